@@ -13,9 +13,16 @@ from datetime import datetime
 from typing import Dict, Any, Optional
 from dataclasses import dataclass
 
+from lifecycle_store import LifecycleStore
+
 # 設置日誌
 logger = logging.getLogger(__name__)
 
+# 內存緩存類型與每類上限
+CACHE_TYPES = ['positions', 'risk_states', 'exit_positions', 'peak_updates', 'trailing_states',
+               'protection_states', 'position_status', 'trailing_stops', 'last_updates']
+MAX_CACHE_ENTRIES = 5000
+
 @dataclass
 class UpdateTask:
     """更新任務數據結構"""
@@ -25,6 +32,7 @@ class UpdateTask:
     timestamp: float
     retry_count: int = 0
     max_retries: int = 3
+    priority: int = 0
 
 class AsyncDatabaseUpdater:
     """
@@ -56,15 +64,14 @@ class AsyncDatabaseUpdater:
         self.last_cleanup_time = time.time()
         
         # 💾 內存緩存
+        # positions / risk_states / exit_positions / peak_updates / trailing_states /
+        # protection_states / position_status / trailing_stops: position_id -> data
+        # last_updates: position_id -> timestamp
+        # 每次寫入重新計時，超過 cache_max_age 未更新即由儲存區到期移除
         self.memory_cache = {
-            'positions': {},  # position_id -> position_data
-            'risk_states': {},  # position_id -> risk_data
-            'exit_positions': {},  # position_id -> exit_data (🔧 新增：平倉緩存)
-            'peak_updates': {},  # 🚀 新增：position_id -> peak_update_data (零風險峰值更新)
-            'trailing_states': {},  # 🎯 新增：position_id -> trailing_state_data (移動停利狀態)
-            'protection_states': {},  # 🛡️ 新增：position_id -> protection_state_data (保護性停損狀態)
-            'position_status': {},  # 📊 新增：position_id -> position_status_data (部位狀態)
-            'last_updates': {}  # position_id -> timestamp
+            cache_type: LifecycleStore(f'async_cache.{cache_type}', ttl_seconds=self.cache_max_age,
+                                       max_entries=MAX_CACHE_ENTRIES, expire_on_set=True)
+            for cache_type in CACHE_TYPES
         }
         
         # 📊 性能統計
@@ -354,9 +361,6 @@ class AsyncDatabaseUpdater:
         # 🚀 立即更新內存緩存（移動停利狀態）
         with self.cache_lock:
             # 更新移動停利狀態緩存
-            if 'trailing_states' not in self.memory_cache:
-                self.memory_cache['trailing_states'] = {}
-
             self.memory_cache['trailing_states'][position_id] = {
                 'position_id': position_id,
                 'trailing_activated': trailing_activated,
@@ -425,9 +429,6 @@ class AsyncDatabaseUpdater:
         # 🚀 立即更新內存緩存（保護性停損狀態）
         with self.cache_lock:
             # 更新保護性停損狀態緩存
-            if 'protection_states' not in self.memory_cache:
-                self.memory_cache['protection_states'] = {}
-
             self.memory_cache['protection_states'][position_id] = {
                 'position_id': position_id,
                 'current_stop_loss': current_stop_loss,
@@ -482,9 +483,6 @@ class AsyncDatabaseUpdater:
         # 🚀 立即更新內存緩存（部位狀態）
         with self.cache_lock:
             # 更新部位狀態緩存
-            if 'position_status' not in self.memory_cache:
-                self.memory_cache['position_status'] = {}
-
             self.memory_cache['position_status'][position_id] = {
                 'position_id': position_id,
                 'status': status,
@@ -558,38 +556,10 @@ class AsyncDatabaseUpdater:
             with self.cache_lock:
                 cleaned_count = 0
 
-                # 清理各類緩存中的過期條目
-                for cache_type in ['positions', 'risk_states', 'exit_positions',
-                                 'peak_updates', 'trailing_states', 'protection_states',
-                                 'position_status']:
-
-                    if cache_type not in self.memory_cache:
-                        continue
-
-                    cache = self.memory_cache[cache_type]
-                    expired_keys = []
-
-                    for key, data in cache.items():
-                        if isinstance(data, dict) and 'updated_at' in data:
-                            age = current_time - data['updated_at']
-                            if age > self.cache_max_age:
-                                expired_keys.append(key)
-
-                    # 移除過期條目
-                    for key in expired_keys:
-                        del cache[key]
-                        cleaned_count += 1
-
-                # 清理last_updates
-                if 'last_updates' in self.memory_cache:
-                    expired_keys = []
-                    for position_id, timestamp in self.memory_cache['last_updates'].items():
-                        if (current_time - timestamp) > self.cache_max_age:
-                            expired_keys.append(position_id)
-
-                    for key in expired_keys:
-                        del self.memory_cache['last_updates'][key]
-                        cleaned_count += 1
+                # 各類緩存依到期順序移除前端條目，不掃描全表
+                for cache in self.memory_cache.values():
+                    cache.ttl_seconds = self.cache_max_age
+                    cleaned_count += cache.expire()
 
                 self.last_cleanup_time = current_time
 
@@ -801,6 +771,11 @@ class AsyncDatabaseUpdater:
         with self.stats_lock:
             return self.stats.copy()
 
+    def get_cache_stats(self) -> Dict:
+        """獲取各類內存緩存的即時數量"""
+        with self.cache_lock:
+            return {cache_type: cache.get_stats() for cache_type, cache in self.memory_cache.items()}
+
     def _process_position_exit_task(self, task: UpdateTask) -> bool:
         """
         處理平倉任務 - 🔧 新增：參考建倉任務處理邏輯
@@ -903,9 +878,6 @@ class AsyncDatabaseUpdater:
         try:
             # 立即更新內存緩存
             with self.cache_lock:
-                if 'trailing_stops' not in self.memory_cache:
-                    self.memory_cache['trailing_stops'] = {}
-
                 cache_key = f"trailing_stop_{position_id}"
                 self.memory_cache['trailing_stops'][cache_key] = {
                     'position_id': position_id,
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+串流K棒聚合器
+逐筆報價以固定大小的狀態累計開高低收量，同時維護多個週期 (1分/5分) 與固定時間窗 (開盤區間)，
+K棒完成時以事件通知訂閱者；即時策略與報價重播共用同一套聚合邏輯
+"""
+
+import logging
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BarCallback = Callable[['Bar'], None]
+
+
+class Bar:
+    """單根K棒 - 只保存開高低收量，不保留逐筆價格"""
+
+    __slots__ = ('name', 'start_sod', 'end_sod', 'open', 'high', 'low', 'close', 'volume', 'tick_count')
+
+    def __init__(self, name: str, start_sod: int, end_sod: int, price: float, volume: int = 0):
+        self.name = name
+        self.start_sod = start_sod
+        self.end_sod = end_sod
+        self.open = self.high = self.low = self.close = price
+        self.volume = volume
+        self.tick_count = 1
+
+    def update(self, price: float, volume: int = 0):
+        """累計一筆報價"""
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += volume
+        self.tick_count += 1
+
+    @property
+    def start_text(self) -> str:
+        """K棒起始時間 HH:MM:SS（顯示用）"""
+        sod = self.start_sod
+        return f"{sod // 3600:02d}:{sod // 60 % 60:02d}:{sod % 60:02d}"
+
+    def to_dict(self) -> Dict:
+        """轉換為字典格式"""
+        return {
+            'name': self.name,
+            'start_time': self.start_text,
+            'open': self.open,
+            'high': self.high,
+            'low': self.low,
+            'close': self.close,
+            'volume': self.volume,
+            'tick_count': self.tick_count,
+        }
+
+    def __repr__(self) -> str:
+        return (f"Bar({self.name} {self.start_text} O:{self.open} H:{self.high} "
+                f"L:{self.low} C:{self.close} V:{self.volume})")
+
+
+class _BarSeries:
+    """單一週期的進行中K棒與最後完成K棒"""
+
+    __slots__ = ('name', 'seconds', 'window_start', 'callbacks', 'current', 'last', 'completed', 'done')
+
+    def __init__(self, name: str, seconds: int, window_start: Optional[int] = None):
+        self.name = name
+        self.seconds = seconds
+        self.window_start = window_start  # None=週期K棒，否則為只收一根的固定時間窗
+        self.callbacks: List[BarCallback] = []
+        self.reset()
+
+    def reset(self):
+        self.current: Optional[Bar] = None
+        self.last: Optional[Bar] = None
+        self.completed = 0
+        self.done = False
+
+    def update(self, price: float, sod: int, volume: int, emitted: List[Bar]):
+        if self.window_start is not None:
+            self._update_window(price, sod, volume, emitted)
+            return
+
+        current = self.current
+        if current is not None and current.start_sod <= sod < current.end_sod:
+            current.update(price, volume)
+            return
+
+        # 進入新的K棒 (含跨日時間倒退)
+        if current is not None:
+            self._complete(emitted)
+        start = sod - sod % self.seconds
+        self.current = Bar(self.name, start, start + self.seconds, price, volume)
+
+    def _update_window(self, price: float, sod: int, volume: int, emitted: List[Bar]):
+        if self.done:
+            return
+        start = self.window_start
+        if sod < start:
+            return
+        if sod < start + self.seconds:
+            if self.current is None:
+                self.current = Bar(self.name, start, start + self.seconds, price, volume)
+            else:
+                self.current.update(price, volume)
+            return
+        # 時間窗結束後的第一筆報價完成K棒
+        self.done = True
+        if self.current is not None:
+            self._complete(emitted)
+
+    def advance(self, sod: int, emitted: List[Bar]):
+        """不等下一筆報價，依時間完成已結束的K棒"""
+        current = self.current
+        if current is None:
+            if self.window_start is not None and not self.done and sod >= self.window_start + self.seconds:
+                self.done = True
+            return
+        if sod >= current.end_sod or (self.window_start is None and sod < current.start_sod):
+            if self.window_start is not None:
+                self.done = True
+            self._complete(emitted)
+
+    def _complete(self, emitted: List[Bar]):
+        self.last = self.current
+        self.current = None
+        self.completed += 1
+        emitted.append(self.last)
+
+
+class BarBuilder:
+    """
+    多週期串流K棒聚合器
+
+    - add_timeframe: 以當日秒數對齊的週期K棒 (60 → 1分K, 300 → 5分K)
+    - add_window: 固定時間窗只產生一根K棒 (例如 08:46 起 120 秒的開盤區間)
+    - update: 每筆報價對每個週期只做常數次比較與累計；跨到新K棒時，
+      將完成的K棒依註冊順序通知訂閱者
+    """
+
+    def __init__(self):
+        self._series: Dict[str, _BarSeries] = {}
+        self._ordered: List[_BarSeries] = []
+
+    def _register(self, series: _BarSeries, callback: Optional[BarCallback]) -> _BarSeries:
+        old = self._series.get(series.name)
+        if old is not None:
+            series.callbacks = old.callbacks
+            self._ordered[self._ordered.index(old)] = series
+        else:
+            self._ordered.append(series)
+        self._series[series.name] = series
+        if callback is not None and callback not in series.callbacks:
+            series.callbacks.append(callback)
+        return series
+
+    def add_timeframe(self, name: str, seconds: int, callback: Optional[BarCallback] = None):
+        """新增 (或重設) 週期K棒"""
+        if seconds <= 0:
+            raise ValueError(f"K棒週期必須為正數: {seconds}")
+        self._register(_BarSeries(name, seconds), callback)
+
+    def add_window(self, name: str, start_sod: int, seconds: int, callback: Optional[BarCallback] = None):
+        """新增 (或重新設定) 固定時間窗K棒，已註冊的訂閱者會保留"""
+        if seconds <= 0:
+            raise ValueError(f"時間窗長度必須為正數: {seconds}")
+        self._register(_BarSeries(name, seconds, window_start=start_sod), callback)
+
+    def subscribe(self, name: str, callback: BarCallback):
+        """訂閱指定週期的完成K棒事件"""
+        callbacks = self._series[name].callbacks
+        if callback not in callbacks:
+            callbacks.append(callback)
+
+    def update(self, price: float, sod: int, volume: int = 0) -> int:
+        """
+        累計一筆報價
+
+        Args:
+            price: 成交價
+            sod: 當日秒數 (TickTime.sod)
+            volume: 成交量
+
+        Returns:
+            int: 本筆報價完成的K棒數
+        """
+        emitted: List[Bar] = []
+        for series in self._ordered:
+            series.update(price, sod, volume, emitted)
+        if emitted:
+            self._emit(emitted)
+        return len(emitted)
+
+    def advance(self, sod: int) -> int:
+        """時間推進到 sod，完成已結束但尚未收到下一筆報價的K棒"""
+        emitted: List[Bar] = []
+        for series in self._ordered:
+            series.advance(sod, emitted)
+        if emitted:
+            self._emit(emitted)
+        return len(emitted)
+
+    def flush(self) -> int:
+        """完成所有進行中的K棒 (收盤或重播結束時)"""
+        emitted: List[Bar] = []
+        for series in self._ordered:
+            if series.current is not None:
+                if series.window_start is not None:
+                    series.done = True
+                series._complete(emitted)
+        if emitted:
+            self._emit(emitted)
+        return len(emitted)
+
+    def _emit(self, bars: List[Bar]):
+        for bar in bars:
+            for callback in self._series[bar.name].callbacks:
+                try:
+                    callback(bar)
+                except Exception as e:
+                    logger.error(f"❌ K棒事件處理錯誤 ({bar.name}): {e}")
+
+    def current(self, name: str) -> Optional[Bar]:
+        """進行中的K棒"""
+        return self._series[name].current
+
+    def last(self, name: str) -> Optional[Bar]:
+        """最後一根完成的K棒"""
+        return self._series[name].last
+
+    def reset(self, name: Optional[str] = None):
+        """清除K棒狀態 (保留週期設定與訂閱者)"""
+        for series in ([self._series[name]] if name else self._ordered):
+            series.reset()
+
+    def get_stats(self) -> Dict[str, int]:
+        """各週期已完成的K棒數"""
+        return {series.name: series.completed for series in self._ordered}
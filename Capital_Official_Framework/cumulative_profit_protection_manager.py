@@ -163,13 +163,14 @@ class CumulativeProfitProtectionManager:
             with self.db_manager.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT pr.*, ler.protective_stop_multiplier
+                    SELECT pr.id, pr.group_id, pr.lot_id, pr.direction, pr.entry_price, pr.current_stop_loss,
+                           ler.protective_stop_multiplier
                     FROM position_records pr
-                    LEFT JOIN lot_exit_rules ler ON pr.lot_rule_id = ler.lot_number
-                    WHERE pr.group_id = ? 
+                    LEFT JOIN lot_exit_rules ler ON ler.lot_number = pr.lot_rule_id
+                    WHERE pr.group_id = ?
                       AND pr.status = 'ACTIVE'
-                      AND pr.id > ?
                       AND pr.is_initial_stop = TRUE
+                      AND pr.id > ?
                     ORDER BY pr.lot_id
                 ''', (group_id, successful_exit_position_id))
                 
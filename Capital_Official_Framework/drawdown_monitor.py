@@ -117,13 +117,10 @@ class DrawdownMonitor:
             with self.db_manager.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT pr.*, sg.range_high, sg.range_low
+                    SELECT pr.id, pr.group_id, pr.lot_id, pr.direction, pr.peak_price,
+                           pr.trailing_pullback_ratio, sg.range_high, sg.range_low
                     FROM position_records pr
-                    JOIN (
-                        SELECT * FROM strategy_groups
-                        WHERE date = ?
-                        ORDER BY id DESC
-                    ) sg ON pr.group_id = sg.group_id
+                    JOIN strategy_groups sg ON sg.date = ? AND sg.group_id = pr.group_id
                     WHERE pr.status = 'ACTIVE'
                       AND pr.trailing_activated = TRUE
                       AND pr.peak_price IS NOT NULL
@@ -233,7 +233,9 @@ class ExitMechanismDatabaseExtension:
             'CREATE INDEX IF NOT EXISTS idx_group_exit_status_date ON group_exit_status(date, group_id)',
             'CREATE INDEX IF NOT EXISTS idx_exit_events_position ON exit_events(position_id, event_type)',
             'CREATE INDEX IF NOT EXISTS idx_exit_events_time ON exit_events(trigger_time, execution_time)',
-            'CREATE INDEX IF NOT EXISTS idx_lot_exit_rules_lookup ON lot_exit_rules(rule_name, lot_number)'
+            'CREATE INDEX IF NOT EXISTS idx_lot_exit_rules_lookup ON lot_exit_rules(rule_name, lot_number)',
+            # 累積獲利保護以口數查保護倍數 (覆蓋索引)
+            'CREATE INDEX IF NOT EXISTS idx_lot_exit_rules_lot_protection ON lot_exit_rules(lot_number, protective_stop_multiplier)'
         ]
         
         for index_sql in indexes:
@@ -199,6 +199,10 @@ class ExitOrderTracker:
                     return False
                 
                 position_id = exit_order.position_id
+
+                # 回填匹配結果，讓呼叫端得知成交所屬的部位與訂單
+                fill_report.order_id = exit_order.order_id
+                fill_report.position_id = position_id
                 
                 # 更新訂單狀態
                 exit_order.status = ExitOrderStatus.FILLED
@@ -12,6 +12,8 @@ from datetime import datetime
 from dataclasses import dataclass
 import logging
 
+MAX_PENDING_ORDERS = 1000  # 待匹配訂單硬上限
+
 @dataclass
 class OrderInfo:
     """訂單資訊"""
@@ -42,11 +44,13 @@ class FIFOOrderMatcher:
         # 匹配參數
         self.price_tolerance = 10.0  # ±10點價格容差（擴大以適應滑價）
         self.time_window = 30.0     # 30秒時間窗口
+        self.max_pending_orders = MAX_PENDING_ORDERS
         
         # 統計數據
         self.total_registered = 0
         self.total_matched = 0
         self.total_expired = 0
+        self.total_evicted = 0
         
         if self.console_enabled:
             print("[FIFO_MATCHER] 純FIFO匹配器已初始化")
@@ -67,17 +71,19 @@ class FIFOOrderMatcher:
                 if order_info.submit_time == 0:
                     order_info.submit_time = time.time()
                 
-                # 插入到正確位置以維持時間順序
-                inserted = False
-                for i, existing_order in enumerate(self.pending_orders):
-                    if order_info.submit_time < existing_order.submit_time:
-                        self.pending_orders.insert(i, order_info)
-                        inserted = True
-                        break
-                
-                if not inserted:
-                    self.pending_orders.append(order_info)
-                
+                # 插入到正確位置以維持時間順序 (一般為最新訂單，從尾端找起)
+                i = len(self.pending_orders)
+                while i > 0 and self.pending_orders[i - 1].submit_time > order_info.submit_time:
+                    i -= 1
+                self.pending_orders.insert(i, order_info)
+
+                # 超過上限時淘汰最舊訂單
+                overflow = len(self.pending_orders) - self.max_pending_orders
+                if overflow > 0:
+                    del self.pending_orders[:overflow]
+                    self.total_evicted += overflow
+                    self.logger.warning(f"待匹配訂單超過上限{self.max_pending_orders}，淘汰最舊{overflow}筆")
+
                 self.total_registered += 1
                 
                 if self.console_enabled:
@@ -216,15 +222,15 @@ class FIFOOrderMatcher:
             return product
     
     def _cleanup_expired_orders(self, current_time: float):
-        """清理過期訂單"""
+        """清理過期訂單 (隊列依時間排序，只需移除前端)"""
         try:
             expired_count = 0
-            self.pending_orders = [
-                order for order in self.pending_orders
-                if current_time - order.submit_time <= self.time_window
-            ]
-            
+            while (expired_count < len(self.pending_orders) and
+                   current_time - self.pending_orders[expired_count].submit_time > self.time_window):
+                expired_count += 1
+
             if expired_count > 0:
+                del self.pending_orders[:expired_count]
                 self.total_expired += expired_count
                 if self.console_enabled:
                     print(f"[FIFO_MATCHER] 🗑️ 清理過期訂單: {expired_count}筆")
@@ -245,7 +251,9 @@ class FIFOOrderMatcher:
                 'total_registered': self.total_registered,
                 'total_matched': self.total_matched,
                 'total_expired': self.total_expired,
-                'pending_count': len(self.pending_orders)
+                'total_evicted': self.total_evicted,
+                'pending_count': len(self.pending_orders),
+                'max_pending_orders': self.max_pending_orders
             }
     
     def clear_all_orders(self):
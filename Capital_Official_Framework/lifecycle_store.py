@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生命週期儲存區
+取代長時間運行下持續成長、靠定期全表掃描清理的字典
+
+- 有序雜湊 (OrderedDict) 依開始計時的先後排列，到期條目由前端 O(1) 移除
+- 同一儲存區共用 TTL，計時起點單調遞增，不需要堆積排序；調整 TTL 立即套用到所有條目
+- 硬上限: 超過時先淘汰已到期排程的條目，再淘汰最舊的活躍條目
+- 全域登記，SystemMaintenanceManager 可匯出各儲存區即時數量
+"""
+
+import time
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 全域登記 {name: LifecycleStore}
+_registry = weakref.WeakValueDictionary()
+_registry_lock = threading.Lock()
+
+
+class LifecycleStore(MutableMapping):
+    """
+    具TTL到期與硬上限的字典
+
+    兩種用法:
+    - expire_on_set=False (預設): 寫入的條目為「活躍」，呼叫 retire(key) 後才開始計時到期
+      (例: 策略組建倉完成後保留一段時間再移除)
+    - expire_on_set=True: 每次寫入都重新計時 (例: 平倉鎖、內存緩存)
+    """
+
+    def __init__(self, name: str, ttl_seconds: Optional[float] = None,
+                 max_entries: Optional[int] = None, expire_on_set: bool = False,
+                 on_evict: Optional[Callable[[Any, Any, str], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            name: 儲存區名稱 (統計匯出用)
+            ttl_seconds: 到期秒數，None 表示不自動到期
+            max_entries: 條目硬上限，None 表示不限制
+            expire_on_set: 寫入時是否立即開始計時
+            on_evict: 條目被到期或上限淘汰時的回調 fn(key, value, reason)
+            clock: 時間來源 (預設 time.monotonic)
+        """
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.expire_on_set = expire_on_set
+        self.on_evict = on_evict
+        self.clock = clock
+
+        self._data: Dict[Any, Any] = {}
+        self._stamps: "OrderedDict[Any, float]" = OrderedDict()  # key -> 開始計時時間 (依計時順序)
+        self._lock = threading.RLock()
+
+        # 統計
+        self.peak_entries = 0
+        self.expired_count = 0
+        self.evicted_count = 0
+        self.evicted_active_count = 0
+
+        _register(self)
+
+    # ---- MutableMapping ----
+
+    def __getitem__(self, key):
+        with self._lock:
+            stamp = self._stamps.get(key)
+            if stamp is not None and self._is_expired(stamp, self.clock()):
+                self._remove(key, 'expired')
+                raise KeyError(key)
+            return self._data[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            if self.expire_on_set and self.ttl_seconds is not None:
+                self._schedule(key)
+            else:
+                self._stamps.pop(key, None)
+
+            self.expire()
+            self._enforce_cap()
+            if len(self._data) > self.peak_entries:
+                self.peak_entries = len(self._data)
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._data[key]
+            self._stamps.pop(key, None)
+
+    def __iter__(self):
+        with self._lock:
+            self.expire()
+            keys = list(self._data)
+        return iter(keys)
+
+    def __len__(self):
+        with self._lock:
+            self.expire()
+            return len(self._data)
+
+    def items(self):
+        """到期清理後在鎖內取得 (key, value) 快照，迭代期間條目到期不會引發 KeyError"""
+        with self._lock:
+            self.expire()
+            return list(self._data.items())
+
+    def values(self):
+        """到期清理後在鎖內取得值的快照"""
+        with self._lock:
+            self.expire()
+            return list(self._data.values())
+
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._stamps.clear()
+
+    # ---- 生命週期 ----
+
+    def retire(self, key) -> bool:
+        """
+        將條目標記為已完成，TTL 後自動移除
+
+        Returns:
+            bool: 條目是否存在
+        """
+        with self._lock:
+            if key not in self._data:
+                return False
+            if self.ttl_seconds is None:
+                return True
+            if key not in self._stamps:
+                self._stamps[key] = self.clock()
+            return True
+
+    def is_retired(self, key) -> bool:
+        """條目是否已排程到期"""
+        with self._lock:
+            return key in self._stamps
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """
+        移除所有已到期條目 (只檢查到期佇列前端)
+
+        Returns:
+            int: 移除數量
+        """
+        removed = 0
+        with self._lock:
+            if not self._stamps or self.ttl_seconds is None:
+                return 0
+            now = self.clock() if now is None else now
+            while self._stamps:
+                key, stamp = next(iter(self._stamps.items()))
+                if not self._is_expired(stamp, now):
+                    break
+                self._remove(key, 'expired')
+                removed += 1
+        return removed
+
+    def get_stats(self) -> Dict:
+        """獲取即時統計"""
+        with self._lock:
+            self.expire()
+            return {
+                'name': self.name,
+                'live': len(self._data),
+                'retired': len(self._stamps),
+                'active': len(self._data) - len(self._stamps),
+                'peak': self.peak_entries,
+                'expired': self.expired_count,
+                'evicted': self.evicted_count,
+                'evicted_active': self.evicted_active_count,
+                'ttl_seconds': self.ttl_seconds,
+                'max_entries': self.max_entries,
+            }
+
+    # ---- 內部 ----
+
+    def _schedule(self, key):
+        self._stamps[key] = self.clock()
+        self._stamps.move_to_end(key)
+
+    def _is_expired(self, stamp: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - stamp >= self.ttl_seconds
+
+    def _remove(self, key, reason: str):
+        value = self._data.pop(key, None)
+        self._stamps.pop(key, None)
+        if reason == 'expired':
+            self.expired_count += 1
+        else:
+            self.evicted_count += 1
+        if self.on_evict:
+            try:
+                self.on_evict(key, value, reason)
+            except Exception as e:
+                logger.error(f"[{self.name}] 淘汰回調失敗: {e}")
+
+    def _enforce_cap(self):
+        if self.max_entries is None:
+            return
+        while len(self._data) > self.max_entries:
+            if self._stamps:
+                # 優先淘汰最早排程到期的條目
+                key = next(iter(self._stamps))
+            else:
+                # 沒有可到期條目時淘汰最舊的活躍條目
+                key = next(iter(self._data))
+                self.evicted_active_count += 1
+                logger.warning(f"[{self.name}] 超過上限{self.max_entries}，淘汰活躍條目: {key}")
+            self._remove(key, 'capacity')
+
+
+def _register(store: LifecycleStore):
+    with _registry_lock:
+        name = store.name
+        suffix = 1
+        while name in _registry:
+            suffix += 1
+            name = f"{store.name}#{suffix}"
+        store.name = name
+        _registry[name] = store
+
+
+def get_lifecycle_stats() -> Dict[str, Dict]:
+    """匯出所有儲存區的即時統計"""
+    with _registry_lock:
+        stores = list(_registry.values())
+    return {store.name: store.get_stats() for store in stores}
+
+
+def expire_all_stores() -> int:
+    """對所有儲存區執行到期清理 (維護任務用)"""
+    with _registry_lock:
+        stores = list(_registry.values())
+    return sum(store.expire() for store in stores)
@@ -13,15 +13,45 @@ from datetime import datetime, date
 from typing import List, Dict, Optional, Tuple
 from decimal import Decimal
 
+from session_archive import attach_history, default_archive_path
+
 # 設定日誌
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 即時風控查詢用到的部位欄位 (取代 p.*；新增欄位且有模組讀取時需一併加入)
+ACTIVE_POSITION_COLUMNS = (
+    'id', 'group_id', 'lot_id', 'direction', 'entry_price', 'entry_time',
+    'exit_price', 'exit_time', 'exit_reason', 'pnl', 'rule_config', 'status',
+    'order_id', 'order_status', 'retry_count', 'original_price', 'updated_at',
+    'current_stop_loss', 'is_initial_stop', 'trailing_activated', 'peak_price',
+    'trailing_activation_points', 'trailing_pullback_ratio'
+)
+_ACTIVE_POSITION_SELECT = ', '.join(f'p.{column}' for column in ACTIVE_POSITION_COLUMNS)
+
+# 即時風控查詢專用索引: (索引名, 表名, 欄位)
+# 部位表只有活躍部位會被掃描，索引以 status 開頭，後接 ORDER BY 欄位與查詢回傳欄位 (覆蓋索引，不回表)
+HOT_QUERY_INDEXES = (
+    # get_all_active_positions / get_active_positions_by_group
+    ('idx_position_records_active_lots', 'position_records', 'status, group_id, lot_id'),
+    # StopLossMonitor: 初始停損中的活躍部位
+    ('idx_position_records_active_stop', 'position_records',
+     'status, is_initial_stop, group_id, lot_id, direction, current_stop_loss'),
+    # PeakPriceTracker / DrawdownMonitor: 移動停利中的活躍部位
+    ('idx_position_records_active_trailing', 'position_records',
+     'status, trailing_activated, group_id, lot_id, direction, peak_price, trailing_pullback_ratio'),
+    # CumulativeProfitProtectionManager: 同組剩餘部位
+    ('idx_position_records_group_protection', 'position_records',
+     'group_id, status, is_initial_stop, lot_id, direction, entry_price, current_stop_loss, lot_rule_id'),
+)
+
 class MultiGroupDatabaseManager:
     """多組策略專用資料庫管理器"""
     
-    def __init__(self, db_path: str = "multi_group_strategy.db"):
+    def __init__(self, db_path: str = "multi_group_strategy.db", archive_path: Optional[str] = None):
         self.db_path = db_path
+        # 已結束場次的封存庫 (SessionArchiver 收盤後搬移)，跨日查詢經 get_history_connection()
+        self.archive_path = archive_path or default_archive_path(db_path)
         self.init_database()
         logger.info(f"多組策略資料庫管理器初始化完成: {db_path}")
     
@@ -43,6 +73,7 @@ class MultiGroupDatabaseManager:
                         range_low REAL,
                         total_lots INTEGER NOT NULL,
                         status TEXT DEFAULT 'WAITING',
+                        product TEXT,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         
                         UNIQUE(date, group_id),
@@ -108,6 +139,23 @@ class MultiGroupDatabaseManager:
                     )
                 ''')
                 
+                # 創建移動停利記錄表 (異步更新器 trailing_stop 任務使用)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS trailing_stop_records (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        position_id INTEGER NOT NULL,
+                        peak_price REAL,
+                        current_stop_price REAL,
+                        is_activated BOOLEAN DEFAULT FALSE,
+                        last_update_time TIMESTAMP,
+                        status TEXT DEFAULT 'ACTIVE',
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+                        FOREIGN KEY (position_id) REFERENCES position_records(id)
+                    )
+                ''')
+
                 # 創建每日策略統計表
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS daily_strategy_stats (
@@ -140,6 +188,9 @@ class MultiGroupDatabaseManager:
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_position_records_api_seq_no ON position_records(api_seq_no)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_risk_states_position_update ON risk_management_states(position_id, last_update_time)')
 
+                # 即時風控查詢覆蓋索引
+                self._create_hot_query_indexes(cursor)
+
                 conn.commit()
                 logger.info("✅ 多組策略資料庫表結構創建完成")
                 
@@ -193,6 +244,17 @@ class MultiGroupDatabaseManager:
                 'retry_reason': 'TEXT'
             }
 
+            # 即時風控查詢與覆蓋索引用到的停損/移動停利欄位 (平倉機制擴展也會檢查)
+            required_columns.update({
+                'current_stop_loss': 'REAL',
+                'is_initial_stop': 'BOOLEAN DEFAULT TRUE',
+                'trailing_activated': 'BOOLEAN DEFAULT FALSE',
+                'peak_price': 'REAL',
+                'trailing_activation_points': 'INTEGER',
+                'trailing_pullback_ratio': 'REAL DEFAULT 0.20',
+                'lot_rule_id': 'INTEGER'
+            })
+
             for column_name, column_def in required_columns.items():
                 if column_name not in columns:
                     try:
@@ -201,11 +263,29 @@ class MultiGroupDatabaseManager:
                     except Exception as e:
                         logger.warning(f"⚠️ 添加欄位 {column_name} 失敗: {e}")
 
+            # 多商品: 策略組記錄所屬商品 (舊資料為NULL，視為預設商品)
+            cursor.execute("PRAGMA table_info(strategy_groups)")
+            group_columns = [column[1] for column in cursor.fetchall()]
+            if 'product' not in group_columns:
+                try:
+                    cursor.execute('ALTER TABLE strategy_groups ADD COLUMN product TEXT')
+                    logger.info("✅ 添加缺失欄位: strategy_groups.product")
+                except Exception as e:
+                    logger.warning(f"⚠️ 添加欄位 strategy_groups.product 失敗: {e}")
+
             logger.info("✅ 必要欄位檢查完成")
 
         except Exception as e:
             logger.error(f"❌ 檢查必要欄位失敗: {e}")
 
+    def _create_hot_query_indexes(self, cursor):
+        """建立即時風控查詢的覆蓋索引"""
+        for index_name, table, columns in HOT_QUERY_INDEXES:
+            try:
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON {table}({columns})')
+            except Exception as e:
+                logger.warning(f"⚠️ 建立索引 {index_name} 失敗: {e}")
+
     def _fix_entry_price_constraint(self, cursor):
         """修復 entry_price 的 NOT NULL 約束問題"""
         try:
@@ -307,18 +387,35 @@ class MultiGroupDatabaseManager:
             if conn:
                 conn.close()
     
+    @contextmanager
+    def get_history_connection(self):
+        """
+        取得含封存資料的唯讀查詢連線
+
+        附加封存庫並以同名 TEMP VIEW 合併熱/冷資料，既有查詢語句可直接查到已封存的場次
+        """
+        with self.get_connection() as conn:
+            attach_history(conn, self.archive_path)
+            yield conn
+
+    def _connection_for_date(self, date_str: str):
+        """今日場次查熱資料庫，過去日期查含封存資料的連線"""
+        if date_str >= date.today().isoformat():
+            return self.get_connection()
+        return self.get_history_connection()
+
     def create_strategy_group(self, date: str, group_id: int, direction: str, 
                             signal_time: str, range_high: float, range_low: float, 
-                            total_lots: int) -> int:
+                            total_lots: int, product: Optional[str] = None) -> int:
         """創建策略組記錄"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO strategy_groups 
-                    (date, group_id, direction, entry_signal_time, range_high, range_low, total_lots)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (date, group_id, direction, signal_time, range_high, range_low, total_lots))
+                    (date, group_id, direction, entry_signal_time, range_high, range_low, total_lots, product)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (date, group_id, direction, signal_time, range_high, range_low, total_lots, product))
                 
                 strategy_group_id = cursor.lastrowid
                 conn.commit()
@@ -444,6 +541,8 @@ class MultiGroupDatabaseManager:
                     sql = f"UPDATE risk_management_states SET {', '.join(update_fields)} WHERE position_id = ?"
                     cursor.execute(sql, params)
                     conn.commit()
+
+                return True
                 
         except Exception as e:
             logger.error(f"更新風險管理狀態失敗: {e}")
@@ -455,17 +554,13 @@ class MultiGroupDatabaseManager:
             from datetime import date
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT p.*, r.peak_price, r.current_stop_loss, r.trailing_activated, r.protection_activated,
-                           sg.range_high, sg.range_low, sg.direction
+                cursor.execute(f'''
+                    SELECT {_ACTIVE_POSITION_SELECT}, r.peak_price, r.current_stop_loss, r.trailing_activated,
+                           r.protection_activated, sg.range_high, sg.range_low, sg.direction, sg.product
                     FROM position_records p
                     LEFT JOIN risk_management_states r ON p.id = r.position_id
-                    LEFT JOIN (
-                        SELECT * FROM strategy_groups
-                        WHERE date = ?
-                        ORDER BY id DESC
-                    ) sg ON p.group_id = sg.group_id
-                    WHERE p.group_id = ? AND p.status = 'ACTIVE'
+                    LEFT JOIN strategy_groups sg ON sg.date = ? AND sg.group_id = p.group_id
+                    WHERE p.status = 'ACTIVE' AND p.group_id = ?
                     ORDER BY p.lot_id
                 ''', (date.today().isoformat(), group_id))
 
@@ -486,16 +581,12 @@ class MultiGroupDatabaseManager:
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT p.*, r.peak_price, r.current_stop_loss, r.trailing_activated, r.protection_activated,
-                           sg.range_high, sg.range_low
+                cursor.execute(f'''
+                    SELECT {_ACTIVE_POSITION_SELECT}, r.peak_price, r.current_stop_loss, r.trailing_activated,
+                           r.protection_activated, sg.range_high, sg.range_low, sg.product
                     FROM position_records p
                     LEFT JOIN risk_management_states r ON p.id = r.position_id
-                    LEFT JOIN (
-                        SELECT * FROM strategy_groups
-                        WHERE date = ?
-                        ORDER BY id DESC
-                    ) sg ON p.group_id = sg.group_id
+                    LEFT JOIN strategy_groups sg ON sg.date = ? AND sg.group_id = p.group_id
                     WHERE p.status = 'ACTIVE'
                     ORDER BY p.group_id, p.lot_id
                 ''', (date.today().isoformat(),))
@@ -549,7 +640,7 @@ class MultiGroupDatabaseManager:
             date_str = date.today().isoformat()
 
         try:
-            with self.get_connection() as conn:
+            with self._connection_for_date(date_str) as conn:
                 cursor = conn.cursor()
 
                 # 查詢基本統計
@@ -803,7 +894,7 @@ class MultiGroupDatabaseManager:
             if date_str is None:
                 date_str = date.today().strftime('%Y-%m-%d')
 
-            with self.get_connection() as conn:
+            with self._connection_for_date(date_str) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT
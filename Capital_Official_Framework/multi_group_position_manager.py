@@ -82,8 +82,8 @@ class MultiGroupPositionManager:
             self.logger.warning("⚠️ 異步更新器已移除")
     
     def create_entry_signal(self, direction: str, signal_time: str,
-                           range_high: float, range_low: float) -> List[int]:
-        """創建進場信號，支援動態 group_id 分配"""
+                           range_high: float, range_low: float, product: str = None) -> List[int]:
+        """創建進場信號，支援動態 group_id 分配 (product: 所屬商品，多商品風控路由用)"""
         try:
             created_groups = []
             current_date = date.today().isoformat()
@@ -106,7 +106,8 @@ class MultiGroupPositionManager:
                     signal_time=signal_time,
                     range_high=range_high,
                     range_low=range_low,
-                    total_lots=group_config.lots_per_group
+                    total_lots=group_config.lots_per_group,
+                    product=product
                 )
 
                 created_groups.append(group_db_id)
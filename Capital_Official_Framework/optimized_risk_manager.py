@@ -36,7 +36,8 @@ class OptimizedRiskManager:
     4. 安全回退機制 - 出錯時自動回退到原始方法
     """
     
-    def __init__(self, db_manager, original_managers: Dict = None, console_enabled: bool = True):
+    def __init__(self, db_manager, original_managers: Dict = None, console_enabled: bool = True,
+                 default_product: str = None):
         """
         初始化優化風險管理器
 
@@ -44,9 +45,11 @@ class OptimizedRiskManager:
             db_manager: 資料庫管理器
             original_managers: 原始管理器字典 (用於回退)
             console_enabled: 是否啟用Console日誌
+            default_product: 未記錄商品的部位所屬商品 (舊資料/單商品模式)
         """
         self.db_manager = db_manager
         self.console_enabled = console_enabled
+        self.default_product = default_product
 
         # 🛡️ 安全機制：保留原始管理器作為回退
         self.original_managers = original_managers or {}
@@ -63,6 +66,7 @@ class OptimizedRiskManager:
         self.stop_loss_cache = {}  # {position_id: stop_loss_price}
         self.activation_cache = {}  # {position_id: activation_price}
         self.trailing_cache = {}  # {position_id: trailing_data}
+        self.product_books = {}  # {product: set(position_id)} 各商品部位簿，報價只掃描所屬商品
         
         # ⏰ 時間控制
         self.last_backup_update = 0
@@ -140,6 +144,7 @@ class OptimizedRiskManager:
             with self.cache_lock:
                 # 🎯 立即加入緩存
                 self.position_cache[position_id] = position_dict
+                self._index_position(position_id, position_dict)
 
                 # 🔢 預計算關鍵價格點位
                 self._precalculate_levels(position_dict)
@@ -167,7 +172,11 @@ class OptimizedRiskManager:
         try:
             with self.cache_lock:
                 # 🗑️ 從所有緩存中移除
-                self.position_cache.pop(position_id, None)
+                position_data = self.position_cache.pop(position_id, None)
+                if position_data is not None:
+                    book = self.product_books.get(self._product_of(position_data))
+                    if book is not None:
+                        book.discard(position_id)
                 self.stop_loss_cache.pop(position_id, None)
                 self.activation_cache.pop(position_id, None)
                 self.trailing_cache.pop(position_id, None)
@@ -180,13 +189,14 @@ class OptimizedRiskManager:
             if self.console_enabled:
                 print(f"[OPTIMIZED_RISK] ❌ 部位移除失敗: {e}")
     
-    def update_price(self, current_price: float, timestamp: str = None) -> Dict:
+    def update_price(self, current_price: float, timestamp: str = None, product: str = None) -> Dict:
         """
         優化版價格更新處理
         
         Args:
             current_price: 當前價格
             timestamp: 時間戳
+            product: 報價商品 (None 表示檢查全部部位，與單商品模式相同)
             
         Returns:
             Dict: 處理結果統計
@@ -207,7 +217,7 @@ class OptimizedRiskManager:
                 self.stats['backup_syncs'] += 1
             
             # 🚀 主要邏輯：純內存比較
-            results = self._process_cached_positions(current_price, timestamp)
+            results = self._process_cached_positions(current_price, timestamp, product)
             
             self.stats['cache_hits'] += 1
             return results
@@ -289,8 +299,20 @@ class OptimizedRiskManager:
             if self.console_enabled:
                 print(f"[OPTIMIZED_RISK] ❌ 部位預計算失敗: {e}")
     
-    def _process_cached_positions(self, current_price: float, timestamp: str) -> Dict:
-        """處理緩存中的部位 - 純內存比較"""
+    def _product_of(self, position_data: Dict) -> str:
+        """部位所屬商品"""
+        return position_data.get('product') or self.default_product
+
+    def _index_position(self, position_id, position_data: Dict):
+        """將部位加入所屬商品的部位簿 (重新緩存時先從其他商品的部位簿移除，避免同時出現在兩個部位簿)"""
+        product = self._product_of(position_data)
+        for book_product, book in self.product_books.items():
+            if book_product != product:
+                book.discard(position_id)
+        self.product_books.setdefault(product, set()).add(position_id)
+
+    def _process_cached_positions(self, current_price: float, timestamp: str, product: str = None) -> Dict:
+        """處理緩存中的部位 - 純內存比較 (指定商品時只處理該商品部位簿)"""
         results = {
             'stop_loss_triggers': 0,
             'trailing_activations': 0,
@@ -300,7 +322,12 @@ class OptimizedRiskManager:
         
         try:
             with self.cache_lock:
-                for position_id, position_data in self.position_cache.items():
+                if product is None:
+                    position_ids = tuple(self.position_cache)
+                else:
+                    position_ids = tuple(self.product_books.get(product, ()))
+
+                for position_id in position_ids:
                     # 🛡️ 檢查初始停損
                     if self._check_stop_loss_trigger(position_id, current_price):
                         results['stop_loss_triggers'] += 1
@@ -474,7 +501,7 @@ class OptimizedRiskManager:
                 conn.row_factory = sqlite3.Row
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT pr.*, sg.range_high, sg.range_low
+                    SELECT pr.*, sg.range_high, sg.range_low, sg.product
                     FROM position_records pr
                     JOIN strategy_groups sg ON pr.group_id = sg.id
                     WHERE pr.status = 'ACTIVE'
@@ -511,6 +538,8 @@ class OptimizedRiskManager:
                 
                 # 📊 更新緩存
                 self.position_cache.update(current_positions)
+                for position_id, position_data in current_positions.items():
+                    self._index_position(position_id, position_data)
                 
                 if self.console_enabled and len(rows) > 0:
                     print(f"[OPTIMIZED_RISK] 🔄 備份同步完成: {len(rows)} 個活躍部位")
@@ -553,6 +582,7 @@ class OptimizedRiskManager:
             return {
                 **self.stats,
                 'cached_positions': len(self.position_cache),
+                'product_books': {product: len(ids) for product, ids in self.product_books.items()},
                 'fallback_mode': self.fallback_mode,
                 'last_backup_sync': self.last_backup_update
             }
@@ -570,7 +600,8 @@ class OptimizedRiskManager:
             print("[OPTIMIZED_RISK] ✅ 已禁用回退模式")
 
 
-def create_optimized_risk_manager(db_manager, original_managers: Dict = None, console_enabled: bool = True) -> OptimizedRiskManager:
+def create_optimized_risk_manager(db_manager, original_managers: Dict = None, console_enabled: bool = True,
+                                  default_product: str = None) -> OptimizedRiskManager:
     """
     創建優化風險管理器的工廠函數
     
@@ -578,11 +609,12 @@ def create_optimized_risk_manager(db_manager, original_managers: Dict = None, co
         db_manager: 資料庫管理器
         original_managers: 原始管理器字典
         console_enabled: 是否啟用Console日誌
+        default_product: 未記錄商品的部位所屬商品
         
     Returns:
         OptimizedRiskManager: 優化風險管理器實例
     """
-    return OptimizedRiskManager(db_manager, original_managers, console_enabled)
+    return OptimizedRiskManager(db_manager, original_managers, console_enabled, default_product)
 
 
 if __name__ == "__main__":
@@ -114,10 +114,11 @@ class PeakPriceTracker:
             with self.db_manager.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT pr.*, sg.range_high, sg.range_low
+                    SELECT pr.id, pr.group_id, pr.lot_id, pr.direction, pr.peak_price,
+                           sg.range_high, sg.range_low
                     FROM position_records pr
                     JOIN strategy_groups sg ON pr.group_id = sg.id
-                    WHERE pr.status = 'ACTIVE' 
+                    WHERE pr.status = 'ACTIVE'
                       AND pr.trailing_activated = TRUE
                       AND pr.peak_price IS NOT NULL
                     ORDER BY pr.group_id, pr.lot_id
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多商品報價路由器
+將 OnNotifyTicksLONG 的 (sMarketNo, nStockidx) 對應到商品代碼，
+讓同一程序可同時監控 MTX00 / TXF / 夜盤合約，各商品的報價只驅動該商品的部位
+"""
+
+import re
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 單次 RequestTicks 合併訂閱的商品數上限
+MAX_PRODUCTS_PER_REQUEST = 50
+
+
+def _product_root(product_code: str) -> str:
+    """去除月份/近月數字: MTX07 → MTX, TM2507 → TM"""
+    return re.sub(r'\d+$', '', product_code)
+
+
+class ProductRouter:
+    """
+    報價商品路由
+
+    熱路徑 resolve() 只做一次dict查詢；未知的 (market_no, stock_idx) 才透過
+    lookup (SKQuoteLib_GetStockByIndexLONG) 取得商品代碼並快取，查詢失敗的索引同樣快取，
+    不會每筆報價重複查詢 (註冊新商品時清除)。
+    """
+
+    def __init__(self, primary_product: str, lookup: Optional[Callable[[int, int], Optional[str]]] = None,
+                 console_enabled: bool = True):
+        """
+        Args:
+            primary_product: 主要商品 (策略/Monitor使用其報價)
+            lookup: fn(market_no, stock_idx) -> 商品代碼，用於首次出現的索引
+            console_enabled: 是否啟用Console日誌
+        """
+        self.primary_product = primary_product
+        self.lookup = lookup
+        self.console_enabled = console_enabled
+
+        self.products: List[str] = []
+        self.index_map: Dict[Tuple[int, int], str] = {}
+        self.failed_indexes: Set[Tuple[int, int]] = set()
+        self.last_prices: Dict[str, float] = {}
+        self.tick_counts: Dict[str, int] = {}
+        self.unresolved_ticks = 0
+
+        self._lock = threading.Lock()  # 僅保護註冊
+        self.register_product(primary_product)
+
+    def register_product(self, product_code: str, market_no: Optional[int] = None,
+                         stock_idx: Optional[int] = None):
+        """註冊商品 (可選擇預先綁定索引)"""
+        with self._lock:
+            if product_code not in self.products:
+                self.products.append(product_code)
+                self.tick_counts[product_code] = 0
+                self.failed_indexes.clear()  # 新商品可能讓先前查不到的索引對應成功
+            if market_no is not None and stock_idx is not None:
+                self.index_map[(market_no, stock_idx)] = product_code
+
+    def resolve(self, market_no: int, stock_idx: int) -> Optional[str]:
+        """
+        取得報價所屬商品
+
+        Returns:
+            Optional[str]: 商品代碼，無法辨識時為None
+        """
+        product = self.index_map.get((market_no, stock_idx))
+        if product is not None:
+            return product
+        return self._learn(market_no, stock_idx)
+
+    def on_tick(self, market_no: int, stock_idx: int, price: float) -> Optional[str]:
+        """記錄成交價並回傳所屬商品"""
+        product = self.resolve(market_no, stock_idx)
+        if product is None:
+            self.unresolved_ticks += 1
+            return None
+        self.last_prices[product] = price
+        self.tick_counts[product] = self.tick_counts.get(product, 0) + 1
+        return product
+
+    def is_primary(self, product: Optional[str]) -> bool:
+        """
+        是否為主要商品
+
+        無法辨識 (None) 時：單商品模式視為主要商品以保持原有行為；
+        多商品模式視為非主要商品，由呼叫端丟棄 (計入 unresolved_ticks)，避免其他商品報價驅動主要策略
+        """
+        if product is None:
+            return len(self.products) <= 1
+        return product == self.primary_product
+
+    def get_last_price(self, product: str) -> Optional[float]:
+        return self.last_prices.get(product)
+
+    def subscribe(self, sk_quote, products: Optional[List[str]] = None, page_no: int = 0) -> Dict[str, int]:
+        """
+        批次訂閱報價
+
+        商品以逗號合併為一次 SKQuoteLib_RequestTicks 呼叫；合併呼叫失敗時
+        退回逐一訂閱，避免單一商品代碼錯誤導致全部失敗。
+
+        Args:
+            sk_quote: SKQuoteLib 物件
+            products: 商品列表 (None 表示全部已註冊商品)
+            page_no: 起始頁碼
+
+        Returns:
+            Dict[str, int]: {商品: 回傳代碼}
+        """
+        products = list(products or self.products)
+        for product in products:
+            self.register_product(product)
+
+        results = {}
+        for offset in range(0, len(products), MAX_PRODUCTS_PER_REQUEST):
+            batch = products[offset:offset + MAX_PRODUCTS_PER_REQUEST]
+            page = page_no + offset // MAX_PRODUCTS_PER_REQUEST
+            code = self._request_ticks(sk_quote, page, ','.join(batch))
+
+            if code == 0 or len(batch) == 1:
+                results.update({product: code for product in batch})
+                continue
+
+            if self.console_enabled:
+                print(f"[PRODUCT_ROUTER] ⚠️ 批次訂閱失敗({code})，改為逐一訂閱: {','.join(batch)}")
+            for index, product in enumerate(batch):
+                results[product] = self._request_ticks(sk_quote, page + index, product)
+
+        if self.console_enabled:
+            print(f"[PRODUCT_ROUTER] 📡 訂閱結果: {results}")
+        return results
+
+    def get_statistics(self) -> Dict:
+        return {
+            'primary_product': self.primary_product,
+            'products': list(self.products),
+            'index_map': {f"{m}:{i}": p for (m, i), p in self.index_map.items()},
+            'tick_counts': dict(self.tick_counts),
+            'last_prices': dict(self.last_prices),
+            'unresolved_ticks': self.unresolved_ticks,
+            'failed_indexes': [f"{m}:{i}" for m, i in sorted(self.failed_indexes)],
+        }
+
+    # ---- 內部 ----
+
+    def _learn(self, market_no: int, stock_idx: int) -> Optional[str]:
+        key = (market_no, stock_idx)
+        if key in self.failed_indexes:
+            return None
+
+        product = None
+        if self.lookup:
+            try:
+                product = self.lookup(market_no, stock_idx)
+            except Exception as e:
+                logger.warning(f"查詢商品索引失敗 ({market_no}, {stock_idx}): {e}")
+
+        if not product:
+            # 只訂閱一個商品時，未知索引必定屬於該商品
+            if len(self.products) != 1:
+                self.failed_indexes.add(key)
+                if self.console_enabled:
+                    print(f"[PRODUCT_ROUTER] ⚠️ 無法辨識索引 ({market_no}, {stock_idx})，該索引的報價將被丟棄")
+                return None
+            product = self.products[0]
+        elif product not in self.products:
+            # 近月代碼 (如 MTX07) 對應到訂閱時使用的通用代碼
+            root = _product_root(product)
+            product = next((p for p in self.products if _product_root(p) == root), product)
+
+        self.register_product(product, market_no, stock_idx)
+        if self.console_enabled:
+            print(f"[PRODUCT_ROUTER] 📌 綁定索引 ({market_no}, {stock_idx}) → {product}")
+        return product
+
+    @staticmethod
+    def _request_ticks(sk_quote, page: int, stock_nos: str) -> int:
+        result = sk_quote.SKQuoteLib_RequestTicks(page, stock_nos)
+        if isinstance(result, tuple):
+            return result[0] if result else -1
+        return result
@@ -23,35 +23,72 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Tuple
 
 
-class QuoteData:
-    """報價數據結構"""
-    
-    def __init__(self):
-        # 五檔ASK數據
-        self.ask_prices = [None] * 5      # [ask1, ask2, ask3, ask4, ask5]
-        self.ask_quantities = [None] * 5  # [qty1, qty2, qty3, qty4, qty5]
-        
-        # 五檔BID數據
-        self.bid_prices = [None] * 5      # [bid1, bid2, bid3, bid4, bid5]
-        self.bid_quantities = [None] * 5  # [qty1, qty2, qty3, qty4, qty5]
-        
+# 五檔 + 延伸檔 (OnNotifyBest5LONG 的 nExtendBid/nExtendAsk)
+BEST5_LEVELS = 5
+EXTENDED_LEVELS = 1
+TOTAL_LEVELS = BEST5_LEVELS + EXTENDED_LEVELS
+
+
+class QuoteSlot:
+    """
+    單一商品的報價槽 - 固定大小陣列 + 版本號(seqlock)
+
+    寫入端 (COM回調線程) 只有一個，寫入前後各遞增一次 version：
+    - version 為奇數 → 寫入進行中
+    - 讀取前後 version 相同且為偶數 → 讀到的是完整快照
+    讀取端永遠不持有鎖，不會阻塞報價回調。
+    """
+
+    __slots__ = (
+        'version',
+        'ask_prices', 'ask_quantities',
+        'bid_prices', 'bid_quantities',
+        'last_price', 'last_volume',
+        'updated_at', 'update_count',
+        'product_code', 'market_no', 'stock_idx', 'index',
+    )
+
+    def __init__(self, product_code: str = None, index: int = -1):
+        self.version = 0                              # seqlock版本號
+
+        # 固定大小陣列: [0..4]=五檔, [5]=延伸檔
+        self.ask_prices = [0.0] * TOTAL_LEVELS
+        self.ask_quantities = [0] * TOTAL_LEVELS
+        self.bid_prices = [0.0] * TOTAL_LEVELS
+        self.bid_quantities = [0] * TOTAL_LEVELS
+
         # 成交數據
-        self.last_price = None            # 最新成交價
-        self.last_volume = None           # 最新成交量
-        
-        # 時間戳
-        self.last_update = None           # 最後更新時間
-        self.update_count = 0             # 更新次數
-        
+        self.last_price = None                        # 最新成交價
+        self.last_volume = None                       # 最新成交量
+
+        # 時間戳 (time.monotonic，不受系統校時影響)
+        self.updated_at = 0.0                         # 0.0 表示尚未更新
+        self.update_count = 0                         # 更新次數
+
         # 商品資訊
-        self.product_code = None          # 商品代碼
-        self.market_no = None             # 市場代碼
-        self.stock_idx = None             # 股票索引
+        self.product_code = product_code              # 商品代碼
+        self.market_no = None                         # 市場代碼
+        self.stock_idx = None                         # 股票索引
+        self.index = index                            # 槽位索引
+
+    @property
+    def last_update(self) -> Optional[datetime]:
+        """最後更新時間 (相容舊版QuoteData，僅供顯示用)"""
+        if not self.updated_at:
+            return None
+        return datetime.now() - timedelta(seconds=time.monotonic() - self.updated_at)
+
+
+# 相容舊名稱
+QuoteData = QuoteSlot
 
 
 class RealTimeQuoteManager:
     """即時報價管理器"""
-    
+
+    # seqlock 讀取重試上限 (寫入端極短，正常情況一次就成功)
+    MAX_READ_RETRIES = 16
+
     def __init__(self, console_enabled=True):
         """
         初始化報價管理器
@@ -60,14 +97,18 @@ class RealTimeQuoteManager:
             console_enabled: 是否啟用Console輸出
         """
         # 數據存儲
-        self.quote_data = {}              # {product_code: QuoteData}
+        self.quote_data = {}              # {product_code: QuoteSlot}
+        self.slots = []                   # [QuoteSlot] 依槽位索引
+        self.index_map = {}               # {(market_no, stock_idx): QuoteSlot} 訂閱時預先建立
         self.console_enabled = console_enabled
         
-        # 線程安全鎖
+        # 線程安全鎖 - 僅用於新增商品槽位，讀寫報價不需要
         self.data_lock = threading.Lock()
         
         # 統計數據
         self.total_updates = 0
+        self.stale_reads = 0
+        self.read_retries = 0
         self.start_time = time.time()
         
         # 配置參數
@@ -77,13 +118,63 @@ class RealTimeQuoteManager:
         if self.console_enabled:
             print(f"[QUOTE_MGR] 即時報價管理器已初始化")
             print(f"[QUOTE_MGR] 支援商品: {', '.join(self.supported_products)}")
-    
+
+    def register_product(self, product_code: str, market_no=None, stock_idx=None) -> QuoteSlot:
+        """
+        註冊商品槽位 - 訂閱報價時調用
+
+        預先建立商品槽位和 (market_no, stock_idx) → 槽位 的對應，
+        之後的五檔回調只需一次dict查詢，不再推斷商品代碼。
+
+        Args:
+            product_code: 商品代碼
+            market_no: 市場代碼 (可選，已知時預先綁定)
+            stock_idx: 股票索引 (可選，已知時預先綁定)
+
+        Returns:
+            QuoteSlot: 商品報價槽
+        """
+        with self.data_lock:
+            slot = self.quote_data.get(product_code)
+            if slot is None:
+                slot = QuoteSlot(product_code, len(self.slots))
+                self.slots.append(slot)
+                self.quote_data[product_code] = slot
+                if self.console_enabled:
+                    print(f"[QUOTE_MGR] 📌 註冊商品槽位 {product_code} (#{slot.index})")
+
+            if market_no is not None and stock_idx is not None:
+                self.index_map[(market_no, stock_idx)] = slot
+                slot.market_no = market_no
+                slot.stock_idx = stock_idx
+
+            return slot
+
+    def _resolve_slot(self, market_no, stock_idx, product_code=None) -> Optional[QuoteSlot]:
+        """取得報價槽 - 熱路徑只做dict查詢，未知商品才走註冊流程"""
+        if product_code:
+            slot = self.quote_data.get(product_code)
+            if slot is not None and slot.stock_idx == stock_idx and slot.market_no == market_no:
+                return slot
+            return self.register_product(product_code, market_no, stock_idx)
+
+        slot = self.index_map.get((market_no, stock_idx))
+        if slot is not None:
+            return slot
+
+        # 根據stock_idx推斷商品代碼 (需要根據實際API調整)
+        product_code = self._infer_product_code(market_no, stock_idx)
+        if not product_code:
+            return None
+        return self.register_product(product_code, market_no, stock_idx)
+
     def update_best5_data(self, market_no, stock_idx, 
                          ask1, ask1_qty, ask2, ask2_qty, ask3, ask3_qty,
                          ask4, ask4_qty, ask5, ask5_qty,
                          bid1, bid1_qty, bid2, bid2_qty, bid3, bid3_qty,
                          bid4, bid4_qty, bid5, bid5_qty,
-                         product_code=None):
+                         product_code=None,
+                         ext_ask=0, ext_ask_qty=0, ext_bid=0, ext_bid_qty=0):
         """
         更新五檔數據 - 從OnNotifyBest5LONG事件調用
         
@@ -95,55 +186,132 @@ class RealTimeQuoteManager:
             bid1-bid5: 五檔買價
             bid1_qty-bid5_qty: 五檔買量
             product_code: 商品代碼 (可選)
+            ext_ask/ext_ask_qty/ext_bid/ext_bid_qty: 延伸檔 (可選)
         
         Returns:
             bool: 更新是否成功
         """
         try:
-            with self.data_lock:
-                # 確定商品代碼
-                if not product_code:
-                    # 根據stock_idx推斷商品代碼 (需要根據實際API調整)
-                    product_code = self._infer_product_code(market_no, stock_idx)
-                
-                if not product_code:
-                    return False
-                
-                # 初始化或取得報價數據
-                if product_code not in self.quote_data:
-                    self.quote_data[product_code] = QuoteData()
-                
-                quote = self.quote_data[product_code]
-                
-                # 更新五檔ASK數據
-                quote.ask_prices = [ask1, ask2, ask3, ask4, ask5]
-                quote.ask_quantities = [ask1_qty, ask2_qty, ask3_qty, ask4_qty, ask5_qty]
-                
-                # 更新五檔BID數據
-                quote.bid_prices = [bid1, bid2, bid3, bid4, bid5]
-                quote.bid_quantities = [bid1_qty, bid2_qty, bid3_qty, bid4_qty, bid5_qty]
-                
-                # 更新元數據
-                quote.last_update = datetime.now()
-                quote.update_count += 1
-                quote.product_code = product_code
-                quote.market_no = market_no
-                quote.stock_idx = stock_idx
-                
-                # 統計更新
-                self.total_updates += 1
-                
-                # Console輸出 (可控制)
-                if self.console_enabled and self.total_updates % 100 == 0:  # 每100次更新輸出一次
-                    print(f"[QUOTE_MGR] {product_code} 五檔更新 #{quote.update_count} ASK1:{ask1} BID1:{bid1}")
-                
-                return True
-                
+            slot = self._resolve_slot(market_no, stock_idx, product_code)
+            if slot is None:
+                return False
+
+            # seqlock 寫入: version 奇數期間讀取端會重試
+            slot.version += 1
+            try:
+                slot.ask_prices[:] = (ask1, ask2, ask3, ask4, ask5, ext_ask)
+                slot.ask_quantities[:] = (ask1_qty, ask2_qty, ask3_qty, ask4_qty, ask5_qty, ext_ask_qty)
+                slot.bid_prices[:] = (bid1, bid2, bid3, bid4, bid5, ext_bid)
+                slot.bid_quantities[:] = (bid1_qty, bid2_qty, bid3_qty, bid4_qty, bid5_qty, ext_bid_qty)
+                slot.updated_at = time.monotonic()
+                slot.update_count += 1
+            finally:
+                slot.version += 1
+
+            # 統計更新
+            self.total_updates += 1
+
+            # Console輸出 (可控制)
+            if self.console_enabled and self.total_updates % 100 == 0:  # 每100次更新輸出一次
+                print(f"[QUOTE_MGR] {slot.product_code} 五檔更新 #{slot.update_count} ASK1:{ask1} BID1:{bid1}")
+
+            return True
+
         except Exception as e:
             if self.console_enabled:
                 print(f"[QUOTE_MGR] ❌ 五檔數據更新失敗: {e}")
             return False
-    
+
+    def update_last_trade(self, product_code: str, last_price, last_volume=None) -> bool:
+        """
+        更新最新成交 - 從OnNotifyTicksLONG事件調用 (可選)
+
+        Args:
+            product_code: 商品代碼
+            last_price: 成交價
+            last_volume: 成交量
+
+        Returns:
+            bool: 更新是否成功
+        """
+        slot = self.quote_data.get(product_code)
+        if slot is None:
+            slot = self.register_product(product_code)
+
+        slot.version += 1
+        try:
+            slot.last_price = last_price
+            slot.last_volume = last_volume
+        finally:
+            slot.version += 1
+        return True
+
+    def _read_level(self, product_code: str, side_attr: str, level: int,
+                    max_age_seconds: float = None) -> Optional[float]:
+        """
+        無鎖讀取單一價位
+
+        Args:
+            product_code: 商品代碼
+            side_attr: 'ask_prices' / 'bid_prices'
+            level: 檔位索引 (0=第一檔)
+            max_age_seconds: 最大有效期(秒)
+
+        Returns:
+            float: 價格，無數據、過期或非正值時返回None
+        """
+        slot = self.quote_data.get(product_code)
+        if slot is None:
+            return None
+
+        for _ in range(self.MAX_READ_RETRIES):
+            v1 = slot.version
+            if v1 & 1:
+                self.read_retries += 1
+                continue
+            price = getattr(slot, side_attr)[level]
+            updated_at = slot.updated_at
+            if slot.version == v1:
+                break
+            self.read_retries += 1
+        else:
+            return None
+
+        if not updated_at:
+            return None
+
+        max_age = max_age_seconds or self.max_data_age_seconds
+        if time.monotonic() - updated_at > max_age:
+            self.stale_reads += 1
+            if self.console_enabled:
+                print(f"[QUOTE_MGR] ⚠️ {product_code} 報價數據過期")
+            return None
+
+        if price is not None and price > 0:
+            return float(price)
+        return None
+
+    def _snapshot(self, slot: QuoteSlot) -> Optional[tuple]:
+        """
+        取得報價槽一致性快照
+
+        Returns:
+            tuple: (ask_prices, ask_quantities, bid_prices, bid_quantities,
+                    last_price, updated_at, update_count)，重試失敗時返回None
+        """
+        for _ in range(self.MAX_READ_RETRIES):
+            v1 = slot.version
+            if v1 & 1:
+                self.read_retries += 1
+                continue
+            snap = (slot.ask_prices[:], slot.ask_quantities[:],
+                    slot.bid_prices[:], slot.bid_quantities[:],
+                    slot.last_price, slot.updated_at, slot.update_count)
+            if slot.version == v1:
+                return snap
+            self.read_retries += 1
+        return None
+
     def get_best_ask_price(self, product_code: str) -> Optional[float]:
         """
         取得最佳賣價 - 策略進場使用
@@ -155,26 +323,7 @@ class RealTimeQuoteManager:
             float: 最佳賣價，如果無數據則返回None
         """
         try:
-            with self.data_lock:
-                if product_code not in self.quote_data:
-                    return None
-                
-                quote = self.quote_data[product_code]
-                
-                # 檢查數據新鮮度
-                if not self.is_quote_fresh(product_code):
-                    if self.console_enabled:
-                        print(f"[QUOTE_MGR] ⚠️ {product_code} 報價數據過期")
-                    return None
-                
-                # 返回最佳賣價 (ASK1)
-                ask1 = quote.ask_prices[0] if quote.ask_prices else None
-                
-                if ask1 is not None and ask1 > 0:
-                    return float(ask1)
-                
-                return None
-                
+            return self._read_level(product_code, 'ask_prices', 0)
         except Exception as e:
             if self.console_enabled:
                 print(f"[QUOTE_MGR] ❌ 取得ASK價格失敗: {e}")
@@ -191,26 +340,7 @@ class RealTimeQuoteManager:
             float: 最佳買價，如果無數據則返回None
         """
         try:
-            with self.data_lock:
-                if product_code not in self.quote_data:
-                    return None
-
-                quote = self.quote_data[product_code]
-
-                # 檢查數據新鮮度
-                if not self.is_quote_fresh(product_code):
-                    if self.console_enabled:
-                        print(f"[QUOTE_MGR] ⚠️ {product_code} 報價數據過期")
-                    return None
-
-                # 返回最佳買價 (BID1)
-                bid1 = quote.bid_prices[0] if quote.bid_prices else None
-
-                if bid1 is not None and bid1 > 0:
-                    return float(bid1)
-
-                return None
-
+            return self._read_level(product_code, 'bid_prices', 0)
         except Exception as e:
             if self.console_enabled:
                 print(f"[QUOTE_MGR] ❌ 取得BID價格失敗: {e}")
@@ -222,33 +352,32 @@ class RealTimeQuoteManager:
         
         Args:
             product_code: 商品代碼
-            levels: 檔數 (1-5)
+            levels: 檔數 (1-5，6含延伸檔)
             
         Returns:
             List[Tuple[float, int]]: [(價格, 數量), ...] 列表
         """
         try:
-            with self.data_lock:
-                if product_code not in self.quote_data:
-                    return []
-                
-                quote = self.quote_data[product_code]
-                
-                if not self.is_quote_fresh(product_code):
-                    return []
-                
-                depth = []
-                levels = min(levels, 5)  # 最多5檔
-                
-                for i in range(levels):
-                    price = quote.ask_prices[i] if i < len(quote.ask_prices) else None
-                    qty = quote.ask_quantities[i] if i < len(quote.ask_quantities) else None
-                    
-                    if price is not None and qty is not None and price > 0 and qty > 0:
-                        depth.append((float(price), int(qty)))
-                
-                return depth
-                
+            slot = self.quote_data.get(product_code)
+            if slot is None:
+                return []
+
+            snap = self._snapshot(slot)
+            if snap is None or not self._is_fresh_at(snap[5]):
+                return []
+
+            ask_prices, ask_quantities = snap[0], snap[1]
+            depth = []
+            levels = min(levels, TOTAL_LEVELS)
+
+            for i in range(levels):
+                price = ask_prices[i]
+                qty = ask_quantities[i]
+                if price is not None and qty is not None and price > 0 and qty > 0:
+                    depth.append((float(price), int(qty)))
+
+            return depth
+
         except Exception as e:
             if self.console_enabled:
                 print(f"[QUOTE_MGR] ❌ 取得ASK深度失敗: {e}")
@@ -265,32 +394,39 @@ class RealTimeQuoteManager:
             float: 最新成交價，如果無數據則返回None
         """
         try:
-            with self.data_lock:
-                if product_code not in self.quote_data:
-                    return None
-                
-                quote = self.quote_data[product_code]
-                
-                if not self.is_quote_fresh(product_code):
-                    return None
-                
-                if quote.last_price is not None and quote.last_price > 0:
-                    return float(quote.last_price)
-                
-                # 如果沒有成交價，使用中間價估算
-                ask1 = quote.ask_prices[0] if quote.ask_prices else None
-                bid1 = quote.bid_prices[0] if quote.bid_prices else None
-                
-                if ask1 is not None and bid1 is not None and ask1 > 0 and bid1 > 0:
-                    return (float(ask1) + float(bid1)) / 2
-                
+            slot = self.quote_data.get(product_code)
+            if slot is None:
                 return None
-                
+
+            snap = self._snapshot(slot)
+            if snap is None or not self._is_fresh_at(snap[5]):
+                return None
+
+            last_price = snap[4]
+            if last_price is not None and last_price > 0:
+                return float(last_price)
+
+            # 如果沒有成交價，使用中間價估算
+            ask1 = snap[0][0]
+            bid1 = snap[2][0]
+
+            if ask1 is not None and bid1 is not None and ask1 > 0 and bid1 > 0:
+                return (float(ask1) + float(bid1)) / 2
+
+            return None
+
         except Exception as e:
             if self.console_enabled:
                 print(f"[QUOTE_MGR] ❌ 取得成交價失敗: {e}")
             return None
-    
+
+    def _is_fresh_at(self, updated_at: float, max_age_seconds: float = None) -> bool:
+        """以monotonic時間戳判斷新鮮度"""
+        if not updated_at:
+            return False
+        max_age = max_age_seconds or self.max_data_age_seconds
+        return time.monotonic() - updated_at <= max_age
+
     def is_quote_fresh(self, product_code: str, max_age_seconds: int = None) -> bool:
         """
         檢查報價新鮮度
@@ -302,23 +438,23 @@ class RealTimeQuoteManager:
         Returns:
             bool: 數據是否新鮮
         """
-        try:
-            if product_code not in self.quote_data:
-                return False
-            
-            quote = self.quote_data[product_code]
-            
-            if quote.last_update is None:
-                return False
-            
-            max_age = max_age_seconds or self.max_data_age_seconds
-            age = (datetime.now() - quote.last_update).total_seconds()
-            
-            return age <= max_age
-            
-        except Exception as e:
+        slot = self.quote_data.get(product_code)
+        if slot is None:
             return False
-    
+        return self._is_fresh_at(slot.updated_at, max_age_seconds)
+
+    def get_quote_age(self, product_code: str) -> Optional[float]:
+        """
+        取得報價年齡(秒)
+
+        Returns:
+            float: 距最後更新的秒數，無數據時返回None
+        """
+        slot = self.quote_data.get(product_code)
+        if slot is None or not slot.updated_at:
+            return None
+        return time.monotonic() - slot.updated_at
+
     def get_quote_summary(self, product_code: str) -> Optional[Dict]:
         """
         取得報價摘要 - 用於監控和調試
@@ -330,24 +466,29 @@ class RealTimeQuoteManager:
             Dict: 報價摘要資訊
         """
         try:
-            with self.data_lock:
-                if product_code not in self.quote_data:
-                    return None
-                
-                quote = self.quote_data[product_code]
-                
-                return {
-                    'product_code': product_code,
-                    'ask1': quote.ask_prices[0] if quote.ask_prices else None,
-                    'ask1_qty': quote.ask_quantities[0] if quote.ask_quantities else None,
-                    'bid1': quote.bid_prices[0] if quote.bid_prices else None,
-                    'bid1_qty': quote.bid_quantities[0] if quote.bid_quantities else None,
-                    'last_price': quote.last_price,
-                    'last_update': quote.last_update,
-                    'update_count': quote.update_count,
-                    'is_fresh': self.is_quote_fresh(product_code),
-                    'age_seconds': (datetime.now() - quote.last_update).total_seconds() if quote.last_update else None
-                }
+            slot = self.quote_data.get(product_code)
+            if slot is None:
+                return None
+
+            snap = self._snapshot(slot)
+            if snap is None:
+                return None
+
+            ask_prices, ask_quantities, bid_prices, bid_quantities, last_price, updated_at, update_count = snap
+            age = time.monotonic() - updated_at if updated_at else None
+
+            return {
+                'product_code': product_code,
+                'ask1': ask_prices[0] if updated_at else None,
+                'ask1_qty': ask_quantities[0] if updated_at else None,
+                'bid1': bid_prices[0] if updated_at else None,
+                'bid1_qty': bid_quantities[0] if updated_at else None,
+                'last_price': last_price,
+                'last_update': datetime.now() - timedelta(seconds=age) if age is not None else None,
+                'update_count': update_count,
+                'is_fresh': self._is_fresh_at(updated_at),
+                'age_seconds': age
+            }
                 
         except Exception as e:
             if self.console_enabled:
@@ -357,6 +498,8 @@ class RealTimeQuoteManager:
     def _infer_product_code(self, market_no, stock_idx) -> Optional[str]:
         """
         根據市場代碼和股票索引推斷商品代碼
+
+        只在 index_map 未命中時調用一次，結果會經由 register_product 快取。
         
         Args:
             market_no: 市場代碼
@@ -387,17 +530,19 @@ class RealTimeQuoteManager:
             Dict: 統計資訊
         """
         try:
-            with self.data_lock:
-                uptime = time.time() - self.start_time
-                
-                return {
-                    'total_updates': self.total_updates,
-                    'uptime_seconds': uptime,
-                    'updates_per_second': self.total_updates / uptime if uptime > 0 else 0,
-                    'tracked_products': list(self.quote_data.keys()),
-                    'product_count': len(self.quote_data)
-                }
-                
+            uptime = time.time() - self.start_time
+
+            return {
+                'total_updates': self.total_updates,
+                'uptime_seconds': uptime,
+                'updates_per_second': self.total_updates / uptime if uptime > 0 else 0,
+                'tracked_products': list(self.quote_data.keys()),
+                'product_count': len(self.quote_data),
+                'indexed_instruments': len(self.index_map),
+                'stale_reads': self.stale_reads,
+                'read_retries': self.read_retries
+            }
+
         except Exception as e:
             return {'error': str(e)}
 
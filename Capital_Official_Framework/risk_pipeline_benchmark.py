@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+即時風控管線吞吐量基準測試
+取代零散的 test_async_update_performance.py / test_unified_trailing_performance.py 等腳本，
+提供可重複、可比較的基準數據
+
+測試項目 (scenario):
+1. optimized_risk   - OptimizedRiskManager.update_price (純內存比較)
+2. risk_engine      - RiskManagementEngine.check_all_exit_conditions (每tick查詢資料庫)
+3. trailing_calc    - TrailingStopCalculator.update_price (逐部位)
+4. async_db         - AsyncDatabaseUpdater 峰值更新排程 + 背景寫入
+
+輸出指標:
+- ticks_per_sec:      每秒處理報價數
+- p50_us / p99_us:    單一tick處理延遲 (微秒)
+- db_writes_per_tick: 每tick實際資料庫寫入語句數 (寫入放大)
+- async_tasks_per_tick: 每tick排程的異步任務數
+
+使用方式:
+    python risk_pipeline_benchmark.py --positions 1,10,100,500 --ticks 2000
+    python risk_pipeline_benchmark.py --save-baseline          # 儲存基準
+    python risk_pipeline_benchmark.py --compare                # 與基準比較，退化時返回1
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import tempfile
+import shutil
+import queue
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, List, Optional
+
+# 添加路徑
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, current_dir)
+
+from multi_group_database import MultiGroupDatabaseManager
+from multi_group_config import LotRule
+from decimal import Decimal
+
+SCENARIOS = ['optimized_risk', 'risk_engine', 'trailing_calc', 'async_db']
+DEFAULT_BASELINE_PATH = os.path.join(current_dir, 'risk_pipeline_baseline.json')
+LOTS_PER_GROUP = 3   # position_records.lot_id 限制 1-3
+BASE_PRICE = 22000.0
+RANGE_WIDTH = 200.0
+
+# 與 multi_group_config 預設規則一致: 15/40/65 點啟動，20% 回撤
+LOT_RULES = [
+    LotRule(lot_id=1, trailing_activation=Decimal('15'), trailing_pullback=Decimal('0.20')),
+    LotRule(lot_id=2, trailing_activation=Decimal('40'), trailing_pullback=Decimal('0.20'),
+            protective_stop_multiplier=Decimal('2.0')),
+    LotRule(lot_id=3, trailing_activation=Decimal('65'), trailing_pullback=Decimal('0.20'),
+            protective_stop_multiplier=Decimal('2.0')),
+]
+
+
+class CountingDatabaseManager(MultiGroupDatabaseManager):
+    """計算實際執行SQL語句數的資料庫管理器"""
+
+    def __init__(self, db_path: str):
+        self.db_reads = 0
+        self.db_writes = 0
+        self.counting = False
+        super().__init__(db_path)
+
+    def _trace(self, statement: str):
+        if not self.counting:
+            return
+        head = statement.lstrip()[:6].upper()
+        if head == 'SELECT':
+            self.db_reads += 1
+        elif head in ('INSERT', 'UPDATE', 'DELETE', 'REPLAC'):
+            self.db_writes += 1
+
+    @contextmanager
+    def get_connection(self):
+        with super().get_connection() as conn:
+            conn.set_trace_callback(self._trace)
+            yield conn
+
+    def reset_counters(self):
+        self.db_reads = 0
+        self.db_writes = 0
+
+
+def build_synthetic_book(db_manager: MultiGroupDatabaseManager, positions: int,
+                         seed: int = 42) -> List[Dict]:
+    """
+    建立合成部位簿 - 每組3口，多空交錯
+
+    Args:
+        db_manager: 資料庫管理器
+        positions: 部位總數 (1-500)
+        seed: 隨機種子
+
+    Returns:
+        List[Dict]: 建立的部位資料 (含區間)
+    """
+    rng = random.Random(seed)
+    today = date.today().isoformat()
+    created = []
+
+    with db_manager.get_connection() as conn:
+        cursor = conn.cursor()
+        group_count = (positions + LOTS_PER_GROUP - 1) // LOTS_PER_GROUP
+        remaining = positions
+
+        for group_id in range(1, group_count + 1):
+            direction = 'LONG' if group_id % 2 else 'SHORT'
+            lots = min(LOTS_PER_GROUP, remaining)
+            remaining -= lots
+            range_high = BASE_PRICE + RANGE_WIDTH / 2
+            range_low = BASE_PRICE - RANGE_WIDTH / 2
+
+            cursor.execute('''
+                INSERT INTO strategy_groups
+                (date, group_id, direction, entry_signal_time, range_high, range_low, total_lots, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'ACTIVE')
+            ''', (today, group_id, direction, '08:48:00', range_high, range_low, lots))
+
+            for lot_id in range(1, lots + 1):
+                entry_price = BASE_PRICE + rng.randint(-5, 5)
+                cursor.execute('''
+                    INSERT INTO position_records
+                    (group_id, lot_id, direction, entry_price, entry_time, rule_config,
+                     status, order_status)
+                    VALUES (?, ?, ?, ?, ?, ?, 'ACTIVE', 'FILLED')
+                ''', (group_id, lot_id, direction, entry_price, '08:48:01',
+                      LOT_RULES[lot_id - 1].to_json()))
+                position_id = cursor.lastrowid
+
+                cursor.execute('''
+                    INSERT INTO risk_management_states
+                    (position_id, peak_price, current_stop_loss, last_update_time, update_reason)
+                    VALUES (?, ?, ?, ?, '初始化')
+                ''', (position_id, entry_price,
+                      range_low if direction == 'LONG' else range_high, '08:48:01'))
+
+                created.append({
+                    'id': position_id,
+                    'group_id': group_id,
+                    'lot_id': lot_id,
+                    'direction': direction,
+                    'entry_price': entry_price,
+                    'range_high': range_high,
+                    'range_low': range_low,
+                    'rule': LOT_RULES[lot_id - 1],
+                })
+
+        conn.commit()
+
+    return created
+
+
+def generate_ticks(count: int, seed: int = 42, volatility: float = 3.0) -> List[float]:
+    """
+    產生可重現的隨機漫步報價 (限制在區間內，避免觸發初始停損後部位全數出場)
+
+    Args:
+        count: tick數量
+        seed: 隨機種子
+        volatility: 每tick標準差(點)
+
+    Returns:
+        List[float]: 價格序列
+    """
+    rng = random.Random(seed)
+    price = BASE_PRICE
+    upper = BASE_PRICE + RANGE_WIDTH / 2 - 10
+    lower = BASE_PRICE - RANGE_WIDTH / 2 + 10
+    ticks = []
+    for _ in range(count):
+        price += round(rng.gauss(0, volatility))
+        price = max(lower, min(upper, price))
+        ticks.append(float(price))
+    return ticks
+
+
+def _tick_time(index: int) -> str:
+    """tick序號 → HH:MM:SS (從09:00:00起每秒一筆)"""
+    seconds = 9 * 3600 + index
+    return f"{seconds // 3600 % 24:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def _percentile(sorted_values: List[int], q: float) -> int:
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def _wait_for_queue(async_updater, timeout: float = 30.0):
+    """等待異步更新隊列清空"""
+    deadline = time.monotonic() + timeout
+    while async_updater.update_queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+class CountingQueue(queue.Queue):
+    """記錄因隊列已滿被丟棄的任務數 (異步更新器背壓)"""
+
+    def __init__(self, maxsize=0):
+        super().__init__(maxsize)
+        self.dropped = 0
+
+    def put_nowait(self, item):
+        try:
+            super().put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            raise
+
+
+def _make_async_updater(db_manager):
+    from async_db_updater import AsyncDatabaseUpdater
+    updater = AsyncDatabaseUpdater(db_manager, console_enabled=False)
+    updater.update_queue = CountingQueue(updater.update_queue.maxsize)
+    updater.start()
+    return updater
+
+
+def _build_driver(scenario: str, db_manager, book: List[Dict]):
+    """
+    建立測試驅動函數
+
+    Returns:
+        tuple: (每tick呼叫的函數 fn(price, time_str), 異步更新器或None, 清理函數)
+    """
+    if scenario == 'optimized_risk':
+        from optimized_risk_manager import OptimizedRiskManager
+        manager = OptimizedRiskManager(db_manager, console_enabled=False)
+        manager.backup_interval = float('inf')   # 只測熱路徑，不含60秒備份同步
+        return (lambda price, t: manager.update_price(price, t)), None, (lambda: None)
+
+    if scenario == 'risk_engine':
+        from risk_management_engine import RiskManagementEngine
+        engine = RiskManagementEngine(db_manager)
+        engine.console_enabled = False
+        async_updater = _make_async_updater(db_manager)
+        engine.set_async_updater(async_updater)
+        return (lambda price, t: engine.check_all_exit_conditions(price, t)), async_updater, async_updater.stop
+
+    if scenario == 'trailing_calc':
+        from trailing_stop_calculator import TrailingStopCalculator
+        async_updater = _make_async_updater(db_manager)
+        calculator = TrailingStopCalculator(db_manager, async_updater, console_enabled=False)
+        calculator.update_interval = 0.0   # 每tick都排程資料庫更新，量測最壞情況寫入放大
+        for position in book:
+            rule = position['rule']
+            calculator.register_position(position['id'], position['direction'], position['entry_price'],
+                                         float(rule.trailing_activation), float(rule.trailing_pullback))
+        position_ids = [p['id'] for p in book]
+
+        def drive(price, t):
+            for position_id in position_ids:
+                calculator.update_price(position_id, price)
+
+        return drive, async_updater, async_updater.stop
+
+    if scenario == 'async_db':
+        async_updater = _make_async_updater(db_manager)
+        peaks = {p['id']: (p['direction'], p['entry_price']) for p in book}
+
+        def drive(price, t):
+            for position_id, (direction, peak) in peaks.items():
+                if (direction == 'LONG' and price > peak) or (direction == 'SHORT' and price < peak):
+                    peaks[position_id] = (direction, price)
+                    async_updater.schedule_peak_update(position_id, price, t, "價格更新")
+
+        return drive, async_updater, async_updater.stop
+
+    raise ValueError(f"未知的測試項目: {scenario}")
+
+
+def run_scenario(scenario: str, positions: int, ticks: int, rate: float = 0.0,
+                 seed: int = 42, work_dir: str = None) -> Dict:
+    """
+    執行單一測試項目
+
+    Args:
+        scenario: 測試項目名稱
+        positions: 部位數
+        ticks: tick數
+        rate: 報價速率 (tick/秒)，0 表示盡快
+        seed: 隨機種子
+        work_dir: 暫存資料庫目錄
+
+    Returns:
+        Dict: 測試結果
+    """
+    db_path = os.path.join(work_dir or tempfile.gettempdir(),
+                           f"bench_{scenario}_{positions}_{os.getpid()}.db")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    db_manager = CountingDatabaseManager(db_path)
+    book = build_synthetic_book(db_manager, positions, seed)
+    prices = generate_ticks(ticks, seed)
+    drive, async_updater, cleanup = _build_driver(scenario, db_manager, book)
+
+    latencies_ns = []
+    lag_ns = 0
+    interval_ns = int(1e9 / rate) if rate and rate > 0 else 0
+    db_manager.reset_counters()
+    db_manager.counting = True
+    tasks_before = async_updater.get_stats()['total_tasks'] if async_updater else 0
+
+    try:
+        started = time.perf_counter_ns()
+        for index, price in enumerate(prices):
+            if interval_ns:
+                # 開環送價: 依排定時間送出，落後時記錄延遲 (不補睡)
+                scheduled = started + index * interval_ns
+                now = time.perf_counter_ns()
+                if now < scheduled:
+                    time.sleep((scheduled - now) / 1e9)
+                else:
+                    lag_ns = max(lag_ns, now - scheduled)
+
+            tick_start = time.perf_counter_ns()
+            drive(price, _tick_time(index))
+            latencies_ns.append(time.perf_counter_ns() - tick_start)
+        elapsed_ns = time.perf_counter_ns() - started
+
+        if async_updater:
+            _wait_for_queue(async_updater)
+        drain_ns = time.perf_counter_ns() - started - elapsed_ns
+    finally:
+        db_manager.counting = False
+        cleanup()
+
+    async_stats = async_updater.get_stats() if async_updater else {}
+    async_tasks = async_stats.get('total_tasks', 0) - tasks_before
+    latencies_us = sorted(ns // 1000 for ns in latencies_ns)
+    busy_seconds = sum(latencies_ns) / 1e9
+
+    result = {
+        'scenario': scenario,
+        'positions': len(book),
+        'groups': len({p['group_id'] for p in book}),
+        'ticks': ticks,
+        'rate': rate,
+        'elapsed_sec': round(elapsed_ns / 1e9, 4),
+        'ticks_per_sec': round(ticks / busy_seconds, 1) if busy_seconds > 0 else 0.0,
+        'p50_us': _percentile(latencies_us, 0.50),
+        'p99_us': _percentile(latencies_us, 0.99),
+        'max_us': latencies_us[-1] if latencies_us else 0,
+        'max_lag_ms': round(lag_ns / 1e6, 3),
+        'db_reads': db_manager.db_reads,
+        'db_writes': db_manager.db_writes,
+        'db_writes_per_tick': round(db_manager.db_writes / ticks, 4) if ticks else 0.0,
+        'async_tasks': async_tasks,
+        'async_tasks_per_tick': round(async_tasks / ticks, 4) if ticks else 0.0,
+        'async_failed_tasks': async_stats.get('failed_tasks', 0),
+        'async_dropped_tasks': getattr(async_updater.update_queue, 'dropped', 0) if async_updater else 0,
+        'async_drain_ms': round(drain_ns / 1e6, 1) if async_updater else 0.0,
+    }
+
+    try:
+        os.remove(db_path)
+    except OSError:
+        pass
+    return result
+
+
+def run_suite(scenarios: List[str], position_counts: List[int], ticks: int,
+              rate: float = 0.0, seed: int = 42) -> Dict:
+    """執行完整基準測試"""
+    work_dir = tempfile.mkdtemp(prefix='risk_bench_')
+    results = []
+    try:
+        for scenario in scenarios:
+            for positions in position_counts:
+                result = run_scenario(scenario, positions, ticks, rate, seed, work_dir)
+                results.append(result)
+                print(f"[BENCH] {scenario:<15} 部位:{result['positions']:>4} "
+                      f"{result['ticks_per_sec']:>10.1f} tick/s  p99:{result['p99_us']:>8}us  "
+                      f"寫入/tick:{result['db_writes_per_tick']:.3f}  "
+                      f"丟棄:{result['async_dropped_tasks']}", file=sys.stderr)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'ticks': ticks,
+            'rate': rate,
+            'seed': seed,
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def _result_key(result: Dict) -> str:
+    return f"{result['scenario']}:{result['positions']}"
+
+
+def compare_with_baseline(report: Dict, baseline: Dict, tolerance: float = 0.30) -> List[str]:
+    """
+    與基準比較
+
+    Args:
+        report: 本次結果
+        baseline: 基準結果
+        tolerance: 容許退化比例 (0.30 = 吞吐量下降或p99上升超過30%視為退化)
+
+    Returns:
+        List[str]: 退化描述列表，空列表表示通過
+    """
+    baseline_map = {_result_key(r): r for r in baseline.get('results', [])}
+    regressions = []
+
+    for result in report['results']:
+        base = baseline_map.get(_result_key(result))
+        if not base:
+            continue
+
+        key = _result_key(result)
+        if base['ticks_per_sec'] > 0 and result['ticks_per_sec'] < base['ticks_per_sec'] * (1 - tolerance):
+            regressions.append(f"{key} 吞吐量 {result['ticks_per_sec']} < 基準 {base['ticks_per_sec']}")
+        if base['p99_us'] > 0 and result['p99_us'] > base['p99_us'] * (1 + tolerance):
+            regressions.append(f"{key} p99 {result['p99_us']}us > 基準 {base['p99_us']}us")
+        # 寫入放大是確定性的，不套用容許範圍
+        if result['db_writes_per_tick'] > base['db_writes_per_tick'] + 1e-9 and result['rate'] == base['rate']:
+            regressions.append(f"{key} 寫入/tick {result['db_writes_per_tick']} > 基準 {base['db_writes_per_tick']}")
+        if result.get('async_failed_tasks', 0) > base.get('async_failed_tasks', 0):
+            regressions.append(f"{key} 異步失敗任務 {result['async_failed_tasks']} > 基準 {base.get('async_failed_tasks', 0)}")
+
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="即時風控管線吞吐量基準測試")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"測試項目，逗號分隔 ({','.join(SCENARIOS)})")
+    parser.add_argument('--positions', default='1,10,100,500', help='部位數，逗號分隔 (1-500)')
+    parser.add_argument('--ticks', type=int, default=2000, help='每項測試tick數')
+    parser.add_argument('--rate', type=float, default=0.0, help='報價速率 tick/秒 (0=盡快)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='JSON輸出檔 (預設輸出到stdout)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH, help='基準檔路徑')
+    parser.add_argument('--save-baseline', action='store_true', help='將本次結果存為基準')
+    parser.add_argument('--compare', action='store_true', help='與基準比較，退化時返回1')
+    parser.add_argument('--tolerance', type=float, default=0.30)
+    args = parser.parse_args(argv)
+
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"未知的測試項目: {', '.join(unknown)}")
+    position_counts = [int(p) for p in args.positions.split(',') if p.strip()]
+    if any(p < 1 or p > 500 for p in position_counts):
+        parser.error("部位數必須介於 1-500")
+
+    # 測試期間關閉INFO日誌，避免輸出影響量測
+    logging.getLogger().setLevel(logging.WARNING)
+    # 隊列已滿的逐筆錯誤改以 async_dropped_tasks 統計呈現
+    logging.getLogger('async_db_updater').setLevel(logging.CRITICAL)
+
+    report = run_suite(scenarios, position_counts, args.ticks, args.rate, args.seed)
+    exit_code = 0
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"[BENCH] ⚠️ 找不到基準檔: {args.baseline}", file=sys.stderr)
+        else:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+            regressions = compare_with_baseline(report, baseline, args.tolerance)
+            report['regressions'] = regressions
+            for line in regressions:
+                print(f"[BENCH] ❌ 效能退化: {line}", file=sys.stderr)
+            exit_code = 1 if regressions else 0
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"[BENCH] 💾 基準已儲存: {args.baseline}", file=sys.stderr)
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
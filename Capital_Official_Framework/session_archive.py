@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+交易場次冷熱分離封存
+multi_group_strategy.db 只保留進行中的場次 (熱資料)，已結束的場次於收盤後
+整批搬到封存資料庫 (冷資料)，即時查詢的資料量不隨交易天數成長
+
+- 已結束場次: 日期早於今日，且該日沒有 ACTIVE 部位 (有留倉部位的場次繼續留在熱資料庫)
+- 搬移在單一交易內完成 (ATTACH 封存庫後 INSERT + DELETE)，中途失敗兩邊都不變
+- 封存表只保留欄位與主鍵，不帶 CHECK 約束，熱資料庫日後放寬約束或新增欄位都能繼續封存
+- 跨日分析用 attach_history(): 以同名 TEMP VIEW 合併熱/冷資料，既有查詢不需修改
+"""
+
+import os
+import sqlite3
+import logging
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SCHEMA = "archive"
+
+# 依場次封存的資料表: (表名, 屬於封存場次的條件)；父表在前，刪除時反向
+SESSION_TABLES: Tuple[Tuple[str, str], ...] = (
+    ('strategy_groups', "date IN (SELECT date FROM temp.archive_dates)"),
+    ('position_records', "group_id IN (SELECT id FROM temp.archive_groups)"),
+    ('risk_management_states', "position_id IN (SELECT id FROM temp.archive_positions)"),
+    ('trailing_stop_records', "position_id IN (SELECT id FROM temp.archive_positions)"),
+    ('exit_events', "position_id IN (SELECT id FROM temp.archive_positions)"),
+    ('group_exit_status', "date IN (SELECT date FROM temp.archive_dates)"),
+    ('daily_strategy_stats', "date IN (SELECT date FROM temp.archive_dates)"),
+)
+
+# 封存庫的查詢索引 (跨日分析用)
+ARCHIVE_INDEXES: Tuple[Tuple[str, str], ...] = (
+    ('strategy_groups', 'date, group_id'),
+    ('position_records', 'group_id'),
+    ('risk_management_states', 'position_id'),
+    ('trailing_stop_records', 'position_id'),
+    ('exit_events', 'position_id'),
+    ('group_exit_status', 'date'),
+)
+
+
+def default_archive_path(db_path: str) -> str:
+    """熱資料庫對應的封存庫路徑 (multi_group_strategy.db → multi_group_strategy_archive.db)"""
+    root, ext = os.path.splitext(db_path)
+    return f"{root}_archive{ext or '.db'}"
+
+
+def _table_columns(conn: sqlite3.Connection, schema: str, table: str) -> List[Tuple[str, str]]:
+    """[(欄位名, 宣告型別)]，表不存在時為空列表"""
+    return [(row[1], row[2]) for row in conn.execute(f'PRAGMA {schema}.table_info("{table}")')]
+
+
+def _session_tables(conn: sqlite3.Connection) -> List[Tuple[str, str]]:
+    """熱資料庫中實際存在的場次資料表 (出場機制擴展表可能尚未建立)"""
+    existing = {row[0] for row in conn.execute("SELECT name FROM main.sqlite_master WHERE type = 'table'")}
+    return [(table, condition) for table, condition in SESSION_TABLES if table in existing]
+
+
+def attach_history(conn: sqlite3.Connection, archive_path: str) -> bool:
+    """
+    在連線上附加封存庫，並建立與原表同名的 TEMP VIEW (熱資料 UNION ALL 冷資料)
+
+    未指定 schema 的表名優先解析到 temp，因此同一段 SQL 在此連線上查到的是完整歷史；
+    VIEW 不可寫入，歷史連線只能用於查詢
+
+    Returns:
+        bool: 封存庫存在且已附加
+    """
+    if not os.path.exists(archive_path):
+        return False
+
+    conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (archive_path,))
+    for table, _ in _session_tables(conn):
+        columns = [name for name, _ in _table_columns(conn, 'main', table)]
+        archived = {name for name, _ in _table_columns(conn, ARCHIVE_SCHEMA, table)}
+        if not archived:
+            continue
+        hot = ', '.join(f'"{name}"' for name in columns)
+        cold = ', '.join(f'"{name}"' if name in archived else f'NULL AS "{name}"' for name in columns)
+        conn.execute(f'CREATE TEMP VIEW IF NOT EXISTS "{table}" AS '
+                     f'SELECT {hot} FROM main."{table}" UNION ALL SELECT {cold} FROM {ARCHIVE_SCHEMA}."{table}"')
+    return True
+
+
+class SessionArchiver:
+    """
+    場次封存器
+
+    由 SystemMaintenanceManager 每日收盤後呼叫 archive_closed_sessions()，
+    也可手動指定 before 封存到某一天為止
+    """
+
+    def __init__(self, db_path: str = "multi_group_strategy.db", archive_path: Optional[str] = None,
+                 console_enabled: bool = True):
+        self.db_path = db_path
+        self.archive_path = archive_path or default_archive_path(db_path)
+        self.console_enabled = console_enabled
+
+        self.stats = {
+            'runs': 0,
+            'archived_sessions': 0,
+            'archived_rows': 0,
+            'last_archived_dates': [],
+            'held_dates': []
+        }
+
+    def archive_closed_sessions(self, before: Optional[str] = None) -> Dict:
+        """
+        將已結束的場次從熱資料庫搬到封存庫
+
+        Args:
+            before: 封存此日期 (YYYY-MM-DD，不含) 之前的場次，預設為今日
+
+        Returns:
+            Dict: {'dates': 已封存日期, 'held': 仍有活躍部位而保留的日期, 'moved': {表名: 筆數}}
+        """
+        cutoff = before or date.today().isoformat()
+        result = {'dates': [], 'held': [], 'moved': {}}
+
+        # 自行控制交易 (BEGIN IMMEDIATE ... COMMIT)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (self.archive_path,))
+            tables = _session_tables(conn)
+            if not tables:
+                return result
+
+            dates, held = self._collect_dates(conn, cutoff, tables)
+            result['held'] = held
+            self.stats['runs'] += 1
+            self.stats['held_dates'] = held
+            if not dates:
+                return result
+
+            self._ensure_archive_tables(conn, tables)
+
+            conn.execute("CREATE TEMP TABLE archive_dates (date TEXT PRIMARY KEY)")
+            conn.executemany("INSERT INTO temp.archive_dates VALUES (?)", [(d,) for d in dates])
+            conn.execute("CREATE TEMP TABLE archive_groups AS SELECT id FROM main.strategy_groups "
+                         "WHERE date IN (SELECT date FROM temp.archive_dates)")
+            conn.execute("CREATE TEMP TABLE archive_positions AS SELECT id FROM main.position_records "
+                         "WHERE group_id IN (SELECT id FROM temp.archive_groups)")
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for table, condition in tables:
+                    columns = ', '.join(f'"{name}"' for name, _ in _table_columns(conn, 'main', table))
+                    cursor = conn.execute(
+                        f'INSERT OR REPLACE INTO {ARCHIVE_SCHEMA}."{table}" ({columns}) '
+                        f'SELECT {columns} FROM main."{table}" WHERE {condition}')
+                    result['moved'][table] = cursor.rowcount
+                for table, condition in reversed(tables):
+                    conn.execute(f'DELETE FROM main."{table}" WHERE {condition}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            result['dates'] = dates
+            rows = sum(result['moved'].values())
+            self.stats['archived_sessions'] += len(dates)
+            self.stats['archived_rows'] += rows
+            self.stats['last_archived_dates'] = dates
+
+            if self.console_enabled:
+                print(f"[ARCHIVE] 📦 已封存 {len(dates)} 個場次 ({dates[0]} ~ {dates[-1]}), 共 {rows} 筆")
+            if held and self.console_enabled:
+                print(f"[ARCHIVE] ⏸️ 仍有活躍部位，保留場次: {', '.join(held)}")
+            return result
+
+        except Exception as e:
+            logger.error(f"場次封存失敗: {e}")
+            if self.console_enabled:
+                print(f"[ARCHIVE] ❌ 場次封存失敗: {e}")
+            raise
+        finally:
+            conn.close()
+
+    def _collect_dates(self, conn: sqlite3.Connection, cutoff: str,
+                       tables: List[Tuple[str, str]]) -> Tuple[List[str], List[str]]:
+        """找出早於 cutoff 的場次日期，區分可封存與仍有活躍部位者"""
+        names = {table for table, _ in tables}
+        dated = [table for table in ('strategy_groups', 'group_exit_status', 'daily_strategy_stats') if table in names]
+        union = ' UNION '.join(f'SELECT date FROM main."{table}" WHERE date < ?' for table in dated)
+        candidates = [row[0] for row in conn.execute(f"SELECT date FROM ({union}) ORDER BY date",
+                                                     (cutoff,) * len(dated))]
+        if not candidates:
+            return [], []
+
+        held = set()
+        if 'position_records' in names:
+            held = {row[0] for row in conn.execute('''
+                SELECT DISTINCT sg.date FROM main.strategy_groups sg
+                JOIN main.position_records pr ON pr.group_id = sg.id
+                WHERE sg.date < ? AND pr.status = 'ACTIVE'
+            ''', (cutoff,))}
+        return [d for d in candidates if d not in held], sorted(held)
+
+    def _ensure_archive_tables(self, conn: sqlite3.Connection, tables: List[Tuple[str, str]]):
+        """封存庫建立對應資料表，熱資料庫新增的欄位同步補上"""
+        for table, _ in tables:
+            columns = _table_columns(conn, 'main', table)
+            archived = {name for name, _ in _table_columns(conn, ARCHIVE_SCHEMA, table)}
+            if not archived:
+                definition = ', '.join(
+                    f'"{name}" INTEGER PRIMARY KEY' if name == 'id' else f'"{name}" {col_type}'.rstrip()
+                    for name, col_type in columns)
+                conn.execute(f'CREATE TABLE {ARCHIVE_SCHEMA}."{table}" ({definition})')
+                continue
+            for name, col_type in columns:
+                if name not in archived:
+                    conn.execute(f'ALTER TABLE {ARCHIVE_SCHEMA}."{table}" ADD COLUMN "{name}" {col_type}'.rstrip())
+                    logger.info(f"✅ 封存表 {table} 添加欄位: {name}")
+
+        names = {table for table, _ in tables}
+        for table, columns in ARCHIVE_INDEXES:
+            if table in names:
+                index = f"idx_{table}_{columns.replace(', ', '_')}"
+                conn.execute(f'CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.{index} ON "{table}" ({columns})')
+
+    def get_status(self) -> Dict:
+        """封存統計與兩邊的場次數"""
+        status = {'archive_path': self.archive_path, 'stats': dict(self.stats),
+                  'hot_sessions': 0, 'archived_sessions': 0}
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                status['hot_sessions'] = conn.execute(
+                    "SELECT COUNT(DISTINCT date) FROM strategy_groups").fetchone()[0]
+                if os.path.exists(self.archive_path):
+                    conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (self.archive_path,))
+                    if _table_columns(conn, ARCHIVE_SCHEMA, 'strategy_groups'):
+                        status['archived_sessions'] = conn.execute(
+                            f"SELECT COUNT(DISTINCT date) FROM {ARCHIVE_SCHEMA}.strategy_groups").fetchone()[0]
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error(f"查詢封存狀態失敗: {e}")
+        return status
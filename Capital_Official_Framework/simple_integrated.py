@@ -22,6 +22,16 @@ if order_service_path not in sys.path:
 # 導入群益官方模組
 import Global
 from user_config import get_user_config
+from product_router import ProductRouter
+from tick_time import ClockSkewTracker, TickTime, as_tick_time, clock_to_seconds
+from bar_builder import BarBuilder
+
+# 🕐 單一策略收盤平倉時間 (日盤13:30後、夜盤15:00前)，以當日秒數比較
+EOD_CLOSE_SECONDS = clock_to_seconds(13, 30)
+NIGHT_SESSION_START_SECONDS = clock_to_seconds(15, 0)
+
+# 開盤區間長度 (精確2分鐘)
+RANGE_WINDOW_SECONDS = 120
 
 # 🚀 Queue基礎設施導入 (GIL問題解決方案)
 # 🚨 Console模式：完全禁用Queue架構
@@ -39,6 +49,7 @@ try:
     from multi_group_ui_panel import MultiGroupConfigPanel
     from multi_group_console_logger import get_logger, LogCategory
     from system_maintenance_manager import init_maintenance_manager, get_maintenance_manager
+    from session_archive import SessionArchiver
 
     MULTI_GROUP_AVAILABLE = True
     print("✅ 多組策略系統模組載入成功")
@@ -157,7 +168,7 @@ class SimpleIntegratedApp:
         self.range_low = 0
         self.range_calculated = False
         self.in_range_period = False
-        self.range_prices = []
+        self.range_tick_count = 0  # 區間內報價筆數
         self.range_start_hour = 8    # 預設08:46開始
         self.range_start_minute = 46
         self._last_range_minute = None
@@ -170,10 +181,14 @@ class SimpleIntegratedApp:
         self.breakout_signal = None
         self.breakout_direction = None
 
+        # 🎯 多商品報價路由 (訂閱時建立)
+        self.product_router = None
+
         # 價格追蹤（不即時更新UI，只記錄）
         self.latest_price = 0
-        self.latest_time = ""
+        self.latest_time = ""  # 最新報價的 TickTime，顯示時才格式化
         self.price_count = 0  # 接收到的報價數量
+        self.clock_skew = ClockSkewTracker()  # API時間 vs 系統時間差異 (毫秒)
         self.best5_count = 0  # 接收到的五檔報價數量
         # self.last_quote_time = time.time()  # 已移除，避免GIL風險
 
@@ -260,10 +275,13 @@ class SimpleIntegratedApp:
         # self.queue_infrastructure = None
         # self.queue_mode_enabled = False
 
-        # 分鐘K線數據追蹤（新增）
+        # 分鐘K線數據追蹤：串流K棒聚合器 (1分K/5分K/開盤區間)，完成的K棒以事件通知
         self.current_minute_candle = None
-        self.minute_prices = []  # 當前分鐘內的價格
-        self.last_minute = None
+        self._minute_candle_pending = False  # 新的1分K完成，待突破檢測
+        self.bar_builder = BarBuilder()
+        self.bar_builder.add_timeframe('1m', 60, self._on_minute_bar)
+        self.bar_builder.add_timeframe('5m', 300)
+        self._configure_range_window()
         self._last_range_minute = None
 
         # 建立介面
@@ -300,7 +318,8 @@ class SimpleIntegratedApp:
             self.optimized_risk_manager = create_optimized_risk_manager(
                 db_manager=self.multi_group_db_manager,
                 original_managers=original_managers,
-                console_enabled=getattr(self, 'console_enabled', True)
+                console_enabled=getattr(self, 'console_enabled', True),
+                default_product=self.config['DEFAULT_PRODUCT']
             )
 
             # 🔧 設置停損執行器到優化風險管理器
@@ -1233,18 +1252,28 @@ class SimpleIntegratedApp:
             self.add_log(f"❌ 報價連線錯誤: {e}")
     
     def subscribe_quote(self):
-        """訂閱MTX00報價"""
+        """訂閱報價 (DEFAULT_PRODUCT + SUBSCRIBE_PRODUCTS)"""
         try:
             product = self.config['DEFAULT_PRODUCT']
-            self.add_log(f"📊 訂閱 {product} 報價...")
+            products = [product] + [p for p in self.config.get('SUBSCRIBE_PRODUCTS', []) if p != product]
+            self.add_log(f"📊 訂閱 {','.join(products)} 報價...")
 
             # 註冊報價事件 (使用群益官方方式)
             self.register_quote_events()
 
+            # 🎯 多商品路由: 主要商品驅動策略/Monitor，其餘商品只驅動所屬部位風控
+            self.product_router = ProductRouter(product, lookup=self._lookup_product_by_index,
+                                                console_enabled=getattr(self, 'console_enabled', True))
+
+            # 🚀 預先建立報價槽位，五檔回調不再推斷商品代碼
+            if getattr(self, 'real_time_quote_manager', None):
+                for subscribed in products:
+                    self.real_time_quote_manager.register_product(subscribed)
+
             # 🔧 修復TypeError: 確保參數類型正確
             try:
-                # 嘗試不同的參數類型
-                result = Global.skQ.SKQuoteLib_RequestTicks(0, str(product))
+                # 批次訂閱 (逗號合併，失敗時逐一訂閱)
+                result = self.product_router.subscribe(Global.skQ, products).get(product, -1)
             except Exception as e1:
                 self.add_log(f"⚠️ 第一次嘗試失敗: {e1}")
                 try:
@@ -1275,6 +1304,28 @@ class SimpleIntegratedApp:
         except Exception as e:
             self.add_log(f"❌ 報價訂閱錯誤: {e}")
 
+    def _lookup_product_by_index(self, market_no, stock_idx):
+        """以 SKQuoteLib_GetStockByIndexLONG 查詢索引對應的商品代碼 (每個索引只查一次)"""
+        import comtypes.gen.SKCOMLib as sk
+        stock = sk.SKSTOCKLONG()
+        result = Global.skQ.SKQuoteLib_GetStockByIndexLONG(market_no, stock_idx, stock)
+        if isinstance(result, tuple):
+            stock, n_code = result[0], result[1]
+        else:
+            n_code = result
+        return stock.bstrStockNo if n_code == 0 else None
+
+    def process_secondary_product_tick(self, product, price, time_hms):
+        """
+        非主要商品報價 - 只更新該商品部位簿的風控，不影響策略、Monitor與主要商品的 last_price
+        """
+        try:
+            if getattr(self, 'optimized_risk_manager', None):
+                self.optimized_risk_manager.update_price(price, TickTime.from_api(time_hms).text, product=product)
+        except Exception as e:
+            if getattr(self, 'console_enabled', True):
+                print(f"[PRODUCT_ROUTER] ⚠️ {product} 風控更新錯誤: {e}")
+
     def stop_quote(self):
         """停止報價訂閱 - 使用OrderTester.py中成功的方法"""
         try:
@@ -1289,6 +1340,12 @@ class SimpleIntegratedApp:
             msg = Global.skC.SKCenterLib_GetReturnCodeMessage(nCode)
             self.add_log(f"📋 CancelRequestTicks結果: {msg} (代碼: {nCode})")
 
+            # 🎯 多商品: 一併取消其餘訂閱商品
+            if self.product_router:
+                for other in self.product_router.products:
+                    if other != product:
+                        Global.skQ.SKQuoteLib_CancelRequestTicks(other)
+
             # 只更新訂閱按鈕狀態，停止按鈕保持可用
             self.btn_subscribe_quote.config(state="normal")  # 重新啟用訂閱按鈕
 
@@ -1610,12 +1667,24 @@ class SimpleIntegratedApp:
                 description="重置每日統計信息"
             )
 
+            # 6. 已結束場次封存（每日收盤後）
+            if getattr(self, 'multi_group_db_manager', None):
+                self.session_archiver = SessionArchiver(self.multi_group_db_manager.db_path,
+                                                        self.multi_group_db_manager.archive_path)
+                maintenance_manager.register_task(
+                    name="場次封存",
+                    func=self.session_archiver.archive_closed_sessions,
+                    interval_seconds=86400,
+                    run_at="14:00",  # 日盤13:45收盤後
+                    description="將已結束場次搬到封存資料庫，熱資料庫只保留進行中的場次"
+                )
+
             # 啟動維護管理器
             maintenance_manager.start()
 
             print("🧹 系統維護管理器已啟用")
             print("💡 將定期清理內存緩存、過期訂單、舊日誌等資源")
-            print("🎯 維護任務：內存緩存(1h)、訂單清理(30m)、資料庫清理(24h)")
+            print("🎯 維護任務：內存緩存(1h)、訂單清理(30m)、資料庫清理(24h)、場次封存(每日14:00)")
 
         except Exception as e:
             print(f"❌ 設置系統維護管理器失敗: {e}")
@@ -1655,6 +1724,17 @@ class SimpleIntegratedApp:
                 def OnNotifyTicksLONG(self, sMarketNo, nStockidx, nPtr, lDate, lTimehms, lTimemillismicros, nBid, nAsk, nClose, nQty, nSimulate):
                     """簡化版報價事件 - Console輸出為主 + 停損監控整合 + 性能監控"""
 
+                    # 🎯 多商品路由: (sMarketNo, nStockidx) → 商品，非主要商品只驅動該商品的部位簿
+                    product = None
+                    router = getattr(self.parent, 'product_router', None)
+                    if router:
+                        product = router.on_tick(sMarketNo, nStockidx, nClose / 100.0)
+                        if not router.is_primary(product):
+                            # 多商品模式下無法辨識的報價 (product 為 None) 直接丟棄，已計入 unresolved_ticks
+                            if product is not None:
+                                self.parent.process_secondary_product_tick(product, nClose / 100.0, lTimehms)
+                            return 0
+
                     # 🚀 零風險頻率控制（可選功能，預設關閉）
                     if hasattr(self.parent, 'enable_quote_throttle') and self.parent.enable_quote_throttle:
                         # 延遲初始化頻率控制器
@@ -1667,8 +1747,8 @@ class SimpleIntegratedApp:
                         if not self.parent.quote_throttler.should_process():
                             return  # 🔄 跳過此次處理，等待下次間隔
 
-                    # ⏰ 性能監控：記錄報價處理開始時間
-                    quote_start_time = time.time()
+                    # ⏰ 整數時間：當日秒數 + 毫秒 + 收到報價的單調時間 (性能監控用)
+                    tick_time = TickTime.from_api(lTimehms, lTimemillismicros)
 
                     try:
                         # 解析價格資訊
@@ -1676,9 +1756,8 @@ class SimpleIntegratedApp:
                         bid = nBid / 100.0
                         ask = nAsk / 100.0
 
-                        # 格式化時間
-                        time_str = f"{lTimehms:06d}"
-                        formatted_time = f"{time_str[:2]}:{time_str[2:4]}:{time_str[4:6]}"
+                        # 風控/部位模組以 HH:MM:SS 記錄時間，每筆只格式化一次
+                        formatted_time = tick_time.text
 
                         # 🛡️ 停損監控整合 - 在價格更新時檢查停損觸發
                         if hasattr(self.parent, 'stop_loss_monitor') and self.parent.stop_loss_monitor:
@@ -1697,7 +1776,7 @@ class SimpleIntegratedApp:
                             try:
                                 # 🎯 使用優化風險管理器 (事件觸發 + 內存緩存)
                                 results = self.parent.optimized_risk_manager.update_price(
-                                    corrected_price, formatted_time
+                                    corrected_price, formatted_time, product=product
                                 )
 
                                 # 📊 記錄處理結果 (靜默模式，避免過多輸出)
@@ -1818,7 +1897,7 @@ class SimpleIntegratedApp:
 
                         # 🎯 策略邏輯整合
                         if hasattr(self.parent, 'strategy_enabled') and self.parent.strategy_enabled:
-                            self.parent.process_strategy_logic_safe(corrected_price, formatted_time)
+                            self.parent.process_strategy_logic_safe(corrected_price, tick_time)
 
                         # ✅ 更新內部數據變數（Monitor依賴這些）
                         self.parent.last_price = corrected_price
@@ -1832,7 +1911,7 @@ class SimpleIntegratedApp:
                         # self.parent.last_quote_time = time.time()  # 已移除
 
                         # 📊 性能監控：計算報價處理總耗時
-                        quote_elapsed = (time.time() - quote_start_time) * 1000
+                        quote_elapsed = tick_time.elapsed_ms()
 
                         # 🚨 延遲警告：如果報價處理超過100ms，輸出警告
                         if quote_elapsed > 100:
@@ -1854,7 +1933,7 @@ class SimpleIntegratedApp:
 
                     except Exception as e:
                         # Console錯誤輸出
-                        quote_elapsed = (time.time() - quote_start_time) * 1000 if 'quote_start_time' in locals() else 0
+                        quote_elapsed = tick_time.elapsed_ms()
                         print(f"❌ [ERROR] 報價處理錯誤: {e} (耗時:{quote_elapsed:.1f}ms)")
 
                     return 0
@@ -1862,16 +1941,29 @@ class SimpleIntegratedApp:
                 def OnNotifyBest5LONG(self, sMarketNo, nStockidx, nBestBid1, nBestBidQty1, nBestBid2, nBestBidQty2, nBestBid3, nBestBidQty3, nBestBid4, nBestBidQty4, nBestBid5, nBestBidQty5, nExtendBid, nExtendBidQty, nBestAsk1, nBestAskQty1, nBestAsk2, nBestAskQty2, nBestAsk3, nBestAskQty3, nBestAsk4, nBestAskQty4, nBestAsk5, nBestAskQty5, nExtendAsk, nExtendAskQty, nSimulate):
                     """五檔報價事件 - Console版本"""
                     try:
-                        # 控制五檔輸出頻率，避免過多信息
+                        # 🎯 多商品路由: 五檔依 (sMarketNo, nStockidx) 歸屬商品，與成交報價相同
+                        router = getattr(self.parent, 'product_router', None)
+                        if router:
+                            product_code = router.resolve(sMarketNo, nStockidx)
+                            is_primary = router.is_primary(product_code)
+                            if product_code is None:
+                                if not is_primary:
+                                    return 0  # 多商品模式下無法辨識的五檔直接丟棄
+                                product_code = self.parent.get_current_monitoring_product()
+                        else:
+                            product_code = self.parent.get_current_monitoring_product()
+                            is_primary = True
+
+                        # 控制五檔輸出頻率，避免過多信息 (各商品分別計時，避免互相擠掉更新)
                         if not hasattr(self.parent, '_last_best5_time'):
-                            self.parent._last_best5_time = 0
+                            self.parent._last_best5_time = {}
 
                         current_time = time.time()
-                        if current_time - self.parent._last_best5_time > 2:  # 每2秒輸出一次
-                            self.parent._last_best5_time = current_time
+                        if current_time - self.parent._last_best5_time.get(product_code, 0) > 2:  # 每2秒輸出一次
+                            self.parent._last_best5_time[product_code] = current_time
 
-                            # 可控制的Console輸出
-                            if getattr(self.parent, 'console_quote_enabled', True):
+                            # 可控制的Console輸出 (只輸出主要商品)
+                            if is_primary and getattr(self.parent, 'console_quote_enabled', True):
                                 # 轉換價格 (群益API價格需要除以100)
                                 bid1 = nBestBid1 / 100.0 if nBestBid1 > 0 else 0
                                 bid2 = nBestBid2 / 100.0 if nBestBid2 > 0 else 0
@@ -1896,26 +1988,24 @@ class SimpleIntegratedApp:
                             # 🔧 移除時間操作，避免GIL風險
                             # self.parent.last_quote_time = current_time  # 已移除
 
-                            # 🎯 為策略保存五檔數據
-                            self.parent.best5_data = {
-                                'bid1': nBestBid1 / 100.0 if nBestBid1 > 0 else 0,
-                                'bid1_qty': nBestBidQty1,
-                                'ask1': nBestAsk1 / 100.0 if nBestAsk1 > 0 else 0,
-                                'ask1_qty': nBestAskQty1,
-                                'bid_prices': [nBestBid1/100.0, nBestBid2/100.0, nBestBid3/100.0, nBestBid4/100.0, nBestBid5/100.0],
-                                'bid_qtys': [nBestBidQty1, nBestBidQty2, nBestBidQty3, nBestBidQty4, nBestBidQty5],
-                                'ask_prices': [nBestAsk1/100.0, nBestAsk2/100.0, nBestAsk3/100.0, nBestAsk4/100.0, nBestAsk5/100.0],
-                                'ask_qtys': [nBestAskQty1, nBestAskQty2, nBestAskQty3, nBestAskQty4, nBestAskQty5],
-                                'timestamp': current_time
-                            }
+                            # 🎯 為策略保存五檔數據 (只保存主要商品，其他商品的五檔不可覆蓋)
+                            if is_primary:
+                                self.parent.best5_data = {
+                                    'bid1': nBestBid1 / 100.0 if nBestBid1 > 0 else 0,
+                                    'bid1_qty': nBestBidQty1,
+                                    'ask1': nBestAsk1 / 100.0 if nBestAsk1 > 0 else 0,
+                                    'ask1_qty': nBestAskQty1,
+                                    'bid_prices': [nBestBid1/100.0, nBestBid2/100.0, nBestBid3/100.0, nBestBid4/100.0, nBestBid5/100.0],
+                                    'bid_qtys': [nBestBidQty1, nBestBidQty2, nBestBidQty3, nBestBidQty4, nBestBidQty5],
+                                    'ask_prices': [nBestAsk1/100.0, nBestAsk2/100.0, nBestAsk3/100.0, nBestAsk4/100.0, nBestAsk5/100.0],
+                                    'ask_qtys': [nBestAskQty1, nBestAskQty2, nBestAskQty3, nBestAskQty4, nBestAskQty5],
+                                    'timestamp': current_time
+                                }
 
                             # 🚀 實際下單系統：更新即時報價管理器
                             if hasattr(self.parent, 'real_time_quote_manager') and self.parent.real_time_quote_manager:
                                 try:
-                                    # 🎯 Stage2 商品監控整合：自動識別當前監控商品
-                                    product_code = self.parent.get_current_monitoring_product()
-
-                                    # 更新五檔數據到實際下單系統
+                                    # 更新五檔數據到實際下單系統 (寫入該五檔所屬商品)
                                     self.parent.real_time_quote_manager.update_best5_data(
                                         market_no=sMarketNo,
                                         stock_idx=nStockidx,
@@ -1929,7 +2019,9 @@ class SimpleIntegratedApp:
                                         bid3=nBestBid3/100.0, bid3_qty=nBestBidQty3,
                                         bid4=nBestBid4/100.0, bid4_qty=nBestBidQty4,
                                         bid5=nBestBid5/100.0, bid5_qty=nBestBidQty5,
-                                        product_code=product_code
+                                        product_code=product_code,
+                                        ext_ask=nExtendAsk/100.0, ext_ask_qty=nExtendAskQty,
+                                        ext_bid=nExtendBid/100.0, ext_bid_qty=nExtendBidQty
                                     )
 
                                     # 🔄 移除UI更新，避免GIL問題
@@ -2511,44 +2603,34 @@ class SimpleIntegratedApp:
             # 回退到簡單格式
             print(f"🔍 策略收到: price={price}, api_time={api_time}, sys_time={sys_time}, count={count}")
 
-    def process_strategy_logic_safe(self, price, time_str):
-        """安全的策略邏輯處理 - 避免頻繁UI更新"""
+    def process_strategy_logic_safe(self, price, tick_time):
+        """
+        安全的策略邏輯處理 - 避免頻繁UI更新
+
+        Args:
+            price: 成交價
+            tick_time: TickTime（報價事件），或 HH:MM:SS 字串（Queue/測試等舊呼叫端）
+        """
         try:
+            tick_time = as_tick_time(tick_time)
+
+            # 🕐 API時間 vs 系統時間差異：每筆都記錄 (整數毫秒運算)
+            skew_ms = self.clock_skew.record(tick_time)
+
             # 🔍 可控制的策略Console輸出 - 增強版包含時間對比
             if getattr(self, 'console_strategy_enabled', True):
                 if price == 0:
-                    print(f"⚠️ 策略收到0價格數據，時間: {time_str}")
+                    print(f"⚠️ 策略收到0價格數據，時間: {tick_time}")
                 elif self.price_count % 50 == 0:  # 每50筆報價顯示一次
-                    # 🕐 添加系統時間對比
-                    import datetime
-                    current_time = datetime.datetime.now().strftime("%H:%M:%S")
+                    time_diff = round(skew_ms / 1000, 3)
 
-                    # 計算時間差異（簡化版）
-                    try:
-                        api_hour, api_min, api_sec = map(int, time_str.split(':'))
-                        sys_hour, sys_min, sys_sec = map(int, current_time.split(':'))
+                    # 🎯 重要：API時間監控LOG - 定期顯示 + 異常立即顯示
+                    self._log_api_time_monitoring(price, tick_time.text, self.clock_skew.local_time_text(),
+                                                  time_diff, self.price_count)
 
-                        api_total_sec = api_hour * 3600 + api_min * 60 + api_sec
-                        sys_total_sec = sys_hour * 3600 + sys_min * 60 + sys_sec
-                        time_diff = sys_total_sec - api_total_sec
-
-                        # 處理跨日情況（簡化處理）
-                        if time_diff > 43200:  # 12小時以上，可能是跨日
-                            time_diff -= 86400
-                        elif time_diff < -43200:
-                            time_diff += 86400
-
-                        # 🎯 重要：API時間監控LOG - 定期顯示 + 異常立即顯示
-                        self._log_api_time_monitoring(price, time_str, current_time, time_diff, self.price_count)
-
-                        # 🚨 延遲警告 - 立即顯示重要事件
-                        if abs(time_diff) > 30:  # 超過30秒
-                            print(f"⚠️ 時間差異警告: {time_diff}秒 (API時間 vs 系統時間)")
-
-                    except Exception as e:
-                        # 時間計算錯誤時回退到原始格式 - 立即顯示
-                        self._log_api_time_monitoring(price, time_str, current_time, "ERR", self.price_count)
-                        print(f"⚠️ 時間差異計算錯誤: {e}")
+                    # 🚨 延遲警告 - 立即顯示重要事件
+                    if abs(skew_ms) > 30000:  # 超過30秒
+                        print(f"⚠️ 時間差異警告: {time_diff}秒 (API時間 vs 系統時間)")
 
             # 🔧 簡化統計更新，避免複雜時間操作 (僅在監控啟用時)
             if getattr(self, 'monitoring_enabled', True):
@@ -2557,7 +2639,7 @@ class SimpleIntegratedApp:
 
             # 只更新內部變數，不更新UI
             self.latest_price = price
-            self.latest_time = time_str
+            self.latest_time = tick_time
             self.price_count += 1
 
             # 移除UI更新，避免GIL問題
@@ -2565,36 +2647,30 @@ class SimpleIntegratedApp:
             if self.price_count % 1000 == 0:  # 每1000筆報價輸出一次統計
                 print(f"📊 [STRATEGY] 報價統計: {self.price_count}筆")
 
-            # 解析時間
-            hour, minute, second = map(int, time_str.split(':'))
-
-            # 區間計算邏輯
-            self.update_range_calculation_safe(price, time_str)
-
-            # 更新分鐘K線數據（用於突破檢測）
-            if self.range_calculated:
-                self.update_minute_candle_safe(price, hour, minute, second)
+            # 區間計算 + K棒聚合（區間/1分K完成時以事件通知）
+            self.update_range_calculation_safe(price, tick_time)
 
             # 🔧 修正：空單即時檢測 + 多單1分K檢測
             if self.range_calculated and not self.first_breakout_detected:
                 # 🚀 新增：即時空單進場檢測（不等1分K收盤）
-                self.check_immediate_short_entry_safe(price, time_str)
+                self.check_immediate_short_entry_safe(price, tick_time)
 
-                # 原有：1分K多單檢測（只檢測多單）
-                if not self.first_breakout_detected:  # 確保空單沒有先觸發
+                # 原有：1分K多單檢測（只在新的1分K完成時檢測多單）
+                if not self.first_breakout_detected and self._minute_candle_pending:  # 確保空單沒有先觸發
                     self.check_minute_candle_breakout_safe()
+            self._minute_candle_pending = False
 
             # 執行進場（檢測到突破信號後的下一個報價）
             if self.range_calculated and self.waiting_for_entry:
-                self.check_breakout_signals_safe(price, time_str)
+                self.check_breakout_signals_safe(price, tick_time)
 
             # 出場條件檢查（有部位時）
             if self.current_position:
-                self.check_exit_conditions_safe(price, time_str)
+                self.check_exit_conditions_safe(price, tick_time)
 
             # 🎯 多組策略風險管理檢查
             if self.multi_group_enabled and self.multi_group_risk_engine:
-                self.check_multi_group_exit_conditions(price, time_str)
+                self.check_multi_group_exit_conditions(price, tick_time.text)
             elif self.console_enabled:
                 # 🔍 DEBUG: 風險管理引擎狀態檢查 (每100次輸出一次)
                 if not hasattr(self, '_risk_engine_debug_count'):
@@ -2611,92 +2687,76 @@ class SimpleIntegratedApp:
             # 靜默處理錯誤，避免影響報價處理
             pass
 
-    def update_range_calculation_safe(self, price, time_str):
+    def update_range_calculation_safe(self, price, tick_time):
         """安全的區間計算 - 只在關鍵時刻更新UI"""
         try:
-            # 檢查是否在區間時間內
-            if self.is_in_range_time_safe(time_str):
-                if not self.in_range_period:
-                    # 開始收集區間數據
-                    self.in_range_period = True
-                    self.range_prices = []
-                    self._range_start_time = time_str
-                    # 重要事件：記錄到策略日誌
-                    self.add_strategy_log(f"📊 開始收集區間數據: {time_str}")
-
-                # 收集價格數據
-                self.range_prices.append(price)
-
-            elif self.in_range_period and not self.range_calculated:
-                # 區間結束，計算高低點
-                if self.range_prices:
-                    self.range_high = max(self.range_prices)
-                    self.range_low = min(self.range_prices)
-                    self.range_calculated = True
-                    self.in_range_period = False
-
-                    # 移除UI更新，改用Console輸出
-                    range_text = f"高:{self.range_high:.0f} 低:{self.range_low:.0f} 大小:{self.range_high-self.range_low:.0f}"
-                    print(f"✅ [STRATEGY] 區間計算完成: {range_text}")
-                    # UI更新會在背景線程中引起GIL錯誤，已移除
-
-                    # 重要事件：記錄到策略日誌
-                    self.add_strategy_log(f"✅ 區間計算完成: {range_text}")
-                    self.add_strategy_log(f"📊 收集數據點數: {len(self.range_prices)} 筆，開始監測突破")
-
-                    # 🎯 檢查是否需要自動啟動多組策略（防重複觸發）
-                    if not self._auto_start_triggered:
-                        self.check_auto_start_multi_group_strategy()
+            # 區間開始：重要事件記錄到策略日誌
+            if not self.in_range_period and not self.range_calculated and self.is_in_range_time_safe(tick_time):
+                self.in_range_period = True
+                self._range_start_time = str(tick_time)
+                self.add_strategy_log(f"📊 開始收集區間數據: {tick_time}")
+
+            # 串流累計開高低收：區間時間窗結束 → _on_range_bar，換分 → _on_minute_bar
+            self.bar_builder.update(price, tick_time.sod)
 
         except Exception as e:
             pass
 
-    def is_in_range_time_safe(self, time_str):
-        """安全的時間檢查 - 精確2分鐘區間"""
-        try:
-            hour, minute, second = map(int, time_str.split(':'))
-            current_total_seconds = hour * 3600 + minute * 60 + second
-            start_total_seconds = self.range_start_hour * 3600 + self.range_start_minute * 60
-            end_total_seconds = start_total_seconds + 120  # 精確2分鐘
+    def _configure_range_window(self):
+        """依區間開始時間設定開盤區間時間窗，保留既有訂閱"""
+        start = clock_to_seconds(self.range_start_hour, self.range_start_minute)
+        self._range_window = (start, start + RANGE_WINDOW_SECONDS)
+        self.bar_builder.add_window('range', start, RANGE_WINDOW_SECONDS, self._on_range_bar)
 
-            return start_total_seconds <= current_total_seconds < end_total_seconds
-        except:
-            return False
+    def _on_range_bar(self, bar):
+        """開盤區間時間窗完成 - 以區間K棒的高低點作為突破區間"""
+        if self.range_calculated:
+            return
 
-    def update_minute_candle_safe(self, price, hour, minute, second):
-        """更新分鐘K線數據 - 參考OrderTester.py邏輯"""
-        try:
-            current_minute = minute
-
-            # 如果是新的分鐘，處理上一分鐘的K線
-            if self.last_minute is not None and current_minute != self.last_minute:
-                if self.minute_prices:
-                    # 計算上一分鐘的K線
-                    open_price = self.minute_prices[0]
-                    close_price = self.minute_prices[-1]
-                    high_price = max(self.minute_prices)
-                    low_price = min(self.minute_prices)
-
-                    self.current_minute_candle = {
-                        'minute': self.last_minute,
-                        'open': open_price,
-                        'high': high_price,
-                        'low': low_price,
-                        'close': close_price,
-                        'start_time': f"{hour:02d}:{self.last_minute:02d}:00"
-                    }
-
-                # 重置當前分鐘的價格數據
-                self.minute_prices = []
-
-            # 添加當前價格到分鐘數據
-            self.minute_prices.append(price)
-            self.last_minute = current_minute
+        self.range_high = bar.high
+        self.range_low = bar.low
+        self.range_tick_count = bar.tick_count
+        self.range_calculated = True
+        self.in_range_period = False
 
-        except Exception as e:
-            pass
+        # 移除UI更新，改用Console輸出
+        range_text = f"高:{self.range_high:.0f} 低:{self.range_low:.0f} 大小:{self.range_high-self.range_low:.0f}"
+        print(f"✅ [STRATEGY] 區間計算完成: {range_text}")
+        # UI更新會在背景線程中引起GIL錯誤，已移除
+
+        # 重要事件：記錄到策略日誌
+        self.add_strategy_log(f"✅ 區間計算完成: {range_text}")
+        self.add_strategy_log(f"📊 收集數據點數: {bar.tick_count} 筆，開始監測突破")
+
+        # 🎯 檢查是否需要自動啟動多組策略（防重複觸發）
+        if not self._auto_start_triggered:
+            self.check_auto_start_multi_group_strategy()
+
+    def _on_minute_bar(self, bar):
+        """1分K完成 - 區間計算完成後、不與區間重疊的K棒才用於多單突破檢測"""
+        range_start, range_end = self._range_window
+        if not self.range_calculated or (bar.start_sod < range_end and bar.end_sod > range_start):
+            return
+
+        self.current_minute_candle = {
+            'minute': bar.start_sod // 60 % 60,
+            'open': bar.open,
+            'high': bar.high,
+            'low': bar.low,
+            'close': bar.close,
+            'start_time': bar.start_text
+        }
+        self._minute_candle_pending = True
 
-    def check_immediate_short_entry_safe(self, price, time_str):
+    def is_in_range_time_safe(self, tick_time):
+        """安全的時間檢查 - 精確2分鐘區間（當日秒數整數比較）"""
+        try:
+            start_total_seconds, end_total_seconds = self._range_window
+            return start_total_seconds <= as_tick_time(tick_time).sod < end_total_seconds
+        except:
+            return False
+
+    def check_immediate_short_entry_safe(self, price, tick_time):
         """
         即時空單進場檢測 - 不等1分K收盤
         空單在下跌過程中只要碰到區間就立即進場
@@ -2762,7 +2822,7 @@ class SimpleIntegratedApp:
         except Exception as e:
             pass
 
-    def check_breakout_signals_safe(self, price, time_str):
+    def check_breakout_signals_safe(self, price, tick_time):
         """執行進場 - 在檢測到突破信號後的下一個報價進場"""
         try:
             # 如果等待進場且有突破方向
@@ -2772,10 +2832,10 @@ class SimpleIntegratedApp:
 
                 # 🎯 多組策略進場邏輯
                 if self.multi_group_enabled and self.multi_group_running and self.multi_group_position_manager:
-                    self.execute_multi_group_entry(direction, price, time_str)
+                    self.execute_multi_group_entry(direction, price, str(tick_time))
                 else:
                     # 單一策略進場邏輯
-                    self.enter_position_safe(direction, price, time_str)
+                    self.enter_position_safe(direction, price, tick_time)
 
         except Exception as e:
             pass
@@ -2825,7 +2885,7 @@ class SimpleIntegratedApp:
                                     conn.row_factory = sqlite3.Row
                                     cursor = conn.cursor()
                                     cursor.execute('''
-                                        SELECT pr.*, sg.range_high, sg.range_low
+                                        SELECT pr.*, sg.range_high, sg.range_low, sg.product
                                         FROM position_records pr
                                         JOIN strategy_groups sg ON pr.group_id = sg.id
                                         WHERE pr.group_id = ? AND pr.status IN ('PENDING', 'ACTIVE')
@@ -2858,17 +2918,20 @@ class SimpleIntegratedApp:
                                                 range_high = position_dict.get('range_high') or getattr(self, 'range_high', 0)
                                                 range_low = position_dict.get('range_low') or getattr(self, 'range_low', 0)
                                                 position_id = position_dict.get('id')
+                                                product = position_dict.get('product')
                                             else:
                                                 # 如果不是字典，嘗試使用索引訪問
                                                 try:
                                                     range_high = position['range_high'] if 'range_high' in position.keys() else getattr(self, 'range_high', 0)
                                                     range_low = position['range_low'] if 'range_low' in position.keys() else getattr(self, 'range_low', 0)
                                                     position_id = position['id'] if 'id' in position.keys() else None
+                                                    product = position['product'] if 'product' in position.keys() else None
                                                 except Exception:
                                                     # 最後的備用方案
                                                     range_high = getattr(self, 'range_high', 0)
                                                     range_low = getattr(self, 'range_low', 0)
                                                     position_id = None
+                                                    product = None
                                                     if self.console_enabled:
                                                         print(f"[OPTIMIZED_RISK] ⚠️ 無法安全訪問部位數據")
 
@@ -2880,7 +2943,8 @@ class SimpleIntegratedApp:
                                                     'entry_price': price,
                                                     'range_high': range_high,
                                                     'range_low': range_low,
-                                                    'group_id': group_db_id
+                                                    'group_id': group_db_id,
+                                                    'product': product  # 多商品部位簿依策略組商品分流
                                                 }
                                                 # 🎯 事件觸發：立即加入監控
                                                 self.optimized_risk_manager.on_new_position(position_data)
@@ -2992,7 +3056,8 @@ class SimpleIntegratedApp:
                 direction=direction,  # 🎯 使用實際突破方向
                 signal_time=time_str,
                 range_high=self.range_high,
-                range_low=self.range_low
+                range_low=self.range_low,
+                product=self.config['DEFAULT_PRODUCT']
             )
 
             if group_ids:
@@ -3019,17 +3084,20 @@ class SimpleIntegratedApp:
                 self.multi_group_logger.system_error(f"創建策略組失敗: {e}")
             return False
 
-    def enter_position_safe(self, direction, price, time_str):
+    def enter_position_safe(self, direction, price, tick_time):
         """安全的建倉處理 - 只在建倉時更新UI"""
         try:
+            tick_time = as_tick_time(tick_time)
+
             # 重要事件：記錄到策略日誌
-            self.add_strategy_log(f"🚀 {direction} 突破進場 @{price:.0f} 時間:{time_str}")
+            self.add_strategy_log(f"🚀 {direction} 突破進場 @{price:.0f} 時間:{tick_time}")
 
             # 記錄部位資訊
             self.current_position = {
                 'direction': direction,
                 'entry_price': price,
-                'entry_time': time_str,
+                'entry_time': tick_time.text,
+                'entry_sod': tick_time.sod,  # 當日秒數，計算持倉時間用
                 'quantity': 1,
                 'peak_price': price,  # 峰值價格追蹤
                 'trailing_activated': False,  # 移動停利是否啟動
@@ -3107,7 +3175,7 @@ class SimpleIntegratedApp:
         except Exception as e:
             self.add_strategy_log(f"❌ 建倉失敗: {e}")
 
-    def check_exit_conditions_safe(self, price, time_str):
+    def check_exit_conditions_safe(self, price, tick_time):
         """安全的出場檢查 - 包含移動停利和收盤平倉"""
         try:
             if not self.current_position:
@@ -3118,26 +3186,25 @@ class SimpleIntegratedApp:
 
             # 🕐 檢查收盤平倉 (13:30) - 受控制開關影響
             if hasattr(self, 'single_strategy_eod_close_var') and self.single_strategy_eod_close_var.get():
-                hour, minute, second = map(int, time_str.split(':'))
-                if hour >= 13 and minute >= 30:
-                    self.exit_position_safe(price, time_str, "收盤平倉")
+                if EOD_CLOSE_SECONDS <= tick_time.sod < NIGHT_SESSION_START_SECONDS:
+                    self.exit_position_safe(price, tick_time, "收盤平倉")
                     return
 
             # 🛡️ 檢查初始停損 (區間邊界)
             if direction == "LONG" and price <= self.range_low:
-                self.exit_position_safe(price, time_str, f"初始停損 {self.range_low:.0f}")
+                self.exit_position_safe(price, tick_time, f"初始停損 {self.range_low:.0f}")
                 return
             elif direction == "SHORT" and price >= self.range_high:
-                self.exit_position_safe(price, time_str, f"初始停損 {self.range_high:.0f}")
+                self.exit_position_safe(price, tick_time, f"初始停損 {self.range_high:.0f}")
                 return
 
             # 🎯 移動停利邏輯
-            self.check_trailing_stop_logic(price, time_str)
+            self.check_trailing_stop_logic(price, tick_time)
 
         except Exception as e:
             pass
 
-    def check_trailing_stop_logic(self, price, time_str):
+    def check_trailing_stop_logic(self, price, tick_time):
         """移動停利邏輯檢查"""
         try:
             if not self.current_position:
@@ -3183,7 +3250,7 @@ class SimpleIntegratedApp:
 
                     if price <= trailing_stop_price:
                         pnl = trailing_stop_price - entry_price
-                        self.exit_position_safe(trailing_stop_price, time_str,
+                        self.exit_position_safe(trailing_stop_price, tick_time,
                                               f"移動停利 (峰值:{peak_price:.0f} 回撤:{pullback_amount:.1f}點)")
                         return
 
@@ -3194,14 +3261,14 @@ class SimpleIntegratedApp:
 
                     if price >= trailing_stop_price:
                         pnl = entry_price - trailing_stop_price
-                        self.exit_position_safe(trailing_stop_price, time_str,
+                        self.exit_position_safe(trailing_stop_price, tick_time,
                                               f"移動停利 (峰值:{peak_price:.0f} 回撤:{pullback_amount:.1f}點)")
                         return
 
         except Exception as e:
             pass
 
-    def exit_position_safe(self, price, time_str, reason):
+    def exit_position_safe(self, price, tick_time, reason):
         """安全的出場處理 - 包含完整損益計算"""
         try:
             if not self.current_position:
@@ -3209,20 +3276,17 @@ class SimpleIntegratedApp:
 
             direction = self.current_position['direction']
             entry_price = self.current_position['entry_price']
-            entry_time = self.current_position['entry_time']
 
             # 計算損益
             pnl = (price - entry_price) if direction == "LONG" else (entry_price - price)
             pnl_money = pnl * 50  # 每點50元
 
-            # 計算持倉時間
+            # 計算持倉時間 (當日秒數相減)
             try:
-                entry_h, entry_m, entry_s = map(int, entry_time.split(':'))
-                exit_h, exit_m, exit_s = map(int, time_str.split(':'))
-                entry_seconds = entry_h * 3600 + entry_m * 60 + entry_s
-                exit_seconds = exit_h * 3600 + exit_m * 60 + exit_s
-                hold_seconds = exit_seconds - entry_seconds
-                hold_minutes = hold_seconds // 60
+                entry_sod = self.current_position.get('entry_sod')
+                if entry_sod is None:
+                    entry_sod = as_tick_time(self.current_position['entry_time']).sod
+                hold_minutes = (as_tick_time(tick_time).sod - entry_sod) // 60
             except:
                 hold_minutes = 0
 
@@ -3254,6 +3318,8 @@ class SimpleIntegratedApp:
 
             # 重置策略狀態
             self.range_calculated = False
+            self.in_range_period = False
+            self.bar_builder.reset()
             self.first_breakout_detected = False
             self.current_position = None
             self.price_count = 0
@@ -3338,7 +3404,8 @@ class SimpleIntegratedApp:
             # 重置區間數據
             self.range_calculated = False
             self.in_range_period = False
-            self.range_prices = []
+            self.range_tick_count = 0
+            self._configure_range_window()
 
             # 重要事件：記錄到策略日誌
             self.add_strategy_log(f"✅ 區間時間已設定: {range_display}")
@@ -3363,7 +3430,7 @@ class SimpleIntegratedApp:
 - 計算狀態: {'已完成' if self.range_calculated else '等待中'}
 - 區間高點: {self.range_high:.0f if self.range_calculated else '--'}
 - 區間低點: {self.range_low:.0f if self.range_calculated else '--'}
-- 數據點數: {len(self.range_prices)}
+- 數據點數: {self.range_tick_count}
 
 突破狀態:
 - 突破檢測: {'已觸發' if self.first_breakout_detected else '等待中'}
@@ -3476,24 +3543,27 @@ class SimpleIntegratedApp:
 
             # 嘗試獲取Queue管理器統計
             if hasattr(self.queue_infrastructure, 'queue_manager') and self.queue_infrastructure.queue_manager:
-                stats = self.queue_infrastructure.queue_manager.stats
+                queue_status = self.queue_infrastructure.queue_manager.get_queue_status()
+                stats = queue_status['stats']
                 self.add_log(f"   - Tick接收: {stats.get('tick_received', 0)}")
-                self.add_log(f"   - Tick處理: {stats.get('tick_processed', 0)}")
+                self.add_log(f"   - Tick處理: {stats.get('tick_processed', 0)} (批次: {stats.get('tick_batches', 0)})")
+                self.add_log(f"   - 佇列深度: {queue_status['tick_queue_size']} (最高: {stats.get('tick_max_depth', 0)})")
+                self.add_log(f"   - 佇列延遲: 平均 {queue_status['latency_avg_ms']:.2f}ms / 最大 {queue_status['latency_max_ms']:.2f}ms")
                 self.add_log(f"   - 佇列錯誤: {stats.get('queue_full_errors', 0)}")
                 self.add_log(f"   - 處理錯誤: {stats.get('processing_errors', 0)}")
         except Exception as e:
             self.add_log(f"❌ 獲取Queue狀態錯誤: {e}")
 
-    def process_queue_strategy_data(self, tick_data_dict):
-        """處理來自Queue的策略數據"""
+    def process_queue_strategy_data(self, tick_data):
+        """處理來自Queue的策略數據 (TickData，每筆都會送達)"""
         try:
-            # 從Queue數據中提取價格和時間
-            price = tick_data_dict.get('corrected_close', 0)
-            formatted_time = tick_data_dict.get('formatted_time', '')
+            # 直接讀取Tick屬性，不經過字典轉換
+            price = tick_data.corrected_price
+            tick_time = TickTime.from_api(tick_data.time_hms, tick_data.time_millis)
 
-            # 調用現有的策略邏輯 (格式完全相同)
+            # 調用現有的策略邏輯
             if hasattr(self, 'strategy_enabled') and self.strategy_enabled:
-                self.process_strategy_logic_safe(price, formatted_time)
+                self.process_strategy_logic_safe(price, tick_time)
 
         except Exception as e:
             # 靜默處理錯誤，不影響Queue處理
@@ -12,6 +12,14 @@ from dataclasses import dataclass, field
 from enum import Enum
 import logging
 
+from lifecycle_store import LifecycleStore
+
+# 生命週期設定: 已完成條目保留時間與硬上限
+COMPLETED_GROUP_TTL = 3600     # 已完成策略組/平倉組保留1小時
+MAX_STRATEGY_GROUPS = 2000
+MAX_EXIT_ORDERS = 2000
+MAX_EXIT_LOCKS = 10000
+
 # 🔧 全局追價狀態管理器
 class GlobalRetryManager:
     """全局追價狀態管理器 - 防止重複觸發"""
@@ -180,10 +188,21 @@ class GlobalExitManager:
 
     def __init__(self):
         if not self._initialized:
-            self.exit_locks = {}  # {position_id: {'timestamp': float, 'trigger_source': str, 'exit_type': str}}
+            # {position_id: {'timestamp': float, 'trigger_source': str, 'exit_type': str}}
+            # 寫入即開始計時，逾時鎖定由儲存區O(1)到期移除
+            self.exit_locks = LifecycleStore('global_exit.exit_locks', ttl_seconds=2.0,
+                                             max_entries=MAX_EXIT_LOCKS, expire_on_set=True)
             self.exit_timeout = 2.0  # 🔧 修復：調整為2.0秒，應對平倉查詢延遲，解決"找不到部位資訊"問題
             self._initialized = True
 
+    @property
+    def exit_timeout(self) -> float:
+        return self.exit_locks.ttl_seconds
+
+    @exit_timeout.setter
+    def exit_timeout(self, value: float):
+        self.exit_locks.ttl_seconds = value
+
     def can_exit(self, position_id: str, trigger_source: str = "unknown") -> bool:
         """檢查是否可以平倉"""
         current_time = time.time()
@@ -453,13 +472,17 @@ class SimplifiedOrderTracker:
         self.logger = logging.getLogger(self.__class__.__name__)
 
         # 策略組追蹤 - 使用字典避免線程問題
-        self.strategy_groups: Dict[int, StrategyGroup] = {}
+        # 完成或取消的組以 retire() 排程到期，不再靠定期全表掃描
+        self.strategy_groups: Dict[int, StrategyGroup] = LifecycleStore(
+            'tracker.strategy_groups', ttl_seconds=COMPLETED_GROUP_TTL, max_entries=MAX_STRATEGY_GROUPS)
 
         # 🔧 修復：平倉組追蹤 - 口級別平倉機制
-        self.exit_groups: Dict[int, ExitGroup] = {}  # {position_id: ExitGroup}
+        self.exit_groups: Dict[int, ExitGroup] = LifecycleStore(
+            'tracker.exit_groups', ttl_seconds=COMPLETED_GROUP_TTL, max_entries=MAX_STRATEGY_GROUPS)  # {position_id: ExitGroup}
 
-        # 🔧 新增：平倉訂單追蹤
-        self.exit_orders = {}  # {order_id: exit_order_info}
+        # 🔧 新增：平倉訂單追蹤 (完成即刪除，上限防止未回報訂單累積)
+        self.exit_orders = LifecycleStore('tracker.exit_orders', max_entries=MAX_EXIT_ORDERS,
+                                          on_evict=self._on_exit_order_evicted)  # {order_id: exit_order_info}
         self.exit_position_mapping = {}  # {position_id: order_id}
 
         # 🔧 修復：全局平倉管理器
@@ -868,6 +891,7 @@ class SimplifiedOrderTracker:
                 # 檢查是否完成
                 if group.is_complete():
                     self.completed_groups += 1
+                    self.strategy_groups.retire(group.group_id)
                     if self.console_enabled:
                         print(f"[SIMPLIFIED_TRACKER] 🎉 策略組{group.group_id}建倉完成!")
 
@@ -981,6 +1005,10 @@ class SimplifiedOrderTracker:
                                 reason = "追價開關已關閉"
                             print(f"[SIMPLIFIED_TRACKER] ℹ️ 策略組{group.group_id}第{current_lot_index}口不需要追價: {reason}")
 
+                if group.status == GroupStatus.CANCELLED and not self.strategy_groups.is_retired(group.group_id):
+                    self.failed_groups += 1
+                    self.strategy_groups.retire(group.group_id)
+
                 if self.console_enabled:
                     print(f"[SIMPLIFIED_TRACKER] ✅ 進場取消處理完成")
 
@@ -1251,6 +1279,7 @@ class SimplifiedOrderTracker:
                 # 檢查是否完成
                 if group.is_complete():
                     self.completed_groups += 1
+                    self.strategy_groups.retire(group.group_id)
                     if self.console_enabled:
                         print(f"[SIMPLIFIED_TRACKER] 🎉 策略組{group.group_id}建倉完成!")
 
@@ -1387,29 +1416,37 @@ class SimplifiedOrderTracker:
                     'completed_groups': self.completed_groups,
                     'failed_groups': self.failed_groups,
                     'active_groups': len([g for g in self.strategy_groups.values()
-                                        if not g.is_complete() and g.status != GroupStatus.CANCELLED])
+                                        if not g.is_complete() and g.status != GroupStatus.CANCELLED]),
+                    'lifecycle': {
+                        'strategy_groups': self.strategy_groups.get_stats(),
+                        'exit_groups': self.exit_groups.get_stats(),
+                        'exit_orders': self.exit_orders.get_stats(),
+                    }
                 }
         except Exception as e:
             if self.console_enabled:
                 print(f"[SIMPLIFIED_TRACKER] ❌ 獲取統計信息失敗: {e}")
             return {}
 
-    def cleanup_completed_groups(self, max_age_seconds: int = 3600):
-        """清理已完成的策略組 (避免記憶體洩漏)"""
+    def cleanup_completed_groups(self, max_age_seconds: int = None):
+        """
+        清理已到期的策略組 (避免記憶體洩漏)
+
+        已完成/取消的組在狀態變更時即排程到期，這裡只移除到期佇列前端，
+        不再掃描全部策略組。
+
+        Args:
+            max_age_seconds: 調整已完成組的保留時間 (None 表示沿用目前設定)
+        """
         try:
             with self.data_lock:
-                current_time = time.time()
-                to_remove = []
+                if max_age_seconds is not None:
+                    self.strategy_groups.ttl_seconds = max_age_seconds
+                    self.exit_groups.ttl_seconds = max_age_seconds
 
-                for group_id, group in self.strategy_groups.items():
-                    if (group.is_complete() or group.status == GroupStatus.CANCELLED):
-                        if current_time - group.submit_time > max_age_seconds:
-                            to_remove.append(group_id)
-
-                for group_id in to_remove:
-                    del self.strategy_groups[group_id]
-                    if self.console_enabled:
-                        print(f"[SIMPLIFIED_TRACKER] 🧹 清理已完成策略組: {group_id}")
+                removed = self.strategy_groups.expire() + self.exit_groups.expire()
+                if self.console_enabled and removed > 0:
+                    print(f"[SIMPLIFIED_TRACKER] 🧹 清理已完成策略組: {removed}個")
 
         except Exception as e:
             if self.console_enabled:
@@ -1455,6 +1492,8 @@ class SimplifiedOrderTracker:
 
                     processed = self.exit_tracker.process_exit_fill_report(fill_report)
                     if processed:
+                        # 平倉組已完成，排程到期 (position_id 由追蹤器匹配時回填)
+                        self.exit_groups.retire(fill_report.position_id)
                         if self.console_enabled:
                             print(f"[SIMPLIFIED_TRACKER] ✅ 新追蹤器處理平倉成交完成")
                         return True
@@ -1503,6 +1542,7 @@ class SimplifiedOrderTracker:
 
                 # 清理已完成的平倉訂單
                 self._cleanup_completed_exit_order(exit_order['order_id'])
+                self.exit_groups.retire(position_id)
 
                 # 🔍 DEBUG: 處理完成
                 if self.console_enabled:
@@ -1709,6 +1749,13 @@ class SimplifiedOrderTracker:
             if self.console_enabled:
                 print(f"[SIMPLIFIED_TRACKER] ❌ 觸發平倉追價失敗: {e}")
 
+    def _on_exit_order_evicted(self, order_id, exit_info, reason):
+        """平倉訂單因上限被淘汰時同步清理部位映射"""
+        if exit_info and self.exit_position_mapping.get(exit_info['position_id']) == order_id:
+            del self.exit_position_mapping[exit_info['position_id']]
+        if self.console_enabled:
+            print(f"[SIMPLIFIED_TRACKER] ⚠️ 平倉訂單{order_id}已淘汰 ({reason})")
+
     def _cleanup_completed_exit_order(self, order_id):
         """清理已完成的平倉訂單"""
         try:
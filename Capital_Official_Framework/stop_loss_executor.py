@@ -384,7 +384,7 @@ class StopLossExecutor:
                 # 🚀 優化查詢：直接使用最新的動態停損價格
                 cursor.execute('''
                     SELECT
-                        pr.*,
+                        pr.id, pr.group_id, pr.lot_id, pr.direction, pr.entry_price, pr.status,
                         r.current_stop_loss,
                         r.protection_activated,
                         r.trailing_activated,
@@ -419,13 +419,10 @@ class StopLossExecutor:
             with self.db_manager.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT pr.*, sg.range_high, sg.range_low, sg.direction as group_direction
+                    SELECT pr.id, pr.group_id, pr.lot_id, pr.direction, pr.entry_price, pr.status,
+                           pr.current_stop_loss, sg.range_high, sg.range_low, sg.direction as group_direction
                     FROM position_records pr
-                    JOIN (
-                        SELECT * FROM strategy_groups
-                        WHERE date = ?
-                        ORDER BY id DESC
-                    ) sg ON pr.group_id = sg.group_id
+                    JOIN strategy_groups sg ON sg.date = ? AND sg.group_id = pr.group_id
                     WHERE pr.id = ? AND pr.status = 'ACTIVE'
                 ''', (date.today().isoformat(), position_id))
 
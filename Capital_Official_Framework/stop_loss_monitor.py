@@ -114,16 +114,13 @@ class StopLossMonitor:
             with self.db_manager.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT pr.*, sg.range_high, sg.range_low
+                    SELECT pr.id, pr.group_id, pr.lot_id, pr.direction, pr.current_stop_loss,
+                           sg.range_high, sg.range_low
                     FROM position_records pr
-                    JOIN (
-                        SELECT * FROM strategy_groups
-                        WHERE date = ?
-                        ORDER BY id DESC
-                    ) sg ON pr.group_id = sg.group_id
+                    JOIN strategy_groups sg ON sg.date = ? AND sg.group_id = pr.group_id
                     WHERE pr.status = 'ACTIVE'
-                      AND pr.current_stop_loss IS NOT NULL
                       AND pr.is_initial_stop = TRUE
+                      AND pr.current_stop_loss IS NOT NULL
                     ORDER BY pr.group_id, pr.lot_id
                 ''', (date.today().isoformat(),))
 
@@ -11,22 +11,47 @@ import logging
 from typing import List, Callable, Optional
 from datetime import datetime, timedelta
 
+from lifecycle_store import get_lifecycle_stats, expire_all_stores
+
 logger = logging.getLogger(__name__)
 
 class MaintenanceTask:
     """維護任務"""
     
     def __init__(self, name: str, func: Callable, interval_seconds: int, 
-                 description: str = "", enabled: bool = True):
+                 description: str = "", enabled: bool = True, run_at: Optional[str] = None):
         self.name = name
         self.func = func
         self.interval_seconds = interval_seconds
         self.description = description
         self.enabled = enabled
+        self.run_at = run_at  # "HH:MM": 每日於此時間後執行一次 (例如收盤後封存)，取代固定間隔
         self.last_run_time = 0
         self.run_count = 0
         self.error_count = 0
         self.last_error = None
+    
+    def _today_run_time(self, current_time: float) -> float:
+        """今日排定執行時間 (timestamp)"""
+        hour, minute = map(int, self.run_at.split(':'))
+        now = datetime.fromtimestamp(current_time)
+        return now.replace(hour=hour, minute=minute, second=0, microsecond=0).timestamp()
+    
+    def is_due(self, current_time: float) -> bool:
+        """是否到了執行時間"""
+        if self.run_at is None:
+            return (current_time - self.last_run_time) >= self.interval_seconds
+        scheduled = self._today_run_time(current_time)
+        return current_time >= scheduled and self.last_run_time < scheduled
+    
+    def seconds_until_next_run(self, current_time: float) -> float:
+        """距離下次執行的秒數"""
+        if self.run_at is None:
+            return max(0, self.last_run_time + self.interval_seconds - current_time)
+        scheduled = self._today_run_time(current_time)
+        if self.last_run_time >= scheduled:
+            scheduled = (datetime.fromtimestamp(scheduled) + timedelta(days=1)).timestamp()
+        return max(0, scheduled - current_time)
 
 class SystemMaintenanceManager:
     """
@@ -62,11 +87,17 @@ class SystemMaintenanceManager:
     
     def _register_default_tasks(self):
         """註冊預設維護任務"""
-        # 這些任務會在start()時根據實際組件動態註冊
-        pass
+        # 其餘任務會在start()時根據實際組件動態註冊
+        # 生命週期儲存區在讀寫時即會移除到期條目，這裡處理閒置儲存區
+        self.register_task(
+            name="生命週期到期清理",
+            func=expire_all_stores,
+            interval_seconds=60,
+            description="移除各生命週期儲存區中已到期的條目"
+        )
     
     def register_task(self, name: str, func: Callable, interval_seconds: int, 
-                     description: str = "", enabled: bool = True):
+                     description: str = "", enabled: bool = True, run_at: Optional[str] = None):
         """
         註冊維護任務
         
@@ -76,12 +107,14 @@ class SystemMaintenanceManager:
             interval_seconds: 執行間隔（秒）
             description: 任務描述
             enabled: 是否啟用
+            run_at: 每日執行時間 "HH:MM" (指定時忽略 interval_seconds)
         """
-        task = MaintenanceTask(name, func, interval_seconds, description, enabled)
+        task = MaintenanceTask(name, func, interval_seconds, description, enabled, run_at)
         self.maintenance_tasks.append(task)
         
         if self.console_enabled:
-            print(f"[MAINTENANCE] 📝 註冊維護任務: {name} (間隔:{interval_seconds}秒)")
+            schedule = f"每日{run_at}" if run_at else f"間隔:{interval_seconds}秒"
+            print(f"[MAINTENANCE] 📝 註冊維護任務: {name} ({schedule})")
     
     def start(self):
         """啟動維護管理器"""
@@ -119,7 +152,7 @@ class SystemMaintenanceManager:
                     if not task.enabled:
                         continue
                     
-                    if (current_time - task.last_run_time) >= task.interval_seconds:
+                    if task.is_due(current_time):
                         self._execute_task(task, current_time)
                 
                 # 每分鐘檢查一次
@@ -169,20 +202,22 @@ class SystemMaintenanceManager:
             'total_tasks': len(self.maintenance_tasks),
             'enabled_tasks': len([t for t in self.maintenance_tasks if t.enabled]),
             'stats': self.stats.copy(),
+            'lifecycle_stores': get_lifecycle_stats(),
             'tasks': []
         }
         
         for task in self.maintenance_tasks:
-            next_run = task.last_run_time + task.interval_seconds - current_time
+            next_run = task.seconds_until_next_run(current_time)
             task_info = {
                 'name': task.name,
                 'description': task.description,
                 'enabled': task.enabled,
                 'interval_seconds': task.interval_seconds,
+                'run_at': task.run_at,
                 'run_count': task.run_count,
                 'error_count': task.error_count,
                 'last_error': task.last_error,
-                'next_run_in_seconds': max(0, next_run) if task.enabled else None
+                'next_run_in_seconds': next_run if task.enabled else None
             }
             status['tasks'].append(task_info)
         
@@ -209,6 +244,13 @@ class SystemMaintenanceManager:
             print(f"  {status_icon} {task['name']}: 執行{task['run_count']}次{error_info} - {next_run}")
             if task['description']:
                 print(f"     描述: {task['description']}")
+
+        if status['lifecycle_stores']:
+            print("\n🗃️ 生命週期儲存區:")
+            for name, store in sorted(status['lifecycle_stores'].items()):
+                cap = store['max_entries'] if store['max_entries'] is not None else '-'
+                print(f"  {name}: {store['live']}/{cap} (待到期:{store['retired']}, "
+                      f"峰值:{store['peak']}, 到期:{store['expired']}, 淘汰:{store['evicted']})")
         
         print("="*60)
     
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試串流K棒聚合器
+驗證多週期同時聚合、開盤區間時間窗、完成事件順序，以及重設/重新設定時間窗
+"""
+
+from bar_builder import BarBuilder
+from tick_time import clock_to_seconds
+
+
+def _sod(text):
+    hour, minute, second = map(int, text.split(':'))
+    return clock_to_seconds(hour, minute, second)
+
+
+def test_concurrent_timeframes_emit_completed_bars():
+    """測試1分K/5分K同時聚合，換分時才發出完成事件"""
+    print("🧪 測試多週期K棒")
+    events = []
+    builder = BarBuilder()
+    builder.add_timeframe('1m', 60, events.append)
+    builder.add_timeframe('5m', 300, events.append)
+
+    ticks = [("08:45:00", 100, 1), ("08:45:30", 105, 2), ("08:45:59", 98, 1),
+             ("08:46:10", 101, 3), ("08:49:59", 110, 1), ("08:50:00", 107, 2)]
+    completed = [builder.update(price, _sod(t), qty) for t, price, qty in ticks]
+    assert completed == [0, 0, 0, 1, 1, 2]
+
+    first = events[0]
+    assert (first.name, first.start_text) == ('1m', "08:45:00")
+    assert (first.open, first.high, first.low, first.close, first.volume, first.tick_count) == (100, 105, 98, 98, 4, 3)
+
+    # 同一筆報價完成的K棒依註冊順序通知
+    assert [(b.name, b.start_text) for b in events[2:]] == [('1m', "08:49:00"), ('5m', "08:45:00")]
+    five = events[-1]
+    assert (five.open, five.high, five.low, five.close, five.volume) == (100, 110, 98, 110, 8)
+
+    assert builder.current('1m').start_text == "08:50:00" and builder.last('5m') is five
+    assert builder.get_stats() == {'1m': 3, '5m': 1}
+
+    # 收盤時完成進行中的K棒
+    assert builder.flush() == 2 and builder.current('1m') is None
+    print("✅ 多週期K棒正常")
+
+
+def test_range_window_emits_once():
+    """測試開盤區間時間窗: 結束後第一筆報價完成，只發出一次"""
+    print("🧪 測試開盤區間時間窗")
+    ranges = []
+    builder = BarBuilder()
+    builder.add_window('range', _sod("08:46:00"), 120, ranges.append)
+
+    for t, price in [("08:45:59", 90), ("08:46:00", 100), ("08:47:30", 108),
+                     ("08:47:59", 95), ("08:48:00", 120), ("08:48:01", 80)]:
+        builder.update(price, _sod(t))
+
+    assert len(ranges) == 1
+    assert (ranges[0].high, ranges[0].low, ranges[0].tick_count) == (108, 95, 3)
+
+    # 重新設定時間窗: 保留訂閱者，重新收集
+    builder.add_window('range', _sod("09:00:00"), 120)
+    builder.update(200, _sod("09:00:30"))
+    assert builder.advance(_sod("09:02:00")) == 1
+    assert len(ranges) == 2 and ranges[1].high == ranges[1].low == 200
+
+    # 重設後同一時間窗可再產生一次
+    builder.reset()
+    builder.update(300, _sod("09:01:00"))
+    builder.update(301, _sod("09:02:00"))
+    assert len(ranges) == 3 and ranges[2].close == 300
+    print("✅ 開盤區間時間窗正常")
+
+
+def test_callback_errors_and_day_rollover():
+    """測試事件處理錯誤不影響聚合，跨日時間倒退開新K棒"""
+    print("🧪 測試錯誤隔離與跨日")
+    seen = []
+
+    def broken(bar):
+        raise RuntimeError("boom")
+
+    builder = BarBuilder()
+    builder.add_timeframe('1m', 60, broken)
+    builder.subscribe('1m', seen.append)
+
+    builder.update(100, _sod("23:59:30"))
+    builder.update(101, _sod("00:00:05"))
+    assert len(seen) == 1 and seen[0].start_text == "23:59:00"
+    assert builder.current('1m').start_text == "00:00:00"
+    print("✅ 錯誤隔離與跨日正常")
+
+
+if __name__ == "__main__":
+    test_concurrent_timeframes_emit_completed_bars()
+    test_range_window_emits_once()
+    test_callback_errors_and_day_rollover()
+    print("\n🎯 串流K棒測試完成")
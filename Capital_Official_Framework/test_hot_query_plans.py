@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試即時風控查詢的執行計畫
+實際呼叫各模組的查詢方法並攔截送出的 SQL，逐一 EXPLAIN QUERY PLAN，
+任何查詢退化成全表掃描 (SCAN) 即失敗
+"""
+
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from datetime import date
+
+from multi_group_database import HOT_QUERY_INDEXES, MultiGroupDatabaseManager
+from exit_mechanism_database_extension import ExitMechanismDatabaseExtension
+from stop_loss_monitor import StopLossMonitor
+from peak_price_tracker import PeakPriceTracker
+from drawdown_monitor import DrawdownMonitor
+from cumulative_profit_protection_manager import CumulativeProfitProtectionManager
+from stop_loss_executor import StopLossExecutor
+
+
+def _build_database(tmp):
+    """建立含平倉機制擴展的資料庫，今日一組三口 (第1口移動停利中)"""
+    db = MultiGroupDatabaseManager(os.path.join(tmp, "strategy.db"))
+    ExitMechanismDatabaseExtension(db).extend_database_schema()
+
+    group_db_id = db.create_strategy_group(date.today().isoformat(), 1, 'LONG', '08:48:00', 22100.0, 22000.0, 3)
+    position_ids = []
+    for lot_id in (1, 2, 3):
+        position_id = db.create_position_record(group_db_id, lot_id, 'LONG', 22105.0, '08:48:05',
+                                                rule_config='{"lot_id": %d}' % lot_id, order_status='FILLED')
+        db.create_risk_management_state(position_id, 22105.0, '08:48:05')
+        position_ids.append(position_id)
+
+    with db.get_connection() as conn:
+        conn.execute("UPDATE position_records SET current_stop_loss = 22000.0")
+        conn.execute("UPDATE position_records SET is_initial_stop = FALSE, trailing_activated = TRUE, "
+                     "peak_price = 22150.0 WHERE id = ?", (position_ids[0],))
+        conn.commit()
+    return db, group_db_id, position_ids
+
+
+def _trace_queries(db, run):
+    """執行 run() 並收集其送出的 SELECT 語句 (參數已代入)"""
+    statements = []
+    original = db.get_connection
+
+    @contextmanager
+    def traced_connection():
+        with original() as conn:
+            conn.set_trace_callback(statements.append)
+            yield conn
+
+    db.get_connection = traced_connection
+    try:
+        result = run()
+    finally:
+        db.get_connection = original
+    return result, [s for s in statements if s.lstrip().upper().startswith('SELECT')]
+
+
+def _query_plan(db_path, sql):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+    finally:
+        conn.close()
+
+
+def _assert_no_scan(db_path, name, statements):
+    assert statements, f"{name} 沒有送出查詢"
+    for sql in statements:
+        plan = _query_plan(db_path, sql)
+        scans = [step for step in plan if step.startswith('SCAN') and 'CONSTANT ROW' not in step]
+        assert not scans, f"{name} 出現全表掃描: {scans}\n{sql}"
+    return plan
+
+
+def test_schema_creates_hot_query_indexes():
+    """測試 init_database 即建立風控欄位與覆蓋索引 (不需執行一次性索引腳本)"""
+    print("🧪 測試索引建立")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = MultiGroupDatabaseManager(os.path.join(tmp, "strategy.db"))
+        with db.get_connection() as conn:
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(position_records)")}
+        assert {name for name, _, _ in HOT_QUERY_INDEXES} <= indexes
+        assert {'current_stop_loss', 'is_initial_stop', 'trailing_activated', 'peak_price',
+                'trailing_pullback_ratio', 'lot_rule_id'} <= columns
+
+        # 重複初始化不報錯
+        MultiGroupDatabaseManager(db.db_path)
+    print("✅ 索引建立正常")
+
+
+def test_hot_queries_use_indexes():
+    """測試各即時風控查詢都走索引，監控類查詢使用覆蓋索引"""
+    print("🧪 測試查詢計畫")
+    with tempfile.TemporaryDirectory() as tmp:
+        db, group_db_id, position_ids = _build_database(tmp)
+        stop_monitor = StopLossMonitor(db, console_enabled=False)
+        peak_tracker = PeakPriceTracker(db, console_enabled=False)
+        drawdown = DrawdownMonitor(db, console_enabled=False)
+        protection = CumulativeProfitProtectionManager(db, console_enabled=False)
+        executor = StopLossExecutor(db, console_enabled=False)
+
+        cases = [
+            ("get_all_active_positions", db.get_all_active_positions, 3, None),
+            ("get_active_positions_by_group", lambda: db.get_active_positions_by_group(group_db_id), 3, None),
+            ("StopLossMonitor", stop_monitor._get_active_stop_loss_positions, 2, 'idx_position_records_active_stop'),
+            ("PeakPriceTracker", peak_tracker._get_trailing_positions, 1, 'idx_position_records_active_trailing'),
+            ("PeakPriceTracker.get_current_peaks", peak_tracker.get_current_peaks, 1,
+             'idx_position_records_active_trailing'),
+            ("DrawdownMonitor", drawdown._get_trailing_positions, 1, 'idx_position_records_active_trailing'),
+            ("CumulativeProfitProtection", lambda: protection._get_remaining_positions(group_db_id, position_ids[0]),
+             None, 'idx_position_records_group_protection'),
+            ("StopLossExecutor", lambda: executor._get_position_info(position_ids[1]), None, None),
+            ("StopLossExecutor.fallback", lambda: executor._get_position_info_fallback(position_ids[1]), None, None),
+        ]
+        for name, run, expected_rows, covering_index in cases:
+            result, statements = _trace_queries(db, run)
+            plan = _assert_no_scan(db.db_path, name, statements)
+            if expected_rows is not None:
+                assert len(result) == expected_rows, f"{name} 回傳 {len(result)} 筆"
+            if covering_index:
+                assert any(f"COVERING INDEX {covering_index}" in step for step in plan), f"{name}: {plan}"
+    print("✅ 查詢計畫正常")
+
+
+def test_narrowed_results_keep_consumer_fields():
+    """測試縮減欄位後，各模組讀取的欄位仍存在且值正確"""
+    print("🧪 測試回傳欄位")
+    with tempfile.TemporaryDirectory() as tmp:
+        db, group_db_id, position_ids = _build_database(tmp)
+
+        positions = db.get_all_active_positions()
+        first = positions[0]
+        assert (first['id'], first['order_status'], first['entry_price']) == (position_ids[0], 'FILLED', 22105.0)
+        assert first['rule_config'] == '{"lot_id": 1}' and first['range_low'] == 22000.0
+        # 部位表欄位優先於風險狀態表同名欄位
+        assert first['peak_price'] == 22150.0 and first['trailing_activated'] == 1
+
+        peaks = PeakPriceTracker(db, console_enabled=False)._get_trailing_positions()
+        assert [(p['id'], p['direction'], p['peak_price'], p['group_id']) for p in peaks] == \
+            [(position_ids[0], 'LONG', 22150.0, group_db_id)]
+
+        remaining = CumulativeProfitProtectionManager(db, console_enabled=False)._get_remaining_positions(
+            group_db_id, position_ids[0])
+        assert [p['lot_id'] for p in remaining] == [2, 3]
+        assert {'id', 'direction', 'entry_price', 'current_stop_loss', 'protective_stop_multiplier'} <= set(remaining[0])
+
+        info = StopLossExecutor(db, console_enabled=False)._get_position_info(position_ids[1])
+        assert (info['id'], info['direction'], info['status'], info['group_id']) == (position_ids[1], 'LONG', 'ACTIVE', group_db_id)
+    print("✅ 回傳欄位正常")
+
+
+if __name__ == "__main__":
+    test_schema_creates_hot_query_indexes()
+    test_hot_queries_use_indexes()
+    test_narrowed_results_keep_consumer_fields()
+    print("\n🎯 即時風控查詢計畫測試完成")
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試生命週期儲存區
+驗證TTL到期、硬上限淘汰，以及追蹤器/緩存的整合
+"""
+
+from lifecycle_store import LifecycleStore, get_lifecycle_stats, expire_all_stores
+from fifo_order_matcher import FIFOOrderMatcher, OrderInfo
+from simplified_order_tracker import SimplifiedOrderTracker, GlobalExitManager
+from exit_order_tracker import ExitOrderTracker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_retire_then_expire():
+    """測試完成條目於TTL後移除，活躍條目保留"""
+    print("🧪 測試retire後到期")
+    clock = FakeClock()
+    store = LifecycleStore('test.retire', ttl_seconds=10, clock=clock)
+    store[1] = 'active'
+    store[2] = 'done'
+    assert store.retire(2)
+    assert not store.retire(99)
+
+    clock.now += 9
+    assert 2 in store
+    clock.now += 1
+    assert 2 not in store
+    assert store[1] == 'active'
+
+    stats = store.get_stats()
+    assert stats['live'] == 1 and stats['expired'] == 1 and stats['retired'] == 0
+    print("✅ retire後到期正常")
+
+
+def test_expire_on_set_refreshes_deadline():
+    """測試寫入即計時且重寫會延長期限"""
+    print("🧪 測試寫入計時")
+    clock = FakeClock()
+    store = LifecycleStore('test.refresh', ttl_seconds=5, expire_on_set=True, clock=clock)
+    store['a'] = 1
+    store['b'] = 1
+    clock.now += 4
+    store['a'] = 2   # 延長a的期限
+    clock.now += 2
+
+    assert store.expire() == 1
+    assert list(store) == ['a']
+    assert store.get('b') is None
+    print("✅ 寫入計時正常")
+
+
+def test_items_snapshot_survives_expiry():
+    """測試 items()/values() 為快照，條目在迭代途中到期不會引發 KeyError"""
+    print("🧪 測試items快照")
+    clock = FakeClock()
+    store = LifecycleStore('test.snapshot', ttl_seconds=5, expire_on_set=True, clock=clock)
+    for key in ('a', 'b', 'c'):
+        store[key] = key.upper()
+        clock.now += 1
+
+    clock.now += 2   # a 剛好到期
+    items = []
+    for key, value in store.items():
+        clock.now += 1   # 迭代途中 b、c 陸續到期
+        items.append((key, value))
+    assert items == [('b', 'B'), ('c', 'C')]
+
+    clock.now = 1000.0 + 6.5   # 只剩 c
+    assert store.values() == ['C']
+    clock.now += 1
+    assert store.items() == [] and store.values() == []
+    print("✅ items快照正常")
+
+
+def test_capacity_evicts_retired_before_active():
+    """測試超過上限時優先淘汰待到期條目"""
+    print("🧪 測試硬上限")
+    evicted = []
+    store = LifecycleStore('test.cap', ttl_seconds=3600, max_entries=3,
+                           on_evict=lambda k, v, reason: evicted.append((k, reason)))
+    for key in range(3):
+        store[key] = key
+    store.retire(1)
+    store[3] = 3
+    assert evicted == [(1, 'capacity')]
+    assert sorted(store) == [0, 2, 3]
+
+    store[4] = 4     # 無待到期條目 → 淘汰最舊活躍條目
+    assert evicted[-1] == (0, 'capacity')
+    stats = store.get_stats()
+    assert stats['live'] == 3 and stats['evicted'] == 2 and stats['evicted_active'] == 1
+    print("✅ 硬上限正常")
+
+
+def test_registry_exports_live_counts():
+    """測試全域統計匯出"""
+    print("🧪 測試全域統計")
+    clock = FakeClock()
+    store = LifecycleStore('test.registry', ttl_seconds=1, expire_on_set=True, clock=clock)
+    store['x'] = 1
+    assert get_lifecycle_stats()[store.name]['live'] == 1
+    clock.now += 2
+    assert expire_all_stores() >= 1
+    assert get_lifecycle_stats()[store.name]['live'] == 0
+    print("✅ 全域統計正常")
+
+
+def test_tracker_retires_completed_group():
+    """測試策略組建倉完成後排程到期"""
+    print("🧪 測試策略組生命週期")
+    tracker = SimplifiedOrderTracker(console_enabled=False)
+    tracker.register_strategy_group(1, 2, "LONG", 22500.0, "TM0000")
+    tracker.register_strategy_group(2, 1, "LONG", 22600.0, "TM0000")
+
+    assert tracker._handle_fill_report(22500.0, 2, "B", "TM0000")
+    assert tracker.strategy_groups.is_retired(1)
+    assert not tracker.strategy_groups.is_retired(2)
+
+    tracker.cleanup_completed_groups(0)
+    assert list(tracker.strategy_groups) == [2]
+    assert tracker.get_statistics()['lifecycle']['strategy_groups']['live'] == 1
+    print("✅ 策略組生命週期正常")
+
+
+def test_tracker_retires_exit_group_via_exit_tracker():
+    """測試平倉成交經由平倉追蹤器處理時，平倉組同樣排程到期"""
+    print("🧪 測試平倉組生命週期")
+    tracker = SimplifiedOrderTracker(console_enabled=False)
+    tracker.set_exit_tracker(ExitOrderTracker(None, console_enabled=False))
+    tracker.register_exit_group(7, 1, "LONG", "SHORT", 22480.0, "TM0000")
+    tracker.register_exit_group(8, 1, "LONG", "SHORT", 22400.0, "TM0000")
+    assert tracker.exit_tracker.register_exit_order(7, "ORD7", "SELL", 1, 22480.0, "TM0000")
+
+    assert tracker._handle_exit_fill_report(22480.0, 1, "TM0000")
+    assert tracker.exit_tracker.stats['confirmed_exits'] == 1
+    assert tracker.exit_groups.is_retired(7)
+    assert not tracker.exit_groups.is_retired(8)
+
+    tracker.cleanup_completed_groups(0)
+    assert list(tracker.exit_groups) == [8]
+    print("✅ 平倉組生命週期正常")
+
+
+def test_global_exit_lock_expires():
+    """測試平倉鎖逾時後可再次平倉"""
+    print("🧪 測試平倉鎖到期")
+    manager = GlobalExitManager()
+    original_clock = manager.exit_locks.clock
+    clock = FakeClock()
+    manager.exit_locks.clock = clock
+    try:
+        assert manager.mark_exit("lifecycle_test", "test")
+        assert not manager.can_exit("lifecycle_test")
+        clock.now += manager.exit_timeout
+        assert "lifecycle_test" not in manager.exit_locks
+    finally:
+        manager.exit_locks.clock = original_clock
+        manager.clear_exit("lifecycle_test")
+    print("✅ 平倉鎖到期正常")
+
+
+def test_fifo_matcher_trims_front():
+    """測試FIFO隊列到期與上限只處理前端"""
+    print("🧪 測試FIFO隊列")
+    matcher = FIFOOrderMatcher(console_enabled=False)
+    matcher.max_pending_orders = 3
+    for i in range(5):
+        matcher.add_pending_order(OrderInfo(f"o{i}", "TM0000", "LONG", 1, 22500.0, 100.0 + i))
+    assert [o.order_id for o in matcher.pending_orders] == ["o2", "o3", "o4"]
+
+    matcher._cleanup_expired_orders(100.0 + 3 + matcher.time_window + 0.5)
+    assert [o.order_id for o in matcher.pending_orders] == ["o4"]
+    stats = matcher.get_statistics()
+    assert stats['total_evicted'] == 2 and stats['total_expired'] == 2
+    print("✅ FIFO隊列正常")
+
+
+if __name__ == "__main__":
+    test_retire_then_expire()
+    test_expire_on_set_refreshes_deadline()
+    test_items_snapshot_survives_expiry()
+    test_capacity_evicts_retired_before_active()
+    test_registry_exports_live_counts()
+    test_tracker_retires_completed_group()
+    test_tracker_retires_exit_group_via_exit_tracker()
+    test_global_exit_lock_expires()
+    test_fifo_matcher_trims_front()
+    print("\n🎯 生命週期儲存區測試完成")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試多商品報價路由
+驗證 (market_no, stock_idx) 對應、批次訂閱，以及風控只處理所屬商品的部位簿
+"""
+
+import os
+import time
+import tempfile
+from datetime import date
+
+from product_router import ProductRouter
+from multi_group_database import MultiGroupDatabaseManager
+from optimized_risk_manager import OptimizedRiskManager
+
+
+class FakeQuoteLib:
+    def __init__(self, fail_batch=False):
+        self.fail_batch = fail_batch
+        self.calls = []
+
+    def SKQuoteLib_RequestTicks(self, page, stock_nos):
+        self.calls.append((page, stock_nos))
+        if self.fail_batch and ',' in stock_nos:
+            return (-1, 0)
+        return (0, page)
+
+
+def _position(position_id, product, direction='LONG'):
+    return {
+        'id': position_id, 'group_id': 1, 'direction': direction, 'entry_price': 22500.0,
+        'range_high': 22550.0, 'range_low': 22450.0, 'product': product,
+    }
+
+
+def test_resolve_and_learn_index():
+    """測試索引綁定與查詢"""
+    print("🧪 測試索引綁定")
+    names = {(2, 7): 'MTX07', (2, 9): 'TXF07'}
+    router = ProductRouter('MTX00', lookup=lambda m, i: names.get((m, i)), console_enabled=False)
+    router.register_product('TXF00')
+
+    assert router.on_tick(2, 7, 22500.0) == 'MTX00'   # 近月代碼歸到訂閱代碼
+    assert router.on_tick(2, 9, 22510.0) == 'TXF00'
+    assert router.resolve(2, 8) is None
+    assert router.index_map[(2, 7)] == 'MTX00'
+    assert router.get_last_price('TXF00') == 22510.0
+    assert router.is_primary('MTX00') and not router.is_primary('TXF00')
+    assert router.get_statistics()['tick_counts'] == {'MTX00': 1, 'TXF00': 1}
+    print("✅ 索引綁定正常")
+
+
+def test_unresolved_ticks_in_multi_product_mode():
+    """測試多商品模式無法辨識的報價不驅動主要商品，且失敗的查詢只做一次"""
+    print("🧪 測試無法辨識的報價")
+    lookups = []
+
+    def lookup(market_no, stock_idx):
+        lookups.append((market_no, stock_idx))
+        return None
+
+    router = ProductRouter('MTX00', lookup=lookup, console_enabled=False)
+    assert router.is_primary(None)   # 單商品模式維持原有行為
+    router.register_product('TXF00')
+
+    for _ in range(3):
+        product = router.on_tick(2, 8, 22500.0)
+        assert product is None and not router.is_primary(product)
+    assert lookups == [(2, 8)]
+    assert router.unresolved_ticks == 3
+    assert router.get_statistics()['failed_indexes'] == ['2:8']
+    assert router.get_statistics()['tick_counts'] == {'MTX00': 0, 'TXF00': 0}
+
+    # 註冊新商品後重新查詢
+    router.register_product('TM0000')
+    router.resolve(2, 8)
+    assert lookups == [(2, 8), (2, 8)]
+    print("✅ 無法辨識的報價已丟棄")
+
+
+def test_single_product_without_lookup():
+    """測試單商品模式不需要查詢API"""
+    print("🧪 測試單商品模式")
+    router = ProductRouter('MTX00', console_enabled=False)
+    assert router.on_tick(2, 123, 22500.0) == 'MTX00'
+    print("✅ 單商品模式正常")
+
+
+def test_batched_subscribe_with_fallback():
+    """測試批次訂閱與逐一退回"""
+    print("🧪 測試批次訂閱")
+    router = ProductRouter('MTX00', console_enabled=False)
+    quote = FakeQuoteLib()
+    assert router.subscribe(quote, ['MTX00', 'TXF00']) == {'MTX00': 0, 'TXF00': 0}
+    assert quote.calls == [(0, 'MTX00,TXF00')]
+
+    quote = FakeQuoteLib(fail_batch=True)
+    results = router.subscribe(quote, ['MTX00', 'TXF00'])
+    assert results == {'MTX00': 0, 'TXF00': 0}
+    assert quote.calls[1:] == [(0, 'MTX00'), (1, 'TXF00')]
+    print("✅ 批次訂閱正常")
+
+
+def test_risk_manager_routes_by_product():
+    """測試報價只驅動所屬商品的部位"""
+    print("🧪 測試商品部位簿")
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        manager = OptimizedRiskManager(MultiGroupDatabaseManager(db_path), console_enabled=False,
+                                       default_product='MTX00')
+        manager.on_new_position(_position(1, 'MTX00'))
+        manager.on_new_position(_position(2, 'TXF00'))
+        manager.on_new_position(_position(3, None))   # 舊資料 → 預設商品
+
+        assert manager.get_stats()['product_books'] == {'MTX00': 2, 'TXF00': 1}
+        manager.last_backup_update = time.time()   # 空資料庫，略過備份同步
+
+        # TXF 報價達到啟動價，只有部位2啟動移動停利
+        results = manager.update_price(22520.0, "09:00:00", product='TXF00')
+        assert results['trailing_activations'] == 1
+        assert manager.trailing_cache[2]['activated']
+        assert not manager.trailing_cache[1]['activated']
+        assert not manager.trailing_cache[3]['activated']
+
+        # 未指定商品時維持單商品行為: 全部部位
+        results = manager.update_price(22520.0, "09:00:01")
+        assert results['trailing_activations'] == 2
+
+        manager.on_position_closed(2)
+        assert manager.get_stats()['product_books']['TXF00'] == 0
+        print("✅ 商品部位簿正常")
+    finally:
+        os.remove(db_path)
+
+
+class RecordingStopExecutor:
+    def __init__(self):
+        self.triggers = []
+
+    def execute_stop_loss(self, trigger_info):
+        self.triggers.append(trigger_info)
+        return type('Result', (), {'success': True, 'order_id': 'T1', 'error_message': None})()
+
+
+def test_stop_loss_routes_by_group_product():
+    """測試部位商品取自策略組: TXF 報價只觸發 TXF 停損，不影響 MTX 部位"""
+    print("🧪 測試雙商品停損分流")
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        db = MultiGroupDatabaseManager(db_path)
+        today = date.today().isoformat()
+        position_ids = {}
+        for group_id, (product, range_low) in enumerate((('MTX00', 22450.0), ('TXF00', 22480.0)), 1):
+            group_db_id = db.create_strategy_group(today, group_id, 'LONG', '08:47:00',
+                                                   22550.0, range_low, 1, product=product)
+            position_id = db.create_position_record(group_db_id, 1, 'LONG', entry_price=22500.0,
+                                                    entry_time='08:48:00')
+            db.confirm_position_filled(position_id, 22500.0, '08:48:00')
+            position_ids[product] = position_id
+        assert {p['product'] for p in db.get_all_active_positions()} == {'MTX00', 'TXF00'}
+
+        manager = OptimizedRiskManager(db, console_enabled=False, default_product='MTX00')
+        executor = RecordingStopExecutor()
+        manager.set_stop_loss_executor(executor)
+        assert manager.get_stats()['product_books'] == {'MTX00': 1, 'TXF00': 1}
+        manager.last_backup_update = time.time()
+        for position_id in position_ids.values():
+            manager.global_exit_manager.clear_exit(str(position_id))
+
+        # 22440 同時低於兩組停損，但 TXF 報價只檢查 TXF 部位
+        results = manager.update_price(22440.0, "09:00:00", product='TXF00')
+        assert results['stop_loss_triggers'] == 1
+        assert [t.position_id for t in executor.triggers] == [position_ids['TXF00']]
+
+        # 重新緩存時換了商品: 部位不會同時留在兩個部位簿
+        manager.on_new_position(dict(manager.position_cache[position_ids['MTX00']], product='TXF00'))
+        assert manager.get_stats()['product_books'] == {'MTX00': 0, 'TXF00': 2}
+        print("✅ 雙商品停損分流正常")
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    test_resolve_and_learn_index()
+    test_unresolved_ticks_in_multi_product_mode()
+    test_single_product_without_lookup()
+    test_batched_subscribe_with_fallback()
+    test_risk_manager_routes_by_product()
+    test_stop_loss_routes_by_group_product()
+    print("\n🎯 多商品路由測試完成")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試即時報價管理器的固定槽位 + seqlock 讀寫
+驗證讀取端不需鎖、延伸檔、monotonic新鮮度
+"""
+
+import time
+import threading
+
+from real_time_quote_manager import RealTimeQuoteManager, TOTAL_LEVELS
+
+
+def _push(manager, base, product_code="MTX00", stock_idx=1):
+    """送一筆五檔 (賣價=base+i, 買價=base-1-i)"""
+    return manager.update_best5_data(
+        market_no="TF", stock_idx=stock_idx,
+        ask1=base, ask1_qty=10, ask2=base + 1, ask2_qty=8, ask3=base + 2, ask3_qty=5,
+        ask4=base + 3, ask4_qty=3, ask5=base + 4, ask5_qty=2,
+        bid1=base - 1, bid1_qty=12, bid2=base - 2, bid2_qty=9, bid3=base - 3, bid3_qty=6,
+        bid4=base - 4, bid4_qty=4, bid5=base - 5, bid5_qty=1,
+        product_code=product_code,
+        ext_ask=base + 5, ext_ask_qty=1, ext_bid=base - 6, ext_bid_qty=1
+    )
+
+
+def test_register_and_read():
+    """測試訂閱時註冊槽位與基本讀取"""
+    print("🧪 測試槽位註冊與讀取")
+    manager = RealTimeQuoteManager(console_enabled=False)
+
+    slot = manager.register_product("MTX00")
+    assert slot.index == 0
+    assert manager.get_best_ask_price("MTX00") is None
+    assert not manager.is_quote_fresh("MTX00")
+
+    assert _push(manager, 22500)
+    assert manager.get_best_ask_price("MTX00") == 22500.0
+    assert manager.get_best_bid_price("MTX00") == 22499.0
+    assert manager.index_map[("TF", 1)] is slot
+
+    # 延伸檔
+    depth = manager.get_ask_depth("MTX00", TOTAL_LEVELS)
+    assert len(depth) == TOTAL_LEVELS
+    assert depth[-1] == (22505.0, 1)
+    print("✅ 槽位註冊與讀取正常")
+
+
+def test_index_map_without_product_code():
+    """測試未帶商品代碼時走預先建立的索引"""
+    print("🧪 測試 (market_no, stock_idx) 索引")
+    manager = RealTimeQuoteManager(console_enabled=False)
+    manager.register_product("TM0000", market_no="TF", stock_idx=7)
+
+    assert _push(manager, 22600, product_code=None, stock_idx=7)
+    assert manager.get_best_ask_price("TM0000") == 22600.0
+    assert manager.get_best_ask_price("MTX00") is None
+    print("✅ 索引查詢正常")
+
+
+def test_monotonic_freshness():
+    """測試monotonic新鮮度判斷"""
+    print("🧪 測試報價新鮮度")
+    manager = RealTimeQuoteManager(console_enabled=False)
+    _push(manager, 22500)
+
+    assert manager.is_quote_fresh("MTX00")
+    manager.quote_data["MTX00"].updated_at = time.monotonic() - 60
+    assert not manager.is_quote_fresh("MTX00")
+    assert manager.get_best_ask_price("MTX00") is None
+    assert manager.get_statistics()['stale_reads'] == 1
+
+    summary = manager.get_quote_summary("MTX00")
+    assert summary['is_fresh'] is False
+    assert summary['age_seconds'] >= 60
+    print("✅ 新鮮度判斷正常")
+
+
+def test_concurrent_reader_sees_consistent_book():
+    """測試寫入時讀取端取得一致快照 (賣1 - 買1 永遠等於1)"""
+    print("🧪 測試並發讀寫一致性")
+    manager = RealTimeQuoteManager(console_enabled=False)
+    _push(manager, 20000)
+    slot = manager.quote_data["MTX00"]
+    stop = threading.Event()
+
+    def writer():
+        base = 20000
+        while not stop.is_set():
+            base += 1
+            _push(manager, base)
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    try:
+        for _ in range(20000):
+            snap = manager._snapshot(slot)
+            if snap is None:
+                continue
+            ask_prices, _, bid_prices = snap[0], snap[1], snap[2]
+            assert ask_prices[0] - bid_prices[0] == 1
+            assert ask_prices[5] - ask_prices[0] == 5
+    finally:
+        stop.set()
+        thread.join()
+    print("✅ 並發讀寫一致")
+
+
+if __name__ == "__main__":
+    test_register_and_read()
+    test_index_map_without_product_code()
+    test_monotonic_freshness()
+    test_concurrent_reader_sees_consistent_book()
+    print("\n🎯 報價槽位測試完成")
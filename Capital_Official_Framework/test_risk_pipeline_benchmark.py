@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試風控管線基準測試工具
+小規模執行各測試項目並驗證基準比較邏輯
+"""
+
+import copy
+import logging
+
+from risk_pipeline_benchmark import SCENARIOS, run_suite, compare_with_baseline, generate_ticks
+
+
+def test_ticks_are_reproducible():
+    """測試相同種子產生相同價格序列"""
+    print("🧪 測試價格序列可重現")
+    assert generate_ticks(200, 7) == generate_ticks(200, 7)
+    assert generate_ticks(200, 7) != generate_ticks(200, 8)
+    print("✅ 價格序列可重現")
+
+
+def test_small_suite_runs_all_scenarios():
+    """測試小規模執行全部測試項目"""
+    print("🧪 測試小規模基準")
+    logging.getLogger('async_db_updater').setLevel(logging.CRITICAL)
+    report = run_suite(SCENARIOS, [1, 3], ticks=50, seed=1)
+
+    assert len(report['results']) == len(SCENARIOS) * 2
+    for result in report['results']:
+        assert result['ticks_per_sec'] > 0
+        assert result['p50_us'] <= result['p99_us'] <= result['max_us']
+        assert result['async_failed_tasks'] == 0
+
+    optimized = [r for r in report['results'] if r['scenario'] == 'optimized_risk']
+    assert all(r['db_writes'] == 0 for r in optimized)
+    print("✅ 小規模基準正常")
+
+
+def test_compare_detects_regression():
+    """測試吞吐量、p99與寫入放大退化判斷"""
+    print("🧪 測試基準比較")
+    baseline = {'results': [{
+        'scenario': 'risk_engine', 'positions': 30, 'rate': 0.0,
+        'ticks_per_sec': 1000.0, 'p99_us': 500, 'db_writes_per_tick': 2.0,
+        'async_failed_tasks': 0,
+    }]}
+    report = copy.deepcopy(baseline)
+    assert compare_with_baseline(report, baseline) == []
+
+    report['results'][0]['ticks_per_sec'] = 800.0   # 在容許範圍內
+    assert compare_with_baseline(report, baseline) == []
+
+    report['results'][0]['ticks_per_sec'] = 500.0
+    report['results'][0]['db_writes_per_tick'] = 2.5
+    regressions = compare_with_baseline(report, baseline)
+    assert len(regressions) == 2
+    print("✅ 基準比較正常")
+
+
+if __name__ == "__main__":
+    test_ticks_are_reproducible()
+    test_small_suite_runs_all_scenarios()
+    test_compare_detects_regression()
+    print("\n🎯 基準測試工具測試完成")
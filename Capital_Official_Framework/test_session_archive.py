@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試交易場次冷熱分離封存
+驗證已結束場次搬到封存庫、留倉場次保留、跨日查詢經封存視圖，以及收盤後每日排程
+"""
+
+import os
+import sqlite3
+import tempfile
+from datetime import date, datetime
+
+from multi_group_database import MultiGroupDatabaseManager
+from session_archive import SessionArchiver, attach_history
+from system_maintenance_manager import MaintenanceTask
+
+
+def _create_session(db, day, group_no, exits):
+    """建立一個場次: 每個 exits 元素為一口的出場損益，None 表示仍持倉"""
+    group_db_id = db.create_strategy_group(day, group_no, 'LONG', '08:48:00', 22100.0, 22000.0, len(exits))
+    position_ids = []
+    for lot_id, pnl in enumerate(exits, start=1):
+        position_id = db.create_position_record(group_db_id, lot_id, 'LONG', 22105.0, '08:48:05',
+                                                order_status='FILLED')
+        db.create_risk_management_state(position_id, 22105.0, '08:48:05')
+        if pnl is not None:
+            db.update_position_exit(position_id, 22105.0 + pnl, '10:00:00', '移動停利', pnl)
+        position_ids.append(position_id)
+    return group_db_id, position_ids
+
+
+def _count(path, table, where="1"):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_closed_sessions_move_to_archive():
+    """測試已結束場次封存、留倉場次保留、歷史統計不變"""
+    print("🧪 測試場次封存")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = MultiGroupDatabaseManager(os.path.join(tmp, "strategy.db"))
+        today = date.today().isoformat()
+        _create_session(db, "2025-07-01", 1, [30.0, -15.0])
+        held_group, held_positions = _create_session(db, "2025-07-02", 1, [None])
+        _create_session(db, today, 1, [None])
+
+        before = db.get_daily_strategy_summary("2025-07-01")
+        assert before['total_positions'] == 2 and before['total_pnl'] == 15.0
+
+        archiver = SessionArchiver(db.db_path, console_enabled=False)
+        assert archiver.archive_path == db.archive_path == os.path.join(tmp, "strategy_archive.db")
+        result = archiver.archive_closed_sessions()
+        assert result['dates'] == ["2025-07-01"] and result['held'] == ["2025-07-02"]
+        assert result['moved']['strategy_groups'] == 1 and result['moved']['position_records'] == 2
+        assert result['moved']['risk_management_states'] == 2
+
+        # 熱資料庫只剩留倉場次與今日場次；封存庫保留原主鍵
+        assert _count(db.db_path, "strategy_groups") == 2
+        assert _count(db.db_path, "position_records") == 2
+        assert _count(db.db_path, "risk_management_states") == 2
+        assert _count(db.archive_path, "position_records", "group_id = 1") == 2
+
+        # 過去日期查詢經封存視圖，結果與封存前相同；今日查詢只看熱資料庫
+        after = db.get_daily_strategy_summary("2025-07-01")
+        assert after == before
+        assert db.get_position_statistics("2025-07-01")['exited_positions'] == 2
+        assert db.get_daily_strategy_summary(today)['total_positions'] == 1
+
+        # 重複執行不會再搬；留倉部位出場後下次收盤封存
+        assert archiver.archive_closed_sessions()['dates'] == []
+        db.update_position_exit(held_positions[0], 22120.0, '13:44:00', '移動停利', 15.0)
+        assert archiver.archive_closed_sessions()['dates'] == ["2025-07-02"]
+        assert archiver.get_status()['hot_sessions'] == 1
+        assert archiver.get_status()['archived_sessions'] == 2
+    print("✅ 場次封存正常")
+
+
+def test_archive_follows_schema_changes():
+    """測試熱資料庫新增欄位後封存庫自動補欄位，歷史視圖以 NULL 補齊"""
+    print("🧪 測試封存欄位同步")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = MultiGroupDatabaseManager(os.path.join(tmp, "strategy.db"))
+        archiver = SessionArchiver(db.db_path, console_enabled=False)
+        _create_session(db, "2025-07-01", 1, [10.0])
+        archiver.archive_closed_sessions()
+
+        with db.get_connection() as conn:
+            conn.execute("ALTER TABLE position_records ADD COLUMN slippage REAL")
+            conn.commit()
+
+        # 封存庫尚未有新欄位時，歷史視圖以 NULL 補齊
+        with db.get_history_connection() as conn:
+            rows = conn.execute("SELECT id, slippage FROM position_records ORDER BY id").fetchall()
+            assert [tuple(row) for row in rows] == [(1, None)]
+
+        _, positions = _create_session(db, "2025-07-02", 2, [20.0])
+        with db.get_connection() as conn:
+            conn.execute("UPDATE position_records SET slippage = 1.5 WHERE id = ?", (positions[0],))
+            conn.commit()
+        assert archiver.archive_closed_sessions(before="2025-07-03")['dates'] == ["2025-07-02"]
+
+        conn = sqlite3.connect(db.db_path)
+        try:
+            assert attach_history(conn, db.archive_path)
+            rows = conn.execute("SELECT id, slippage FROM position_records ORDER BY id").fetchall()
+            assert rows == [(1, None), (2, 1.5)]
+            # 歷史視圖不可寫入
+            try:
+                conn.execute("DELETE FROM position_records")
+                assert False, "歷史視圖應為唯讀"
+            except sqlite3.OperationalError:
+                pass
+        finally:
+            conn.close()
+    print("✅ 封存欄位同步正常")
+
+
+def test_daily_maintenance_schedule():
+    """測試維護任務每日指定時間執行一次"""
+    print("🧪 測試每日排程")
+    task = MaintenanceTask("場次封存", lambda: None, 86400, run_at="14:00")
+    morning = datetime(2025, 7, 3, 9, 0).timestamp()
+    after_close = datetime(2025, 7, 3, 14, 1).timestamp()
+
+    assert not task.is_due(morning)
+    assert task.seconds_until_next_run(morning) == 5 * 3600
+    assert task.is_due(after_close)
+
+    task.last_run_time = after_close
+    assert not task.is_due(datetime(2025, 7, 3, 20, 0).timestamp())
+    assert task.seconds_until_next_run(after_close) == 24 * 3600 - 60
+    assert task.is_due(datetime(2025, 7, 4, 14, 0).timestamp())
+    print("✅ 每日排程正常")
+
+
+if __name__ == "__main__":
+    test_closed_sessions_move_to_archive()
+    test_archive_follows_schema_changes()
+    test_daily_maintenance_schedule()
+    print("\n🎯 場次封存測試完成")
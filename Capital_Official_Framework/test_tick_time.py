@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試報價時間整數表示
+驗證 lTimehms / lTimemillismicros 轉換、延遲格式化，以及 API 與系統時鐘差異統計
+"""
+
+import time
+
+from tick_time import ClockSkewTracker, TickTime, as_tick_time, clock_to_seconds, hms_to_seconds
+
+
+def test_from_api_and_lazy_text():
+    """測試 API 整數時間轉換與顯示字串"""
+    print("🧪 測試 TickTime 轉換")
+    assert hms_to_seconds(84600) == clock_to_seconds(8, 46) == 31560
+    assert hms_to_seconds(0) == 0 and hms_to_seconds(235959) == 86399
+
+    tick = TickTime.from_api(91530, 123456, ingest_ns=0)
+    assert (tick.sod, tick.ms) == (33330, 123)
+    assert (tick.hour, tick.minute, tick.second) == (9, 15, 30)
+    assert tick.minute_of_day == 9 * 60 + 15 and tick.ms_of_day == 33330123
+
+    # 字串只在顯示時產生，並快取
+    assert tick._text is None
+    assert str(tick) == tick.text == "09:15:30" and tick.text is tick.text
+    assert tick.precise_text() == "09:15:30.123"
+
+    # 舊呼叫端的字串、整數都轉成相同表示
+    assert as_tick_time("09:15:30").sod == 33330
+    assert as_tick_time("09:15:30.123").ms == 123
+    assert as_tick_time(91530).sod == 33330
+    assert as_tick_time(tick) is tick
+    assert TickTime.from_api(91630).seconds_since(tick) == 60
+    print("✅ TickTime 轉換正常")
+
+
+def test_ingest_timestamp_is_monotonic():
+    """測試收到報價的單調時間與處理耗時"""
+    print("🧪 測試收到時間")
+    before = time.monotonic_ns()
+    tick = TickTime.from_api(90000)
+    assert before <= tick.ingest_ns <= time.monotonic_ns()
+    assert tick.elapsed_ms() >= 0
+    print("✅ 收到時間正常")
+
+
+def test_clock_skew_tracker():
+    """測試時鐘差異統計 (含跨午夜)"""
+    print("🧪 測試時鐘差異")
+    now = [0.0]
+    tracker = ClockSkewTracker(clock=lambda: now[0])
+    offset = time.localtime(0).tm_gmtoff
+
+    def at_local(hour, minute, second, ms=0):
+        # 設定本機時鐘為指定的本地時間
+        now[0] = 86400 * 10 + clock_to_seconds(hour, minute, second) + ms / 1000 - offset
+
+    at_local(9, 0, 1, 250)
+    assert tracker.record(TickTime.from_api(90000, 0)) == 1250
+    assert tracker.local_time_text() == "09:00:01"
+
+    at_local(9, 0, 1)
+    assert tracker.record(TickTime.from_api(90001, 500000)) == -500
+
+    # 本機已過午夜、報價仍為前一日 23:59:59
+    at_local(0, 0, 1)
+    assert tracker.record(TickTime.from_api(235959)) == 2000
+
+    stats = tracker.get_stats()
+    assert stats['samples'] == 3 and stats['last_ms'] == 2000
+    assert stats['min_ms'] == -500 and stats['max_ms'] == 2000
+    assert stats['mean_ms'] == round((1250 - 500 + 2000) / 3, 1)
+
+    tracker.reset()
+    assert tracker.get_stats()['samples'] == 0 and tracker.get_stats()['mean_ms'] is None
+    print("✅ 時鐘差異正常")
+
+
+if __name__ == "__main__":
+    test_from_api_and_lazy_text()
+    test_ingest_timestamp_is_monotonic()
+    test_clock_skew_tracker()
+    print("\n🎯 報價時間測試完成")
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+報價時間整數表示
+OnNotifyTicksLONG 的 lTimehms / lTimemillismicros 直接轉成「當日秒數 + 毫秒」，
+策略熱路徑只做整數比較，HH:MM:SS 字串只在顯示或記錄時產生
+"""
+
+import time
+from typing import Callable, Dict, Optional, Union
+
+SECONDS_PER_DAY = 86400
+MS_PER_DAY = SECONDS_PER_DAY * 1000
+
+
+def hms_to_seconds(time_hms: int) -> int:
+    """HHMMSS 整數 → 當日秒數: 91530 → 33330"""
+    return (time_hms // 10000) * 3600 + (time_hms // 100 % 100) * 60 + time_hms % 100
+
+
+def clock_to_seconds(hour: int, minute: int, second: int = 0) -> int:
+    """時、分、秒 → 當日秒數"""
+    return hour * 3600 + minute * 60 + second
+
+
+class TickTime:
+    """
+    單筆報價時間
+
+    - sod: 當日秒數 (seconds of day)
+    - ms: 毫秒 (lTimemillismicros 為 mmmuuu，取前三位)
+    - ingest_ns: 本機收到報價時的 time.monotonic_ns()，用於量測處理延遲
+    """
+
+    __slots__ = ('sod', 'ms', 'ingest_ns', '_text')
+
+    def __init__(self, sod: int, ms: int = 0, ingest_ns: Optional[int] = None):
+        self.sod = sod
+        self.ms = ms
+        self.ingest_ns = time.monotonic_ns() if ingest_ns is None else ingest_ns
+        self._text = None
+
+    @classmethod
+    def from_api(cls, time_hms: int, time_millis_micros: int = 0,
+                 ingest_ns: Optional[int] = None) -> 'TickTime':
+        """由群益 API 的 lTimehms / lTimemillismicros 建立"""
+        return cls(hms_to_seconds(time_hms), time_millis_micros // 1000, ingest_ns)
+
+    @classmethod
+    def from_string(cls, text: str, ingest_ns: Optional[int] = None) -> 'TickTime':
+        """由 'HH:MM:SS' 或 'HH:MM:SS.mmm' 字串建立（Queue / 測試等舊呼叫端）"""
+        clock, _, millis = text.partition('.')
+        hour, minute, second = map(int, clock.split(':'))
+        return cls(clock_to_seconds(hour, minute, second), int(millis or 0), ingest_ns)
+
+    @property
+    def hour(self) -> int:
+        return self.sod // 3600
+
+    @property
+    def minute(self) -> int:
+        return self.sod // 60 % 60
+
+    @property
+    def second(self) -> int:
+        return self.sod % 60
+
+    @property
+    def minute_of_day(self) -> int:
+        return self.sod // 60
+
+    @property
+    def ms_of_day(self) -> int:
+        return self.sod * 1000 + self.ms
+
+    @property
+    def text(self) -> str:
+        """HH:MM:SS 顯示字串（第一次使用時才格式化）"""
+        if self._text is None:
+            sod = self.sod
+            self._text = f"{sod // 3600:02d}:{sod // 60 % 60:02d}:{sod % 60:02d}"
+        return self._text
+
+    def precise_text(self) -> str:
+        """HH:MM:SS.mmm 顯示字串"""
+        return f"{self.text}.{self.ms:03d}"
+
+    def seconds_since(self, earlier: 'TickTime') -> int:
+        """與較早報價的秒數差"""
+        return self.sod - earlier.sod
+
+    def elapsed_ms(self) -> float:
+        """自收到報價至今的處理耗時 (毫秒)"""
+        return (time.monotonic_ns() - self.ingest_ns) / 1e6
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return f"TickTime({self.precise_text()})"
+
+
+def as_tick_time(value: Union[TickTime, str, int]) -> TickTime:
+    """統一轉成 TickTime：TickTime 原樣返回，字串解析 HH:MM:SS，整數視為 HHMMSS"""
+    if isinstance(value, TickTime):
+        return value
+    if isinstance(value, int):
+        return TickTime.from_api(value)
+    return TickTime.from_string(value)
+
+
+class ClockSkewTracker:
+    """
+    API 報價時間與本機時鐘差異 (毫秒)
+
+    每筆報價只做一次 clock() 與整數運算，正值表示本機時間晚於報價時間（報價延遲），
+    跨午夜的差異會折回 ±12 小時內
+    """
+
+    # 時區偏移重新讀取間隔（秒）
+    OFFSET_REFRESH_SECONDS = 3600
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._utc_offset = 0
+        self._offset_checked_at = None
+        self.reset()
+
+    def reset(self):
+        """重設統計"""
+        self.samples = 0
+        self.last_ms = 0
+        self.min_ms = None
+        self.max_ms = None
+        self._total_ms = 0
+
+    def _local_ms_of_day(self) -> int:
+        now = self._clock()
+        if self._offset_checked_at is None or now - self._offset_checked_at > self.OFFSET_REFRESH_SECONDS:
+            self._utc_offset = time.localtime(now).tm_gmtoff
+            self._offset_checked_at = now
+        return int((now + self._utc_offset) * 1000) % MS_PER_DAY
+
+    def record(self, tick_time: TickTime) -> int:
+        """
+        記錄一筆報價的時鐘差異
+
+        Returns:
+            int: 本機時間 - 報價時間 (毫秒)
+        """
+        skew = self._local_ms_of_day() - tick_time.ms_of_day
+        if skew > MS_PER_DAY // 2:
+            skew -= MS_PER_DAY
+        elif skew < -MS_PER_DAY // 2:
+            skew += MS_PER_DAY
+
+        self.samples += 1
+        self.last_ms = skew
+        self._total_ms += skew
+        if self.min_ms is None or skew < self.min_ms:
+            self.min_ms = skew
+        if self.max_ms is None or skew > self.max_ms:
+            self.max_ms = skew
+        return skew
+
+    def local_time_text(self) -> str:
+        """本機時間 HH:MM:SS（顯示用）"""
+        sod = self._local_ms_of_day() // 1000
+        return f"{sod // 3600:02d}:{sod // 60 % 60:02d}:{sod % 60:02d}"
+
+    def get_stats(self) -> Dict[str, Optional[float]]:
+        """
+        取得時鐘差異統計
+
+        Returns:
+            dict: samples / last_ms / min_ms / max_ms / mean_ms
+        """
+        return {
+            'samples': self.samples,
+            'last_ms': self.last_ms,
+            'min_ms': self.min_ms,
+            'max_ms': self.max_ms,
+            'mean_ms': round(self._total_ms / self.samples, 1) if self.samples else None,
+        }
@@ -11,6 +11,10 @@ from datetime import datetime
 import logging
 
 from total_lot_tracker import TotalLotTracker, TrackerStatus
+from lifecycle_store import LifecycleStore
+
+COMPLETED_TRACKER_TTL = 3600   # 已完成追蹤器保留1小時
+MAX_ACTIVE_TRACKERS = 500
 
 class TotalLotManager:
     """
@@ -23,7 +27,9 @@ class TotalLotManager:
         self.logger = logging.getLogger(self.__class__.__name__)
         
         # 追蹤器管理
-        self.active_trackers: Dict[str, TotalLotTracker] = {}
+        # 完成/失敗的追蹤器排程到期，由儲存區移除
+        self.active_trackers: Dict[str, TotalLotTracker] = LifecycleStore(
+            'total_lot.active_trackers', ttl_seconds=COMPLETED_TRACKER_TTL, max_entries=MAX_ACTIVE_TRACKERS)
         
         # 統計數據
         self.total_strategies = 0
@@ -312,6 +318,7 @@ class TotalLotManager:
                         self.completed_strategies += 1
                     elif tracker.status == TrackerStatus.FAILED:
                         self.failed_strategies += 1
+                    self.active_trackers.retire(strategy_id)
             
             # 觸發全局完成回調
             for callback in self.global_complete_callbacks:
@@ -352,23 +359,17 @@ class TotalLotManager:
                 print(f"[TOTAL_MANAGER] ❌ 獲取統計信息失敗: {e}")
             return {}
     
-    def cleanup_completed_trackers(self, max_age_seconds: int = 3600):
-        """清理已完成的追蹤器"""
+    def cleanup_completed_trackers(self, max_age_seconds: int = None):
+        """清理已到期的追蹤器 (完成時即排程，不掃描全部追蹤器)"""
         try:
             with self.data_lock:
-                current_time = time.time()
-                to_remove = []
-                
-                for strategy_id, tracker in self.active_trackers.items():
-                    if tracker.is_complete() or tracker.status == TrackerStatus.FAILED:
-                        if current_time - tracker.start_time > max_age_seconds:
-                            to_remove.append(strategy_id)
-                
-                for strategy_id in to_remove:
-                    del self.active_trackers[strategy_id]
-                    if self.console_enabled:
-                        print(f"[TOTAL_MANAGER] 🧹 清理已完成策略: {strategy_id}")
-                
+                if max_age_seconds is not None:
+                    self.active_trackers.ttl_seconds = max_age_seconds
+
+                removed = self.active_trackers.expire()
+                if self.console_enabled and removed > 0:
+                    print(f"[TOTAL_MANAGER] 🧹 清理已完成策略: {removed}個")
+
         except Exception as e:
             if self.console_enabled:
                 print(f"[TOTAL_MANAGER] ❌ 清理追蹤器失敗: {e}")
@@ -392,5 +393,6 @@ class TotalLotManager:
                 'total_strategies': self.total_strategies,
                 'completed_strategies': self.completed_strategies,
                 'failed_strategies': self.failed_strategies,
-                'active_strategies': len(self.active_trackers)
+                'active_strategies': len(self.active_trackers),
+                'lifecycle': self.active_trackers.get_stats()
             }
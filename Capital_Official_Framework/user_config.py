@@ -19,6 +19,7 @@ USER_CONFIG = {
     # 預設交易商品
     'DEFAULT_PRODUCT': 'MTX00',           # 小台指期貨
     'ALTERNATIVE_PRODUCT': 'TM0000',      # 微型台指期貨
+    'SUBSCRIBE_PRODUCTS': [],             # 額外同時監控的商品 (如 ['TXF00'])，報價只驅動該商品部位的風控
     
     # 測試參數
     'TEST_QUANTITY': 1,                   # 測試數量 (最小單位)
@@ -17,6 +17,7 @@ from .quote_engine import VirtualQuoteEngine
 from .event_dispatcher import EventDispatcher
 from .order_simulator import OrderSimulator
 from .config_manager import ConfigManager
+from .replay_engine import TickReplayEngine, HistoryReplaySource, ReplayBook, ReplayClock
 
 # 版本信息
 def get_version():
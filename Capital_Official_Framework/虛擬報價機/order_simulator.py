@@ -49,6 +49,9 @@ class OrderSimulator:
         # 控制變數
         self.running = False
         
+        # 重播報價簿 (attach_book 後改用報價簿撮合，且同步處理訂單)
+        self.book = None
+        
         # 統計
         self.total_orders = 0
         self.filled_orders = 0
@@ -66,6 +69,16 @@ class OrderSimulator:
         self.running = False
         print(f"🛑 [OrderSimulator] 下單模擬器已停止 - 總訂單: {self.total_orders}, 成交: {self.filled_orders}")
     
+    def attach_book(self, book) -> None:
+        """
+        掛上重播報價簿 (ReplayBook)
+        
+        掛上後訂單依報價簿可成交量撮合，成交價取對手檔位，
+        並在下單線程上同步處理，讓重播結果可重現。
+        """
+        self.book = book
+        print("📚 [OrderSimulator] 已掛上重播報價簿，改用報價簿撮合")
+    
     def process_order(self, user_id: str, async_flag: bool, order_obj) -> Tuple[str, int]:
         """
         處理下單請求
@@ -92,8 +105,12 @@ class OrderSimulator:
             
             print(f"📋 [OrderSimulator] 接收下單: {order_id} - {self._format_order_info(order_info)}")
             
-            # 異步處理訂單
-            threading.Thread(target=self._process_order_async, args=(order_info,), daemon=True).start()
+            if self.book is not None:
+                # 重播模式: 對報價簿同步撮合
+                self._process_order_against_book(order_info)
+            else:
+                # 異步處理訂單
+                threading.Thread(target=self._process_order_async, args=(order_info,), daemon=True).start()
             
             return (order_id, 0)  # 成功
             
@@ -136,6 +153,34 @@ class OrderSimulator:
             print(f"❌ [OrderSimulator] 訂單處理異常: {e}")
             self._reject_order(order_info, str(e))
     
+    def _process_order_against_book(self, order_info: OrderInfo) -> None:
+        """對重播報價簿撮合訂單"""
+        try:
+            self._send_new_order_reply(order_info)
+            
+            # 委託價為點數，報價簿為 *100 格式
+            order_qty = order_info.quantity
+            fill_price, fill_qty = self.book.match(
+                order_info.buy_sell,
+                order_info.price * 100,
+                order_qty,
+                fill_or_kill=order_info.order_type == 2  # FOK 不足量全部取消
+            )
+            
+            if fill_qty > 0:
+                order_info.quantity = fill_qty
+                self._fill_order(order_info, int(round(fill_price / 100)))
+                if fill_qty < order_qty:
+                    # IOC (及 ROD) 部分成交：重播報價簿不留單，剩餘口數取消
+                    order_info.quantity = order_qty - fill_qty
+                    self._cancel_order(order_info)
+            else:
+                self._cancel_order(order_info)
+                
+        except Exception as e:
+            print(f"❌ [OrderSimulator] 報價簿撮合異常: {e}")
+            self._reject_order(order_info, str(e))
+    
     def _should_fill_order(self, order_info: OrderInfo) -> bool:
         """判斷訂單是否應該成交"""
         # 基本成交機率
@@ -154,13 +199,14 @@ class OrderSimulator:
         self.event_dispatcher.dispatch_reply_event(reply_data)
         print(f"📤 [OrderSimulator] 新單回報: {order_info.order_id}")
     
-    def _fill_order(self, order_info: OrderInfo) -> None:
+    def _fill_order(self, order_info: OrderInfo, fill_price: int = None) -> None:
         """成交訂單"""
         order_info.status = "FILLED"
         self.filled_orders += 1
         
         # 計算成交價格 (使用當前市價)
-        fill_price = self._get_fill_price(order_info)
+        if fill_price is None:
+            fill_price = self._get_fill_price(order_info)
         
         # 發送成交回報
         reply_data = self._generate_reply_data(order_info, "D", fill_price, order_info.quantity)
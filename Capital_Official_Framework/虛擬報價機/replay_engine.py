@@ -0,0 +1,469 @@
+# 報價重播引擎
+# Tick Replay Engine for Virtual Quote Machine
+#
+# 從 HistoryDataCollector 的 tick_data / best5_data 表讀取歷史逐筆與五檔，
+# 依原始時間順序送進與群益API相同簽名的 OnNotifyTicksLONG / OnNotifyBest5LONG，
+# 讓 simple_integrated.py 的真實風控/平倉程式碼可以用整天的資料做壓力測試。
+#
+# 時鐘模式:
+#   speed=None 或 0  → 盡快重播 (不等待)
+#   speed=1.0        → 依原始時間戳重播
+#   speed=N          → N 倍速重播
+
+import os
+import sys
+import time
+import heapq
+import sqlite3
+import argparse
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+from dataclasses import dataclass, field
+
+# 與即時策略共用K棒聚合與時間轉換 (Capital_Official_Framework)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bar_builder import BarBuilder
+from tick_time import hms_to_seconds
+
+# 預設歷史資料庫 (HistoryDataCollector/data/history_data.db)
+DEFAULT_HISTORY_DB = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'HistoryDataCollector', 'data', 'history_data.db'
+)
+
+# 同一時間戳內的事件順序: 五檔先於逐筆 (成交前的掛單狀態)
+EVENT_BEST5 = 0
+EVENT_TICK = 1
+
+
+def _to_api_price(value) -> int:
+    """資料庫價格(點) → 群益API格式 (*100)"""
+    if value is None:
+        return 0
+    return int(round(value * 100))
+
+
+@dataclass
+class ReplayEvent:
+    """重播事件"""
+    kind: int              # EVENT_BEST5 / EVENT_TICK
+    date: int              # YYYYMMDD
+    time_hms: int          # HHMMSS
+    time_ms: int           # 毫秒微秒 (lTimemillismicros)
+    market_no: int
+    stock_idx: int
+    args: tuple            # 事件參數 (不含 market_no/stock_idx 前綴)
+
+
+class ReplayBook:
+    """重播中的最新報價簿 - 供 OrderSimulator 撮合"""
+
+    def __init__(self):
+        self.bid_prices = [0] * 5   # 買方五檔 (*100，由高到低)
+        self.bid_qtys = [0] * 5
+        self.ask_prices = [0] * 5   # 賣方五檔 (*100，由低到高)
+        self.ask_qtys = [0] * 5
+        self.last_price = 0         # 最新成交價 (*100)
+        self.date = 0
+        self.time_hms = 0
+        self.has_depth = False
+
+    def apply_tick(self, event: ReplayEvent) -> None:
+        """套用逐筆事件 (nPtr, lDate, lTimehms, lTimemillismicros, nBid, nAsk, nClose, nQty, nSimulate)"""
+        args = event.args
+        self.last_price = args[6]
+        self.date = event.date
+        self.time_hms = event.time_hms
+        # 沒有五檔資料時，以逐筆的買賣價當作第一檔
+        if not self.has_depth:
+            self.bid_prices[0] = args[4]
+            self.ask_prices[0] = args[5]
+            self.bid_qtys[0] = self.ask_qtys[0] = max(args[7], 1)
+
+    def apply_best5(self, event: ReplayEvent) -> None:
+        """套用五檔事件"""
+        args = event.args
+        for i in range(5):
+            self.bid_prices[i] = args[i * 2]
+            self.bid_qtys[i] = args[i * 2 + 1]
+            self.ask_prices[i] = args[12 + i * 2]
+            self.ask_qtys[i] = args[12 + i * 2 + 1]
+        self.date = event.date
+        self.time_hms = event.time_hms
+        self.has_depth = True
+
+    def match(self, buy_sell: int, limit_price: int, quantity: int,
+              fill_or_kill: bool = True) -> Tuple[int, int]:
+        """
+        對報價簿撮合
+
+        Args:
+            buy_sell: 0=買, 1=賣
+            limit_price: 委託價 (*100)，0 表示市價
+            quantity: 委託口數
+            fill_or_kill: FOK 不足量則全部不成交
+
+        Returns:
+            Tuple[成交價(*100, 以可成交檔位量加權取整), 成交口數]
+        """
+        if buy_sell == 0:
+            prices, qtys = self.ask_prices, self.ask_qtys
+            marketable = lambda p: p > 0 and (limit_price <= 0 or p <= limit_price)
+        else:
+            prices, qtys = self.bid_prices, self.bid_qtys
+            marketable = lambda p: p > 0 and (limit_price <= 0 or p >= limit_price)
+
+        remaining = quantity
+        notional = 0
+        for price, qty in zip(prices, qtys):
+            if remaining <= 0 or not marketable(price):
+                break
+            take = min(remaining, max(qty, 0))
+            notional += take * price
+            remaining -= take
+
+        filled = quantity - remaining
+        if filled == 0 or (fill_or_kill and remaining > 0):
+            return 0, 0
+        return int(round(notional / filled)), filled
+
+
+class HistoryReplaySource:
+    """歷史資料來源 - 串流讀取 tick_data / best5_data 並依時間合併"""
+
+    def __init__(self, db_path: str = None, symbol: str = "MTX00",
+                 start_date: str = None, end_date: str = None,
+                 include_best5: bool = True, market_no: int = 2, stock_idx: int = 0):
+        """
+        初始化資料來源
+
+        Args:
+            db_path: HistoryDataCollector SQLite 路徑
+            symbol: 商品代碼
+            start_date/end_date: 日期範圍 (YYYYMMDD，含)
+            include_best5: 是否重播五檔
+            market_no/stock_idx: 資料庫缺值時使用的市場別/索引
+        """
+        self.db_path = db_path or DEFAULT_HISTORY_DB
+        self.symbol = symbol
+        self.start_date = start_date
+        self.end_date = end_date
+        self.include_best5 = include_best5
+        self.market_no = market_no
+        self.stock_idx = stock_idx
+
+    def _date_filter(self) -> Tuple[str, list]:
+        clauses, params = ["symbol = ?"], [self.symbol]
+        if self.start_date:
+            clauses.append("trade_date >= ?")
+            params.append(str(self.start_date))
+        if self.end_date:
+            clauses.append("trade_date <= ?")
+            params.append(str(self.end_date))
+        return " AND ".join(clauses), params
+
+    def _iter_ticks(self, conn: sqlite3.Connection) -> Iterator[tuple]:
+        where, params = self._date_filter()
+        cursor = conn.execute(f"""
+            SELECT trade_date, trade_time, COALESCE(trade_time_ms, 0), id,
+                   market_no, index_code, ptr, bid_price, ask_price, close_price,
+                   volume, simulate_flag
+            FROM tick_data WHERE {where}
+            ORDER BY trade_date, trade_time, trade_time_ms, ptr, id
+        """, params)
+        for row in cursor:
+            date, hms, ms = int(row[0]), int(row[1]), int(row[2])
+            event = ReplayEvent(
+                kind=EVENT_TICK, date=date, time_hms=hms, time_ms=ms,
+                market_no=row[4] if row[4] is not None else self.market_no,
+                stock_idx=row[5] if row[5] is not None else self.stock_idx,
+                args=(row[6] or 0, date, hms, ms,
+                      _to_api_price(row[7]), _to_api_price(row[8]), _to_api_price(row[9]),
+                      row[10] or 0, row[11] or 0)
+            )
+            yield (date, hms, ms, EVENT_TICK, row[3], event)
+
+    def _iter_best5(self, conn: sqlite3.Connection) -> Iterator[tuple]:
+        where, params = self._date_filter()
+        cursor = conn.execute(f"""
+            SELECT trade_date, trade_time, id, market_no, index_code,
+                   bid_price_1, bid_volume_1, bid_price_2, bid_volume_2, bid_price_3, bid_volume_3,
+                   bid_price_4, bid_volume_4, bid_price_5, bid_volume_5,
+                   extend_bid, extend_bid_qty,
+                   ask_price_1, ask_volume_1, ask_price_2, ask_volume_2, ask_price_3, ask_volume_3,
+                   ask_price_4, ask_volume_4, ask_price_5, ask_volume_5,
+                   extend_ask, extend_ask_qty, simulate_flag
+            FROM best5_data WHERE {where}
+            ORDER BY trade_date, trade_time, id
+        """, params)
+        for row in cursor:
+            date, hms = int(row[0]), int(row[1])
+            levels = row[5:29]
+            args = tuple(
+                _to_api_price(v) if i % 2 == 0 else (v or 0)
+                for i, v in enumerate(levels)
+            ) + (row[29] or 0,)
+            event = ReplayEvent(
+                kind=EVENT_BEST5, date=date, time_hms=hms, time_ms=0,
+                market_no=row[3] if row[3] is not None else self.market_no,
+                stock_idx=row[4] if row[4] is not None else self.stock_idx,
+                args=args
+            )
+            yield (date, hms, 0, EVENT_BEST5, row[2], event)
+
+    def __iter__(self) -> Iterator[ReplayEvent]:
+        """依 (日期, 時間, 毫秒, 事件類型, id) 合併兩張表 - 重播順序完全可重現"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            streams = [self._iter_ticks(conn)]
+            if self.include_best5:
+                streams.append(self._iter_best5(conn))
+            for item in heapq.merge(*streams, key=lambda x: x[:5]):
+                yield item[5]
+        finally:
+            conn.close()
+
+
+class ReplayClock:
+    """重播時鐘 - 將歷史時間戳映射到 monotonic 時間"""
+
+    def __init__(self, speed: Optional[float] = None):
+        self.speed = speed if speed and speed > 0 else None
+        self._day_offsets: Dict[int, int] = {}
+        self._origin_event = None
+        self._origin_wall = None
+
+    def _event_seconds(self, event: ReplayEvent) -> float:
+        """事件時間 → 絕對秒數 (跨日夜盤也連續)"""
+        day = self._day_offsets.get(event.date)
+        if day is None:
+            day = datetime.strptime(str(event.date), '%Y%m%d').toordinal() * 86400
+            self._day_offsets[event.date] = day
+        hms = event.time_hms
+        return (day + (hms // 10000) * 3600 + (hms // 100 % 100) * 60 + hms % 100
+                + event.time_ms / 1_000_000)
+
+    def wait_until(self, event: ReplayEvent) -> float:
+        """
+        等待到事件的重播時間
+
+        Returns:
+            float: 實際等待秒數
+        """
+        if self.speed is None:
+            return 0.0
+
+        event_seconds = self._event_seconds(event)
+        now = time.monotonic()
+        if self._origin_event is None:
+            self._origin_event = event_seconds
+            self._origin_wall = now
+            return 0.0
+
+        target = self._origin_wall + (event_seconds - self._origin_event) / self.speed
+        delay = target - now
+        if delay > 0:
+            time.sleep(delay)
+            return delay
+        return 0.0
+
+
+class TickReplayEngine:
+    """報價重播引擎 - 將歷史事件送入群益API相同簽名的處理器"""
+
+    def __init__(self, source, handlers: List[Any] = None, speed: Optional[float] = None,
+                 order_simulator=None, console_enabled: bool = True, bar_builder: BarBuilder = None):
+        """
+        初始化重播引擎
+
+        Args:
+            source: 可迭代的 ReplayEvent 來源 (如 HistoryReplaySource)
+            handlers: 具有 OnNotifyTicksLONG / OnNotifyBest5LONG 的處理器
+            speed: None/0=盡快, 1.0=原始速度, N=N倍速
+            order_simulator: OrderSimulator，會改用重播報價簿撮合
+            console_enabled: 是否啟用Console輸出
+            bar_builder: BarBuilder，逐筆成交同步聚合K棒 (與即時策略相同邏輯)
+        """
+        self.source = source
+        self.bar_builder = bar_builder
+        self.handlers = list(handlers or [])
+        self.clock = ReplayClock(speed)
+        self.book = ReplayBook()
+        self.console_enabled = console_enabled
+        self.running = False
+
+        if order_simulator is not None:
+            order_simulator.attach_book(self.book)
+
+        # 統計
+        self.tick_count = 0
+        self.best5_count = 0
+        self.error_count = 0
+        self.handler_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.latencies_us: List[int] = []
+        self.start_time = None
+        self.end_time = None
+
+    def add_handler(self, handler) -> None:
+        """註冊事件處理器"""
+        if handler not in self.handlers:
+            self.handlers.append(handler)
+
+    def stop(self) -> None:
+        """停止重播"""
+        self.running = False
+
+    def run(self, max_events: int = None) -> Dict[str, Any]:
+        """
+        同步執行重播 (在呼叫端線程上分發事件)
+
+        Args:
+            max_events: 最多重播筆數
+
+        Returns:
+            Dict: 重播統計
+        """
+        self.running = True
+        self.start_time = time.perf_counter()
+        processed = 0
+
+        if self.console_enabled:
+            mode = "盡快" if self.clock.speed is None else f"{self.clock.speed:g}x"
+            print(f"🚀 [ReplayEngine] 開始重播 - 模式: {mode}, 處理器: {len(self.handlers)}")
+
+        for event in self.source:
+            if not self.running or (max_events is not None and processed >= max_events):
+                break
+
+            self.wait_seconds += self.clock.wait_until(event)
+            self._dispatch(event)
+            processed += 1
+
+        self.running = False
+        if self.bar_builder is not None:
+            self.bar_builder.flush()
+        self.end_time = time.perf_counter()
+        stats = self.get_statistics()
+
+        if self.console_enabled:
+            print(f"🛑 [ReplayEngine] 重播結束 - 逐筆: {stats['tick_count']}, 五檔: {stats['best5_count']}, "
+                  f"{stats['events_per_second']:.0f} 筆/秒, 處理器p99: {stats['handler_p99_us']}us")
+        return stats
+
+    def _dispatch(self, event: ReplayEvent) -> None:
+        """分發單一事件"""
+        if event.kind == EVENT_TICK:
+            self.book.apply_tick(event)
+            method_name = 'OnNotifyTicksLONG'
+            self.tick_count += 1
+            if self.bar_builder is not None:
+                self.bar_builder.update(event.args[6] / 100.0, hms_to_seconds(event.time_hms), event.args[7])
+        else:
+            self.book.apply_best5(event)
+            method_name = 'OnNotifyBest5LONG'
+            self.best5_count += 1
+
+        started = time.perf_counter()
+        for handler in self.handlers:
+            method = getattr(handler, method_name, None)
+            if method is None:
+                continue
+            try:
+                method(event.market_no, event.stock_idx, *event.args)
+            except Exception as e:
+                self.error_count += 1
+                if self.console_enabled and self.error_count <= 10:
+                    print(f"❌ [ReplayEngine] {method_name} 處理錯誤: {e}")
+        elapsed = time.perf_counter() - started
+        self.handler_seconds += elapsed
+        self.latencies_us.append(int(elapsed * 1_000_000))
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """取得統計資訊"""
+        end = self.end_time or time.perf_counter()
+        elapsed = end - self.start_time if self.start_time else 0
+        events = self.tick_count + self.best5_count
+        latencies = sorted(self.latencies_us)
+
+        def percentile(q):
+            if not latencies:
+                return 0
+            return latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+
+        return {
+            "running": self.running,
+            "tick_count": self.tick_count,
+            "best5_count": self.best5_count,
+            "error_count": self.error_count,
+            "elapsed_time": elapsed,
+            "wait_time": self.wait_seconds,
+            "handler_time": self.handler_seconds,
+            "events_per_second": events / elapsed if elapsed > 0 else 0,
+            "handler_p50_us": percentile(0.50),
+            "handler_p99_us": percentile(0.99),
+            "last_price": self.book.last_price / 100.0,
+            "bars": self.bar_builder.get_stats() if self.bar_builder is not None else {}
+        }
+
+
+def handlers_from_app(app) -> List[Any]:
+    """
+    取得 SimpleIntegratedApp 的報價事件處理器
+
+    SKQuoteLibEvents 是 register_quote_events 內的區域類別，註冊後存在 app.quote_event；
+    非 Windows 環境下 comtypes 綁定失敗不影響處理器本身。
+    """
+    if getattr(app, 'quote_event', None) is None:
+        app.register_quote_events()
+    return [app.quote_event]
+
+
+class _CountingHandler:
+    """命令列模式用的計數處理器"""
+
+    def __init__(self):
+        self.ticks = 0
+        self.best5 = 0
+
+    def OnNotifyTicksLONG(self, *args):
+        self.ticks += 1
+
+    def OnNotifyBest5LONG(self, *args):
+        self.best5 += 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="歷史逐筆/五檔重播")
+    parser.add_argument('--db', default=DEFAULT_HISTORY_DB, help='HistoryDataCollector SQLite 路徑')
+    parser.add_argument('--symbol', default='MTX00')
+    parser.add_argument('--start-date', help='YYYYMMDD')
+    parser.add_argument('--end-date', help='YYYYMMDD')
+    parser.add_argument('--speed', type=float, default=0, help='0=盡快, 1=原始速度, N=N倍速')
+    parser.add_argument('--no-best5', action='store_true')
+    parser.add_argument('--max-events', type=int)
+    parser.add_argument('--bars', default='60,300', help='K棒週期秒數，逗號分隔 (空字串=不聚合)')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"❌ [ReplayEngine] 找不到資料庫: {args.db}")
+        return 1
+
+    source = HistoryReplaySource(args.db, args.symbol, args.start_date, args.end_date,
+                                 include_best5=not args.no_best5)
+    bar_builder = None
+    if args.bars:
+        bar_builder = BarBuilder()
+        for seconds in map(int, args.bars.split(',')):
+            bar_builder.add_timeframe(f"{seconds}s", seconds)
+
+    engine = TickReplayEngine(source, [_CountingHandler()], speed=args.speed, bar_builder=bar_builder)
+    stats = engine.run(max_events=args.max_events)
+    for name, count in stats['bars'].items():
+        last = bar_builder.last(name)
+        print(f"📊 [ReplayEngine] {name} K棒: {count} 根" + (f", 最後: {last}" if last else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
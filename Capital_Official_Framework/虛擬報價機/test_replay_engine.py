@@ -0,0 +1,215 @@
+# 報價重播引擎測試
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from replay_engine import HistoryReplaySource, TickReplayEngine, ReplayBook
+from order_simulator import OrderSimulator
+from bar_builder import BarBuilder
+
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'HistoryDataCollector', 'database', 'schema.sql'
+)
+
+
+def _build_history_db():
+    """建立含三筆逐筆、兩筆五檔的歷史資料庫"""
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_PATH, 'r', encoding='utf-8') as f:
+        conn.executescript(f.read())
+
+    ticks = [
+        ('084500', 0, 1, 21499, 21500, 21500, 2),
+        ('084500', 500000, 2, 21500, 21501, 21501, 1),
+        ('084502', 0, 3, 21502, 21503, 21503, 3),
+    ]
+    for trade_time, ms, ptr, bid, ask, close, qty in ticks:
+        conn.execute("""
+            INSERT INTO tick_data (symbol, market_no, index_code, ptr, trade_date, trade_time,
+                                   trade_time_ms, bid_price, ask_price, close_price, volume)
+            VALUES ('MTX00', 2, 7, ?, '20250703', ?, ?, ?, ?, ?, ?)
+        """, (ptr, trade_time, ms, bid, ask, close, qty))
+
+    for trade_time, base in [('084500', 21500), ('084502', 21503)]:
+        conn.execute("""
+            INSERT INTO best5_data (symbol, market_no, index_code, trade_date, trade_time,
+                bid_price_1, bid_volume_1, bid_price_2, bid_volume_2, bid_price_3, bid_volume_3,
+                bid_price_4, bid_volume_4, bid_price_5, bid_volume_5,
+                ask_price_1, ask_volume_1, ask_price_2, ask_volume_2, ask_price_3, ask_volume_3,
+                ask_price_4, ask_volume_4, ask_price_5, ask_volume_5)
+            VALUES ('MTX00', 2, 7, '20250703', ?, ?, 5, ?, 5, ?, 5, ?, 5, ?, 5, ?, 2, ?, 3, ?, 5, ?, 5, ?, 5)
+        """, (trade_time, base - 1, base - 2, base - 3, base - 4, base - 5,
+              base, base + 1, base + 2, base + 3, base + 4))
+    conn.commit()
+    conn.close()
+    return path
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.events = []
+
+    def OnNotifyTicksLONG(self, sMarketNo, nStockidx, nPtr, lDate, lTimehms,
+                          lTimemillismicros, nBid, nAsk, nClose, nQty, nSimulate):
+        self.events.append(('tick', lTimehms, lTimemillismicros, nClose, nStockidx))
+
+    def OnNotifyBest5LONG(self, sMarketNo, nStockidx, nBestBid1, nBestBidQty1, nBestBid2, nBestBidQty2,
+                          nBestBid3, nBestBidQty3, nBestBid4, nBestBidQty4, nBestBid5, nBestBidQty5,
+                          nExtendBid, nExtendBidQty, nBestAsk1, nBestAskQty1, nBestAsk2, nBestAskQty2,
+                          nBestAsk3, nBestAskQty3, nBestAsk4, nBestAskQty4, nBestAsk5, nBestAskQty5,
+                          nExtendAsk, nExtendAskQty, nSimulate):
+        self.events.append(('best5', nBestBid1, nBestAsk1))
+
+
+class CapturingDispatcher:
+    def __init__(self):
+        self.replies = []
+
+    def dispatch_reply_event(self, reply_data):
+        self.replies.append(reply_data.split(','))
+
+
+class StubConfig:
+    def get_fill_probability(self):
+        return 1.0
+
+    def get_fill_delay_ms(self):
+        return 0
+
+    def get_default_account(self):
+        return "F0200006363839"
+
+
+class MockOrder:
+    def __init__(self, buy_sell, price, qty, trade_type=2):
+        self.bstrFullAccount = "F0200006363839"
+        self.bstrStockNo = "MTX00"
+        self.sBuySell = buy_sell
+        self.sTradeType = trade_type  # 預設 FOK
+        self.nQty = qty
+        self.bstrPrice = str(price)
+
+
+def test_replay_order_is_deterministic():
+    """測試重播順序: 同秒五檔先於逐筆，逐筆依毫秒排序"""
+    db_path = _build_history_db()
+    try:
+        runs = []
+        for _ in range(2):
+            handler = RecordingHandler()
+            engine = TickReplayEngine(HistoryReplaySource(db_path, 'MTX00'), [handler],
+                                      console_enabled=False)
+            stats = engine.run()
+            runs.append(handler.events)
+
+        assert runs[0] == runs[1]
+        assert [e[0] for e in runs[0]] == ['best5', 'tick', 'tick', 'best5', 'tick']
+        assert runs[0][1] == ('tick', 84500, 0, 2150000, 7)
+        assert runs[0][2][2] == 500000
+        assert stats['tick_count'] == 3 and stats['best5_count'] == 2
+        print("✅ 重播順序可重現")
+    finally:
+        os.remove(db_path)
+
+
+def test_accelerated_clock():
+    """測試倍速時鐘: 2秒歷史資料以 20x 重播約 0.1 秒"""
+    db_path = _build_history_db()
+    try:
+        engine = TickReplayEngine(HistoryReplaySource(db_path, 'MTX00'), [RecordingHandler()],
+                                  speed=20, console_enabled=False)
+        started = time.monotonic()
+        engine.run()
+        elapsed = time.monotonic() - started
+        assert 0.08 <= elapsed < 1.0
+        print(f"✅ 20x 重播耗時 {elapsed:.3f}s")
+    finally:
+        os.remove(db_path)
+
+
+def test_order_simulator_fills_against_book():
+    """測試 OrderSimulator 依重播報價簿撮合"""
+    db_path = _build_history_db()
+    try:
+        dispatcher = CapturingDispatcher()
+        simulator = OrderSimulator(StubConfig(), dispatcher)
+        engine = TickReplayEngine(HistoryReplaySource(db_path, 'MTX00'), [RecordingHandler()],
+                                  order_simulator=simulator, console_enabled=False)
+        engine.run()
+
+        # 最後報價簿: 賣1 21503 x2, 賣2 21504 x3
+        simulator.process_order("user", True, MockOrder(0, 21504, 3))
+        fill = dispatcher.replies[-1]
+        assert fill[8] == 'D' and fill[7] == '3'
+        assert fill[6] == str(round((21503 * 2 + 21504) / 3))
+
+        # FOK 限價低於賣1 → 取消
+        simulator.process_order("user", True, MockOrder(0, 21500, 1))
+        assert dispatcher.replies[-1][8] == 'C'
+
+        # 限價 21503 只有 2 口可成交: FOK 全部取消，IOC 成交 2 口後取消剩餘 3 口
+        count = len(dispatcher.replies)
+        simulator.process_order("user", True, MockOrder(0, 21503, 5, trade_type=2))
+        assert [r[8] for r in dispatcher.replies[count:]] == ['N', 'C']
+        count = len(dispatcher.replies)
+        simulator.process_order("user", True, MockOrder(0, 21503, 5, trade_type=1))
+        fill, cancel = dispatcher.replies[count + 1:]
+        assert (fill[8], fill[6], fill[7]) == ('D', '21503', '2')
+        assert (cancel[8], cancel[5]) == ('C', '3')
+
+        # 賣出以買1成交
+        simulator.process_order("user", True, MockOrder(1, 21502, 1))
+        assert dispatcher.replies[-1][8] == 'D' and dispatcher.replies[-1][6] == '21502'
+        print("✅ 報價簿撮合正常")
+    finally:
+        os.remove(db_path)
+
+
+def test_book_match_without_depth_uses_tick_quote():
+    """測試無五檔時以逐筆買賣價撮合"""
+    db_path = _build_history_db()
+    try:
+        book = ReplayBook()
+        engine = TickReplayEngine(HistoryReplaySource(db_path, 'MTX00', include_best5=False),
+                                  console_enabled=False)
+        engine.book = book
+        engine.run()
+        assert book.match(0, 0, 1) == (2150300, 1)
+        print("✅ 無五檔撮合正常")
+    finally:
+        os.remove(db_path)
+
+
+def test_replay_feeds_bar_builder():
+    """測試重播逐筆同步聚合K棒 (與即時策略共用 BarBuilder)"""
+    db_path = _build_history_db()
+    try:
+        bars = []
+        builder = BarBuilder()
+        builder.add_timeframe('1m', 60, bars.append)
+        engine = TickReplayEngine(HistoryReplaySource(db_path, 'MTX00'), [RecordingHandler()],
+                                  console_enabled=False, bar_builder=builder)
+        stats = engine.run()
+
+        assert stats['bars'] == {'1m': 1} and len(bars) == 1
+        bar = bars[0]
+        assert bar.start_text == "08:45:00" and bar.tick_count == 3
+        assert (bar.open, bar.high, bar.low, bar.close, bar.volume) == (21500, 21503, 21500, 21503, 6)
+        print("✅ 重播K棒聚合正常")
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    test_replay_order_is_deterministic()
+    test_accelerated_clock()
+    test_order_simulator_fills_against_book()
+    test_book_match_without_depth_uses_tick_quote()
+    test_replay_feeds_bar_builder()
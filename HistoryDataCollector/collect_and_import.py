@@ -3,6 +3,7 @@
 """
 資料收集並自動匯入PostgreSQL工具
 用於收集期貨歷史資料並自動匯入到PostgreSQL資料庫
+支援多商品、長日期區間切段下載，中斷後依收集記錄續傳，下載同時背景匯入
 """
 
 import argparse
@@ -16,8 +17,9 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from database.db_manager import DatabaseManager
 from utils.skcom_manager import SKCOMManager
-from collectors.kline_collector import KLineCollector
+from collectors.download_scheduler import DownloadScheduler, plan_chunks, postgres_import_function
 from database.postgres_importer import PostgreSQLImporter
+from history_config import DOWNLOAD_CHUNK_DAYS
 
 # 設定日誌
 logging.basicConfig(
@@ -37,7 +39,7 @@ class CollectAndImportTool:
         """初始化工具"""
         self.db_manager = None
         self.skcom_manager = None
-        self.kline_collector = None
+        self.scheduler = None
         self.postgres_importer = None
         
     def initialize(self):
@@ -60,10 +62,6 @@ class CollectAndImportTool:
             
             logger.info("✅ SKCOM API初始化完成")
             
-            # 初始化K線收集器
-            self.kline_collector = KLineCollector(self.db_manager, self.skcom_manager)
-            logger.info("✅ K線收集器初始化完成")
-            
             # 初始化PostgreSQL匯入器
             self.postgres_importer = PostgreSQLImporter()
             logger.info("✅ PostgreSQL匯入器初始化完成")
@@ -99,37 +97,30 @@ class CollectAndImportTool:
             logger.error(f"❌ 登入過程發生錯誤: {e}")
             return False
     
-    def collect_data(self, symbol, kline_type, start_date, end_date, trading_session='DAY'):
-        """收集K線資料"""
+    def collect_data(self, symbols, kline_type, start_date, end_date, trading_session='ALL',
+                     chunk_days=DOWNLOAD_CHUNK_DAYS, include_ticks=False, auto_import=True):
+        """排程收集K線（與逐筆）資料，完成的段落在背景匯入PostgreSQL"""
         try:
-            logger.info(f"📊 開始收集 {symbol} {kline_type} K線資料...")
-            logger.info(f"📅 日期範圍: {start_date} ~ {end_date}")
+            logger.info(f"📊 開始收集 {', '.join(symbols)} {kline_type} K線資料...")
+            logger.info(f"📅 日期範圍: {start_date} ~ {end_date} (每段 {chunk_days} 天)")
             logger.info(f"🕐 交易時段: {trading_session}")
-            
-            # 開始收集K線資料
-            success = self.kline_collector.start_collection(
-                symbol=symbol,
-                kline_type=kline_type,
-                start_date=start_date,
-                end_date=end_date,
-                trading_session=trading_session
-            )
-            
-            if not success:
-                logger.error("❌ K線資料收集失敗")
-                return False
-            
-            # 等待收集完成
-            logger.info("⏳ 等待資料收集完成...")
-            import time
-            time.sleep(5)  # 等待資料收集
-            
-            # 檢查收集結果
-            stats = self.db_manager.get_data_statistics(symbol)
-            logger.info(f"✅ 資料收集完成 - K線: {stats['kline_count']} 筆")
-            
-            return stats['kline_count'] > 0
-            
+
+            import_function = None
+            if auto_import:
+                if self.postgres_importer.postgres_initialized:
+                    import_function = postgres_import_function(self.postgres_importer)
+                else:
+                    logger.warning("⚠️ PostgreSQL未初始化，僅收集不匯入")
+
+            chunks = plan_chunks(symbols, start_date, end_date, kline_type, trading_session,
+                                 chunk_days=chunk_days, include_ticks=include_ticks)
+            self.scheduler = DownloadScheduler(self.skcom_manager, self.db_manager, import_function)
+            stats = self.scheduler.run(chunks)
+
+            logger.info(f"✅ 資料收集完成 - {stats['completed'] + stats['skipped']}/{stats['planned']} 段, "
+                        f"本次 {stats['records']:,} 筆, 匯入 {stats['imports']} 次 (失敗 {stats['import_failures']})")
+            return stats['failed'] == 0
+
         except Exception as e:
             logger.error(f"❌ 資料收集失敗: {e}")
             return False
@@ -162,8 +153,8 @@ class CollectAndImportTool:
             logger.error(f"❌ PostgreSQL匯入過程發生錯誤: {e}")
             return False
     
-    def run(self, user_id, password, symbol, kline_type, start_date, end_date, 
-            trading_session='DAY', auto_import=True):
+    def run(self, user_id, password, symbols, kline_type, start_date, end_date,
+            trading_session='ALL', auto_import=True, chunk_days=DOWNLOAD_CHUNK_DAYS, include_ticks=False):
         """執行完整的收集和匯入流程"""
         try:
             # 1. 初始化
@@ -174,16 +165,12 @@ class CollectAndImportTool:
             if not self.login(user_id, password):
                 return False
             
-            # 3. 收集資料
-            if not self.collect_data(symbol, kline_type, start_date, end_date, trading_session):
+            # 3. 收集資料（自動匯入在下載期間於背景進行）
+            if not self.collect_data(symbols, kline_type, start_date, end_date, trading_session,
+                                     chunk_days, include_ticks, auto_import):
+                logger.warning("⚠️ 部分段落未完成，重新執行相同指令即可續傳")
                 return False
             
-            # 4. 自動匯入（如果啟用）
-            if auto_import:
-                if not self.import_to_postgres(symbol, kline_type):
-                    logger.warning("⚠️ 自動匯入失敗，但資料收集成功")
-                    return True  # 收集成功，匯入失敗不算整體失敗
-            
             logger.info("🎉 完整流程執行成功！")
             return True
             
@@ -204,15 +191,20 @@ def main():
     parser.add_argument('--password', required=True, help='群益證券密碼')
     
     # 收集參數
-    parser.add_argument('--symbol', default='MTX00', help='商品代碼 (預設: MTX00)')
+    parser.add_argument('--symbol', dest='symbols', nargs='+', default=['MTX00'],
+                       help='商品代碼，可指定多個 (預設: MTX00)')
     parser.add_argument('--kline-type', default='MINUTE', 
                        choices=['MINUTE', 'DAILY', 'WEEKLY', 'MONTHLY'],
                        help='K線類型 (預設: MINUTE)')
     parser.add_argument('--start-date', required=True, help='開始日期 (YYYYMMDD)')
     parser.add_argument('--end-date', required=True, help='結束日期 (YYYYMMDD)')
-    parser.add_argument('--trading-session', default='DAY',
-                       choices=['DAY', 'NIGHT', 'ALL'],
-                       help='交易時段 (預設: DAY)')
+    parser.add_argument('--trading-session', default='ALL',
+                       choices=['ALL', 'AM_ONLY'],
+                       help='交易時段 (預設: ALL)')
+    parser.add_argument('--chunk-days', type=int, default=DOWNLOAD_CHUNK_DAYS,
+                       help=f'K線每段請求天數 (預設: {DOWNLOAD_CHUNK_DAYS})')
+    parser.add_argument('--include-ticks', action='store_true',
+                       help='同時收集當日歷史逐筆與五檔')
     
     # 匯入參數
     parser.add_argument('--no-auto-import', action='store_true',
@@ -227,12 +219,14 @@ def main():
     success = tool.run(
         user_id=args.user_id,
         password=args.password,
-        symbol=args.symbol,
+        symbols=args.symbols,
         kline_type=args.kline_type,
         start_date=args.start_date,
         end_date=args.end_date,
         trading_session=args.trading_session,
-        auto_import=not args.no_auto_import
+        auto_import=not args.no_auto_import,
+        chunk_days=args.chunk_days,
+        include_ticks=args.include_ticks
     )
     
     return 0 if success else 1
@@ -14,6 +14,8 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from .base_collector import BaseCollector
+from database.buffered_writer import DoubleBufferWriter
+from database.db_manager import BEST5_COLUMNS, BEST5_INSERT_SQL
 from history_config import BATCH_SIZE, DEFAULT_SYMBOL
 
 logger = logging.getLogger(__name__)
@@ -30,7 +32,8 @@ class Best5Collector(BaseCollector):
             db_manager: 資料庫管理器
         """
         super().__init__(skcom_manager, db_manager)
-        self.best5_buffer = []  # 批量插入緩衝區
+        # 雙緩衝背景寫入器（回調只附加 tuple，由背景執行緒批量寫入）
+        self.best5_writer = DoubleBufferWriter(getattr(db_manager, 'db_path', None), BEST5_INSERT_SQL, 'best5')
         self.current_symbol = None
         self.printed_count = 0  # 追蹤已列印的資料筆數
 
@@ -42,13 +45,14 @@ class Best5Collector(BaseCollector):
         if self.skcom_manager:
             self.skcom_manager.on_best5_received = self.on_best5_received
 
-    def start_collection(self, symbol=DEFAULT_SYMBOL, page_no=0):
+    def start_collection(self, symbol=DEFAULT_SYMBOL, page_no=0, send_request=True):
         """
         開始收集五檔資料
         
         Args:
             symbol: 商品代碼
             page_no: 頁數（歷史資料用）
+            send_request: 是否送出請求（逐筆收集器已送出 RequestTicks 時設為False，只接收五檔）
             
         Returns:
             bool: 是否成功開始收集
@@ -65,11 +69,11 @@ class Best5Collector(BaseCollector):
             
             self.is_collecting = True
             self.current_symbol = symbol
-            self.best5_buffer.clear()
             self.printed_count = 0  # 重置列印計數器
+            self.best5_writer.start()
 
             # 五檔資料與逐筆資料使用相同的API
-            if not self.skcom_manager.request_history_ticks(symbol, page_no):
+            if send_request and not self.skcom_manager.request_history_ticks(symbol, page_no):
                 self.stop_collection()
                 return False
 
@@ -86,9 +90,9 @@ class Best5Collector(BaseCollector):
         try:
             self.is_collecting = False
 
-            # 處理剩餘的緩衝區資料
-            if self.best5_buffer:
-                self._flush_buffer()
+            # 寫完剩餘的緩衝區資料並停止背景寫入器
+            self.best5_writer.stop()
+            self._log_writer_stats()
 
             # 結束收集記錄
             self.end_collection_log('COMPLETED')
@@ -125,62 +129,35 @@ class Best5Collector(BaseCollector):
             # 取得當前時間作為時間戳記
             now = datetime.now()
             
-            # 格式化資料
-            best5_data = {
-                'symbol': self.current_symbol,
-                'market_no': sMarketNo,
-                'index_code': nIndex,
-                'trade_date': now.strftime('%Y%m%d'),
-                'trade_time': now.strftime('%H%M%S'),
-                
-                # 五檔買價買量
-                'bid_price_1': self.format_price(nBestBid1),
-                'bid_volume_1': nBestBidQty1,
-                'bid_price_2': self.format_price(nBestBid2),
-                'bid_volume_2': nBestBidQty2,
-                'bid_price_3': self.format_price(nBestBid3),
-                'bid_volume_3': nBestBidQty3,
-                'bid_price_4': self.format_price(nBestBid4),
-                'bid_volume_4': nBestBidQty4,
-                'bid_price_5': self.format_price(nBestBid5),
-                'bid_volume_5': nBestBidQty5,
-                
-                # 五檔賣價賣量
-                'ask_price_1': self.format_price(nBestAsk1),
-                'ask_volume_1': nBestAskQty1,
-                'ask_price_2': self.format_price(nBestAsk2),
-                'ask_volume_2': nBestAskQty2,
-                'ask_price_3': self.format_price(nBestAsk3),
-                'ask_volume_3': nBestAskQty3,
-                'ask_price_4': self.format_price(nBestAsk4),
-                'ask_volume_4': nBestAskQty4,
-                'ask_price_5': self.format_price(nBestAsk5),
-                'ask_volume_5': nBestAskQty5,
-                
-                # 延伸買賣
-                'extend_bid': self.format_price(nExtendBid),
-                'extend_bid_qty': nExtendBidQty,
-                'extend_ask': self.format_price(nExtendAsk),
-                'extend_ask_qty': nExtendAskQty,
-                'simulate_flag': nSimulate
-            }
-
-            # 驗證資料（至少要有一檔買價或賣價）
-            required_fields = ['symbol', 'trade_date', 'trade_time']
-            if not self.validate_data(best5_data, required_fields):
+            # 驗證資料
+            if self.current_symbol is None:
                 self.handle_collection_error("五檔資料驗證失敗")
                 return
 
-            # 檢查是否有有效的買賣價格
-            has_valid_data = (
-                best5_data['bid_price_1'] is not None or 
-                best5_data['ask_price_1'] is not None
-            )
-            
-            if not has_valid_data:
+            # 檢查是否有有效的買賣價格（至少要有一檔買價或賣價）
+            bid_price_1 = self.format_price(nBestBid1)
+            ask_price_1 = self.format_price(nBestAsk1)
+            if bid_price_1 is None and ask_price_1 is None:
                 logger.debug("五檔資料無有效價格，跳過")
                 return
 
+            # 格式化資料（依 BEST5_COLUMNS 順序組成 tuple，避免每筆建立字典）
+            format_price = self.format_price
+            row = (
+                self.current_symbol, sMarketNo, nIndex, now.strftime('%Y%m%d'), now.strftime('%H%M%S'),
+                # 五檔買價買量
+                bid_price_1, nBestBidQty1, format_price(nBestBid2), nBestBidQty2,
+                format_price(nBestBid3), nBestBidQty3, format_price(nBestBid4), nBestBidQty4,
+                format_price(nBestBid5), nBestBidQty5,
+                # 五檔賣價賣量
+                ask_price_1, nBestAskQty1, format_price(nBestAsk2), nBestAskQty2,
+                format_price(nBestAsk3), nBestAskQty3, format_price(nBestAsk4), nBestAskQty4,
+                format_price(nBestAsk5), nBestAskQty5,
+                # 延伸買賣
+                format_price(nExtendBid), nExtendBidQty, format_price(nExtendAsk), nExtendAskQty,
+                nSimulate
+            )
+
             # 列印前10行轉換後的資料到console
             if self.printed_count < 10:
                 self.printed_count += 1
@@ -193,6 +170,7 @@ class Best5Collector(BaseCollector):
                 print(f"  賣1價: {nBestAsk1}, 量: {nBestAskQty1}")
                 print(f"  賣2價: {nBestAsk2}, 量: {nBestAskQty2}")
                 print(f"  賣3價: {nBestAsk3}, 量: {nBestAskQty3}")
+                best5_data = dict(zip(BEST5_COLUMNS, row))
                 print(f"轉換後資料:")
                 print(f"  商品代碼: {best5_data['symbol']}")
                 print(f"  交易日期: {best5_data['trade_date']}")
@@ -205,38 +183,27 @@ class Best5Collector(BaseCollector):
                 print(f"  賣3: {best5_data['ask_price_3']} x {best5_data['ask_volume_3']}")
                 print("=" * 50)
 
-            # 添加到緩衝區
-            self.best5_buffer.append(best5_data)
+            # 添加到緩衝區（滿批次時由背景寫入器批量插入）
+            self.best5_writer.append(row)
             self.collected_count += 1
 
-            # 批量插入
-            if len(self.best5_buffer) >= BATCH_SIZE:
-                self._flush_buffer()
-
             # 記錄進度
             self.log_collection_progress('BEST5', self.current_symbol, 100)
 
             # 詳細日誌（可選）
             if logger.isEnabledFor(logging.DEBUG):
-                bid1 = best5_data['bid_price_1']
-                ask1 = best5_data['ask_price_1']
-                logger.debug(f"📊 五檔: 買1={bid1} 賣1={ask1} @{best5_data['trade_time']}")
+                logger.debug(f"📊 五檔: 買1={bid_price_1} 賣1={ask_price_1} @{row[4]}")
 
         except Exception as e:
             self.handle_collection_error("處理五檔資料失敗", e)
 
-    def _flush_buffer(self):
-        """清空緩衝區並批量插入資料庫"""
-        if not self.best5_buffer or not self.db_manager:
-            return
-
-        try:
-            self.db_manager.batch_insert_best5_data(self.best5_buffer)
-            logger.debug(f"💾 批量插入 {len(self.best5_buffer)} 筆五檔資料")
-            self.best5_buffer.clear()
-            
-        except Exception as e:
-            self.handle_collection_error("批量插入五檔資料失敗", e)
+    def _log_writer_stats(self):
+        """記錄背景寫入器統計"""
+        stats = self.best5_writer.get_stats()
+        if stats['rows_written'] or stats['rows_failed']:
+            logger.info(f"💾 五檔寫入 {stats['rows_written']} 筆 (新增 {stats['rows_inserted']}, "
+                        f"失敗 {stats['rows_failed']}, 批次 {stats['batches']}, "
+                        f"背壓 {stats['backpressure_events']} 次/{stats['backpressure_seconds']}秒)")
 
     def get_buffer_status(self):
         """
@@ -245,10 +212,12 @@ class Best5Collector(BaseCollector):
         Returns:
             dict: 緩衝區狀態資訊
         """
+        pending = self.best5_writer.pending
         return {
-            'buffer_size': len(self.best5_buffer),
+            'buffer_size': pending,
             'buffer_limit': BATCH_SIZE,
-            'buffer_usage': f"{len(self.best5_buffer)}/{BATCH_SIZE}"
+            'buffer_usage': f"{pending}/{BATCH_SIZE}",
+            'writer': self.best5_writer.get_stats()
         }
 
     def get_latest_best5(self):
@@ -258,6 +227,7 @@ class Best5Collector(BaseCollector):
         Returns:
             dict: 最新五檔資料，無資料時返回None
         """
-        if self.best5_buffer:
-            return self.best5_buffer[-1].copy()
-        return None
+        row = self.best5_writer.latest()
+        if row is None:
+            return None
+        return dict(zip(BEST5_COLUMNS, row))
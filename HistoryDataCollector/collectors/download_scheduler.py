@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+歷史資料下載排程器 - 多商品、多區間無人值守回補
+將長日期區間切段、依API頻率限制連續送出請求、以 collection_log 續傳，
+每段完成後在背景匯入 PostgreSQL (只匯入該段日期區間)，同時下載下一段
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+# 添加專案路徑
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from .best5_collector import Best5Collector
+from .kline_collector import KLineCollector
+from .tick_collector import TickCollector
+from history_config import (DOWNLOAD_CHUNK_DAYS, DOWNLOAD_CHUNK_TIMEOUT, DOWNLOAD_MAX_REQUESTS,
+                            DOWNLOAD_MAX_RETRIES, DOWNLOAD_RATE_WINDOW, DOWNLOAD_REQUEST_INTERVAL,
+                            DOWNLOAD_TICK_IDLE_SECONDS)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DownloadChunk:
+    """一段下載工作（K線為一段日期區間；逐筆為當日歷史逐筆）"""
+    kind: str
+    symbol: str
+    start_date: str
+    end_date: str
+    kline_type: str = 'MINUTE'
+    trading_session: str = 'ALL'
+    minute_number: int = 1
+
+    def describe(self):
+        if self.kind == 'KLINE':
+            return f"{self.symbol} {self.kline_type}K線 {self.start_date}~{self.end_date}"
+        return f"{self.symbol} 逐筆 {self.start_date}"
+
+
+def split_date_range(start_date, end_date, chunk_days=DOWNLOAD_CHUNK_DAYS):
+    """
+    將日期區間切成每段最多 chunk_days 天
+
+    Args:
+        start_date: 起始日期 (YYYYMMDD)
+        end_date: 結束日期 (YYYYMMDD)
+        chunk_days: 每段天數
+
+    Returns:
+        list: [(start_date, end_date), ...]
+    """
+    start = datetime.strptime(start_date, '%Y%m%d')
+    end = datetime.strptime(end_date, '%Y%m%d')
+    if start > end:
+        raise ValueError(f"起始日期 {start_date} 晚於結束日期 {end_date}")
+
+    ranges = []
+    while start <= end:
+        chunk_end = min(start + timedelta(days=chunk_days - 1), end)
+        ranges.append((start.strftime('%Y%m%d'), chunk_end.strftime('%Y%m%d')))
+        start = chunk_end + timedelta(days=1)
+    return ranges
+
+
+def plan_chunks(symbols, start_date, end_date, kline_type='MINUTE', trading_session='ALL',
+                minute_number=1, chunk_days=DOWNLOAD_CHUNK_DAYS, include_ticks=False, tick_date=None):
+    """
+    產生下載工作清單：每個商品的K線依日期切段，逐筆每商品一段
+
+    群益 RequestTicks 只回傳當日歷史逐筆，無法指定日期，因此逐筆以執行日 (tick_date) 為一段
+
+    Returns:
+        list: DownloadChunk 列表
+    """
+    chunks = []
+    ranges = split_date_range(start_date, end_date, chunk_days)
+    for symbol in symbols:
+        for chunk_start, chunk_end in ranges:
+            chunks.append(DownloadChunk('KLINE', symbol, chunk_start, chunk_end,
+                                        kline_type, trading_session, minute_number))
+        if include_ticks:
+            day = tick_date or datetime.now().strftime('%Y%m%d')
+            chunks.append(DownloadChunk('TICK', symbol, day, day))
+    return chunks
+
+
+class RateLimiter:
+    """API請求頻率限制：兩次請求的最小間隔，加上時間窗內的最大請求數"""
+
+    def __init__(self, min_interval=DOWNLOAD_REQUEST_INTERVAL, max_requests=DOWNLOAD_MAX_REQUESTS,
+                 window=DOWNLOAD_RATE_WINDOW, clock=time.monotonic, sleep=time.sleep):
+        self.min_interval = min_interval
+        self.max_requests = max_requests
+        self.window = window
+        self.clock = clock
+        self.sleep = sleep
+        self.request_times = []
+        self.waited_seconds = 0.0
+
+    def acquire(self):
+        """等待到可以送出下一個請求，返回本次等待秒數"""
+        now = self.clock()
+        wait = 0.0
+        if self.request_times:
+            wait = max(wait, self.request_times[-1] + self.min_interval - now)
+        recent = [t for t in self.request_times if t > now - self.window]
+        if self.max_requests and len(recent) >= self.max_requests:
+            wait = max(wait, recent[-self.max_requests] + self.window - now)
+        if wait > 0:
+            self.sleep(wait)
+            self.waited_seconds += wait
+        self.request_times = recent[-max(self.max_requests, 1):] + [self.clock()]
+        return max(wait, 0.0)
+
+
+def pump_events(seconds):
+    """處理 COM 事件（非 Windows 或未安裝 comtypes 時僅等待）"""
+    try:
+        import comtypes.client
+        comtypes.client.PumpEvents(seconds)
+    except Exception:
+        time.sleep(seconds)
+
+
+def postgres_import_function(importer):
+    """
+    將 PostgreSQLImporter 包成排程器使用的匯入函數 (kind, symbol, kline_type, start_date, end_date) -> bool
+
+    只匯入完成段落的日期區間，不再每段都重新讀取該商品的全部歷史資料
+    """
+    def import_chunk(kind, symbol, kline_type, start_date, end_date):
+        dates = {'start_date': start_date, 'end_date': end_date}
+        if kind == 'KLINE':
+            return importer.import_kline_to_postgres(symbol=symbol, kline_type=kline_type, **dates)
+        if kind == 'TICK':
+            return importer.import_tick_to_postgres(symbol=symbol, **dates)
+        if kind == 'BEST5':
+            return importer.import_best5_to_postgres(symbol=symbol, **dates)
+        return False
+    return import_chunk
+
+
+class DownloadScheduler:
+    """
+    歷史資料下載排程器
+
+    - 群益 API 的K線回調只帶商品代碼，無法區分同時進行的多個請求，
+      因此一次只保留一個進行中的請求，上一段完成就立刻送出下一段（受頻率限制）
+    - 每段沿用收集器寫入 collection_log；重新執行時略過已 COMPLETED 的段落
+    - 完成的段落交給背景匯入執行緒，只匯入該段日期區間；
+      同一商品/類型在匯入進行中又完成的段落合併 (擴大日期區間) 為下一次匯入
+    """
+
+    def __init__(self, skcom_manager, db_manager, import_function=None, rate_limiter=None,
+                 chunk_timeout=DOWNLOAD_CHUNK_TIMEOUT, tick_idle_seconds=DOWNLOAD_TICK_IDLE_SECONDS,
+                 max_retries=DOWNLOAD_MAX_RETRIES, collect_best5=True, pump=pump_events):
+        """
+        初始化排程器
+
+        Args:
+            skcom_manager: SKCOM API管理器（測試時可替換為本地模擬物件）
+            db_manager: 資料庫管理器
+            import_function: 匯入函數 (kind, symbol, kline_type, start_date, end_date) -> bool，None表示不匯入
+            rate_limiter: 請求頻率限制器
+            chunk_timeout: 單段等待完成的最長秒數
+            tick_idle_seconds: 逐筆資料無新資料多久視為回傳完畢
+            max_retries: 單段失敗重試次數
+            collect_best5: 逐筆段落是否同時收集五檔
+            pump: 等待時處理 COM 事件的函數
+        """
+        self.skcom_manager = skcom_manager
+        self.db_manager = db_manager
+        self.import_function = import_function
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.chunk_timeout = chunk_timeout
+        self.tick_idle_seconds = tick_idle_seconds
+        self.max_retries = max_retries
+        self.pump = pump
+
+        self.kline_collector = KLineCollector(skcom_manager, db_manager)
+        self.tick_collector = TickCollector(skcom_manager, db_manager)
+        self.best5_collector = Best5Collector(skcom_manager, db_manager) if collect_best5 else None
+
+        self._stop_requested = False
+        self._import_lock = threading.Lock()
+        self._queued_imports = {}  # (kind, symbol, kline_type) -> [start_date, end_date]
+        self._import_futures = []
+        self._executor = None
+        self.stats = {}
+
+    def stop(self):
+        """要求排程器在目前段落結束後停止"""
+        self._stop_requested = True
+
+    def completed_keys(self, symbols):
+        """由 collection_log 取得已完成段落的識別鍵"""
+        keys = set()
+        for symbol in symbols:
+            for record in self.db_manager.get_completed_collections('KLINE', symbol):
+                p = record['parameters']
+                keys.add(('KLINE', symbol, p.get('start_date'), p.get('end_date'), p.get('kline_type'),
+                          p.get('trading_session'), p.get('minute_number')))
+            for record in self.db_manager.get_completed_collections('TICK', symbol):
+                day = str(record['start_time'])[:10].replace('-', '')
+                keys.add(('TICK', symbol, day))
+        return keys
+
+    @staticmethod
+    def chunk_key(chunk):
+        if chunk.kind == 'KLINE':
+            return ('KLINE', chunk.symbol, chunk.start_date, chunk.end_date, chunk.kline_type,
+                    chunk.trading_session, chunk.minute_number)
+        return ('TICK', chunk.symbol, chunk.start_date)
+
+    def run(self, chunks):
+        """
+        執行下載工作
+
+        Args:
+            chunks: DownloadChunk 列表（可由 plan_chunks 產生）
+
+        Returns:
+            dict: 執行統計
+        """
+        started = time.perf_counter()
+        self._stop_requested = False
+        self.stats = {'planned': len(chunks), 'skipped': 0, 'completed': 0, 'failed': 0, 'retries': 0,
+                      'imports': 0, 'import_failures': 0, 'records': 0}
+
+        done = self.completed_keys({chunk.symbol for chunk in chunks})
+        pending = [chunk for chunk in chunks if self.chunk_key(chunk) not in done]
+        self.stats['skipped'] = len(chunks) - len(pending)
+        if self.stats['skipped']:
+            logger.info(f"⏭️ 依收集記錄略過 {self.stats['skipped']} 段已完成的下載")
+        logger.info(f"🚀 開始排程下載 {len(pending)} 段 (共規劃 {len(chunks)} 段)")
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='history-import') as executor:
+            self._executor = executor
+            for index, chunk in enumerate(pending, 1):
+                if self._stop_requested:
+                    logger.warning("🛑 排程已停止，剩餘段落待下次續傳")
+                    break
+                logger.info(f"📥 [{index}/{len(pending)}] {chunk.describe()}")
+                records = self._download_with_retry(chunk)
+                if records is None:
+                    self.stats['failed'] += 1
+                    continue
+                self.stats['completed'] += 1
+                self.stats['records'] += records
+                self._schedule_imports(chunk)
+
+            for future in list(self._import_futures):
+                future.result()
+            self._executor = None
+
+        self.stats['rate_limit_wait_seconds'] = round(self.rate_limiter.waited_seconds, 2)
+        self.stats['elapsed_seconds'] = round(time.perf_counter() - started, 2)
+        logger.info(f"✅ 排程下載結束 - 完成 {self.stats['completed']} 段、略過 {self.stats['skipped']} 段、"
+                    f"失敗 {self.stats['failed']} 段，共 {self.stats['records']:,} 筆")
+        return self.stats
+
+    def _download_with_retry(self, chunk):
+        """下載一段，失敗時重試，返回筆數；全部失敗返回 None"""
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats['retries'] += 1
+                logger.warning(f"🔄 重試 {chunk.describe()} (第 {attempt} 次)")
+            self.rate_limiter.acquire()
+            records = self._download(chunk)
+            if records is not None:
+                return records
+        logger.error(f"❌ {chunk.describe()} 下載失敗，下次執行時續傳")
+        return None
+
+    def _download(self, chunk):
+        if chunk.kind == 'KLINE':
+            return self._download_kline(chunk)
+        return self._download_ticks(chunk)
+
+    def _download_kline(self, chunk):
+        collector = self.kline_collector
+        if not collector.start_collection(chunk.symbol, chunk.kline_type, chunk.start_date, chunk.end_date,
+                                          chunk.trading_session, chunk.minute_number):
+            return None
+
+        deadline = time.monotonic() + self.chunk_timeout
+        while not collector.is_complete and time.monotonic() < deadline:
+            self.pump(0.05)
+
+        if not collector.is_complete:
+            logger.warning(f"⚠️ {chunk.describe()} 等待逾時 ({self.chunk_timeout}秒)")
+            collector.stop_collection()
+            return None
+        return collector.collected_count
+
+    def _download_ticks(self, chunk):
+        collectors = [c for c in (self.tick_collector, self.best5_collector) if c is not None]
+        # 五檔與逐筆由同一個 RequestTicks 回傳，五檔收集器只接收不另外請求
+        if self.best5_collector:
+            self.best5_collector.start_collection(chunk.symbol, send_request=False)
+        if not self.tick_collector.start_collection(chunk.symbol):
+            if self.best5_collector:
+                self.best5_collector.stop_collection()
+            return None
+
+        # 歷史逐筆沒有結束事件，以一段時間沒有新資料視為回傳完畢
+        deadline = time.monotonic() + self.chunk_timeout
+        last_count, last_change = -1, time.monotonic()
+        while time.monotonic() < deadline:
+            count = sum(c.collected_count for c in collectors)
+            if count != last_count:
+                last_count, last_change = count, time.monotonic()
+            elif time.monotonic() - last_change >= self.tick_idle_seconds:
+                break
+            self.pump(0.05)
+
+        for collector in collectors:
+            collector.stop_collection()
+        return self.tick_collector.collected_count
+
+    def _schedule_imports(self, chunk):
+        """把完成段落的匯入交給背景執行緒；同一目標已在佇列中時合併"""
+        if self.import_function is None:
+            return
+        kinds = ['KLINE'] if chunk.kind == 'KLINE' else ['TICK'] + (['BEST5'] if self.best5_collector else [])
+        for kind in kinds:
+            key = (kind, chunk.symbol, chunk.kline_type if kind == 'KLINE' else None)
+            with self._import_lock:
+                queued = self._queued_imports.get(key)
+                if queued is not None:
+                    queued[0] = min(queued[0], chunk.start_date)
+                    queued[1] = max(queued[1], chunk.end_date)
+                    continue
+                self._queued_imports[key] = [chunk.start_date, chunk.end_date]
+            self._import_futures.append(self._executor.submit(self._run_import, key))
+
+    def _run_import(self, key):
+        with self._import_lock:
+            start_date, end_date = self._queued_imports.pop(key)
+        kind, symbol, kline_type = key
+        try:
+            ok = self.import_function(kind, symbol, kline_type, start_date, end_date)
+        except Exception as e:
+            logger.error(f"❌ 匯入 {symbol} {kind} 失敗: {e}")
+            ok = False
+        self.stats['imports'] += 1
+        if not ok:
+            self.stats['import_failures'] += 1
+        return ok
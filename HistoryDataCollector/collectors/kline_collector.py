@@ -14,6 +14,8 @@ from datetime import datetime, timedelta
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from .base_collector import BaseCollector
+from database.buffered_writer import DoubleBufferWriter
+from database.db_manager import KLINE_COLUMNS, KLINE_INSERT_SQL
 from history_config import (
     DEFAULT_SYMBOL, KLINE_TYPES, TRADING_SESSIONS, 
     TRADING_SESSION_NAMES, DEFAULT_DATE_RANGE
@@ -34,7 +36,8 @@ class KLineCollector(BaseCollector):
             db_manager: 資料庫管理器
         """
         super().__init__(skcom_manager, db_manager)
-        self.kline_buffer = []
+        # 雙緩衝背景寫入器（回調只附加 tuple，由背景執行緒批量寫入）
+        self.kline_writer = DoubleBufferWriter(getattr(db_manager, 'db_path', None), KLINE_INSERT_SQL, 'kline')
         self.current_symbol = None
         self.current_kline_type = None
         self.is_complete = False
@@ -106,8 +109,8 @@ class KLineCollector(BaseCollector):
             self.is_complete = False
             self.current_symbol = symbol
             self.current_kline_type = kline_type
-            self.kline_buffer.clear()
             self.printed_count = 0  # 重置列印計數器
+            self.kline_writer.start()
 
             # 轉換參數
             api_kline_type = KLINE_TYPES[kline_type]
@@ -133,9 +136,9 @@ class KLineCollector(BaseCollector):
         try:
             self.is_collecting = False
 
-            # 處理剩餘的緩衝區資料
-            if self.kline_buffer:
-                self._flush_buffer()
+            # 寫完剩餘的緩衝區資料並停止背景寫入器
+            self.kline_writer.stop()
+            self._log_writer_stats()
 
             # 結束收集記錄
             status = 'COMPLETED' if self.is_complete else 'STOPPED'
@@ -166,48 +169,37 @@ class KLineCollector(BaseCollector):
             # 根據K線類型決定是否有時間欄位
             has_time = self.current_kline_type == 'MINUTE'
             
+            # 依 KLINE_COLUMNS 順序組成 tuple，避免每筆建立字典
             if has_time and len(data_parts) >= 7:
                 # 分線資料：日期,時間,開,高,低,收,量
-                kline_data = {
-                    'symbol': stock_no,
-                    'kline_type': self.current_kline_type,
-                    'trade_date': data_parts[0],
-                    'trade_time': data_parts[1],
-                    'open_price': self._parse_price(data_parts[2]),
-                    'high_price': self._parse_price(data_parts[3]),
-                    'low_price': self._parse_price(data_parts[4]),
-                    'close_price': self._parse_price(data_parts[5]),
-                    'volume': self._parse_volume(data_parts[6])
-                }
+                trade_time = data_parts[1]
+                prices = data_parts[2:6]
+                volume = self._parse_volume(data_parts[6])
             else:
                 # 日線/週線/月線資料：日期,開,高,低,收,量
-                kline_data = {
-                    'symbol': stock_no,
-                    'kline_type': self.current_kline_type,
-                    'trade_date': data_parts[0],
-                    'trade_time': None,
-                    'open_price': self._parse_price(data_parts[1]),
-                    'high_price': self._parse_price(data_parts[2]),
-                    'low_price': self._parse_price(data_parts[3]),
-                    'close_price': self._parse_price(data_parts[4]),
-                    'volume': self._parse_volume(data_parts[5]) if len(data_parts) > 5 else None
-                }
+                trade_time = None
+                prices = data_parts[1:5]
+                volume = self._parse_volume(data_parts[5]) if len(data_parts) > 5 else None
+            open_price, high_price, low_price, close_price = [self._parse_price(p) for p in prices]
 
             # 驗證資料
-            required_fields = ['symbol', 'trade_date', 'open_price', 'high_price', 
-                             'low_price', 'close_price']
-            if not self.validate_data(kline_data, required_fields):
+            if (stock_no is None or open_price is None or high_price is None
+                    or low_price is None or close_price is None):
                 self.handle_collection_error("K線資料驗證失敗")
                 return
 
-            # 添加到緩衝區
-            self.kline_buffer.append(kline_data)
+            row = (stock_no, self.current_kline_type, data_parts[0], trade_time,
+                   open_price, high_price, low_price, close_price, volume)
+
+            # 添加到緩衝區（滿批次時由背景寫入器批量插入）
+            self.kline_writer.append(row)
             self.collected_count += 1
 
             # 列印前10行轉換後的資料到console
             if self.printed_count < 10:
                 self.printed_count += 1
                 print(f"\n=== 第 {self.printed_count} 筆轉換後的K線資料 ===")
+                kline_data = dict(zip(KLINE_COLUMNS, row))
                 print(f"原始資料: {data}")
                 print(f"轉換後資料:")
                 print(f"  商品代碼: {kline_data['symbol']}")
@@ -226,9 +218,9 @@ class KLineCollector(BaseCollector):
 
             # 詳細日誌（可選）
             if logger.isEnabledFor(logging.DEBUG):
-                ohlc = f"O:{kline_data['open_price']} H:{kline_data['high_price']} L:{kline_data['low_price']} C:{kline_data['close_price']}"
-                time_info = f" @{kline_data['trade_time']}" if kline_data['trade_time'] else ""
-                logger.debug(f"📈 K線: {ohlc} V:{kline_data['volume']} {kline_data['trade_date']}{time_info}")
+                ohlc = f"O:{open_price} H:{high_price} L:{low_price} C:{close_price}"
+                time_info = f" @{trade_time}" if trade_time else ""
+                logger.debug(f"📈 K線: {ohlc} V:{volume} {data_parts[0]}{time_info}")
 
         except Exception as e:
             self.handle_collection_error("處理K線資料失敗", e)
@@ -244,10 +236,7 @@ class KLineCollector(BaseCollector):
             logger.info("✅ K線資料查詢完成")
             self.is_complete = True
 
-            # 處理剩餘的緩衝區資料
-            if self.kline_buffer:
-                self._flush_buffer()
-
+            # 停止收集時會寫完剩餘的緩衝區資料
             self.stop_collection()
 
     def _parse_price(self, price_str):
@@ -268,18 +257,13 @@ class KLineCollector(BaseCollector):
         except (ValueError, TypeError):
             return None
 
-    def _flush_buffer(self):
-        """清空緩衝區並批量插入資料庫"""
-        if not self.kline_buffer or not self.db_manager:
-            return
-
-        try:
-            self.db_manager.batch_insert_kline_data(self.kline_buffer)
-            logger.debug(f"💾 批量插入 {len(self.kline_buffer)} 筆K線資料")
-            self.kline_buffer.clear()
-            
-        except Exception as e:
-            self.handle_collection_error("批量插入K線資料失敗", e)
+    def _log_writer_stats(self):
+        """記錄背景寫入器統計"""
+        stats = self.kline_writer.get_stats()
+        if stats['rows_written'] or stats['rows_failed']:
+            logger.info(f"💾 K線寫入 {stats['rows_written']} 筆 (新增 {stats['rows_inserted']}, "
+                        f"失敗 {stats['rows_failed']}, 批次 {stats['batches']}, "
+                        f"背壓 {stats['backpressure_events']} 次/{stats['backpressure_seconds']}秒)")
 
     def get_buffer_status(self):
         """
@@ -289,7 +273,8 @@ class KLineCollector(BaseCollector):
             dict: 緩衝區狀態資訊
         """
         return {
-            'buffer_size': len(self.kline_buffer),
+            'buffer_size': self.kline_writer.pending,
             'is_complete': self.is_complete,
-            'kline_type': self.current_kline_type
+            'kline_type': self.current_kline_type,
+            'writer': self.kline_writer.get_stats()
         }
@@ -14,6 +14,8 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from .base_collector import BaseCollector
+from database.buffered_writer import DoubleBufferWriter
+from database.db_manager import TICK_COLUMNS, TICK_INSERT_SQL
 from history_config import BATCH_SIZE, DEFAULT_SYMBOL
 
 logger = logging.getLogger(__name__)
@@ -30,7 +32,8 @@ class TickCollector(BaseCollector):
             db_manager: 資料庫管理器
         """
         super().__init__(skcom_manager, db_manager)
-        self.tick_buffer = []  # 批量插入緩衝區
+        # 雙緩衝背景寫入器（回調只附加 tuple，由背景執行緒批量寫入）
+        self.tick_writer = DoubleBufferWriter(getattr(db_manager, 'db_path', None), TICK_INSERT_SQL, 'tick')
         self.current_symbol = None
         self.printed_count = 0  # 追蹤已列印的資料筆數
 
@@ -70,8 +73,8 @@ class TickCollector(BaseCollector):
             
             self.is_collecting = True
             self.current_symbol = symbol
-            self.tick_buffer.clear()
             self.printed_count = 0  # 重置列印計數器
+            self.tick_writer.start()
 
             # 請求歷史逐筆資料
             if not self.skcom_manager.request_history_ticks(symbol, page_no):
@@ -91,9 +94,9 @@ class TickCollector(BaseCollector):
         try:
             self.is_collecting = False
 
-            # 處理剩餘的緩衝區資料
-            if self.tick_buffer:
-                self._flush_buffer()
+            # 寫完剩餘的緩衝區資料並停止背景寫入器
+            self.tick_writer.stop()
+            self._log_writer_stats()
 
             # 結束收集記錄
             self.end_collection_log('COMPLETED')
@@ -124,29 +127,19 @@ class TickCollector(BaseCollector):
             return
 
         try:
-            # 格式化資料
-            tick_data = {
-                'symbol': self.current_symbol,
-                'market_no': sMarketNo,
-                'index_code': nIndex,
-                'ptr': nPtr,
-                'trade_date': str(nDate),
-                'trade_time': str(nTimehms).zfill(6),
-                'trade_time_ms': nTimemillismicros,
-                'bid_price': self.format_price(nBid),
-                'ask_price': self.format_price(nAsk),
-                'close_price': self.format_price(nClose),
-                'volume': nQty,
-                'simulate_flag': nSimulate,
-                'data_type': 'HISTORY'
-            }
+            # 格式化資料（依 TICK_COLUMNS 順序組成 tuple，避免每筆建立字典）
+            trade_date = str(nDate)
+            trade_time = str(nTimehms).zfill(6)
+            close_price = self.format_price(nClose)
 
             # 驗證資料
-            required_fields = ['symbol', 'trade_date', 'trade_time', 'close_price', 'volume']
-            if not self.validate_data(tick_data, required_fields):
+            if self.current_symbol is None or close_price is None or nQty is None:
                 self.handle_collection_error("歷史逐筆資料驗證失敗")
                 return
 
+            row = (self.current_symbol, sMarketNo, nIndex, nPtr, trade_date, trade_time, nTimemillismicros,
+                   self.format_price(nBid), self.format_price(nAsk), close_price, nQty, nSimulate, 'HISTORY')
+
             # 列印前10行轉換後的資料到console
             if self.printed_count < 10:
                 self.printed_count += 1
@@ -160,6 +153,7 @@ class TickCollector(BaseCollector):
                 print(f"  賣價: {nAsk}")
                 print(f"  成交價: {nClose}")
                 print(f"  成交量: {nQty}")
+                tick_data = dict(zip(TICK_COLUMNS, row))
                 print(f"轉換後資料:")
                 print(f"  商品代碼: {tick_data['symbol']}")
                 print(f"  交易日期: {tick_data['trade_date']}")
@@ -171,14 +165,10 @@ class TickCollector(BaseCollector):
                 print(f"  毫秒: {tick_data['trade_time_ms']}")
                 print("=" * 50)
 
-            # 添加到緩衝區
-            self.tick_buffer.append(tick_data)
+            # 添加到緩衝區（滿批次時由背景寫入器批量插入）
+            self.tick_writer.append(row)
             self.collected_count += 1
 
-            # 批量插入
-            if len(self.tick_buffer) >= BATCH_SIZE:
-                self._flush_buffer()
-
             # 記錄進度
             self.log_collection_progress('TICK', self.current_symbol, 1000)
 
@@ -229,18 +219,13 @@ class TickCollector(BaseCollector):
         except Exception as e:
             self.handle_collection_error("處理即時逐筆資料失敗", e)
 
-    def _flush_buffer(self):
-        """清空緩衝區並批量插入資料庫"""
-        if not self.tick_buffer or not self.db_manager:
-            return
-
-        try:
-            self.db_manager.batch_insert_tick_data(self.tick_buffer)
-            logger.debug(f"💾 批量插入 {len(self.tick_buffer)} 筆逐筆資料")
-            self.tick_buffer.clear()
-            
-        except Exception as e:
-            self.handle_collection_error("批量插入逐筆資料失敗", e)
+    def _log_writer_stats(self):
+        """記錄背景寫入器統計"""
+        stats = self.tick_writer.get_stats()
+        if stats['rows_written'] or stats['rows_failed']:
+            logger.info(f"💾 逐筆寫入 {stats['rows_written']} 筆 (新增 {stats['rows_inserted']}, "
+                        f"失敗 {stats['rows_failed']}, 批次 {stats['batches']}, "
+                        f"背壓 {stats['backpressure_events']} 次/{stats['backpressure_seconds']}秒)")
 
     def get_buffer_status(self):
         """
@@ -249,8 +234,10 @@ class TickCollector(BaseCollector):
         Returns:
             dict: 緩衝區狀態資訊
         """
+        pending = self.tick_writer.pending
         return {
-            'buffer_size': len(self.tick_buffer),
+            'buffer_size': pending,
             'buffer_limit': BATCH_SIZE,
-            'buffer_usage': f"{len(self.tick_buffer)}/{BATCH_SIZE}"
+            'buffer_usage': f"{pending}/{BATCH_SIZE}",
+            'writer': self.tick_writer.get_stats()
         }
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+雙緩衝背景寫入器 - 讓 COM 回調執行緒只負責附加 tuple
+背景執行緒交換緩衝區後以持久 WAL 連線批量寫入，回調不再等待資料庫
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# 添加專案路徑
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_config import (BATCH_SIZE, WRITER_BACKPRESSURE_TIMEOUT, WRITER_FLUSH_INTERVAL,
+                            WRITER_MAX_PENDING)
+
+logger = logging.getLogger(__name__)
+
+
+class DoubleBufferWriter:
+    """
+    雙緩衝批量寫入器
+
+    - 回調執行緒：append(tuple) 只做 list.append（GIL 下為原子操作），滿批次時喚醒寫入器
+    - 寫入執行緒：交換作用中/備用緩衝區後 executemany，寫完以 del buf[:n] 移除已寫入的筆數，
+      交換瞬間晚到、落在舊緩衝區的資料會留在原處，於下一輪寫入，不需要鎖也不會遺失
+    - 持久連線在寫入執行緒內建立 (WAL + synchronous=NORMAL)，固定的 INSERT 字串由
+      sqlite3 語句快取重複使用，不必每批重新編譯
+    - 待寫入筆數超過 max_pending 時回調短暫等待寫入器交換（背壓），並記錄於統計
+    """
+
+    def __init__(self, db_path, insert_sql, name, batch_size=BATCH_SIZE,
+                 flush_interval=WRITER_FLUSH_INTERVAL, max_pending=WRITER_MAX_PENDING,
+                 backpressure_timeout=WRITER_BACKPRESSURE_TIMEOUT):
+        """
+        初始化寫入器
+
+        Args:
+            db_path: SQLite 資料庫路徑，None 時只緩衝不寫入
+            insert_sql: 批量寫入語句
+            name: 寫入器名稱（日誌與執行緒名稱用）
+            batch_size: 喚醒寫入器的批次大小
+            flush_interval: 未滿批次時的最長寫入間隔秒數
+            max_pending: 待寫入筆數上限（背壓門檻）
+            backpressure_timeout: 單次背壓等待上限秒數
+        """
+        self.db_path = db_path
+        self.insert_sql = insert_sql
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max(max_pending, batch_size)
+        self.backpressure_timeout = backpressure_timeout
+
+        # 兩個緩衝區輪流使用，寫完後保留容量重複利用
+        self._active = []
+        self._spare = []
+        self._wake = threading.Event()
+        self._swapped = threading.Event()
+        self._thread = None
+        self._stopping = False
+        self._writing = False
+        self.reset_stats()
+
+    def reset_stats(self):
+        """重設寫入與背壓統計（每次開始收集時呼叫）"""
+        self.rows_written = 0
+        self.rows_inserted = 0
+        self.rows_failed = 0
+        self.batches = 0
+        self.max_pending_seen = 0
+        self.backpressure_events = 0
+        self.backpressure_seconds = 0.0
+        self.write_seconds = 0.0
+        self.last_error = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def pending(self):
+        """尚未寫入的筆數（兩個緩衝區合計）"""
+        return len(self._active) + len(self._spare)
+
+    def start(self):
+        """啟動背景寫入執行緒"""
+        if self.is_running or not self.db_path:
+            return
+        self._stopping = False
+        self.reset_stats()
+        self._thread = threading.Thread(target=self._run, name=f"{self.name}-writer", daemon=True)
+        self._thread.start()
+        logger.debug(f"🧵 {self.name} 背景寫入器已啟動")
+
+    def append(self, row):
+        """附加一筆資料（回調執行緒呼叫）"""
+        buffer = self._active
+        buffer.append(row)
+        size = len(buffer)
+        if size >= self.batch_size:
+            self._wake.set()
+            if size >= self.max_pending:
+                self._apply_backpressure(size)
+
+    def latest(self):
+        """最近附加的一筆資料，無資料時返回 None"""
+        for buffer in (self._active, self._spare):
+            if buffer:
+                return buffer[-1]
+        return None
+
+    def _apply_backpressure(self, size):
+        """待寫入過多時短暫等待寫入器交換緩衝區"""
+        if size > self.max_pending_seen:
+            self.max_pending_seen = size
+        if not self.is_running:
+            return
+        self.backpressure_events += 1
+        started = time.perf_counter()
+        self._swapped.clear()
+        if len(self._active) >= self.max_pending:
+            self._swapped.wait(self.backpressure_timeout)
+        self.backpressure_seconds += time.perf_counter() - started
+
+    def flush(self, timeout=30.0):
+        """
+        等待目前緩衝的資料全部寫入
+
+        Returns:
+            bool: 是否在時限內寫完
+        """
+        if not self.is_running:
+            return self.pending == 0
+        deadline = time.monotonic() + timeout
+        while self.pending or self._writing:
+            if time.monotonic() >= deadline:
+                logger.warning(f"⚠️ {self.name} 寫入器在 {timeout} 秒內未清空，剩餘 {self.pending} 筆")
+                return False
+            self._wake.set()
+            time.sleep(0.005)
+        return True
+
+    def stop(self, timeout=30.0):
+        """寫完剩餘資料並結束寫入執行緒"""
+        if not self.is_running:
+            return self.pending == 0
+        self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"⚠️ {self.name} 寫入器未在 {timeout} 秒內結束，剩餘 {self.pending} 筆")
+            return False
+        self._thread = None
+        return self.pending == 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _run(self):
+        conn = None
+        try:
+            conn = self._connect()
+            while True:
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+                stopping = self._stopping
+                self._drain(conn)
+                if stopping and not self.pending:
+                    break
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"❌ {self.name} 背景寫入器異常結束: {e}")
+        finally:
+            self._swapped.set()
+            if conn is not None:
+                conn.close()
+
+    def _drain(self, conn):
+        """交換緩衝區並寫入，直到兩個緩衝區都清空"""
+        while self._active or self._spare:
+            self._writing = True
+            batch = self._active
+            if batch:
+                self._active, self._spare = self._spare, batch
+            else:
+                batch = self._spare
+            self._swapped.set()
+
+            count = len(batch)
+            self._write(conn, batch[:count])
+            del batch[:count]
+            self._writing = False
+
+    def _write(self, conn, rows):
+        if len(rows) > self.max_pending_seen:
+            self.max_pending_seen = len(rows)
+        started = time.perf_counter()
+        try:
+            cursor = conn.executemany(self.insert_sql, rows)
+            conn.commit()
+            self.rows_inserted += max(cursor.rowcount, 0)
+            self.rows_written += len(rows)
+            self.batches += 1
+            logger.debug(f"💾 {self.name} 批量寫入 {cursor.rowcount}/{len(rows)} 筆")
+        except sqlite3.Error as e:
+            conn.rollback()
+            self.rows_failed += len(rows)
+            self.last_error = str(e)
+            logger.error(f"❌ {self.name} 批量寫入失敗 ({len(rows)} 筆): {e}")
+        finally:
+            self.write_seconds += time.perf_counter() - started
+
+    def get_stats(self):
+        """
+        取得寫入與背壓統計
+
+        Returns:
+            dict: 寫入器統計資訊
+        """
+        return {
+            'pending': self.pending,
+            'rows_written': self.rows_written,
+            'rows_inserted': self.rows_inserted,
+            'rows_failed': self.rows_failed,
+            'batches': self.batches,
+            'max_pending': self.max_pending_seen,
+            'backpressure_events': self.backpressure_events,
+            'backpressure_seconds': round(self.backpressure_seconds, 3),
+            'write_seconds': round(self.write_seconds, 3),
+            'rows_per_sec': round(self.rows_written / self.write_seconds) if self.write_seconds else 0,
+            'last_error': self.last_error,
+        }
@@ -20,6 +20,29 @@ from history_config import DATABASE_PATH, DATA_DIR
 
 logger = logging.getLogger(__name__)
 
+# 批量寫入欄位順序（收集器直接以此順序組成 tuple）
+TICK_COLUMNS = ('symbol', 'market_no', 'index_code', 'ptr', 'trade_date', 'trade_time', 'trade_time_ms',
+                'bid_price', 'ask_price', 'close_price', 'volume', 'simulate_flag', 'data_type')
+BEST5_COLUMNS = ('symbol', 'market_no', 'index_code', 'trade_date', 'trade_time',
+                 'bid_price_1', 'bid_volume_1', 'bid_price_2', 'bid_volume_2', 'bid_price_3', 'bid_volume_3',
+                 'bid_price_4', 'bid_volume_4', 'bid_price_5', 'bid_volume_5',
+                 'ask_price_1', 'ask_volume_1', 'ask_price_2', 'ask_volume_2', 'ask_price_3', 'ask_volume_3',
+                 'ask_price_4', 'ask_volume_4', 'ask_price_5', 'ask_volume_5',
+                 'extend_bid', 'extend_bid_qty', 'extend_ask', 'extend_ask_qty', 'simulate_flag')
+KLINE_COLUMNS = ('symbol', 'kline_type', 'trade_date', 'trade_time',
+                 'open_price', 'high_price', 'low_price', 'close_price', 'volume')
+
+
+def build_insert_sql(table, columns):
+    """產生 INSERT OR IGNORE 語句（固定字串，可被連線的語句快取重複使用）"""
+    return (f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})")
+
+
+TICK_INSERT_SQL = build_insert_sql('tick_data', TICK_COLUMNS)
+BEST5_INSERT_SQL = build_insert_sql('best5_data', BEST5_COLUMNS)
+KLINE_INSERT_SQL = build_insert_sql('kline_data', KLINE_COLUMNS)
+
 class DatabaseManager:
     """資料庫管理器"""
 
@@ -94,12 +117,7 @@ class DatabaseManager:
         Returns:
             bool: 是否成功插入
         """
-        sql = """
-        INSERT OR IGNORE INTO tick_data
-        (symbol, market_no, index_code, ptr, trade_date, trade_time, trade_time_ms,
-         bid_price, ask_price, close_price, volume, simulate_flag, data_type)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
+        sql = TICK_INSERT_SQL
 
         values = (
             tick_data.get('symbol'),
@@ -139,12 +157,7 @@ class DatabaseManager:
         if not tick_data_list:
             return 0
 
-        sql = """
-        INSERT OR IGNORE INTO tick_data
-        (symbol, market_no, index_code, ptr, trade_date, trade_time, trade_time_ms,
-         bid_price, ask_price, close_price, volume, simulate_flag, data_type)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
+        sql = TICK_INSERT_SQL
 
         values_list = []
         for tick_data in tick_data_list:
@@ -189,16 +202,7 @@ class DatabaseManager:
         if not best5_data_list:
             return 0
 
-        sql = """
-        INSERT OR IGNORE INTO best5_data
-        (symbol, market_no, index_code, trade_date, trade_time,
-         bid_price_1, bid_volume_1, bid_price_2, bid_volume_2, bid_price_3, bid_volume_3,
-         bid_price_4, bid_volume_4, bid_price_5, bid_volume_5,
-         ask_price_1, ask_volume_1, ask_price_2, ask_volume_2, ask_price_3, ask_volume_3,
-         ask_price_4, ask_volume_4, ask_price_5, ask_volume_5,
-         extend_bid, extend_bid_qty, extend_ask, extend_ask_qty, simulate_flag)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
+        sql = BEST5_INSERT_SQL
 
         values_list = []
         for best5_data in best5_data_list:
@@ -248,11 +252,7 @@ class DatabaseManager:
         if not kline_data_list:
             return 0
 
-        sql = """
-        INSERT OR IGNORE INTO kline_data
-        (symbol, kline_type, trade_date, trade_time, open_price, high_price, low_price, close_price, volume)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
+        sql = KLINE_INSERT_SQL
 
         values_list = []
         for kline_data in kline_data_list:
@@ -402,6 +402,42 @@ class DatabaseManager:
             logger.error(f"❌ 取得資料統計失敗: {e}")
             return None
 
+    def get_completed_collections(self, collection_type, symbol=None):
+        """
+        取得已完成的收集記錄（排程續傳用）
+
+        Args:
+            collection_type: 收集類型 (TICK/BEST5/KLINE)
+            symbol: 商品代碼，None表示所有商品
+
+        Returns:
+            list: 記錄列表，parameters 已解析為字典
+        """
+        sql = """
+        SELECT symbol, start_time, records_count, parameters
+        FROM collection_log
+        WHERE collection_type = ? AND status = 'COMPLETED'
+        """
+        params = [collection_type]
+        if symbol:
+            sql += " AND symbol = ?"
+            params.append(symbol)
+
+        try:
+            with self.get_connection() as conn:
+                records = []
+                for row in conn.execute(sql, params).fetchall():
+                    record = dict(row)
+                    try:
+                        record['parameters'] = json.loads(record['parameters']) if record['parameters'] else {}
+                    except json.JSONDecodeError:
+                        record['parameters'] = {}
+                    records.append(record)
+                return records
+        except Exception as e:
+            logger.error(f"❌ 取得已完成收集記錄失敗: {e}")
+            return []
+
     def get_collection_history(self, limit=10):
         """
         取得收集歷史記錄
@@ -207,15 +207,21 @@ class PostgreSQLImporter:
             logger.error(f"   日期字串: '{date_str}'")
             return None
 
-    def import_kline_to_postgres(self, symbol='MTX00', kline_type='MINUTE', batch_size=5000, use_copy=False, optimize_performance=True, exclude_anomalies=True):
-        """匯入K線資料到PostgreSQL"""
+    def import_kline_to_postgres(self, symbol='MTX00', kline_type='MINUTE', batch_size=5000, use_copy=False, optimize_performance=True, exclude_anomalies=True,
+                                 start_date=None, end_date=None):
+        """
+        匯入K線資料到PostgreSQL
+
+        Args:
+            start_date / end_date: 只匯入該交易日期區間 (YYYYMMDD)，None 表示不限
+        """
         if not self.postgres_initialized:
             logger.error("❌ PostgreSQL未初始化，無法匯入")
             return False
 
         # 如果使用COPY方式（超高速）
         if use_copy:
-            return self._import_using_copy(symbol, kline_type)
+            return self._import_using_copy(symbol, kline_type, start_date, end_date)
 
         try:
             import time
@@ -230,15 +236,17 @@ class PostgreSQLImporter:
             sqlite_conn.row_factory = sqlite3.Row
 
             # 查詢K線資料
-            query_sql = """
+            from .postgres_streaming_importer import sqlite_date_condition
+            date_sql, date_params = sqlite_date_condition(start_date, end_date)
+            query_sql = f"""
                 SELECT * FROM kline_data
-                WHERE symbol = ? AND kline_type = ?
+                WHERE symbol = ? AND kline_type = ?{date_sql}
                 ORDER BY trade_date, trade_time
             """
             logger.info(f"🔍 執行SQLite查詢: {query_sql.strip()}")
-            logger.info(f"🔍 查詢參數: symbol='{symbol}', kline_type='{kline_type}'")
+            logger.info(f"🔍 查詢參數: symbol='{symbol}', kline_type='{kline_type}', 日期區間={date_params}")
 
-            sqlite_cursor = sqlite_conn.execute(query_sql, (symbol, kline_type))
+            sqlite_cursor = sqlite_conn.execute(query_sql, (symbol, kline_type, *date_params))
 
             # 檢查查詢結果
             all_rows = sqlite_cursor.fetchall()
@@ -530,7 +538,7 @@ class PostgreSQLImporter:
             logger.error(f"❌ 檢查PostgreSQL資料時發生錯誤: {e}")
             return False
 
-    def _import_using_copy(self, symbol, kline_type):
+    def _import_using_copy(self, symbol, kline_type, start_date=None, end_date=None):
         """使用COPY命令超高速匯入（適合大量資料）"""
         import tempfile
         import csv
@@ -545,11 +553,13 @@ class PostgreSQLImporter:
             sqlite_conn.row_factory = sqlite3.Row
 
             # 查詢K線資料
-            sqlite_cursor = sqlite_conn.execute("""
+            from .postgres_streaming_importer import sqlite_date_condition
+            date_sql, date_params = sqlite_date_condition(start_date, end_date)
+            sqlite_cursor = sqlite_conn.execute(f"""
                 SELECT * FROM kline_data
-                WHERE symbol = ? AND kline_type = ?
+                WHERE symbol = ? AND kline_type = ?{date_sql}
                 ORDER BY trade_date, trade_time
-            """, (symbol, kline_type))
+            """, (symbol, kline_type, *date_params))
 
             all_rows = sqlite_cursor.fetchall()
             logger.info(f"📊 查詢到 {len(all_rows)} 筆資料")
@@ -776,12 +786,22 @@ class PostgreSQLImporter:
             logger.error(f"❌ 批量插入逐筆資料失敗: {e}")
             return 0
 
-    def import_tick_to_postgres(self, symbol='MTX00', batch_size=5000, optimize_performance=True):
-        """匯入逐筆資料到PostgreSQL"""
+    def import_tick_to_postgres(self, symbol='MTX00', batch_size=5000, optimize_performance=True, use_copy=True,
+                                start_date=None, end_date=None):
+        """
+        匯入逐筆資料到PostgreSQL
+
+        Args:
+            use_copy: True 使用串流 COPY (分塊讀取、向量化轉換、暫存表去重)；False 使用逐筆轉換 + execute_values
+            start_date / end_date: 只匯入該交易日期區間 (YYYYMMDD)，None 表示不限
+        """
         if not self.postgres_initialized:
             logger.error("❌ PostgreSQL未初始化，無法匯入")
             return False
 
+        if use_copy:
+            return self._import_streaming('tick', symbol, batch_size, optimize_performance, start_date, end_date)
+
         try:
             import time
             total_start_time = time.time()
@@ -795,15 +815,17 @@ class PostgreSQLImporter:
             sqlite_conn.row_factory = sqlite3.Row
 
             # 查詢逐筆資料
-            query_sql = """
+            from .postgres_streaming_importer import sqlite_date_condition
+            date_sql, date_params = sqlite_date_condition(start_date, end_date)
+            query_sql = f"""
                 SELECT * FROM tick_data
-                WHERE symbol = ?
+                WHERE symbol = ?{date_sql}
                 ORDER BY trade_date, trade_time
             """
             logger.info(f"🔍 執行SQLite查詢: {query_sql.strip()}")
-            logger.info(f"🔍 查詢參數: symbol='{symbol}'")
+            logger.info(f"🔍 查詢參數: symbol='{symbol}', 日期區間={date_params}")
 
-            sqlite_cursor = sqlite_conn.execute(query_sql, (symbol,))
+            sqlite_cursor = sqlite_conn.execute(query_sql, (symbol, *date_params))
             all_rows = sqlite_cursor.fetchall()
             logger.info(f"📊 從SQLite查詢到 {len(all_rows)} 筆 {symbol} 逐筆資料")
 
@@ -1099,8 +1121,21 @@ class PostgreSQLImporter:
             logger.error(f"❌ 批量插入五檔資料失敗: {e}")
             return 0
 
-    def import_best5_to_postgres(self, symbol='MTX00', batch_size=5000, optimize_performance=True):
-        """匯入五檔資料到PostgreSQL"""
+    def import_best5_to_postgres(self, symbol='MTX00', batch_size=5000, optimize_performance=True, use_copy=True,
+                                 start_date=None, end_date=None):
+        """
+        匯入五檔資料到PostgreSQL
+
+        Args:
+            use_copy: True 使用串流 COPY (分塊讀取、向量化轉換、暫存表去重)；False 使用逐筆轉換 + execute_values
+            start_date / end_date: 只匯入該交易日期區間 (YYYYMMDD)，None 表示不限
+        """
+        if use_copy:
+            if not self.postgres_initialized:
+                logger.error("❌ PostgreSQL未初始化，無法匯入")
+                return False
+            return self._import_streaming('best5', symbol, batch_size, optimize_performance, start_date, end_date)
+
         # 導入擴展功能
         from .postgres_importer_extensions import PostgreSQLImporterExtensions
 
@@ -1113,7 +1148,24 @@ class PostgreSQLImporter:
                 self._insert_best5_batch_to_postgres = parent._insert_best5_batch_to_postgres
 
         mixed_importer = MixedImporter(self)
-        return mixed_importer.import_best5_to_postgres(symbol, batch_size, optimize_performance)
+        return mixed_importer.import_best5_to_postgres(symbol, batch_size, optimize_performance, start_date, end_date)
+
+    def _import_streaming(self, kind, symbol, batch_size, optimize_performance, start_date=None, end_date=None):
+        """以串流 COPY 匯入逐筆或五檔資料 (每塊至少 DEFAULT_CHUNK_SIZE 筆)"""
+        from .postgres_streaming_importer import DEFAULT_CHUNK_SIZE, StreamingCopyImporter
+
+        try:
+            importer = StreamingCopyImporter(self.sqlite_db_path, shared.get_conn_cur_from_pool_b)
+            stats = importer.import_table(kind, symbol, max(batch_size, DEFAULT_CHUNK_SIZE), optimize_performance,
+                                          start_date, end_date)
+        except Exception as e:
+            logger.error(f"❌ 串流匯入 {kind} 資料失敗: {e}", exc_info=True)
+            return False
+
+        if stats['read'] == 0:
+            logger.warning(f"⚠️ 沒有找到 {symbol} {kind} 資料")
+            return False
+        return stats['converted'] > 0
 
     def import_all_data_to_postgres(self, symbol='MTX00', batch_size=5000, optimize_performance=True):
         """匯入所有類型資料到PostgreSQL"""
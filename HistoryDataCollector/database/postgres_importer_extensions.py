@@ -16,8 +16,9 @@ logger = logging.getLogger(__name__)
 class PostgreSQLImporterExtensions:
     """PostgreSQL匯入器擴展類別"""
     
-    def import_best5_to_postgres(self, symbol='MTX00', batch_size=5000, optimize_performance=True):
-        """匯入五檔資料到PostgreSQL"""
+    def import_best5_to_postgres(self, symbol='MTX00', batch_size=5000, optimize_performance=True,
+                                 start_date=None, end_date=None):
+        """匯入五檔資料到PostgreSQL (start_date / end_date 限定交易日期區間 YYYYMMDD)"""
         if not self.postgres_initialized:
             logger.error("❌ PostgreSQL未初始化，無法匯入")
             return False
@@ -34,15 +35,17 @@ class PostgreSQLImporterExtensions:
             sqlite_conn.row_factory = sqlite3.Row
             
             # 查詢五檔資料
-            query_sql = """
+            from .postgres_streaming_importer import sqlite_date_condition
+            date_sql, date_params = sqlite_date_condition(start_date, end_date)
+            query_sql = f"""
                 SELECT * FROM best5_data
-                WHERE symbol = ?
+                WHERE symbol = ?{date_sql}
                 ORDER BY trade_date, trade_time
             """
             logger.info(f"🔍 執行SQLite查詢: {query_sql.strip()}")
-            logger.info(f"🔍 查詢參數: symbol='{symbol}'")
+            logger.info(f"🔍 查詢參數: symbol='{symbol}', 日期區間={date_params}")
 
-            sqlite_cursor = sqlite_conn.execute(query_sql, (symbol,))
+            sqlite_cursor = sqlite_conn.execute(query_sql, (symbol, *date_params))
             all_rows = sqlite_cursor.fetchall()
             logger.info(f"📊 從SQLite查詢到 {len(all_rows)} 筆 {symbol} 五檔資料")
 
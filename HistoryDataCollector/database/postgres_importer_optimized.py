@@ -12,8 +12,8 @@ import sqlite3
 import time
 from datetime import datetime
 from decimal import Decimal
-import tempfile
 import csv
+import io
 
 # 添加專案路徑
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -186,47 +186,39 @@ class PostgreSQLImporterOptimized:
         
         return converted_data
 
+    def _iter_copy_chunks(self, converted_data, chunk_size=50000):
+        """將轉換後的資料逐塊寫成記憶體中的CSV (不落地暫存檔)"""
+        for start in range(0, len(converted_data), chunk_size):
+            buffer = io.StringIO()
+            csv_writer = csv.writer(buffer)
+            csv_writer.writerows(
+                (data['trade_datetime'].strftime('%Y-%m-%d %H:%M:%S'),
+                 data['open_price'], data['high_price'], data['low_price'], data['close_price'],
+                 data['price_change'], data['percentage_change'], data['volume'])
+                for data in converted_data[start:start + chunk_size]
+            )
+            buffer.seek(0)
+            yield buffer
+
     def _import_using_copy_optimized(self, converted_data):
-        """使用COPY命令超高速匯入"""
+        """使用COPY命令超高速匯入 (記憶體緩衝區逐塊串流)"""
         try:
             logger.info("⚡ 使用COPY命令進行超高速匯入...")
-            
-            # 創建臨時CSV檔案
-            temp_file = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv', encoding='utf-8')
-            csv_writer = csv.writer(temp_file)
-            
-            # 寫入資料
-            for data in converted_data:
-                csv_writer.writerow([
-                    data['trade_datetime'].strftime('%Y-%m-%d %H:%M:%S'),
-                    str(data['open_price']),
-                    str(data['high_price']),
-                    str(data['low_price']),
-                    str(data['close_price']),
-                    str(data['price_change']),
-                    str(data['percentage_change']),
-                    data['volume']
-                ])
-            
-            temp_file.close()
-            
-            # 使用COPY命令匯入
+
             with shared.get_conn_cur_from_pool_b(as_dict=False) as (pg_conn, pg_cursor):
-                with open(temp_file.name, 'r', encoding='utf-8') as f:
+                for buffer in self._iter_copy_chunks(converted_data):
                     pg_cursor.copy_expert("""
                         COPY stock_prices (
                             trade_datetime, open_price, high_price, low_price,
                             close_price, price_change, percentage_change, volume
                         ) FROM STDIN WITH CSV
-                    """, f)
-                
+                    """, buffer)
+
                 pg_conn.commit()
-            
-            # 清理臨時檔案
-            os.unlink(temp_file.name)
+
             logger.info("✅ COPY命令匯入完成")
             return True
-            
+
         except Exception as e:
             logger.error(f"❌ COPY命令匯入失敗: {e}")
             return False
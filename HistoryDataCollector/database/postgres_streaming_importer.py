@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PostgreSQL串流匯入器 - 逐筆/五檔資料以 COPY 串流匯入
+
+🎯 目的：
+    逐筆與五檔資料表可達數千萬筆，原本的做法是 fetchall 全部讀入、逐筆轉換成 dict，
+    再 execute_values 插入 (或先寫暫存CSV檔再 COPY)，記憶體與磁碟 I/O 都加倍。
+    本模組改為：
+    1. SQLite 分塊讀取 (pandas chunksize)，記憶體只保留一塊
+    2. 每塊以向量化運算轉換：價格四捨五入到小數2位、日期+時間+毫秒組成 trade_datetime
+    3. 轉換結果直接寫成記憶體中的 COPY 文字 (io.StringIO)，由產生器逐塊交給 copy_expert
+    4. 先 COPY 到暫存表，再 INSERT ... SELECT DISTINCT ON ... ON CONFLICT DO NOTHING，
+       同時處理批次內與既有資料的重複
+
+📐 用法：
+    importer = StreamingCopyImporter()
+    importer.import_table('tick', symbol='MTX00', chunk_size=100000)
+"""
+
+import io
+import logging
+import sqlite3
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 100000
+
+BEST5_LEVELS = range(1, 6)
+
+TICK_COLUMNS = ['trade_datetime', 'symbol', 'bid_price', 'ask_price', 'close_price',
+                'volume', 'trade_time_ms', 'market_no', 'simulate_flag']
+
+BEST5_COLUMNS = (['trade_datetime', 'symbol']
+                 + [name for level in BEST5_LEVELS for name in (f'bid_price_{level}', f'bid_volume_{level}')]
+                 + [name for level in BEST5_LEVELS for name in (f'ask_price_{level}', f'ask_volume_{level}')]
+                 + ['extend_bid', 'extend_bid_qty', 'extend_ask', 'extend_ask_qty'])
+
+BEST5_PRICE_COLUMNS = ([f'bid_price_{level}' for level in BEST5_LEVELS]
+                       + [f'ask_price_{level}' for level in BEST5_LEVELS]
+                       + ['extend_bid', 'extend_ask'])
+
+CREATE_TICK_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS tick_prices (
+        trade_datetime timestamp without time zone NOT NULL,
+        symbol varchar(20) NOT NULL,
+        bid_price numeric(10,2),
+        ask_price numeric(10,2),
+        close_price numeric(10,2) NOT NULL,
+        volume integer NOT NULL,
+        trade_time_ms integer,
+        market_no integer,
+        simulate_flag integer DEFAULT 0,
+        CONSTRAINT pk_tick_prices PRIMARY KEY (trade_datetime, symbol)
+    )
+"""
+
+CREATE_BEST5_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS best5_prices (
+        trade_datetime timestamp without time zone NOT NULL,
+        symbol varchar(20) NOT NULL,
+
+        -- 五檔買價買量
+        bid_price_1 numeric(10,2), bid_volume_1 integer,
+        bid_price_2 numeric(10,2), bid_volume_2 integer,
+        bid_price_3 numeric(10,2), bid_volume_3 integer,
+        bid_price_4 numeric(10,2), bid_volume_4 integer,
+        bid_price_5 numeric(10,2), bid_volume_5 integer,
+
+        -- 五檔賣價賣量
+        ask_price_1 numeric(10,2), ask_volume_1 integer,
+        ask_price_2 numeric(10,2), ask_volume_2 integer,
+        ask_price_3 numeric(10,2), ask_volume_3 integer,
+        ask_price_4 numeric(10,2), ask_volume_4 integer,
+        ask_price_5 numeric(10,2), ask_volume_5 integer,
+
+        -- 延伸買賣
+        extend_bid numeric(10,2), extend_bid_qty integer,
+        extend_ask numeric(10,2), extend_ask_qty integer,
+
+        CONSTRAINT pk_best5_prices PRIMARY KEY (trade_datetime, symbol)
+    )
+"""
+
+
+def _assemble_datetime(df: pd.DataFrame, with_ms: bool) -> pd.Series:
+    """由 trade_date (YYYYMMDD) + trade_time (HHMMSS) [+ trade_time_ms] 組成時間，無法解析者為 NaT"""
+    text = df['trade_date'].astype(str).str.strip() + df['trade_time'].astype(str).str.strip().str.zfill(6)
+    stamps = pd.to_datetime(text, format='%Y%m%d%H%M%S', errors='coerce')
+    if with_ms:
+        # 與 convert_tick_to_postgres_format 相同：毫秒欄位 × 1000 為微秒，上限 999999
+        millis = pd.to_numeric(df['trade_time_ms'], errors='coerce').fillna(0).clip(lower=0)
+        micros = np.minimum(millis.to_numpy(dtype=np.int64) * 1000, 999999)
+        stamps = stamps + pd.to_timedelta(micros, unit='us')
+    return stamps
+
+
+def _round_prices(values: pd.Series, zero_as_null: bool = False) -> pd.Series:
+    prices = pd.to_numeric(values, errors='coerce').round(2)
+    if zero_as_null:
+        prices = prices.mask(prices == 0)
+    return prices
+
+
+def _nullable_int(values: pd.Series) -> pd.Series:
+    return pd.to_numeric(values, errors='coerce').astype('Int64')
+
+
+def transform_tick_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """逐筆資料向量化轉換 (欄位與 tick_prices 相同；無法解析時間或缺成交價者剔除)"""
+    out = pd.DataFrame({
+        'trade_datetime': _assemble_datetime(df, with_ms=True),
+        'symbol': df['symbol'],
+        'bid_price': _round_prices(df['bid_price']),
+        'ask_price': _round_prices(df['ask_price']),
+        'close_price': _round_prices(df['close_price']),
+        'volume': _nullable_int(df['volume']),
+        'trade_time_ms': _nullable_int(df['trade_time_ms']),
+        'market_no': _nullable_int(df['market_no']),
+        'simulate_flag': _nullable_int(df['simulate_flag']),
+    })
+    return out.dropna(subset=['trade_datetime', 'close_price', 'volume'])
+
+
+def transform_best5_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """五檔資料向量化轉換 (價格為0視為無報價)"""
+    out = pd.DataFrame({'trade_datetime': _assemble_datetime(df, with_ms=False), 'symbol': df['symbol']})
+    for column in BEST5_COLUMNS[2:]:
+        if column in BEST5_PRICE_COLUMNS:
+            out[column] = _round_prices(df[column], zero_as_null=True)
+        else:
+            out[column] = _nullable_int(df[column])
+    return out.dropna(subset=['trade_datetime'])
+
+
+def to_copy_buffer(df: pd.DataFrame, columns: List[str]) -> io.StringIO:
+    """轉成 COPY text 格式 (tab 分隔、\\N 為 NULL) 的記憶體緩衝區"""
+    buffer = io.StringIO()
+    df[columns].to_csv(buffer, sep='\t', header=False, index=False, na_rep='\\N',
+                       float_format='%.2f', date_format='%Y-%m-%d %H:%M:%S.%f')
+    buffer.seek(0)
+    return buffer
+
+
+class TableSpec:
+    """匯入設定：SQLite 來源表、PostgreSQL 目標表、欄位與轉換函式"""
+
+    def __init__(self, sqlite_table: str, pg_table: str, columns: List[str], create_sql: str,
+                 transform: Callable[[pd.DataFrame], pd.DataFrame]):
+        self.sqlite_table = sqlite_table
+        self.pg_table = pg_table
+        self.columns = columns
+        self.create_sql = create_sql
+        self.transform = transform
+
+
+TABLE_SPECS = {
+    'tick': TableSpec('tick_data', 'tick_prices', TICK_COLUMNS, CREATE_TICK_TABLE_SQL, transform_tick_chunk),
+    'best5': TableSpec('best5_data', 'best5_prices', BEST5_COLUMNS, CREATE_BEST5_TABLE_SQL, transform_best5_chunk),
+}
+
+
+def sqlite_date_condition(start_date: Optional[str] = None, end_date: Optional[str] = None) -> Tuple[str, List[str]]:
+    """
+    SQLite 交易日期區間條件
+
+    逐筆/五檔的 trade_date 為 YYYYMMDD，K線為 "YYYY/MM/DD HH:MM"，取前10字並去掉分隔符號後統一以 YYYYMMDD 比較
+
+    Returns:
+        tuple: (" AND ..." 條件字串，未指定區間時為空字串, 參數列表)
+    """
+    day = "REPLACE(REPLACE(SUBSTR(trade_date, 1, 10), '/', ''), '-', '')"
+    conditions, params = [], []
+    if start_date:
+        conditions.append(f"{day} >= ?")
+        params.append(start_date)
+    if end_date:
+        conditions.append(f"{day} <= ?")
+        params.append(end_date)
+    return "".join(f" AND {condition}" for condition in conditions), params
+
+
+def iter_sqlite_chunks(sqlite_path: str, table: str, symbol: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       start_date: Optional[str] = None, end_date: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """依 (trade_date, trade_time) 順序分塊讀取 SQLite 資料 (可限定交易日期區間 YYYYMMDD)"""
+    conn = sqlite3.connect(sqlite_path)
+    try:
+        date_sql, date_params = sqlite_date_condition(start_date, end_date)
+        query = f"SELECT * FROM {table} WHERE symbol = ?{date_sql} ORDER BY trade_date, trade_time"
+        for chunk in pd.read_sql_query(query, conn, params=(symbol, *date_params), chunksize=chunk_size):
+            yield chunk
+    finally:
+        conn.close()
+
+
+def iter_copy_buffers(spec: TableSpec, chunks, stats: Dict) -> Iterator[Tuple[io.StringIO, int]]:
+    """轉換每一塊並產生 (COPY緩衝區, 筆數)，同時累計讀取/轉換筆數"""
+    for chunk in chunks:
+        converted = spec.transform(chunk)
+        stats['read'] += len(chunk)
+        stats['converted'] += len(converted)
+        if len(converted):
+            yield to_copy_buffer(converted, spec.columns), len(converted)
+
+
+class StreamingCopyImporter:
+    """
+    逐筆/五檔資料串流 COPY 匯入器
+
+    Args:
+        sqlite_db_path: 歷史資料 SQLite 路徑
+        get_conn_cur: shared.get_conn_cur_from_pool_b (None 時延後匯入 shared)
+    """
+
+    def __init__(self, sqlite_db_path: str = "data/history_data.db", get_conn_cur: Optional[Callable] = None):
+        self.sqlite_db_path = sqlite_db_path
+        if get_conn_cur is None:
+            import shared
+            get_conn_cur = shared.get_conn_cur_from_pool_b
+        self.get_conn_cur = get_conn_cur
+
+    def import_table(self, kind: str, symbol: str = 'MTX00', chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     optimize_performance: bool = True, start_date: Optional[str] = None,
+                     end_date: Optional[str] = None) -> Dict:
+        """
+        匯入一種資料 ('tick' 或 'best5')；指定 start_date / end_date (YYYYMMDD) 時只匯入該區間
+
+        Returns:
+            dict: read / converted / errors / inserted / duplicates / seconds / rows_per_sec
+        """
+        spec = TABLE_SPECS[kind]
+        stats = {'read': 0, 'converted': 0, 'inserted': 0}
+        started = time.time()
+        staging = f"staging_{spec.pg_table}"
+        column_list = ", ".join(spec.columns)
+
+        with self.get_conn_cur(as_dict=False) as (pg_conn, pg_cursor):
+            if optimize_performance:
+                pg_cursor.execute("SET synchronous_commit = OFF")
+            pg_cursor.execute(spec.create_sql)
+            pg_cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {staging} "
+                              f"(LIKE {spec.pg_table} INCLUDING DEFAULTS)")
+            pg_cursor.execute(f"TRUNCATE {staging}")
+
+            chunks = iter_sqlite_chunks(self.sqlite_db_path, spec.sqlite_table, symbol, chunk_size,
+                                        start_date, end_date)
+            for batch_no, (buffer, rows) in enumerate(iter_copy_buffers(spec, chunks, stats), start=1):
+                pg_cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN", buffer)
+                pg_cursor.execute(f"""
+                    INSERT INTO {spec.pg_table} ({column_list})
+                    SELECT DISTINCT ON (trade_datetime, symbol) {column_list} FROM {staging}
+                    ORDER BY trade_datetime, symbol
+                    ON CONFLICT (trade_datetime, symbol) DO NOTHING
+                """)
+                stats['inserted'] += max(pg_cursor.rowcount, 0)
+                pg_cursor.execute(f"TRUNCATE {staging}")
+                pg_conn.commit()
+
+                elapsed = time.time() - started
+                logger.info(f"📦 {spec.pg_table} 第 {batch_no} 塊: {rows:,} 筆 | 累計讀取 {stats['read']:,} 筆 | "
+                            f"{stats['read'] / elapsed if elapsed > 0 else 0:,.0f} 筆/秒")
+
+            if optimize_performance:
+                pg_cursor.execute("SET synchronous_commit = ON")
+            pg_conn.commit()
+
+        stats['errors'] = stats['read'] - stats['converted']
+        stats['duplicates'] = stats['converted'] - stats['inserted']
+        stats['seconds'] = round(time.time() - started, 3)
+        stats['rows_per_sec'] = round(stats['read'] / stats['seconds'], 1) if stats['seconds'] > 0 else 0.0
+        logger.info(f"✅ {spec.pg_table} 串流匯入完成: 讀取 {stats['read']:,} | 插入 {stats['inserted']:,} | "
+                    f"重複 {stats['duplicates']:,} | 轉換錯誤 {stats['errors']:,} | {stats['rows_per_sec']:,.0f} 筆/秒")
+        return stats
@@ -41,6 +41,20 @@ BATCH_SIZE = 1000             # 批量插入大小
 MAX_RETRY_COUNT = 3           # 最大重試次數
 RETRY_DELAY = 5               # 重試延遲秒數
 
+# 背景寫入器配置（雙緩衝）
+WRITER_FLUSH_INTERVAL = 0.5   # 未滿批次時的最長寫入間隔秒數
+WRITER_MAX_PENDING = BATCH_SIZE * 50   # 待寫入筆數上限，超過時回調短暫等待（背壓）
+WRITER_BACKPRESSURE_TIMEOUT = 0.2      # 單次背壓等待上限秒數
+
+# 下載排程配置（多商品、多區間批次回補）
+DOWNLOAD_CHUNK_DAYS = 30            # K線請求每段天數
+DOWNLOAD_REQUEST_INTERVAL = 1.0     # 兩次API請求的最小間隔秒數
+DOWNLOAD_MAX_REQUESTS = 20          # 每個時間窗內的最大請求數
+DOWNLOAD_RATE_WINDOW = 60           # 請求頻率時間窗秒數
+DOWNLOAD_CHUNK_TIMEOUT = 300        # 單段等待完成的最長秒數
+DOWNLOAD_TICK_IDLE_SECONDS = 10     # 逐筆資料無新資料多久視為回傳完畢
+DOWNLOAD_MAX_RETRIES = 3            # 單段失敗重試次數
+
 # K線類型配置（對應群益API）
 KLINE_TYPES = {
     'MINUTE': 0,              # 分線
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試雙緩衝背景寫入器
+- 回調執行緒持續附加時，背景寫入器交換緩衝區不遺失資料
+- 收集器回調只附加 tuple，停止收集時寫完剩餘資料，結果與原本的批量插入相同
+- 背壓統計
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+# 添加專案路徑
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from collectors.best5_collector import Best5Collector
+from collectors.kline_collector import KLineCollector
+from collectors.tick_collector import TickCollector
+from database.buffered_writer import DoubleBufferWriter
+from database.db_manager import TICK_INSERT_SQL, DatabaseManager
+
+
+class FakeSkcom:
+    """模擬 SKCOM 管理器：不實際請求資料"""
+
+    def is_ready_for_data_collection(self):
+        return True
+
+    def request_history_ticks(self, symbol, page_no):
+        return True
+
+    def request_kline_data(self, *args):
+        return True
+
+
+def _tick_row(i, symbol='MTX00'):
+    second = 9 * 3600 + i // 10
+    time_str = f"{second // 3600:02d}{second % 3600 // 60:02d}{second % 60:02d}"
+    return (symbol, 2, 1, i, '20250701', time_str, i % 10, 22000.0, 22001.0, 22000.5 + i % 7, 1, 0, 'HISTORY')
+
+
+def _count(db_path, table):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_concurrent_appends_are_not_lost():
+    """測試回調持續附加、寫入器同時交換緩衝區時資料完整寫入"""
+    print("🧪 測試雙緩衝寫入完整性")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'history.db')
+        DatabaseManager(db_path)
+        writer = DoubleBufferWriter(db_path, TICK_INSERT_SQL, 'tick', batch_size=500, flush_interval=0.01)
+        writer.start()
+
+        total = 20000
+        producer = threading.Thread(target=lambda: [writer.append(_tick_row(i)) for i in range(total)])
+        producer.start()
+        producer.join()
+        writer.append(_tick_row(0))   # 重複資料由 INSERT OR IGNORE 略過
+        assert writer.stop()
+
+        stats = writer.get_stats()
+        assert stats['rows_written'] == total + 1 and stats['rows_inserted'] == total
+        assert stats['pending'] == 0 and stats['rows_failed'] == 0 and stats['batches'] >= 2
+        assert _count(db_path, 'tick_data') == total
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    print("✅ 雙緩衝寫入完整")
+
+
+def test_backpressure_waits_for_writer():
+    """測試待寫入超過上限時回調等待寫入器並記錄背壓"""
+    print("🧪 測試背壓統計")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'history.db')
+        DatabaseManager(db_path)
+        writer = DoubleBufferWriter(db_path, TICK_INSERT_SQL, 'tick', batch_size=10, flush_interval=5,
+                                    max_pending=50, backpressure_timeout=0.5)
+        # 寫入器未啟動時不等待，只記錄最高待寫入量
+        for i in range(60):
+            writer.append(_tick_row(i))
+        assert writer.backpressure_events == 0 and writer.max_pending_seen >= 50
+
+        writer.start()
+        started = time.perf_counter()
+        for i in range(60, 3000):
+            writer.append(_tick_row(i))
+        assert time.perf_counter() - started < 10
+        assert writer.flush()
+        stats = writer.get_stats()
+        assert stats['rows_written'] == 3000 and stats['backpressure_events'] > 0
+        assert writer.stop()
+    print("✅ 背壓統計正常")
+
+
+def test_collectors_write_through_background_writer():
+    """測試三種收集器經由背景寫入器寫入，欄位與原本的批量插入一致"""
+    print("🧪 測試收集器背景寫入")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'history.db')
+        db_manager = DatabaseManager(db_path)
+        skcom = FakeSkcom()
+
+        tick = TickCollector(skcom, db_manager)
+        assert tick.start_collection('MTX00')
+        tick.printed_count = 10   # 略過除錯列印
+        for i in range(2500):
+            tick.on_history_tick_received(2, 1, i, 20250701, 90000 + i % 60, i, 2200000, 2200100, 2200050, 2, 0)
+        tick.on_history_tick_received(2, 1, 9999, 20250701, 90000, 0, 0, 0, 0, 1, 0)   # 無成交價，驗證失敗
+        tick.stop_collection()
+        assert tick.get_buffer_status()['buffer_size'] == 0
+        assert tick.get_buffer_status()['writer']['rows_written'] == 2500 and tick.error_count == 1
+
+        reference = os.path.join(tmp, 'reference.db')
+        DatabaseManager(reference).batch_insert_tick_data([
+            {'symbol': 'MTX00', 'market_no': 2, 'index_code': 1, 'ptr': i, 'trade_date': '20250701',
+             'trade_time': str(90000 + i % 60).zfill(6), 'trade_time_ms': i, 'bid_price': 22000.0,
+             'ask_price': 22001.0, 'close_price': 22000.5, 'volume': 2, 'simulate_flag': 0} for i in range(2500)])
+        columns = "symbol, market_no, index_code, ptr, trade_date, trade_time, trade_time_ms, " \
+                  "bid_price, ask_price, close_price, volume, simulate_flag, data_type"
+        with sqlite3.connect(db_path) as conn, sqlite3.connect(reference) as ref:
+            query = f"SELECT {columns} FROM tick_data ORDER BY ptr"
+            assert conn.execute(query).fetchall() == ref.execute(query).fetchall()
+
+        best5 = Best5Collector(skcom, db_manager)
+        assert best5.start_collection('MTX00')
+        best5.printed_count = 10
+        prices = [2200000 - k * 100 for k in range(5)]
+        best5.on_best5_received(2, 1, *[v for p in prices for v in (p, 3)], 0, 0,
+                                *[v for p in prices for v in (p + 100, 4)], 0, 0, 0)
+        latest = best5.get_latest_best5()
+        assert latest['bid_price_1'] == 22000.0 and latest['ask_volume_5'] == 4 and latest['extend_bid'] is None
+        best5.stop_collection()
+        assert _count(db_path, 'best5_data') == 1
+
+        kline = KLineCollector(skcom, db_manager)
+        assert kline.start_collection('MTX00', start_date='20250701', end_date='20250701')
+        kline.printed_count = 10
+        for minute in range(30):
+            kline.on_kline_received('MTX00', f"2025/07/01,09:{minute:02d},22000,22010,21990,22005,{minute + 1}")
+        kline.on_kline_complete("##")
+        assert kline.is_complete and not kline.is_collecting
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT COUNT(*), SUM(volume), MAX(high_price) FROM kline_data").fetchone() \
+                == (30, 465, 22010.0)
+    print("✅ 收集器背景寫入正常")
+
+
+if __name__ == "__main__":
+    test_concurrent_appends_are_not_lost()
+    test_backpressure_waits_for_writer()
+    test_collectors_write_through_background_writer()
+    print("\n🎯 雙緩衝寫入器測試完成")
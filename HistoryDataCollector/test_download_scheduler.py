@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試歷史資料下載排程器
+- 日期區間切段與頻率限制
+- 以本地模擬 API 執行多商品下載，失敗段落重試，重新執行時依 collection_log 續傳
+- 完成的段落在下載期間背景匯入，只匯入該段日期區間
+"""
+
+import os
+import queue
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+# 添加專案路徑
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from collectors.download_scheduler import (DownloadChunk, DownloadScheduler, RateLimiter, plan_chunks,
+                                           postgres_import_function, split_date_range)
+from database.db_manager import DatabaseManager
+
+
+class StubSkcom:
+    """
+    本地模擬群益 API：請求後由背景執行緒產生事件，
+    事件與 COM 相同，在等待端呼叫 pump 時才於該執行緒派送
+    """
+
+    def __init__(self, failing_starts=()):
+        self.failing_starts = set(failing_starts)
+        self.requests = []
+        self.events = queue.Queue()
+        self.on_kline_received = self.on_kline_complete = None
+        self.on_history_tick_received = self.on_realtime_tick_received = self.on_best5_received = None
+
+    def is_ready_for_data_collection(self):
+        return True
+
+    def request_kline_data(self, symbol, kline_type, start_date, end_date, trading_session, minute_number):
+        self.requests.append(('KLINE', symbol, start_date))
+        if start_date in self.failing_starts:
+            return False
+
+        def deliver():
+            day = datetime.strptime(start_date, '%Y%m%d')
+            while day <= datetime.strptime(end_date, '%Y%m%d'):
+                for minute in range(3):
+                    bar = f"{day:%Y/%m/%d} 08:4{5 + minute},100,101,99,100,{minute + 1}"
+                    self.events.put(lambda bar=bar: self.on_kline_received(symbol, bar))
+                day += timedelta(days=1)
+            self.events.put(lambda: self.on_kline_complete("##"))
+
+        threading.Thread(target=deliver, daemon=True).start()
+        return True
+
+    def request_history_ticks(self, symbol, page_no):
+        self.requests.append(('TICK', symbol, page_no))
+
+        def deliver():
+            for i in range(50):
+                self.events.put(lambda i=i: self.on_history_tick_received(
+                    2, 1, i, 20250701, 84500 + i, 0, 2200000, 2200100, 2200050, 1, 0))
+                if i % 10 == 0:
+                    self.events.put(lambda: self.on_best5_received(
+                        2, 1, *[2200000, 1] * 5, 0, 0, *[2200100, 1] * 5, 0, 0, 0))
+
+        threading.Thread(target=deliver, daemon=True).start()
+        return True
+
+    def pump(self, seconds):
+        """派送已到達的事件，沒有事件時等待"""
+        deadline = time.monotonic() + seconds
+        while True:
+            try:
+                self.events.get(timeout=max(deadline - time.monotonic(), 0))()
+            except queue.Empty:
+                return
+
+
+class RecordingImport:
+    """記錄匯入呼叫，並確認匯入與下載同時進行"""
+
+    def __init__(self, stub):
+        self.stub = stub
+        self.calls = []
+        self.ranges = []
+        self.requests_seen_during_import = 0
+
+    def __call__(self, kind, symbol, kline_type, start_date, end_date):
+        before = len(self.stub.requests)
+        time.sleep(0.15)
+        self.requests_seen_during_import += len(self.stub.requests) - before
+        self.calls.append((kind, symbol, kline_type))
+        self.ranges.append((kind, symbol, start_date, end_date))
+        return True
+
+
+class ManualExecutor:
+    """手動執行的執行緒池替身，用來檢查排入佇列的匯入如何合併"""
+
+    def __init__(self):
+        self.tasks = []
+
+    def submit(self, fn, *args):
+        self.tasks.append((fn, args))
+        return None
+
+    def run_all(self):
+        for fn, args in self.tasks:
+            fn(*args)
+        self.tasks = []
+
+
+def _scheduler(stub, db_manager, import_function=None):
+    return DownloadScheduler(stub, db_manager, import_function,
+                             rate_limiter=RateLimiter(min_interval=0.01, max_requests=100, window=1),
+                             chunk_timeout=5, tick_idle_seconds=0.3, max_retries=1, pump=stub.pump)
+
+
+def test_split_and_plan():
+    """測試日期切段與工作規劃"""
+    print("🧪 測試日期切段")
+    ranges = split_date_range('20240101', '20241231', chunk_days=30)
+    assert len(ranges) == 13 and ranges[0] == ('20240101', '20240130') and ranges[-1][1] == '20241231'
+    assert all((datetime.strptime(b[0], '%Y%m%d') - datetime.strptime(a[1], '%Y%m%d')).days == 1
+               for a, b in zip(ranges, ranges[1:]))
+    assert split_date_range('20240101', '20240101') == [('20240101', '20240101')]
+
+    chunks = plan_chunks(['MTX00', 'TXF00'], '20240101', '20241231', include_ticks=True, tick_date='20250701')
+    assert len(chunks) == 2 * 13 + 2
+    assert [c.kind for c in chunks].count('TICK') == 2 and chunks[13].start_date == '20250701'
+    print("✅ 日期切段正常")
+
+
+def test_rate_limiter_spacing_and_window():
+    """測試最小間隔與時間窗請求上限"""
+    print("🧪 測試頻率限制")
+    now = [0.0]
+    limiter = RateLimiter(min_interval=1.0, max_requests=3, window=10,
+                          clock=lambda: now[0], sleep=lambda s: now.__setitem__(0, now[0] + s))
+    times = []
+    for _ in range(5):
+        limiter.acquire()
+        times.append(now[0])
+    assert times == [0.0, 1.0, 2.0, 10.0, 11.0]
+    assert limiter.waited_seconds == 11.0
+    print("✅ 頻率限制正常")
+
+
+def test_scheduler_retries_resumes_and_imports():
+    """測試多商品排程：失敗重試、續傳、背景匯入"""
+    print("🧪 測試下載排程與續傳")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'history.db')
+        db_manager = DatabaseManager(db_path)
+        chunks = plan_chunks(['MTX00', 'TXF00'], '20240101', '20240309', chunk_days=30,
+                             include_ticks=True, tick_date=datetime.now().strftime('%Y%m%d'))
+        assert len(chunks) == 8
+
+        stub = StubSkcom(failing_starts={'20240131'})
+        importer = RecordingImport(stub)
+        stats = _scheduler(stub, db_manager, importer).run(chunks)
+        assert stats['completed'] == 6 and stats['failed'] == 2 and stats['retries'] == 2
+        assert stats['records'] == 2 * (30 + 9) * 3 + 2 * 50
+        assert importer.calls and stats['import_failures'] == 0
+        assert {('KLINE', 'MTX00', 'MINUTE'), ('TICK', 'TXF00', None), ('BEST5', 'TXF00', None)} <= set(importer.calls)
+        # 每次匯入只涵蓋完成段落的日期區間
+        starts, ends = {c.start_date for c in chunks}, {c.end_date for c in chunks}
+        assert all(start in starts and end in ends and start <= end for _, _, start, end in importer.ranges)
+        # 匯入與下一段下載同時進行
+        assert importer.requests_seen_during_import > 0
+
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM kline_data").fetchone()[0] == 2 * 39 * 3
+            assert conn.execute("SELECT COUNT(*) FROM tick_data").fetchone()[0] == 2 * 50
+            statuses = dict(conn.execute("SELECT status, COUNT(*) FROM collection_log "
+                                         "WHERE collection_type = 'KLINE' GROUP BY status").fetchall())
+        assert statuses == {'COMPLETED': 4, 'STOPPED': 4}
+
+        # 重新執行：只下載先前失敗的段落
+        stub = StubSkcom()
+        importer = RecordingImport(stub)
+        stats = _scheduler(stub, db_manager, importer).run(chunks)
+        assert stats['skipped'] == 6 and stats['completed'] == 2 and stats['failed'] == 0
+        assert stub.requests == [('KLINE', 'MTX00', '20240131'), ('KLINE', 'TXF00', '20240131')]
+        assert sorted(importer.ranges) == [('KLINE', 'MTX00', '20240131', '20240229'),
+                                           ('KLINE', 'TXF00', '20240131', '20240229')]
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM kline_data").fetchone()[0] == 2 * 69 * 3
+
+        # 全部完成後再執行不送出任何請求
+        stub = StubSkcom()
+        stats = _scheduler(stub, db_manager).run(chunks)
+        assert stats['skipped'] == 8 and stub.requests == []
+    print("✅ 下載排程與續傳正常")
+
+
+def test_imports_only_completed_date_ranges():
+    """測試匯入只涵蓋完成段落；匯入開始前又完成的段落合併為一次匯入"""
+    print("🧪 測試分段匯入區間")
+    with tempfile.TemporaryDirectory() as tmp:
+        stub = StubSkcom()
+        importer = RecordingImport(stub)
+        scheduler = _scheduler(stub, DatabaseManager(os.path.join(tmp, 'history.db')), importer)
+        scheduler._executor = ManualExecutor()
+        scheduler.stats = {'imports': 0, 'import_failures': 0}
+
+        for start, end in (('20240101', '20240130'), ('20240131', '20240229')):
+            scheduler._schedule_imports(DownloadChunk('KLINE', 'MTX00', start, end))
+        scheduler._schedule_imports(DownloadChunk('KLINE', 'TXF00', '20240101', '20240130'))
+        scheduler._executor.run_all()
+        assert sorted(importer.ranges) == [('KLINE', 'MTX00', '20240101', '20240229'),
+                                           ('KLINE', 'TXF00', '20240101', '20240130')]
+
+        # 上一次匯入開始後完成的段落只匯入自己的區間
+        scheduler._schedule_imports(DownloadChunk('KLINE', 'MTX00', '20240301', '20240309'))
+        scheduler._executor.run_all()
+        assert importer.ranges[-1] == ('KLINE', 'MTX00', '20240301', '20240309')
+        assert scheduler.stats == {'imports': 3, 'import_failures': 0}
+
+    class FakeImporter:
+        def __init__(self):
+            self.calls = []
+
+        def __getattr__(self, name):
+            return lambda **kwargs: self.calls.append((name, kwargs)) or True
+
+    fake = FakeImporter()
+    import_chunk = postgres_import_function(fake)
+    assert import_chunk('KLINE', 'MTX00', 'MINUTE', '20240101', '20240130')
+    assert import_chunk('TICK', 'MTX00', None, '20250701', '20250701')
+    assert fake.calls == [
+        ('import_kline_to_postgres', {'symbol': 'MTX00', 'kline_type': 'MINUTE',
+                                      'start_date': '20240101', 'end_date': '20240130'}),
+        ('import_tick_to_postgres', {'symbol': 'MTX00', 'start_date': '20250701', 'end_date': '20250701'})]
+    print("✅ 分段匯入區間正常")
+
+
+if __name__ == "__main__":
+    test_split_and_plan()
+    test_rate_limiter_spacing_and_window()
+    test_scheduler_retries_resumes_and_imports()
+    test_imports_only_completed_date_ranges()
+    print("\n🎯 下載排程測試完成")
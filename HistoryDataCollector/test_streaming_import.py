@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試逐筆/五檔串流 COPY 匯入
+- 向量化轉換結果與逐筆轉換 (convert_*_to_postgres_format) 一致
+- 分塊產生 COPY 緩衝區，暫存表去重 (批次內與既有資料)
+- 限定交易日期區間時只讀取該區間 (逐筆 YYYYMMDD 與K線 YYYY/MM/DD HH:MM 兩種日期格式)
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from decimal import Decimal
+
+# 添加專案路徑
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.postgres_importer import PostgreSQLImporter
+from database.postgres_streaming_importer import (BEST5_COLUMNS, TICK_COLUMNS, StreamingCopyImporter,
+                                                  iter_sqlite_chunks, sqlite_date_condition, to_copy_buffer,
+                                                  transform_best5_chunk, transform_tick_chunk)
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'schema.sql')
+
+
+def _create_history_db(path, ticks=2500):
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_PATH, encoding='utf-8') as f:
+        conn.executescript(f.read())
+    rows = []
+    for i in range(ticks):
+        second = 9 * 3600 + i // 3
+        time_str = f"{second // 3600:02d}{second % 3600 // 60:02d}{second % 60:02d}"
+        rows.append(('MTX00', 2, 1, i, '20250701', time_str, (i % 3) * 250 if i % 5 else None,
+                     22000 + i * 0.25, 22001.005 if i % 7 else None, 22000.5 + i % 11, 1 + i % 4, 0))
+    rows.append(('MTX00', 2, 1, 99999, 'bad-date', '090000', 0, 1.0, 1.0, 1.0, 1, 0))   # 無法解析的日期
+    rows.append(('TXF00', 2, 1, 1, '20250701', '090000', 0, 1.0, 1.0, 1.0, 1, 0))        # 其他商品
+    conn.executemany("""
+        INSERT INTO tick_data (symbol, market_no, index_code, ptr, trade_date, trade_time, trade_time_ms,
+                               bid_price, ask_price, close_price, volume, simulate_flag)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+
+    best5 = []
+    for i in range(300):
+        values = {f'bid_price_{k}': 22000 - k + (0 if k != 5 or i % 2 else -22000 + k) for k in range(1, 6)}
+        values.update({f'ask_price_{k}': 22000.125 + k for k in range(1, 6)})
+        best5.append(('MTX00', 2, i, '20250701', f"{9 + i // 60:02d}{i % 60:02d}00",
+                      *[values[f'bid_price_{k}'] for k in range(1, 6)],
+                      *[values[f'ask_price_{k}'] for k in range(1, 6)], i % 9))
+    conn.executemany(f"""
+        INSERT INTO best5_data (symbol, market_no, index_code, trade_date, trade_time,
+                                {', '.join(f'bid_price_{k}' for k in range(1, 6))},
+                                {', '.join(f'ask_price_{k}' for k in range(1, 6))}, bid_volume_1)
+        VALUES ({', '.join('?' * 16)})
+    """, best5)
+    conn.commit()
+    conn.close()
+
+
+def _copy_text(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, Decimal):
+        return f"{value:.2f}"
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+    return str(value)
+
+
+class FakeCursor:
+    """模擬 PostgreSQL 游標：COPY 寫入暫存表、INSERT ... DISTINCT ON ... ON CONFLICT DO NOTHING"""
+
+    def __init__(self):
+        self.staging, self.tables, self.rowcount, self.copy_calls = [], {}, 0, 0
+
+    def copy_expert(self, sql, buffer):
+        self.copy_calls += 1
+        self.staging.extend(line.split('\t') for line in buffer.read().splitlines())
+
+    def execute(self, sql, params=None):
+        statement = " ".join(sql.split())
+        if statement.startswith("INSERT INTO"):
+            table = self.tables.setdefault(statement.split()[2], {})
+            before = len(table)
+            for row in self.staging:
+                table.setdefault((row[0], row[1]), row)
+            self.rowcount = len(table) - before
+        elif statement.startswith("TRUNCATE"):
+            self.staging = []
+
+
+class FakePool:
+    def __init__(self):
+        self.cursor = FakeCursor()
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def __call__(self, as_dict=False):
+        pool = self
+
+        class Context:
+            def __enter__(self):
+                return pool, pool.cursor
+
+            def __exit__(self, *exc):
+                return False
+
+        return Context()
+
+
+def test_vectorized_conversion_matches_row_conversion():
+    """測試向量化轉換與逐筆轉換產生相同的 COPY 內容"""
+    print("🧪 測試向量化轉換")
+    reference = PostgreSQLImporter()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history.db')
+        _create_history_db(path)
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+
+        for table, transform, columns, convert in (
+                ('tick_data', transform_tick_chunk, TICK_COLUMNS, reference.convert_tick_to_postgres_format),
+                ('best5_data', transform_best5_chunk, BEST5_COLUMNS, reference.convert_best5_to_postgres_format)):
+            chunks = list(iter_sqlite_chunks(path, table, 'MTX00', chunk_size=1000))
+            lines = [line for chunk in chunks
+                     for line in to_copy_buffer(transform(chunk), columns).read().splitlines()]
+
+            rows = conn.execute(f"SELECT * FROM {table} WHERE symbol = 'MTX00' "
+                                f"ORDER BY trade_date, trade_time").fetchall()
+            expected = []
+            for row in rows:
+                converted = convert(dict(row))
+                if converted is not None:
+                    expected.append("\t".join(_copy_text(converted.get(column)) for column in columns))
+            assert lines == expected, (table, lines[:2], expected[:2])
+        conn.close()
+    print("✅ 向量化轉換與逐筆轉換一致")
+
+
+def test_streaming_import_dedups_through_staging():
+    """測試分塊 COPY 與暫存表去重"""
+    print("🧪 測試串流匯入與去重")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history.db')
+        _create_history_db(path)
+        pool = FakePool()
+        importer = StreamingCopyImporter(path, get_conn_cur=pool)
+
+        stats = importer.import_table('tick', 'MTX00', chunk_size=1000)
+        assert stats['read'] == 2501 and stats['errors'] == 1
+        assert pool.cursor.copy_calls == 3
+        # 同一秒同毫秒的逐筆 (不同 ptr) 在 PostgreSQL 主鍵相同，只保留一筆
+        unique_keys = len(pool.cursor.tables['tick_prices'])
+        assert stats['inserted'] == unique_keys and stats['duplicates'] == 2500 - unique_keys > 0
+
+        # 重跑時既有資料全部略過
+        again = importer.import_table('tick', 'MTX00', chunk_size=1000)
+        assert again['inserted'] == 0 and again['duplicates'] == 2500
+
+        best5 = importer.import_table('best5', 'MTX00')
+        assert best5['inserted'] == 300 and pool.cursor.copy_calls == 7
+    print("✅ 串流匯入與去重正常")
+
+
+def test_date_range_limits_rows_read():
+    """測試日期區間條件同時適用逐筆與K線的日期格式"""
+    print("🧪 測試日期區間匯入")
+    assert sqlite_date_condition() == ("", [])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history.db')
+        _create_history_db(path, ticks=30)
+        with sqlite3.connect(path) as conn:
+            conn.executemany("""
+                INSERT INTO kline_data (symbol, kline_type, trade_date, trade_time, open_price, high_price,
+                                        low_price, close_price, volume)
+                VALUES ('MTX00', 'MINUTE', ?, NULL, 100, 101, 99, 100, 1)
+            """, [(f"2025/07/0{day} 08:4{minute}",) for day in (1, 2, 3) for minute in (5, 6)])
+
+        def read(table, start_date=None, end_date=None):
+            chunks = iter_sqlite_chunks(path, table, 'MTX00', 1000, start_date, end_date)
+            return sum(len(chunk) for chunk in chunks)
+
+        assert read('kline_data') == 6
+        assert read('kline_data', '20250702') == 4
+        assert read('kline_data', '20250702', '20250702') == 2
+        assert read('tick_data', '20250701', '20250701') == 30
+        assert read('tick_data', '20250702', '20250731') == 0
+
+        pool = FakePool()
+        stats = StreamingCopyImporter(path, get_conn_cur=pool).import_table('tick', 'MTX00', 1000,
+                                                                           start_date='20250702', end_date='20250731')
+        assert stats['read'] == 0 and pool.cursor.copy_calls == 0
+    print("✅ 日期區間匯入正常")
+
+
+if __name__ == "__main__":
+    test_vectorized_conversion_matches_row_conversion()
+    test_streaming_import_dedups_through_staging()
+    test_date_range_limits_rows_read()
+    print("\n🎯 串流匯入測試完成")
@@ -5,177 +5,126 @@
 OrderTester和test_ui_improvements之間的價格數據傳遞
 
 🔗 PRICE_BRIDGE_2025_06_30
-✅ 簡單的檔案共享方式
+✅ 以共享記憶體價格匯流排 (price_bus) 傳遞，不再逐筆寫入 JSON 檔案
 ✅ OrderTester寫入價格
-✅ UI讀取價格
+✅ UI讀取價格 (等待匯流排序號，不再每100ms輪詢檔案)
 ✅ 無需複雜的API初始化
 """
 
-import json
 import time
 import os
 from datetime import datetime
-import threading
 import logging
 
+from price_bus import DEFAULT_BUS_PATH, PriceBusReader, PriceBusWriter
+
 logger = logging.getLogger(__name__)
 
 class PriceBridge:
     """價格橋接類 - 處理OrderTester和UI之間的價格傳遞"""
-    
-    def __init__(self, bridge_file="price_data.json"):
-        self.bridge_file = bridge_file
+
+    def __init__(self, bus_path=DEFAULT_BUS_PATH):
+        self.bus_path = bus_path
         self.is_running = False
         self.last_update = None
         self.price_callback = None
-        
+        self._writer = None
+        self._reader = None
+
     def write_price(self, price, volume=0, timestamp=None):
         """寫入價格數據 (OrderTester調用)"""
         try:
+            if self._writer is None:
+                self._writer = PriceBusWriter(self.bus_path)
+
             if timestamp is None:
                 timestamp = datetime.now()
 
-            # 確保價格和時間戳正確
-            current_time = time.time()
+            self._writer.publish(
+                float(price), volume=int(volume),
+                date=timestamp.year * 10000 + timestamp.month * 100 + timestamp.day,
+                time_hms=timestamp.hour * 10000 + timestamp.minute * 100 + timestamp.second,
+                ms=timestamp.microsecond // 1000
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ 寫入價格失敗: {e}")
+            return False
 
-            price_data = {
-                "price": float(price),
-                "volume": int(volume),
-                "timestamp": timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"),
-                "update_time": current_time
-            }
+    @staticmethod
+    def _to_price_data(tick):
+        """匯流排記錄 → 舊版價格字典"""
+        update_time = tick.publish_ns / 1e9
+        return {
+            "price": tick.price,
+            "volume": tick.volume,
+            "timestamp": datetime.fromtimestamp(update_time).strftime("%Y-%m-%d %H:%M:%S.%f"),
+            "update_time": update_time
+        }
 
-            # 使用臨時檔案避免讀寫衝突
-            temp_file = self.bridge_file + ".tmp"
+    def read_price(self):
+        """讀取最新價格數據 (UI調用)"""
+        try:
+            if self._reader is None:
+                self._reader = PriceBusReader(self.bus_path)
 
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(price_data, f, ensure_ascii=False, indent=2)
-                f.flush()  # 確保寫入完成
-                os.fsync(f.fileno())  # 強制寫入磁碟
+            tick = self._reader.latest()
+            if tick is None:
+                return None
 
-            # 原子性替換檔案
-            if os.path.exists(self.bridge_file):
-                os.remove(self.bridge_file)
-            os.rename(temp_file, self.bridge_file)
+            price_data = self._to_price_data(tick)
 
-            logger.debug(f"📊 寫入價格: {price}")
-            return True
+            # 檢查數據是否太舊 (超過10秒，放寬限制)
+            if time.time() - price_data['update_time'] > 10:
+                logger.warning("⚠️ 價格數據過舊")
+                return None
+
+            return price_data
 
         except Exception as e:
-            logger.error(f"❌ 寫入價格失敗: {e}")
-            # 清理臨時檔案
-            temp_file = self.bridge_file + ".tmp"
-            if os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
-            return False
-    
-    def read_price(self):
-        """讀取價格數據 (UI調用) - 帶重試機制"""
-        max_retries = 3
-        retry_delay = 0.01  # 10ms
-
-        for attempt in range(max_retries):
-            try:
-                if not os.path.exists(self.bridge_file):
-                    return None
-
-                # 檢查檔案大小，避免讀取空檔案
-                if os.path.getsize(self.bridge_file) == 0:
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay)
-                        continue
-                    return None
-
-                with open(self.bridge_file, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    if not content:
-                        if attempt < max_retries - 1:
-                            time.sleep(retry_delay)
-                            continue
-                        return None
-
-                    price_data = json.loads(content)
-
-                # 檢查數據是否太舊 (超過10秒，放寬限制)
-                update_time = price_data.get('update_time', 0)
-                current_time = time.time()
-                if current_time - update_time > 10:
-                    logger.warning("⚠️ 價格數據過舊")
-                    return None
-
-                return price_data
-
-            except json.JSONDecodeError as e:
-                if attempt < max_retries - 1:
-                    logger.debug(f"JSON解析失敗，重試 {attempt + 1}/{max_retries}: {e}")
-                    time.sleep(retry_delay)
-                    continue
-                else:
-                    logger.error(f"❌ JSON解析失敗: {e}")
-                    return None
-
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    logger.debug(f"讀取失敗，重試 {attempt + 1}/{max_retries}: {e}")
-                    time.sleep(retry_delay)
-                    continue
-                else:
-                    logger.error(f"❌ 讀取價格失敗: {e}")
-                    return None
-
-        return None
-    
+            logger.error(f"❌ 讀取價格失敗: {e}")
+            return None
+
     def start_monitoring(self, callback):
-        """開始監控價格變化 (UI調用)"""
+        """開始監控價格變化 (UI調用) - 每筆新報價都會回調"""
         self.price_callback = callback
         self.is_running = True
-        
-        def monitor_thread():
-            last_update_time = 0
-            
-            while self.is_running:
-                try:
-                    price_data = self.read_price()
-                    
-                    if price_data:
-                        update_time = price_data.get('update_time', 0)
-                        
-                        # 只處理新的價格數據
-                        if update_time > last_update_time:
-                            last_update_time = update_time
-                            
-                            if self.price_callback:
-                                self.price_callback(
-                                    price_data['price'],
-                                    price_data.get('volume', 0),
-                                    datetime.strptime(price_data['timestamp'], "%Y-%m-%d %H:%M:%S.%f")
-                                )
-                    
-                    time.sleep(0.1)  # 每100ms檢查一次
-                    
-                except Exception as e:
-                    logger.error(f"❌ 監控價格失敗: {e}")
-                    time.sleep(1)
-        
-        threading.Thread(target=monitor_thread, daemon=True).start()
+
+        def on_tick(tick):
+            if self.price_callback:
+                self.last_update = datetime.fromtimestamp(tick.publish_ns / 1e9)
+                self.price_callback(tick.price, tick.volume, self.last_update)
+
+        if self._reader is None:
+            self._reader = PriceBusReader(self.bus_path)
+        self._reader.start(on_tick)
         logger.info("🚀 價格監控已啟動")
-    
+
     def stop_monitoring(self):
         """停止監控"""
         self.is_running = False
+        if self._reader is not None:
+            self._reader.stop()
         logger.info("⏹️ 價格監控已停止")
-    
+
     def cleanup(self):
-        """清理橋接檔案"""
+        """
+        關閉匯流排
+
+        映射檔案不刪除：其他程序的讀取端仍映射該檔案，刪除後只會留在孤立的 inode 上，
+        看不到下一個寫入端。寫入端改為清除標頭結束本次 session，讀取端會等待下一個寫入端。
+        """
         try:
-            if os.path.exists(self.bridge_file):
-                os.remove(self.bridge_file)
-                logger.info("🗑️ 橋接檔案已清理")
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+            if self._writer is not None:
+                self._writer.close(retire=True)
+                self._writer = None
+                logger.info("🗑️ 價格匯流排 session 已結束")
         except Exception as e:
-            logger.error(f"❌ 清理橋接檔案失敗: {e}")
+            logger.error(f"❌ 關閉價格匯流排失敗: {e}")
 
 # 全域橋接實例
 price_bridge = PriceBridge()
@@ -3,9 +3,9 @@ Queue基礎設施模組
 提供完整的Queue架構來解決GIL錯誤問題
 
 主要組件：
-- QueueManager: 管理Tick資料佇列和日誌佇列
-- TickDataProcessor: 在獨立線程中處理Tick資料
-- UIUpdateManager: 安全地更新UI控件
+- QueueManager: 管理Tick資料佇列和日誌佇列 (深度/延遲/丟棄統計)
+- TickDataProcessor: 在獨立線程中整批處理Tick資料
+- UIUpdateManager: 安全地更新UI控件 (行情每幀只顯示最新一筆)
 
 使用方式：
 1. 初始化Queue基礎設施
@@ -145,6 +145,11 @@ class QueueInfrastructure:
         if self.ui_updater:
             self.ui_updater.add_log_callback(callback)
     
+    def add_tick_callback(self, callback):
+        """添加最新Tick顯示回調函數 (每幀最多一次)"""
+        if self.ui_updater:
+            self.ui_updater.add_tick_callback(callback)
+    
     def put_tick_data(self, market_no, stock_idx, date, time_hms, time_millis, 
                      bid, ask, close, qty, timestamp=None):
         """便捷方法：放入Tick資料"""
@@ -4,16 +4,16 @@ Tick資料處理器
 
 設計原則：
 1. 從tick_data_queue讀取資料
-2. 執行策略計算
+2. 執行策略計算 (整批取出，每筆都交給策略)
 3. 將結果放入log_queue
-4. 完全不直接操作UI
+4. 完全不直接操作UI，只發布最新一筆給UI合併顯示
 """
 
 import threading
 import time
 import logging
 from datetime import datetime
-from typing import Optional, Callable, Dict, Any
+from typing import Optional, Callable, Dict, Any, List
 from queue_infrastructure.queue_manager import QueueManager, TickData, LogMessage, get_queue_manager
 
 logger = logging.getLogger(__name__)
@@ -42,27 +42,35 @@ class TickDataProcessor:
         self.stats = {
             'processed_count': 0,
             'error_count': 0,
+            'batch_count': 0,
+            'largest_batch': 0,
             'last_process_time': None,
             'average_process_time': 0.0
         }
         
+        # 批次處理設定
+        self.max_batch_size = 256       # 每次最多取出筆數
+        self.batch_time_budget = 0.005  # 秒，連續消化佇列的時間預算
+        self.idle_timeout = 1.0         # 秒，佇列為空時的最長等待
+        self._last_log_time = 0.0
+        
         # 最後處理的資料
-        self.last_tick_data = None
+        self.last_tick_data: Optional[TickData] = None
         
         logger.info("TickDataProcessor 初始化完成")
     
-    def add_strategy_callback(self, callback: Callable[[Dict[str, Any]], None]):
+    def add_strategy_callback(self, callback: Callable[[TickData], None]):
         """
         添加策略回調函數
         
         Args:
-            callback: 策略處理函數，接收tick資料字典
+            callback: 策略處理函數，每筆Tick都會收到 TickData (可用屬性或字典式存取)
         """
         if callback not in self.strategy_callbacks:
             self.strategy_callbacks.append(callback)
             logger.info(f"已添加策略回調函數: {callback.__name__}")
     
-    def remove_strategy_callback(self, callback: Callable[[Dict[str, Any]], None]):
+    def remove_strategy_callback(self, callback: Callable[[TickData], None]):
         """移除策略回調函數"""
         if callback in self.strategy_callbacks:
             self.strategy_callbacks.remove(callback)
@@ -94,6 +102,7 @@ class TickDataProcessor:
                 return
             
             self.running = False
+            self.queue_manager.wake_consumers()
             
             # 等待線程結束
             if self.processing_thread and self.processing_thread.is_alive():
@@ -105,19 +114,36 @@ class TickDataProcessor:
             self.queue_manager.put_log_message("🛑 策略處理引擎已停止", "INFO", "PROCESSOR")
     
     def _processing_loop(self):
-        """主要處理循環 (在獨立線程中運行)"""
+        """
+        主要處理循環 (在獨立線程中運行)
+        
+        佇列為空時阻塞等待喚醒；有資料時整批取出，在時間預算內持續消化，
+        每個預算週期結束才更新UI最新值與Tick日誌
+        """
         logger.info("Tick資料處理循環開始")
+        queue_manager = self.queue_manager
         
         while self.running:
             try:
-                # 從佇列取出Tick資料
-                tick_data = self.queue_manager.get_tick_data(timeout=1.0)
+                # 等待新資料 (put_tick_data / stop_processing 會喚醒)
+                batch = queue_manager.get_tick_batch(self.max_batch_size, timeout=self.idle_timeout)
+                if not batch:
+                    continue
                 
-                if tick_data is None:
-                    continue  # 超時，繼續等待
+                deadline = time.perf_counter() + self.batch_time_budget
+                latest = None
+                count = 0
+                while batch:
+                    self._process_batch(batch)
+                    latest = batch[-1]
+                    count += len(batch)
+                    if time.perf_counter() >= deadline or not self.running:
+                        break
+                    batch = queue_manager.get_tick_batch(self.max_batch_size, timeout=0)
                 
-                # 處理Tick資料
-                self._process_single_tick(tick_data)
+                # UI只需要最新一筆
+                queue_manager.publish_latest_tick(latest, count)
+                self._log_tick(latest)
                 
             except Exception as e:
                 self.stats['error_count'] += 1
@@ -130,58 +156,52 @@ class TickDataProcessor:
         
         logger.info("Tick資料處理循環結束")
     
-    def _process_single_tick(self, tick_data: TickData):
+    def _process_batch(self, batch: List[TickData]):
         """
-        處理單個Tick資料
+        依序處理一批Tick資料，每筆都交給所有策略回調
         
         Args:
-            tick_data: Tick資料物件
+            batch: Tick資料物件列表
         """
-        start_time = time.time()
+        start_time = time.perf_counter()
+        callbacks = tuple(self.strategy_callbacks)
         
-        try:
-            # 轉換為字典格式
-            tick_dict = tick_data.to_dict()
-            self.last_tick_data = tick_dict
-            
-            # 生成基本日誌訊息
-            price = tick_dict['corrected_price']
-            formatted_time = tick_dict['formatted_time']
-            
-            # 控制日誌頻率 (每秒最多一次)
-            current_time = time.time()
-            if not hasattr(self, '_last_log_time') or current_time - self._last_log_time > 1.0:
-                self._last_log_time = current_time
-                tick_msg = f"【Tick】價格:{price} 買:{tick_data.bid} 賣:{tick_data.ask} 量:{tick_data.qty} 時間:{formatted_time}"
-                self.queue_manager.put_log_message(tick_msg, "INFO", "TICK")
-            
-            # 調用所有策略回調函數
-            for callback in self.strategy_callbacks:
+        for tick_data in batch:
+            for callback in callbacks:
                 try:
-                    callback(tick_dict)
+                    callback(tick_data)
                 except Exception as callback_error:
                     error_msg = f"策略回調錯誤 ({callback.__name__}): {str(callback_error)}"
                     logger.error(error_msg)
                     self.queue_manager.put_log_message(f"⚠️ {error_msg}", "WARNING", "STRATEGY")
-            
-            # 更新統計
-            process_time = time.time() - start_time
-            self.stats['processed_count'] += 1
-            self.stats['last_process_time'] = datetime.now()
-            
-            # 計算平均處理時間
-            if self.stats['average_process_time'] == 0:
-                self.stats['average_process_time'] = process_time
-            else:
-                self.stats['average_process_time'] = (
-                    self.stats['average_process_time'] * 0.9 + process_time * 0.1
-                )
-            
-        except Exception as e:
-            self.stats['error_count'] += 1
-            error_msg = f"處理Tick資料時發生錯誤: {str(e)}"
-            logger.error(error_msg)
-            self.queue_manager.put_log_message(f"❌ {error_msg}", "ERROR", "PROCESSOR")
+        
+        self.last_tick_data = batch[-1]
+        
+        # 更新統計 (平均處理時間以每筆計)
+        count = len(batch)
+        process_time = (time.perf_counter() - start_time) / count
+        self.stats['processed_count'] += count
+        self.stats['batch_count'] += 1
+        if count > self.stats['largest_batch']:
+            self.stats['largest_batch'] = count
+        self.stats['last_process_time'] = datetime.now()
+        
+        # 計算平均處理時間
+        if self.stats['average_process_time'] == 0:
+            self.stats['average_process_time'] = process_time
+        else:
+            self.stats['average_process_time'] = (
+                self.stats['average_process_time'] * 0.9 + process_time * 0.1
+            )
+    
+    def _log_tick(self, tick_data: TickData):
+        """輸出Tick日誌 (每秒最多一次)"""
+        current_time = time.time()
+        if current_time - self._last_log_time > 1.0:
+            self._last_log_time = current_time
+            tick_msg = (f"【Tick】價格:{tick_data.corrected_price} 買:{tick_data.bid} 賣:{tick_data.ask} "
+                        f"量:{tick_data.qty} 時間:{tick_data.formatted_time}")
+            self.queue_manager.put_log_message(tick_msg, "INFO", "TICK")
     
     def get_status(self) -> Dict[str, Any]:
         """取得處理器狀態"""
@@ -198,7 +218,7 @@ class TickDataProcessor:
         """檢查處理器是否在運行"""
         return self.running
     
-    def get_last_tick_data(self) -> Optional[Dict[str, Any]]:
+    def get_last_tick_data(self) -> Optional[TickData]:
         """取得最後處理的Tick資料"""
         return self.last_tick_data
 
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試共享記憶體價格匯流排
+- 環形緩衝區寫入/讀取、落後時遺失計數、寫入端重啟
+- 跨程序讀取端
+- TCP 二進位訊框轉發與舊版 PriceServer/PriceClient、PriceBridge 介面
+"""
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from price_bus import (FrameDecoder, PriceBusReader, PriceBusTcpClient, PriceBusTcpServer, PriceBusWriter,
+                       PriceTick, encode_frame)
+from price_bridge import PriceBridge
+from tcp_price_server import PriceClient, PriceServer
+
+
+def _bus_path(tmp):
+    return os.path.join(tmp, "test_bus.ring")
+
+
+def _wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_ring_read_overrun_and_restart():
+    """測試讀取順序、落後超過容量、寫入端重啟"""
+    print("🧪 測試環形緩衝區")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _bus_path(tmp)
+        writer = PriceBusWriter(path, capacity=8)
+        reader = PriceBusReader(path)
+        assert reader.poll() == []
+
+        for i in range(5):
+            writer.publish(22000 + i, bid=21999 + i, ask=22001 + i, volume=i, date=20250703,
+                           time_hms=90000 + i, ms=i * 100)
+        ticks = reader.poll()
+        assert [t.seq for t in ticks] == [1, 2, 3, 4, 5]
+        assert (ticks[2].price, ticks[2].bid, ticks[2].volume, ticks[2].time_hms, ticks[2].ms) == (22002, 22001, 2, 90002, 200)
+        assert reader.latest().seq == 5 and reader.poll() == []
+
+        # 落後 20 筆 (容量 8)：跳到最舊可用記錄並計入遺失
+        for i in range(20):
+            writer.publish(23000 + i)
+        ticks = reader.poll()
+        assert [t.seq for t in ticks] == list(range(18, 26))
+        assert reader.dropped == 12
+
+        # 寫入端重啟 (同一檔案) → 讀取端偵測新 session，從新資料開始
+        writer.close()
+        writer = PriceBusWriter(path, capacity=8)
+        writer.publish(24000)
+        ticks = reader.poll()
+        assert [(t.seq, t.price) for t in ticks] == [(1, 24000)]
+        reader.close()
+        writer.close()
+    print("✅ 環形緩衝區正常")
+
+
+def test_cross_process_reader():
+    """測試另一個程序等待序號並讀取全部記錄"""
+    print("🧪 測試跨程序讀取")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _bus_path(tmp)
+        writer = PriceBusWriter(path, capacity=1024)
+        script = (
+            "import sys; sys.path.insert(0, sys.argv[1])\n"
+            "from price_bus import PriceBusReader\n"
+            "reader = PriceBusReader(sys.argv[2])\n"
+            "print('ready', flush=True)\n"
+            "total = 0; count = 0\n"
+            "while count < 500:\n"
+            "    ticks = reader.wait(5.0)\n"
+            "    if not ticks: break\n"
+            "    count += len(ticks); total += sum(int(t.price) for t in ticks)\n"
+            "print(count, total, reader.dropped, flush=True)\n"
+        )
+        proc = subprocess.Popen([sys.executable, '-c', script, os.path.dirname(os.path.abspath(__file__)), path],
+                                stdout=subprocess.PIPE, text=True)
+        assert proc.stdout.readline().strip() == 'ready'
+        for i in range(500):
+            writer.publish(i)
+        out, _ = proc.communicate(timeout=10)
+        writer.close()
+        assert out.split() == ['500', str(sum(range(500))), '0']
+    print("✅ 跨程序讀取正常")
+
+
+def test_tcp_fanout_from_bus():
+    """測試由匯流排轉發 TCP 二進位訊框給多個訂閱端"""
+    print("🧪 測試TCP轉發")
+    decoder = FrameDecoder()
+    frame = encode_frame(PriceTick(1, 22000.0, 0.0, 0.0, 1, 0, 90000, 0, 0))
+    # 訊框被切成兩段也能正確組回
+    assert decoder.feed(frame[:10]) == [] and decoder.feed(frame[10:] + frame)[0].price == 22000.0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _bus_path(tmp)
+        writer = PriceBusWriter(path, capacity=256)
+        server = PriceBusTcpServer('127.0.0.1', 0)
+        assert server.start(PriceBusReader(path))
+
+        received = [[], []]
+        clients = [PriceBusTcpClient('127.0.0.1', server.port) for _ in received]
+        for client, sink in zip(clients, received):
+            assert client.connect(sink.append)
+        assert _wait_for(lambda: len(server.clients) == 2)
+
+        for i in range(100):
+            writer.publish(22000 + i, time_hms=90000)
+        assert _wait_for(lambda: all(len(sink) == 100 for sink in received))
+        assert [t.seq for t in received[1]] == list(range(1, 101))
+
+        # 訂閱端斷線後自動移除
+        clients[0].disconnect()
+        assert _wait_for(lambda: len(server.clients) == 1)
+        clients[1].disconnect()
+        server.stop()
+        writer.close()
+    print("✅ TCP轉發正常")
+
+
+def test_legacy_server_client_and_bridge():
+    """測試舊版 PriceServer/PriceClient 字典介面與 PriceBridge 監控"""
+    print("🧪 測試舊版介面")
+    server = PriceServer('127.0.0.1', 0)
+    assert server.start_server()
+    client = PriceClient('127.0.0.1', server.port)
+    messages = []
+    client.set_price_callback(messages.append)
+    assert client.connect()
+    assert _wait_for(lambda: len(server.clients) == 1)
+
+    assert server.broadcast_price({'price': 22100.0, 'bid': 22099.0, 'ask': 22101.0, 'volume': 3,
+                                   'timestamp': '09:15:30', 'date': 20250703, 'source': 'OrderTester'})
+    assert _wait_for(lambda: messages)
+    message = messages[0]
+    assert (message['price'], message['volume'], message['timestamp'], message['date']) == (22100.0, 3, '09:15:30', 20250703)
+    assert server.get_status()['connected_clients'] == 1
+    client.disconnect()
+    server.stop_server()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bridge = PriceBridge(_bus_path(tmp))
+        seen = []
+        bridge.start_monitoring(lambda price, volume, timestamp: seen.append((price, volume)))
+        for i in range(3):
+            assert bridge.write_price(22000 + i, 10)
+        assert _wait_for(lambda: len(seen) == 3)
+        assert seen == [(22000, 10), (22001, 10), (22002, 10)]
+        assert bridge.read_price()['price'] == 22002
+        bridge.stop_monitoring()
+
+        # 其他程序的讀取端在寫入端清理後仍映射同一檔案，須能看到下一個寫入端的資料
+        path = _bus_path(tmp)
+        other_reader = PriceBusReader(path)
+        inode = os.stat(path).st_ino
+        bridge.cleanup()
+        assert os.stat(path).st_ino == inode
+        assert other_reader.poll() == [] and other_reader.latest() is None
+
+        next_bridge = PriceBridge(path)
+        assert next_bridge.write_price(22500, 1)
+        assert [t.price for t in other_reader.poll()] == [22500]
+        other_reader.close()
+        next_bridge.cleanup()
+    print("✅ 舊版介面正常")
+
+
+if __name__ == "__main__":
+    test_ring_read_overrun_and_restart()
+    test_cross_process_reader()
+    test_tcp_fanout_from_bus()
+    test_legacy_server_client_and_bridge()
+    print("\n🎯 價格匯流排測試完成")
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+進度串流核心 (quan / rev 分析套件共用) - 以 Server-Sent Events (SSE) 推送執行進度、日誌與部分結果
+
+🎯 目的：
+    Web GUI 原本由瀏覽器每 2 秒輪詢 /status，伺服器把子進程的完整輸出累積在記憶體，
+    每次輪詢都整份回傳，結束後才一次解析結果。數千組實驗的 MDD 搜尋會累積數 GB 日誌。
+    本模組提供：
+    - ProgressStream：事件代理，背景執行緒 publish() 事件，/stream 端點以 SSE 推給瀏覽器；
+      只保留最近 history 筆事件，斷線重連時依 Last-Event-ID 補送，落後太多則改送目前狀態快照
+    - LogTail：記憶體只保留最後 max_lines 行，完整日誌 (需要時) 寫入暫存檔，事後可逐行讀回
+    - ProgressTracker：完成數 / 總數 / 速率 / 預估剩餘時間 (ETA)
+    - TopN：以小頂堆維護前 N 名，實驗結果陸續到達時即時更新排行
+    - LogBatcher：日誌行累積後每個節流週期合併成一個 log 事件，不再一行一個事件
+    - BacktestLogProgress：從回測日誌的交易日標題與各口出場行推算進度與累計損益
+
+📡 事件格式 (SSE)：
+    id: <遞增序號>
+    event: <snapshot | status | progress | log | top | results>
+    data: <JSON>
+
+📐 用法 (各套件的 progress_stream.py 只是轉出本模組，事件格式與節流邏輯只維護這一份)：
+    from progress_stream import LogBatcher, LogTail, ProgressStream, Throttle
+
+作者：量化分析團隊
+日期：2025-07-18
+"""
+
+import heapq
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# 記憶體中保留的日誌行數
+DEFAULT_LOG_LINES = 2000
+
+# 可補送給重連用戶端的事件數
+DEFAULT_HISTORY = 1000
+
+# 沒有事件時送出註解行，避免代理伺服器或瀏覽器判定連線閒置
+HEARTBEAT_SECONDS = 15.0
+
+# 瀏覽器斷線後的重連間隔 (毫秒)
+RETRY_MS = 3000
+
+
+def format_sse(event_id: int, event: str, data: Any) -> str:
+    """組成一筆 SSE 訊息 (data 為單行 JSON)"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+class ProgressStream:
+    """
+    SSE 事件代理
+
+    背景執行緒呼叫 publish()；每個 /stream 連線各自以 sse() 產生器讀取，
+    以 Condition 等待新事件，不需輪詢。
+    """
+
+    def __init__(self, history: int = DEFAULT_HISTORY):
+        self._events = deque(maxlen=history)
+        self._next_id = 1
+        self._cond = threading.Condition()
+
+    @property
+    def latest_id(self) -> int:
+        with self._cond:
+            return self._next_id - 1
+
+    def publish(self, event: str, data: Any) -> int:
+        """發布事件，回傳事件序號"""
+        with self._cond:
+            event_id = self._next_id
+            self._next_id += 1
+            self._events.append((event_id, event, data))
+            self._cond.notify_all()
+        return event_id
+
+    def reset(self):
+        """新的一次執行開始：清除舊事件 (序號持續遞增，重連的用戶端會改收快照)"""
+        with self._cond:
+            self._events.clear()
+            self._cond.notify_all()
+
+    def events_after(self, last_id: Optional[int],
+                     timeout: Optional[float] = None) -> Tuple[List[Tuple[int, str, Any]], bool]:
+        """
+        取得序號大於 last_id 的事件，沒有新事件時最多等待 timeout 秒
+
+        Returns:
+            (事件列表, 是否有事件已被淘汰而無法補送)；last_id 為 None 時視為需要快照
+        """
+        with self._cond:
+            if last_id is None:
+                return [], True
+            self._cond.wait_for(lambda: self._next_id - 1 > last_id, timeout)
+            oldest = self._events[0][0] if self._events else self._next_id
+            missed = last_id < oldest - 1
+            return [item for item in self._events if item[0] > last_id], missed
+
+    def sse(self, last_event_id: Optional[str] = None, snapshot: Optional[Callable[[], Any]] = None,
+            heartbeat: float = HEARTBEAT_SECONDS) -> Iterator[str]:
+        """
+        SSE 產生器 (交給 Flask Response，mimetype 為 text/event-stream)
+
+        Args:
+            last_event_id: 瀏覽器重連時帶的 Last-Event-ID 標頭
+            snapshot: 回傳目前完整狀態的函數；新連線或落後太多時先送 snapshot 事件
+            heartbeat: 無事件時送出心跳註解的間隔秒數
+        """
+        try:
+            last_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_id = None
+
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            events, missed = self.events_after(last_id, heartbeat)
+            if missed and snapshot is not None:
+                # 快照之後發生的事件照常補送
+                last_id = self.latest_id
+                yield format_sse(last_id, 'snapshot', snapshot())
+                continue
+            if last_id is None:
+                last_id = self.latest_id
+                continue
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            for event_id, event, data in events:
+                yield format_sse(event_id, event, data)
+            last_id = events[-1][0]
+
+
+class LogTail:
+    """只保留最後 max_lines 行的日誌緩衝；指定 spool_path 時完整日誌另寫入該檔"""
+
+    def __init__(self, max_lines: int = DEFAULT_LOG_LINES, spool_path: Optional[str] = None):
+        self._lines = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self.total_lines = 0
+        self.spool_path = spool_path
+        self._spool = open(spool_path, 'w', encoding='utf-8') if spool_path else None
+
+    def append(self, text: str) -> List[str]:
+        """加入一段文字 (可含多行)，回傳拆出的各行"""
+        lines = text.splitlines()
+        with self._lock:
+            self._lines.extend(lines)
+            self.total_lines += len(lines)
+            if self._spool is not None:
+                self._spool.write(text if text.endswith('\n') else text + '\n')
+        return lines
+
+    @property
+    def dropped_lines(self) -> int:
+        """已從記憶體淘汰的行數"""
+        return self.total_lines - len(self._lines)
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            return list(self._lines)
+
+    def text(self) -> str:
+        """記憶體中的最後幾行 (有淘汰時在開頭註明)"""
+        with self._lock:
+            lines = list(self._lines)
+            dropped = self.total_lines - len(lines)
+        header = [f"... (省略前 {dropped} 行)"] if dropped else []
+        return '\n'.join(header + lines)
+
+    def close(self):
+        with self._lock:
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+
+    def iter_lines(self) -> Iterator[str]:
+        """逐行讀取完整日誌 (從暫存檔串流，不需整份載入記憶體)"""
+        self.close()
+        if self.spool_path and os.path.exists(self.spool_path):
+            with open(self.spool_path, encoding='utf-8') as f:
+                for line in f:
+                    yield line.rstrip('\n')
+        else:
+            yield from self.lines()
+
+    def read_all(self) -> str:
+        """完整日誌：有暫存檔時從檔案讀取，否則為記憶體中的內容"""
+        self.close()
+        if self.spool_path and os.path.exists(self.spool_path):
+            with open(self.spool_path, encoding='utf-8') as f:
+                return f.read()
+        return '\n'.join(self.lines())
+
+
+class ProgressTracker:
+    """完成數 / 總數 / 速率 / 預估剩餘時間"""
+
+    def __init__(self, total: int = 0, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.start_time = clock()
+        self.total = total
+        self.completed = 0
+
+    def set_total(self, total: int):
+        self.total = max(int(total), 0)
+
+    def update(self, completed: Optional[int] = None, step: int = 0) -> Dict[str, Any]:
+        """設定完成數 (只會往前) 或累加 step，回傳目前進度"""
+        if completed is not None:
+            self.completed = max(self.completed, int(completed))
+        self.completed += step
+        return self.snapshot()
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = self._clock() - self.start_time
+        rate = self.completed / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.total - self.completed, 0)
+        eta = remaining / rate if rate > 0 and self.total else None
+        percent = min(self.completed / self.total * 100, 100.0) if self.total else 0.0
+        return {
+            'completed': self.completed,
+            'total': self.total,
+            'percent': round(percent, 1),
+            'elapsed': round(elapsed, 1),
+            'rate': round(rate, 3),
+            'eta_seconds': round(eta, 1) if eta is not None else None,
+        }
+
+
+class TopN:
+    """以小頂堆維護 key 最大的前 n 筆資料"""
+
+    def __init__(self, n: int, key: Callable[[Dict[str, Any]], float]):
+        self.n = n
+        self.key = key
+        self._heap: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, row: Dict[str, Any]) -> bool:
+        """加入一筆資料，回傳是否進入前 n 名"""
+        self._seq += 1
+        item = (self.key(row), -self._seq, row)  # 同分時先到者優先
+        if len(self._heap) < self.n:
+            heapq.heappush(self._heap, item)
+            return True
+        if item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+            return True
+        return False
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """由高到低排序並附上名次"""
+        ordered = sorted(self._heap, key=lambda item: item[:2], reverse=True)
+        return [dict(row, rank=rank) for rank, (_, _, row) in enumerate(ordered, 1)]
+
+
+class Throttle:
+    """限制事件發送頻率 (例如排行與進度每秒最多推送數次)"""
+
+    def __init__(self, interval: float, clock: Callable[[], float] = time.monotonic):
+        self.interval = interval
+        self._clock = clock
+        self._last = None
+
+    def ready(self, force: bool = False) -> bool:
+        now = self._clock()
+        if force or self._last is None or now - self._last >= self.interval:
+            self._last = now
+            return True
+        return False
+
+
+class LogBatcher:
+    """
+    把日誌行合併成批次事件：每個節流週期最多發送一個 log 事件 (內含該週期累積的所有行)
+
+    子進程每秒可輸出上千行，逐行發送會塞滿事件歷史並讓瀏覽器逐行重繪。
+    週期內未送出的行由計時器在一個週期後補送，輸出停頓時最後幾行不會被卡住；
+    狀態變更或執行結束前呼叫 flush() 立即送出。
+    """
+
+    def __init__(self, broker: ProgressStream, interval: float, event: str = 'log',
+                 clock: Callable[[], float] = time.monotonic, **fields):
+        self._broker = broker
+        self._event = event
+        self._fields = fields
+        self._throttle = Throttle(interval, clock)
+        self._pending: List[str] = []
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def add(self, lines: List[str]):
+        """加入日誌行；距上次發送已滿一個週期則立即發送"""
+        with self._lock:
+            self._pending.extend(lines)
+            if not self._pending:
+                return
+            if self._throttle.ready():
+                self._publish_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self._throttle.interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """立即送出尚未發送的行"""
+        with self._lock:
+            if self._pending:
+                self._throttle.ready(force=True)
+                self._publish_locked()
+
+    def _publish_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        lines, self._pending = self._pending, []
+        self._broker.publish(self._event, dict(self._fields, lines=lines))
+
+
+class BacktestLogProgress:
+    """
+    從回測日誌推算進度
+
+    每個交易日以 "--- YYYY-MM-DD | 開盤區間 ..." 開頭，各口出場行含 "第N口 ... 損益: ±X"。
+    總交易日數以期間內的工作日估計 (未扣除休市日，結束時以實際天數為準)。
+    """
+
+    DAY_PATTERN = re.compile(r'--- (\d{4}-\d{2}-\d{2}) \|')
+    LOT_PNL_PATTERN = re.compile(r'第\d+口.*損益:\s*([+-]?\d+(?:\.\d+)?)')
+
+    def __init__(self, start_date: str, end_date: str, clock: Callable[[], float] = time.monotonic):
+        try:
+            end = date.fromisoformat(end_date) + timedelta(days=1)
+            total = int(np.busday_count(date.fromisoformat(start_date), end))
+        except (TypeError, ValueError):
+            total = 0
+        self.tracker = ProgressTracker(total, clock=clock)
+        self.current_date = None
+        self.trades = 0
+        self.total_pnl = 0.0
+
+    def feed(self, line: str) -> Optional[Dict[str, Any]]:
+        """處理一行日誌；進入新的交易日時回傳進度事件資料"""
+        pnl_match = self.LOT_PNL_PATTERN.search(line)
+        if pnl_match:
+            self.trades += 1
+            self.total_pnl += float(pnl_match.group(1))
+            return None
+
+        day_match = self.DAY_PATTERN.search(line)
+        if day_match:
+            # 新交易日開始代表前一日已完成
+            if self.current_date is not None:
+                self.tracker.update(step=1)
+            self.current_date = day_match.group(1)
+            if self.tracker.completed >= self.tracker.total:
+                self.tracker.set_total(self.tracker.completed + 1)
+            return self.snapshot()
+        return None
+
+    def finish(self) -> Dict[str, Any]:
+        """回測結束：最後一日完成，總數以實際交易日為準"""
+        if self.current_date is not None:
+            self.tracker.update(step=1)
+        self.current_date = None
+        self.tracker.set_total(self.tracker.completed)
+        return self.snapshot()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(self.tracker.snapshot(), current_date=self.current_date,
+                    trades=self.trades, total_pnl=round(self.total_pnl, 2))
@@ -0,0 +1,649 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自適應參數優化器 - 以代理模型取代全網格搜尋
+
+🎯 目的：
+    parameter_matrix_generator 的全網格 (各口啟動點 × 回撤 × 保護係數 × 時間區段) 動輒上萬組，
+    本模組只用少量回測逐步逼近最佳區域：
+    1. 先以拉丁超立方抽樣覆蓋參數空間
+    2. 之後每批依代理模型挑選最有潛力的參數
+       - gp:     高斯過程 + Expected Improvement
+       - tpe:    Tree-structured Parzen Estimator (好/壞樣本密度比)
+       - rf:     隨機森林 (各棵樹預測的平均與離散度) + Expected Improvement
+       - random: 純隨機抽樣 (對照組)
+    3. 多目標：總損益 (越大越好) 與最大回撤 (越小越好)。
+       每次挑選時隨機抽一組權重做 Chebyshev 純量化 (ParEGO)，輪流探索 Pareto 前緣的不同位置；
+       指定固定權重則退化為單目標優化
+    4. 回測透過 BatchBacktestEngine 執行並寫入同一個 experiments 資料表，
+       experiment_analyzer、HTML 報告與批次實驗GUI 不需修改即可使用
+
+📐 參數空間：
+    各口 trigger / trailing(回撤) / protection 沿用 ParameterRange 的步長，開盤區間以選項表示，
+    因此優化器挑出的每組參數都落在原本網格上，可直接與網格結果比較。
+
+作者：量化分析團隊
+日期：2025-07-15
+"""
+
+import argparse
+import json
+import logging
+import uuid
+import warnings
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.stats import norm, qmc
+
+from batch_backtest_engine import BatchBacktestEngine, ExperimentResult, ResultDatabase
+from parameter_matrix_generator import ExperimentConfig, ParameterRange, create_default_experiment_config
+
+logger = logging.getLogger(__name__)
+
+OPTIMIZER_METHODS = ('gp', 'tpe', 'rf', 'random')
+
+LOT_TRIGGERS = ('lot1_trigger', 'lot2_trigger', 'lot3_trigger')
+
+# 開盤區間維度的名稱，值為 (range_start_time, range_end_time)
+RANGE_WINDOW = 'range_window'
+
+# 舊實驗沒有記錄的欄位預設值 (暖啟動比對用)
+BASE_DEFAULTS = {'trading_direction': 'BOTH'}
+
+
+@dataclass
+class SearchDimension:
+    """單一參數維度：依步長取值的數值範圍 (與 ParameterRange 相同) 或離散選項"""
+    name: str
+    low: float = 0.0
+    high: float = 0.0
+    step: float = 1.0
+    choices: Optional[List[Any]] = None
+
+    def __post_init__(self):
+        if self.choices is not None:
+            self.values = list(self.choices)
+        else:
+            self.values = ParameterRange(self.low, self.high, self.step).generate_values()
+        if not self.values:
+            raise ValueError(f"參數 {self.name} 沒有任何取值")
+
+    @classmethod
+    def from_range(cls, name: str, parameter_range: ParameterRange) -> 'SearchDimension':
+        return cls(name, parameter_range.min_value, parameter_range.max_value, parameter_range.step)
+
+    @property
+    def size(self) -> int:
+        return len(self.values)
+
+    def index_of(self, value: Any) -> Optional[int]:
+        """參數值在取值表中的位置，不在表中時為 None"""
+        for index, candidate in enumerate(self.values):
+            if _same_value(candidate, value):
+                return index
+        return None
+
+
+def _same_value(a: Any, b: Any) -> bool:
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return abs(a - b) < 1e-9
+    if isinstance(a, (tuple, list)) and isinstance(b, (tuple, list)):
+        return tuple(a) == tuple(b)
+    return a == b
+
+
+class SearchSpace:
+    """
+    參數空間
+
+    每組參數以各維度的取值索引表示 (N × 維度數 的整數矩陣)，
+    代理模型則使用索引所在區段中心的單位座標 (index + 0.5) / size。
+    """
+
+    def __init__(self, dimensions: Sequence[SearchDimension], enforce_lot_progression: bool = True):
+        self.dimensions = list(dimensions)
+        self.enforce_lot_progression = enforce_lot_progression
+        self.sizes = np.array([dim.size for dim in self.dimensions])
+
+        names = [dim.name for dim in self.dimensions]
+        self._trigger_columns = [names.index(name) for name in LOT_TRIGGERS if name in names]
+        self._trigger_values = [np.array(self.dimensions[col].values, dtype=float) for col in self._trigger_columns]
+
+    @property
+    def num_dims(self) -> int:
+        return len(self.dimensions)
+
+    def to_indices(self, unit_rows: np.ndarray) -> np.ndarray:
+        """單位座標 → 取值索引"""
+        unit_rows = np.clip(np.asarray(unit_rows, dtype=float), 0.0, 1.0)
+        return np.minimum((unit_rows * self.sizes).astype(int), self.sizes - 1)
+
+    def to_unit(self, indices: np.ndarray) -> np.ndarray:
+        """取值索引 → 單位座標 (區段中心)"""
+        return (np.asarray(indices, dtype=float) + 0.5) / self.sizes
+
+    def valid_mask(self, indices: np.ndarray) -> np.ndarray:
+        """約束條件 (與 ParameterMatrixGenerator 相同：lot1_trigger <= lot2_trigger <= lot3_trigger)"""
+        indices = np.atleast_2d(indices)
+        mask = np.ones(len(indices), dtype=bool)
+        if self.enforce_lot_progression and len(self._trigger_columns) == len(LOT_TRIGGERS):
+            t1, t2, t3 = (values[indices[:, col]] for col, values in zip(self._trigger_columns, self._trigger_values))
+            mask = (t1 <= t2) & (t2 <= t3)
+        return mask
+
+    def decode(self, indices: Sequence[int]) -> Dict[str, Any]:
+        """取值索引 → 實驗參數"""
+        params = {}
+        for dim, index in zip(self.dimensions, indices):
+            value = dim.values[int(index)]
+            if dim.name == RANGE_WINDOW:
+                params['range_start_time'], params['range_end_time'] = value
+            else:
+                params[dim.name] = value
+        return params
+
+    def encode(self, params: Dict[str, Any]) -> Optional[np.ndarray]:
+        """實驗參數 → 取值索引，不在空間內時為 None"""
+        row = []
+        for dim in self.dimensions:
+            if dim.name == RANGE_WINDOW:
+                value = (params.get('range_start_time'), params.get('range_end_time'))
+            else:
+                value = params.get(dim.name)
+            index = dim.index_of(value)
+            if index is None:
+                return None
+            row.append(index)
+        return np.array(row, dtype=int)
+
+    @staticmethod
+    def key(indices: Sequence[int]) -> Tuple[int, ...]:
+        """參數組合的唯一鍵 (判斷是否已評估)"""
+        return tuple(int(index) for index in indices)
+
+    def select_new(self, indices: np.ndarray, exclude: set, limit: Optional[int] = None) -> np.ndarray:
+        """保留符合約束、未評估過且不重複的組合 (維持原順序)"""
+        indices = np.atleast_2d(indices)[self.valid_mask(indices)]
+        seen = set(exclude)
+        chosen = []
+        for row in indices:
+            key = self.key(row)
+            if key in seen:
+                continue
+            seen.add(key)
+            chosen.append(row)
+            if limit is not None and len(chosen) >= limit:
+                break
+        return np.array(chosen, dtype=int).reshape(-1, self.num_dims)
+
+    def sample(self, rng: np.random.Generator, count: int, exclude: Optional[set] = None,
+               latin_hypercube: bool = False, max_rounds: int = 20) -> np.ndarray:
+        """
+        抽取符合約束且未評估過的組合
+
+        Args:
+            rng: 亂數產生器
+            count: 需要的組數
+            exclude: 已評估 (或待評估) 的參數鍵
+            latin_hypercube: 使用拉丁超立方抽樣 (初始設計)
+
+        Returns:
+            np.ndarray: 取值索引 (最多 count 列)
+        """
+        seen = set(exclude or ())
+        batches = []
+        found = 0
+        for _ in range(max_rounds):
+            if found >= count:
+                break
+            need = max(count - found, 1) * 4
+            if latin_hypercube:
+                rows = qmc.LatinHypercube(d=self.num_dims, seed=rng).random(need)
+            else:
+                rows = rng.random((need, self.num_dims))
+            chosen = self.select_new(self.to_indices(rows), seen, limit=count - found)
+            seen.update(self.key(row) for row in chosen)
+            batches.append(chosen)
+            found += len(chosen)
+        return np.vstack(batches) if batches else np.empty((0, self.num_dims), dtype=int)
+
+    @property
+    def grid_size(self) -> int:
+        """全網格的實驗數 (已扣除違反約束的組合)"""
+        if not self.enforce_lot_progression or len(self._trigger_columns) != len(LOT_TRIGGERS):
+            return int(np.prod(self.sizes))
+
+        t1, t2, t3 = self._trigger_values
+        valid_triggers = int(np.sum((t1[:, None, None] <= t2[None, :, None]) & (t2[None, :, None] <= t3[None, None, :])))
+        other = int(np.prod([size for col, size in enumerate(self.sizes) if col not in self._trigger_columns]))
+        return valid_triggers * other
+
+
+def search_space_from_config(config: ExperimentConfig) -> SearchSpace:
+    """
+    由 ExperimentConfig 建立參數空間 (與 ParameterMatrixGenerator 的網格相同)
+
+    啟用的濾網以其參數值作為維度 (濾網本身固定啟用，見 base_experiment_from_config)
+    """
+    dims = [
+        SearchDimension.from_range('lot1_trigger', config.lot1_config.trigger_range),
+        SearchDimension.from_range('lot1_trailing', config.lot1_config.trailing_range),
+    ]
+    for lot, lot_config in (('lot2', config.lot2_config), ('lot3', config.lot3_config)):
+        dims.append(SearchDimension.from_range(f'{lot}_trigger', lot_config.trigger_range))
+        dims.append(SearchDimension.from_range(f'{lot}_trailing', lot_config.trailing_range))
+        if lot_config.protection_range:
+            dims.append(SearchDimension.from_range(f'{lot}_protection', lot_config.protection_range))
+        else:
+            dims.append(SearchDimension(f'{lot}_protection', choices=[2.0]))
+
+    time_combinations = config.time_ranges.generate_combinations()
+    if len(time_combinations) > 1:
+        dims.append(SearchDimension(RANGE_WINDOW, choices=time_combinations))
+
+    if config.enable_range_filter:
+        dims.append(SearchDimension('max_range_points', choices=list(config.range_filter_values)))
+    if config.enable_risk_filter:
+        dims.append(SearchDimension('daily_loss_limit', choices=list(config.daily_loss_limits)))
+        dims.append(SearchDimension('profit_target', choices=list(config.profit_targets)))
+
+    return SearchSpace(dims, enforce_lot_progression=config.enforce_lot_progression)
+
+
+def base_experiment_from_config(config: ExperimentConfig, trading_direction: str = "BOTH",
+                                date_range_index: int = 0) -> Dict[str, Any]:
+    """
+    優化過程中固定不變的實驗欄位 (回測期間、口數、交易方向、濾網開關)
+
+    Args:
+        config: 實驗配置
+        trading_direction: 'LONG_ONLY' / 'SHORT_ONLY' / 'BOTH'
+        date_range_index: 使用 config.date_ranges 中的第幾個期間
+    """
+    start_date, end_date = config.date_ranges[date_range_index]
+    time_combinations = config.time_ranges.generate_combinations()
+    range_start_time, range_end_time = time_combinations[0]
+    return {
+        "trade_lots": config.trade_lots,
+        "start_date": start_date,
+        "end_date": end_date,
+        "range_start_time": range_start_time,
+        "range_end_time": range_end_time,
+        "trading_direction": trading_direction,
+        "range_filter_enabled": config.enable_range_filter,
+        "risk_filter_enabled": config.enable_risk_filter,
+        "stop_loss_filter_enabled": False,
+    }
+
+
+def pareto_front(total_pnl: Sequence[float], max_drawdown: Sequence[float]) -> np.ndarray:
+    """
+    Pareto 前緣 (總損益越大越好、最大回撤越小越好)
+
+    Returns:
+        np.ndarray: 非支配點的索引，依總損益由高到低排列
+    """
+    pnl = np.asarray(total_pnl, dtype=float)
+    mdd = np.asarray(max_drawdown, dtype=float)
+    order = np.lexsort((mdd, -pnl))
+    front = []
+    best_mdd = np.inf
+    for index in order:
+        if mdd[index] < best_mdd:
+            front.append(index)
+            best_mdd = mdd[index]
+    return np.array(front, dtype=int)
+
+
+def scalarize(objectives: np.ndarray, weights: Sequence[float], rho: float = 0.05) -> np.ndarray:
+    """
+    增廣 Chebyshev 純量化 (越小越好)
+
+    Args:
+        objectives: (N, 2) [總損益, 最大回撤]
+        weights: [損益權重, 回撤權重]
+    """
+    costs = np.column_stack([-objectives[:, 0], objectives[:, 1]])
+    low, high = costs.min(axis=0), costs.max(axis=0)
+    span = np.where(high > low, high - low, 1.0)
+    weighted = (costs - low) / span * np.asarray(weights, dtype=float)
+    return weighted.max(axis=1) + rho * weighted.sum(axis=1)
+
+
+def _expected_improvement(mean: np.ndarray, std: np.ndarray, best: float) -> np.ndarray:
+    """最小化問題的 Expected Improvement"""
+    std = np.maximum(std, 1e-9)
+    z = (best - mean) / std
+    return (best - mean) * norm.cdf(z) + std * norm.pdf(z)
+
+
+def gp_acquisition(X: np.ndarray, y: np.ndarray, candidates: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """高斯過程 (Matern 5/2，各維度獨立長度尺度) + Expected Improvement"""
+    from sklearn.exceptions import ConvergenceWarning
+    from sklearn.gaussian_process import GaussianProcessRegressor
+    from sklearn.gaussian_process.kernels import ConstantKernel, Matern, WhiteKernel
+
+    kernel = (ConstantKernel(1.0, (1e-2, 1e2))
+              * Matern(length_scale=np.full(X.shape[1], 0.3), length_scale_bounds=(1e-2, 1e1), nu=2.5)
+              + WhiteKernel(1e-3, (1e-6, 1e-1)))
+    model = GaussianProcessRegressor(kernel=kernel, normalize_y=True, n_restarts_optimizer=2,
+                                     random_state=int(rng.integers(2 ** 31)))
+    with warnings.catch_warnings():
+        # 與結果無關的維度長度尺度會頂到上限，屬預期情況
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        model.fit(X, y)
+    mean, std = model.predict(candidates, return_std=True)
+    return _expected_improvement(mean, std, float(y.min()))
+
+
+def rf_acquisition(X: np.ndarray, y: np.ndarray, candidates: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """隨機森林代理模型：以各棵樹預測的平均與標準差計算 Expected Improvement"""
+    from sklearn.ensemble import RandomForestRegressor
+
+    model = RandomForestRegressor(n_estimators=50, max_features=0.6, min_samples_leaf=1,
+                                  random_state=int(rng.integers(2 ** 31)))
+    model.fit(X, y)
+    per_tree = np.stack([tree.predict(candidates) for tree in model.estimators_])
+    return _expected_improvement(per_tree.mean(axis=0), per_tree.std(axis=0), float(y.min()))
+
+
+def _parzen_log_density(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """單位超立方體上的 Parzen 密度 (高斯核 + 均勻先驗，避免空白區域密度為0)"""
+    count, dims = centers.shape
+    bandwidth = np.clip(centers.std(axis=0) * count ** (-1.0 / (dims + 4)), 0.1, 0.5)
+    z = (points[:, None, :] - centers[None, :, :]) / bandwidth
+    log_kernel = -0.5 * np.sum(z * z, axis=2) - np.sum(np.log(bandwidth * np.sqrt(2 * np.pi)))
+    peak = log_kernel.max(axis=1, keepdims=True)
+    kernel_sum = np.exp(peak[:, 0]) * np.exp(log_kernel - peak).sum(axis=1)
+    return np.log((kernel_sum + 1.0) / (count + 1))
+
+
+def tpe_acquisition(X: np.ndarray, y: np.ndarray, candidates: np.ndarray, rng: np.random.Generator,
+                    gamma: float = 0.25) -> np.ndarray:
+    """TPE：前 gamma 比例為好樣本，以 log(l(x) / g(x)) 作為挑選分數"""
+    order = np.argsort(y)
+    good_count = max(1, int(np.ceil(gamma * len(y))))
+    good, bad = X[order[:good_count]], X[order[good_count:]]
+    if len(bad) == 0:
+        bad = X
+    return _parzen_log_density(candidates, good) - _parzen_log_density(candidates, bad)
+
+
+ACQUISITIONS: Dict[str, Callable] = {
+    'gp': gp_acquisition,
+    'tpe': tpe_acquisition,
+    'rf': rf_acquisition,
+}
+
+
+class AdaptiveOptimizer:
+    """自適應參數優化器 (結果寫入 BatchBacktestEngine 的實驗資料庫)"""
+
+    def __init__(self, space: SearchSpace, base_experiment: Dict[str, Any],
+                 engine: Optional[BatchBacktestEngine] = None, method: str = "gp",
+                 weights: Optional[Sequence[float]] = None, n_initial: Optional[int] = None,
+                 candidate_pool: int = 2000, seed: Optional[int] = None, warm_start: bool = True):
+        """
+        Args:
+            space: 參數空間
+            base_experiment: 固定欄位 (見 base_experiment_from_config)
+            engine: 回測引擎，None 時使用預設 BatchBacktestEngine
+            method: 'gp' / 'tpe' / 'rf' / 'random'
+            weights: [損益權重, 回撤權重]，None 表示每次隨機 (探索整條 Pareto 前緣)
+            n_initial: 初始隨機設計的組數，預設為 max(10, 2 × 維度數)
+            candidate_pool: 每次挑選時評分的候選組數
+            seed: 亂數種子
+            warm_start: 是否沿用資料庫中相同設定的既有結果
+        """
+        if method not in OPTIMIZER_METHODS:
+            raise ValueError(f"不支援的優化方法: {method} (可用: {', '.join(OPTIMIZER_METHODS)})")
+
+        self.space = space
+        self.base_experiment = dict(base_experiment)
+        self.engine = engine or BatchBacktestEngine()
+        self.result_db = self.engine.result_db
+        self.method = method
+        self.weights = weights
+        self.n_initial = n_initial or max(10, 2 * space.num_dims)
+        self.candidate_pool = candidate_pool
+        self.rng = np.random.default_rng(seed)
+        self.run_id = uuid.uuid4().hex[:8]
+
+        # 評估紀錄
+        self.history: List[Dict[str, Any]] = []
+        self.evaluated_keys = set()
+        self.warm_start_count = 0
+
+        if warm_start:
+            self._load_existing_results()
+
+    # ------------------------------------------------------------------ 紀錄
+
+    def _record(self, indices: np.ndarray, result: ExperimentResult):
+        self.history.append({
+            'experiment_id': result.experiment_id,
+            'indices': np.asarray(indices, dtype=int),
+            'success': result.success,
+            'total_pnl': float(result.total_pnl),
+            'max_drawdown': float(result.max_drawdown),
+        })
+        self.evaluated_keys.add(self.space.key(indices))
+
+    def _load_existing_results(self):
+        """暖啟動：沿用資料庫中固定欄位相同、且落在參數空間內的既有結果"""
+        varying = set(self.space.decode(np.zeros(self.space.num_dims, dtype=int)))
+        fixed = {name: value for name, value in self.base_experiment.items() if name not in varying}
+
+        for row in self.result_db.get_metric_results(success_only=False):
+            parameters = json.loads(row['parameters'])
+            if any(not _same_value(parameters.get(name, BASE_DEFAULTS.get(name)), value)
+                   for name, value in fixed.items()):
+                continue
+            indices = self.space.encode(parameters)
+            if indices is None or self.space.key(indices) in self.evaluated_keys:
+                continue
+            self._record(indices, ExperimentResult(
+                experiment_id=row['experiment_id'], parameters=parameters, success=bool(row['success']),
+                execution_time=0.0, total_pnl=row['total_pnl'] or 0.0, max_drawdown=row['max_drawdown'] or 0.0))
+
+        self.warm_start_count = len(self.history)
+        if self.warm_start_count:
+            logger.info(f"💾 暖啟動：沿用資料庫中 {self.warm_start_count} 筆既有結果")
+
+    # ------------------------------------------------------------------ 挑選
+
+    def _observations(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(取值索引, [總損益, 最大回撤], 是否成功)"""
+        indices = np.array([item['indices'] for item in self.history], dtype=int).reshape(-1, self.space.num_dims)
+        objectives = np.array([[item['total_pnl'], item['max_drawdown']] for item in self.history]).reshape(-1, 2)
+        success = np.array([item['success'] for item in self.history], dtype=bool)
+        return indices, objectives, success
+
+    def _candidates(self, indices: np.ndarray, y: np.ndarray, exclude: set) -> np.ndarray:
+        """
+        候選組合：全域隨機 + 目前較佳組合的鄰近網格點 (隨機改動一到兩個維度的取值)，
+        去除已評估與違反約束者
+        """
+        num_dims = self.space.num_dims
+        global_rows = self.space.to_indices(self.rng.random((self.candidate_pool, num_dims)))
+
+        top = indices[np.argsort(y)[:max(3, len(y) // 10)]]
+        local_rows = top[self.rng.integers(len(top), size=self.candidate_pool)].copy()
+        moves = self.rng.random(local_rows.shape) < 1.5 / num_dims
+        steps = self.rng.choice([-2, -1, 1, 2], size=local_rows.shape, p=[0.15, 0.35, 0.35, 0.15])
+        local_rows = np.clip(local_rows + moves * steps, 0, self.space.sizes - 1)
+
+        return self.space.select_new(np.vstack([local_rows, global_rows]), exclude)
+
+    def suggest(self, batch_size: int) -> List[Dict[str, Any]]:
+        """
+        挑選下一批待回測的參數
+
+        同一批中已挑選的點以 constant liar (假設其結果等於目前最佳) 加入模型，避免重複挑選相近的點。
+        """
+        return [self.space.decode(row) for row in self._suggest_indices(batch_size)]
+
+    def _suggest_indices(self, batch_size: int) -> np.ndarray:
+        indices, objectives, success = self._observations()
+        exclude = set(self.evaluated_keys)
+
+        if self.method == 'random' or success.sum() < self.n_initial:
+            return self.space.sample(self.rng, batch_size, exclude=exclude, latin_hypercube=True)
+
+        acquisition = ACQUISITIONS[self.method]
+        batch = []
+        for _ in range(batch_size):
+            weights = self.weights if self.weights is not None else self.rng.dirichlet([1.0, 1.0])
+            y = np.empty(len(indices))
+            y[success] = scalarize(objectives[success], weights)
+            y[~success] = y[success].max()   # 回測失敗視為最差
+
+            fit_indices, fit_y = indices, y
+            if batch:
+                fit_indices = np.vstack([indices, np.array(batch)])
+                fit_y = np.concatenate([y, np.full(len(batch), y.min())])
+
+            candidates = self._candidates(fit_indices, fit_y, exclude)
+            if len(candidates) == 0:
+                break
+
+            scores = acquisition(self.space.to_unit(fit_indices), fit_y, self.space.to_unit(candidates), self.rng)
+            best = candidates[int(np.argmax(scores))]
+            batch.append(best)
+            exclude.add(self.space.key(best))
+        return np.array(batch, dtype=int).reshape(-1, self.space.num_dims)
+
+    # ------------------------------------------------------------------ 執行
+
+    def evaluate(self, params_batch: List[Dict[str, Any]]) -> List[ExperimentResult]:
+        """透過回測引擎執行一批參數 (結果由引擎寫入實驗資料庫)"""
+        next_id = self.result_db.get_max_experiment_id() + 1
+        experiments = []
+        for offset, params in enumerate(params_batch):
+            experiments.append({
+                "experiment_id": next_id + offset,
+                **self.base_experiment,
+                **params,
+                "optimizer": self.method,
+                "optimizer_run": self.run_id,
+            })
+
+        collected: Dict[int, ExperimentResult] = {}
+        previous_callback = self.engine.result_callback
+
+        def collect(result: ExperimentResult):
+            collected[result.experiment_id] = result
+            if previous_callback:
+                previous_callback(result)
+
+        self.engine.set_result_callback(collect)
+        try:
+            self.engine.run_batch_experiments(experiments)
+        finally:
+            self.engine.result_callback = previous_callback
+
+        results = []
+        for experiment, params in zip(experiments, params_batch):
+            result = collected.get(experiment["experiment_id"])
+            if result is not None:
+                self._record(self.space.encode(params), result)
+                results.append(result)
+        return results
+
+    def run(self, budget: int, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        執行優化
+
+        Args:
+            budget: 本次最多回測的組數 (不含暖啟動沿用的結果)
+            batch_size: 每批組數，預設為引擎的並行數
+
+        Returns:
+            dict: 見 summary()
+        """
+        batch_size = batch_size or max(1, self.engine.max_parallel)
+        grid_size = self.space.grid_size
+        logger.info(f"🎯 自適應優化開始 - 方法: {self.method}, 預算: {budget}, 全網格: {grid_size} 組")
+
+        evaluated = 0
+        while evaluated < budget:
+            params_batch = self.suggest(min(batch_size, budget - evaluated))
+            if not params_batch:
+                logger.info("📭 參數空間已全部評估")
+                break
+
+            results = self.evaluate(params_batch)
+            if not results:
+                logger.warning("🛑 回測引擎未回傳結果，停止優化")
+                break
+            evaluated += len(results)
+
+            summary = self.summary()
+            best = summary['best_total_pnl']
+            logger.info(f"📊 優化進度: {evaluated}/{budget} - 最佳總損益: "
+                        f"{best['total_pnl'] if best else 'N/A'}, Pareto 前緣: {len(summary['pareto_front'])} 組")
+
+        return self.summary()
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        優化結果摘要
+
+        Returns:
+            dict: run_id、評估數、全網格組數、最佳總損益組合與 Pareto 前緣 (含 experiment_id 可回查資料庫)
+        """
+        succeeded = [item for item in self.history if item['success']]
+        rows = [{'experiment_id': item['experiment_id'], **self.space.decode(item['indices']),
+                 'total_pnl': item['total_pnl'], 'max_drawdown': item['max_drawdown']} for item in succeeded]
+
+        front = []
+        if rows:
+            indices = pareto_front([row['total_pnl'] for row in rows], [row['max_drawdown'] for row in rows])
+            front = [rows[i] for i in indices]
+
+        evaluations = len(self.history) - self.warm_start_count
+        grid_size = self.space.grid_size
+        return {
+            'run_id': self.run_id,
+            'method': self.method,
+            'evaluations': evaluations,
+            'warm_start': self.warm_start_count,
+            'failed': len(self.history) - len(succeeded),
+            'grid_size': grid_size,
+            'evaluation_ratio': len(self.history) / grid_size,
+            'best_total_pnl': front[0] if front else None,
+            'pareto_front': front,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自適應參數優化 (GP / TPE / 隨機森林)")
+    parser.add_argument("--method", choices=OPTIMIZER_METHODS, default="gp", help="優化方法")
+    parser.add_argument("--budget", type=int, default=120, help="最多回測組數")
+    parser.add_argument("--parallel", type=int, default=4, help="並行回測數 (同時也是每批組數)")
+    parser.add_argument("--direction", choices=["LONG_ONLY", "SHORT_ONLY", "BOTH"], default="BOTH", help="交易方向")
+    parser.add_argument("--seed", type=int, default=None, help="亂數種子")
+    parser.add_argument("--db", default="batch_experiments.db", help="實驗結果資料庫")
+    parser.add_argument("--no-warm-start", action="store_true", help="不沿用資料庫中的既有結果")
+    args = parser.parse_args()
+
+    config = create_default_experiment_config()
+    engine = BatchBacktestEngine(max_parallel=args.parallel, result_db=ResultDatabase(args.db))
+    optimizer = AdaptiveOptimizer(search_space_from_config(config),
+                                  base_experiment_from_config(config, trading_direction=args.direction),
+                                  engine=engine, method=args.method, seed=args.seed,
+                                  warm_start=not args.no_warm_start)
+    summary = optimizer.run(args.budget)
+
+    print(f"\n🏁 優化完成 - 回測 {summary['evaluations']} 組 (全網格 {summary['grid_size']} 組)")
+    print("🏆 Pareto 前緣 (總損益 vs 最大回撤):")
+    for row in summary['pareto_front']:
+        print(f"  實驗 {row['experiment_id']}: 總損益 {row['total_pnl']:.1f}, MDD {row['max_drawdown']:.1f} - "
+              f"{row['lot1_trigger']}({row['lot1_trailing']}%)/{row['lot2_trigger']}({row['lot2_trailing']}%)/"
+              f"{row['lot3_trigger']}({row['lot3_trailing']}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -120,6 +120,22 @@ class ResultDatabase:
             cursor = conn.execute("SELECT * FROM experiments ORDER BY created_at DESC")
             return [dict(row) for row in cursor.fetchall()]
 
+    def get_max_experiment_id(self) -> int:
+        """獲取目前最大的實驗ID (新實驗從下一號開始，避免覆蓋既有結果)"""
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("SELECT MAX(experiment_id) FROM experiments").fetchone()
+            return row[0] or 0
+
+    def get_metric_results(self, success_only: bool = True) -> List[Dict]:
+        """獲取參數與主要指標 (不含執行日誌，供優化器暖啟動使用)"""
+        query = "SELECT experiment_id, parameters, success, total_pnl, max_drawdown FROM experiments"
+        if success_only:
+            query += " WHERE success = 1"
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(query + " ORDER BY experiment_id")
+            return [dict(row) for row in cursor.fetchall()]
+
     def get_best_results(self, metric: str = "total_pnl", limit: int = 10, ascending: bool = False) -> List[Dict]:
         """獲取最佳結果"""
         if ascending:
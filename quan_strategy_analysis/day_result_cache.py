@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+每日回測結果快取 - 以 (交易日, 配置指紋, 引擎版本) 記憶每日結果，增量回測
+
+🎯 目的：
+    每次 export_to_sqlite.export_incremental_data / sync_data.py 追加新交易日後，
+    各分析都會把整段歷史重新回測一次，但舊交易日的結果其實不會改變。
+    本模組把每個交易日的結果 (當日損益、各口損益、進出場事件) 存進 SQLite，
+    完整區間的回測 = 已快取交易日的結果彙總 + 只計算新增或行情有變動的交易日。
+
+🔑 快取鍵：
+    - config_key：策略配置正規化後的雜湊 (含開盤區間時間等影響結果的設定)
+    - engine_version：交易邏輯版本，邏輯修改時變更版本即可讓舊結果自動失效
+    - trade_day：交易日
+    每筆結果另存 data_hash (當日行情指紋，load_day_hashes 以一次 GROUP BY 查詢取得)，
+    行情修正時指紋不同即重新計算。
+
+🔗 共用：
+    run_backtest(day_cache=...) 與 walk_forward 的 DailyPnLMatrix 使用同一個快取與相同的鍵，
+    參數優化、蒙地卡羅、滾動前進算過的 (配置, 交易日) 彼此沿用。
+
+📐 用法：
+    run_backtest(config, start_date, end_date, day_cache=DEFAULT_DAY_CACHE_PATH)
+    DailyPnLMatrix(configs, ..., extra=opening_range_key('08:46', '08:47')).update(market_days, store=store, ...)
+    python sync_data.py cache          # 查看快取狀態並清除舊引擎版本的結果
+
+作者：量化分析團隊
+日期：2025-07-17
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from contextlib import closing
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sensitivity_evaluation import MarketDay, config_fingerprint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DAY_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "day_results.sqlite")
+
+# 每日結果狀態
+STATUS_TRADED = 'traded'          # 有進場
+STATUS_NO_SIGNAL = 'no_signal'    # 通過濾網但沒有突破訊號
+STATUS_FILTERED = 'filtered'      # 被開盤區間濾網排除
+STATUS_NO_RANGE = 'no_range'      # K棒不足或找不到開盤區間K棒
+
+# 每日行情指紋 (K棒數、首末時間、OHLC 加總)，用於判斷快取的每日結果是否仍有效
+DAY_SUMMARY_QUERY = """
+    SELECT trade_datetime::date AS trade_day, COUNT(*) AS candle_count,
+           MIN(trade_datetime) AS first_candle, MAX(trade_datetime) AS last_candle,
+           SUM(open_price) AS sum_open, SUM(high_price) AS sum_high,
+           SUM(low_price) AS sum_low, SUM(close_price) AS sum_close
+    FROM stock_prices
+"""
+DAY_SUMMARY_FIELDS = ('candle_count', 'first_candle', 'last_candle', 'sum_open', 'sum_high', 'sum_low', 'sum_close')
+
+
+@dataclass
+class DayResult:
+    """單一交易日的回測結果"""
+    trade_day: str
+    data_hash: str
+    status: str
+    day_pnl: Decimal = Decimal(0)
+    direction: str = ""
+    lot_pnl: List[Decimal] = field(default_factory=list)
+    events: List[Dict] = field(default_factory=list)
+
+    @property
+    def traded(self) -> bool:
+        return self.status == STATUS_TRADED
+
+
+def summary_hash(*values) -> str:
+    """由每日彙總值 (K棒數、首末時間、OHLC 加總等) 計算行情指紋"""
+    return hashlib.sha1("|".join(str(value) for value in values).encode()).hexdigest()[:16]
+
+
+def config_key(config, *extra) -> str:
+    """快取用的配置鍵；extra 為配置以外影響結果的設定 (例如開盤區間時間)"""
+    return config_fingerprint([config, *extra]) if extra else config_fingerprint(config)
+
+
+def opening_range_key(range_start_time: str, range_end_time: str) -> Tuple[str, str]:
+    """開盤區間時間正規化為 ('HH:MM', 'HH:MM')，作為 config_key 的 extra (8:46 與 08:46 視為相同)"""
+    return tuple(f"{hour:02d}:{minute:02d}" for hour, minute in
+                 (map(int, value.split(':')) for value in (range_start_time, range_end_time)))
+
+
+def load_day_hashes(cur, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, str]:
+    """
+    以一次 GROUP BY 查詢取得期間內各交易日的行情指紋 (不讀取K棒本身)
+
+    Returns:
+        dict: {交易日字串: 指紋}，依日期排序
+    """
+    conditions, params = [], []
+    if start_date:
+        conditions.append("trade_datetime::date >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append("trade_datetime::date <= %s")
+        params.append(end_date)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    cur.execute(f"{DAY_SUMMARY_QUERY}{where} GROUP BY trade_datetime::date ORDER BY trade_day;", tuple(params))
+    return {str(row['trade_day']): summary_hash(*(row[name] for name in DAY_SUMMARY_FIELDS))
+            for row in cur.fetchall()}
+
+
+def day_result_from_logic(trade_day, data_hash: str, run_logic: Callable, day_session_candles: list,
+                          trade_candles: list, config, range_high, range_low) -> DayResult:
+    """
+    執行當日交易邏輯並整理成 DayResult
+
+    Args:
+        run_logic: _run_multi_lot_logic，需接受 trade_log 關鍵字參數並填入各口損益與事件
+    """
+    trade_log: Dict = {}
+    day_pnl, direction = run_logic(day_session_candles, trade_candles, config, range_high, range_low,
+                                   trade_log=trade_log)
+    return DayResult(trade_day=str(trade_day), data_hash=data_hash,
+                     status=STATUS_TRADED if direction else STATUS_NO_SIGNAL,
+                     day_pnl=Decimal(str(day_pnl)), direction=direction or "",
+                     lot_pnl=[Decimal(str(pnl)) for pnl in trade_log.get('lot_pnl', [])],
+                     events=list(trade_log.get('events', [])))
+
+
+class DayResultStore:
+    """
+    每日結果的 SQLite 儲存
+
+    主鍵為 (config_key, engine_version, trade_day)；金額以字串保存，讀回後仍為精確的 Decimal，
+    因此由快取彙總的總損益與直接回測完全相同。
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DAY_CACHE_PATH):
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS day_results (
+                    config_key TEXT NOT NULL,
+                    engine_version TEXT NOT NULL,
+                    trade_day TEXT NOT NULL,
+                    data_hash TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    day_pnl TEXT NOT NULL,
+                    direction TEXT NOT NULL,
+                    lot_pnl TEXT NOT NULL,
+                    events TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (config_key, engine_version, trade_day)
+                ) WITHOUT ROWID
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def load(self, key: str, engine_version: str,
+             start_day: Optional[str] = None, end_day: Optional[str] = None) -> Dict[str, DayResult]:
+        """
+        載入某配置的已快取結果
+
+        Returns:
+            dict: {交易日字串: DayResult}
+        """
+        query = ("SELECT trade_day, data_hash, status, day_pnl, direction, lot_pnl, events FROM day_results "
+                 "WHERE config_key = ? AND engine_version = ?")
+        params: List = [key, engine_version]
+        if start_day:
+            query += " AND trade_day >= ?"
+            params.append(str(start_day))
+        if end_day:
+            query += " AND trade_day <= ?"
+            params.append(str(end_day))
+
+        results = {}
+        with closing(self._connect()) as conn:
+            for day, data_hash, status, day_pnl, direction, lot_pnl, events in conn.execute(query, params):
+                results[day] = DayResult(trade_day=day, data_hash=data_hash, status=status,
+                                         day_pnl=Decimal(day_pnl), direction=direction,
+                                         lot_pnl=[Decimal(pnl) for pnl in json.loads(lot_pnl)],
+                                         events=json.loads(events))
+        return results
+
+    def save(self, key: str, engine_version: str, results: Iterable[DayResult]) -> int:
+        """寫入 (或覆蓋) 每日結果，回傳筆數"""
+        now = datetime.now().isoformat(timespec='seconds')
+        rows = [(key, engine_version, r.trade_day, r.data_hash, r.status, str(r.day_pnl), r.direction,
+                 json.dumps([str(pnl) for pnl in r.lot_pnl]), json.dumps(r.events, default=str), now)
+                for r in results]
+        if rows:
+            with closing(self._connect()) as conn, conn:
+                conn.executemany("INSERT OR REPLACE INTO day_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def stats(self) -> Dict:
+        """快取統計：總筆數、配置數、各引擎版本筆數與日期範圍"""
+        with closing(self._connect()) as conn:
+            total, configs, first_day, last_day = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT config_key), MIN(trade_day), MAX(trade_day) FROM day_results"
+            ).fetchone()
+            versions = dict(conn.execute(
+                "SELECT engine_version, COUNT(*) FROM day_results GROUP BY engine_version").fetchall())
+        return {'rows': total, 'configs': configs, 'first_day': first_day, 'last_day': last_day,
+                'engine_versions': versions}
+
+    def prune(self, keep_engine_version: str) -> int:
+        """刪除其他引擎版本的結果 (邏輯修改後不會再被讀取)，回傳刪除筆數"""
+        with closing(self._connect()) as conn, conn:
+            deleted = conn.execute("DELETE FROM day_results WHERE engine_version != ?",
+                                   (keep_engine_version,)).rowcount
+        if deleted:
+            with closing(self._connect()) as conn:
+                conn.execute("VACUUM")
+        return deleted
+
+
+def evaluate_day(config, market_day: MarketDay, data_hash: str, run_logic: Callable,
+                 apply_filter: Callable) -> DayResult:
+    """
+    評估 load_market_days 整理好的單一交易日 (先套用區間濾網，與 run_backtest 的每日流程相同)
+
+    Args:
+        run_logic: _run_multi_lot_logic (需支援 trade_log 參數)
+        apply_filter: apply_range_filter
+    """
+    day, session, trade_candles, range_high, range_low = market_day
+    passed, _ = apply_filter(config, range_high, range_low, day)
+    if not passed:
+        return DayResult(trade_day=str(day), data_hash=data_hash, status=STATUS_FILTERED)
+    return day_result_from_logic(day, data_hash, run_logic, session, trade_candles, config, range_high, range_low)
@@ -22,6 +22,10 @@ import logging
 import re
 from typing import Dict, Any, List, Optional
 
+from report_assets import (LAZY_LOADER_SCRIPT, REPORT_FORMAT_EMBEDDED, REPORT_FORMAT_LIGHT, REPORT_FORMATS,
+                           ReportAssetStore, lazy_log_html, lazy_table_html)
+from report_index import record_report
+
 # 導入策略摘要功能
 try:
     from multi_Profit_Funded_Risk_多口 import format_config_summary, create_strategy_config_from_gui
@@ -364,114 +368,190 @@ def calculate_enhanced_statistics(daily_df: pd.DataFrame, events_df: pd.DataFram
         'lot_analysis': lot_analysis
     }
 
-def create_enhanced_charts(daily_df: pd.DataFrame, events_df: pd.DataFrame, statistics: Dict[str, Any]) -> Dict[str, str]:
-    """創建增強圖表"""
+# 圖表檔名 (內嵌格式沿用的暫存路徑)
+CHART_FILENAMES = {
+    'daily_pnl': 'daily_pnl_analysis.png',
+    'pnl_distribution': 'pnl_distribution.png',
+    'lot_contribution': 'lot_contribution.png',
+}
+
+
+def _plot_daily_pnl(daily_pnl: pd.Series, chart_path: str):
+    """每日損益柱狀圖 + 累積損益曲線"""
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), height_ratios=[2, 1])
+
+    # 上圖：每日損益柱狀圖
+    colors = ['green' if x > 0 else 'red' for x in daily_pnl]
+    ax1.bar(range(len(daily_pnl)), daily_pnl, color=colors, alpha=0.7)
+
+    ax1.set_title('Daily P&L Analysis', fontsize=14, fontweight='bold')
+    ax1.set_ylabel('P&L (Points)', fontsize=12)
+    ax1.grid(True, alpha=0.3)
+    ax1.axhline(y=0, color='black', linestyle='-', alpha=0.5)
+
+    # 下圖：累積損益曲線
+    equity_curve = daily_pnl.cumsum()
+    ax2.plot(range(len(daily_pnl)), equity_curve, linewidth=2, color='blue')
+    ax2.fill_between(range(len(daily_pnl)), equity_curve, alpha=0.3, color='blue')
+    ax2.set_title('Cumulative P&L Curve', fontsize=12)
+    ax2.set_ylabel('Cumulative P&L', fontsize=10)
+    ax2.set_xlabel('Trading Days', fontsize=10)
+    ax2.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig(chart_path, dpi=300, bbox_inches='tight')
+    plt.close(fig)
+
+
+def _plot_pnl_distribution(daily_pnl: pd.Series, chart_path: str):
+    """每日損益分布直方圖"""
+    fig, ax = plt.subplots(figsize=(10, 6))
+
+    ax.hist(daily_pnl, bins=20, alpha=0.7, color='skyblue', edgecolor='black')
+    ax.axvline(daily_pnl.mean(), color='red', linestyle='--',
+               label=f'Mean: {daily_pnl.mean():.1f}')
+    ax.axvline(0, color='black', linestyle='-', alpha=0.5)
+
+    ax.set_title('P&L Distribution', fontsize=14, fontweight='bold')
+    ax.set_xlabel('P&L (Points)', fontsize=12)
+    ax.set_ylabel('Frequency', fontsize=12)
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig(chart_path, dpi=300, bbox_inches='tight')
+    plt.close(fig)
+
+
+def _plot_lot_contribution(lot_events: pd.DataFrame, chart_path: str):
+    """各口損益貢獻"""
+    fig, ax = plt.subplots(figsize=(10, 6))
+
+    lot_pnl = lot_events.groupby('lot_number')['pnl'].sum()
+    colors = ['green' if x > 0 else 'red' for x in lot_pnl.values]
+
+    bars = ax.bar([f'Lot {int(i)}' for i in lot_pnl.index], lot_pnl.values,
+                  color=colors, alpha=0.7)
+
+    # 添加數值標籤
+    for bar, value in zip(bars, lot_pnl.values):
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + (5 if height >= 0 else -15),
+                f'{value:+.0f}', ha='center', va='bottom' if height >= 0 else 'top')
+
+    ax.set_title('Lot Contribution Analysis', fontsize=14, fontweight='bold')
+    ax.set_ylabel('P&L (Points)', fontsize=12)
+    ax.axhline(y=0, color='black', linestyle='-', alpha=0.5)
+    ax.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig(chart_path, dpi=300, bbox_inches='tight')
+    plt.close(fig)
+
+
+def create_enhanced_charts(daily_df: pd.DataFrame, events_df: pd.DataFrame, statistics: Dict[str, Any],
+                           asset_store: Optional[ReportAssetStore] = None) -> Dict[str, str]:
+    """
+    創建增強圖表
+
+    Args:
+        asset_store: 未指定時回傳 base64 (內嵌於單一HTML)；
+                     指定時回傳共用圖檔的相對路徑，輸入相同的圖表不重新繪製
+
+    Returns:
+        Dict[str, str]: {圖表名稱: base64 或 相對路徑}
+    """
     chart_data = {}
-    
+
     if daily_df.empty:
         return chart_data
-    
-    # 確保charts目錄存在
-    os.makedirs('charts', exist_ok=True)
-    
-    # 1. 每日損益圖
-    try:
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), height_ratios=[2, 1])
-        
-        # 上圖：每日損益柱狀圖
-        colors = ['green' if x > 0 else 'red' for x in daily_df['total_pnl']]
-        bars = ax1.bar(range(len(daily_df)), daily_df['total_pnl'], color=colors, alpha=0.7)
-        
-        ax1.set_title('Daily P&L Analysis', fontsize=14, fontweight='bold')
-        ax1.set_ylabel('P&L (Points)', fontsize=12)
-        ax1.grid(True, alpha=0.3)
-        ax1.axhline(y=0, color='black', linestyle='-', alpha=0.5)
-        
-        # 下圖：累積損益曲線
-        equity_curve = daily_df['total_pnl'].cumsum()
-        ax2.plot(range(len(daily_df)), equity_curve, linewidth=2, color='blue')
-        ax2.fill_between(range(len(daily_df)), equity_curve, alpha=0.3, color='blue')
-        ax2.set_title('Cumulative P&L Curve', fontsize=12)
-        ax2.set_ylabel('Cumulative P&L', fontsize=10)
-        ax2.set_xlabel('Trading Days', fontsize=10)
-        ax2.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        chart_path = 'charts/daily_pnl_analysis.png'
-        plt.savefig(chart_path, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        # 轉換為base64
-        with open(chart_path, 'rb') as f:
-            chart_data['daily_pnl'] = base64.b64encode(f.read()).decode('utf-8')
-            
-    except Exception as e:
-        logger.error(f"Error creating daily P&L chart: {e}")
-    
-    # 2. 損益分布圖
-    try:
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        # 直方圖
-        ax.hist(daily_df['total_pnl'], bins=20, alpha=0.7, color='skyblue', edgecolor='black')
-        ax.axvline(daily_df['total_pnl'].mean(), color='red', linestyle='--', 
-                  label=f'Mean: {daily_df["total_pnl"].mean():.1f}')
-        ax.axvline(0, color='black', linestyle='-', alpha=0.5)
-        
-        ax.set_title('P&L Distribution', fontsize=14, fontweight='bold')
-        ax.set_xlabel('P&L (Points)', fontsize=12)
-        ax.set_ylabel('Frequency', fontsize=12)
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        chart_path = 'charts/pnl_distribution.png'
-        plt.savefig(chart_path, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        with open(chart_path, 'rb') as f:
-            chart_data['pnl_distribution'] = base64.b64encode(f.read()).decode('utf-8')
-            
-    except Exception as e:
-        logger.error(f"Error creating P&L distribution chart: {e}")
-    
-    # 3. 口數貢獻分析
+
+    # 只取繪圖用到的欄位，作為圖檔雜湊的輸入
+    daily_pnl = daily_df['total_pnl'].reset_index(drop=True)
+    charts = [('daily_pnl', _plot_daily_pnl, daily_pnl),
+              ('pnl_distribution', _plot_pnl_distribution, daily_pnl)]
     if not events_df.empty:
+        charts.append(('lot_contribution', _plot_lot_contribution,
+                       events_df[['lot_number', 'pnl']].reset_index(drop=True)))
+
+    if asset_store is None:
+        # 確保charts目錄存在
+        os.makedirs('charts', exist_ok=True)
+
+    for name, plot, data in charts:
         try:
-            fig, ax = plt.subplots(figsize=(10, 6))
-            
-            lot_pnl = events_df.groupby('lot_number')['pnl'].sum()
-            colors = ['green' if x > 0 else 'red' for x in lot_pnl.values]
-            
-            bars = ax.bar([f'Lot {int(i)}' for i in lot_pnl.index], lot_pnl.values, 
-                         color=colors, alpha=0.7)
-            
-            # 添加數值標籤
-            for bar, value in zip(bars, lot_pnl.values):
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height + (5 if height >= 0 else -15),
-                       f'{value:+.0f}', ha='center', va='bottom' if height >= 0 else 'top')
-            
-            ax.set_title('Lot Contribution Analysis', fontsize=14, fontweight='bold')
-            ax.set_ylabel('P&L (Points)', fontsize=12)
-            ax.axhline(y=0, color='black', linestyle='-', alpha=0.5)
-            ax.grid(True, alpha=0.3)
-            
-            plt.tight_layout()
-            chart_path = 'charts/lot_contribution.png'
-            plt.savefig(chart_path, dpi=300, bbox_inches='tight')
-            plt.close()
-            
+            if asset_store is not None:
+                chart_data[name] = asset_store.chart(name, lambda path: plot(data, path), data)
+                continue
+
+            chart_path = f'charts/{CHART_FILENAMES[name]}'
+            plot(data, chart_path)
+
+            # 轉換為base64
             with open(chart_path, 'rb') as f:
-                chart_data['lot_contribution'] = base64.b64encode(f.read()).decode('utf-8')
-                
+                chart_data[name] = base64.b64encode(f.read()).decode('utf-8')
+
         except Exception as e:
-            logger.error(f"Error creating lot contribution chart: {e}")
-    
+            logger.error(f"Error creating {name} chart: {e}")
+
     return chart_data
 
-def generate_enhanced_html_report(statistics: Dict[str, Any], chart_data: Dict[str, str], config_data: Dict[str, Any], events_df: pd.DataFrame, strategy_summary: str = "", log_content: str = "") -> str:
-    """生成增強版HTML報告"""
+
+# 出場類型的中文對應
+EXIT_TYPE_MAPPING = {
+    'trailing_stop': '移動停利',
+    'take_profit': '停利',
+    'stop_loss': '停損',
+    'protective_stop': '保護性停損',
+    'risk_management': '風險管理平倉',
+    'unknown': '未知'
+}
+
+# 交易明細表欄位：(資料鍵, 表頭)
+TRADE_DETAIL_COLUMNS = [
+    ('date', 'Date'),
+    ('direction', 'Direction'),
+    ('lot', 'Lot'),
+    ('entry_price', 'Entry Price'),
+    ('exit_price', 'Exit Price'),
+    ('pnl', 'P&L'),
+    ('exit_type', 'Exit Type'),
+]
+
+
+def build_trade_detail_rows(events_df: pd.DataFrame) -> List[Dict[str, str]]:
+    """交易明細表的顯示資料 (內嵌表格與分頁JSON共用)"""
+    rows = []
+    for trade in events_df.to_dict('records'):
+        pnl_class = 'positive' if trade['pnl'] > 0 else 'negative' if trade['pnl'] < 0 else 'neutral'
+        direction_icon = '📈' if trade['direction'] == 'LONG' else '📉'
+        exit_type_display = EXIT_TYPE_MAPPING.get(trade['exit_type'], trade['exit_type'])
+
+        # 特殊處理風險管理平倉
+        if trade['exit_type'] == 'risk_management':
+            exit_type_display = '🚨 風險管理平倉'
+
+        rows.append({
+            'date': str(trade['trade_date']),
+            'direction': f"{direction_icon} {trade['direction']}",
+            'lot': f"第{int(trade['lot_number'])}口",
+            'entry_price': str(trade['entry_price'] if pd.notna(trade['entry_price']) else 'N/A'),
+            'exit_price': str(trade['exit_price'] if pd.notna(trade['exit_price']) else 'N/A'),
+            'pnl': f"{trade['pnl']:+.0f}",
+            'pnl_class': pnl_class,
+            'exit_type': str(exit_type_display),
+        })
+    return rows
+
+def generate_enhanced_html_report(statistics: Dict[str, Any], chart_data: Dict[str, str], config_data: Dict[str, Any], events_df: pd.DataFrame, strategy_summary: str = "", log_content: str = "", lazy_assets: Optional[Dict[str, Dict]] = None) -> str:
+    """
+    生成增強版HTML報告
+
+    Args:
+        chart_data: create_enhanced_charts 的結果 (內嵌格式為 base64，輕量格式為圖檔相對路徑)
+        lazy_assets: 輕量格式的延遲載入資產 {'trades': write_table 描述, 'log': write_log 描述}；
+                     未指定時明細與日誌直接寫入HTML
+    """
     basic_metrics = statistics.get('basic_metrics', {})
     risk_metrics = statistics.get('risk_metrics', {})
     lot_analysis = statistics.get('lot_analysis', {})
@@ -483,27 +563,19 @@ def generate_enhanced_html_report(statistics: Dict[str, Any], chart_data: Dict[s
 
     # 圖表HTML
     charts_html = ""
-    if chart_data.get('daily_pnl'):
-        charts_html += f"""
-        <div class="chart-container">
-            <h3>📊 Daily P&L Analysis</h3>
-            <img src="data:image/png;base64,{chart_data['daily_pnl']}" alt="Daily P&L Chart" style="max-width: 100%; height: auto;">
-        </div>
-        """
-
-    if chart_data.get('pnl_distribution'):
-        charts_html += f"""
-        <div class="chart-container">
-            <h3>📈 P&L Distribution</h3>
-            <img src="data:image/png;base64,{chart_data['pnl_distribution']}" alt="P&L Distribution Chart" style="max-width: 100%; height: auto;">
-        </div>
-        """
-
-    if chart_data.get('lot_contribution'):
+    for name, title, alt in (('daily_pnl', '📊 Daily P&L Analysis', 'Daily P&L Chart'),
+                             ('pnl_distribution', '📈 P&L Distribution', 'P&L Distribution Chart'),
+                             ('lot_contribution', '🎯 Lot Contribution Analysis', 'Lot Contribution Chart')):
+        if not chart_data.get(name):
+            continue
+        if lazy_assets is not None:
+            image = f'<img src="{chart_data[name]}" alt="{alt}" loading="lazy" style="max-width: 100%; height: auto;">'
+        else:
+            image = f'<img src="data:image/png;base64,{chart_data[name]}" alt="{alt}" style="max-width: 100%; height: auto;">'
         charts_html += f"""
         <div class="chart-container">
-            <h3>🎯 Lot Contribution Analysis</h3>
-            <img src="data:image/png;base64,{chart_data['lot_contribution']}" alt="Lot Contribution Chart" style="max-width: 100%; height: auto;">
+            <h3>{title}</h3>
+            {image}
         </div>
         """
 
@@ -545,54 +617,36 @@ def generate_enhanced_html_report(statistics: Dict[str, Any], chart_data: Dict[s
 
     # 添加詳細交易明細表格
     trade_details_html = ""
-    if not events_df.empty:
-        # 按日期分組顯示交易明細
-        trade_details_html = """
+    if lazy_assets is not None and lazy_assets.get('trades'):
+        # 輕量格式：分頁JSON，捲動到此才載入
+        trade_details_html = f"""
+        <div class="table-container">
+            <h3>📋 Detailed Trade Records</h3>
+            {lazy_table_html('trade-details', TRADE_DETAIL_COLUMNS, lazy_assets['trades'], class_key='pnl_class')}
+        </div>
+        """
+    elif not events_df.empty:
+        header = ''.join(f"<th>{label}</th>" for _, label in TRADE_DETAIL_COLUMNS)
+        trade_details_html = f"""
         <div class="table-container">
             <h3>📋 Detailed Trade Records</h3>
             <table class="performance-table">
                 <thead>
-                    <tr>
-                        <th>Date</th>
-                        <th>Direction</th>
-                        <th>Lot</th>
-                        <th>Entry Price</th>
-                        <th>Exit Price</th>
-                        <th>P&L</th>
-                        <th>Exit Type</th>
-                    </tr>
+                    <tr>{header}</tr>
                 </thead>
                 <tbody>
         """
 
-        # 出場類型的中文對應
-        exit_type_mapping = {
-            'trailing_stop': '移動停利',
-            'take_profit': '停利',
-            'stop_loss': '停損',
-            'protective_stop': '保護性停損',
-            'risk_management': '風險管理平倉',
-            'unknown': '未知'
-        }
-
-        for _, trade in events_df.iterrows():
-            pnl_class = 'positive' if trade['pnl'] > 0 else 'negative' if trade['pnl'] < 0 else 'neutral'
-            direction_icon = '📈' if trade['direction'] == 'LONG' else '📉'
-            exit_type_display = exit_type_mapping.get(trade['exit_type'], trade['exit_type'])
-
-            # 特殊處理風險管理平倉
-            if trade['exit_type'] == 'risk_management':
-                exit_type_display = '🚨 風險管理平倉'
-
+        for row in build_trade_detail_rows(events_df):
             trade_details_html += f"""
                     <tr>
-                        <td>{trade['trade_date']}</td>
-                        <td>{direction_icon} {trade['direction']}</td>
-                        <td>第{int(trade['lot_number'])}口</td>
-                        <td>{trade['entry_price'] if pd.notna(trade['entry_price']) else 'N/A'}</td>
-                        <td>{trade['exit_price'] if pd.notna(trade['exit_price']) else 'N/A'}</td>
-                        <td class="{pnl_class}">{trade['pnl']:+.0f}</td>
-                        <td>{exit_type_display}</td>
+                        <td>{row['date']}</td>
+                        <td>{row['direction']}</td>
+                        <td>{row['lot']}</td>
+                        <td>{row['entry_price']}</td>
+                        <td>{row['exit_price']}</td>
+                        <td class="{row['pnl_class']}">{row['pnl']}</td>
+                        <td>{row['exit_type']}</td>
                     </tr>
             """
 
@@ -602,6 +656,15 @@ def generate_enhanced_html_report(statistics: Dict[str, Any], chart_data: Dict[s
         </div>
         """
 
+    # 交易日誌：輕量格式按需載入壓縮檔
+    if lazy_assets is not None and lazy_assets.get('log'):
+        log_html = lazy_log_html(lazy_assets['log'])
+    else:
+        log_html = f"""
+                <div style="max-height: 400px; overflow-y: auto; font-family: monospace; font-size: 12px; line-height: 1.4; white-space: pre-wrap; background: #ffffff; padding: 15px; border-radius: 5px; border: 1px solid #ddd;">
+{log_content}
+                </div>"""
+
     html_content = f"""
 <!DOCTYPE html>
 <html lang="en">
@@ -825,15 +888,14 @@ def generate_enhanced_html_report(statistics: Dict[str, Any], chart_data: Dict[s
             <!-- 交易日誌詳情 -->
             <h2 class="section-title">📋 Trading Log Details</h2>
             <div style="background: #f8f9fa; padding: 20px; border-radius: 10px; margin-bottom: 30px; border-left: 4px solid #667eea;">
-                <div style="max-height: 400px; overflow-y: auto; font-family: monospace; font-size: 12px; line-height: 1.4; white-space: pre-wrap; background: #ffffff; padding: 15px; border-radius: 5px; border: 1px solid #ddd;">
-{log_content}
-                </div>
+{log_html}
                 <p style="margin-top: 10px; color: #666; font-size: 14px;">
                     💡 此日誌用於研究階段數字比對，包含完整的交易執行細節
                 </p>
             </div>
         </div>
     </div>
+{LAZY_LOADER_SCRIPT if lazy_assets is not None else ''}
 </body>
 </html>
     """
@@ -842,9 +904,21 @@ def generate_enhanced_html_report(statistics: Dict[str, Any], chart_data: Dict[s
 
 
 
-def generate_comprehensive_report(log_content: str, config_data: Dict[str, Any]) -> Optional[str]:
-    """生成完整的分析報告"""
+def generate_comprehensive_report(log_content: str, config_data: Dict[str, Any],
+                                  report_format: str = REPORT_FORMAT_EMBEDDED,
+                                  reports_dir: str = "reports") -> Optional[str]:
+    """
+    生成完整的分析報告
+
+    Args:
+        report_format: REPORT_FORMAT_EMBEDDED 單一HTML檔；
+                       REPORT_FORMAT_LIGHT 圖表存為共用圖檔，明細與日誌延遲載入 (見 report_assets)
+        reports_dir: 報告輸出目錄
+    """
     try:
+        if report_format not in REPORT_FORMATS:
+            raise ValueError(f"不支援的報告格式: {report_format}")
+
         print("📊 開始生成完整分析報告...")
 
         # 1. 提取交易資料
@@ -861,9 +935,13 @@ def generate_comprehensive_report(log_content: str, config_data: Dict[str, Any])
         print("📈 計算統計指標...")
         statistics = calculate_enhanced_statistics(daily_df, events_df)
 
-        # 3. 生成圖表
+        report_filename = os.path.join(reports_dir, f"enhanced_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html")
+        os.makedirs(reports_dir, exist_ok=True)
+
+        # 3. 生成圖表 (輕量格式：相同輸入沿用既有圖檔)
         print("📊 生成圖表...")
-        chart_data = create_enhanced_charts(daily_df, events_df, statistics)
+        asset_store = ReportAssetStore(reports_dir) if report_format == REPORT_FORMAT_LIGHT else None
+        chart_data = create_enhanced_charts(daily_df, events_df, statistics, asset_store=asset_store)
 
         # 4. 生成策略摘要
         strategy_summary = ""
@@ -882,14 +960,33 @@ def generate_comprehensive_report(log_content: str, config_data: Dict[str, Any])
 
         # 5. 生成HTML報告
         print("📋 生成HTML報告...")
-        report_filename = f"reports/enhanced_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-        os.makedirs("reports", exist_ok=True)
-
-        html_content = generate_enhanced_html_report(statistics, chart_data, config_data, events_df, strategy_summary, log_content)
+        lazy_assets = None
+        if asset_store is not None:
+            lazy_assets = {'log': asset_store.write_log(report_filename, log_content)}
+            if not events_df.empty:
+                lazy_assets['trades'] = asset_store.write_table(report_filename, 'trades',
+                                                                build_trade_detail_rows(events_df))
+            print(f"🖼️ 圖表: 新繪製 {asset_store.stats['charts_rendered']} 張，"
+                  f"沿用 {asset_store.stats['charts_reused']} 張")
+
+        html_content = generate_enhanced_html_report(statistics, chart_data, config_data, events_df, strategy_summary, log_content,
+                                                     lazy_assets=lazy_assets)
 
         with open(report_filename, 'w', encoding='utf-8') as f:
             f.write(html_content)
 
+        # 6. 寫入報告索引 (報告管理頁只讀索引)
+        config_data = config_data or {}
+        basic_metrics = statistics.get('basic_metrics', {})
+        record_report(report_filename,
+                      trade_lots=config_data.get('trade_lots'),
+                      start_date=config_data.get('start_date'),
+                      end_date=config_data.get('end_date'),
+                      total_trades=basic_metrics.get('total_trades'),
+                      win_rate=basic_metrics.get('win_rate'),
+                      total_pnl=basic_metrics.get('total_pnl'),
+                      max_drawdown=statistics.get('risk_metrics', {}).get('max_drawdown'))
+
         print(f"✅ 完整報告生成成功: {report_filename}")
         return report_filename
 
@@ -34,8 +34,11 @@ from strategy_core import run_backtest, StrategyConfig, LotRule, StopLossType
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
 
+# 義大利麵圖最多繪製的路徑數 (統計仍使用全部路徑)
+MAX_PLOTTED_PATHS = 2000
+
 def simulate_future_paths(historical_daily_pnl: List[Decimal], num_simulations: int,
-                         num_future_days: int, initial_capital: float) -> List[np.ndarray]:
+                         num_future_days: int, initial_capital: float) -> np.ndarray:
     """
     使用蒙地卡羅方法模擬未來資金曲線路徑
 
@@ -46,7 +49,7 @@ def simulate_future_paths(historical_daily_pnl: List[Decimal], num_simulations:
         initial_capital: 模擬的起始資金
 
     Returns:
-        List[np.ndarray]: 包含所有模擬路徑的列表，每條路徑都是一個NumPy陣列
+        np.ndarray: (模擬次數 × 天數+1) 的路徑矩陣，每一列為一條資金曲線
     """
     logger.info(f"🎲 開始蒙地卡羅模擬：{num_simulations} 次模擬，{num_future_days} 天預測")
 
@@ -63,35 +66,34 @@ def simulate_future_paths(historical_daily_pnl: List[Decimal], num_simulations:
     logger.info(f"   - 標準差 (σ)：{sigma:.2f} 點")
     logger.info(f"   - 起始資金：{initial_capital:,.0f}")
 
-    # 初始化存放所有模擬路徑的列表
-    all_paths = []
-
-    # 執行蒙地卡羅模擬
-    for i in range(num_simulations):
-        # 生成隨機每日損益序列（基於歷史統計特徵）
-        random_daily_pnl = np.random.normal(loc=mu, scale=sigma, size=num_future_days)
+    # 一次產生 (模擬次數 × 天數) 的隨機每日損益矩陣（基於歷史統計特徵）
+    random_daily_pnl = np.random.normal(loc=mu, scale=sigma, size=(num_simulations, num_future_days))
 
-        # 計算累積損益並加上起始資金，形成資金曲線路徑
-        cumulative_pnl = np.cumsum(random_daily_pnl)
-        equity_curve = initial_capital + cumulative_pnl
+    # 逐列累積損益並加上起始資金，第一欄為起始資金點
+    all_paths = np.empty((num_simulations, num_future_days + 1))
+    all_paths[:, 0] = initial_capital
+    np.cumsum(random_daily_pnl, axis=1, out=all_paths[:, 1:])
+    all_paths[:, 1:] += initial_capital
 
-        # 將起始資金點加到路徑開頭
-        full_path = np.concatenate([[initial_capital], equity_curve])
+    logger.info(f"✅ 蒙地卡羅模擬完成！生成了 {len(all_paths)} 條未來路徑")
 
-        # 添加到路徑列表
-        all_paths.append(full_path)
+    return all_paths
 
-        # 每完成 10% 顯示進度
-        if (i + 1) % (num_simulations // 10) == 0:
-            progress = (i + 1) / num_simulations * 100
-            logger.info(f"   模擬進度：{progress:.0f}% ({i + 1}/{num_simulations})")
 
-    logger.info(f"✅ 蒙地卡羅模擬完成！生成了 {len(all_paths)} 條未來路徑")
+def _path_hit_stats(all_paths: np.ndarray, profit_target: float, risk_limit: float):
+    """
+    逐列統計路徑是否觸及目標/底線
 
-    return all_paths
+    Returns:
+        tuple: (觸及獲利目標路徑數, 觸及風險底線路徑數, 最終資金陣列)
+    """
+    all_paths = np.asarray(all_paths)
+    hit_profit = int(np.count_nonzero((all_paths >= profit_target).any(axis=1)))
+    hit_risk = int(np.count_nonzero((all_paths <= risk_limit).any(axis=1)))
+    return hit_profit, hit_risk, all_paths[:, -1].copy()
 
 
-def analyze_and_plot_future_paths(all_paths: List[np.ndarray], initial_capital: float,
+def analyze_and_plot_future_paths(all_paths: np.ndarray, initial_capital: float,
                                  profit_target_pct: Optional[float] = None, risk_limit_pct: Optional[float] = None,
                                  profit_target_abs: Optional[float] = None, risk_limit_abs: Optional[float] = None,
                                  save_reports: bool = True, strategy_config=None,
@@ -101,7 +103,7 @@ def analyze_and_plot_future_paths(all_paths: List[np.ndarray], initial_capital:
     分析並視覺化未來路徑，繪製義大利麵圖並計算關鍵風險指標
 
     Args:
-        all_paths: 從模擬獲得的所有路徑列表
+        all_paths: 從模擬獲得的路徑矩陣 (每列一條路徑)
         initial_capital: 起始資金
         profit_target_pct: 獲利目標百分比（例如 0.20 代表20%）
         risk_limit_pct: 風險底線百分比（例如 0.15 代表15%）
@@ -131,14 +133,9 @@ def analyze_and_plot_future_paths(all_paths: List[np.ndarray], initial_capital:
     # 創建圖表
     plt.figure(figsize=(14, 10))
 
-    # 繪製所有模擬路徑（義大利麵圖）
-    for i, path in enumerate(all_paths):
-        plt.plot(range(len(path)), path, color='lightblue', alpha=0.1, linewidth=0.5)
-
-        # 每繪製 200 條路徑顯示一次進度
-        if (i + 1) % 200 == 0:
-            progress = (i + 1) / len(all_paths) * 100
-            logger.info(f"   繪圖進度：{progress:.0f}% ({i + 1}/{len(all_paths)})")
+    # 繪製模擬路徑（義大利麵圖）：路徑已是隨機產生，取前 MAX_PLOTTED_PATHS 條一次繪製
+    plotted_paths = np.asarray(all_paths[:MAX_PLOTTED_PATHS])
+    plt.plot(plotted_paths.T, color='lightblue', alpha=0.1, linewidth=0.5)
 
     # 繪製重要的水平線
     plt.axhline(y=initial_capital, color='black', linestyle='-', linewidth=2, label=f'起始資金 ({initial_capital:,.0f})')
@@ -163,29 +160,14 @@ def analyze_and_plot_future_paths(all_paths: List[np.ndarray], initial_capital:
     # ==========================================
     logger.info("🔍 計算風險與回報指標...")
 
-    # 統計觸及獲利目標的路徑
-    paths_hit_profit = 0
-    paths_hit_risk = 0
-    final_values = []
-
-    for path in all_paths:
-        # 檢查是否曾經觸及或超過獲利目標
-        if np.any(path >= profit_target):
-            paths_hit_profit += 1
-
-        # 檢查是否曾經觸及或跌破風險底線
-        if np.any(path <= risk_limit):
-            paths_hit_risk += 1
-
-        # 收集最終資金值
-        final_values.append(path[-1])
+    # 統計觸及獲利目標/風險底線的路徑
+    paths_hit_profit, paths_hit_risk, final_values = _path_hit_stats(all_paths, profit_target, risk_limit)
 
     # 計算百分比
     profit_hit_pct = (paths_hit_profit / len(all_paths)) * 100
     risk_hit_pct = (paths_hit_risk / len(all_paths)) * 100
 
     # 計算最終資金分位數
-    final_values = np.array(final_values)
     percentile_5 = np.percentile(final_values, 5)
     percentile_50 = np.percentile(final_values, 50)  # 中位數
     percentile_95 = np.percentile(final_values, 95)
@@ -368,20 +350,10 @@ def run_dual_analysis(daily_pnl_list, num_simulations, num_future_days,
     profit_target_abs = profit_target_points
     risk_limit_abs = risk_limit_points
 
-    paths_hit_profit_1 = 0
-    paths_hit_risk_1 = 0
-    final_values_1 = []
-
-    for path in paths_points:
-        if np.any(path >= profit_target_abs):
-            paths_hit_profit_1 += 1
-        if np.any(path <= risk_limit_abs):
-            paths_hit_risk_1 += 1
-        final_values_1.append(path[-1])
+    paths_hit_profit_1, paths_hit_risk_1, final_values_1 = _path_hit_stats(paths_points, profit_target_abs, risk_limit_abs)
 
     profit_hit_pct_1 = (paths_hit_profit_1 / len(paths_points)) * 100
     risk_hit_pct_1 = (paths_hit_risk_1 / len(paths_points)) * 100
-    final_values_1 = np.array(final_values_1)
 
     # ==========================================
     # 方案二：資本報酬率分析
@@ -399,20 +371,10 @@ def run_dual_analysis(daily_pnl_list, num_simulations, num_future_days,
     profit_target_abs_2 = initial_capital_pct * (1 + profit_target_pct)
     risk_limit_abs_2 = initial_capital_pct * (1 - risk_limit_pct)
 
-    paths_hit_profit_2 = 0
-    paths_hit_risk_2 = 0
-    final_values_2 = []
-
-    for path in paths_pct:
-        if np.any(path >= profit_target_abs_2):
-            paths_hit_profit_2 += 1
-        if np.any(path <= risk_limit_abs_2):
-            paths_hit_risk_2 += 1
-        final_values_2.append(path[-1])
+    paths_hit_profit_2, paths_hit_risk_2, final_values_2 = _path_hit_stats(paths_pct, profit_target_abs_2, risk_limit_abs_2)
 
     profit_hit_pct_2 = (paths_hit_profit_2 / len(paths_pct)) * 100
     risk_hit_pct_2 = (paths_hit_risk_2 / len(paths_pct)) * 100
-    final_values_2 = np.array(final_values_2)
 
     # 保存雙方案對比報告
     if save_reports:
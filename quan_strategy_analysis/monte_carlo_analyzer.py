@@ -134,6 +134,7 @@ try:
     RiskConfig = backtest_module.RiskConfig
     StopLossConfig = backtest_module.StopLossConfig
     run_backtest = backtest_module.run_backtest
+    from day_result_cache import DEFAULT_DAY_CACHE_PATH
 
     print("✅ 成功導入回測模組")
 except Exception as e:
@@ -273,7 +274,8 @@ def main():
             end_date="2025-06-28",
             silent=False,  # 顯示詳細回測過程
             range_start_time="10:15",
-            range_end_time="10:30"
+            range_end_time="10:30",
+            day_cache=DEFAULT_DAY_CACHE_PATH  # 只計算新增或行情有變動的交易日
         )
         
         if not result or result['total_trades'] == 0:
@@ -0,0 +1,333 @@
+# monte_carlo_engine.py
+"""
+向量化蒙地卡羅模擬引擎
+以 (模擬次數 × 交易日) 矩陣分塊產生重抽樣路徑，累積損益、峰值與回撤全部以陣列運算完成
+
+- 重抽樣方式: permutation (打亂順序，與原本相同)、iid (逐日重複抽樣)、
+  stationary (Politis-Romano 平穩區塊)、circular (固定長度循環區塊)
+- 分塊大小依記憶體預算計算，百萬次模擬也不需保留所有路徑
+- 分位數以可合併的串流直方圖估計，誤差不超過一個分箱寬度
+- 原始順序路徑的結果另外精確計數，原始結果在分佈中的位置可正確處理同值
+  (permutation 模式下每次模擬的總損益都與原始相同)
+
+作者: 量化分析師
+日期: 2025-01-14
+"""
+
+import math
+import numpy as np
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+RESAMPLING_METHODS = ('permutation', 'iid', 'stationary', 'circular')
+
+# 每條路徑每日約需的陣列數 (索引、損益/累積、峰值/回撤、區塊暫存)
+_ARRAYS_PER_CELL = 4
+
+# 同值判斷的相對容差：不同加總順序造成的浮點誤差視為同值
+TIE_TOLERANCE = 1e-9
+
+
+def _tie_tolerance(threshold: float) -> float:
+    return TIE_TOLERANCE * max(1.0, abs(threshold))
+
+
+class StreamingQuantiles:
+    """
+    串流分位數估計器
+
+    固定分箱數的直方圖；新資料超出範圍時將相鄰分箱兩兩合併、範圍加倍，
+    記憶體固定為 num_bins 個計數。同時精確記錄筆數、平均、標準差與極值，
+    以及以 track() 登記的門檻值的小於 / 同值筆數。
+    """
+
+    def __init__(self, num_bins: int = 8192):
+        if num_bins < 2 or num_bins % 2:
+            raise ValueError("num_bins 必須為大於等於2的偶數")
+        self.num_bins = num_bins
+        self.counts = np.zeros(num_bins, dtype=np.int64)
+        self.low = None
+        self.width = None
+
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.tracked = {}  # 門檻值 -> [小於筆數, 同值筆數]
+
+    def track(self, *thresholds: float):
+        """登記需要精確比較的門檻值 (需在 update 之前)"""
+        for threshold in thresholds:
+            self.tracked.setdefault(float(threshold), [0, 0])
+
+    def update(self, values: np.ndarray):
+        """加入一批數值"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+
+        self._update_moments(values)
+        for threshold, counts in self.tracked.items():
+            tolerance = _tie_tolerance(threshold)
+            counts[0] += int(np.count_nonzero(values < threshold - tolerance))
+            counts[1] += int(np.count_nonzero(np.abs(values - threshold) <= tolerance))
+
+        vmin, vmax = float(values.min()), float(values.max())
+        self.min = min(self.min, vmin)
+        self.max = max(self.max, vmax)
+
+        if self.low is None:
+            span = vmax - vmin
+            self.width = span / (self.num_bins // 2) if span > 0 else max(abs(vmin) * 1e-9, 1e-9)
+            # 預留一半空間，減少之後的合併次數
+            self.low = vmin - self.width * (self.num_bins // 4)
+
+        while vmin < self.low or vmax >= self.high:
+            self._grow(extend_down=vmin < self.low)
+
+        bins = ((values - self.low) / self.width).astype(np.int64)
+        np.clip(bins, 0, self.num_bins - 1, out=bins)
+        self.counts += np.bincount(bins, minlength=self.num_bins)
+
+    @property
+    def high(self) -> float:
+        return self.low + self.width * self.num_bins
+
+    @property
+    def mean(self) -> float:
+        return self._mean if self.count else float('nan')
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / self.count) if self.count else float('nan')
+
+    def quantile(self, q: float) -> float:
+        """估計分位數 (q 介於 0~1)"""
+        if not self.count:
+            return float('nan')
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        cumulative = np.cumsum(self.counts)
+        target = q * self.count
+        index = int(np.searchsorted(cumulative, target, side='left'))
+        before = cumulative[index - 1] if index > 0 else 0
+        in_bin = self.counts[index]
+        fraction = (target - before) / in_bin if in_bin else 0.0
+        value = self.low + (index + fraction) * self.width
+        return float(min(max(value, self.min), self.max))
+
+    def percentile(self, p: float) -> float:
+        """估計百分位數 (p 介於 0~100)"""
+        return self.quantile(p / 100.0)
+
+    def fraction_below(self, threshold: float, strict: bool = False) -> float:
+        """
+        估計小於等於 (strict=True 時為小於) 門檻值的比例
+
+        track() 登記過的門檻值為精確計數；其餘由分箱內線性內插估計，
+        內插無法分辨同值，只有門檻值在最小值以下或最大值以上時為精確值
+        """
+        if not self.count:
+            return float('nan')
+        for tracked, (less, equal) in self.tracked.items():
+            if abs(threshold - tracked) <= _tie_tolerance(tracked):
+                return float((less if strict else less + equal) / self.count)
+        if threshold < self.min or (strict and threshold <= self.min):
+            return 0.0
+        if threshold > self.max or (not strict and threshold >= self.max):
+            return 1.0
+        position = (threshold - self.low) / self.width
+        index = int(position)
+        below = self.counts[:index].sum() + self.counts[index] * (position - index)
+        return float(below / self.count)
+
+    def summary(self, percentiles: Sequence[float] = (5, 25, 50, 75, 95)) -> Dict:
+        """統計摘要"""
+        result = {
+            'count': self.count, 'mean': self.mean, 'std': self.std,
+            'min': self.min if self.count else float('nan'),
+            'max': self.max if self.count else float('nan'),
+            'bin_width': self.width,
+        }
+        for p in percentiles:
+            result[f'p{p:g}'] = self.percentile(p)
+        return result
+
+    # ---- 內部 ----
+
+    def _update_moments(self, values: np.ndarray):
+        # Chan 平行合併公式
+        n_b = values.size
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+        n = self.count + n_b
+        delta = mean_b - self._mean
+        self._mean += delta * n_b / n
+        self._m2 += m2_b + delta * delta * self.count * n_b / n
+        self.count = n
+
+    def _grow(self, extend_down: bool):
+        merged = self.counts.reshape(-1, 2).sum(axis=1)
+        self.counts = np.zeros(self.num_bins, dtype=np.int64)
+        half = self.num_bins // 2
+        if extend_down:
+            self.counts[half:] = merged
+            self.low -= self.width * self.num_bins
+        else:
+            self.counts[:half] = merged
+        self.width *= 2
+
+
+class MonteCarloEngine:
+    """
+    分塊向量化蒙地卡羅引擎
+
+    用法:
+        engine = MonteCarloEngine(daily_pnl, method='stationary', block_length=5, seed=42)
+        result = engine.run(200000)
+        result['final_pnl'].percentile(5)
+    """
+
+    def __init__(self, daily_pnl: Sequence, method: str = 'permutation',
+                 block_length: Optional[float] = None, horizon: Optional[int] = None,
+                 memory_budget_mb: float = 256.0, seed: Optional[int] = None):
+        """
+        Args:
+            daily_pnl: 歷史每日損益 (可為 Decimal)
+            method: 重抽樣方式 (permutation / iid / stationary / circular)
+            block_length: 區塊長度 (stationary 為平均長度)，預設為 n^(1/3)
+            horizon: 每條路徑天數，預設與歷史天數相同 (permutation 只能等於歷史天數)
+            memory_budget_mb: 單一分塊可使用的記憶體上限
+            seed: 亂數種子
+        """
+        if method not in RESAMPLING_METHODS:
+            raise ValueError(f"未知的重抽樣方式: {method}，可用: {RESAMPLING_METHODS}")
+
+        self.pnl = np.array([float(x) for x in daily_pnl], dtype=np.float64)
+        if self.pnl.size == 0:
+            raise ValueError("每日損益列表為空")
+
+        self.method = method
+        self.horizon = int(horizon) if horizon else self.pnl.size
+        if method == 'permutation' and self.horizon != self.pnl.size:
+            raise ValueError("permutation 模式的路徑長度必須等於歷史天數")
+
+        self.block_length = float(block_length) if block_length else max(1.0, round(self.pnl.size ** (1 / 3)))
+        self.memory_budget_mb = memory_budget_mb
+        self.rng = np.random.default_rng(seed)
+
+    @property
+    def chunk_size(self) -> int:
+        """依記憶體預算計算每塊模擬次數"""
+        bytes_per_path = self.horizon * 8 * _ARRAYS_PER_CELL
+        return max(1, int(self.memory_budget_mb * 1024 * 1024 // bytes_per_path))
+
+    def sample_indices(self, num_paths: int) -> np.ndarray:
+        """產生 (num_paths × horizon) 的重抽樣索引矩陣"""
+        n, days = self.pnl.size, self.horizon
+
+        if self.method == 'permutation':
+            return self.rng.permuted(np.broadcast_to(np.arange(n), (num_paths, n)), axis=1)
+
+        if self.method == 'iid':
+            return self.rng.integers(0, n, size=(num_paths, days))
+
+        position = np.arange(days)
+        if self.method == 'circular':
+            length = max(1, int(round(self.block_length)))
+            starts = self.rng.integers(0, n, size=(num_paths, -(-days // length)))
+            return (starts[:, position // length] + position % length) % n
+
+        # stationary: 每日以機率 1/L 開始新區塊，區塊長度服從幾何分佈
+        new_block = self.rng.random((num_paths, days)) < 1.0 / self.block_length
+        new_block[:, 0] = True
+        block_start = np.maximum.accumulate(np.where(new_block, position, 0), axis=1)
+        starts = self.rng.integers(0, n, size=(num_paths, days))
+        start_values = np.take_along_axis(starts, block_start, axis=1)
+        return (start_values + position - block_start) % n
+
+    def iter_chunks(self, num_simulations: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        逐塊產生模擬結果
+
+        Yields:
+            (最終損益陣列, 最大回撤陣列)
+        """
+        remaining = num_simulations
+        chunk = self.chunk_size
+        while remaining > 0:
+            size = min(chunk, remaining)
+            yield equity_curve_stats(self.pnl[self.sample_indices(size)])
+            remaining -= size
+
+    def run(self, num_simulations: int, keep_samples: bool = False,
+            progress: bool = True, num_bins: int = 8192) -> Dict:
+        """
+        執行模擬
+
+        Args:
+            num_simulations: 模擬次數
+            keep_samples: 是否保留每次模擬的結果陣列 (百萬次約需16MB)
+            progress: 是否顯示進度
+            num_bins: 串流分位數的分箱數
+
+        路徑長度等於歷史天數時，原始順序路徑的最終損益與最大回撤登記為精確計數的門檻值
+
+        Returns:
+            dict:
+                - 'final_pnl' / 'max_drawdown': StreamingQuantiles
+                - 'final_pnls' / 'max_drawdowns': np.ndarray (keep_samples=True 時)
+                - 'num_simulations', 'method', 'chunk_size'
+        """
+        final_stats = StreamingQuantiles(num_bins)
+        mdd_stats = StreamingQuantiles(num_bins)
+        if self.horizon == self.pnl.size:
+            original_final, original_mdd = equity_curve_stats(self.pnl[np.newaxis, :].copy())
+            final_stats.track(original_final[0])
+            mdd_stats.track(original_mdd[0])
+        finals, mdds = [], []
+
+        done = 0
+        next_report = 0.1
+        for final_pnl, max_dd in self.iter_chunks(num_simulations):
+            final_stats.update(final_pnl)
+            mdd_stats.update(max_dd)
+            if keep_samples:
+                finals.append(final_pnl)
+                mdds.append(max_dd)
+
+            done += final_pnl.size
+            if progress and done / num_simulations >= next_report:
+                print(f"   🔄 模擬進度: {done / num_simulations * 100:.0f}% ({done}/{num_simulations})")
+                next_report = math.floor(done / num_simulations * 10 + 1) / 10
+
+        result = {
+            'final_pnl': final_stats,
+            'max_drawdown': mdd_stats,
+            'num_simulations': num_simulations,
+            'method': self.method,
+            'chunk_size': self.chunk_size,
+        }
+        if keep_samples:
+            result['final_pnls'] = np.concatenate(finals) if finals else np.empty(0)
+            result['max_drawdowns'] = np.concatenate(mdds) if mdds else np.empty(0)
+        return result
+
+
+def equity_curve_stats(pnl_paths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    計算多條資金曲線的最終損益與最大回撤 (逐列)
+
+    Args:
+        pnl_paths: (路徑數 × 天數) 損益矩陣，會被就地改寫為累積損益
+
+    Returns:
+        tuple: (最終總損益陣列, 最大回撤陣列)
+    """
+    cumulative = np.cumsum(pnl_paths, axis=1, out=pnl_paths)
+    peak = np.maximum.accumulate(cumulative, axis=1)
+    np.subtract(peak, cumulative, out=peak)
+    return cumulative[:, -1].copy(), peak.max(axis=1)
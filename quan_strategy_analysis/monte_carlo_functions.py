@@ -11,93 +11,64 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from decimal import Decimal
-from typing import List, Dict, Tuple
-import copy
+from typing import List, Dict, Optional, Tuple
 
+from monte_carlo_engine import MonteCarloEngine, StreamingQuantiles
 
-def run_monte_carlo_simulation(daily_pnl_list: List[Decimal], num_simulations: int = 2000) -> Dict:
+# 超過此模擬次數時只保留串流統計，不保留逐次結果
+MAX_KEPT_SAMPLES = 1_000_000
+
+
+def run_monte_carlo_simulation(daily_pnl_list: List[Decimal], num_simulations: int = 2000,
+                               method: str = 'permutation', block_length: Optional[float] = None,
+                               seed: Optional[int] = None, memory_budget_mb: float = 256.0,
+                               keep_samples: Optional[bool] = None) -> Dict:
     """
-    執行蒙地卡羅模擬分析
+    執行蒙地卡羅模擬分析 (向量化分塊引擎)
     
     Args:
         daily_pnl_list: 從回測獲得的每日損益列表
-        num_simulations: 模擬次數，預設為2000次
+        num_simulations: 模擬次數，預設為2000次 (可提高到百萬次)
+        method: 重抽樣方式 permutation / iid / stationary / circular
+        block_length: 區塊重抽樣的區塊長度
+        seed: 亂數種子 (相同種子結果可重現)
+        memory_budget_mb: 每個分塊的記憶體上限
+        keep_samples: 是否保留每次模擬的結果，預設在 MAX_KEPT_SAMPLES 次以內保留
     
     Returns:
         dict: 包含模擬結果的字典
-            - 'final_pnls': 所有模擬的最終總損益列表
-            - 'max_drawdowns': 所有模擬的最大回撤列表
+            - 'final_pnls': 所有模擬的最終總損益列表 (未保留時為空列表)
+            - 'max_drawdowns': 所有模擬的最大回撤列表 (未保留時為空列表)
+            - 'final_pnl_stats' / 'max_drawdown_stats': StreamingQuantiles 串流統計
     """
     if not daily_pnl_list:
         print("⚠️ 警告：每日損益列表為空，無法進行蒙地卡羅模擬")
         return {'final_pnls': [], 'max_drawdowns': []}
     
+    if keep_samples is None:
+        keep_samples = num_simulations <= MAX_KEPT_SAMPLES
+
+    engine = MonteCarloEngine(daily_pnl_list, method=method, block_length=block_length,
+                              memory_budget_mb=memory_budget_mb, seed=seed)
+
     print(f"🎲 開始蒙地卡羅模擬...")
     print(f"   📊 原始交易日數: {len(daily_pnl_list)}")
-    print(f"   🔄 模擬次數: {num_simulations}")
-    
-    # 初始化結果容器
-    simulated_final_pnls = []
-    simulated_max_drawdowns = []
-    
-    # 將 Decimal 轉換為 float 以便 numpy 處理
-    pnl_array = np.array([float(pnl) for pnl in daily_pnl_list])
+    print(f"   🔄 模擬次數: {num_simulations} (重抽樣: {method}, 每塊 {engine.chunk_size} 次)")
     
-    # 執行模擬迴圈
-    for i in range(num_simulations):
-        # 顯示進度（每10%顯示一次）
-        if (i + 1) % (num_simulations // 10) == 0:
-            progress = (i + 1) / num_simulations * 100
-            print(f"   🔄 模擬進度: {progress:.0f}% ({i + 1}/{num_simulations})")
-        
-        # 複製並打亂損益列表
-        shuffled_pnl = pnl_array.copy()
-        np.random.shuffle(shuffled_pnl)
-        
-        # 計算新的資金曲線和統計數據
-        final_pnl, max_drawdown = _calculate_equity_curve_stats(shuffled_pnl)
-        
-        # 記錄結果
-        simulated_final_pnls.append(final_pnl)
-        simulated_max_drawdowns.append(max_drawdown)
+    result = engine.run(num_simulations, keep_samples=keep_samples)
     
     print(f"✅ 蒙地卡羅模擬完成！")
     
     return {
-        'final_pnls': simulated_final_pnls,
-        'max_drawdowns': simulated_max_drawdowns
+        'final_pnls': result['final_pnls'].tolist() if keep_samples else [],
+        'max_drawdowns': result['max_drawdowns'].tolist() if keep_samples else [],
+        'final_pnl_stats': result['final_pnl'],
+        'max_drawdown_stats': result['max_drawdown'],
+        'method': method,
+        'num_simulations': num_simulations,
     }
 
 
-def _calculate_equity_curve_stats(pnl_sequence: np.ndarray) -> Tuple[float, float]:
-    """
-    計算資金曲線的統計數據
-    
-    Args:
-        pnl_sequence: 損益序列
-    
-    Returns:
-        tuple: (最終總損益, 最大回撤)
-    """
-    # 計算累積損益曲線
-    cumulative_pnl = np.cumsum(pnl_sequence)
-    
-    # 最終總損益
-    final_pnl = cumulative_pnl[-1]
-    
-    # 計算最大回撤 (MDD)
-    # 追蹤累積損益的峰值
-    peak_pnl = np.maximum.accumulate(cumulative_pnl)
-    
-    # 計算每個時點的回撤
-    drawdowns = peak_pnl - cumulative_pnl
-    
-    # 最大回撤
-    max_drawdown = np.max(drawdowns)
-    
-    return float(final_pnl), float(max_drawdown)
-
-
 def analyze_and_plot_mc_results(simulation_results: Dict,
                                original_total_pnl: Decimal,
                                original_max_drawdown: Decimal,
@@ -114,7 +85,14 @@ def analyze_and_plot_mc_results(simulation_results: Dict,
     simulated_max_drawdowns = simulation_results['max_drawdowns']
     
     if not simulated_final_pnls or not simulated_max_drawdowns:
-        print("⚠️ 警告：模擬結果為空，無法進行分析")
+        pnl_stats = simulation_results.get('final_pnl_stats')
+        mdd_stats = simulation_results.get('max_drawdown_stats')
+        if pnl_stats is None or mdd_stats is None or not pnl_stats.count:
+            print("⚠️ 警告：模擬結果為空，無法進行分析")
+            return
+        # 未保留逐次結果 (大量模擬): 以串流統計繪圖與摘要
+        _analyze_streaming_results(pnl_stats, mdd_stats, float(original_total_pnl),
+                                   float(original_max_drawdown), output_dir)
         return
     
     # 轉換原始數據為 float
@@ -211,39 +189,115 @@ def _print_statistical_summary(simulated_pnls: List[float],
     """
     pnl_array = np.array(simulated_pnls)
     mdd_array = np.array(simulated_mdds)
-    
+
+    pnl_summary = {
+        'mean': np.mean(pnl_array), 'median': np.median(pnl_array), 'std': np.std(pnl_array),
+        'p5': np.percentile(pnl_array, 5), 'p95': np.percentile(pnl_array, 95),
+        'at_or_below': np.sum(pnl_array <= original_pnl) / len(pnl_array),
+        'below': np.sum(pnl_array < original_pnl) / len(pnl_array),
+    }
+    mdd_summary = {
+        'mean': np.mean(mdd_array), 'median': np.median(mdd_array), 'std': np.std(mdd_array),
+        'p5': np.percentile(mdd_array, 5), 'p95': np.percentile(mdd_array, 95),
+        'at_or_below': np.sum(mdd_array <= original_mdd) / len(mdd_array),
+    }
+    _print_summary_report(pnl_summary, mdd_summary, original_pnl, original_mdd)
+
+
+def _summarize_stream(stats: StreamingQuantiles, original: float) -> Dict:
+    """由串流統計取得摘要 (分位數為分箱估計；原始結果的比例由引擎精確計數，含同值)"""
+    return {
+        'mean': stats.mean, 'median': stats.percentile(50), 'std': stats.std,
+        'p5': stats.percentile(5), 'p95': stats.percentile(95),
+        'at_or_below': stats.fraction_below(original),
+        'below': stats.fraction_below(original, strict=True),
+    }
+
+
+def _analyze_streaming_results(pnl_stats: StreamingQuantiles, mdd_stats: StreamingQuantiles,
+                               orig_pnl: float, orig_mdd: float, output_dir: str = None) -> None:
+    """以串流直方圖繪製分佈並印出摘要 (大量模擬時使用)"""
+    print(f"\n📈 蒙地卡羅模擬結果分析 ({pnl_stats.count:,} 次，串流統計)")
+    print(f"=" * 50)
+
+    plt.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei', 'DejaVu Sans']
+    plt.rcParams['axes.unicode_minus'] = False
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+
+    panels = (
+        (ax1, pnl_stats, orig_pnl, 'skyblue', '模擬總損益分佈 (Final PnL Distribution)', '總損益 (點數)'),
+        (ax2, mdd_stats, orig_mdd, 'lightcoral', '模擬最大回撤分佈 (Max Drawdown Distribution)', '最大回撤 (點數)'),
+    )
+    for ax, stats, original, color, title, xlabel in panels:
+        counts, edges = _coarse_histogram(stats)
+        ax.stairs(counts, edges, fill=True, alpha=0.7, color=color, edgecolor='black')
+        ax.axvline(original, color='red', linestyle='--', linewidth=2, label=f'原始回測結果: {original:.2f}')
+        ax.set_title(title, fontsize=14, fontweight='bold')
+        ax.set_xlabel(xlabel, fontsize=12)
+        ax.set_ylabel('頻率', fontsize=12)
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    if output_dir:
+        import os
+        chart_path = os.path.join(output_dir, "monte_carlo_analysis.png")
+        plt.savefig(chart_path, dpi=300, bbox_inches='tight')
+        print(f"📊 圖表已保存: {chart_path}")
+    plt.show()
+
+    _print_summary_report(_summarize_stream(pnl_stats, orig_pnl), _summarize_stream(mdd_stats, orig_mdd),
+                          orig_pnl, orig_mdd)
+
+
+def _coarse_histogram(stats: StreamingQuantiles, target_bins: int = 50) -> Tuple[np.ndarray, np.ndarray]:
+    """將串流直方圖裁掉空白兩端並合併為約 target_bins 個分箱"""
+    nonzero = np.nonzero(stats.counts)[0]
+    first, last = nonzero[0], nonzero[-1] + 1
+    group = max(1, -(-(last - first) // target_bins))
+    last = first + -(-(last - first) // group) * group
+    counts = np.zeros(last - first, dtype=np.int64)
+    available = stats.counts[first:min(last, stats.num_bins)]
+    counts[:available.size] = available
+    counts = counts.reshape(-1, group).sum(axis=1)
+    edges = stats.low + (first + np.arange(counts.size + 1) * group) * stats.width
+    return counts, edges
+
+
+def _print_summary_report(pnl: Dict, mdd: Dict, original_pnl: float, original_mdd: float) -> None:
+    """印出統計摘要 (摘要字典由逐次結果或串流統計產生)"""
     print(f"\n📊 統計摘要報告")
     print(f"=" * 50)
     
     # 總損益統計
     print(f"💰 總損益分析:")
     print(f"   原始回測結果: {original_pnl:.2f} 點")
-    print(f"   模擬平均值: {np.mean(pnl_array):.2f} 點")
-    print(f"   模擬中位數: {np.median(pnl_array):.2f} 點")
-    print(f"   模擬標準差: {np.std(pnl_array):.2f} 點")
-    print(f"   5% 分位數 (最差5%): {np.percentile(pnl_array, 5):.2f} 點")
-    print(f"   95% 分位數 (最佳5%): {np.percentile(pnl_array, 95):.2f} 點")
+    print(f"   模擬平均值: {pnl['mean']:.2f} 點")
+    print(f"   模擬中位數: {pnl['median']:.2f} 點")
+    print(f"   模擬標準差: {pnl['std']:.2f} 點")
+    print(f"   5% 分位數 (最差5%): {pnl['p5']:.2f} 點")
+    print(f"   95% 分位數 (最佳5%): {pnl['p95']:.2f} 點")
     
     # 原始結果在分佈中的位置
-    pnl_percentile = (np.sum(pnl_array <= original_pnl) / len(pnl_array)) * 100
+    pnl_percentile = pnl['at_or_below'] * 100
     print(f"   原始結果百分位: {pnl_percentile:.1f}%")
     
     print(f"\n📉 最大回撤分析:")
     print(f"   原始回測結果: {original_mdd:.2f} 點")
-    print(f"   模擬平均值: {np.mean(mdd_array):.2f} 點")
-    print(f"   模擬中位數: {np.median(mdd_array):.2f} 點")
-    print(f"   模擬標準差: {np.std(mdd_array):.2f} 點")
-    print(f"   5% 分位數 (最佳5%): {np.percentile(mdd_array, 5):.2f} 點")
-    print(f"   95% 分位數 (最差5%): {np.percentile(mdd_array, 95):.2f} 點")
+    print(f"   模擬平均值: {mdd['mean']:.2f} 點")
+    print(f"   模擬中位數: {mdd['median']:.2f} 點")
+    print(f"   模擬標準差: {mdd['std']:.2f} 點")
+    print(f"   5% 分位數 (最佳5%): {mdd['p5']:.2f} 點")
+    print(f"   95% 分位數 (最差5%): {mdd['p95']:.2f} 點")
     
     # 原始結果在分佈中的位置
-    mdd_percentile = (np.sum(mdd_array <= original_mdd) / len(mdd_array)) * 100
+    mdd_percentile = mdd['at_or_below'] * 100
     print(f"   原始結果百分位: {mdd_percentile:.1f}%")
     
     # 風險分析
     print(f"\n⚠️ 風險分析:")
-    worse_pnl_prob = (np.sum(pnl_array < original_pnl) / len(pnl_array)) * 100
-    worse_mdd_prob = (np.sum(mdd_array > original_mdd) / len(mdd_array)) * 100
+    worse_pnl_prob = pnl['below'] * 100
+    worse_mdd_prob = (1 - mdd['at_or_below']) * 100
     
     print(f"   獲得更差總損益的機率: {worse_pnl_prob:.1f}%")
     print(f"   遭遇更大回撤的機率: {worse_mdd_prob:.1f}%")
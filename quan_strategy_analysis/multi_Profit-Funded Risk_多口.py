@@ -6,6 +6,8 @@ from dataclasses import dataclass, field
 from enum import Enum, auto
 from app_setup import init_all_db_pools
 import shared
+from day_result_cache import (DayResult, DayResultStore, STATUS_FILTERED, STATUS_NO_RANGE, config_key,
+                              day_result_from_logic, load_day_hashes)
 
 # 🚀 數據源配置
 USE_SQLITE = True  # True: 使用本機SQLite, False: 使用遠程PostgreSQL
@@ -13,6 +15,9 @@ USE_SQLITE = True  # True: 使用本機SQLite, False: 使用遠程PostgreSQL
 if USE_SQLITE:
     import sqlite_connection
 
+# 🚀 交易邏輯版本：修改 _run_multi_lot_logic 或濾網邏輯時請更新，每日結果快取會自動失效
+ENGINE_VERSION = "multi_lot-2025.07.17"
+
 # --- 設定日誌 ---
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s [%(name)s.%(funcName)s:%(lineno)d] %(message)s', datefmt='%Y-%m-%dT%H:%M:%S%z')
 logger = logging.getLogger(__name__)
@@ -204,8 +209,14 @@ def get_initial_stop_loss(config: StrategyConfig, range_high: Decimal, range_low
 # ==============================================================================
 # 3. 核心交易邏輯函式
 # ==============================================================================
-def _run_multi_lot_logic(day_session_candles: list, trade_candles: list, config: StrategyConfig, range_high, range_low) -> tuple[Decimal, str]:
-    """支援任意口數，並使用正確序列檢查的邏輯"""
+def _run_multi_lot_logic(day_session_candles: list, trade_candles: list, config: StrategyConfig, range_high, range_low,
+                         trade_log: dict | None = None) -> tuple[Decimal, str]:
+    """
+    支援任意口數，並使用正確序列檢查的邏輯
+
+    Args:
+        trade_log: 可選，傳入 dict 時填入各口損益 (lot_pnl) 與進出場事件 (events)，供每日結果快取保存
+    """
     position, entry_price, entry_time, entry_candle_index = None, Decimal(0), None, -1
 
     for i, candle in enumerate(trade_candles):
@@ -250,7 +261,8 @@ def _run_multi_lot_logic(day_session_candles: list, trade_candles: list, config:
 
     for i in range(config.trade_size_in_lots):
         rule = config.lot_rules[i] if i < len(config.lot_rules) else config.lot_rules[-1]
-        lots.append({'id': i + 1, 'rule': rule, 'status': 'active', 'pnl': Decimal(0), 'peak_price': entry_price, 'trailing_on': False, 'stop_loss': final_sl, 'is_initial_stop': True})
+        lots.append({'id': i + 1, 'rule': rule, 'status': 'active', 'pnl': Decimal(0), 'peak_price': entry_price, 'trailing_on': False, 'stop_loss': final_sl, 'is_initial_stop': True,
+                     'exit_time': None, 'exit_reason': None})
 
     for exit_candle in trade_candles[entry_candle_index + 1:]:
         if all(lot['status'] != 'active' for lot in lots): break
@@ -271,6 +283,7 @@ def _run_multi_lot_logic(day_session_candles: list, trade_candles: list, config:
             if stop_triggered:
                 lot['pnl'] = lot['stop_loss'] - entry_price if position == 'LONG' else entry_price - lot['stop_loss']
                 lot['status'] = 'exited'
+                lot['exit_time'], lot['exit_reason'] = current_time, 'initial_stop' if lot['is_initial_stop'] else 'protective_stop'
 
                 # 根據停損類型顯示不同訊息
                 if lot['is_initial_stop']:
@@ -306,6 +319,7 @@ def _run_multi_lot_logic(day_session_candles: list, trade_candles: list, config:
                         if exit_candle['high_price'] >= stop_price: lot['pnl'], lot['status'], exited_by_tp = entry_price - stop_price, 'exited', True
                 
                 if exited_by_tp: 
+                    lot['exit_time'], lot['exit_reason'] = current_time, 'trailing_stop'
                     exit_p = entry_price + lot['pnl'] if position == 'LONG' else entry_price - lot['pnl']
                     logger.info(f"  ✅ 第{lot['id']}口移動停利 | 時間: {current_time}, 價格: {int(round(exit_p))}, 損益: +{int(round(lot['pnl']))}")
             
@@ -313,6 +327,7 @@ def _run_multi_lot_logic(day_session_candles: list, trade_candles: list, config:
                 if (position == 'LONG' and exit_candle['high_price'] >= entry_price + rule.fixed_tp_points) or \
                    (position == 'SHORT' and exit_candle['low_price'] <= entry_price - rule.fixed_tp_points):
                     lot['pnl'], lot['status'], exited_by_tp = rule.fixed_tp_points, 'exited', True
+                    lot['exit_time'], lot['exit_reason'] = current_time, 'fixed_tp'
                     logger.info(f"  ✅ 第{lot['id']}口固定停利 | 時間: {current_time}, 損益: +{int(round(lot['pnl']))}")
 
             if exited_by_tp:
@@ -358,6 +373,7 @@ def _run_multi_lot_logic(day_session_candles: list, trade_candles: list, config:
                         lot_pnl = exit_candle['close_price'] - entry_price if position == 'LONG' else entry_price - exit_candle['close_price']
                         lot['pnl'] = lot_pnl
                         lot['status'] = 'exited'
+                        lot['exit_time'], lot['exit_reason'] = current_time, 'profit_target'
                         logger.info(f"    🚨 第{lot['id']}口風險平倉 | 損益: {int(round(lot_pnl)):+d}點")
                     break
 
@@ -366,16 +382,62 @@ def _run_multi_lot_logic(day_session_candles: list, trade_candles: list, config:
         if active_lots:
             exit_price = day_session_candles[-1]['close_price']
             eod_pnl = (exit_price - entry_price) if position == 'LONG' else (entry_price - exit_price)
-            for lot in active_lots: lot['pnl'], lot['status'] = eod_pnl, 'exited'
+            eod_time = day_session_candles[-1]['trade_datetime'].time()
+            for lot in active_lots: lot['pnl'], lot['status'], lot['exit_time'], lot['exit_reason'] = eod_pnl, 'exited', eod_time, 'eod_close'
             logger.info(f"  ⚪️ 收盤平倉剩餘 {len(active_lots)} 口 | 損益: {int(round(eod_pnl))}")
     
+    if trade_log is not None:
+        trade_log.update(_build_trade_log(position, entry_time, entry_price, lots))
+
     return Decimal(sum(l['pnl'] for l in lots)) if lots else Decimal(0), position or ""
 
+
+def _build_trade_log(position: str, entry_time, entry_price: Decimal, lots: list) -> dict:
+    """整理各口損益與進出場事件 (時間字串、價格為數值，可直接序列化為JSON)"""
+    events = [{'time': str(entry_time), 'type': 'entry', 'lot': None, 'price': float(entry_price), 'pnl': 0.0,
+               'direction': position, 'lots': len(lots)}]
+    for lot in sorted(lots, key=lambda l: (str(l['exit_time']), l['id'])):
+        exit_price = entry_price + lot['pnl'] if position == 'LONG' else entry_price - lot['pnl']
+        events.append({'time': str(lot['exit_time']), 'type': lot['exit_reason'], 'lot': lot['id'],
+                       'price': float(exit_price), 'pnl': float(lot['pnl'])})
+    return {'lot_pnl': [lot['pnl'] for lot in lots], 'events': events}
+
 # ==============================================================================
 # 3. 主回測函式
 # ==============================================================================
+def _evaluate_trade_day(cur, day, data_hash: str, config: StrategyConfig, range_times: list, trade_start: time,
+                        silent: bool):
+    """讀取單日K棒並執行交易邏輯，回傳 DayResult (被略過的交易日損益為0)"""
+    cur.execute("SELECT * FROM stock_prices WHERE trade_datetime::date = %s ORDER BY trade_datetime;", (day,))
+    day_session_candles = [c for c in cur.fetchall() if time(8, 45) <= c['trade_datetime'].time() <= time(13, 45)]
+    if len(day_session_candles) < 3:
+        return DayResult(trade_day=str(day), data_hash=data_hash, status=STATUS_NO_RANGE)
+
+    candles_range = [c for c in day_session_candles if c['trade_datetime'].time() in range_times]
+    if len(candles_range) != 2:
+        if not silent:
+            logger.warning(f"⚠️ {day}: 找不到開盤區間K棒 ({range_times[0].strftime('%H:%M')}-{range_times[1].strftime('%H:%M')})")
+        return DayResult(trade_day=str(day), data_hash=data_hash, status=STATUS_NO_RANGE)
+
+    range_high, range_low = max(c['high_price'] for c in candles_range), min(c['low_price'] for c in candles_range)
+
+    # === 套用區間過濾濾網 ===
+    range_passed, range_msg = apply_range_filter(config, range_high, range_low, day)
+    if not range_passed:
+        logger.info(f"--- {day} | 開盤區間: {range_low} - {range_high} | {range_msg} | 跳過交易 ---")
+        return DayResult(trade_day=str(day), data_hash=data_hash, status=STATUS_FILTERED)
+
+    logger.info(f"--- {day} | 開盤區間: {range_low} - {range_high} | {range_msg} ---")
+
+    trade_candles = [c for c in day_session_candles if c['trade_datetime'].time() >= trade_start]
+
+    # 🚀 【新邏輯】使用風控停損點方式，不再需要累積損益參數
+    return day_result_from_logic(day, data_hash, _run_multi_lot_logic, day_session_candles, trade_candles,
+                                 config, range_high, range_low)
+
+
 def run_backtest(config: StrategyConfig, start_date: str | None = None, end_date: str | None = None, silent: bool = False,
-                 range_start_time: str | None = None, range_end_time: str | None = None):
+                 range_start_time: str | None = None, range_end_time: str | None = None, day_cache: str | None = None):
     """
     執行回測
 
@@ -386,6 +448,8 @@ def run_backtest(config: StrategyConfig, start_date: str | None = None, end_date
         silent: 是否靜默模式（不輸出日誌）
         range_start_time: 開盤區間開始時間 (格式: 'HH:MM')，可選，預設08:46
         range_end_time: 開盤區間結束時間 (格式: 'HH:MM')，可選，預設08:47
+        day_cache: 每日結果快取路徑 (day_result_cache.DEFAULT_DAY_CACHE_PATH)，可選；
+                   啟用時只計算新增或行情有變動的交易日，其餘沿用快取
 
     Returns:
         dict: 回測結果統計
@@ -446,8 +510,19 @@ def run_backtest(config: StrategyConfig, start_date: str | None = None, end_date
             else:
                 query = f"{base_query} ORDER BY trade_day;"
 
-            cur.execute(query, tuple(params))
-            trade_days = [row['trade_day'] for row in cur.fetchall()]
+            # 🚀 每日結果快取：以每日行情指紋判斷哪些交易日可直接沿用
+            store, cache_key, cached_days, new_results = None, None, {}, []
+            if day_cache:
+                store = DayResultStore(day_cache)
+                cache_key = config_key(config, f"{range_start_hour:02d}:{range_start_min:02d}",
+                                       f"{range_end_hour:02d}:{range_end_min:02d}")
+                cached_days = store.load(cache_key, ENGINE_VERSION, start_date, end_date)
+                day_hashes = load_day_hashes(cur, start_date, end_date)
+                trade_days = list(day_hashes)
+            else:
+                cur.execute(query, tuple(params))
+                trade_days = [row['trade_day'] for row in cur.fetchall()]
+                day_hashes = {}
             logger.info(f"🔍 找到 {len(trade_days)} 個交易日進行回測。")
             total_pnl, winning_trades, losing_trades = Decimal(0), 0, 0
             cumulative_pnl = Decimal(0)  # 🚀 新增：追蹤累積損益
@@ -460,40 +535,24 @@ def run_backtest(config: StrategyConfig, start_date: str | None = None, end_date
             # 🚀 【Task 1 新增】收集每日損益列表用於蒙地卡羅模擬
             daily_pnl_list = []
 
-            for day in trade_days:
-                cur.execute("SELECT * FROM stock_prices WHERE trade_datetime::date = %s ORDER BY trade_datetime;", (day,))
-                day_session_candles = [c for c in cur.fetchall() if time(8, 45) <= c['trade_datetime'].time() <= time(13, 45)]
-                if len(day_session_candles) < 3: continue
-
-                # 使用自定義的開盤區間時間
-                range_times = [time(range_start_hour, range_start_min), time(range_end_hour, range_end_min)]
-                candles_range = [c for c in day_session_candles if c['trade_datetime'].time() in range_times]
-                if len(candles_range) != 2:
-                    if not silent:
-                        logger.warning(f"⚠️ {day}: 找不到開盤區間K棒 ({range_start_hour:02d}:{range_start_min:02d}-{range_end_hour:02d}:{range_end_min:02d})")
-                    continue
+            # 開盤區間時間與交易開始時間 (開盤區間結束後1分鐘)
+            range_times = [time(range_start_hour, range_start_min), time(range_end_hour, range_end_min)]
+            trade_start_hour = range_end_hour
+            trade_start_min = range_end_min + 1
+            if trade_start_min >= 60:
+                trade_start_hour += 1
+                trade_start_min -= 60
+            trade_start = time(trade_start_hour, trade_start_min)
 
-                range_high, range_low = max(c['high_price'] for c in candles_range), min(c['low_price'] for c in candles_range)
-
-                # === 套用區間過濾濾網 ===
-                range_passed, range_msg = apply_range_filter(config, range_high, range_low, day)
-                if not range_passed:
-                    logger.info(f"--- {day} | 開盤區間: {range_low} - {range_high} | {range_msg} | 跳過交易 ---")
-                    continue
-
-                logger.info(f"--- {day} | 開盤區間: {range_low} - {range_high} | {range_msg} ---")
-
-                # 交易開始時間設為開盤區間結束後1分鐘
-                trade_start_hour = range_end_hour
-                trade_start_min = range_end_min + 1
-                if trade_start_min >= 60:
-                    trade_start_hour += 1
-                    trade_start_min -= 60
-
-                trade_candles = [c for c in day_session_candles if c['trade_datetime'].time() >= time(trade_start_hour, trade_start_min)]
+            for day in trade_days:
+                data_hash = day_hashes.get(str(day), "")
+                day_result = cached_days.get(str(day))
+                if day_result is None or day_result.data_hash != data_hash:
+                    day_result = _evaluate_trade_day(cur, day, data_hash, config, range_times, trade_start, silent)
+                    if store:
+                        new_results.append(day_result)
 
-                # 🚀 【新邏輯】使用風控停損點方式，不再需要累積損益參數
-                day_pnl, trade_direction = _run_multi_lot_logic(day_session_candles, trade_candles, config, range_high, range_low)
+                day_pnl, trade_direction = day_result.day_pnl, day_result.direction
 
                 if day_pnl != 0:
                     is_long_trade = (trade_direction == 'LONG')
@@ -520,6 +579,10 @@ def run_backtest(config: StrategyConfig, start_date: str | None = None, end_date
                 if day_pnl != 0:
                     daily_pnl_list.append(day_pnl)
 
+            if store:
+                store.save(cache_key, ENGINE_VERSION, new_results)
+                logger.info(f"💾 每日結果快取: 沿用 {len(trade_days) - len(new_results)} 天，計算 {len(new_results)} 天")
+
             # 計算統計數據
             trade_count = winning_trades + losing_trades
             win_rate = (winning_trades / trade_count * 100) if trade_count > 0 else 0
@@ -22,6 +22,8 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 import importlib.util
 import sys
 
+from day_result_cache import DEFAULT_DAY_CACHE_PATH
+
 # 動態導入模組
 module_name = "multi_Profit-Funded Risk_多口"
 file_path = "multi_Profit-Funded Risk_多口.py"
@@ -135,7 +137,7 @@ class ParameterOptimizer:
         """執行單次回測並返回結果"""
         try:
             # 執行回測
-            result = run_backtest(config, self.start_date, self.end_date, silent=True)
+            result = run_backtest(config, self.start_date, self.end_date, silent=True, day_cache=DEFAULT_DAY_CACHE_PATH)
 
             # 解析結果 - 確保result不為None
             if result is None:
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+輕量報告資產 - 圖表、明細表與日誌放在報告 HTML 之外，開啟報告時才載入
+
+🎯 目的：
+    原本的報告把每張 matplotlib 圖 (dpi=300) 以 base64 內嵌、完整日誌與交易明細直接寫進 HTML，
+    單一報告動輒數 MB 到數十 MB，而且每份報告都重新繪製同樣的圖。
+    輕量格式 (REPORT_FORMAT_LIGHT) 改為：
+    - 圖表：以 (圖表種類, 繪圖版本, 輸入資料) 的雜湊命名，存於 reports/assets/charts/，
+      不同報告輸入相同時共用同一張圖，不再重繪
+    - 明細表：分頁 JSON 存於 reports/assets/data/<報告名稱>/，捲動到該區塊才載入第一頁
+    - 日誌：gzip 壓縮存檔，按下按鈕才下載並在瀏覽器解壓
+
+📁 目錄結構：
+    reports/
+    ├── enhanced_report_20250718_100000.html
+    └── assets/
+        ├── charts/daily_pnl_<雜湊>.png
+        └── data/enhanced_report_20250718_100000/
+            ├── trades_1.json, trades_2.json ...
+            └── log.txt.gz
+
+    HTML 以相對路徑 assets/... 引用資產；報告管理頁的 /view_report/assets/ 路由提供這些檔案。
+    直接以檔案開啟時圖表正常顯示，但瀏覽器禁止 file:// 讀取 JSON，明細與日誌會提示改由報告管理頁開啟。
+
+作者：量化分析團隊
+日期：2025-07-18
+"""
+
+import gzip
+import hashlib
+import html
+import json
+import logging
+import os
+import shutil
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+REPORT_FORMAT_EMBEDDED = 'embedded'   # 單一 HTML 檔 (原格式)
+REPORT_FORMAT_LIGHT = 'light'         # 外部圖檔 + 延遲載入
+REPORT_FORMATS = (REPORT_FORMAT_EMBEDDED, REPORT_FORMAT_LIGHT)
+
+ASSETS_DIRNAME = "assets"
+CHART_RENDER_VERSION = 1   # 圖表繪製邏輯修改時遞增，舊圖不再沿用
+DEFAULT_PAGE_SIZE = 200
+
+
+def data_digest(*parts) -> str:
+    """輸入資料的雜湊：DataFrame/Series 以內容計算 (含欄名)，其他值以 repr 計算"""
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            columns = list(part.columns) if isinstance(part, pd.DataFrame) else [part.name]
+            digest.update(repr(columns).encode())
+            digest.update(pd.util.hash_pandas_object(part, index=False).values.tobytes())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b'|')
+    return digest.hexdigest()[:20]
+
+
+class ReportAssetStore:
+    """
+    報告目錄下的共用資產
+
+    圖表以雜湊命名，已存在即視為有效；明細與日誌屬於單一報告，刪除報告時以 remove_report() 一併清除。
+    """
+
+    def __init__(self, reports_dir: str = "reports"):
+        self.reports_dir = str(reports_dir)
+        self.assets_dir = os.path.join(self.reports_dir, ASSETS_DIRNAME)
+        self.charts_dir = os.path.join(self.assets_dir, "charts")
+        self.data_dir = os.path.join(self.assets_dir, "data")
+        self.stats = {'charts_rendered': 0, 'charts_reused': 0}
+
+    def _url(self, path: str) -> str:
+        """報告 HTML 使用的相對路徑 (相對於報告目錄)"""
+        return os.path.relpath(path, self.reports_dir).replace(os.sep, '/')
+
+    def report_data_dir(self, report_name: str) -> str:
+        return os.path.join(self.data_dir, os.path.splitext(os.path.basename(report_name))[0])
+
+    def chart(self, kind: str, render: Callable[[str], None], *inputs) -> str:
+        """
+        取得圖表檔，輸入相同的圖表只繪製一次
+
+        Args:
+            kind: 圖表種類 (同時作為檔名前綴)
+            render: render(path) 將圖表存到 path (副檔名為 .png)
+            inputs: 決定圖表內容的所有輸入 (DataFrame、參數等)
+
+        Returns:
+            str: 相對於報告目錄的圖檔路徑
+        """
+        path = os.path.join(self.charts_dir, f"{kind}_{data_digest(CHART_RENDER_VERSION, kind, *inputs)}.png")
+        if os.path.exists(path):
+            self.stats['charts_reused'] += 1
+            return self._url(path)
+
+        os.makedirs(self.charts_dir, exist_ok=True)
+        temp_path = f"{path[:-4]}.{os.getpid()}.tmp.png"
+        try:
+            render(temp_path)
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.stats['charts_rendered'] += 1
+        return self._url(path)
+
+    def add_chart_file(self, chart_path: str) -> str:
+        """把已繪製的圖檔以內容雜湊存入共用目錄 (內容相同的圖只保留一份)"""
+        with open(chart_path, 'rb') as f:
+            content = f.read()
+        stem, ext = os.path.splitext(os.path.basename(chart_path))
+        path = os.path.join(self.charts_dir, f"{stem}_{hashlib.sha1(content).hexdigest()[:20]}{ext}")
+        if os.path.exists(path):
+            self.stats['charts_reused'] += 1
+        else:
+            os.makedirs(self.charts_dir, exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(content)
+            self.stats['charts_rendered'] += 1
+        return self._url(path)
+
+    def write_table(self, report_name: str, table: str, rows: Sequence[Dict],
+                    page_size: int = DEFAULT_PAGE_SIZE) -> Dict:
+        """
+        將明細表寫成分頁 JSON
+
+        Returns:
+            Dict: 頁面載入用的描述 {'url': 含 {page} 的路徑樣板, 'pages', 'total', 'page_size'}
+        """
+        directory = self.report_data_dir(report_name)
+        os.makedirs(directory, exist_ok=True)
+        total = len(rows)
+        pages = max(1, -(-total // page_size))
+        for page in range(1, pages + 1):
+            chunk = list(rows[(page - 1) * page_size:page * page_size])
+            with open(os.path.join(directory, f"{table}_{page}.json"), 'w', encoding='utf-8') as f:
+                json.dump({'page': page, 'pages': pages, 'total': total, 'rows': chunk}, f,
+                          ensure_ascii=False, separators=(',', ':'), default=str)
+        return {'url': self._url(os.path.join(directory, f"{table}_{{page}}.json")),
+                'pages': pages, 'total': total, 'page_size': page_size}
+
+    def write_log(self, report_name: str, log_content: str) -> Dict:
+        """
+        將日誌以 gzip 壓縮存檔
+
+        Returns:
+            Dict: {'url', 'size': 原始位元組數, 'compressed_size'}
+        """
+        directory = self.report_data_dir(report_name)
+        os.makedirs(directory, exist_ok=True)
+        raw = (log_content or "").encode('utf-8')
+        path = os.path.join(directory, "log.txt.gz")
+        with open(path, 'wb') as f:
+            f.write(gzip.compress(raw, compresslevel=6, mtime=0))
+        return {'url': self._url(path), 'size': len(raw), 'compressed_size': os.path.getsize(path)}
+
+    def remove_report(self, report_name: str):
+        """刪除單一報告的明細與日誌 (共用圖表保留)"""
+        shutil.rmtree(self.report_data_dir(report_name), ignore_errors=True)
+
+    def clear(self):
+        """刪除所有資產 (清空報告時使用)"""
+        shutil.rmtree(self.assets_dir, ignore_errors=True)
+
+
+# ============================================================================
+# 延遲載入的 HTML 片段
+# ============================================================================
+
+def lazy_table_html(element_id: str, columns: List[Tuple[str, str]], manifest: Dict,
+                    class_key: Optional[str] = None) -> str:
+    """
+    分頁明細表的容器，捲動到此處才載入第一頁
+
+    Args:
+        columns: [(資料鍵, 表頭文字)]
+        class_key: 每列資料中存放損益樣式 (positive/negative/neutral) 的鍵，套用於 pnl 欄
+    """
+    config = {'columns': [key for key, _ in columns], 'class_key': class_key, **manifest}
+    header = ''.join(f"<th>{html.escape(label)}</th>" for _, label in columns)
+    return f"""
+            <div class="lazy-table" id="{element_id}" data-config="{html.escape(json.dumps(config, ensure_ascii=False))}">
+                <table class="performance-table">
+                    <thead><tr>{header}</tr></thead>
+                    <tbody></tbody>
+                </table>
+                <div class="lazy-pager">
+                    <button type="button" data-step="-1" disabled>« 上一頁</button>
+                    <span class="lazy-status">⏳ 共 {manifest['total']} 筆，捲動至此載入…</span>
+                    <button type="button" data-step="1" disabled>下一頁 »</button>
+                </div>
+            </div>
+    """
+
+
+def lazy_log_html(manifest: Dict) -> str:
+    """壓縮日誌的容器，按下按鈕才下載並解壓"""
+    config = html.escape(json.dumps(manifest, ensure_ascii=False))
+    return f"""
+                <div class="lazy-log" data-config="{config}">
+                    <button type="button">📥 載入完整日誌 ({manifest['size'] / 1024:.0f} KB，壓縮後 {manifest['compressed_size'] / 1024:.0f} KB)</button>
+                    <pre style="display: none; max-height: 400px; overflow-y: auto; font-family: monospace; font-size: 12px; line-height: 1.4; white-space: pre-wrap; background: #ffffff; padding: 15px; border-radius: 5px; border: 1px solid #ddd;"></pre>
+                </div>
+    """
+
+
+LAZY_LOADER_SCRIPT = """
+<style>
+    .lazy-pager { display: flex; justify-content: center; align-items: center; gap: 15px; margin-top: 10px; }
+    .lazy-pager button, .lazy-log button { padding: 6px 14px; border: none; border-radius: 5px; background: #667eea; color: white; cursor: pointer; }
+    .lazy-pager button:disabled { background: #ccc; cursor: default; }
+    .lazy-status { color: #666; font-size: 14px; }
+</style>
+<script>
+(function () {
+    const unavailable = '⚠️ 無法載入資料，請透過報告管理頁開啟本報告';
+
+    function loadTablePage(box, page) {
+        const config = JSON.parse(box.dataset.config);
+        const status = box.querySelector('.lazy-status');
+        const [prev, next] = box.querySelectorAll('.lazy-pager button');
+        status.textContent = '⏳ 載入中…';
+        fetch(config.url.replace('{page}', page))
+            .then(response => { if (!response.ok) throw new Error(response.status); return response.json(); })
+            .then(data => {
+                const body = box.querySelector('tbody');
+                body.textContent = '';
+                for (const row of data.rows) {
+                    const tr = document.createElement('tr');
+                    for (const key of config.columns) {
+                        const td = document.createElement('td');
+                        td.textContent = row[key] === null || row[key] === undefined ? '' : row[key];
+                        if (key === 'pnl' && config.class_key) td.className = row[config.class_key] || '';
+                        tr.appendChild(td);
+                    }
+                    body.appendChild(tr);
+                }
+                box.dataset.page = data.page;
+                prev.disabled = data.page <= 1;
+                next.disabled = data.page >= data.pages;
+                status.textContent = '第 ' + data.page + ' / ' + data.pages + ' 頁，共 ' + data.total + ' 筆';
+            })
+            .catch(() => { status.textContent = unavailable; });
+    }
+
+    async function readLog(url) {
+        const response = await fetch(url);
+        if (!response.ok) throw new Error(response.status);
+        const bytes = new Uint8Array(await response.arrayBuffer());
+        // 伺服器可能已以 Content-Encoding 解壓，僅在仍為 gzip 格式時自行解壓
+        if (bytes[0] === 0x1f && bytes[1] === 0x8b) {
+            const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+            return await new Response(stream).text();
+        }
+        return new TextDecoder('utf-8').decode(bytes);
+    }
+
+    document.addEventListener('DOMContentLoaded', () => {
+        const tables = document.querySelectorAll('.lazy-table');
+        tables.forEach(box => {
+            box.querySelectorAll('.lazy-pager button').forEach(button => button.addEventListener('click', () => {
+                loadTablePage(box, parseInt(box.dataset.page || '1') + parseInt(button.dataset.step));
+            }));
+        });
+        if ('IntersectionObserver' in window) {
+            const observer = new IntersectionObserver(entries => entries.forEach(entry => {
+                if (entry.isIntersecting) { observer.unobserve(entry.target); loadTablePage(entry.target, 1); }
+            }), { rootMargin: '200px' });
+            tables.forEach(box => observer.observe(box));
+        } else {
+            tables.forEach(box => loadTablePage(box, 1));
+        }
+
+        document.querySelectorAll('.lazy-log').forEach(box => {
+            const button = box.querySelector('button');
+            const pre = box.querySelector('pre');
+            button.addEventListener('click', () => {
+                button.disabled = true;
+                button.textContent = '⏳ 載入中…';
+                readLog(JSON.parse(box.dataset.config).url)
+                    .then(text => { pre.textContent = text; pre.style.display = 'block'; button.style.display = 'none'; })
+                    .catch(() => { button.disabled = false; button.textContent = unavailable; });
+            });
+        });
+    });
+})();
+</script>
+"""
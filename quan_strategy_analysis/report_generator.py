@@ -15,6 +15,7 @@ from jinja2 import Template
 
 from config import REPORT_CONFIG, CHARTS_DIR, REPORTS_DIR, PROCESSED_DIR, OUTPUT_FILES
 from utils import format_number, ensure_directory_exists
+from report_assets import REPORT_FORMAT_EMBEDDED, REPORT_FORMAT_LIGHT, REPORT_FORMATS, ReportAssetStore
 
 logger = logging.getLogger(__name__)
 
@@ -22,11 +23,15 @@ class ReportGenerator:
     """策略分析報告生成器"""
     
     def __init__(self, daily_df: pd.DataFrame, events_df: pd.DataFrame, 
-                 statistics: Dict[str, Any], chart_files: Dict[str, str]):
+                 statistics: Dict[str, Any], chart_files: Dict[str, str],
+                 report_format: str = REPORT_FORMAT_EMBEDDED):
+        if report_format not in REPORT_FORMATS:
+            raise ValueError(f"不支援的報告格式: {report_format}")
         self.daily_df = daily_df
         self.events_df = events_df
         self.statistics = statistics
         self.chart_files = chart_files
+        self.report_format = report_format
         
         # 確保輸出目錄存在
         ensure_directory_exists(REPORTS_DIR)
@@ -57,12 +62,16 @@ class ReportGenerator:
         trade_analysis = self.statistics.get('trade_analysis', {})
         lot_analysis = self.statistics.get('lot_analysis', {})
         
-        # 圖表數據（轉換為base64）
+        # 圖表來源：內嵌格式轉為base64，輕量格式以內容雜湊存入報告目錄的共用圖檔
         chart_data = {}
+        asset_store = ReportAssetStore(REPORTS_DIR) if self.report_format == REPORT_FORMAT_LIGHT else None
         for chart_name, chart_path in self.chart_files.items():
             if chart_path and Path(chart_path).exists() and chart_path.endswith('.png'):
+                if asset_store is not None:
+                    chart_data[chart_name] = asset_store.add_chart_file(chart_path)
+                    continue
                 with open(chart_path, 'rb') as f:
-                    chart_data[chart_name] = base64.b64encode(f.read()).decode('utf-8')
+                    chart_data[chart_name] = 'data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8')
         
         # 交易摘要表
         trade_summary = self._create_trade_summary_table()
@@ -352,28 +361,28 @@ class ReportGenerator:
             {% if chart_data.daily_pnl %}
             <div class="chart-container">
                 <h3>每日損益分析</h3>
-                <img src="data:image/png;base64,{{ chart_data.daily_pnl }}" alt="每日損益分析">
+                <img src="{{ chart_data.daily_pnl }}" alt="每日損益分析">
             </div>
             {% endif %}
             
             {% if chart_data.equity_curve %}
             <div class="chart-container">
                 <h3>資金曲線</h3>
-                <img src="data:image/png;base64,{{ chart_data.equity_curve }}" alt="資金曲線">
+                <img src="{{ chart_data.equity_curve }}" alt="資金曲線">
             </div>
             {% endif %}
             
             {% if chart_data.pnl_distribution %}
             <div class="chart-container">
                 <h3>損益分布</h3>
-                <img src="data:image/png;base64,{{ chart_data.pnl_distribution }}" alt="損益分布">
+                <img src="{{ chart_data.pnl_distribution }}" alt="損益分布">
             </div>
             {% endif %}
             
             {% if chart_data.direction_analysis %}
             <div class="chart-container">
                 <h3>多空分析</h3>
-                <img src="data:image/png;base64,{{ chart_data.direction_analysis }}" alt="多空分析">
+                <img src="{{ chart_data.direction_analysis }}" alt="多空分析">
             </div>
             {% endif %}
         </div>
@@ -454,9 +463,10 @@ class ReportGenerator:
         return template.render(**report_data)
 
 def generate_strategy_report(daily_df: pd.DataFrame, events_df: pd.DataFrame,
-                           statistics: Dict[str, Any], chart_files: Dict[str, str]) -> str:
+                           statistics: Dict[str, Any], chart_files: Dict[str, str],
+                           report_format: str = REPORT_FORMAT_EMBEDDED) -> str:
     """生成策略分析報告的主函數"""
-    generator = ReportGenerator(daily_df, events_df, statistics, chart_files)
+    generator = ReportGenerator(daily_df, events_df, statistics, chart_files, report_format=report_format)
     return generator.generate_html_report()
 
 if __name__ == "__main__":
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+報告索引 - 報告產生時寫入元數據與關鍵指標，報告管理頁只讀索引
+(索引結構與舊報告解析由專案根目錄的 report_index_store.py 共用實作)
+"""
+
+import os
+import sys
+
+# 添加專案根目錄到路徑
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report_index_store import (DEFAULT_PER_PAGE, INDEX_FILENAME, MAX_PER_PAGE, REPORT_SUFFIX, SORT_COLUMNS,
+                                ReportIndex, parse_report_metadata, record_report, report_type_of)
+
+__all__ = ['DEFAULT_PER_PAGE', 'INDEX_FILENAME', 'MAX_PER_PAGE', 'REPORT_SUFFIX', 'SORT_COLUMNS',
+           'ReportIndex', 'parse_report_metadata', 'record_report', 'report_type_of']
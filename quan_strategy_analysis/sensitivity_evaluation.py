@@ -0,0 +1,309 @@
+"""
+敏感度分析評估核心 - 一次評估、分方向輸出、Y向量快取
+
+🎯 目的：
+    1. 行情資料只從資料庫讀取一次，整理成每日的開盤區間與交易K棒，供所有樣本共用
+    2. 每個參數樣本只跑一次雙向(BOTH)回測，同時得到 LONG_ONLY / SHORT_ONLY 的精確結果
+    3. Y向量依 (問題定義, 抽樣種子, 資料版本) 存檔，重跑或增加樣本數時只評估新增的樣本
+
+📐 分方向推導：
+    BOTH 的第一個訊號若為多方，代表之前沒有任何空方或多方訊號，
+    LONG_ONLY 會在同一根K棒以相同價格進場，結果相同；此時只需另外跑 SHORT_ONLY。
+    反之亦然。當天完全沒有訊號時三個方向皆為0。
+    因此每個交易日最多執行兩次交易邏輯 (原本為三次，且每次都要重讀資料庫)。
+
+作者：量化分析團隊
+日期：2025-07-14
+"""
+
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+from datetime import time
+from decimal import Decimal
+from enum import Enum
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DIRECTIONS = ('LONG_ONLY', 'SHORT_ONLY', 'BOTH')
+OUTPUT_METRICS = ('neg_mdd', 'total_pnl')
+
+# 評估失敗時的輸出值 (與原本 evaluate_for_salib 相同)
+FAILED_VALUE = -999999.0
+
+# 每日資料: (交易日, 當日盤中K棒, 開盤區間後的交易K棒, 區間高點, 區間低點)
+MarketDay = Tuple[object, list, list, object, object]
+
+
+def output_name(direction: str, metric: str) -> str:
+    """輸出欄位名稱，例如 'LONG_ONLY:neg_mdd'"""
+    return f"{direction}:{metric}"
+
+
+def load_market_days(cur, start_date: str, end_date: str,
+                     range_start_time: str, range_end_time: str) -> List[MarketDay]:
+    """
+    一次讀取並整理回測期間的每日資料 (與 calculate_backtest_metrics 的篩選規則相同)
+
+    Args:
+        cur: 資料庫游標 (as_dict=True)
+        start_date / end_date: 回測期間
+        range_start_time / range_end_time: 開盤區間時間 'HH:MM'
+
+    Returns:
+        List[MarketDay]: 有完整開盤區間的交易日
+    """
+    range_start_hour, range_start_min = map(int, range_start_time.split(':'))
+    range_end_hour, range_end_min = map(int, range_end_time.split(':'))
+    range_times = [time(range_start_hour, range_start_min), time(range_end_hour, range_end_min)]
+
+    trade_start_hour, trade_start_min = range_end_hour, range_end_min + 1
+    if trade_start_min >= 60:
+        trade_start_hour += 1
+        trade_start_min -= 60
+    trade_start = time(trade_start_hour, trade_start_min)
+
+    cur.execute("SELECT DISTINCT trade_datetime::date as trade_day FROM stock_prices "
+                "WHERE trade_datetime::date >= %s AND trade_datetime::date <= %s ORDER BY trade_day;",
+                (start_date, end_date))
+    trade_days = [row['trade_day'] for row in cur.fetchall()]
+
+    market_days = []
+    for day in trade_days:
+        cur.execute("SELECT * FROM stock_prices WHERE trade_datetime::date = %s ORDER BY trade_datetime;", (day,))
+        session = [dict(c) for c in cur.fetchall() if time(8, 45) <= c['trade_datetime'].time() <= time(13, 45)]
+        if len(session) < 3:
+            continue
+
+        candles_range = [c for c in session if c['trade_datetime'].time() in range_times]
+        if len(candles_range) != 2:
+            continue
+
+        range_high = max(c['high_price'] for c in candles_range)
+        range_low = min(c['low_price'] for c in candles_range)
+        trade_candles = [c for c in session if c['trade_datetime'].time() >= trade_start]
+        market_days.append((day, session, trade_candles, range_high, range_low))
+
+    return market_days
+
+
+CANDLE_FIELDS = ('trade_datetime', 'open_price', 'high_price', 'low_price', 'close_price')
+
+
+def day_fingerprint(market_day: MarketDay) -> str:
+    """單日資料指紋：逐根K棒的時間與OHLC，任何一根K棒修正都會改變指紋"""
+    day, session, trade_candles, range_high, range_low = market_day
+    digest = hashlib.sha1(f"{day}|{len(trade_candles)}|{range_high}|{range_low}".encode())
+    for candle in session:
+        digest.update(repr(tuple(candle.get(name) for name in CANDLE_FIELDS)).encode())
+    return digest.hexdigest()[:16]
+
+
+def data_fingerprint(market_days: Sequence[MarketDay], *extra) -> str:
+    """
+    資料版本指紋：由各交易日的 day_fingerprint (逐根K棒的時間與OHLC) 組成，
+    任何一根K棒修正 (包括盤中高低點) 都會改變指紋
+
+    Args:
+        market_days: load_market_days 的結果
+        extra: 其他影響結果的設定 (例如時間區段)
+    """
+    digest = hashlib.sha1()
+    for item in extra:
+        digest.update(str(item).encode())
+    for market_day in market_days:
+        digest.update(day_fingerprint(market_day).encode())
+    return digest.hexdigest()[:16]
+
+
+def problem_fingerprint(problem: Dict) -> str:
+    """SALib 問題定義指紋 (參數名稱與範圍)"""
+    canonical = json.dumps({'names': list(problem['names']),
+                            'bounds': [[float(b) for b in bound] for bound in problem['bounds']]},
+                           sort_keys=True)
+    return hashlib.sha1(canonical.encode()).hexdigest()[:16]
+
+
+def _normalize_config_value(value):
+    if dataclasses.is_dataclass(value):
+        return {f.name: _normalize_config_value(getattr(value, f.name)) for f in dataclasses.fields(value)}
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (list, tuple)):
+        return [_normalize_config_value(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _normalize_config_value(item) for key, item in value.items()}
+    return value
+
+
+def config_fingerprint(config) -> str:
+    """策略配置指紋 (dataclass 欄位正規化後的雜湊；Decimal 轉為數值、Enum 轉為名稱)"""
+    canonical = json.dumps(_normalize_config_value(config), sort_keys=True, default=str)
+    return hashlib.sha1(canonical.encode()).hexdigest()[:16]
+
+
+def evaluate_all_directions(configs: Dict[str, object], market_days: Sequence[MarketDay],
+                            run_logic: Callable, apply_filter: Callable) -> Dict[str, float]:
+    """
+    一次評估取得三個交易方向的 -MDD 與總損益
+
+    Args:
+        configs: {方向: 策略配置}，必須包含 DIRECTIONS 中的三個方向
+        market_days: 共用的每日資料
+        run_logic: _run_multi_lot_logic
+        apply_filter: apply_range_filter
+
+    Returns:
+        dict: {output_name(方向, 指標): 數值}
+    """
+    both_config = configs['BOTH']
+    other_side = {'LONG': 'SHORT_ONLY', 'SHORT': 'LONG_ONLY'}
+    same_side = {'LONG': 'LONG_ONLY', 'SHORT': 'SHORT_ONLY'}
+
+    cumulative = dict.fromkeys(DIRECTIONS, 0.0)
+    peak = dict.fromkeys(DIRECTIONS, 0.0)
+    max_drawdown = dict.fromkeys(DIRECTIONS, 0.0)
+
+    for day, session, trade_candles, range_high, range_low in market_days:
+        passed, _ = apply_filter(both_config, range_high, range_low, day)
+        if not passed:
+            continue
+
+        both_pnl, side = run_logic(session, trade_candles, both_config, range_high, range_low)
+        if side not in same_side:
+            continue   # 當天沒有任何訊號，三個方向皆無交易
+
+        other = other_side[side]
+        other_pnl, _ = run_logic(session, trade_candles, configs[other], range_high, range_low)
+        day_pnls = {'BOTH': float(both_pnl), same_side[side]: float(both_pnl), other: float(other_pnl)}
+
+        for direction, pnl in day_pnls.items():
+            if pnl == 0:
+                continue
+            cumulative[direction] += pnl
+            if cumulative[direction] > peak[direction]:
+                peak[direction] = cumulative[direction]
+            drawdown = peak[direction] - cumulative[direction]
+            if drawdown > max_drawdown[direction]:
+                max_drawdown[direction] = drawdown
+
+    outputs = {}
+    for direction in DIRECTIONS:
+        outputs[output_name(direction, 'neg_mdd')] = -max_drawdown[direction]
+        outputs[output_name(direction, 'total_pnl')] = cumulative[direction]
+    return outputs
+
+
+def failed_outputs() -> Dict[str, float]:
+    """評估失敗時的輸出"""
+    return {output_name(d, m): FAILED_VALUE for d in DIRECTIONS for m in OUTPUT_METRICS}
+
+
+class YVectorStore:
+    """
+    Y向量快取
+
+    每個 (問題定義, 抽樣種子, 資料版本) 存成一個 .npz，內含參數樣本與各輸出的Y向量。
+    Sobol 抽樣在相同種子下具有前綴一致性 (N=2048 的前段與 N=1024 相同)，
+    因此增加樣本數時只需評估新增的列。
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(problem: Dict, seed: int, data_version: str) -> str:
+        return f"{problem_fingerprint(problem)}_s{seed}_{data_version}"
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"y_vectors_{key}.npz")
+
+    def load(self, key: str) -> Optional[Dict]:
+        """
+        載入快取
+
+        Returns:
+            dict: {'param_values': ndarray, 'outputs': {名稱: ndarray}}，不存在時為 None
+        """
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                names = [str(n) for n in data['output_names']]
+                return {
+                    'param_values': data['param_values'],
+                    'outputs': {name: data['outputs'][:, i] for i, name in enumerate(names)},
+                }
+        except Exception as e:
+            logger.warning(f"⚠️ Y向量快取讀取失敗，將重新評估: {path} ({e})")
+            return None
+
+    def save(self, key: str, param_values: np.ndarray, outputs: Dict[str, np.ndarray]):
+        """寫入快取 (先寫暫存檔再置換，避免中斷時損毀)"""
+        names = sorted(outputs)
+        matrix = np.column_stack([outputs[name] for name in names]) if names else np.empty((len(param_values), 0))
+        tmp_path = self.path(key) + '.tmp.npz'
+        np.savez_compressed(tmp_path, param_values=param_values, outputs=matrix,
+                            output_names=np.array(names))
+        os.replace(tmp_path, self.path(key))
+
+
+def reusable_prefix(cached_params: np.ndarray, param_values: np.ndarray) -> int:
+    """計算快取中與目前樣本前段完全相同的列數"""
+    rows = min(len(cached_params), len(param_values))
+    if rows == 0 or cached_params.shape[1:] != param_values.shape[1:]:
+        return 0
+    same = np.all(np.isclose(cached_params[:rows], param_values[:rows], rtol=0, atol=1e-12), axis=1)
+    mismatch = np.flatnonzero(~same)
+    return int(mismatch[0]) if mismatch.size else rows
+
+
+def evaluate_with_cache(param_values: np.ndarray, evaluate_rows: Callable[[np.ndarray], List[Dict[str, float]]],
+                        store: Optional[YVectorStore] = None, key: Optional[str] = None,
+                        checkpoint_rows: int = 2048) -> Dict[str, np.ndarray]:
+    """
+    評估所有樣本 (已快取的列直接沿用)
+
+    Args:
+        param_values: SALib 參數樣本 (樣本數 × 參數數)
+        evaluate_rows: fn(參數列矩陣) -> 每列一個輸出字典
+        store / key: Y向量快取，None 表示不快取
+        checkpoint_rows: 每評估多少列存檔一次 (長時間執行中斷後可接續)
+
+    Returns:
+        dict: {輸出名稱: Y向量}
+    """
+    outputs: Dict[str, np.ndarray] = {}
+    done = 0
+
+    cached = store.load(key) if store and key else None
+    if cached:
+        done = reusable_prefix(cached['param_values'], param_values)
+        for name, values in cached['outputs'].items():
+            outputs[name] = np.full(len(param_values), np.nan)
+            outputs[name][:done] = values[:done]
+        logger.info(f"   💾 Y向量快取命中 {done}/{len(param_values)} 列")
+
+    while done < len(param_values):
+        end = min(len(param_values), done + checkpoint_rows)
+        rows = evaluate_rows(param_values[done:end])
+        for offset, row in enumerate(rows):
+            for name, value in row.items():
+                if name not in outputs:
+                    outputs[name] = np.full(len(param_values), np.nan)
+                outputs[name][done + offset] = value
+        done = end
+        if store and key:
+            store.save(key, param_values[:done], {name: values[:done] for name, values in outputs.items()})
+        logger.info(f"   📊 進度更新: {done}/{len(param_values)} ({done / len(param_values) * 100:.1f}%)")
+
+    return outputs
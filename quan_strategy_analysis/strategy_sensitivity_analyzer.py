@@ -41,6 +41,8 @@
     1. 確保 stock_data.sqlite 資料庫存在且包含足夠的歷史數據
     2. 樣本數建議從小值（如64）開始測試，確認無誤後再增加
     3. 完整分析可能需要數小時，建議在性能較好的機器上運行
+    4. Y向量快取於 SALIB_report/y_cache，相同參數空間/種子/資料重跑時直接沿用，
+       增加樣本數時只評估新增的樣本
 
 作者：量化分析團隊
 日期：2025-07-14
@@ -94,6 +96,10 @@ if USE_SQLITE:
 else:
     import shared
 
+from sensitivity_evaluation import (DIRECTIONS, FAILED_VALUE, YVectorStore, data_fingerprint,
+                                    evaluate_all_directions, evaluate_with_cache, failed_outputs,
+                                    load_market_days, output_name)
+
 # 設定日誌
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s [%(name)s.%(funcName)s:%(lineno)d] %(message)s', datefmt='%Y-%m-%dT%H:%M:%S%z')
 logger = logging.getLogger(__name__)
@@ -249,6 +255,53 @@ def calculate_backtest_metrics(config: StrategyConfig, start_date: str, end_date
         }
 
 
+def build_strategy_config(params: np.ndarray, trading_direction: str) -> StrategyConfig:
+    """
+    將 SALib 參數陣列轉換為策略配置
+
+    Args:
+        params: [lot1_trigger, lot1_pullback, lot2_trigger, lot2_pullback,
+                 lot3_trigger, lot3_pullback, protection_multiplier]
+        trading_direction: 交易方向 ("LONG_ONLY", "SHORT_ONLY", "BOTH")
+    """
+    lot1_trigger, lot1_pullback, lot2_trigger, lot2_pullback, lot3_trigger, lot3_pullback, protection_multiplier = params
+
+    lot_rules = [
+        LotRule(
+            use_trailing_stop=True,
+            trailing_activation=Decimal(str(lot1_trigger)),
+            trailing_pullback=Decimal(str(lot1_pullback))
+        ),
+        LotRule(
+            use_trailing_stop=True,
+            trailing_activation=Decimal(str(lot2_trigger)),
+            trailing_pullback=Decimal(str(lot2_pullback)),
+            protective_stop_multiplier=Decimal(str(protection_multiplier))
+        ),
+        LotRule(
+            use_trailing_stop=True,
+            trailing_activation=Decimal(str(lot3_trigger)),
+            trailing_pullback=Decimal(str(lot3_pullback)),
+            protective_stop_multiplier=Decimal(str(protection_multiplier))
+        )
+    ]
+
+    return StrategyConfig(
+        trade_size_in_lots=3,
+        stop_loss_type=StopLossType.RANGE_BOUNDARY,
+        lot_rules=lot_rules,
+        trading_direction=trading_direction,
+        range_filter=RangeFilter(),  # 使用預設值
+        risk_config=RiskConfig(),    # 使用預設值
+        stop_loss_config=StopLossConfig()  # 使用預設值
+    )
+
+
+def silence_backtest_logging():
+    """將回測模組的交易日誌降為 WARNING (只需設定一次，不再逐次切換全域日誌級別)"""
+    logging.getLogger(backtest_module.__name__).setLevel(logging.WARNING)
+
+
 def evaluate_for_salib(params: np.ndarray, trading_direction: str, start_date: str, end_date: str, 
                       range_start_time: str, range_end_time: str) -> float:
     """
@@ -266,63 +319,53 @@ def evaluate_for_salib(params: np.ndarray, trading_direction: str, start_date: s
     Returns:
         float: 負MDD值（用於最小化優化）
     """
+    silence_backtest_logging()
     try:
-        # 臨時設置日誌級別為 WARNING 以抑制 INFO 級別的交易日誌
-        original_level = logging.getLogger().level
-        logging.getLogger().setLevel(logging.WARNING)
-
-        # 解析參數
-        lot1_trigger, lot1_pullback, lot2_trigger, lot2_pullback, lot3_trigger, lot3_pullback, protection_multiplier = params
-
-        # 創建策略配置
-        lot_rules = [
-            LotRule(
-                use_trailing_stop=True,
-                trailing_activation=Decimal(str(lot1_trigger)),
-                trailing_pullback=Decimal(str(lot1_pullback))
-            ),
-            LotRule(
-                use_trailing_stop=True,
-                trailing_activation=Decimal(str(lot2_trigger)),
-                trailing_pullback=Decimal(str(lot2_pullback)),
-                protective_stop_multiplier=Decimal(str(protection_multiplier))
-            ),
-            LotRule(
-                use_trailing_stop=True,
-                trailing_activation=Decimal(str(lot3_trigger)),
-                trailing_pullback=Decimal(str(lot3_pullback)),
-                protective_stop_multiplier=Decimal(str(protection_multiplier))
-            )
-        ]
-
-        config = StrategyConfig(
-            trade_size_in_lots=3,
-            stop_loss_type=StopLossType.RANGE_BOUNDARY,
-            lot_rules=lot_rules,
-            trading_direction=trading_direction,
-            range_filter=RangeFilter(),  # 使用預設值
-            risk_config=RiskConfig(),    # 使用預設值
-            stop_loss_config=StopLossConfig()  # 使用預設值
-        )
+        config = build_strategy_config(params, trading_direction)
 
         # 執行回測
         result = calculate_backtest_metrics(config, start_date, end_date, range_start_time, range_end_time, silent=True)
 
-        # 恢復原始日誌級別
-        logging.getLogger().setLevel(original_level)
-
         # 返回負MDD（用於最小化優化）
         mdd = result['max_drawdown']
         return -mdd
 
     except Exception as e:
-        # 恢復原始日誌級別
-        logging.getLogger().setLevel(original_level)
-
         # 記錄錯誤的參數組合和錯誤訊息
-        param_str = f"[{lot1_trigger:.2f}, {lot1_pullback:.3f}, {lot2_trigger:.2f}, {lot2_pullback:.3f}, {lot3_trigger:.2f}, {lot3_pullback:.3f}, {protection_multiplier:.2f}]"
+        param_str = "[" + ", ".join(f"{value:.3f}" for value in params) + "]"
         logger.error(f"❌ SALib 評估函式錯誤: {e} | 錯誤參數: {param_str} | 交易方向: {trading_direction}")
-        return -999999.0  # 返回極大的負值表示失敗
+        return FAILED_VALUE  # 返回極大的負值表示失敗
+
+
+# ==============================================================================
+# 共用行情資料的單次評估 (每個樣本一次評估取得三個方向)
+# ==============================================================================
+
+# 子進程共用的每日行情資料 (由進程池 initializer 設定，每個子進程只傳遞一次)
+_shared_market_days = None
+
+
+def init_evaluation_worker(market_days):
+    """進程池 initializer：保存共用行情資料並靜音交易日誌"""
+    global _shared_market_days
+    _shared_market_days = market_days
+    silence_backtest_logging()
+
+
+def evaluate_sample_all_directions(params: np.ndarray) -> Dict[str, float]:
+    """
+    評估單一參數樣本，同時取得 LONG_ONLY / SHORT_ONLY / BOTH 的輸出
+
+    Returns:
+        dict: {'<方向>:neg_mdd': 負MDD, '<方向>:total_pnl': 總損益}
+    """
+    try:
+        configs = {direction: build_strategy_config(params, direction) for direction in DIRECTIONS}
+        return evaluate_all_directions(configs, _shared_market_days, _run_multi_lot_logic, apply_range_filter)
+    except Exception as e:
+        param_str = "[" + ", ".join(f"{value:.3f}" for value in params) + "]"
+        logger.error(f"❌ SALib 評估函式錯誤: {e} | 錯誤參數: {param_str}")
+        return failed_outputs()
 
 
 # ==============================================================================
@@ -355,6 +398,9 @@ problem = {
 # 交易方向列表（分類變數）
 TRADING_DIRECTIONS = ['LONG_ONLY', 'SHORT_ONLY', 'BOTH']
 
+# Y向量快取目錄
+DEFAULT_Y_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "SALIB_report", "y_cache")
+
 
 # ==============================================================================
 # 並行處理輔助函數
@@ -530,10 +576,15 @@ def save_sensitivity_csv(df_results, trading_direction, report_dir, additional_i
 
 def run_sensitivity_analysis(target_time_slot: Tuple[str, str], sample_size: int = 64,
                            start_date: str = "2024-11-04", end_date: str = "2025-06-28",
-                           use_parallel: bool = True, num_processes: Optional[int] = None) -> Dict[str, Any]:
+                           use_parallel: bool = True, num_processes: Optional[int] = None,
+                           sample_seed: int = 2025, cache_dir: Optional[str] = DEFAULT_Y_CACHE_DIR) -> Dict[str, Any]:
     """
     執行完整的敏感度分析流程
 
+    行情資料只讀取一次並由所有子進程共用；Sobol 樣本只產生一次，每個樣本只評估一次
+    即同時得到三個交易方向的輸出。Y向量依 (問題定義, 抽樣種子, 資料版本) 快取，
+    相同條件重跑不需重新回測，增加 sample_size 時只評估新增的樣本。
+
     Args:
         target_time_slot: 目標時間區段，例如 ('08:46', '08:47')
         sample_size: SALib 樣本數
@@ -541,6 +592,8 @@ def run_sensitivity_analysis(target_time_slot: Tuple[str, str], sample_size: int
         end_date: 回測結束日期
         use_parallel: 是否使用並行處理
         num_processes: 並行處理核心數（None時自動設定為CPU核心數-4）
+        sample_seed: Sobol 抽樣種子 (快取鍵的一部分)
+        cache_dir: Y向量快取目錄，None 表示不快取
 
     Returns:
         dict: 包含所有交易方向分析結果的字典
@@ -564,73 +617,56 @@ def run_sensitivity_analysis(target_time_slot: Tuple[str, str], sample_size: int
     else:
         logger.info(f"🔄 使用單核心順序計算...")
 
-    # 初始化數據源
-    if USE_SQLITE:
-        try:
+    # 初始化數據源並一次讀取行情
+    try:
+        if USE_SQLITE:
             sqlite_connection.init_sqlite_connection()
-            logger.info("✅ SQLite連接初始化成功。")
-        except Exception as e:
-            logger.error(f"❌ SQLite連接初始化失敗: {e}")
-            return {}
-    else:
-        try:
+            context_manager = sqlite_connection.get_conn_cur_from_sqlite_with_adapter(as_dict=True)
+        else:
             from app_setup import init_all_db_pools
             init_all_db_pools()
-            logger.info("✅ PostgreSQL連線池初始化成功。")
-        except Exception as e:
-            logger.error(f"❌ PostgreSQL連線池初始化失敗: {e}")
-            return {}
+            context_manager = shared.get_conn_cur_from_pool_b(as_dict=True)
 
-    # 對每個交易方向分別進行分析
+        with context_manager as (conn, cur):
+            market_days = load_market_days(cur, start_date, end_date, range_start_time, range_end_time)
+        logger.info(f"✅ 行情資料載入完成: {len(market_days)} 個交易日")
+    except Exception as e:
+        logger.error(f"❌ 行情資料載入失敗: {e}")
+        return {}
+
+    data_version = data_fingerprint(market_days, start_date, end_date, range_start_time, range_end_time)
+
+    # 1. 生成樣本 (所有方向共用)
+    logger.info(f"   🎲 生成 Sobol 樣本 (seed={sample_seed})...")
+    param_values = sobol_sample.sample(problem, N=sample_size, seed=sample_seed)
+    logger.info(f"   ✅ 生成了 {len(param_values)} 個參數組合")
+
+    # 2. 執行回測 (每個樣本一次，取得三個方向)
+    store = YVectorStore(cache_dir) if cache_dir else None
+    cache_key = YVectorStore.make_key(problem, sample_seed, data_version) if store else None
+    logger.info(f"   🔄 執行回測... (資料版本: {data_version})")
+
+    if use_parallel and len(param_values) > 10:  # 只有樣本數足夠大時才使用並行
+        logger.info(f"   🚀 使用 {num_processes} 核心並行處理...")
+        chunksize = max(1, len(param_values) // (num_processes * 16))
+        with multiprocessing.Pool(processes=num_processes, initializer=init_evaluation_worker,
+                                  initargs=(market_days,)) as pool:
+            outputs = evaluate_with_cache(
+                param_values, lambda rows: pool.map(evaluate_sample_all_directions, rows, chunksize=chunksize),
+                store, cache_key)
+    else:
+        init_evaluation_worker(market_days)
+        outputs = evaluate_with_cache(
+            param_values, lambda rows: [evaluate_sample_all_directions(params) for params in rows],
+            store, cache_key)
+    logger.info(f"   ✅ 計算完成: {len(param_values)}/{len(param_values)} (100.0%)")
+
+    # 對每個交易方向分別進行 Sobol 分析與報告 (共用同一組樣本與評估結果)
     for trading_direction in TRADING_DIRECTIONS:
         logger.info(f"\n📊 分析交易方向: {trading_direction}")
 
         try:
-            # 1. 生成樣本
-            logger.info(f"   🎲 生成 Sobol 樣本...")
-            param_values = sobol_sample.sample(problem, N=sample_size)
-            logger.info(f"   ✅ 生成了 {len(param_values)} 個參數組合")
-
-            # 2. 執行回測
-            logger.info(f"   🔄 執行回測...")
-            Y = np.zeros(len(param_values))
-
-            if use_parallel and len(param_values) > 10:  # 只有樣本數足夠大時才使用並行
-                # 並行處理
-                logger.info(f"   🚀 使用 {num_processes} 核心並行處理...")
-
-                # 創建進度追蹤器
-                progress_tracker = ProgressTracker(len(param_values), update_interval=5)
-
-                # 準備參數（不使用進度追蹤的簡單版本）
-                args_list = [(params, trading_direction, start_date, end_date, range_start_time, range_end_time)
-                           for params in param_values]
-
-                # 使用進程池並行計算
-                with multiprocessing.Pool(processes=num_processes) as pool:
-                    # 執行並行計算
-                    results_list = pool.map(evaluate_single_param_set, args_list)
-                    Y = np.array(results_list)
-
-                # 手動更新進度到100%
-                logger.info(f"   ✅ 並行計算完成: {len(param_values)}/{len(param_values)} (100.0%)")
-
-            else:
-                # 順序處理
-                progress_tracker = ProgressTracker(len(param_values), update_interval=5)
-
-                for i, params in enumerate(param_values):
-                    Y[i] = evaluate_for_salib(params, trading_direction, start_date, end_date,
-                                            range_start_time, range_end_time)
-
-                    # 更新進度（每5%顯示一次）
-                    current_percentage = ((i + 1) / len(param_values)) * 100
-                    if current_percentage - progress_tracker.last_reported_percentage >= 5:
-                        logger.info(f"   📊 進度更新: {i+1}/{len(param_values)} ({current_percentage:.1f}%)")
-                        progress_tracker.last_reported_percentage = current_percentage
-
-                # 完成時報告
-                logger.info(f"   ✅ 順序計算完成: {len(param_values)}/{len(param_values)} (100.0%)")
+            Y = outputs[output_name(trading_direction, 'neg_mdd')]
 
             logger.info(f"   ✅ 回測完成，有效結果: {np.sum(Y > -999999)} / {len(Y)}")
 
@@ -689,7 +725,9 @@ def run_sensitivity_analysis(target_time_slot: Tuple[str, str], sample_size: int
                 'Time_Slot': f"{range_start_time}-{range_end_time}",
                 'Analysis_Date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 'Valid_Results': np.sum(Y > -999999),
-                'Total_Samples': len(Y)
+                'Total_Samples': len(Y),
+                'Sample_Seed': sample_seed,
+                'Data_Version': data_version
             }
 
             # 保存CSV結果
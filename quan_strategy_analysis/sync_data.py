@@ -143,6 +143,32 @@ def sync_data():
     except Exception as e:
         logger.error(f"❌ 同步過程出錯: {e}")
 
+def check_day_cache(prune=True):
+    """檢查每日回測結果快取，並清除舊引擎版本的結果"""
+    from day_result_cache import DEFAULT_DAY_CACHE_PATH, DayResultStore
+
+    if not Path(DEFAULT_DAY_CACHE_PATH).exists():
+        logger.info("ℹ️ 尚未建立每日結果快取 (run_backtest 指定 day_cache 後自動建立)")
+        return
+
+    import importlib.util
+    spec = importlib.util.spec_from_file_location(
+        "backtest_module", Path(__file__).parent / "multi_Profit-Funded Risk_多口.py")
+    backtest_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(backtest_module)
+
+    store = DayResultStore(DEFAULT_DAY_CACHE_PATH)
+    if prune:
+        deleted = store.prune(backtest_module.ENGINE_VERSION)
+        if deleted:
+            logger.info(f"🧹 已清除 {deleted:,} 筆舊引擎版本的每日結果")
+
+    stats = store.stats()
+    logger.info(f"💾 每日結果快取: {stats['rows']:,} 筆 / {stats['configs']} 組配置 "
+                f"({stats['first_day']} 至 {stats['last_day']})")
+    logger.info(f"🔧 目前引擎版本: {backtest_module.ENGINE_VERSION}")
+    logger.info("💡 新增交易日後重新回測只會計算新的交易日，行情有修正的交易日會自動重算")
+
 def main():
     """主函數"""
     logger.info("🔄 SQLite數據同步工具")
@@ -166,6 +192,10 @@ def main():
         elif command == "postgres":
             logger.info("📋 檢查PostgreSQL狀態...")
             check_postgresql_status()
+
+        elif command == "cache":
+            logger.info("📋 檢查每日結果快取...")
+            check_day_cache()
             
         else:
             print("❌ 未知命令")
@@ -186,10 +216,12 @@ python sync_data.py [命令]
   sync      - 執行完整數據同步
   sqlite    - 僅檢查SQLite狀態
   postgres  - 僅檢查PostgreSQL狀態
+  cache     - 檢查每日回測結果快取並清除舊引擎版本的結果
 
 使用範例:
   python sync_data.py check    # 檢查同步狀態
   python sync_data.py sync     # 執行數據同步
+  python sync_data.py cache    # 檢查每日結果快取
   python sync_data.py          # 默認檢查狀態
     """)
 
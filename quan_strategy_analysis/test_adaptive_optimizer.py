@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自適應參數優化器測試
+以合成的回測函數驗證參數空間、Pareto 前緣與優化器寫入實驗資料庫的行為
+
+作者：量化分析團隊
+日期：2025-07-15
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from adaptive_optimizer import (AdaptiveOptimizer, base_experiment_from_config, pareto_front,
+                                search_space_from_config)
+from batch_backtest_engine import BatchBacktestEngine, ExperimentResult, ResultDatabase
+from experiment_analyzer import ExperimentAnalyzer
+from parameter_matrix_generator import ExperimentConfig, ParameterMatrixGenerator
+
+
+def synthetic_metrics(params):
+    """合成的回測結果：損益在中段啟動點最高，回撤隨第3口啟動點與回撤比例增加"""
+    pnl = (1000
+           - 3.0 * (params['lot1_trigger'] - 20) ** 2
+           - 1.5 * (params['lot2_trigger'] - 40) ** 2
+           - 0.8 * (params['lot3_trigger'] - 65) ** 2
+           - 2.0 * (params['lot1_trailing'] - 20) ** 2
+           + 40.0 * params['lot2_protection']
+           + (30.0 if params['range_start_time'] == "08:46" else 0.0))
+    mdd = 200 + 2.0 * params['lot3_trigger'] + 1.5 * params['lot2_trailing'] + 20.0 * params['lot3_protection']
+    return pnl, mdd
+
+
+class SyntheticEngine(BatchBacktestEngine):
+    """以合成函數取代子程序回測的引擎"""
+
+    def execute_single_experiment(self, experiment):
+        pnl, mdd = synthetic_metrics(experiment)
+        return ExperimentResult(experiment_id=experiment['experiment_id'], parameters=experiment,
+                                success=True, execution_time=0.0, total_trades=10,
+                                total_pnl=pnl, max_drawdown=mdd)
+
+
+def _grid_objectives(config):
+    """全網格的合成結果 (作為比較基準)"""
+    generator = ParameterMatrixGenerator(config)
+    rows = [synthetic_metrics(exp) for exp in generator.generate_full_parameter_matrix()
+            if not exp['range_filter_enabled']]
+    return np.array(rows)
+
+
+def test_search_space_matches_grid():
+    """測試參數空間與網格生成器一致"""
+    print("🧪 測試參數空間")
+    config = ExperimentConfig()
+    space = search_space_from_config(config)
+    stats = ParameterMatrixGenerator(config).get_matrix_statistics()
+    assert space.grid_size == stats['lot_combinations'] * stats['time_combinations']
+
+    rng = np.random.default_rng(0)
+    lot2_values = config.lot2_config.protection_range.generate_values()
+    samples = space.sample(rng, 200)
+    assert len({space.key(row) for row in samples}) == 200
+    for row in samples:
+        params = space.decode(row)
+        assert params['lot1_trigger'] <= params['lot2_trigger'] <= params['lot3_trigger']
+        assert params['lot2_protection'] in lot2_values
+        assert (space.encode(params) == row).all()
+    print("✅ 參數空間正確")
+
+
+def test_pareto_front_matches_brute_force():
+    """測試 Pareto 前緣與兩兩比較的結果一致"""
+    print("🧪 測試Pareto前緣")
+    rng = np.random.default_rng(1)
+    pnl = rng.normal(0, 100, 300).round()
+    mdd = rng.uniform(0, 100, 300).round()
+
+    expected = set()
+    for i in range(len(pnl)):
+        dominated = any(pnl[j] >= pnl[i] and mdd[j] <= mdd[i] and (pnl[j] > pnl[i] or mdd[j] < mdd[i])
+                        for j in range(len(pnl)))
+        if not dominated:
+            expected.add((pnl[i], mdd[i]))
+
+    front = pareto_front(pnl, mdd)
+    assert {(pnl[i], mdd[i]) for i in front} == expected
+    assert (np.diff(pnl[front]) <= 0).all() and (np.diff(mdd[front]) < 0).all()
+    print("✅ Pareto前緣正確")
+
+
+def test_optimizer_finds_near_optimum_with_small_budget():
+    """測試各方法以遠少於網格的評估數接近最佳值，且結果寫入實驗資料庫"""
+    print("🧪 測試自適應優化")
+    config = ExperimentConfig()
+    grid = _grid_objectives(config)
+    target = np.percentile(grid[:, 0], 98)   # 網格前 2%
+
+    for method in ('gp', 'tpe', 'rf'):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = SyntheticEngine(max_parallel=4, result_db=ResultDatabase(os.path.join(tmp, 'exp.db')))
+            optimizer = AdaptiveOptimizer(search_space_from_config(config), base_experiment_from_config(config),
+                                          engine=engine, method=method, weights=(1.0, 0.0), seed=4)
+            started = time.time()
+            summary = optimizer.run(budget=80)
+
+            assert summary['evaluations'] == 80
+            assert summary['evaluation_ratio'] < 0.02
+            assert summary['best_total_pnl']['total_pnl'] >= target, (method, summary['best_total_pnl'])
+
+            df = ExperimentAnalyzer(os.path.join(tmp, 'exp.db')).load_results_dataframe()
+            ids = [row['experiment_id'] for row in engine.result_db.get_metric_results()]
+            assert len(df) == 80 and len(set(ids)) == 80
+            assert set(df['optimizer']) == {method}
+            print(f"   {method}: 最佳 {summary['best_total_pnl']['total_pnl']:.1f} "
+                  f"(網格前 2%: {target:.1f})，耗時 {time.time() - started:.1f}s")
+    print("✅ 自適應優化正常")
+
+
+def test_pareto_search_and_warm_start():
+    """測試多目標探索與資料庫暖啟動 (不覆蓋既有實驗)"""
+    print("🧪 測試多目標與暖啟動")
+    config = ExperimentConfig()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'exp.db')
+        engine = SyntheticEngine(max_parallel=4, result_db=ResultDatabase(db_path))
+        space = search_space_from_config(config)
+        base = base_experiment_from_config(config)
+
+        first = AdaptiveOptimizer(space, base, engine=engine, method='tpe', seed=5).run(budget=40)
+        assert len(first['pareto_front']) >= 3
+        front = first['pareto_front']
+        assert all(a['total_pnl'] > b['total_pnl'] and a['max_drawdown'] > b['max_drawdown']
+                   for a, b in zip(front, front[1:]))
+
+        second = AdaptiveOptimizer(space, base, engine=engine, method='tpe', seed=6)
+        assert second.warm_start_count == 40
+        second.run(budget=12)
+        ids = [row['experiment_id'] for row in engine.result_db.get_metric_results()]
+        assert len(ids) == 52 and len(set(ids)) == 52
+
+        # 不同交易方向不沿用
+        other = AdaptiveOptimizer(space, base_experiment_from_config(config, trading_direction='LONG_ONLY'),
+                                  engine=engine, method='tpe')
+        assert other.warm_start_count == 0
+    print("✅ 多目標與暖啟動正常")
+
+
+if __name__ == "__main__":
+    test_search_space_matches_grid()
+    test_pareto_front_matches_brute_force()
+    test_optimizer_finds_near_optimum_with_small_budget()
+    test_pareto_search_and_warm_start()
+    print("\n🎯 自適應參數優化器測試完成")
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+每日結果快取測試
+驗證每日結果的精確存取、濾網日與引擎版本的失效，以及 run_backtest 重跑時全部沿用快取
+
+作者：量化分析團隊
+日期：2025-07-17
+"""
+
+import importlib.util
+import os
+import sqlite3
+import sys
+import tempfile
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from day_result_cache import (STATUS_FILTERED, STATUS_NO_SIGNAL, STATUS_TRADED, DayResultStore, config_key,
+                              evaluate_day, load_day_hashes)
+from walk_forward import DailyPnLMatrix
+
+
+@dataclass
+class FakeConfig:
+    lots: int = 2
+    max_range: Decimal = Decimal(1000)
+
+
+class CountingLogic:
+    """假的交易邏輯：收盤價 - 100 為每口損益，收盤價為 100 時沒有訊號；記錄呼叫次數"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, session, trade_candles, config, range_high, range_low, trade_log=None):
+        self.calls += 1
+        per_lot = session[-1]['close_price'] - Decimal(100)
+        if per_lot == 0:
+            return Decimal(0), ""
+        if trade_log is not None:
+            trade_log['lot_pnl'] = [per_lot] * config.lots
+            trade_log['events'] = [{'time': '08:48:00', 'type': 'entry', 'lot': None, 'price': 100.0, 'pnl': 0.0}]
+        return per_lot * config.lots, 'LONG' if per_lot > 0 else 'SHORT'
+
+
+def fake_filter(config, range_high, range_low, day):
+    return range_high - range_low <= config.max_range, ""
+
+
+def _market_days(closes, start=date(2024, 1, 1), width=Decimal(20)):
+    days = []
+    for offset, close in enumerate(closes):
+        session = [{'close_price': Decimal(100)}, {'close_price': Decimal(str(close))}]
+        days.append((start + timedelta(days=offset), session, session[1:], 100 + width / 2, 100 - width / 2))
+    return days
+
+
+def test_results_round_trip_exactly():
+    """測試每日結果 (含 Decimal 與事件) 由快取讀回後完全相同"""
+    print("🧪 測試每日結果存取")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DayResultStore(os.path.join(tmp, 'day.sqlite'))
+        results = [evaluate_day(FakeConfig(), market_day, f"h{index}", CountingLogic(), fake_filter)
+                   for index, market_day in enumerate(_market_days(['100.35', '100', '97.1']))]
+        assert [r.status for r in results] == [STATUS_TRADED, STATUS_NO_SIGNAL, STATUS_TRADED]
+        assert results[0].day_pnl == Decimal('0.70') and results[2].direction == 'SHORT'
+
+        key = config_key(FakeConfig())
+        assert store.save(key, 'v1', results) == 3
+        loaded = store.load(key, 'v1')
+        assert list(loaded.values()) == results
+        assert isinstance(loaded['2024-01-01'].day_pnl, Decimal) and loaded['2024-01-01'].lot_pnl == [Decimal('0.35')] * 2
+        assert loaded['2024-01-01'].events[0]['type'] == 'entry'
+        assert list(store.load(key, 'v1', '2024-01-02', '2024-01-02')) == ['2024-01-02']
+    print("✅ 每日結果存取正常")
+
+
+def test_filtered_days_and_engine_version():
+    """測試區間濾網排除的交易日同樣被快取，引擎版本不同時不沿用並可清除舊版本"""
+    print("🧪 測試快取失效")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DayResultStore(os.path.join(tmp, 'day.sqlite'))
+        market_days = _market_days([101, 99, 102, 98])
+
+        logic = CountingLogic()
+        filtered = DailyPnLMatrix([FakeConfig(max_range=Decimal(10))], logic, fake_filter)
+        assert filtered.update(market_days, store=store, engine_version='v1') == 4 and logic.calls == 0
+        key = filtered.config_keys[0]
+        assert all(r.status == STATUS_FILTERED for r in store.load(key, 'v1').values())
+        assert DailyPnLMatrix([FakeConfig(max_range=Decimal(10))], logic, fake_filter).update(
+            market_days, store=store, engine_version='v1') == 0
+
+        for version in ('v1', 'v2'):
+            DailyPnLMatrix([FakeConfig()], CountingLogic(), fake_filter).update(
+                market_days, store=store, engine_version=version)
+        assert store.stats()['engine_versions'] == {'v1': 8, 'v2': 4}
+        assert store.prune('v2') == 8 and store.stats()['rows'] == 4
+    print("✅ 快取失效正常")
+
+
+def _write_stock_prices(path, days):
+    """每個交易日 08:45-13:45 的一分K；開盤區間後依日期單數上漲、雙數下跌"""
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE stock_prices (trade_datetime TEXT PRIMARY KEY, open_price INTEGER, "
+                     "high_price INTEGER, low_price INTEGER, close_price INTEGER, price_change INTEGER, "
+                     "percentage_change REAL, volume INTEGER)")
+        rows = []
+        for offset in range(days):
+            start = datetime(2024, 11, 4, 8, 45) + timedelta(days=offset)
+            trend = 1 if offset % 2 == 0 else -1
+            for minute in range(301):
+                close = 20000 + (trend * (minute - 2) * 2 if minute > 2 else 0)
+                rows.append(((start + timedelta(minutes=minute)).strftime('%Y-%m-%d %H:%M:%S'),
+                             close, close + 5, close - 5, close, 0, 0.0, 10))
+        conn.executemany("INSERT INTO stock_prices VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+def test_run_backtest_reuses_day_cache():
+    """測試 run_backtest 啟用每日結果快取時，第二次執行全部沿用且結果與不快取完全相同"""
+    print("🧪 測試 run_backtest 每日結果快取")
+    spec = importlib.util.spec_from_file_location(
+        "backtest_module", os.path.join(os.path.dirname(os.path.abspath(__file__)), "multi_Profit-Funded Risk_多口.py"))
+    backtest_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(backtest_module)
+    import sqlite_connection
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'stock_data.sqlite')
+        _write_stock_prices(db_path, days=6)
+        with mock.patch.object(sqlite_connection, '_sqlite_connection', sqlite_connection.SQLiteConnection(db_path)):
+            with sqlite_connection.get_conn_cur_from_sqlite_with_adapter(as_dict=True) as (_, cur):
+                assert len(load_day_hashes(cur, '2024-11-05', '2024-11-08')) == 4
+
+            config = backtest_module.StrategyConfig(
+                trade_size_in_lots=2,
+                lot_rules=[backtest_module.LotRule(use_trailing_stop=True, trailing_activation=Decimal(15),
+                                                   trailing_pullback=Decimal('0.20'))] * 2)
+            cache_path = os.path.join(tmp, 'day_results.sqlite')
+            period = ('2024-11-04', '2024-11-09')
+            evaluate = backtest_module._evaluate_trade_day
+            with mock.patch.object(backtest_module, '_evaluate_trade_day', wraps=evaluate) as first_calls:
+                first = backtest_module.run_backtest(config, *period, silent=True, day_cache=cache_path)
+            with mock.patch.object(backtest_module, '_evaluate_trade_day', wraps=evaluate) as second_calls:
+                second = backtest_module.run_backtest(config, *period, silent=True, day_cache=cache_path)
+            direct = backtest_module.run_backtest(config, *period, silent=True)
+
+            assert first_calls.call_count == 6 and second_calls.call_count == 0
+            assert first['total_trades'] == 6 and first['long_trades'] == first['short_trades'] == 3
+            assert first == second == direct
+            assert DayResultStore(cache_path).stats()['rows'] == 6
+
+            # 其他開盤區間不沿用
+            with mock.patch.object(backtest_module, '_evaluate_trade_day', wraps=evaluate) as other_calls:
+                backtest_module.run_backtest(config, *period, silent=True, range_start_time='08:46',
+                                             range_end_time='08:48', day_cache=cache_path)
+            assert other_calls.call_count == 6
+    print("✅ run_backtest 每日結果快取正常")
+
+
+if __name__ == "__main__":
+    test_results_round_trip_exactly()
+    test_filtered_days_and_engine_version()
+    test_run_backtest_reuses_day_cache()
+    print("\n🎯 每日結果快取測試完成")
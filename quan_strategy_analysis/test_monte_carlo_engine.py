@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+向量化蒙地卡羅引擎測試
+驗證重抽樣索引、分塊統計、串流分位數與原始結果同值時的比例
+
+作者: 量化分析師
+日期: 2025-01-14
+"""
+
+import os
+import sys
+from decimal import Decimal
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from monte_carlo_engine import MonteCarloEngine, StreamingQuantiles, equity_curve_stats
+from monte_carlo_functions import run_monte_carlo_simulation, analyze_and_plot_mc_results, _summarize_stream
+
+TEST_PNL = [Decimal('10'), Decimal('-5'), Decimal('15'), Decimal('-8'),
+            Decimal('20'), Decimal('-12'), Decimal('25'), Decimal('-3')]
+
+
+def _single_path_stats(pnl_sequence):
+    """逐條計算資金曲線的最終損益與最大回撤"""
+    cumulative_pnl = np.cumsum(pnl_sequence)
+    drawdowns = np.maximum.accumulate(cumulative_pnl) - cumulative_pnl
+    return float(cumulative_pnl[-1]), float(np.max(drawdowns))
+
+
+def test_matrix_stats_match_single_path():
+    """測試矩陣版資金曲線統計與逐條計算一致"""
+    print("🧪 測試矩陣統計")
+    paths = np.random.default_rng(1).normal(0, 10, size=(50, 30))
+    expected = [_single_path_stats(row) for row in paths]
+    finals, mdds = equity_curve_stats(paths.copy())
+    assert np.allclose(finals, [e[0] for e in expected])
+    assert np.allclose(mdds, [e[1] for e in expected])
+    print("✅ 矩陣統計正確")
+
+
+def test_resampling_methods():
+    """測試各重抽樣方式的索引"""
+    print("🧪 測試重抽樣索引")
+    pnl = np.arange(20, dtype=float)
+
+    engine = MonteCarloEngine(pnl, method='permutation', seed=7)
+    indices = engine.sample_indices(100)
+    assert (np.sort(indices, axis=1) == np.arange(20)).all()
+
+    engine = MonteCarloEngine(pnl, method='circular', block_length=5, horizon=23, seed=7)
+    indices = engine.sample_indices(100)
+    assert indices.shape == (100, 23)
+    # 區塊內索引循環遞增
+    assert ((np.diff(indices[:, :5], axis=1) % 20) == 1).all()
+
+    engine = MonteCarloEngine(pnl, method='stationary', block_length=4, seed=7)
+    indices = engine.sample_indices(2000)
+    steps = np.diff(indices, axis=1) % 20
+    continuation = np.mean(steps == 1)
+    assert 0.7 < continuation < 0.8   # 約 1 - 1/L
+
+    engine = MonteCarloEngine(pnl, method='iid', seed=7)
+    assert engine.sample_indices(10).max() < 20
+    print("✅ 重抽樣索引正確")
+
+
+def test_chunked_run_is_reproducible():
+    """測試分塊執行的結果數量與種子重現性"""
+    print("🧪 測試分塊執行")
+    engine = MonteCarloEngine(TEST_PNL, method='iid', memory_budget_mb=0.01, seed=3)
+    assert engine.chunk_size < 1000
+    first = engine.run(5000, keep_samples=True, progress=False)
+    second = MonteCarloEngine(TEST_PNL, method='iid', memory_budget_mb=0.01, seed=3).run(
+        5000, keep_samples=True, progress=False)
+
+    assert first['final_pnls'].size == 5000 and first['final_pnl'].count == 5000
+    assert np.array_equal(first['final_pnls'], second['final_pnls'])
+
+    permuted = MonteCarloEngine(TEST_PNL, seed=3).run(1000, keep_samples=True, progress=False)
+    assert np.allclose(permuted['final_pnls'], float(sum(TEST_PNL)))
+    print("✅ 分塊執行正常")
+
+
+def test_streaming_quantiles_accuracy():
+    """測試串流分位數與精確值的誤差"""
+    print("🧪 測試串流分位數")
+    rng = np.random.default_rng(11)
+    values = np.concatenate([rng.normal(0, 1, 10000), rng.normal(50, 5, 10000), rng.normal(-80, 2, 10000)])
+    stats = StreamingQuantiles(num_bins=4096)
+    for chunk in np.array_split(values, 30):   # 範圍向上與向下擴張
+        stats.update(chunk)
+
+    assert stats.count == values.size
+    assert abs(stats.mean - values.mean()) < 1e-9
+    assert abs(stats.std - values.std()) < 1e-9
+    for p in (1, 5, 50, 95, 99):
+        assert abs(stats.percentile(p) - np.percentile(values, p)) <= 2 * stats.width
+    assert abs(stats.fraction_below(0.0) - np.mean(values <= 0.0)) < 0.01
+    print("✅ 串流分位數正確")
+
+
+def test_ties_with_original_result():
+    """測試原始結果與模擬結果同值時，嚴格小於與小於等於分開計算"""
+    print("🧪 測試同值比例")
+    original_pnl, original_mdd = _single_path_stats(np.array([float(x) for x in TEST_PNL]))
+
+    # permutation 模式每次模擬的總損益都與原始相同
+    results = run_monte_carlo_simulation(TEST_PNL, num_simulations=5000, seed=3, keep_samples=False)
+    pnl = _summarize_stream(results['final_pnl_stats'], float(sum(TEST_PNL)))
+    assert pnl['below'] == 0.0 and pnl['at_or_below'] == 1.0
+
+    mdd_stats = results['max_drawdown_stats']
+    mdd = _summarize_stream(mdd_stats, original_mdd)
+    assert 0.0 < mdd['below'] < mdd['at_or_below'] < 1.0
+
+    results = run_monte_carlo_simulation(TEST_PNL, num_simulations=5000, seed=3, keep_samples=True)
+    mdds = np.array(results['max_drawdowns'])
+    assert np.isclose(mdd['below'], np.mean(mdds < original_mdd - 1e-9))
+    assert np.isclose(mdd['at_or_below'], np.mean(mdds <= original_mdd + 1e-9))
+
+    # 未登記的門檻值：最小值以下與最大值以上為精確值
+    stats = StreamingQuantiles(num_bins=64)
+    stats.update(np.array([1.0, 2.0, 2.0, 3.0]))
+    assert stats.fraction_below(1.0, strict=True) == 0.0 and stats.fraction_below(3.0) == 1.0
+    stats.track(2.0)
+    assert stats.tracked == {2.0: [0, 0]}
+    print("✅ 同值比例正確")
+
+
+def test_streaming_only_analysis():
+    """測試不保留逐次結果時仍可完成分析"""
+    print("🧪 測試串流分析")
+    results = run_monte_carlo_simulation(TEST_PNL, num_simulations=20000, method='stationary',
+                                         block_length=2, seed=5, keep_samples=False)
+    assert results['final_pnls'] == [] and results['final_pnl_stats'].count == 20000
+    analyze_and_plot_mc_results(results, sum(TEST_PNL), Decimal('12'))
+
+    results = run_monte_carlo_simulation(TEST_PNL, num_simulations=200, seed=5)
+    assert len(results['final_pnls']) == 200
+    print("✅ 串流分析正常")
+
+
+if __name__ == "__main__":
+    test_matrix_stats_match_single_path()
+    test_resampling_methods()
+    test_chunked_run_is_reproducible()
+    test_streaming_quantiles_accuracy()
+    test_ties_with_original_result()
+    test_streaming_only_analysis()
+    print("\n🎯 蒙地卡羅引擎測試完成")
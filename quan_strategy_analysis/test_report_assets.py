@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+輕量報告資產測試
+驗證圖表依輸入雜湊只繪製一次、明細分頁JSON與壓縮日誌，以及輕量格式報告不再內嵌圖表與日誌
+
+作者：量化分析團隊
+日期：2025-07-18
+"""
+
+import contextlib
+import glob
+import gzip
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from report_assets import ReportAssetStore, data_digest
+from enhanced_report_generator import generate_comprehensive_report
+
+SAMPLE_LOG = """
+[2025-07-06T20:34:21+0800] INFO [__main__.run_backtest:382] --- 2024-11-07 | 開盤區間: 23130 - 23180 | 區間濾網未啟用 ---
+[2025-07-06T20:34:21+0800] INFO [__main__._run_multi_lot_logic:202]   📉 SHORT | 進場 3 口 | 時間: 08:48:00, 價格: 23130
+[2025-07-06T20:34:21+0800] INFO [__main__._run_multi_lot_logic:268]   ✅ 第1口移動停利 | 時間: 08:49:00, 價格: 23115, 損益: +15
+[2025-07-06T20:34:21+0800] INFO [__main__._run_multi_lot_logic:268]   ✅ 第2口移動停利 | 時間: 08:57:00, 價格: 23093, 損益: +37
+[2025-07-06T20:34:21+0800] INFO [__main__._run_multi_lot_logic:237]   🛡️ 第3口保護性停損 | 時間: 09:05:00, 出場價: 23234, 損益: -104
+[2025-07-06T20:34:26+0800] INFO [__main__.run_backtest:382] --- 2024-11-08 | 開盤區間: 23746 - 23793 | 區間濾網未啟用 ---
+[2025-07-06T20:34:26+0800] INFO [__main__._run_multi_lot_logic:198]   📈 LONG  | 進場 3 口 | 時間: 08:48:00, 價格: 23794
+[2025-07-06T20:34:26+0800] INFO [__main__._run_multi_lot_logic:301]   🚨 風險管理虧損平倉 | 觸發當日虧損限制，強制平倉 (-114點 <= -100點) | 時間: 08:51:00, 平倉價: 23756
+[2025-07-06T20:34:26+0800] INFO [__main__._run_multi_lot_logic:309]     🚨 第1口風險平倉 | 損益: -38點
+[2025-07-06T20:34:26+0800] INFO [__main__._run_multi_lot_logic:309]     🚨 第2口風險平倉 | 損益: -38點
+[2025-07-06T20:34:26+0800] INFO [__main__._run_multi_lot_logic:309]     🚨 第3口風險平倉 | 損益: -38點
+"""
+CONFIG = {'trade_lots': 3, 'start_date': '2024-11-07', 'end_date': '2024-11-08'}
+
+
+def _generate(workdir, report_format):
+    # 內嵌格式的暫存圖檔寫在工作目錄的 charts/，切到暫存目錄執行
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return generate_comprehensive_report(SAMPLE_LOG, CONFIG, report_format=report_format,
+                                                 reports_dir=os.path.join(workdir, 'reports'))
+    finally:
+        os.chdir(cwd)
+
+
+def test_asset_store():
+    """測試圖表以輸入雜湊去重、分頁JSON、壓縮日誌與清除"""
+    print("🧪 測試報告資產儲存")
+    with tempfile.TemporaryDirectory() as reports_dir:
+        store = ReportAssetStore(reports_dir)
+        rendered = []
+
+        def render(path):
+            rendered.append(path)
+            with open(path, 'wb') as f:
+                f.write(b'png')
+
+        pnl = pd.Series([10.0, -5.0, 20.0], name='total_pnl')
+        first = store.chart('daily_pnl', render, pnl)
+        assert store.chart('daily_pnl', render, pnl.copy()) == first and len(rendered) == 1
+        assert store.chart('daily_pnl', render, pnl + 1) != first and len(rendered) == 2
+        assert store.chart('pnl_distribution', render, pnl) != first
+        assert first.startswith('assets/charts/daily_pnl_') and os.path.exists(os.path.join(reports_dir, first))
+        assert not glob.glob(os.path.join(store.charts_dir, '*.tmp.png'))
+        assert data_digest(pd.DataFrame({'a': [1]})) != data_digest(pd.DataFrame({'b': [1]}))
+
+        # 已繪製的圖檔依內容去重
+        chart_file = os.path.join(reports_dir, 'equity_curve.png')
+        with open(chart_file, 'wb') as f:
+            f.write(b'curve')
+        assert store.add_chart_file(chart_file) == store.add_chart_file(chart_file)
+
+        rows = [{'date': f'2024-11-{i % 28 + 1:02d}', 'pnl': f'{i:+d}'} for i in range(450)]
+        manifest = store.write_table('enhanced_report_x.html', 'trades', rows, page_size=200)
+        assert (manifest['pages'], manifest['total']) == (3, 450)
+        with open(os.path.join(reports_dir, manifest['url'].format(page=3)), encoding='utf-8') as f:
+            last_page = json.load(f)
+        assert last_page['page'] == 3 and last_page['rows'] == rows[400:]
+
+        log = "📋 回測日誌\n" * 5000
+        log_manifest = store.write_log('enhanced_report_x.html', log)
+        with open(os.path.join(reports_dir, log_manifest['url']), 'rb') as f:
+            assert gzip.decompress(f.read()).decode('utf-8') == log
+        assert log_manifest['compressed_size'] < log_manifest['size'] / 20
+
+        store.remove_report('enhanced_report_x.html')
+        assert not os.path.exists(store.report_data_dir('enhanced_report_x.html'))
+        assert os.path.exists(os.path.join(reports_dir, first))
+        store.clear()
+        assert not os.path.exists(store.assets_dir)
+    print("✅ 報告資產儲存正常")
+
+
+def test_light_report_format():
+    """測試輕量格式報告：圖表引用共用圖檔、明細與日誌延遲載入，相同輸入的報告不重繪圖表"""
+    print("🧪 測試輕量報告格式")
+    with tempfile.TemporaryDirectory() as tmp:
+        reports_dir = os.path.join(tmp, 'reports')
+        embedded = _generate(tmp, 'embedded')
+        with open(embedded, encoding='utf-8') as f:
+            embedded_html = f.read()
+        assert 'data:image/png;base64,' in embedded_html and '第3口風險平倉' in embedded_html
+        assert not os.path.exists(os.path.join(reports_dir, 'assets'))
+
+        time.sleep(1.1)  # 報告檔名精確到秒
+        light = _generate(tmp, 'light')
+        with open(light, encoding='utf-8') as f:
+            light_html = f.read()
+        assert 'base64' not in light_html and '第3口風險平倉' not in light_html
+        assert len(light_html) < len(embedded_html) / 10
+
+        charts = re.findall(r'<img src="(assets/charts/[^"]+\.png)"', light_html)
+        assert len(charts) == 3 and all(os.path.exists(os.path.join(reports_dir, c)) for c in charts)
+
+        data_dir = ReportAssetStore(reports_dir).report_data_dir(light)
+        with open(os.path.join(data_dir, 'trades_1.json'), encoding='utf-8') as f:
+            trades = json.load(f)
+        assert trades['total'] == 6 and trades['rows'][0]['lot'] == '第1口'
+        assert trades['rows'][-1]['exit_type'] == '🚨 風險管理平倉' and trades['rows'][-1]['pnl_class'] == 'negative'
+        with open(os.path.join(data_dir, 'log.txt.gz'), 'rb') as f:
+            assert gzip.decompress(f.read()).decode('utf-8') == SAMPLE_LOG
+
+        # 相同輸入的下一份報告沿用同一組圖檔
+        chart_files = sorted(os.listdir(os.path.join(reports_dir, 'assets', 'charts')))
+        time.sleep(1.1)
+        again = _generate(tmp, 'light')
+        with open(again, encoding='utf-8') as f:
+            assert re.findall(r'<img src="(assets/charts/[^"]+\.png)"', f.read()) == charts
+        assert sorted(os.listdir(os.path.join(reports_dir, 'assets', 'charts'))) == chart_files
+    print("✅ 輕量報告格式正常")
+
+
+if __name__ == "__main__":
+    test_asset_store()
+    test_light_report_format()
+    print("\n🎯 輕量報告資產測試完成")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+敏感度評估核心測試腳本
+驗證單次評估推導的分方向結果與逐方向回測一致，以及Y向量快取的沿用與延伸
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sensitivity_evaluation import (DIRECTIONS, YVectorStore, data_fingerprint, evaluate_all_directions,
+                                    evaluate_with_cache, output_name, reusable_prefix)
+
+
+class FakeConfig:
+    def __init__(self, trading_direction):
+        self.trading_direction = trading_direction
+
+
+def fake_run_logic(session, trade_candles, config, range_high, range_low):
+    """與 _run_multi_lot_logic 相同的進場規則，出場價為收盤K棒"""
+    for candle in trade_candles:
+        if candle['close_price'] > range_high and config.trading_direction in ("LONG_ONLY", "BOTH"):
+            return trade_candles[-1]['close_price'] - candle['close_price'], 'LONG'
+        if candle['low_price'] < range_low and config.trading_direction in ("SHORT_ONLY", "BOTH"):
+            return candle['close_price'] - trade_candles[-1]['close_price'], 'SHORT'
+    return 0, ""
+
+
+def fake_filter(config, range_high, range_low, day):
+    return range_high - range_low <= 80, ""
+
+
+def _market_days(seed=1, num_days=120):
+    rng = np.random.default_rng(seed)
+    days = []
+    for i in range(num_days):
+        closes = 100 + np.cumsum(rng.normal(0, 6, 30))
+        candles = [{'close_price': float(c), 'low_price': float(c - abs(rng.normal(0, 3)))} for c in closes]
+        range_width = rng.uniform(10, 100)
+        days.append((date(2025, 1, 1).toordinal() + i, candles, candles, 100 + range_width / 2, 100 - range_width / 2))
+    return days
+
+
+def _single_direction(direction, market_days):
+    """逐方向回測的參考實作 (與 calculate_backtest_metrics 的 MDD 計算相同)"""
+    config = FakeConfig(direction)
+    cumulative = peak = mdd = 0.0
+    for day, session, trade, high, low in market_days:
+        if not fake_filter(config, high, low, day)[0]:
+            continue
+        pnl, _ = fake_run_logic(session, trade, config, high, low)
+        cumulative += pnl
+        peak = max(peak, cumulative)
+        mdd = max(mdd, peak - cumulative)
+    return -mdd, cumulative
+
+
+def test_single_pass_matches_per_direction_runs():
+    """測試一次評估的三方向結果與分別回測一致"""
+    print("🧪 測試單次評估分方向輸出")
+    market_days = _market_days()
+    configs = {direction: FakeConfig(direction) for direction in DIRECTIONS}
+    outputs = evaluate_all_directions(configs, market_days, fake_run_logic, fake_filter)
+
+    for direction in DIRECTIONS:
+        neg_mdd, total = _single_direction(direction, market_days)
+        assert abs(outputs[output_name(direction, 'neg_mdd')] - neg_mdd) < 1e-9
+        assert abs(outputs[output_name(direction, 'total_pnl')] - total) < 1e-9
+    print("✅ 單次評估分方向輸出正確")
+
+
+def test_cache_reuse_and_extension():
+    """測試快取命中與延伸樣本只評估新增列"""
+    print("🧪 測試Y向量快取")
+    evaluated = []
+
+    def evaluate_rows(rows):
+        evaluated.append(len(rows))
+        return [{'BOTH:neg_mdd': -float(row.sum()), 'BOTH:total_pnl': float(row[0])} for row in rows]
+
+    problem = {'num_vars': 2, 'names': ['a', 'b'], 'bounds': [[0, 1], [0, 1]]}
+    params = np.random.default_rng(0).random((40, 2))
+    version = data_fingerprint(_market_days(num_days=5), '08:46', '08:47')
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        store = YVectorStore(cache_dir)
+        key = store.make_key(problem, 7, version)
+
+        first = evaluate_with_cache(params[:24], evaluate_rows, store, key, checkpoint_rows=10)
+        assert evaluated == [10, 10, 4]
+
+        evaluated.clear()
+        again = evaluate_with_cache(params[:24], evaluate_rows, store, key)
+        assert evaluated == [] and np.array_equal(again['BOTH:neg_mdd'], first['BOTH:neg_mdd'])
+
+        extended = evaluate_with_cache(params, evaluate_rows, store, key)
+        assert evaluated == [16]
+        assert np.allclose(extended['BOTH:neg_mdd'], -params.sum(axis=1))
+
+        # 參數空間不同 → 不同快取鍵
+        other = dict(problem, bounds=[[0, 2], [0, 1]])
+        assert store.make_key(other, 7, version) != key
+    print("✅ Y向量快取正常")
+
+
+def test_data_fingerprint_covers_every_candle():
+    """測試盤中任一根K棒的高低點修正都會改變資料版本"""
+    print("🧪 測試資料版本指紋")
+    market_days = _market_days(num_days=3)
+    version = data_fingerprint(market_days, '08:46', '08:47')
+    assert data_fingerprint(_market_days(num_days=3), '08:46', '08:47') == version
+    assert data_fingerprint(market_days, '08:46', '08:48') != version
+
+    # 修正第2天盤中一根K棒的低點 (K棒數、區間與收盤價皆不變)
+    day, session, trade, high, low = market_days[1]
+    corrected = [dict(candle) for candle in session]
+    corrected[10]['low_price'] -= 5
+    market_days[1] = (day, corrected, corrected, high, low)
+    assert data_fingerprint(market_days, '08:46', '08:47') != version
+    print("✅ 資料版本指紋正常")
+
+
+def test_reusable_prefix_stops_at_first_difference():
+    """測試只沿用前段相同的列"""
+    print("🧪 測試快取前綴比對")
+    params = np.arange(12, dtype=float).reshape(6, 2)
+    changed = params.copy()
+    changed[3, 1] += 1
+    assert reusable_prefix(params, params[:4]) == 4
+    assert reusable_prefix(params, changed) == 3
+    assert reusable_prefix(params[:, :1], params) == 0
+    print("✅ 快取前綴比對正確")
+
+
+if __name__ == '__main__':
+    test_single_pass_matches_per_direction_runs()
+    test_cache_reuse_and_extension()
+    test_data_fingerprint_covers_every_candle()
+    test_reusable_prefix_stops_at_first_difference()
+    print("\n🎯 敏感度評估核心測試完成")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+圖表並行繪製與快取測試
+驗證衍生序列只計算一次、進程池繪製整套圖表，以及輸入相同時沿用快取、只重繪輸入有變動的圖表
+
+作者：量化分析團隊
+日期：2025-07-18
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import visualization
+from visualization import CHART_RENDERERS, StrategyVisualizer, build_chart_frame
+
+
+def _sample_data():
+    dates = pd.date_range('2024-11-04', periods=30, freq='B')
+    pnl = [(-1) ** i * (20 + i * 3) for i in range(30)]
+    daily_df = pd.DataFrame({
+        'trade_date': dates.strftime('%Y-%m-%d')[::-1],  # 亂序輸入
+        'total_pnl': pnl[::-1],
+        'direction': ['LONG' if i % 3 else 'SHORT' for i in range(30)][::-1],
+    })
+    events_df = pd.DataFrame({
+        'trade_date': [str(d.date()) for d in dates for _ in range(3)],
+        'timestamp': [f'{d.date()} 09:00:00' for d in dates for _ in range(3)],
+        'lot_number': [1, 2, 3] * 30,
+        'pnl': [15.0, 37.0, -20.0] * 30,
+    })
+    statistics = {'risk_metrics': {'max_drawdown': -0.12}}
+    return daily_df, events_df, statistics
+
+
+@mock.patch.dict(visualization.CHART_CONFIG, {'dpi': 40})
+def _run(charts_dir, daily_df, events_df, statistics, processes):
+    with mock.patch.object(visualization, 'CHARTS_DIR', Path(charts_dir)), \
+            mock.patch.object(visualization, 'CHART_CACHE_DIR', Path(charts_dir) / 'cache'):
+        visualizer = StrategyVisualizer(daily_df, events_df, statistics)
+        return visualizer, visualizer.create_all_charts(processes=processes)
+
+
+def test_chart_frame():
+    """測試共用衍生序列：依日期排序、累積損益、回撤、月份"""
+    print("🧪 測試共用衍生序列")
+    daily_df, _, _ = _sample_data()
+    frame = build_chart_frame(daily_df)
+    assert frame['trade_date'].is_monotonic_increasing and list(frame.index) == list(range(30))
+    assert frame['cumulative_pnl'].iloc[-1] == sum(daily_df['total_pnl'])
+    assert ((frame['cumulative_pnl'] - frame['cumulative_pnl'].cummax()) == frame['drawdown']).all()
+    assert (frame['drawdown_currency'] == frame['drawdown'] * 50).all()
+    assert list(frame['year_month'].unique()) == ['2024-11', '2024-12']
+    print("✅ 共用衍生序列正常")
+
+
+def test_parallel_render_and_cache():
+    """測試進程池繪製、相同輸入沿用快取、只重繪變動的圖表"""
+    print("🧪 測試並行繪製與快取")
+    daily_df, events_df, statistics = _sample_data()
+    with tempfile.TemporaryDirectory() as charts_dir:
+        visualizer, chart_files = _run(charts_dir, daily_df, events_df, statistics, processes=4)
+        assert visualizer.stats == {'rendered': 7, 'cached': 0}
+        for kind, (filename, _) in CHART_RENDERERS.items():
+            assert chart_files[kind] == os.path.join(charts_dir, filename) and os.path.getsize(chart_files[kind]) > 0
+        cache_files = sorted(os.listdir(os.path.join(charts_dir, 'cache')))
+        assert len(cache_files) == 7 and not any(name.endswith('.tmp.png') for name in cache_files)
+
+        # 相同輸入：全部沿用快取，輸出檔內容不變
+        with open(chart_files['equity_curve'], 'rb') as f:
+            equity_curve = f.read()
+        visualizer, chart_files = _run(charts_dir, daily_df.copy(), events_df.copy(), statistics, processes=4)
+        assert visualizer.stats == {'rendered': 0, 'cached': 7}
+        with open(chart_files['equity_curve'], 'rb') as f:
+            assert f.read() == equity_curve
+
+        # 只改口數損益：只重繪口數貢獻圖 (單一圖表在本進程繪製)
+        events_df.loc[events_df['lot_number'] == 3, 'pnl'] = 5.0
+        visualizer, _ = _run(charts_dir, daily_df, events_df, statistics, processes=4)
+        assert visualizer.stats == {'rendered': 1, 'cached': 6}
+        assert len(os.listdir(os.path.join(charts_dir, 'cache'))) == 8
+
+        # 統計數字只影響資金曲線圖
+        visualizer, _ = _run(charts_dir, daily_df, events_df, {'risk_metrics': {'max_drawdown': -0.2}}, processes=1)
+        assert visualizer.stats == {'rendered': 1, 'cached': 6}
+
+        # 沒有事件資料時不產生口數貢獻圖
+        visualizer, chart_files = _run(charts_dir, daily_df, events_df.iloc[0:0], statistics, processes=1)
+        assert chart_files['lot_contribution'] == "" and visualizer.stats['rendered'] == 0
+    print("✅ 並行繪製與快取正常")
+
+
+def test_save_figure_uses_per_process_temp_file():
+    """測試暫存檔名含進程ID，多個進程寫同一張圖時不會共用暫存檔"""
+    print("🧪 測試圖表暫存檔名")
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'daily_pnl.png')
+        with mock.patch.object(visualization.os, 'replace', wraps=os.replace) as replace:
+            visualization._save_figure(plt.figure(), path)
+        replace.assert_called_once_with(os.path.join(tmp, f'daily_pnl.{os.getpid()}.tmp.png'), path)
+        assert os.listdir(tmp) == ['daily_pnl.png']
+    print("✅ 圖表暫存檔名正常")
+
+
+if __name__ == "__main__":
+    test_chart_frame()
+    test_parallel_render_and_cache()
+    test_save_figure_uses_per_process_temp_file()
+    print("\n🎯 圖表並行繪製與快取測試完成")
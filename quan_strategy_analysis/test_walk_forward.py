@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+滾動前進優化測試
+驗證每日損益矩陣的增量評估與快取、視窗切分、矩陣績效指標與樣本外串接
+
+作者：量化分析團隊
+日期：2025-07-16
+"""
+
+import os
+import sys
+import tempfile
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from day_result_cache import DayResultStore, config_key, opening_range_key
+from walk_forward import (DailyPnLMatrix, build_windows, live_lot_rules, run_walk_forward, save_walk_forward_report,
+                          window_metrics)
+
+
+@dataclass
+class FakeConfig:
+    config_id: int
+    max_range: float = 1000.0
+
+
+def fake_run_logic(session, trade_candles, config, range_high, range_low, trade_log=None):
+    """第 i 根K棒的收盤價即為配置 i 當天的損益"""
+    pnl = session[config.config_id]['close_price']
+    return pnl, 'LONG' if pnl > 0 else 'SHORT'
+
+
+def fake_filter(config, range_high, range_low, day):
+    return range_high - range_low <= config.max_range, ""
+
+
+def _market_days(pnl_rows, start=date(2024, 1, 1), range_width=20.0):
+    """由 (配置 × 交易日) 損益建立假的每日資料"""
+    pnl_rows = np.asarray(pnl_rows, dtype=float)
+    days = []
+    for column in range(pnl_rows.shape[1]):
+        session = [{'close_price': float(pnl)} for pnl in pnl_rows[:, column]]
+        days.append((start + timedelta(days=column), session, [], 100 + range_width / 2, 100 - range_width / 2))
+    return days
+
+
+def _reference_metrics(pnl_list):
+    """與 calculate_backtest_metrics 相同的逐筆計算"""
+    cumulative = peak = mdd = 0.0
+    for pnl in pnl_list:
+        cumulative += pnl
+        peak = max(peak, cumulative)
+        mdd = max(mdd, peak - cumulative)
+    return cumulative, mdd
+
+
+def test_incremental_update_and_cache():
+    """測試只評估新增或變動的交易日，並可由每日結果快取接續"""
+    print("🧪 測試每日損益矩陣增量評估")
+    rng = np.random.default_rng(0)
+    pnl = rng.normal(0, 10, (4, 50)).round(1)
+    configs = [FakeConfig(i) for i in range(4)]
+    market_days = _market_days(pnl)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DayResultStore(os.path.join(tmp, 'day_results.sqlite'))
+        matrix = DailyPnLMatrix(configs, fake_run_logic, fake_filter)
+        assert matrix.update(market_days[:30], store=store, engine_version='v1') == 4 * 30
+        assert matrix.update(market_days, store=store, engine_version='v1') == 4 * 20   # 只評估新增的20天
+        assert matrix.update(market_days, store=store, engine_version='v1') == 0
+        assert np.allclose(matrix.pnl, pnl)
+
+        # 行情修正：只重算該日
+        changed = list(market_days)
+        day, session, trade, high, low = changed[10]
+        changed[10] = (day, [{'close_price': 99.0}] + session[1:], trade, high, low)
+        assert matrix.update(changed, store=store, engine_version='v1') == 4
+        assert matrix.pnl[0, 10] == 99.0
+
+        # 新的矩陣 (新增一組區間濾網配置)：舊配置全部由快取沿用，只有新配置需要評估
+        reloaded = DailyPnLMatrix(configs + [FakeConfig(1, max_range=10.0)], fake_run_logic, fake_filter)
+        assert reloaded.update(changed, store=store, engine_version='v1') == 50
+        assert np.allclose(reloaded.pnl[:4], matrix.pnl)
+        assert (reloaded.pnl[4] == 0).all()                # 區間寬度20 > 10，全部被濾掉
+
+        # 引擎版本不同時不沿用
+        assert DailyPnLMatrix(configs[:1], fake_run_logic, fake_filter).update(
+            changed, store=store, engine_version='v2') == 50
+    print("✅ 增量評估與快取正常")
+
+
+def test_cache_keys_match_run_backtest():
+    """測試矩陣與 run_backtest 使用相同的快取鍵：開盤區間與行情指紋不同時不沿用"""
+    print("🧪 測試快取鍵")
+    pnl = np.random.default_rng(2).normal(0, 10, (2, 20)).round(1)
+    market_days = _market_days(pnl)
+    configs = [FakeConfig(i) for i in range(2)]
+    extra = opening_range_key('8:46', '08:47')
+    assert extra == ('08:46', '08:47')
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DayResultStore(os.path.join(tmp, 'day_results.sqlite'))
+        day_hashes = {str(day[0]): f"h{column}" for column, day in enumerate(market_days)}
+        matrix = DailyPnLMatrix(configs, fake_run_logic, fake_filter, extra=extra)
+        matrix.update(market_days, store=store, engine_version='v1', day_hashes=day_hashes)
+        assert matrix.config_keys[0] == config_key(configs[0], '08:46', '08:47')
+        assert store.load(matrix.config_keys[0], 'v1')['2024-01-01'].data_hash == 'h0'
+
+        same = DailyPnLMatrix(configs, fake_run_logic, fake_filter, extra=opening_range_key('08:46', '08:47'))
+        assert same.update(market_days, store=store, engine_version='v1', day_hashes=day_hashes) == 0
+        assert np.allclose(same.pnl, pnl)
+
+        other_range = DailyPnLMatrix(configs, fake_run_logic, fake_filter, extra=opening_range_key('08:46', '08:48'))
+        assert other_range.update(market_days, store=store, engine_version='v1', day_hashes=day_hashes) == 2 * 20
+
+        # 行情指紋變動的交易日重算
+        revised = dict(day_hashes, **{'2024-01-06': 'revised'})
+        again = DailyPnLMatrix(configs, fake_run_logic, fake_filter, extra=extra)
+        assert again.update(market_days, store=store, engine_version='v1', day_hashes=revised) == 2
+    print("✅ 快取鍵正常")
+
+
+def test_parallel_update_matches_sequential():
+    """測試多進程評估與單進程結果一致"""
+    print("🧪 測試多進程評估")
+    pnl = np.random.default_rng(1).normal(0, 10, (6, 40))
+    configs = [FakeConfig(i) for i in range(6)]
+    sequential = DailyPnLMatrix(configs, fake_run_logic, fake_filter)
+    sequential.update(_market_days(pnl))
+    parallel = DailyPnLMatrix(configs, fake_run_logic, fake_filter)
+    parallel.update(_market_days(pnl), processes=2)
+    assert np.array_equal(sequential.pnl, parallel.pnl) and parallel.complete
+    print("✅ 多進程評估一致")
+
+
+def test_windows_and_metrics():
+    """測試視窗切分與矩陣指標"""
+    print("🧪 測試視窗與績效指標")
+    rolling = build_windows(100, 40, 25)
+    assert [(w.is_start, w.is_end, w.oos_start, w.oos_end) for w in rolling] == [
+        (0, 40, 40, 65), (25, 65, 65, 90), (50, 90, 90, 100)]
+    anchored = build_windows(100, 40, 25, anchored=True)
+    assert all(w.is_start == 0 for w in anchored) and anchored[-1].is_end == 90
+
+    pnl = np.random.default_rng(2).normal(1, 20, (5, 60)) * (np.random.default_rng(3).random((5, 60)) < 0.7)
+    metrics = window_metrics(pnl)
+    for row in range(5):
+        total, mdd = _reference_metrics(pnl[row])
+        assert abs(metrics['total_pnl'][row] - total) < 1e-9
+        assert abs(metrics['max_drawdown'][row] - mdd) < 1e-9
+        assert metrics['trades'][row] == np.count_nonzero(pnl[row])
+    print("✅ 視窗與績效指標正確")
+
+
+def test_walk_forward_tracks_regime_change():
+    """測試樣本內挑選、樣本外串接與參數穩定度"""
+    print("🧪 測試滾動前進")
+    rng = np.random.default_rng(4)
+    days = 200
+    pnl = rng.normal(0, 5, (3, days))
+    pnl[0, :100] += 8       # 前半段配置0最佳
+    pnl[1, 100:] += 8       # 後半段配置1最佳
+    configs = [FakeConfig(i) for i in range(3)]
+    params = [{'lot1_trigger': 15, 'lot1_trailing': 10, 'lot2_trigger': 40, 'lot2_trailing': 10,
+               'lot2_protection': 2.0, 'lot3_trigger': trigger, 'lot3_trailing': 20, 'lot3_protection': 2.0}
+              for trigger in (45, 50, 55)]
+
+    matrix = DailyPnLMatrix(configs, fake_run_logic, fake_filter, labels=['A', 'B', 'C'])
+    matrix.update(_market_days(pnl))
+    result = run_walk_forward(matrix, in_sample_days=40, out_of_sample_days=20,
+                              objective='total_pnl', min_trades=5, config_params=params)
+
+    selected = [row['selected'] for row in result['windows']]
+    assert selected[0] == 'A' and selected[-1] == 'B'
+    assert len(result['oos_daily_pnl']) == days - 40 == len(result['oos_days'])
+
+    # 串接的樣本外損益 = 各視窗挑中配置在該視窗的損益
+    expected = np.concatenate([pnl['ABC'.index(row['selected']), 40 + 20 * i:60 + 20 * i]
+                               for i, row in enumerate(result['windows'])])
+    assert np.allclose(result['oos_daily_pnl'], expected)
+    assert abs(result['oos_summary']['total_pnl'] - expected.sum()) < 1e-9
+
+    stability = result['stability']
+    assert stability['distinct_configs'] >= 2 and 0 < stability['switch_rate'] < 0.5
+    assert stability['parameters']['lot3_trigger']['std'] > 0
+    assert stability['parameters']['lot1_trigger']['std'] == 0
+    assert result['recommendation']['label'] == 'B'
+
+    rules = live_lot_rules(result['recommendation']['params'])
+    assert [rule['lot_id'] for rule in rules] == [1, 2, 3]
+    assert rules[0]['trailing_pullback'] == 0.1 and rules[0]['protective_stop_multiplier'] is None
+    assert rules[2]['trailing_activation'] == 50.0 and rules[2]['protective_stop_multiplier'] == 2.0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = save_walk_forward_report(result, tmp)
+        assert all(os.path.exists(path) for path in files.values())
+    print("✅ 滾動前進正常")
+
+
+if __name__ == "__main__":
+    test_incremental_update_and_cache()
+    test_cache_keys_match_run_backtest()
+    test_parallel_update_matches_sequential()
+    test_windows_and_metrics()
+    test_walk_forward_tracks_regime_change()
+    print("\n🎯 滾動前進優化測試完成")
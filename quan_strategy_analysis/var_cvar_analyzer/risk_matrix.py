@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+批次 VaR / CVaR 風險矩陣
+
+對 (配置數 × 交易日) 的每日損益矩陣一次計算所有配置的風險指標：
+1. 歷史模擬法 (historical) - 與 calculate_var / calculate_cvar 相同的百分位數定義
+2. 參數法 (parametric) - 常態分佈假設
+3. Cornish-Fisher 修正 (cornish_fisher) - 以偏態與峰態修正常態分位數
+4. 歷史法的 bootstrap 信賴區間
+
+各配置交易日數不同時以 NaN 補齊，NaN 視為無交易日，不列入計算。
+
+作者: 量化策略分析團隊
+日期: 2025-07-14
+"""
+
+from statistics import NormalDist
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+RISK_METHODS = ('historical', 'parametric', 'cornish_fisher')
+DEFAULT_CONFIDENCE_LEVELS = (0.90, 0.95, 0.99)
+
+# Cornish-Fisher CVaR 以尾部分位數平均近似的取樣點數
+_CF_TAIL_POINTS = 64
+
+_STANDARD_NORMAL = NormalDist()
+
+
+def build_pnl_matrix(pnl_lists: Sequence[Sequence]) -> np.ndarray:
+    """
+    將多個每日損益列表組成矩陣 (長度不足以 NaN 補齊)
+
+    Args:
+        pnl_lists: 每個配置的每日損益列表 (可為 Decimal)
+
+    Returns:
+        np.ndarray: (配置數 × 最長天數) 的 float 矩陣
+    """
+    max_days = max((len(pnls) for pnls in pnl_lists), default=0)
+    matrix = np.full((len(pnl_lists), max_days), np.nan)
+    for row, pnls in enumerate(pnl_lists):
+        matrix[row, :len(pnls)] = [float(pnl) for pnl in pnls]
+    return matrix
+
+
+def calculate_risk_matrix(pnl_matrix, confidence_levels: Sequence[float] = DEFAULT_CONFIDENCE_LEVELS,
+                          methods: Sequence[str] = RISK_METHODS, bootstrap_samples: int = 0,
+                          ci_level: float = 0.95, seed: Optional[int] = None,
+                          memory_budget_mb: float = 128.0) -> Dict:
+    """
+    一次計算所有配置、所有信心水準的 VaR / CVaR
+
+    Args:
+        pnl_matrix: (配置數 × 交易日) 每日損益矩陣，NaN 表示無交易
+        confidence_levels: 信心水準列表
+        methods: 計算方法 (historical / parametric / cornish_fisher)
+        bootstrap_samples: 歷史法 bootstrap 次數，0 表示不計算信賴區間
+        ci_level: 信賴區間水準
+        seed: bootstrap 亂數種子
+        memory_budget_mb: bootstrap 分塊記憶體上限
+
+    Returns:
+        dict:
+            - 'confidence_levels': 信心水準陣列
+            - '<method>': {'var': (配置數 × 信心水準), 'cvar': (配置數 × 信心水準)}
+            - 'historical_ci' (bootstrap_samples > 0): {'var_low', 'var_high', 'cvar_low', 'cvar_high'}
+            - 'stats': 各配置的天數、平均、標準差、偏態、超額峰態
+
+        沒有任何交易日的配置結果為 NaN。
+    """
+    pnl = _as_matrix(pnl_matrix)
+    levels = np.asarray(confidence_levels, dtype=np.float64)
+    unknown = set(methods) - set(RISK_METHODS)
+    if unknown:
+        raise ValueError(f"未知的風險計算方法: {sorted(unknown)}，可用: {RISK_METHODS}")
+
+    stats = _moments(pnl)
+    result = {'confidence_levels': levels, 'stats': stats}
+
+    if 'historical' in methods:
+        var, cvar = _historical_var_cvar(pnl, levels)
+        result['historical'] = {'var': var, 'cvar': cvar}
+
+    if 'parametric' in methods:
+        z = np.array([_STANDARD_NORMAL.inv_cdf(1 - c) for c in levels])
+        tail = np.array([_STANDARD_NORMAL.pdf(zi) / (1 - c) for zi, c in zip(z, levels)])
+        mean, std = stats['mean'][:, None], stats['std'][:, None]
+        result['parametric'] = {'var': mean + std * z, 'cvar': mean - std * tail}
+
+    if 'cornish_fisher' in methods:
+        result['cornish_fisher'] = _cornish_fisher_var_cvar(stats, levels)
+
+    if bootstrap_samples > 0:
+        result['historical_ci'] = _bootstrap_historical(pnl, levels, bootstrap_samples, ci_level,
+                                                        seed, memory_budget_mb)
+    return result
+
+
+def risk_rows(risk_result: Dict, labels: Optional[Sequence] = None) -> List[Dict]:
+    """
+    將風險矩陣展開為每個配置一列的字典 (可直接附加到參數掃描結果)
+
+    欄位名稱如 'historical_var_95'、'cornish_fisher_cvar_99'、'historical_var_95_ci_low'
+
+    Args:
+        risk_result: calculate_risk_matrix 的回傳值
+        labels: 各配置標籤 (加入 'label' 欄位)
+
+    Returns:
+        List[Dict]: 每個配置的風險欄位
+    """
+    levels = risk_result['confidence_levels']
+    num_configs = risk_result['stats']['days'].size
+    rows = [{} if labels is None else {'label': labels[i]} for i in range(num_configs)]
+
+    for method in RISK_METHODS:
+        if method not in risk_result:
+            continue
+        for measure in ('var', 'cvar'):
+            values = risk_result[method][measure]
+            for col, level in enumerate(levels):
+                key = f"{method}_{measure}_{_level_tag(level)}"
+                for row in range(num_configs):
+                    rows[row][key] = float(values[row, col])
+
+    ci = risk_result.get('historical_ci')
+    if ci:
+        for measure in ('var', 'cvar'):
+            for bound in ('low', 'high'):
+                values = ci[f'{measure}_{bound}']
+                for col, level in enumerate(levels):
+                    key = f"historical_{measure}_{_level_tag(level)}_ci_{bound}"
+                    for row in range(num_configs):
+                        rows[row][key] = float(values[row, col])
+    return rows
+
+
+# ==============================================================================
+# 內部計算
+# ==============================================================================
+
+def _as_matrix(pnl_matrix) -> np.ndarray:
+    pnl = np.asarray(pnl_matrix, dtype=np.float64)
+    if pnl.ndim == 1:
+        pnl = pnl[None, :]
+    if pnl.ndim != 2:
+        raise ValueError("每日損益矩陣必須為二維 (配置數 × 交易日)")
+    return pnl
+
+
+def _level_tag(level: float) -> str:
+    return f"{level * 100:g}".replace('.', '_')
+
+
+def _moments(pnl: np.ndarray) -> Dict[str, np.ndarray]:
+    """逐列計算天數、平均、標準差 (母體)、偏態與超額峰態 (忽略 NaN)"""
+    valid = ~np.isnan(pnl)
+    days = valid.sum(axis=1)
+    safe_days = np.maximum(days, 1)
+    filled = np.where(valid, pnl, 0.0)
+
+    mean = filled.sum(axis=1) / safe_days
+    centered = np.where(valid, pnl - mean[:, None], 0.0)
+    m2 = (centered ** 2).sum(axis=1) / safe_days
+    m3 = (centered ** 3).sum(axis=1) / safe_days
+    m4 = (centered ** 4).sum(axis=1) / safe_days
+    std = np.sqrt(m2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        skew = np.where(m2 > 0, m3 / m2 ** 1.5, 0.0)
+        kurt = np.where(m2 > 0, m4 / m2 ** 2 - 3.0, 0.0)
+
+    empty = days == 0
+    for values in (mean, std, skew, kurt):
+        values[empty] = np.nan
+    return {'days': days, 'mean': mean, 'std': std, 'skew': skew, 'excess_kurtosis': kurt}
+
+
+def _sorted_percentile(sorted_pnl: np.ndarray, days: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """
+    對已排序 (NaN 在後) 的矩陣計算線性內插百分位數，與 np.percentile 預設定義相同
+
+    Args:
+        sorted_pnl: (..., 天數) 已排序矩陣
+        days: (...) 每列有效天數
+        q: (信心水準數,) 分位 (0~1)
+
+    Returns:
+        np.ndarray: (..., 信心水準數)
+    """
+    position = (np.maximum(days, 1) - 1)[..., None] * q
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, np.maximum(days, 1)[..., None] - 1)
+    fraction = position - lower
+    low_values = np.take_along_axis(sorted_pnl, lower, axis=-1)
+    high_values = np.take_along_axis(sorted_pnl, upper, axis=-1)
+    values = low_values + (high_values - low_values) * fraction
+    values[days == 0] = np.nan
+    return values
+
+
+def _tail_mean(sorted_pnl: np.ndarray, days: np.ndarray, var: np.ndarray) -> np.ndarray:
+    """小於等於 VaR 的損益平均 (無極端損失時回傳 VaR，與 calculate_cvar 相同)"""
+    valid = np.arange(sorted_pnl.shape[-1]) < days[..., None]
+    values = np.where(valid, sorted_pnl, np.inf)[..., None, :]      # (..., 1, 天數)
+    in_tail = values <= var[..., :, None]                            # (..., 信心水準, 天數)
+    count = in_tail.sum(axis=-1)
+    total = np.where(in_tail, values, 0.0).sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(count > 0, total / np.maximum(count, 1), var)
+
+
+def _historical_var_cvar(pnl: np.ndarray, levels: np.ndarray):
+    sorted_pnl = np.sort(pnl, axis=-1)
+    days = (~np.isnan(pnl)).sum(axis=-1)
+    var = _sorted_percentile(sorted_pnl, days, 1 - levels)
+    return var, _tail_mean(sorted_pnl, days, var)
+
+
+def _cornish_fisher_z(z: np.ndarray, skew: np.ndarray, kurt: np.ndarray) -> np.ndarray:
+    """Cornish-Fisher 修正分位數 (z 與偏態/峰態可廣播)"""
+    return (z
+            + (z ** 2 - 1) * skew / 6
+            + (z ** 3 - 3 * z) * kurt / 24
+            - (2 * z ** 3 - 5 * z) * skew ** 2 / 36)
+
+
+def _cornish_fisher_var_cvar(stats: Dict, levels: np.ndarray) -> Dict[str, np.ndarray]:
+    mean, std = stats['mean'][:, None], stats['std'][:, None]
+    skew, kurt = stats['skew'][:, None, None], stats['excess_kurtosis'][:, None, None]
+
+    z = np.array([_STANDARD_NORMAL.inv_cdf(1 - c) for c in levels])
+    var = mean + std * _cornish_fisher_z(z[None, :, None], skew, kurt)[:, :, 0]
+
+    # CVaR = 尾部 (0, 1-c) 內修正分位數的平均，以中點取樣近似積分
+    midpoints = (np.arange(_CF_TAIL_POINTS) + 0.5) / _CF_TAIL_POINTS
+    tail_z = np.array([[_STANDARD_NORMAL.inv_cdf((1 - c) * u) for u in midpoints] for c in levels])
+    tail_quantiles = _cornish_fisher_z(tail_z[None, :, :], skew, kurt)
+    cvar = mean + std * tail_quantiles.mean(axis=-1)
+    return {'var': var, 'cvar': cvar}
+
+
+def _bootstrap_historical(pnl: np.ndarray, levels: np.ndarray, samples: int, ci_level: float,
+                          seed: Optional[int], memory_budget_mb: float) -> Dict[str, np.ndarray]:
+    """
+    歷史法 bootstrap 信賴區間
+
+    每個配置在自己的有效交易日內重複抽樣；所有配置共用同一組均勻亂數，
+    分塊處理以控制 (配置數 × 抽樣數 × 天數) 的記憶體用量。
+    """
+    rng = np.random.default_rng(seed)
+    num_configs, max_days = pnl.shape
+    days = (~np.isnan(pnl)).sum(axis=1)
+    compact = np.sort(pnl, axis=1)   # 有效值在前，iid 抽樣與順序無關
+
+    cell_bytes = 8 * 4 * len(levels)
+    chunk = max(1, int(memory_budget_mb * 1024 * 1024 // max(1, num_configs * max_days * cell_bytes)))
+
+    var_samples = np.empty((samples, num_configs, len(levels)))
+    cvar_samples = np.empty_like(var_samples)
+    rows = np.arange(num_configs)[:, None, None]
+    valid = np.arange(max_days) < days[:, None, None]
+
+    for start in range(0, samples, chunk):
+        size = min(chunk, samples - start)
+        uniform = rng.random((size, max_days))
+        index = (uniform[None, :, :] * days[:, None, None]).astype(np.int64)   # (配置, 抽樣, 天數)
+        resampled = np.where(valid, compact[rows, index], np.nan)
+        resampled.sort(axis=-1)
+
+        sample_days = np.broadcast_to(days[:, None], (num_configs, size))
+        var = _sorted_percentile(resampled, sample_days, 1 - levels)
+        cvar = _tail_mean(resampled, sample_days, var)
+        var_samples[start:start + size] = var.transpose(1, 0, 2)
+        cvar_samples[start:start + size] = cvar.transpose(1, 0, 2)
+
+    alpha = (1 - ci_level) / 2 * 100
+    with np.errstate(invalid='ignore'):
+        return {
+            'var_low': np.percentile(var_samples, alpha, axis=0),
+            'var_high': np.percentile(var_samples, 100 - alpha, axis=0),
+            'cvar_low': np.percentile(cvar_samples, alpha, axis=0),
+            'cvar_high': np.percentile(cvar_samples, 100 - alpha, axis=0),
+        }
@@ -383,25 +383,15 @@ def _run_multi_lot_logic(day_session_candles: list, trade_candles: list, config:
     return Decimal(sum(l['pnl'] for l in lots)) if lots else Decimal(0), position or ""
 
 # ==============================================================================
-# 4. 主回測函式
+# 4. 單日回測步驟 (run_backtest 與 run_backtest_batch 共用)
 # ==============================================================================
-def run_backtest(config: StrategyConfig, start_date: str | None = None, end_date: str | None = None, silent: bool = False,
-                 range_start_time: str | None = None, range_end_time: str | None = None):
+def _opening_range_times(range_start_time: str | None, range_end_time: str | None, silent: bool = True) -> tuple[list, time]:
     """
-    執行回測
-
-    Args:
-        config: 策略配置
-        start_date: 開始日期 (格式: 'YYYY-MM-DD')，可選
-        end_date: 結束日期 (格式: 'YYYY-MM-DD')，可選
-        silent: 是否靜默模式（不輸出日誌）
-        range_start_time: 開盤區間開始時間 (格式: 'HH:MM')，可選，預設08:46
-        range_end_time: 開盤區間結束時間 (格式: 'HH:MM')，可選，預設08:47
+    解析開盤區間時間
 
     Returns:
-        dict: 回測結果統計
+        tuple: (開盤區間兩根K棒的時間, 交易開始時間 = 開盤區間結束後1分鐘)；格式錯誤時使用預設 08:46 / 08:47
     """
-    # 處理自定義開盤區間時間
     range_start_hour, range_start_min = 8, 46  # 預設值
     range_end_hour, range_end_min = 8, 47      # 預設值
 
@@ -419,6 +409,95 @@ def run_backtest(config: StrategyConfig, start_date: str | None = None, end_date
             if not silent:
                 logger.warning(f"⚠️ 開盤區間結束時間格式錯誤: {range_end_time}，使用預設值 08:47")
 
+    trade_start_hour, trade_start_min = range_end_hour, range_end_min + 1
+    if trade_start_min >= 60:
+        trade_start_hour += 1
+        trade_start_min -= 60
+
+    range_times = [time(range_start_hour, range_start_min), time(range_end_hour, range_end_min)]
+    return range_times, time(trade_start_hour, trade_start_min)
+
+def _query_trade_days(cur, start_date: str | None = None, end_date: str | None = None) -> list:
+    """查詢時間區間內的交易日列表"""
+    base_query = "SELECT DISTINCT trade_datetime::date as trade_day FROM stock_prices"
+    conditions, params = [], []
+    if start_date:
+        conditions.append("trade_datetime::date >= %s")
+        params.append(start_date)
+    if end_date:
+        conditions.append("trade_datetime::date <= %s")
+        params.append(end_date)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    cur.execute(f"{base_query}{where} ORDER BY trade_day;", tuple(params))
+    return [row['trade_day'] for row in cur.fetchall()]
+
+def _load_trade_day(cur, day, range_times: list, trade_start: time, silent: bool = True) -> tuple | None:
+    """
+    讀取單一交易日的K棒並計算開盤區間
+
+    Returns:
+        tuple | None: (日盤K棒, 交易K棒, 區間高點, 區間低點)；K棒不足或找不到開盤區間時回傳 None
+    """
+    cur.execute("SELECT * FROM stock_prices WHERE trade_datetime::date = %s ORDER BY trade_datetime;", (day,))
+    day_session_candles = [c for c in cur.fetchall() if time(8, 45) <= c['trade_datetime'].time() <= time(13, 45)]
+    if len(day_session_candles) < 3:
+        return None
+
+    candles_range = [c for c in day_session_candles if c['trade_datetime'].time() in range_times]
+    if len(candles_range) != 2:
+        if not silent:
+            logger.warning(f"⚠️ {day}: 找不到開盤區間K棒 ({range_times[0]:%H:%M}-{range_times[1]:%H:%M})")
+        return None
+
+    range_high, range_low = max(c['high_price'] for c in candles_range), min(c['low_price'] for c in candles_range)
+    trade_candles = [c for c in day_session_candles if c['trade_datetime'].time() >= trade_start]
+    return day_session_candles, trade_candles, range_high, range_low
+
+def _evaluate_config_day(config: StrategyConfig, day, day_data: tuple, verbose: bool = True) -> tuple[bool, Decimal, str]:
+    """
+    對單一交易日套用區間濾網並執行多口交易邏輯
+
+    Returns:
+        tuple: (是否通過區間濾網, 當日損益, 交易方向)；被濾網跳過時損益為 0
+    """
+    day_session_candles, trade_candles, range_high, range_low = day_data
+
+    # === 套用區間過濾濾網 ===
+    range_passed, range_msg = apply_range_filter(config, range_high, range_low, day)
+    if not range_passed:
+        if verbose:
+            logger.info(f"--- {day} | 開盤區間: {range_low} - {range_high} | {range_msg} | 跳過交易 ---")
+        return False, Decimal(0), ""
+
+    if verbose:
+        logger.info(f"--- {day} | 開盤區間: {range_low} - {range_high} | {range_msg} ---")
+
+    # 🚀 【新邏輯】使用風控停損點方式，不再需要累積損益參數
+    day_pnl, trade_direction = _run_multi_lot_logic(day_session_candles, trade_candles, config, range_high, range_low)
+    return True, day_pnl, trade_direction
+
+# ==============================================================================
+# 5. 主回測函式
+# ==============================================================================
+def run_backtest(config: StrategyConfig, start_date: str | None = None, end_date: str | None = None, silent: bool = False,
+                 range_start_time: str | None = None, range_end_time: str | None = None):
+    """
+    執行回測
+
+    Args:
+        config: 策略配置
+        start_date: 開始日期 (格式: 'YYYY-MM-DD')，可選
+        end_date: 結束日期 (格式: 'YYYY-MM-DD')，可選
+        silent: 是否靜默模式（不輸出日誌）
+        range_start_time: 開盤區間開始時間 (格式: 'HH:MM')，可選，預設08:46
+        range_end_time: 開盤區間結束時間 (格式: 'HH:MM')，可選，預設08:47
+
+    Returns:
+        dict: 回測結果統計
+    """
+    # 處理自定義開盤區間時間
+    range_times, trade_start = _opening_range_times(range_start_time, range_end_time, silent)
+
     # 顯示時間區間資訊
     if not silent:
         if start_date or end_date:
@@ -426,7 +505,7 @@ def run_backtest(config: StrategyConfig, start_date: str | None = None, end_date
             logger.info(date_info)
 
         # 顯示開盤區間時間設定
-        range_time_info = f"🕐 開盤區間時間: {range_start_hour:02d}:{range_start_min:02d} 至 {range_end_hour:02d}:{range_end_min:02d}"
+        range_time_info = f"🕐 開盤區間時間: {range_times[0]:%H:%M} 至 {range_times[1]:%H:%M}"
         logger.info(range_time_info)
 
         logger.info(format_config_summary(config))
@@ -439,26 +518,7 @@ def run_backtest(config: StrategyConfig, start_date: str | None = None, end_date
             context_manager = shared.get_conn_cur_from_pool_b(as_dict=True)
 
         with context_manager as (conn, cur):
-            # 構建SQL查詢，根據時間區間過濾
-            base_query = "SELECT DISTINCT trade_datetime::date as trade_day FROM stock_prices"
-            conditions = []
-            params = []
-
-            if start_date:
-                conditions.append("trade_datetime::date >= %s")
-                params.append(start_date)
-
-            if end_date:
-                conditions.append("trade_datetime::date <= %s")
-                params.append(end_date)
-
-            if conditions:
-                query = f"{base_query} WHERE {' AND '.join(conditions)} ORDER BY trade_day;"
-            else:
-                query = f"{base_query} ORDER BY trade_day;"
-
-            cur.execute(query, tuple(params))
-            trade_days = [row['trade_day'] for row in cur.fetchall()]
+            trade_days = _query_trade_days(cur, start_date, end_date)
             logger.info(f"🔍 找到 {len(trade_days)} 個交易日進行回測。")
             total_pnl, winning_trades, losing_trades = Decimal(0), 0, 0
             cumulative_pnl = Decimal(0)  # 🚀 新增：追蹤累積損益
@@ -472,39 +532,11 @@ def run_backtest(config: StrategyConfig, start_date: str | None = None, end_date
             daily_pnl_list = []
 
             for day in trade_days:
-                cur.execute("SELECT * FROM stock_prices WHERE trade_datetime::date = %s ORDER BY trade_datetime;", (day,))
-                day_session_candles = [c for c in cur.fetchall() if time(8, 45) <= c['trade_datetime'].time() <= time(13, 45)]
-                if len(day_session_candles) < 3: continue
-
-                # 使用自定義的開盤區間時間
-                range_times = [time(range_start_hour, range_start_min), time(range_end_hour, range_end_min)]
-                candles_range = [c for c in day_session_candles if c['trade_datetime'].time() in range_times]
-                if len(candles_range) != 2:
-                    if not silent:
-                        logger.warning(f"⚠️ {day}: 找不到開盤區間K棒 ({range_start_hour:02d}:{range_start_min:02d}-{range_end_hour:02d}:{range_end_min:02d})")
-                    continue
-
-                range_high, range_low = max(c['high_price'] for c in candles_range), min(c['low_price'] for c in candles_range)
+                day_data = _load_trade_day(cur, day, range_times, trade_start, silent)
+                if day_data is None: continue
 
-                # === 套用區間過濾濾網 ===
-                range_passed, range_msg = apply_range_filter(config, range_high, range_low, day)
-                if not range_passed:
-                    logger.info(f"--- {day} | 開盤區間: {range_low} - {range_high} | {range_msg} | 跳過交易 ---")
-                    continue
-
-                logger.info(f"--- {day} | 開盤區間: {range_low} - {range_high} | {range_msg} ---")
-
-                # 交易開始時間設為開盤區間結束後1分鐘
-                trade_start_hour = range_end_hour
-                trade_start_min = range_end_min + 1
-                if trade_start_min >= 60:
-                    trade_start_hour += 1
-                    trade_start_min -= 60
-
-                trade_candles = [c for c in day_session_candles if c['trade_datetime'].time() >= time(trade_start_hour, trade_start_min)]
-
-                # 🚀 【新邏輯】使用風控停損點方式，不再需要累積損益參數
-                day_pnl, trade_direction = _run_multi_lot_logic(day_session_candles, trade_candles, config, range_high, range_low)
+                range_passed, day_pnl, trade_direction = _evaluate_config_day(config, day, day_data)
+                if not range_passed: continue
 
                 if day_pnl != 0:
                     is_long_trade = (trade_direction == 'LONG')
@@ -577,3 +609,51 @@ def run_backtest(config: StrategyConfig, start_date: str | None = None, end_date
             'win_rate': 0.0, 'long_win_rate': 0.0, 'short_win_rate': 0.0, 'trade_days': 0,
             'daily_pnl_list': []  # 🚀 【Task 1 新增】錯誤時回傳空列表
         }
+
+
+def run_backtest_batch(configs: list, start_date: str | None = None, end_date: str | None = None,
+                       silent: bool = True, range_start_time: str | None = None,
+                       range_end_time: str | None = None) -> dict:
+    """
+    批次回測：每個交易日的K棒只讀取一次，依序套用所有策略配置
+
+    Args:
+        configs: 策略配置列表
+        start_date / end_date / silent / range_start_time / range_end_time: 同 run_backtest
+
+    Returns:
+        dict:
+            - 'trade_days': 產生開盤區間的交易日列表
+            - 'daily_pnls': (配置數 × 交易日) 二維列表，無交易的日子為 None
+            - 'daily_pnl_lists': 各配置的每日損益列表 (與 run_backtest 的 daily_pnl_list 相同)
+    """
+    range_times, trade_start = _opening_range_times(range_start_time, range_end_time, silent)
+
+    if USE_SQLITE:
+        context_manager = sqlite_connection.get_conn_cur_from_sqlite_with_adapter(as_dict=True)
+    else:
+        context_manager = shared.get_conn_cur_from_pool_b(as_dict=True)
+
+    trade_days_used = []
+    daily_pnls = [[] for _ in configs]
+
+    with context_manager as (conn, cur):
+        trade_days = _query_trade_days(cur, start_date, end_date)
+        if not silent:
+            logger.info(f"🔍 找到 {len(trade_days)} 個交易日，批次回測 {len(configs)} 組配置。")
+
+        for day in trade_days:
+            day_data = _load_trade_day(cur, day, range_times, trade_start, silent)
+            if day_data is None:
+                continue
+
+            trade_days_used.append(day)
+            for index, config in enumerate(configs):
+                range_passed, day_pnl, _ = _evaluate_config_day(config, day, day_data, verbose=not silent)
+                daily_pnls[index].append(float(day_pnl) if range_passed and day_pnl != 0 else None)
+
+    return {
+        'trade_days': trade_days_used,
+        'daily_pnls': daily_pnls,
+        'daily_pnl_lists': [[pnl for pnl in row if pnl is not None] for row in daily_pnls],
+    }
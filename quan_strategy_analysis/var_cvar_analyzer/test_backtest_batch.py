@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+批次回測測試腳本
+
+驗證 run_backtest_batch 每組配置的每日損益與逐一執行 run_backtest 的結果一致
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from strategy_core import (LotRule, RangeFilter, StopLossType, StrategyConfig, run_backtest, run_backtest_batch,
+                           sqlite_connection)
+
+
+def _write_stock_prices(path, days):
+    """每個交易日 08:45-13:45 的一分K；開盤區間寬度逐日加大，之後依日期單數上漲、雙數下跌"""
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE stock_prices (trade_datetime TEXT PRIMARY KEY, open_price INTEGER, "
+                     "high_price INTEGER, low_price INTEGER, close_price INTEGER, price_change INTEGER, "
+                     "percentage_change REAL, volume INTEGER)")
+        rows = []
+        for offset in range(days):
+            start = datetime(2024, 11, 4, 8, 45) + timedelta(days=offset)
+            trend = 1 if offset % 2 == 0 else -1
+            for minute in range(301):
+                close = 20000 + (trend * (minute - 2) * (offset + 2) if minute > 2 else 0)
+                spread = 5 + offset * 5 if minute in (1, 2) else 5
+                rows.append(((start + timedelta(minutes=minute)).strftime('%Y-%m-%d %H:%M:%S'),
+                             close, close + spread, close - spread, close, 0, 0.0, 10))
+        conn.executemany("INSERT INTO stock_prices VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+def _configs():
+    """涵蓋移動停利、固定停利、區間濾網與固定點數停損的配置"""
+    trailing = LotRule(use_trailing_stop=True, trailing_activation=Decimal(15), trailing_pullback=Decimal('0.20'))
+    fixed_tp = LotRule(use_trailing_stop=False, fixed_tp_points=Decimal(30))
+    return [
+        StrategyConfig(trade_size_in_lots=2, lot_rules=[trailing, trailing]),
+        StrategyConfig(trade_size_in_lots=3, lot_rules=[fixed_tp, trailing, trailing],
+                       range_filter=RangeFilter(use_range_size_filter=True, max_range_points=Decimal(30))),
+        StrategyConfig(trade_size_in_lots=1, stop_loss_type=StopLossType.FIXED_POINTS, lot_rules=[fixed_tp]),
+    ]
+
+
+def test_batch_matches_single_config_backtests():
+    """測試批次回測與逐一 run_backtest 的每日損益完全相同"""
+    print("🧪 測試批次回測與單一配置回測一致")
+    configs = _configs()
+    period = ('2024-11-04', '2024-11-09')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'stock_data.sqlite')
+        _write_stock_prices(db_path, days=6)
+        with mock.patch.object(sqlite_connection, '_sqlite_connection', sqlite_connection.SQLiteConnection(db_path)):
+            batch = run_backtest_batch(configs, *period, silent=True)
+            singles = [run_backtest(config, *period, silent=True) for config in configs]
+
+    assert len(batch['trade_days']) == 6
+    for row, single in zip(batch['daily_pnls'], singles):
+        assert len(row) == len(batch['trade_days'])
+        assert sum(pnl is not None for pnl in row) == single['total_trades']
+    for pnl_list, single in zip(batch['daily_pnl_lists'], singles):
+        assert pnl_list == [float(pnl) for pnl in single['daily_pnl_list']]
+
+    # 區間濾網的配置在寬區間的交易日沒有交易
+    assert singles[1]['total_trades'] < singles[0]['total_trades'] == 6
+    assert batch['daily_pnls'][1][-1] is None
+    print("✅ 批次回測與單一配置回測一致")
+
+
+if __name__ == '__main__':
+    test_batch_matches_single_config_backtests()
+    print("\n🎯 批次回測測試完成")
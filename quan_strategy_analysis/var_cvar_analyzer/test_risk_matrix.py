@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+批次風險矩陣測試腳本
+
+驗證矩陣版 VaR/CVaR 與逐一計算的結果一致，以及參數法、Cornish-Fisher 與 bootstrap 信賴區間
+"""
+
+import numpy as np
+
+from risk_matrix import build_pnl_matrix, calculate_risk_matrix, risk_rows
+
+
+def _reference_var_cvar(pnl_list, confidence_level):
+    """與 var_cvar_analyzer.calculate_var / calculate_cvar 相同的定義"""
+    pnl_array = np.array([float(pnl) for pnl in pnl_list])
+    var_value = float(np.percentile(pnl_array, (1 - confidence_level) * 100))
+    extreme_losses = pnl_array[pnl_array <= var_value]
+    cvar_value = float(np.mean(extreme_losses)) if len(extreme_losses) else var_value
+    return var_value, cvar_value
+
+
+def test_historical_matches_single_config():
+    """測試歷史法與逐一計算一致 (含不同長度的配置)"""
+    print("🧪 測試歷史法矩陣計算")
+    rng = np.random.default_rng(42)
+    pnl_lists = [rng.normal(5, 20, n).tolist() for n in (250, 180, 37, 1)]
+    levels = (0.90, 0.95, 0.99)
+    risk = calculate_risk_matrix(build_pnl_matrix(pnl_lists), levels, methods=['historical'])
+
+    for row, pnl_list in enumerate(pnl_lists):
+        for col, level in enumerate(levels):
+            var_value, cvar_value = _reference_var_cvar(pnl_list, level)
+            assert abs(risk['historical']['var'][row, col] - var_value) < 1e-9
+            assert abs(risk['historical']['cvar'][row, col] - cvar_value) < 1e-9
+    assert list(risk['stats']['days']) == [250, 180, 37, 1]
+    print("✅ 歷史法矩陣計算正確")
+
+
+def test_parametric_and_cornish_fisher():
+    """測試常態資料下參數法與 Cornish-Fisher 接近理論值"""
+    print("🧪 測試參數法與Cornish-Fisher")
+    rng = np.random.default_rng(7)
+    normal = rng.normal(0, 10, 200000)
+    skewed = -rng.lognormal(0, 0.3, 200000)   # 左偏的損益 (中度偏態)
+    risk = calculate_risk_matrix(np.vstack([normal, skewed]), [0.95, 0.99])
+
+    # 常態: VaR95 ≈ -16.45σ/10，CVaR95 ≈ -20.63σ/10
+    assert abs(risk['parametric']['var'][0, 0] - (-16.45)) < 0.2
+    assert abs(risk['parametric']['cvar'][0, 0] - (-20.63)) < 0.2
+    assert abs(risk['cornish_fisher']['var'][0, 0] - risk['parametric']['var'][0, 0]) < 0.2
+
+    # 左偏: Cornish-Fisher 比參數法更接近歷史法的尾部
+    hist_var = risk['historical']['var'][1, 1]
+    cf_error = abs(risk['cornish_fisher']['var'][1, 1] - hist_var)
+    normal_error = abs(risk['parametric']['var'][1, 1] - hist_var)
+    assert cf_error < normal_error
+    assert (risk['cornish_fisher']['cvar'] <= risk['cornish_fisher']['var'] + 1e-9).all()
+    print("✅ 參數法與Cornish-Fisher正常")
+
+
+def test_bootstrap_interval_and_rows():
+    """測試 bootstrap 信賴區間涵蓋點估計，並展開為逐列欄位"""
+    print("🧪 測試bootstrap信賴區間")
+    rng = np.random.default_rng(3)
+    matrix = build_pnl_matrix([rng.normal(5, 20, 300), rng.normal(-2, 30, 120), []])
+    risk = calculate_risk_matrix(matrix, [0.95], bootstrap_samples=400, seed=1, memory_budget_mb=1)
+
+    ci = risk['historical_ci']
+    var = risk['historical']['var']
+    assert (ci['var_low'][:2] <= var[:2]).all() and (var[:2] <= ci['var_high'][:2]).all()
+    assert (ci['cvar_low'][:2] < ci['cvar_high'][:2]).all()
+    assert np.isnan(var[2]).all()
+
+    rows = risk_rows(risk, labels=['a', 'b', 'empty'])
+    assert rows[0]['label'] == 'a'
+    assert rows[1]['historical_var_95'] == float(var[1, 0])
+    assert 'historical_cvar_95_ci_high' in rows[0] and 'cornish_fisher_cvar_95' in rows[0]
+    print("✅ bootstrap信賴區間正常")
+
+
+if __name__ == '__main__':
+    test_historical_matches_single_config()
+    test_parametric_and_cornish_fisher()
+    test_bootstrap_interval_and_rows()
+    print("\n🎯 批次風險矩陣測試完成")
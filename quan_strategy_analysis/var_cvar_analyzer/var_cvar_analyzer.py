@@ -7,6 +7,7 @@ VaR (風險價值) 與 CVaR (條件風險價值) 分析器
 2. 計算 VaR (Value at Risk) - 風險價值
 3. 計算 CVaR (Conditional Value at Risk) - 條件風險價值
 4. 生成風險分析報告和視覺化圖表
+5. 批次回測多組配置，一次計算所有配置的風險矩陣 (risk_matrix)
 
 作者: 量化策略分析團隊
 日期: 2025-07-14
@@ -20,7 +21,9 @@ import os
 import sys
 
 # 導入策略核心模組
-from strategy_core import StrategyConfig, LotRule, StopLossType, RangeFilter, RiskConfig, StopLossConfig, run_backtest
+from strategy_core import (StrategyConfig, LotRule, StopLossType, RangeFilter, RiskConfig, StopLossConfig,
+                           run_backtest, run_backtest_batch)
+from risk_matrix import calculate_risk_matrix, risk_rows, DEFAULT_CONFIDENCE_LEVELS
 from decimal import Decimal
 
 # 設定中文字體
@@ -90,6 +93,57 @@ def get_historical_pnls(config: StrategyConfig, start_date: str = None, end_date
         raise
 
 
+def get_historical_pnl_matrix(configs: list, start_date: str = None, end_date: str = None, silent: bool = True,
+                              range_start_time: str = None, range_end_time: str = None):
+    """
+    以一次批次回測獲取多組配置的每日損益矩陣
+
+    Args:
+        configs (list): 策略配置列表
+        其餘參數同 get_historical_pnls
+
+    Returns:
+        tuple: (每日損益矩陣 (配置數 × 交易日，無交易為 NaN), 交易日列表)
+    """
+    print(f"🔄 正在批次回測 {len(configs)} 組配置...")
+    batch = run_backtest_batch(
+        configs=configs,
+        start_date=start_date,
+        end_date=end_date,
+        silent=silent,
+        range_start_time=range_start_time,
+        range_end_time=range_end_time
+    )
+    pnl_matrix = np.array([[np.nan if pnl is None else pnl for pnl in row] for row in batch['daily_pnls']],
+                          dtype=float).reshape(len(configs), len(batch['trade_days']))
+    print(f"✅ 成功獲取 {len(configs)} 組配置 × {len(batch['trade_days'])} 個交易日的損益矩陣")
+    return pnl_matrix, batch['trade_days']
+
+
+def analyze_configs_risk(configs: list, start_date: str = None, end_date: str = None, labels: list = None,
+                         confidence_levels=DEFAULT_CONFIDENCE_LEVELS, bootstrap_samples: int = 1000,
+                         range_start_time: str = None, range_end_time: str = None) -> list:
+    """
+    為參數掃描的每一組配置附加風險指標
+
+    Args:
+        configs (list): 策略配置列表
+        labels (list, optional): 各配置標籤
+        confidence_levels: 信心水準列表
+        bootstrap_samples (int): 歷史法 bootstrap 次數
+
+    Returns:
+        list: 每組配置一個字典，含各方法/信心水準的 VaR、CVaR 與信賴區間
+    """
+    pnl_matrix, _ = get_historical_pnl_matrix(configs, start_date, end_date,
+                                              range_start_time=range_start_time, range_end_time=range_end_time)
+    risk = calculate_risk_matrix(pnl_matrix, confidence_levels, bootstrap_samples=bootstrap_samples)
+    rows = risk_rows(risk, labels)
+    for row, days, mean, std in zip(rows, risk['stats']['days'], risk['stats']['mean'], risk['stats']['std']):
+        row.update({'total_days': int(days), 'mean_pnl': float(mean), 'std_pnl': float(std)})
+    return rows
+
+
 def calculate_var(pnl_list: list, confidence_level: float = 0.95) -> float:
     """
     計算風險價值 (Value at Risk, VaR)
@@ -347,38 +401,37 @@ def analyze_trading_direction_risk(base_config, start_date, end_date):
     print("\n🔍 正在分析不同交易方向的風險特徵...")
     print("-" * 60)
 
-    for direction in directions:
-        print(f"\n📊 分析 {direction} 策略...")
-
-        # 創建該方向的配置
-        direction_config = StrategyConfig(
+    # 三個方向共用同一次批次回測
+    direction_configs = [
+        StrategyConfig(
             trade_size_in_lots=base_config.trade_size_in_lots,
             stop_loss_type=base_config.stop_loss_type,
             trading_direction=direction,
             lot_rules=base_config.lot_rules,
             range_filter=base_config.range_filter
         )
+        for direction in directions
+    ]
+    pnl_matrix, _ = get_historical_pnl_matrix(
+        configs=direction_configs,
+        start_date=start_date,
+        end_date=end_date,
+        silent=True,
+        range_start_time="08:58",
+        range_end_time="09:02"
+    )
+    risk = calculate_risk_matrix(pnl_matrix, confidence_levels=[0.95], methods=['historical'])
+
+    for row, direction in enumerate(directions):
+        print(f"\n📊 分析 {direction} 策略...")
+        pnl_array = pnl_matrix[row][~np.isnan(pnl_matrix[row])]
 
-        # 獲取該方向的損益數據
-        daily_pnl_list = get_historical_pnls(
-            config=direction_config,
-            start_date=start_date,
-            end_date=end_date,
-            silent=True,
-            range_start_time="08:58",
-            range_end_time="09:02"
-        )
-
-        if daily_pnl_list:
-            # 計算風險指標
-            var_value = calculate_var(daily_pnl_list, 0.95)
-            cvar_value = calculate_cvar(daily_pnl_list, var_value)
-
-            # 基本統計
-            pnl_array = np.array([float(pnl) for pnl in daily_pnl_list])
+        if pnl_array.size:
+            var_value = float(risk['historical']['var'][row, 0])
+            cvar_value = float(risk['historical']['cvar'][row, 0])
 
             results[direction] = {
-                'daily_pnl_list': daily_pnl_list,
+                'daily_pnl_list': pnl_array.tolist(),
                 'var': var_value,
                 'cvar': cvar_value,
                 'mean_pnl': np.mean(pnl_array),
@@ -386,10 +439,10 @@ def analyze_trading_direction_risk(base_config, start_date, end_date):
                 'max_profit': np.max(pnl_array),
                 'max_loss': np.min(pnl_array),
                 'win_rate': np.sum(pnl_array > 0) / len(pnl_array) * 100,
-                'total_days': len(daily_pnl_list)
+                'total_days': len(pnl_array)
             }
 
-            print(f"   交易日數: {len(daily_pnl_list)}")
+            print(f"   交易日數: {len(pnl_array)}")
             print(f"   VaR (95%): {var_value:.1f} 點")
             print(f"   CVaR: {cvar_value:.1f} 點")
             print(f"   平均日損益: {np.mean(pnl_array):.1f} 點")
@@ -2,23 +2,37 @@
 """
 生成各種分析圖表
 包含每日損益、資金曲線、分布圖等
+
+⚡ 批次實驗每組結果都要產生整套圖表，繪圖是後處理的主要耗時：
+    - 衍生序列 (台幣損益、累積損益、回撤、月度、口數貢獻) 在建構時一次算好，各圖表共用
+    - 圖表以 (圖表種類, 繪圖版本, 圖表設定, 輸入資料) 的雜湊快取於 charts/cache/，輸入相同不重繪
+    - 需要重繪的圖表交給進程池 (Agg 後端) 並行繪製
 """
 
 import logging
+import multiprocessing
+import os
+import shutil
 import pandas as pd
 import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import seaborn as sns
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Callable, Dict, List, Tuple, Optional, Any
 from pathlib import Path
 
 from config import CHART_CONFIG, CHARTS_DIR, PROCESSED_DIR, OUTPUT_FILES, ANALYSIS_CONFIG
 from utils import format_number, ensure_directory_exists, format_currency, points_to_currency
+from report_assets import data_digest
+
+try:
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+except ImportError as e:
+    logging.warning(f"導入plotly失敗，互動式儀表板不可用: {e}")
+    go = make_subplots = None
 
 logger = logging.getLogger(__name__)
 
@@ -26,429 +40,517 @@ logger = logging.getLogger(__name__)
 plt.rcParams['font.family'] = 'DejaVu Sans'
 plt.rcParams['axes.unicode_minus'] = False
 
+# 繪圖程式變更時遞增，使舊的快取圖檔失效
+CHART_RENDER_VERSION = 1
+
+CHART_CACHE_DIR = CHARTS_DIR / "cache"
+
+# 快取圖檔上限 (依最後使用時間淘汰)
+CHART_CACHE_LIMIT = 2000
+
+# ==============================================================================
+# 圖表繪製 (模組層級函數，可在子進程執行)
+# ==============================================================================
+
+def _init_render_worker():
+    """繪圖子進程初始化：不開視窗的 Agg 後端與相同的樣式"""
+    matplotlib.use('Agg')
+    plt.style.use('default')
+    plt.rcParams['font.family'] = 'DejaVu Sans'
+    plt.rcParams['axes.unicode_minus'] = False
+    sns.set_palette(CHART_CONFIG['color_palette'])
+
+
+def _save_figure(fig, path: str):
+    """先寫暫存檔再置換，並行繪製或中斷時不會留下半張圖 (暫存檔名含進程ID，多個進程繪製同一張圖也不互相覆寫)"""
+    tmp_path = f"{os.path.splitext(path)[0]}.{os.getpid()}.tmp.png"
+    fig.savefig(tmp_path, dpi=CHART_CONFIG['dpi'], bbox_inches='tight')
+    plt.close(fig)
+    os.replace(tmp_path, path)
+
+
+def _render_daily_pnl(path: str, frame: pd.DataFrame):
+    """每日損益柱狀圖 + 累積損益曲線"""
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=CHART_CONFIG['figure_size'], height_ratios=[2, 1])
+
+    # 上圖：每日損益柱狀圖（轉換為台幣）
+    colors = ['green' if x > 0 else 'red' for x in frame['total_pnl']]
+    bars = ax1.bar(frame['trade_date'], frame['pnl_currency'], color=colors, alpha=0.7)
+
+    ax1.set_title('Daily P&L Analysis', fontsize=CHART_CONFIG['title_size'], fontweight='bold')
+    ax1.set_ylabel('P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
+    ax1.grid(True, alpha=0.3)
+    ax1.axhline(y=0, color='black', linestyle='-', alpha=0.5)
+
+    # 添加數值標籤（顯示台幣金額）
+    for bar, currency_value in zip(bars, frame['pnl_currency']):
+        height = bar.get_height()
+        ax1.text(bar.get_x() + bar.get_width()/2., height + (500 if height > 0 else -1500),
+                f'NT${currency_value:,.0f}', ha='center', va='bottom' if height > 0 else 'top', fontsize=8)
+
+    # 下圖：累積損益曲線（轉換為台幣）
+    ax2.plot(frame['trade_date'], frame['cumulative_currency'], marker='o', linewidth=2, markersize=4)
+    ax2.set_title('Cumulative P&L Curve', fontsize=CHART_CONFIG['font_size'])
+    ax2.set_ylabel('Cumulative P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
+    ax2.set_xlabel('Date', fontsize=CHART_CONFIG['font_size'])
+    ax2.grid(True, alpha=0.3)
+    ax2.axhline(y=0, color='black', linestyle='-', alpha=0.5)
+
+    # 格式化日期軸
+    for ax in [ax1, ax2]:
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
+        ax.xaxis.set_major_locator(mdates.DayLocator(interval=1))
+        plt.setp(ax.xaxis.get_majorticklabels(), rotation=45)
+
+    fig.tight_layout()
+    _save_figure(fig, path)
+
+
+def _render_equity_curve(path: str, frame: pd.DataFrame, max_dd: float):
+    """資金曲線 + 回撤區域"""
+    fig, ax = plt.subplots(figsize=CHART_CONFIG['figure_size'])
+
+    # 繪製資金曲線
+    equity_curve_currency = frame['cumulative_currency']
+    ax.plot(frame['trade_date'], equity_curve_currency, linewidth=2, label='Equity Curve', color='blue')
+
+    # 繪製回撤區域
+    ax.fill_between(frame['trade_date'], equity_curve_currency, equity_curve_currency + frame['drawdown_currency'],
+                   alpha=0.3, color='red', label='Drawdown Area')
+
+    ax.set_title('Equity Curve & Drawdown Analysis', fontsize=CHART_CONFIG['title_size'], fontweight='bold')
+    ax.set_ylabel('Cumulative P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
+    ax.set_xlabel('Date', fontsize=CHART_CONFIG['font_size'])
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+
+    # 添加統計資訊
+    total_return_currency = equity_curve_currency.iloc[-1] if len(frame) > 0 else 0
+
+    textstr = f'Total Return: NT${total_return_currency:,.0f}\nMax Drawdown: {max_dd:.2%}'
+    props = dict(boxstyle='round', facecolor='wheat', alpha=0.8)
+    ax.text(0.02, 0.98, textstr, transform=ax.transAxes, fontsize=10,
+            verticalalignment='top', bbox=props)
+
+    # 格式化日期軸
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
+    plt.setp(ax.xaxis.get_majorticklabels(), rotation=45)
+
+    fig.tight_layout()
+    _save_figure(fig, path)
+
+
+def _render_pnl_distribution(path: str, frame: pd.DataFrame):
+    """損益直方圖 + 盈虧盒鬚圖"""
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+
+    # 左圖：損益直方圖（轉換為台幣）
+    pnl_currency = frame['pnl_currency']
+    ax1.hist(pnl_currency, bins=10, alpha=0.7, color='skyblue', edgecolor='black')
+    mean_currency = pnl_currency.mean()
+    ax1.axvline(mean_currency, color='red', linestyle='--',
+               label=f'Mean: NT${mean_currency:,.0f}')
+    ax1.set_title('P&L Distribution Histogram', fontsize=CHART_CONFIG['title_size'])
+    ax1.set_xlabel('P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
+    ax1.set_ylabel('Frequency', fontsize=CHART_CONFIG['font_size'])
+    ax1.grid(True, alpha=0.3)
+    ax1.legend()
+
+    # 右圖：盒鬚圖（轉換為台幣）
+    box_data = [
+        pnl_currency[frame['total_pnl'] > 0].dropna(),
+        pnl_currency[frame['total_pnl'] < 0].dropna()
+    ]
+    labels = ['Winning Trades', 'Losing Trades']
+
+    bp = ax2.boxplot(box_data, patch_artist=True)
+    ax2.set_xticks([1, 2], labels)
+    bp['boxes'][0].set_facecolor('lightgreen')
+    bp['boxes'][1].set_facecolor('lightcoral')
+
+    ax2.set_title('Win/Loss Distribution', fontsize=CHART_CONFIG['title_size'])
+    ax2.set_ylabel('P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
+    ax2.grid(True, alpha=0.3)
+
+    fig.tight_layout()
+    _save_figure(fig, path)
+
+
+def _render_lot_contribution(path: str, lot_pnl: pd.DataFrame):
+    """各口數損益貢獻柱狀圖 + 獲利口數圓餅圖"""
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+
+    # 左圖：口數貢獻柱狀圖（轉換為台幣）
+    lot_labels = [f'Lot {int(i)}' for i in lot_pnl['lot_number']]
+    colors = ['green' if x > 0 else 'red' for x in lot_pnl['pnl']]
+    bars = ax1.bar(lot_labels, lot_pnl['pnl_currency'].values, color=colors, alpha=0.7)
+
+    ax1.set_title('P&L Contribution by Lot', fontsize=CHART_CONFIG['title_size'])
+    ax1.set_ylabel('P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
+    ax1.grid(True, alpha=0.3)
+    ax1.axhline(y=0, color='black', linestyle='-', alpha=0.5)
+
+    # 添加數值標籤
+    for bar, value in zip(bars, lot_pnl['pnl_currency'].values):
+        height = bar.get_height()
+        ax1.text(bar.get_x() + bar.get_width()/2., height + (500 if height > 0 else -1500),
+                f'NT${int(value):,}', ha='center', va='bottom' if height > 0 else 'top')
+
+    # 右圖：口數貢獻圓餅圖（只顯示正值）
+    positive_lot_pnl = lot_pnl[lot_pnl['pnl'] > 0]
+    if not positive_lot_pnl.empty:
+        ax2.pie(positive_lot_pnl['pnl'].values, labels=[f'Lot {int(i)}' for i in positive_lot_pnl['lot_number']],
+               autopct='%1.1f%%', startangle=90)
+        ax2.set_title('Profitable Lots Contribution', fontsize=CHART_CONFIG['title_size'])
+
+    fig.tight_layout()
+    _save_figure(fig, path)
+
+
+def _render_monthly_performance(path: str, monthly_pnl: pd.DataFrame):
+    """月度損益柱狀圖"""
+    fig, ax = plt.subplots(figsize=CHART_CONFIG['figure_size'])
+
+    colors = ['green' if x > 0 else 'red' for x in monthly_pnl['total_pnl']]
+    bars = ax.bar(range(len(monthly_pnl)), monthly_pnl['pnl_currency'].values, color=colors, alpha=0.7)
+
+    ax.set_title('Monthly Performance Analysis', fontsize=CHART_CONFIG['title_size'], fontweight='bold')
+    ax.set_ylabel('Monthly P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
+    ax.set_xlabel('Month', fontsize=CHART_CONFIG['font_size'])
+    ax.set_xticks(range(len(monthly_pnl)))
+    ax.set_xticklabels(list(monthly_pnl['year_month']), rotation=45)
+    ax.grid(True, alpha=0.3)
+    ax.axhline(y=0, color='black', linestyle='-', alpha=0.5)
+
+    # 添加數值標籤
+    for bar, value in zip(bars, monthly_pnl['pnl_currency'].values):
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + (500 if height > 0 else -1500),
+                f'NT${int(value):,}', ha='center', va='bottom' if height > 0 else 'top')
+
+    fig.tight_layout()
+    _save_figure(fig, path)
+
+
+def _render_drawdown_analysis(path: str, frame: pd.DataFrame):
+    """回撤百分比曲線並標記最大回撤點"""
+    drawdown_pct = frame['drawdown_pct']
+
+    fig, ax = plt.subplots(figsize=CHART_CONFIG['figure_size'])
+
+    ax.fill_between(frame['trade_date'], 0, drawdown_pct,
+                   alpha=0.7, color='red', label='Drawdown %')
+    ax.plot(frame['trade_date'], drawdown_pct, color='darkred', linewidth=1)
+
+    ax.set_title('Drawdown Analysis', fontsize=CHART_CONFIG['title_size'], fontweight='bold')
+    ax.set_ylabel('Drawdown (%)', fontsize=CHART_CONFIG['font_size'])
+    ax.set_xlabel('Date', fontsize=CHART_CONFIG['font_size'])
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+
+    # 標記最大回撤點
+    max_dd_idx = drawdown_pct.idxmin()
+    max_dd_value = drawdown_pct.min()
+    ax.annotate(f'Max DD: {max_dd_value:.1f}%',
+               xy=(frame.loc[max_dd_idx, 'trade_date'], max_dd_value),
+               xytext=(10, 10), textcoords='offset points',
+               bbox=dict(boxstyle='round,pad=0.3', facecolor='yellow', alpha=0.7),
+               arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0'))
+
+    # 格式化日期軸
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
+    plt.setp(ax.xaxis.get_majorticklabels(), rotation=45)
+
+    fig.tight_layout()
+    _save_figure(fig, path)
+
+
+def _render_direction_analysis(path: str, frame: pd.DataFrame):
+    """多空總損益、平均損益、交易次數與勝率比較"""
+    # 統計多空交易
+    direction_stats = frame.groupby('direction').agg({
+        'total_pnl': ['sum', 'mean', 'count']
+    }).round(2)
+
+    direction_stats.columns = ['總損益', '平均損益', '交易次數']
+    direction_stats = direction_stats.reset_index()
+
+    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 10))
+
+    # 左上：多空總損益比較（轉換為台幣）
+    total_pnl_currency = direction_stats['總損益'] * ANALYSIS_CONFIG['point_value']
+    bars1 = ax1.bar(direction_stats['direction'], total_pnl_currency,
+                   color=['green', 'red'], alpha=0.7)
+    ax1.set_title('Long vs Short Total P&L', fontsize=CHART_CONFIG['font_size'])
+    ax1.set_ylabel('Total P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
+    ax1.grid(True, alpha=0.3)
+
+    for bar, value in zip(bars1, direction_stats['總損益']):
+        height = bar.get_height()
+        ax1.text(bar.get_x() + bar.get_width()/2., height + (5 if height > 0 else -15),
+                f'{value}', ha='center', va='bottom' if height > 0 else 'top')
+
+    # 右上：多空平均損益比較（轉換為台幣）
+    avg_pnl_currency = direction_stats['平均損益'] * ANALYSIS_CONFIG['point_value']
+    bars2 = ax2.bar(direction_stats['direction'], avg_pnl_currency,
+                   color=['green', 'red'], alpha=0.7)
+    ax2.set_title('Long vs Short Average P&L', fontsize=CHART_CONFIG['font_size'])
+    ax2.set_ylabel('Average P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
+    ax2.grid(True, alpha=0.3)
+
+    for bar, value in zip(bars2, direction_stats['平均損益']):
+        height = bar.get_height()
+        ax2.text(bar.get_x() + bar.get_width()/2., height + (2 if height > 0 else -5),
+                f'{value}', ha='center', va='bottom' if height > 0 else 'top')
+
+    # 左下：多空交易次數比較
+    wedges, texts, autotexts = ax3.pie(direction_stats['交易次數'], labels=direction_stats['direction'],
+                                      autopct='%1.1f%%', colors=['green', 'red'])
+    for wedge in wedges:
+        wedge.set_alpha(0.7)
+    ax3.set_title('Long vs Short Trade Count', fontsize=CHART_CONFIG['font_size'])
+
+    # 右下：多空勝率比較
+    win_rates = (frame['total_pnl'] > 0).groupby(frame['direction']).mean() * 100
+    win_rates = [win_rates[direction] for direction in direction_stats['direction']]
+
+    bars4 = ax4.bar(direction_stats['direction'], win_rates,
+                   color=['green', 'red'], alpha=0.7)
+    ax4.set_title('Long vs Short Win Rate', fontsize=CHART_CONFIG['font_size'])
+    ax4.set_ylabel('Win Rate (%)', fontsize=CHART_CONFIG['font_size'])
+    ax4.set_ylim(0, 100)
+    ax4.grid(True, alpha=0.3)
+
+    for bar, value in zip(bars4, win_rates):
+        height = bar.get_height()
+        ax4.text(bar.get_x() + bar.get_width()/2., height + 2,
+                f'{value:.1f}%', ha='center', va='bottom')
+
+    fig.tight_layout()
+    _save_figure(fig, path)
+
+
+# 圖表種類 → (輸出檔名, 繪圖函數)
+CHART_RENDERERS: Dict[str, Tuple[str, Callable]] = {
+    'daily_pnl': ('daily_pnl_analysis.png', _render_daily_pnl),
+    'equity_curve': ('equity_curve.png', _render_equity_curve),
+    'pnl_distribution': ('pnl_distribution.png', _render_pnl_distribution),
+    'lot_contribution': ('lot_contribution.png', _render_lot_contribution),
+    'monthly_performance': ('monthly_performance.png', _render_monthly_performance),
+    'drawdown_analysis': ('drawdown_analysis.png', _render_drawdown_analysis),
+    'direction_analysis': ('direction_analysis.png', _render_direction_analysis),
+}
+
+
+def _render_chart(kind: str, path: str, args: tuple) -> str:
+    CHART_RENDERERS[kind][1](path, *args)
+    return path
+
+
+def _render_chart_in_worker(task) -> str:
+    return _render_chart(*task)
+
+
+def _cache_path(kind: str, args: tuple, extension: str = 'png') -> Path:
+    """圖表輸入相同 (含繪圖版本與圖表設定) 時對應到同一個快取檔"""
+    digest = data_digest(kind, CHART_RENDER_VERSION, CHART_CONFIG, ANALYSIS_CONFIG['point_value'], *args)
+    return CHART_CACHE_DIR / f"{kind}_{digest}.{extension}"
+
+
+def _prune_chart_cache(limit: int = CHART_CACHE_LIMIT):
+    """快取圖檔超過上限時，刪除最久未使用的檔案"""
+    entries = list(CHART_CACHE_DIR.glob('*.*'))
+    if len(entries) <= limit:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:len(entries) - limit]:
+        entry.unlink(missing_ok=True)
+
+
+def build_chart_frame(daily_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    各圖表共用的衍生序列，只計算一次
+
+    Returns:
+        pd.DataFrame: 依日期排序，含 total_pnl、pnl_currency、cumulative_pnl、cumulative_currency、
+                      drawdown、drawdown_currency、drawdown_pct 與 year_month 欄位
+    """
+    frame = daily_df.copy()
+    frame['trade_date'] = pd.to_datetime(frame['trade_date'])
+    frame = frame.sort_values('trade_date').reset_index(drop=True)
+
+    point_value = ANALYSIS_CONFIG['point_value']
+    frame['pnl_currency'] = frame['total_pnl'] * point_value
+    frame['cumulative_pnl'] = frame['total_pnl'].cumsum()
+    frame['cumulative_currency'] = frame['cumulative_pnl'] * point_value
+    peak = frame['cumulative_pnl'].expanding().max()
+    frame['drawdown'] = frame['cumulative_pnl'] - peak
+    frame['drawdown_currency'] = frame['drawdown'] * point_value
+    frame['drawdown_pct'] = frame['drawdown'] / peak * 100
+    frame['year_month'] = frame['trade_date'].dt.to_period('M').astype(str)
+    return frame
+
+
 class StrategyVisualizer:
     """策略視覺化工具"""
-    
+
     def __init__(self, daily_df: pd.DataFrame, events_df: pd.DataFrame, statistics: Dict[str, Any]):
         self.daily_df = daily_df.copy()
         self.events_df = events_df.copy()
         self.statistics = statistics
-        
-        # 確保日期格式正確
+
+        # 確保日期格式正確，並一次算好各圖表共用的衍生序列
         if not self.daily_df.empty:
-            self.daily_df['trade_date'] = pd.to_datetime(self.daily_df['trade_date'])
-            self.daily_df = self.daily_df.sort_values('trade_date')
-            
+            self.daily_df = build_chart_frame(self.daily_df)
+
         if not self.events_df.empty:
             self.events_df['trade_date'] = pd.to_datetime(self.events_df['trade_date'])
             self.events_df['timestamp'] = pd.to_datetime(self.events_df['timestamp'])
-        
+
+        self.lot_pnl = self._calculate_lot_pnl()
+        self.monthly_pnl = self._calculate_monthly_pnl()
+
         # 設定圖表樣式
         plt.style.use('default')
         sns.set_palette(CHART_CONFIG['color_palette'])
-        
+
         # 確保輸出目錄存在
         ensure_directory_exists(CHARTS_DIR)
-    
-    def create_all_charts(self) -> Dict[str, str]:
-        """生成所有圖表"""
+        ensure_directory_exists(CHART_CACHE_DIR)
+
+        # 本次繪製/沿用快取的圖表數
+        self.stats = {'rendered': 0, 'cached': 0}
+
+    def create_all_charts(self, processes: Optional[int] = None) -> Dict[str, str]:
+        """
+        生成所有圖表
+
+        Args:
+            processes: 並行繪圖的進程數 (預設為 CPU 數，1 表示在本進程依序繪製)
+        """
         logger.info("開始生成圖表...")
-        
-        chart_files = {}
-        
-        # 每日損益圖表
-        chart_files['daily_pnl'] = self.create_daily_pnl_chart()
-        
-        # 資金曲線圖
-        chart_files['equity_curve'] = self.create_equity_curve_chart()
-        
-        # 損益分布圖
-        chart_files['pnl_distribution'] = self.create_pnl_distribution_chart()
-        
-        # 口數貢獻圖
-        chart_files['lot_contribution'] = self.create_lot_contribution_chart()
-        
-        # 月度績效圖
-        chart_files['monthly_performance'] = self.create_monthly_performance_chart()
-        
-        # 回撤分析圖
-        chart_files['drawdown_analysis'] = self.create_drawdown_analysis_chart()
-        
-        # 交易方向分析圖
-        chart_files['direction_analysis'] = self.create_direction_analysis_chart()
-        
+
+        jobs = self._chart_jobs()
+        chart_files = {kind: "" for kind in CHART_RENDERERS}
+        pending = []
+        for kind, args in jobs.items():
+            cache_path = _cache_path(kind, args)
+            if cache_path.exists():
+                os.utime(cache_path)
+                chart_files[kind] = self._publish(kind, cache_path)
+                self.stats['cached'] += 1
+            else:
+                pending.append((kind, str(cache_path), args))
+
+        if processes is None:
+            processes = os.cpu_count() or 1
+        # 已在進程池子進程 (daemon) 中執行時不能再開子進程
+        if multiprocessing.current_process().daemon:
+            processes = 1
+        processes = min(processes, len(pending))
+
+        # 繪圖函數都在模組層級，fork/spawn 皆可；子進程固定使用 Agg 後端
+        if processes > 1:
+            method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+            context = multiprocessing.get_context(method)
+            with context.Pool(processes, initializer=_init_render_worker) as pool:
+                rendered = pool.map(_render_chart_in_worker, pending)
+        else:
+            rendered = [_render_chart(*task) for task in pending]
+
+        for (kind, _, _), cache_path in zip(pending, rendered):
+            chart_files[kind] = self._publish(kind, Path(cache_path))
+        self.stats['rendered'] += len(pending)
+
         # 互動式儀表板
         chart_files['interactive_dashboard'] = self.create_interactive_dashboard()
-        
-        logger.info(f"圖表生成完成，共生成 {len(chart_files)} 個圖表")
+
+        _prune_chart_cache()
+
+        logger.info(f"圖表生成完成，共生成 {len(chart_files)} 個圖表 "
+                    f"(繪製 {len(pending)} 個，沿用快取 {len(jobs) - len(pending)} 個)")
         return chart_files
-    
-    def create_daily_pnl_chart(self) -> str:
-        """創建每日損益圖表"""
-        if self.daily_df.empty:
+
+    def _chart_jobs(self) -> Dict[str, tuple]:
+        """各圖表的繪圖參數 (只傳入該圖表用到的欄位，作為快取雜湊的輸入)；無資料的圖表不列入"""
+        jobs = {}
+        if not self.daily_df.empty:
+            frame = self.daily_df
+            max_dd = self.statistics.get('risk_metrics', {}).get('max_drawdown', 0)
+            jobs['daily_pnl'] = (frame[['trade_date', 'total_pnl', 'pnl_currency', 'cumulative_currency']],)
+            jobs['equity_curve'] = (frame[['trade_date', 'cumulative_currency', 'drawdown_currency']], max_dd)
+            jobs['pnl_distribution'] = (frame[['total_pnl', 'pnl_currency']],)
+        if not self.lot_pnl.empty:
+            jobs['lot_contribution'] = (self.lot_pnl,)
+        if not self.monthly_pnl.empty:
+            jobs['monthly_performance'] = (self.monthly_pnl,)
+        if not self.daily_df.empty:
+            jobs['drawdown_analysis'] = (self.daily_df[['trade_date', 'drawdown_pct']],)
+            jobs['direction_analysis'] = (self.daily_df[['direction', 'total_pnl']],)
+        return jobs
+
+    def _render(self, kind: str) -> str:
+        """在本進程繪製單一圖表 (輸入相同時沿用快取)"""
+        args = self._chart_jobs().get(kind)
+        if args is None:
             return ""
-        
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=CHART_CONFIG['figure_size'], height_ratios=[2, 1])
-        
-        # 上圖：每日損益柱狀圖（轉換為台幣）
-        daily_pnl_currency = self.daily_df['total_pnl'] * ANALYSIS_CONFIG['point_value']
-        colors = ['green' if x > 0 else 'red' for x in self.daily_df['total_pnl']]
-        bars = ax1.bar(self.daily_df['trade_date'], daily_pnl_currency, color=colors, alpha=0.7)
-
-        ax1.set_title('Daily P&L Analysis', fontsize=CHART_CONFIG['title_size'], fontweight='bold')
-        ax1.set_ylabel('P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
-        ax1.grid(True, alpha=0.3)
-        ax1.axhline(y=0, color='black', linestyle='-', alpha=0.5)
-
-        # 添加數值標籤（顯示台幣金額）
-        for bar, currency_value in zip(bars, daily_pnl_currency):
-            height = bar.get_height()
-            ax1.text(bar.get_x() + bar.get_width()/2., height + (500 if height > 0 else -1500),
-                    f'NT${currency_value:,.0f}', ha='center', va='bottom' if height > 0 else 'top', fontsize=8)
-        
-        # 下圖：累積損益曲線（轉換為台幣）
-        cumulative_pnl = self.daily_df['total_pnl'].cumsum()
-        cumulative_pnl_currency = cumulative_pnl * ANALYSIS_CONFIG['point_value']
-        ax2.plot(self.daily_df['trade_date'], cumulative_pnl_currency, marker='o', linewidth=2, markersize=4)
-        ax2.set_title('Cumulative P&L Curve', fontsize=CHART_CONFIG['font_size'])
-        ax2.set_ylabel('Cumulative P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
-        ax2.set_xlabel('Date', fontsize=CHART_CONFIG['font_size'])
-        ax2.grid(True, alpha=0.3)
-        ax2.axhline(y=0, color='black', linestyle='-', alpha=0.5)
-        
-        # 格式化日期軸
-        for ax in [ax1, ax2]:
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
-            ax.xaxis.set_major_locator(mdates.DayLocator(interval=1))
-            plt.setp(ax.xaxis.get_majorticklabels(), rotation=45)
-        
-        plt.tight_layout()
-        
-        # 儲存圖表
-        filename = 'daily_pnl_analysis.png'
-        filepath = CHARTS_DIR / filename
-        plt.savefig(filepath, dpi=CHART_CONFIG['dpi'], bbox_inches='tight')
-        plt.close()
-
-        logger.info(f"Daily P&L chart saved: {filepath}")
+        cache_path = _cache_path(kind, args)
+        if cache_path.exists():
+            os.utime(cache_path)
+            self.stats['cached'] += 1
+        else:
+            _render_chart(kind, str(cache_path), args)
+            self.stats['rendered'] += 1
+        return self._publish(kind, cache_path)
+
+    def _publish(self, kind: str, cache_path: Path) -> str:
+        """把快取圖檔複製到 charts/ 下的固定檔名 (報告與既有流程都以此路徑讀取)"""
+        filepath = CHARTS_DIR / CHART_RENDERERS[kind][0]
+        shutil.copyfile(cache_path, filepath)
+        logger.info(f"{kind} chart saved: {filepath}")
         return str(filepath)
-    
+
+    def create_daily_pnl_chart(self) -> str:
+        """創建每日損益圖表"""
+        return self._render('daily_pnl')
+
     def create_equity_curve_chart(self) -> str:
         """創建資金曲線圖"""
-        if self.daily_df.empty:
-            return ""
-        
-        fig, ax = plt.subplots(figsize=CHART_CONFIG['figure_size'])
-        
-        # 計算資金曲線（轉換為台幣）
-        equity_curve = self.daily_df['total_pnl'].cumsum()
-        equity_curve_currency = equity_curve * ANALYSIS_CONFIG['point_value']
-        drawdown = self._calculate_drawdown_series(equity_curve)
-        drawdown_currency = drawdown * ANALYSIS_CONFIG['point_value']
-
-        # 繪製資金曲線
-        ax.plot(self.daily_df['trade_date'], equity_curve_currency, linewidth=2, label='Equity Curve', color='blue')
-
-        # 繪製回撤區域
-        ax.fill_between(self.daily_df['trade_date'], equity_curve_currency, equity_curve_currency + drawdown_currency,
-                       alpha=0.3, color='red', label='Drawdown Area')
-
-        ax.set_title('Equity Curve & Drawdown Analysis', fontsize=CHART_CONFIG['title_size'], fontweight='bold')
-        ax.set_ylabel('Cumulative P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
-        ax.set_xlabel('Date', fontsize=CHART_CONFIG['font_size'])
-        ax.grid(True, alpha=0.3)
-        ax.legend()
-        
-        # 添加統計資訊
-        max_dd = self.statistics.get('risk_metrics', {}).get('max_drawdown', 0)
-        total_return = equity_curve.iloc[-1] if len(equity_curve) > 0 else 0
-        total_return_currency = total_return * ANALYSIS_CONFIG['point_value']
-
-        textstr = f'Total Return: NT${total_return_currency:,.0f}\nMax Drawdown: {max_dd:.2%}'
-        props = dict(boxstyle='round', facecolor='wheat', alpha=0.8)
-        ax.text(0.02, 0.98, textstr, transform=ax.transAxes, fontsize=10,
-                verticalalignment='top', bbox=props)
-        
-        # 格式化日期軸
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
-        plt.setp(ax.xaxis.get_majorticklabels(), rotation=45)
-        
-        plt.tight_layout()
-        
-        # 儲存圖表
-        filename = 'equity_curve.png'
-        filepath = CHARTS_DIR / filename
-        plt.savefig(filepath, dpi=CHART_CONFIG['dpi'], bbox_inches='tight')
-        plt.close()
-
-        logger.info(f"Equity curve chart saved: {filepath}")
-        return str(filepath)
-    
+        return self._render('equity_curve')
+
     def create_pnl_distribution_chart(self) -> str:
         """創建損益分布圖"""
-        if self.daily_df.empty:
-            return ""
-        
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
-        
-        # 左圖：損益直方圖（轉換為台幣）
-        pnl_currency = self.daily_df['total_pnl'] * ANALYSIS_CONFIG['point_value']
-        ax1.hist(pnl_currency, bins=10, alpha=0.7, color='skyblue', edgecolor='black')
-        mean_currency = pnl_currency.mean()
-        ax1.axvline(mean_currency, color='red', linestyle='--',
-                   label=f'Mean: NT${mean_currency:,.0f}')
-        ax1.set_title('P&L Distribution Histogram', fontsize=CHART_CONFIG['title_size'])
-        ax1.set_xlabel('P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
-        ax1.set_ylabel('Frequency', fontsize=CHART_CONFIG['font_size'])
-        ax1.grid(True, alpha=0.3)
-        ax1.legend()
-        
-        # 右圖：盒鬚圖（轉換為台幣）
-        box_data = [
-            (self.daily_df[self.daily_df['total_pnl'] > 0]['total_pnl'] * ANALYSIS_CONFIG['point_value']).dropna(),
-            (self.daily_df[self.daily_df['total_pnl'] < 0]['total_pnl'] * ANALYSIS_CONFIG['point_value']).dropna()
-        ]
-        labels = ['Winning Trades', 'Losing Trades']
-
-        bp = ax2.boxplot(box_data, labels=labels, patch_artist=True)
-        bp['boxes'][0].set_facecolor('lightgreen')
-        bp['boxes'][1].set_facecolor('lightcoral')
-
-        ax2.set_title('Win/Loss Distribution', fontsize=CHART_CONFIG['title_size'])
-        ax2.set_ylabel('P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
-        ax2.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        
-        # 儲存圖表
-        filename = 'pnl_distribution.png'
-        filepath = CHARTS_DIR / filename
-        plt.savefig(filepath, dpi=CHART_CONFIG['dpi'], bbox_inches='tight')
-        plt.close()
-
-        logger.info(f"P&L distribution chart saved: {filepath}")
-        return str(filepath)
-    
+        return self._render('pnl_distribution')
+
     def create_lot_contribution_chart(self) -> str:
         """創建口數貢獻圖"""
-        if self.events_df.empty:
-            return ""
-        
-        # 計算各口數的貢獻
-        lot_pnl = self.events_df[self.events_df['pnl'].notna()].groupby('lot_number')['pnl'].sum()
-        
-        if lot_pnl.empty:
-            return ""
-        
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
-        
-        # 左圖：口數貢獻柱狀圖（轉換為台幣）
-        lot_pnl_currency = lot_pnl * ANALYSIS_CONFIG['point_value']
-        colors = ['green' if x > 0 else 'red' for x in lot_pnl.values]
-        bars = ax1.bar([f'Lot {int(i)}' for i in lot_pnl.index], lot_pnl_currency.values, color=colors, alpha=0.7)
-
-        ax1.set_title('P&L Contribution by Lot', fontsize=CHART_CONFIG['title_size'])
-        ax1.set_ylabel('P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
-        ax1.grid(True, alpha=0.3)
-        ax1.axhline(y=0, color='black', linestyle='-', alpha=0.5)
-
-        # 添加數值標籤
-        for bar, value in zip(bars, lot_pnl_currency.values):
-            height = bar.get_height()
-            ax1.text(bar.get_x() + bar.get_width()/2., height + (500 if height > 0 else -1500),
-                    f'NT${int(value):,}', ha='center', va='bottom' if height > 0 else 'top')
-        
-        # 右圖：口數貢獻圓餅圖（只顯示正值）
-        positive_lot_pnl = lot_pnl[lot_pnl > 0]
-        if not positive_lot_pnl.empty:
-            ax2.pie(positive_lot_pnl.values, labels=[f'Lot {int(i)}' for i in positive_lot_pnl.index],
-                   autopct='%1.1f%%', startangle=90)
-            ax2.set_title('Profitable Lots Contribution', fontsize=CHART_CONFIG['title_size'])
-        
-        plt.tight_layout()
-        
-        # 儲存圖表
-        filename = 'lot_contribution.png'
-        filepath = CHARTS_DIR / filename
-        plt.savefig(filepath, dpi=CHART_CONFIG['dpi'], bbox_inches='tight')
-        plt.close()
-
-        logger.info(f"Lot contribution chart saved: {filepath}")
-        return str(filepath)
-    
+        return self._render('lot_contribution')
+
     def create_monthly_performance_chart(self) -> str:
         """創建月度績效圖"""
-        if self.daily_df.empty:
-            return ""
-
-        # 按月統計
-        self.daily_df['year_month'] = self.daily_df['trade_date'].dt.to_period('M')
-        monthly_pnl = self.daily_df.groupby('year_month')['total_pnl'].sum()
-
-        if monthly_pnl.empty:
-            return ""
-
-        fig, ax = plt.subplots(figsize=CHART_CONFIG['figure_size'])
-
-        colors = ['green' if x > 0 else 'red' for x in monthly_pnl.values]
-        monthly_pnl_currency = monthly_pnl * ANALYSIS_CONFIG['point_value']
-        bars = ax.bar(range(len(monthly_pnl)), monthly_pnl_currency.values, color=colors, alpha=0.7)
-
-        ax.set_title('Monthly Performance Analysis', fontsize=CHART_CONFIG['title_size'], fontweight='bold')
-        ax.set_ylabel('Monthly P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
-        ax.set_xlabel('Month', fontsize=CHART_CONFIG['font_size'])
-        ax.set_xticks(range(len(monthly_pnl)))
-        ax.set_xticklabels([str(period) for period in monthly_pnl.index], rotation=45)
-        ax.grid(True, alpha=0.3)
-        ax.axhline(y=0, color='black', linestyle='-', alpha=0.5)
-
-        # 添加數值標籤
-        for bar, value in zip(bars, monthly_pnl_currency.values):
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height + (500 if height > 0 else -1500),
-                    f'NT${int(value):,}', ha='center', va='bottom' if height > 0 else 'top')
-
-        plt.tight_layout()
-
-        # 儲存圖表
-        filename = 'monthly_performance.png'
-        filepath = CHARTS_DIR / filename
-        plt.savefig(filepath, dpi=CHART_CONFIG['dpi'], bbox_inches='tight')
-        plt.close()
-
-        logger.info(f"Monthly performance chart saved: {filepath}")
-        return str(filepath)
+        return self._render('monthly_performance')
 
     def create_drawdown_analysis_chart(self) -> str:
         """創建回撤分析圖"""
-        if self.daily_df.empty:
-            return ""
-
-        equity_curve = self.daily_df['total_pnl'].cumsum()
-        drawdown = self._calculate_drawdown_series(equity_curve)
-        drawdown_pct = drawdown / equity_curve.expanding().max() * 100
-
-        fig, ax = plt.subplots(figsize=CHART_CONFIG['figure_size'])
-
-        ax.fill_between(self.daily_df['trade_date'], 0, drawdown_pct,
-                       alpha=0.7, color='red', label='Drawdown %')
-        ax.plot(self.daily_df['trade_date'], drawdown_pct, color='darkred', linewidth=1)
-
-        ax.set_title('Drawdown Analysis', fontsize=CHART_CONFIG['title_size'], fontweight='bold')
-        ax.set_ylabel('Drawdown (%)', fontsize=CHART_CONFIG['font_size'])
-        ax.set_xlabel('Date', fontsize=CHART_CONFIG['font_size'])
-        ax.grid(True, alpha=0.3)
-        ax.legend()
-
-        # 標記最大回撤點
-        max_dd_idx = drawdown_pct.idxmin()
-        max_dd_value = drawdown_pct.min()
-        ax.annotate(f'Max DD: {max_dd_value:.1f}%',
-                   xy=(self.daily_df.iloc[max_dd_idx]['trade_date'], max_dd_value),
-                   xytext=(10, 10), textcoords='offset points',
-                   bbox=dict(boxstyle='round,pad=0.3', facecolor='yellow', alpha=0.7),
-                   arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0'))
-
-        # 格式化日期軸
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%m-%d'))
-        plt.setp(ax.xaxis.get_majorticklabels(), rotation=45)
-
-        plt.tight_layout()
-
-        # 儲存圖表
-        filename = 'drawdown_analysis.png'
-        filepath = CHARTS_DIR / filename
-        plt.savefig(filepath, dpi=CHART_CONFIG['dpi'], bbox_inches='tight')
-        plt.close()
-
-        logger.info(f"Drawdown analysis chart saved: {filepath}")
-        return str(filepath)
+        return self._render('drawdown_analysis')
 
     def create_direction_analysis_chart(self) -> str:
         """創建交易方向分析圖"""
-        if self.daily_df.empty:
-            return ""
-
-        # 統計多空交易
-        direction_stats = self.daily_df.groupby('direction').agg({
-            'total_pnl': ['sum', 'mean', 'count']
-        }).round(2)
-
-        direction_stats.columns = ['總損益', '平均損益', '交易次數']
-        direction_stats = direction_stats.reset_index()
-
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 10))
-
-        # 左上：多空總損益比較（轉換為台幣）
-        total_pnl_currency = direction_stats['總損益'] * ANALYSIS_CONFIG['point_value']
-        bars1 = ax1.bar(direction_stats['direction'], total_pnl_currency,
-                       color=['green', 'red'], alpha=0.7)
-        ax1.set_title('Long vs Short Total P&L', fontsize=CHART_CONFIG['font_size'])
-        ax1.set_ylabel('Total P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
-        ax1.grid(True, alpha=0.3)
-
-        for bar, value in zip(bars1, direction_stats['總損益']):
-            height = bar.get_height()
-            ax1.text(bar.get_x() + bar.get_width()/2., height + (5 if height > 0 else -15),
-                    f'{value}', ha='center', va='bottom' if height > 0 else 'top')
-
-        # 右上：多空平均損益比較（轉換為台幣）
-        avg_pnl_currency = direction_stats['平均損益'] * ANALYSIS_CONFIG['point_value']
-        bars2 = ax2.bar(direction_stats['direction'], avg_pnl_currency,
-                       color=['green', 'red'], alpha=0.7)
-        ax2.set_title('Long vs Short Average P&L', fontsize=CHART_CONFIG['font_size'])
-        ax2.set_ylabel('Average P&L (NT$)', fontsize=CHART_CONFIG['font_size'])
-        ax2.grid(True, alpha=0.3)
-
-        for bar, value in zip(bars2, direction_stats['平均損益']):
-            height = bar.get_height()
-            ax2.text(bar.get_x() + bar.get_width()/2., height + (2 if height > 0 else -5),
-                    f'{value}', ha='center', va='bottom' if height > 0 else 'top')
-
-        # 左下：多空交易次數比較
-        wedges, texts, autotexts = ax3.pie(direction_stats['交易次數'], labels=direction_stats['direction'],
-                                          autopct='%1.1f%%', colors=['green', 'red'])
-        for wedge in wedges:
-            wedge.set_alpha(0.7)
-        ax3.set_title('Long vs Short Trade Count', fontsize=CHART_CONFIG['font_size'])
-
-        # 右下：多空勝率比較
-        win_rates = []
-        for direction in direction_stats['direction']:
-            direction_trades = self.daily_df[self.daily_df['direction'] == direction]
-            wins = len(direction_trades[direction_trades['total_pnl'] > 0])
-            total = len(direction_trades)
-            win_rate = wins / total * 100 if total > 0 else 0
-            win_rates.append(win_rate)
-
-        bars4 = ax4.bar(direction_stats['direction'], win_rates,
-                       color=['green', 'red'], alpha=0.7)
-        ax4.set_title('Long vs Short Win Rate', fontsize=CHART_CONFIG['font_size'])
-        ax4.set_ylabel('Win Rate (%)', fontsize=CHART_CONFIG['font_size'])
-        ax4.set_ylim(0, 100)
-        ax4.grid(True, alpha=0.3)
-
-        for bar, value in zip(bars4, win_rates):
-            height = bar.get_height()
-            ax4.text(bar.get_x() + bar.get_width()/2., height + 2,
-                    f'{value:.1f}%', ha='center', va='bottom')
-
-        plt.tight_layout()
-
-        # 儲存圖表
-        filename = 'direction_analysis.png'
-        filepath = CHARTS_DIR / filename
-        plt.savefig(filepath, dpi=CHART_CONFIG['dpi'], bbox_inches='tight')
-        plt.close()
-
-        logger.info(f"Direction analysis chart saved: {filepath}")
-        return str(filepath)
+        return self._render('direction_analysis')
 
     def create_interactive_dashboard(self) -> str:
         """創建互動式儀表板"""
-        if self.daily_df.empty:
+        if self.daily_df.empty or go is None:
             return ""
 
+        frame = self.daily_df[['trade_date', 'total_pnl', 'pnl_currency', 'cumulative_currency']]
+        cache_path = _cache_path('interactive_dashboard', (frame, self.lot_pnl), extension='html')
+        filepath = CHARTS_DIR / 'interactive_dashboard.html'
+        if cache_path.exists():
+            os.utime(cache_path)
+            shutil.copyfile(cache_path, filepath)
+            return str(filepath)
+
         # 創建子圖
         fig = make_subplots(
             rows=2, cols=2,
@@ -458,40 +560,34 @@ class StrategyVisualizer:
         )
 
         # 每日損益柱狀圖（轉換為台幣）
-        daily_pnl_currency = self.daily_df['total_pnl'] * ANALYSIS_CONFIG['point_value']
-        colors = ['green' if x > 0 else 'red' for x in self.daily_df['total_pnl']]
+        colors = ['green' if x > 0 else 'red' for x in frame['total_pnl']]
         fig.add_trace(
-            go.Bar(x=self.daily_df['trade_date'], y=daily_pnl_currency,
+            go.Bar(x=frame['trade_date'], y=frame['pnl_currency'],
                    marker_color=colors, name='Daily P&L', showlegend=False),
             row=1, col=1
         )
 
         # 累積損益曲線（轉換為台幣）
-        cumulative_pnl = self.daily_df['total_pnl'].cumsum()
-        cumulative_pnl_currency = cumulative_pnl * ANALYSIS_CONFIG['point_value']
         fig.add_trace(
-            go.Scatter(x=self.daily_df['trade_date'], y=cumulative_pnl_currency,
+            go.Scatter(x=frame['trade_date'], y=frame['cumulative_currency'],
                       mode='lines+markers', name='Cumulative P&L', showlegend=False),
             row=1, col=2
         )
 
         # 損益分布直方圖（轉換為台幣）
         fig.add_trace(
-            go.Histogram(x=daily_pnl_currency, nbinsx=10,
+            go.Histogram(x=frame['pnl_currency'], nbinsx=10,
                         name='P&L Distribution', showlegend=False),
             row=2, col=1
         )
 
         # 口數貢獻（如果有事件資料）
-        if not self.events_df.empty:
-            lot_pnl = self.events_df[self.events_df['pnl'].notna()].groupby('lot_number')['pnl'].sum()
-            if not lot_pnl.empty:
-                lot_pnl_currency = lot_pnl * ANALYSIS_CONFIG['point_value']
-                fig.add_trace(
-                    go.Bar(x=[f'Lot {int(i)}' for i in lot_pnl.index], y=lot_pnl_currency.values,
-                          name='Lot Contribution', showlegend=False),
-                    row=2, col=2
-                )
+        if not self.lot_pnl.empty:
+            fig.add_trace(
+                go.Bar(x=[f'Lot {int(i)}' for i in self.lot_pnl['lot_number']], y=self.lot_pnl['pnl_currency'].values,
+                      name='Lot Contribution', showlegend=False),
+                row=2, col=2
+            )
 
         # 更新佈局
         fig.update_layout(
@@ -502,18 +598,27 @@ class StrategyVisualizer:
         )
 
         # 儲存互動式圖表
-        filename = 'interactive_dashboard.html'
-        filepath = CHARTS_DIR / filename
-        fig.write_html(str(filepath))
+        fig.write_html(str(cache_path))
+        shutil.copyfile(cache_path, filepath)
 
         logger.info(f"Interactive dashboard saved: {filepath}")
         return str(filepath)
 
-    def _calculate_drawdown_series(self, equity_curve: pd.Series) -> pd.Series:
-        """計算回撤序列"""
-        peak = equity_curve.expanding().max()
-        drawdown = equity_curve - peak
-        return drawdown
+    def _calculate_lot_pnl(self) -> pd.DataFrame:
+        """各口數的損益貢獻 (lot_number, pnl, pnl_currency)"""
+        if self.events_df.empty:
+            return pd.DataFrame(columns=['lot_number', 'pnl', 'pnl_currency'])
+        lot_pnl = self.events_df[self.events_df['pnl'].notna()].groupby('lot_number')['pnl'].sum().reset_index()
+        lot_pnl['pnl_currency'] = lot_pnl['pnl'] * ANALYSIS_CONFIG['point_value']
+        return lot_pnl
+
+    def _calculate_monthly_pnl(self) -> pd.DataFrame:
+        """按月統計損益 (year_month, total_pnl, pnl_currency)"""
+        if self.daily_df.empty:
+            return pd.DataFrame(columns=['year_month', 'total_pnl', 'pnl_currency'])
+        monthly_pnl = self.daily_df.groupby('year_month')['total_pnl'].sum().reset_index()
+        monthly_pnl['pnl_currency'] = monthly_pnl['total_pnl'] * ANALYSIS_CONFIG['point_value']
+        return monthly_pnl
 
 def create_all_visualizations(daily_df: pd.DataFrame, events_df: pd.DataFrame,
                             statistics: Dict[str, Any]) -> Dict[str, str]:
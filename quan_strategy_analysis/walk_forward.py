@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+滾動前進 (Walk-Forward) 優化 - 樣本內挑參數、樣本外驗證，增量重新擬合
+
+🎯 目的：
+    原本的分析都在單一固定的 start_date / end_date 上挑參數，容易過度擬合。
+    本模組把歷史切成連續的「樣本內 (IS) → 樣本外 (OOS)」視窗：
+    1. 每個 IS 視窗依目標函數挑出最佳配置
+    2. 該配置在緊接著的 OOS 視窗實際表現，串接成一條樣本外資金曲線
+    3. 報告各視窗挑中的參數是否穩定，以及樣本外相對樣本內的效率
+
+⚡ 增量計算：
+    每個 (配置, 交易日) 的結果只計算一次，存入 day_result_cache 的每日結果快取
+    (與 run_backtest(day_cache=...) 共用，鍵相同)，再組成 (配置 × 交易日) 損益矩陣。
+    新增交易日或行情修正時只重算有變動的日子；所有視窗的挑選都只是矩陣切片運算，
+    因此數千組配置 × 兩年資料的完整滾動前進只需數分鐘 (首次) 或數秒 (增量)。
+
+📐 用法：
+    python walk_forward.py --start-date 2023-07-01 --end-date 2025-06-30 \\
+        --in-sample 120 --out-of-sample 20 --objective pnl_mdd_ratio --processes 8
+
+    最後一個樣本內視窗 (截至最新交易日) 挑出的配置即為建議上線參數，
+    報告中的 live_lot_rules 欄位與 MultiGroupStrategyConfig 的 LotRule.to_json 格式相同。
+
+作者：量化分析團隊
+日期：2025-07-16
+"""
+
+import argparse
+import csv
+import json
+import logging
+import math
+import multiprocessing
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from day_result_cache import DEFAULT_DAY_CACHE_PATH, DayResult, DayResultStore, config_key, evaluate_day
+from sensitivity_evaluation import MarketDay, day_fingerprint
+
+logger = logging.getLogger(__name__)
+
+OBJECTIVES = ('pnl_mdd_ratio', 'total_pnl', 'sharpe', 'neg_mdd')
+
+TRADING_DAYS_PER_YEAR = 252
+
+DEFAULT_REPORT_DIR = "walk_forward_reports"
+
+
+# ==============================================================================
+# (配置 × 交易日) 損益矩陣
+# ==============================================================================
+
+# 子進程共用的評估資料 (由進程池 initializer 設定)
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_day_worker(configs, run_logic, apply_filter):
+    _worker_state.update(configs=configs, run_logic=run_logic, apply_filter=apply_filter)
+
+
+def _evaluate_day(market_day: MarketDay, data_hash: str, configs: Sequence, config_indices: Sequence[int],
+                  run_logic: Callable, apply_filter: Callable) -> List[DayResult]:
+    """單一交易日對多組配置的每日結果 (行情只整理一次，依序套用各配置)"""
+    return [evaluate_day(configs[index], market_day, data_hash, run_logic, apply_filter) for index in config_indices]
+
+
+def _evaluate_day_in_worker(task):
+    market_day, data_hash, config_indices = task
+    return _evaluate_day(market_day, data_hash, _worker_state['configs'], config_indices,
+                         _worker_state['run_logic'], _worker_state['apply_filter'])
+
+
+class DailyPnLMatrix:
+    """
+    (配置 × 交易日) 每日損益矩陣
+
+    - pnl[i, j]: 第 i 組配置在第 j 個交易日的損益，0 表示當天未交易 (與 run_backtest 的判斷相同)
+    - 交易日以字串 (ISO 日期) 儲存與排序
+    - 每個交易日記錄資料指紋，行情修正過的日子會在 update() 時重算
+    - 只評估尚未計算的 (配置, 交易日)；指定 store 時先沿用每日結果快取，新算的結果寫回快取
+    """
+
+    def __init__(self, configs: Sequence, run_logic: Callable, apply_filter: Callable,
+                 labels: Optional[Sequence[str]] = None, extra: Tuple = ()):
+        """
+        Args:
+            configs: 策略配置列表
+            run_logic: _run_multi_lot_logic
+            apply_filter: apply_range_filter
+            labels: 配置顯示名稱，預設為配置鍵
+            extra: 配置以外影響結果的設定 (opening_range_key 的結果)，與 run_backtest 的快取鍵一致
+        """
+        self.configs = list(configs)
+        self.run_logic = run_logic
+        self.apply_filter = apply_filter
+        self.config_keys = [config_key(config, *extra) for config in self.configs]
+        self.labels = list(labels) if labels is not None else list(self.config_keys)
+
+        self.days: List[str] = []
+        self.day_keys: List[str] = []
+        self.pnl = np.zeros((len(self.configs), 0))
+        self.evaluated = np.zeros((len(self.configs), 0), dtype=bool)
+
+    @property
+    def num_configs(self) -> int:
+        return len(self.configs)
+
+    @property
+    def num_days(self) -> int:
+        return len(self.days)
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.evaluated.all())
+
+    def _ensure_days(self, incoming: Dict[str, str]) -> Dict[str, int]:
+        """把新的交易日加入矩陣 (維持日期順序)，行情有變動的日子標記為未評估"""
+        existing = dict(zip(self.days, self.day_keys))
+
+        days = sorted(set(existing) | set(incoming))
+        if days != self.days:
+            old_columns = {day: column for column, day in enumerate(self.days)}
+            pnl = np.zeros((self.num_configs, len(days)))
+            evaluated = np.zeros((self.num_configs, len(days)), dtype=bool)
+            for column, day in enumerate(days):
+                if day in old_columns:
+                    pnl[:, column] = self.pnl[:, old_columns[day]]
+                    evaluated[:, column] = self.evaluated[:, old_columns[day]]
+            self.pnl, self.evaluated = pnl, evaluated
+            self.day_keys = [existing.get(day, incoming.get(day)) for day in days]
+            self.days = days
+
+        columns = {day: column for column, day in enumerate(self.days)}
+        for day, key in incoming.items():
+            column = columns[day]
+            if self.day_keys[column] != key:
+                self.evaluated[:, column] = False
+                self.day_keys[column] = key
+        return columns
+
+    def _load_cached(self, store: DayResultStore, engine_version: str, incoming: Dict[str, str],
+                     columns: Dict[str, int]) -> int:
+        """由每日結果快取填入尚未評估的格 (快取的行情指紋須與本次相同)，回傳沿用筆數"""
+        incoming_columns = [columns[day] for day in incoming]
+        reused = 0
+        for row in np.flatnonzero(~self.evaluated[:, incoming_columns].all(axis=1)):
+            cached = store.load(self.config_keys[row], engine_version, min(incoming), max(incoming))
+            for day, result in cached.items():
+                column = columns.get(day)
+                if day in incoming and not self.evaluated[row, column] and result.data_hash == incoming[day]:
+                    self.pnl[row, column] = float(result.day_pnl)
+                    self.evaluated[row, column] = True
+                    reused += 1
+        if reused:
+            logger.info(f"💾 每日結果快取命中 {reused}/{self.num_configs * len(incoming)} 筆")
+        return reused
+
+    def update(self, market_days: Sequence[MarketDay], processes: int = 1, store: Optional[DayResultStore] = None,
+               engine_version: str = "", day_hashes: Optional[Dict[str, str]] = None) -> int:
+        """
+        評估尚未計算的 (配置, 交易日)
+
+        Args:
+            market_days: load_market_days 的結果 (可只包含新增的交易日)
+            processes: 並行進程數 (以交易日為單位分派)
+            store: 每日結果快取，None 表示只保留在記憶體
+            engine_version: 交易邏輯版本 (ENGINE_VERSION)
+            day_hashes: load_day_hashes 的每日行情指紋 (與 run_backtest 相同)，None 時以 day_fingerprint 計算
+
+        Returns:
+            int: 本次計算的 (配置, 交易日) 數
+        """
+        incoming = {str(market_day[0]): day_hashes[str(market_day[0])] if day_hashes else day_fingerprint(market_day)
+                    for market_day in market_days}
+        if not incoming:
+            return 0
+        columns = self._ensure_days(incoming)
+        if store:
+            self._load_cached(store, engine_version, incoming, columns)
+
+        tasks = []
+        for market_day in market_days:
+            day = str(market_day[0])
+            missing = np.flatnonzero(~self.evaluated[:, columns[day]])
+            if missing.size:
+                tasks.append((columns[day], market_day, incoming[day], missing))
+
+        if not tasks:
+            return 0
+
+        total_cells = int(sum(len(missing) for _, _, _, missing in tasks))
+        logger.info(f"🔄 評估 {len(tasks)} 個交易日 × 最多 {self.num_configs} 組配置 (共 {total_cells} 筆)")
+
+        # 回測函數來自以 importlib 載入的策略檔，只能以 fork 方式傳給子進程 (Windows 改為單進程)
+        use_pool = processes > 1 and len(tasks) > 1 and 'fork' in multiprocessing.get_all_start_methods()
+        new_results: Dict[int, List[DayResult]] = {}
+        if use_pool:
+            context = multiprocessing.get_context('fork')
+            with context.Pool(processes, initializer=_init_day_worker,
+                              initargs=(self.configs, self.run_logic, self.apply_filter)) as pool:
+                results = pool.imap(_evaluate_day_in_worker,
+                                    [(market_day, data_hash, missing) for _, market_day, data_hash, missing in tasks],
+                                    chunksize=4)
+                for done, ((column, _, _, missing), day_results) in enumerate(zip(tasks, results), 1):
+                    self._fill(column, missing, day_results, new_results)
+                    self._log_progress(done, len(tasks))
+        else:
+            for done, (column, market_day, data_hash, missing) in enumerate(tasks, 1):
+                day_results = _evaluate_day(market_day, data_hash, self.configs, missing,
+                                            self.run_logic, self.apply_filter)
+                self._fill(column, missing, day_results, new_results)
+                self._log_progress(done, len(tasks))
+
+        if store:
+            for row, results in new_results.items():
+                store.save(self.config_keys[row], engine_version, results)
+        return total_cells
+
+    def _fill(self, column: int, rows: Sequence[int], day_results: Sequence[DayResult],
+              new_results: Dict[int, List[DayResult]]):
+        for row, result in zip(rows, day_results):
+            self.pnl[row, column] = float(result.day_pnl)
+            self.evaluated[row, column] = True
+            new_results.setdefault(int(row), []).append(result)
+
+    @staticmethod
+    def _log_progress(done: int, total: int):
+        if done == total or done % max(1, total // 10) == 0:
+            logger.info(f"   📊 進度更新: {done}/{total} 個交易日 ({done / total * 100:.1f}%)")
+
+
+# ==============================================================================
+# 視窗與績效指標
+# ==============================================================================
+
+@dataclass
+class WalkForwardWindow:
+    """單一視窗的交易日索引範圍 (左閉右開)"""
+    index: int
+    is_start: int
+    is_end: int
+    oos_start: int
+    oos_end: int
+
+
+def build_windows(num_days: int, in_sample_days: int, out_of_sample_days: int,
+                  anchored: bool = False) -> List[WalkForwardWindow]:
+    """
+    建立滾動視窗 (樣本外視窗首尾相接，不重疊)
+
+    Args:
+        num_days: 交易日總數
+        in_sample_days: 樣本內交易日數 (anchored 時為第一個視窗的長度)
+        out_of_sample_days: 樣本外交易日數 (也是每次前進的步長)
+        anchored: True 時樣本內固定從第一天開始 (擴張視窗)
+    """
+    if in_sample_days <= 0 or out_of_sample_days <= 0:
+        raise ValueError("樣本內與樣本外天數必須為正數")
+
+    windows = []
+    oos_start = in_sample_days
+    while oos_start < num_days:
+        is_start = 0 if anchored else oos_start - in_sample_days
+        windows.append(WalkForwardWindow(len(windows), is_start, oos_start,
+                                         oos_start, min(oos_start + out_of_sample_days, num_days)))
+        oos_start += out_of_sample_days
+    return windows
+
+
+def window_metrics(pnl: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    矩陣版績效指標 (每列一組配置)
+
+    最大回撤的計算與 calculate_backtest_metrics 相同：峰值從 0 起算。
+    """
+    pnl = np.atleast_2d(np.asarray(pnl, dtype=float))
+    num_configs, num_days = pnl.shape
+    if num_days == 0:
+        zeros = np.zeros(num_configs)
+        return {'total_pnl': zeros, 'max_drawdown': zeros, 'trades': zeros.astype(int),
+                'win_rate': zeros, 'sharpe': zeros, 'pnl_mdd_ratio': zeros}
+
+    cumulative = np.cumsum(pnl, axis=1)
+    peak = np.maximum(np.maximum.accumulate(cumulative, axis=1), 0.0)
+    max_drawdown = (peak - cumulative).max(axis=1)
+    total_pnl = cumulative[:, -1]
+    trades = np.count_nonzero(pnl, axis=1)
+    wins = np.count_nonzero(pnl > 0, axis=1)
+    std = pnl.std(axis=1)
+    sharpe = np.divide(pnl.mean(axis=1), std, out=np.zeros(num_configs), where=std > 0) * math.sqrt(TRADING_DAYS_PER_YEAR)
+
+    return {
+        'total_pnl': total_pnl,
+        'max_drawdown': max_drawdown,
+        'trades': trades,
+        'win_rate': np.divide(wins, trades, out=np.zeros(num_configs), where=trades > 0),
+        'sharpe': sharpe,
+        'pnl_mdd_ratio': total_pnl / np.maximum(max_drawdown, 1.0),
+    }
+
+
+def objective_scores(metrics: Dict[str, np.ndarray], objective: str, min_trades: int = 0) -> np.ndarray:
+    """目標函數分數 (越大越好)，交易次數不足的配置為 -inf"""
+    if objective not in OBJECTIVES:
+        raise ValueError(f"不支援的目標函數: {objective} (可用: {', '.join(OBJECTIVES)})")
+    scores = -metrics['max_drawdown'] if objective == 'neg_mdd' else metrics[objective]
+    scores = np.asarray(scores, dtype=float).copy()
+    scores[metrics['trades'] < min_trades] = -np.inf
+    return scores
+
+
+def _select(pnl: np.ndarray, objective: str, min_trades: int):
+    metrics = window_metrics(pnl)
+    scores = objective_scores(metrics, objective, min_trades)
+    best = int(np.argmax(scores))
+    if not np.isfinite(scores[best]):
+        return None, metrics, scores
+    return best, metrics, scores
+
+
+# ==============================================================================
+# 滾動前進
+# ==============================================================================
+
+def parameter_stability(selected_params: Sequence[Optional[Dict[str, Any]]]) -> Dict[str, Dict[str, float]]:
+    """各數值參數在各視窗挑選結果中的平均、標準差與變異係數"""
+    chosen = [params for params in selected_params if params]
+    stability = {}
+    if not chosen:
+        return stability
+    for name in chosen[0]:
+        values = [params.get(name) for params in chosen]
+        if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+            continue
+        values = np.array(values, dtype=float)
+        mean = float(values.mean())
+        std = float(values.std())
+        stability[name] = {'mean': mean, 'std': std, 'cv': std / abs(mean) if mean else 0.0,
+                           'min': float(values.min()), 'max': float(values.max())}
+    return stability
+
+
+def run_walk_forward(matrix: DailyPnLMatrix, in_sample_days: int, out_of_sample_days: int,
+                     objective: str = 'pnl_mdd_ratio', min_trades: int = 10, anchored: bool = False,
+                     config_params: Optional[Sequence[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    執行滾動前進
+
+    Args:
+        matrix: 已完成評估的每日損益矩陣
+        in_sample_days / out_of_sample_days / anchored: 見 build_windows
+        objective: 樣本內挑選的目標函數 (OBJECTIVES)
+        min_trades: 樣本內最少交易次數 (避免挑到幾乎不交易的配置)
+        config_params: 各配置的參數字典 (用於穩定度分析與上線建議)
+
+    Returns:
+        dict:
+            - windows: 各視窗的日期、挑中的配置與樣本內/外績效
+            - oos_days / oos_daily_pnl / oos_equity: 串接的樣本外每日損益與資金曲線
+            - oos_summary: 樣本外總損益、最大回撤、交易次數、勝率、Sharpe
+            - walk_forward_efficiency: 樣本外日均損益 / 樣本內日均損益
+            - stability: 換手率、挑中的不同配置數、各參數的變異
+            - recommendation: 以最新樣本內視窗挑出的配置 (建議上線參數)
+    """
+    if not matrix.complete:
+        raise ValueError("每日損益矩陣尚有未評估的交易日，請先呼叫 update()")
+
+    pnl = matrix.pnl
+    windows = build_windows(matrix.num_days, in_sample_days, out_of_sample_days, anchored)
+    if not windows:
+        raise ValueError(f"交易日不足：共 {matrix.num_days} 天，樣本內需要 {in_sample_days} 天")
+
+    window_rows = []
+    oos_segments = []
+    selected_indices = []
+    is_daily, oos_daily = [], []
+
+    for window in windows:
+        best, is_metrics, _ = _select(pnl[:, window.is_start:window.is_end], objective, min_trades)
+        oos_pnl = pnl[:, window.oos_start:window.oos_end]
+        selected_indices.append(best)
+
+        row = {
+            'window': window.index,
+            'is_start': matrix.days[window.is_start],
+            'is_end': matrix.days[window.is_end - 1],
+            'oos_start': matrix.days[window.oos_start],
+            'oos_end': matrix.days[window.oos_end - 1],
+            'selected': matrix.labels[best] if best is not None else None,
+        }
+        if best is None:
+            # 沒有符合條件的配置：樣本外視窗空手
+            oos_segments.append(np.zeros(oos_pnl.shape[1]))
+            window_rows.append(row)
+            continue
+
+        oos_metrics = window_metrics(oos_pnl[best])
+        oos_totals = oos_pnl.sum(axis=1)
+        is_length = window.is_end - window.is_start
+        row.update({
+            'is_total_pnl': float(is_metrics['total_pnl'][best]),
+            'is_max_drawdown': float(is_metrics['max_drawdown'][best]),
+            'is_trades': int(is_metrics['trades'][best]),
+            'oos_total_pnl': float(oos_metrics['total_pnl'][0]),
+            'oos_max_drawdown': float(oos_metrics['max_drawdown'][0]),
+            'oos_trades': int(oos_metrics['trades'][0]),
+            # 樣本外表現勝過多少比例的配置 (IS 挑中者在 OOS 是否仍在前段)
+            'oos_percentile': float(np.mean(oos_totals < oos_totals[best])),
+        })
+        if config_params is not None:
+            row['params'] = config_params[best]
+        window_rows.append(row)
+        oos_segments.append(oos_pnl[best])
+        is_daily.append(row['is_total_pnl'] / is_length)
+        oos_daily.append(row['oos_total_pnl'] / (window.oos_end - window.oos_start))
+
+    oos_daily_pnl = np.concatenate(oos_segments)
+    oos_metrics = window_metrics(oos_daily_pnl)
+    mean_is_daily = float(np.mean(is_daily)) if is_daily else 0.0
+
+    chosen = [index for index in selected_indices if index is not None]
+    switches = sum(1 for a, b in zip(selected_indices, selected_indices[1:]) if a != b)
+
+    # 上線建議：以最新的樣本內視窗 (截至最後一個交易日) 挑選
+    latest_start = 0 if anchored else max(0, matrix.num_days - in_sample_days)
+    latest, latest_metrics, _ = _select(pnl[:, latest_start:], objective, min_trades)
+    recommendation = None
+    if latest is not None:
+        recommendation = {
+            'config_index': latest,
+            'label': matrix.labels[latest],
+            'is_start': matrix.days[latest_start],
+            'is_end': matrix.days[-1],
+            'is_total_pnl': float(latest_metrics['total_pnl'][latest]),
+            'is_max_drawdown': float(latest_metrics['max_drawdown'][latest]),
+        }
+        if config_params is not None:
+            recommendation['params'] = config_params[latest]
+
+    return {
+        'objective': objective,
+        'in_sample_days': in_sample_days,
+        'out_of_sample_days': out_of_sample_days,
+        'anchored': anchored,
+        'num_configs': matrix.num_configs,
+        'windows': window_rows,
+        'oos_days': matrix.days[windows[0].oos_start:],
+        'oos_daily_pnl': oos_daily_pnl,
+        'oos_equity': np.cumsum(oos_daily_pnl),
+        'oos_summary': {name: float(values[0]) for name, values in oos_metrics.items()},
+        'walk_forward_efficiency': (float(np.mean(oos_daily)) / mean_is_daily) if mean_is_daily > 0 else None,
+        'stability': {
+            'distinct_configs': len(set(chosen)),
+            'switch_rate': switches / max(len(selected_indices) - 1, 1),
+            'parameters': parameter_stability([config_params[i] if config_params is not None and i is not None
+                                               else None for i in selected_indices]),
+        },
+        'recommendation': recommendation,
+    }
+
+
+# ==============================================================================
+# 參數網格與上線格式
+# ==============================================================================
+
+def live_lot_rules(params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    參數 → MultiGroupStrategyConfig 的 LotRule 格式 (與 LotRule.to_json 欄位相同)
+
+    params 使用 parameter_matrix_generator 的欄位 (lot1_trigger, lot1_trailing(%), lot2_protection...)
+    """
+    rules = []
+    lot_id = 1
+    while f'lot{lot_id}_trigger' in params:
+        protection = params.get(f'lot{lot_id}_protection')
+        rules.append({
+            'lot_id': lot_id,
+            'use_trailing_stop': True,
+            'trailing_activation': float(params[f'lot{lot_id}_trigger']),
+            'trailing_pullback': float(params[f'lot{lot_id}_trailing']) / 100,
+            'protective_stop_multiplier': float(protection) if lot_id > 1 and protection else None,
+            'fixed_tp_points': None,
+        })
+        lot_id += 1
+    return rules
+
+
+def build_grid_configs(backtest_module, lot_combinations: Sequence[Dict[str, Any]],
+                       trading_direction: str = "BOTH") -> List:
+    """把 ParameterMatrixGenerator 的各口參數組合轉為 StrategyConfig (回撤比例由 % 轉為小數)"""
+    configs = []
+    for combo in lot_combinations:
+        lot_rules = [backtest_module.LotRule(
+            use_trailing_stop=True,
+            trailing_activation=Decimal(str(combo['lot1_trigger'])),
+            trailing_pullback=Decimal(str(combo['lot1_trailing'])) / 100)]
+        for lot in ('lot2', 'lot3'):
+            lot_rules.append(backtest_module.LotRule(
+                use_trailing_stop=True,
+                trailing_activation=Decimal(str(combo[f'{lot}_trigger'])),
+                trailing_pullback=Decimal(str(combo[f'{lot}_trailing'])) / 100,
+                protective_stop_multiplier=Decimal(str(combo[f'{lot}_protection']))))
+        configs.append(backtest_module.StrategyConfig(
+            trade_size_in_lots=3,
+            stop_loss_type=backtest_module.StopLossType.RANGE_BOUNDARY,
+            lot_rules=lot_rules,
+            trading_direction=trading_direction))
+    return configs
+
+
+def save_walk_forward_report(result: Dict[str, Any], report_dir: str) -> Dict[str, str]:
+    """輸出 JSON 摘要、視窗明細 CSV 與樣本外資金曲線 CSV"""
+    os.makedirs(report_dir, exist_ok=True)
+    files = {
+        'summary': os.path.join(report_dir, 'walk_forward_summary.json'),
+        'windows': os.path.join(report_dir, 'walk_forward_windows.csv'),
+        'equity': os.path.join(report_dir, 'walk_forward_oos_equity.csv'),
+    }
+
+    summary = {key: value for key, value in result.items()
+               if key not in ('oos_days', 'oos_daily_pnl', 'oos_equity')}
+    if result['recommendation'] and 'params' in result['recommendation']:
+        summary['live_lot_rules'] = live_lot_rules(result['recommendation']['params'])
+    with open(files['summary'], 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2, default=str)
+
+    fieldnames = []
+    for row in result['windows']:
+        fieldnames += [key for key in row if key not in fieldnames and key != 'params']
+    with open(files['windows'], 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames + ['params'])
+        writer.writeheader()
+        for row in result['windows']:
+            writer.writerow({**row, 'params': json.dumps(row.get('params'), ensure_ascii=False)})
+
+    with open(files['equity'], 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['trade_day', 'daily_pnl', 'equity'])
+        for day, pnl, equity in zip(result['oos_days'], result['oos_daily_pnl'], result['oos_equity']):
+            writer.writerow([day, f"{pnl:.2f}", f"{equity:.2f}"])
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="滾動前進優化 (樣本內挑選、樣本外驗證)")
+    parser.add_argument("--start-date", required=True, help="開始日期 YYYY-MM-DD")
+    parser.add_argument("--end-date", required=True, help="結束日期 YYYY-MM-DD")
+    parser.add_argument("--in-sample", type=int, default=120, help="樣本內交易日數")
+    parser.add_argument("--out-of-sample", type=int, default=20, help="樣本外交易日數 (前進步長)")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="pnl_mdd_ratio", help="樣本內挑選目標")
+    parser.add_argument("--min-trades", type=int, default=10, help="樣本內最少交易次數")
+    parser.add_argument("--anchored", action="store_true", help="樣本內固定從第一天開始")
+    parser.add_argument("--direction", choices=["LONG_ONLY", "SHORT_ONLY", "BOTH"], default="BOTH", help="交易方向")
+    parser.add_argument("--range-start", default="08:46", help="開盤區間開始時間")
+    parser.add_argument("--range-end", default="08:47", help="開盤區間結束時間")
+    parser.add_argument("--processes", type=int, default=max(1, multiprocessing.cpu_count() - 1), help="並行進程數")
+    parser.add_argument("--report-dir", default=DEFAULT_REPORT_DIR, help="報告輸出目錄")
+    parser.add_argument("--day-cache", default=DEFAULT_DAY_CACHE_PATH, help="每日結果快取 (與 run_backtest 共用)")
+    args = parser.parse_args()
+
+    import importlib.util
+
+    from day_result_cache import load_day_hashes, opening_range_key
+    from parameter_matrix_generator import ParameterMatrixGenerator, create_default_experiment_config
+    from sensitivity_evaluation import load_market_days
+
+    spec = importlib.util.spec_from_file_location("backtest_module", "multi_Profit-Funded Risk_多口.py")
+    backtest_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(backtest_module)
+    logging.getLogger(backtest_module.__name__).setLevel(logging.WARNING)
+
+    lot_combinations = ParameterMatrixGenerator(create_default_experiment_config()).generate_lot_parameter_combinations()
+    configs = build_grid_configs(backtest_module, lot_combinations, args.direction)
+    labels = [f"{c['lot1_trigger']}({c['lot1_trailing']}%)/{c['lot2_trigger']}({c['lot2_trailing']}%)/"
+              f"{c['lot3_trigger']}({c['lot3_trailing']}%)" for c in lot_combinations]
+
+    if backtest_module.USE_SQLITE:
+        import sqlite_connection
+        context_manager = sqlite_connection.get_conn_cur_from_sqlite_with_adapter(as_dict=True)
+    else:
+        import shared
+        context_manager = shared.get_conn_cur_from_pool_b(as_dict=True)
+
+    logger.info(f"📥 載入行情資料 {args.start_date} ~ {args.end_date}")
+    with context_manager as (conn, cur):
+        market_days = load_market_days(cur, args.start_date, args.end_date, args.range_start, args.range_end)
+        day_hashes = load_day_hashes(cur, args.start_date, args.end_date)
+
+    matrix = DailyPnLMatrix(configs, backtest_module._run_multi_lot_logic, backtest_module.apply_range_filter, labels,
+                            extra=opening_range_key(args.range_start, args.range_end))
+    matrix.update(market_days, processes=args.processes, store=DayResultStore(args.day_cache),
+                  engine_version=backtest_module.ENGINE_VERSION, day_hashes=day_hashes)
+    result = run_walk_forward(matrix, args.in_sample, args.out_of_sample, args.objective,
+                              args.min_trades, args.anchored, config_params=lot_combinations)
+    report_dir = os.path.join(args.report_dir, datetime.now().strftime("%Y%m%d_%H%M%S"))
+    files = save_walk_forward_report(result, report_dir)
+
+    summary = result['oos_summary']
+    print(f"\n🏁 滾動前進完成 - {len(result['windows'])} 個視窗, {matrix.num_configs} 組配置")
+    print(f"📈 樣本外總損益: {summary['total_pnl']:.1f}, 最大回撤: {summary['max_drawdown']:.1f}, "
+          f"交易次數: {summary['trades']:.0f}")
+    efficiency = result['walk_forward_efficiency']
+    print(f"📐 前進效率: {efficiency:.2f}" if efficiency is not None else "📐 前進效率: N/A")
+    print(f"🔁 換手率: {result['stability']['switch_rate']:.0%}, 挑中 {result['stability']['distinct_configs']} 種配置")
+    if result['recommendation']:
+        print(f"🎯 建議上線配置: {result['recommendation']['label']}")
+    print(f"📁 報告: {files['summary']}")
+
+
+if __name__ == "__main__":
+    main()
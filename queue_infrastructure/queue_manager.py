@@ -6,49 +6,80 @@ Queue基礎設施管理器
 1. API事件只負責塞資料到Queue
 2. 策略處理在獨立線程中進行
 3. UI更新通過安全的Queue機制
+4. Tick以__slots__物件直接傳遞，消費端整批取出，UI只取最新一筆
 """
 
 import queue
 import threading
 import time
 import logging
+from collections import deque
 from datetime import datetime
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
 
 # 設定日誌
 logger = logging.getLogger(__name__)
 
-@dataclass
 class TickData:
-    """Tick資料結構"""
-    market_no: str
-    stock_idx: int
-    date: int
-    time_hms: int
-    time_millis: int
-    bid: int
-    ask: int
-    close: int
-    qty: int
-    timestamp: datetime
-    
+    """
+    Tick資料結構
+
+    以 __slots__ 儲存，放入佇列與交給策略回調時都不轉換成字典；
+    formatted_time / corrected_price 需要時才計算，並保留 tick['key'] / tick.get('key')
+    的字典式存取，舊的策略回調不需修改
+    """
+
+    __slots__ = ('market_no', 'stock_idx', 'date', 'time_hms', 'time_millis',
+                 'bid', 'ask', 'close', 'qty', 'timestamp', 'enqueue_ns')
+
+    _KEYS = ('market_no', 'stock_idx', 'date', 'time_hms', 'time_millis',
+             'bid', 'ask', 'close', 'qty', 'timestamp', 'formatted_time', 'corrected_price')
+
+    def __init__(self, market_no: str, stock_idx: int, date: int, time_hms: int, time_millis: int,
+                 bid: int, ask: int, close: int, qty: int, timestamp: Optional[datetime] = None):
+        self.market_no = market_no
+        self.stock_idx = stock_idx
+        self.date = date
+        self.time_hms = time_hms
+        self.time_millis = time_millis
+        self.bid = bid
+        self.ask = ask
+        self.close = close
+        self.qty = qty
+        self.timestamp = timestamp
+        self.enqueue_ns = 0  # 放入佇列時的 monotonic_ns，用於計算佇列延遲
+
+    @property
+    def formatted_time(self) -> str:
+        """HH:MM:SS 時間字串"""
+        hms = self.time_hms
+        return f"{hms // 10000:02d}:{hms // 100 % 100:02d}:{hms % 100:02d}"
+
+    @property
+    def corrected_price(self):
+        """修正後價格 (群益報價為實際價格×100)"""
+        return self.close / 100.0 if self.close > 100000 else self.close
+
+    def __getitem__(self, key: str):
+        if key in self._KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._KEYS
+
+    def get(self, key: str, default=None):
+        """字典式取值 (相容舊版回調)"""
+        return getattr(self, key) if key in self._KEYS else default
+
     def to_dict(self) -> Dict[str, Any]:
         """轉換為字典格式"""
-        return {
-            'market_no': self.market_no,
-            'stock_idx': self.stock_idx,
-            'date': self.date,
-            'time_hms': self.time_hms,
-            'time_millis': self.time_millis,
-            'bid': self.bid,
-            'ask': self.ask,
-            'close': self.close,
-            'qty': self.qty,
-            'timestamp': self.timestamp,
-            'formatted_time': f"{self.time_hms:06d}"[:2] + ":" + f"{self.time_hms:06d}"[2:4] + ":" + f"{self.time_hms:06d}"[4:6],
-            'corrected_price': self.close / 100.0 if self.close > 100000 else self.close
-        }
+        return {key: getattr(self, key) for key in self._KEYS}
+
+    def __repr__(self) -> str:
+        return (f"TickData({self.market_no} {self.stock_idx} {self.formatted_time}.{self.time_millis} "
+                f"close={self.close} bid={self.bid} ask={self.ask} qty={self.qty})")
 
 @dataclass
 class LogMessage:
@@ -78,8 +109,9 @@ class QueueManager:
             tick_queue_size: Tick資料佇列大小
             log_queue_size: 日誌佇列大小
         """
-        # 核心佇列
-        self.tick_data_queue = queue.Queue(maxsize=tick_queue_size)
+        # 核心佇列：Tick 用 deque + Condition，佇列由空變非空時才喚醒消費端
+        self.tick_queue_maxsize = tick_queue_size
+        self._tick_buffer = deque()
         self.log_queue = queue.Queue(maxsize=log_queue_size)
         
         # 狀態管理
@@ -87,14 +119,22 @@ class QueueManager:
         self.stats = {
             'tick_received': 0,
             'tick_processed': 0,
+            'tick_batches': 0,
+            'tick_max_depth': 0,
             'log_generated': 0,
             'log_displayed': 0,
-            'queue_full_errors': 0,
+            'queue_full_errors': 0,  # 佇列已滿丟棄的Tick數
             'processing_errors': 0
         }
+        self._latency_total_ns = 0
+        self._latency_max_ns = 0
         
-        # 線程安全鎖
+        # 線程安全鎖 (Tick佇列的等待條件共用同一把鎖)
         self.stats_lock = threading.Lock()
+        self._tick_ready = threading.Condition(self.stats_lock)
+        
+        # UI 用的最新一筆Tick (版本號遞增，UI 每幀只取最後一筆)
+        self._latest_tick: Tuple[int, Optional[TickData]] = (0, None)
         
         logger.info("QueueManager 初始化完成")
     
@@ -108,23 +148,65 @@ class QueueManager:
         Returns:
             是否成功放入佇列
         """
-        try:
-            self.tick_data_queue.put_nowait(tick_data)
-            with self.stats_lock:
-                self.stats['tick_received'] += 1
-            return True
-        except queue.Full:
-            with self.stats_lock:
+        tick_data.enqueue_ns = time.monotonic_ns()
+        with self._tick_ready:
+            buffer = self._tick_buffer
+            if len(buffer) >= self.tick_queue_maxsize:
                 self.stats['queue_full_errors'] += 1
-            logger.warning("Tick資料佇列已滿，丟棄資料")
-            return False
-        except Exception as e:
-            logger.error(f"放入Tick資料失敗: {e}")
-            return False
+                dropped = self.stats['queue_full_errors']
+            else:
+                buffer.append(tick_data)
+                depth = len(buffer)
+                self.stats['tick_received'] += 1
+                if depth > self.stats['tick_max_depth']:
+                    self.stats['tick_max_depth'] = depth
+                if depth == 1:
+                    self._tick_ready.notify()
+                return True
+        
+        # 佇列滿時每100筆才記錄一次，避免壅塞時日誌再加重負擔
+        if dropped == 1 or dropped % 100 == 0:
+            logger.warning(f"Tick資料佇列已滿，丟棄資料 (累計 {dropped} 筆)")
+        return False
+    
+    def get_tick_batch(self, max_items: int = 256, timeout: float = 1.0) -> List[TickData]:
+        """
+        整批取出Tick資料 (依放入順序)
+        
+        佇列為空時等待新資料或 wake_consumers()，不做輪詢
+        
+        Args:
+            max_items: 最多取出筆數
+            timeout: 佇列為空時的最長等待時間（秒），0 表示不等待
+            
+        Returns:
+            Tick資料列表，超時則為空列表
+        """
+        with self._tick_ready:
+            buffer = self._tick_buffer
+            if not buffer:
+                if timeout <= 0:
+                    return []
+                self._tick_ready.wait(timeout)
+                if not buffer:
+                    return []
+            
+            count = min(len(buffer), max_items)
+            popleft = buffer.popleft
+            batch = [popleft() for _ in range(count)]
+            
+            now_ns = time.monotonic_ns()
+            oldest_ns = now_ns - batch[0].enqueue_ns
+            self._latency_total_ns += now_ns * count - sum(tick.enqueue_ns for tick in batch)
+            if oldest_ns > self._latency_max_ns:
+                self._latency_max_ns = oldest_ns
+            self.stats['tick_processed'] += count
+            self.stats['tick_batches'] += 1
+        return batch
     
     def get_tick_data(self, timeout: float = 1.0) -> Optional[TickData]:
         """
-        從佇列取出Tick資料
+        從佇列取出單筆Tick資料
         
         Args:
             timeout: 超時時間（秒）
@@ -132,16 +214,27 @@ class QueueManager:
         Returns:
             Tick資料物件或None
         """
-        try:
-            tick_data = self.tick_data_queue.get(timeout=timeout)
-            with self.stats_lock:
-                self.stats['tick_processed'] += 1
-            return tick_data
-        except queue.Empty:
-            return None
-        except Exception as e:
-            logger.error(f"取出Tick資料失敗: {e}")
-            return None
+        batch = self.get_tick_batch(1, timeout)
+        return batch[0] if batch else None
+    
+    def wake_consumers(self):
+        """喚醒等待中的消費端 (停止處理時使用)"""
+        with self._tick_ready:
+            self._tick_ready.notify_all()
+    
+    def publish_latest_tick(self, tick_data: TickData, count: int = 1):
+        """
+        更新UI用的最新Tick
+        
+        Args:
+            tick_data: 本批最後一筆Tick
+            count: 本批筆數 (版本號一次加上，UI 可據此計算被合併的筆數)
+        """
+        self._latest_tick = (self._latest_tick[0] + count, tick_data)
+    
+    def get_latest_tick(self) -> Tuple[int, Optional[TickData]]:
+        """取得 (版本號, 最新Tick)"""
+        return self._latest_tick
     
     def put_log_message(self, message: str, level: str = "INFO", source: str = "SYSTEM") -> bool:
         """
@@ -195,25 +288,48 @@ class QueueManager:
             logger.error(f"取出日誌訊息失敗: {e}")
             return None
     
+    def drain_log_messages(self, max_items: int = 50) -> List[LogMessage]:
+        """
+        非阻塞取出目前佇列中的日誌訊息 (UI 主線程使用，不等待)
+        
+        Args:
+            max_items: 最多取出筆數
+            
+        Returns:
+            日誌訊息列表
+        """
+        messages = []
+        get_nowait = self.log_queue.get_nowait
+        try:
+            while len(messages) < max_items:
+                messages.append(get_nowait())
+        except queue.Empty:
+            pass
+        if messages:
+            with self.stats_lock:
+                self.stats['log_displayed'] += len(messages)
+        return messages
+    
     def get_queue_status(self) -> Dict[str, Any]:
-        """取得佇列狀態資訊"""
+        """取得佇列狀態資訊 (含深度、延遲、丟棄統計)"""
         with self.stats_lock:
+            processed = self.stats['tick_processed']
             return {
-                'tick_queue_size': self.tick_data_queue.qsize(),
+                'tick_queue_size': len(self._tick_buffer),
                 'log_queue_size': self.log_queue.qsize(),
-                'tick_queue_maxsize': self.tick_data_queue.maxsize,
+                'tick_queue_maxsize': self.tick_queue_maxsize,
                 'log_queue_maxsize': self.log_queue.maxsize,
+                'tick_dropped': self.stats['queue_full_errors'],
+                'latency_avg_ms': self._latency_total_ns / processed / 1e6 if processed else 0.0,
+                'latency_max_ms': self._latency_max_ns / 1e6,
                 'stats': self.stats.copy(),
                 'running': self.running
             }
     
     def clear_queues(self):
         """清空所有佇列"""
-        try:
-            while not self.tick_data_queue.empty():
-                self.tick_data_queue.get_nowait()
-        except queue.Empty:
-            pass
+        with self._tick_ready:
+            self._tick_buffer.clear()
         
         try:
             while not self.log_queue.empty():
@@ -231,6 +347,7 @@ class QueueManager:
     def stop(self):
         """停止Queue管理器"""
         self.running = False
+        self.wake_consumers()
         logger.info("QueueManager 已停止")
 
 # 全域Queue管理器實例 (單例模式)
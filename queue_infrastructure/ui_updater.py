@@ -4,8 +4,8 @@ UI更新管理器
 
 設計原則：
 1. 只在主線程中運行
-2. 使用root.after()定期檢查log_queue
-3. 安全地更新UI控件
+2. 使用root.after()作為畫面更新節拍，每幀最多刷新一次
+3. 安全地更新UI控件，行情只顯示最新一筆 (中間的Tick合併掉)
 4. 不執行任何策略計算
 """
 
@@ -13,7 +13,7 @@ import tkinter as tk
 import logging
 from datetime import datetime
 from typing import Optional, Callable, Dict, Any, List
-from queue_infrastructure.queue_manager import QueueManager, LogMessage, get_queue_manager
+from queue_infrastructure.queue_manager import QueueManager, LogMessage, TickData, get_queue_manager
 
 logger = logging.getLogger(__name__)
 
@@ -33,24 +33,32 @@ class UIUpdateManager:
         
         # 更新控制
         self.running = False
-        self.update_interval = 50  # 毫秒，每50ms檢查一次
+        self.update_interval = 50  # 毫秒，每幀50ms
         self.after_id = None
         
         # UI更新回調函數
         self.log_callbacks = []  # 日誌顯示回調
         self.data_callbacks = []  # 資料顯示回調
+        self.tick_callbacks = []  # 最新Tick顯示回調 (每幀最多一次)
+        
+        # 待顯示的最新資料 (每幀只取最後一筆)
+        self._pending_data: Optional[Dict[str, Any]] = None
+        self._tick_version = 0
         
         # 統計資訊
         self.stats = {
             'ui_updates': 0,
             'log_updates': 0,
             'data_updates': 0,
+            'tick_updates': 0,
+            'data_coalesced': 0,
+            'tick_coalesced': 0,
             'error_count': 0,
             'last_update_time': None
         }
         
         # 批次處理設定
-        self.max_batch_size = 10  # 每次最多處理10個訊息
+        self.max_batch_size = 50  # 每幀最多處理50個訊息
         
         logger.info("UIUpdateManager 初始化完成")
     
@@ -88,6 +96,23 @@ class UIUpdateManager:
             self.data_callbacks.remove(callback)
             logger.info(f"已移除資料更新回調: {callback.__name__}")
     
+    def add_tick_callback(self, callback: Callable[[TickData], None]):
+        """
+        添加最新Tick顯示回調函數
+        
+        Args:
+            callback: 回調函數，每幀最多呼叫一次，只收到該幀最新的 TickData
+        """
+        if callback not in self.tick_callbacks:
+            self.tick_callbacks.append(callback)
+            logger.info(f"已添加Tick顯示回調: {callback.__name__}")
+    
+    def remove_tick_callback(self, callback: Callable[[TickData], None]):
+        """移除最新Tick顯示回調函數"""
+        if callback in self.tick_callbacks:
+            self.tick_callbacks.remove(callback)
+            logger.info(f"已移除Tick顯示回調: {callback.__name__}")
+    
     def start_updates(self):
         """啟動UI更新循環"""
         if self.running:
@@ -119,25 +144,39 @@ class UIUpdateManager:
             self.after_id = self.root.after(self.update_interval, self._update_ui)
     
     def _update_ui(self):
-        """主要UI更新函數 (在主線程中運行)"""
+        """主要UI更新函數 (在主線程中運行，每幀一次)"""
         try:
-            # 批次處理日誌訊息
-            processed_count = 0
+            refreshed = False
             
-            while processed_count < self.max_batch_size:
-                log_msg = self.queue_manager.get_log_message(timeout=0.001)
-                
-                if log_msg is None:
-                    break  # 沒有更多訊息
-                
-                # 調用所有日誌回調函數
+            # 批次處理日誌訊息 (非阻塞，不在主線程等待)
+            messages = self.queue_manager.drain_log_messages(self.max_batch_size)
+            for log_msg in messages:
                 self._process_log_message(log_msg)
-                processed_count += 1
+            if messages:
+                self.stats['log_updates'] += len(messages)
+                refreshed = True
+            
+            # 行情只顯示最新一筆
+            if self.tick_callbacks:
+                version, tick_data = self.queue_manager.get_latest_tick()
+                if version != self._tick_version and tick_data is not None:
+                    if version > self._tick_version + 1:
+                        self.stats['tick_coalesced'] += version - self._tick_version - 1
+                    self._tick_version = version
+                    self._dispatch(self.tick_callbacks, tick_data, "Tick顯示")
+                    self.stats['tick_updates'] += 1
+                    refreshed = True
+            
+            data = self._pending_data
+            if data is not None:
+                self._pending_data = None
+                self._dispatch(self.data_callbacks, data, "資料")
+                self.stats['data_updates'] += 1
+                refreshed = True
             
             # 更新統計
-            if processed_count > 0:
+            if refreshed:
                 self.stats['ui_updates'] += 1
-                self.stats['log_updates'] += processed_count
                 self.stats['last_update_time'] = datetime.now()
             
         except Exception as e:
@@ -151,6 +190,14 @@ class UIUpdateManager:
             # 排程下一次更新
             self._schedule_next_update()
     
+    def _dispatch(self, callbacks, data, kind: str):
+        """呼叫顯示回調，單一回調錯誤不影響其他回調"""
+        for callback in callbacks:
+            try:
+                callback(data)
+            except Exception as callback_error:
+                logger.error(f"{kind}回調錯誤 ({callback.__name__}): {str(callback_error)}")
+    
     def _process_log_message(self, log_msg: LogMessage):
         """
         處理單個日誌訊息
@@ -171,19 +218,22 @@ class UIUpdateManager:
     
     def update_data_display(self, data: Dict[str, Any]):
         """
-        更新資料顯示 (從外部調用)
+        更新資料顯示 (從外部調用，可在任何線程)
+        
+        更新循環運行中時只保留最新一筆，於下一幀顯示；
+        未運行時直接呼叫資料回調
         
         Args:
             data: 要顯示的資料字典
         """
+        if self.running:
+            if self._pending_data is not None:
+                self.stats['data_coalesced'] += 1
+            self._pending_data = data
+            return
+        
         try:
-            # 調用所有資料回調函數
-            for callback in self.data_callbacks:
-                try:
-                    callback(data)
-                except Exception as callback_error:
-                    logger.error(f"資料回調錯誤 ({callback.__name__}): {str(callback_error)}")
-            
+            self._dispatch(self.data_callbacks, data, "資料")
             self.stats['data_updates'] += 1
             
         except Exception as e:
@@ -212,6 +262,7 @@ class UIUpdateManager:
             'update_interval': self.update_interval,
             'log_callback_count': len(self.log_callbacks),
             'data_callback_count': len(self.data_callbacks),
+            'tick_callback_count': len(self.tick_callbacks),
             'stats': self.stats.copy(),
             'queue_status': self.queue_manager.get_queue_status()
         }
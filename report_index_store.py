@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+報告索引核心 (四個分析套件共用) - 報告產生時寫入元數據與關鍵指標，報告管理頁只讀索引
+
+🎯 目的：
+    /reports 頁面原本對 reports/*.html 逐一整檔讀取再字串切割 交易口數/總交易次數/勝率，
+    報告內嵌圖表動輒數 MB，幾百個報告就要好幾秒。
+    改為報告產生時把指標寫入 reports/report_index.sqlite 的一筆記錄，
+    頁面以 SQL 完成分頁、排序與篩選，不再開啟任何報告檔。
+
+🔄 與目錄同步：
+    每次查詢前只比對目錄中的檔名 (不讀內容)：
+    - 索引中沒有的報告 (舊版報告、手動複製進來的) 讀一次內容補建索引，之後不再讀
+    - 檔案已不存在的記錄自動移除
+
+📐 用法 (各套件的 report_index.py 只是轉出本模組，索引結構與舊報告解析規則只維護這一份)：
+    record_report(report_filename, trade_lots=3, total_trades=136, win_rate=97.06, total_pnl=4062.2)
+    ReportIndex('reports').query(page=1, per_page=50, sort='total_pnl', order='desc', keyword='enhanced')
+
+作者：量化分析團隊
+日期：2025-07-18
+"""
+
+import logging
+import math
+import os
+import re
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "report_index.sqlite"
+REPORT_SUFFIX = ".html"
+
+# 可排序欄位 (白名單，直接組入 ORDER BY)
+SORT_COLUMNS = ('created_time', 'filename', 'size', 'trade_lots', 'total_trades',
+                'win_rate', 'total_pnl', 'max_drawdown')
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+_NUMBER = re.compile(r'[-+]?\d+(?:\.\d+)?')
+
+# 補建舊報告索引時的擷取規則：(欄位, 正則)；依序嘗試，取第一個符合者
+_LEGACY_PATTERNS = (
+    ('trade_lots', re.compile(r'交易口數:\s*([^<\n]+)')),
+    ('total_trades', re.compile(r'總交易次數:\s*([^<\n]+)')),
+    ('win_rate', re.compile(r'勝率:\s*([^<\n]+)')),
+    ('total_pnl', re.compile(r'總損益:\s*([^<\n]+)')),
+    # 簡易報告的統計卡片：數值在標籤之前
+    ('total_trades', re.compile(r'stat-value">([^<]*)</div>\s*<div class="stat-label">總交易次數<')),
+    ('win_rate', re.compile(r'stat-value">([^<]*)</div>\s*<div class="stat-label">勝率<')),
+    ('total_pnl', re.compile(r'stat-value">([^<]*)</div>\s*<div class="stat-label">總損益<')),
+)
+_LEGACY_DATE_RANGE = re.compile(r'回測期間:\s*(\d{4}-\d{2}-\d{2})\s*至\s*(\d{4}-\d{2}-\d{2})')
+
+
+def _to_number(value) -> Optional[float]:
+    """'97.06%'、'3 口'、136、numpy 數值 → float；'N/A'、None、NaN → None"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        number = float(value)
+    else:
+        match = _NUMBER.search(str(value).replace(',', ''))
+        if not match:
+            return None
+        number = float(match.group(0))
+    return None if math.isnan(number) or math.isinf(number) else number
+
+
+def _to_int(value) -> Optional[int]:
+    number = _to_number(value)
+    return None if number is None else int(number)
+
+
+def report_type_of(filename: str) -> str:
+    """由檔名前綴判斷報告類型 (enhanced_report_* / backtest_report_*)"""
+    for prefix in ('enhanced', 'backtest'):
+        if filename.startswith(f"{prefix}_report_"):
+            return prefix
+    return 'other'
+
+
+def parse_report_metadata(report_path: str) -> Dict:
+    """
+    從報告 HTML 擷取指標 (只用於補建索引，每個檔案最多讀一次)
+
+    Returns:
+        Dict: record() 可接受的關鍵字參數
+    """
+    with open(report_path, 'r', encoding='utf-8', errors='replace') as f:
+        content = f.read()
+
+    metrics: Dict = {}
+    for name, pattern in _LEGACY_PATTERNS:
+        if name in metrics:
+            continue
+        match = pattern.search(content)
+        if match and _to_number(match.group(1)) is not None:
+            metrics[name] = match.group(1).strip()
+
+    date_range = _LEGACY_DATE_RANGE.search(content)
+    if date_range:
+        metrics['start_date'], metrics['end_date'] = date_range.groups()
+    return metrics
+
+
+class ReportIndex:
+    """
+    reports 目錄的報告索引
+
+    主鍵為檔名 (報告目錄中唯一)；數值欄位以數字保存以便排序與篩選，
+    查詢結果再轉為頁面顯示用的字串 (缺值顯示 N/A)。
+    """
+
+    def __init__(self, reports_dir: str = "reports"):
+        self.reports_dir = reports_dir
+        self.db_path = os.path.join(reports_dir, INDEX_FILENAME)
+        os.makedirs(reports_dir, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS reports (
+                    filename TEXT PRIMARY KEY,
+                    report_type TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_time TEXT NOT NULL,
+                    trade_lots INTEGER,
+                    start_date TEXT,
+                    end_date TEXT,
+                    total_trades INTEGER,
+                    win_rate REAL,
+                    total_pnl REAL,
+                    max_drawdown REAL,
+                    indexed_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_created_time ON reports (created_time)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _row(self, report_path: str, trade_lots=None, start_date=None, end_date=None, total_trades=None,
+             win_rate=None, total_pnl=None, max_drawdown=None) -> tuple:
+        stat = os.stat(report_path)
+        filename = os.path.basename(report_path)
+        return (filename, report_type_of(filename), stat.st_size,
+                datetime.fromtimestamp(stat.st_ctime).isoformat(timespec='seconds'),
+                _to_int(trade_lots), str(start_date) if start_date else None, str(end_date) if end_date else None,
+                _to_int(total_trades), _to_number(win_rate), _to_number(total_pnl), _to_number(max_drawdown),
+                datetime.now().isoformat(timespec='seconds'))
+
+    def record(self, report_path: str, **metrics):
+        """
+        寫入 (或覆蓋) 一份報告的索引記錄
+
+        Args:
+            report_path: 報告檔路徑 (需位於本索引的報告目錄)
+            metrics: trade_lots, start_date, end_date, total_trades, win_rate (百分比), total_pnl, max_drawdown；
+                     可為數字或 '97.06%' 這類字串
+        """
+        row = self._row(report_path, **metrics)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+
+    def remove(self, filename: str):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM reports WHERE filename = ?", (filename,))
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM reports")
+
+    def sync(self) -> Dict[str, int]:
+        """
+        依目錄檔名校正索引：補建缺少的記錄、移除已刪除檔案的記錄
+
+        Returns:
+            Dict: {'added': 補建筆數, 'removed': 移除筆數}
+        """
+        with os.scandir(self.reports_dir) as entries:
+            on_disk = {entry.name for entry in entries if entry.name.endswith(REPORT_SUFFIX) and entry.is_file()}
+        with closing(self._connect()) as conn:
+            indexed = {row[0] for row in conn.execute("SELECT filename FROM reports")}
+
+        missing = sorted(on_disk - indexed)
+        stale = indexed - on_disk
+        rows = []
+        for filename in missing:
+            report_path = os.path.join(self.reports_dir, filename)
+            try:
+                rows.append(self._row(report_path, **parse_report_metadata(report_path)))
+            except Exception as e:
+                logger.warning(f"⚠️ 報告索引補建失敗 {filename}: {e}")
+
+        if rows or stale:
+            with closing(self._connect()) as conn, conn:
+                conn.executemany("INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                conn.executemany("DELETE FROM reports WHERE filename = ?", [(name,) for name in stale])
+        if rows:
+            logger.info(f"📇 報告索引補建 {len(rows)} 筆")
+        return {'added': len(rows), 'removed': len(stale)}
+
+    def query(self, page: int = 1, per_page: int = DEFAULT_PER_PAGE, sort: str = 'created_time',
+              order: str = 'desc', keyword: str = '', report_type: str = '',
+              trade_lots: Optional[int] = None, sync: bool = True) -> Dict:
+        """
+        分頁查詢報告列表
+
+        Args:
+            page: 頁碼 (從 1 開始，超出範圍時取最後一頁)
+            per_page: 每頁筆數 (上限 MAX_PER_PAGE)
+            sort: SORT_COLUMNS 之一，其他值視為 created_time
+            order: 'asc' 或 'desc'
+            keyword: 檔名包含的文字
+            report_type: 'enhanced' / 'backtest' / 'other'，空字串為全部
+            trade_lots: 只列出指定交易口數
+            sync: 查詢前先與目錄檔名同步
+
+        Returns:
+            Dict: {'reports': [頁面顯示用的記錄], 'total', 'page', 'per_page', 'pages'}
+        """
+        if sync:
+            self.sync()
+
+        sort = sort if sort in SORT_COLUMNS else 'created_time'
+        direction = 'ASC' if str(order).lower() == 'asc' else 'DESC'
+        per_page = max(1, min(int(per_page or DEFAULT_PER_PAGE), MAX_PER_PAGE))
+
+        conditions: List[str] = []
+        params: List = []
+        if keyword:
+            conditions.append("filename LIKE ? ESCAPE '\\'")
+            escaped = keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f"%{escaped}%")
+        if report_type:
+            conditions.append("report_type = ?")
+            params.append(report_type)
+        if trade_lots is not None:
+            conditions.append("trade_lots = ?")
+            params.append(int(trade_lots))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            total = conn.execute(f"SELECT COUNT(*) FROM reports {where}", params).fetchone()[0]
+            pages = max(1, math.ceil(total / per_page))
+            page = max(1, min(int(page or 1), pages))
+            # 缺值一律排在最後；同值依檔名排序，分頁結果穩定
+            rows = conn.execute(
+                f"SELECT * FROM reports {where} ORDER BY {sort} IS NULL, {sort} {direction}, filename {direction} "
+                f"LIMIT ? OFFSET ?", params + [per_page, (page - 1) * per_page]).fetchall()
+
+        return {'reports': [self._display(row) for row in rows], 'total': total,
+                'page': page, 'per_page': per_page, 'pages': pages}
+
+    def _display(self, row: sqlite3.Row) -> Dict:
+        """轉為報告管理頁使用的欄位 (與原 get_report_metadata 相同的鍵)"""
+        def text(value, fmt="{}"):
+            return 'N/A' if value is None else fmt.format(value)
+
+        return {
+            'filename': row['filename'],
+            'filepath': os.path.join(self.reports_dir, row['filename']),
+            'report_type': row['report_type'],
+            'size': row['size'],
+            'created_time': datetime.fromisoformat(row['created_time']),
+            'trade_lots': text(row['trade_lots']),
+            'date_range': f"{row['start_date']} ~ {row['end_date']}" if row['start_date'] else 'N/A',
+            'total_trades': text(row['total_trades']),
+            'win_rate': text(row['win_rate'], "{:.2f}%"),
+            'total_pnl': text(row['total_pnl'], "{:.1f}"),
+            'max_drawdown': text(row['max_drawdown'], "{:.1f}"),
+        }
+
+
+def record_report(report_path: str, **metrics) -> bool:
+    """
+    報告產生後寫入索引；失敗只記錄警告，不影響報告本身
+
+    Returns:
+        bool: 是否寫入成功
+    """
+    try:
+        ReportIndex(os.path.dirname(report_path) or '.').record(report_path, **metrics)
+        return True
+    except Exception as e:
+        logger.warning(f"⚠️ 報告索引寫入失敗 {report_path}: {e}")
+        return False
@@ -6,15 +6,24 @@ MDD 優化器 GUI 介面
 完全不修改現有回測邏輯，只是提供 GUI 參數輸入
 """
 
-from flask import Flask, render_template_string, request, jsonify, send_file
+from flask import Flask, Response, render_template_string, request, jsonify, send_file
 import subprocess
 import json
 import os
+import re
+import sys
+import tempfile
 import threading
 import logging
 from datetime import datetime
 from pathlib import Path
 
+# 添加父目錄到路徑以導入進度串流模組
+parent_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(parent_dir))
+
+from progress_stream import LogBatcher, LogTail, ProgressStream, ProgressTracker, Throttle, TopN
+
 # 設定日誌
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -28,11 +37,26 @@ experiment_status = {
     'completed': False,
     'error': None,
     'result': None,
-    'log_content': '',
     'start_time': None,
     'parsed_results': None
 }
 
+# 瀏覽器即時日誌與 /status 回傳的行數
+LIVE_LOG_LINES = 500
+
+# 實驗進行中即時排行的筆數
+LIVE_TOP_N = 10
+
+# 進度串流 (SSE)：伺服器只保留最後幾行日誌，完整輸出寫入暫存檔，結束後再逐行解析結果
+progress_stream = ProgressStream()
+experiment_log = LogTail(max_lines=LIVE_LOG_LINES)
+# 日誌行每秒最多合併成一個 log 事件 (與進度、排行同頻率)
+log_batch = LogBatcher(progress_stream, 1.0)
+live_results = None
+
+# 完整輸出暫存檔 (每次實驗覆寫)
+LOG_SPOOL_FILE = os.path.join(tempfile.gettempdir(), f"mdd_gui_{os.getpid()}.log")
+
 HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="zh-TW">
@@ -91,6 +115,7 @@ HTML_TEMPLATE = """
         <div id="statusPanel" class="status-panel">
             <h3>📊 執行狀態</h3>
             <div id="statusContent">就緒 - 請設定參數後執行實驗</div>
+            <div id="progressInfo" style="margin-top: 8px;"></div>
         </div>
 
         <!-- 參數設定 -->
@@ -263,6 +288,8 @@ HTML_TEMPLATE = """
     <script>
         // 全域變數
         let statusCheckInterval = null;
+        let eventSource = null;
+        const LIVE_LOG_LINES = {{ live_log_lines }};
 
         // 解析進場模式的輔助函數
         function getEntryModeFromExperimentId(experimentId) {
@@ -369,29 +396,109 @@ HTML_TEMPLATE = """
             return true;
         }
 
-        // 開始狀態檢查
+        // 開始狀態檢查 (已透過 SSE 接收時不需輪詢)
         function startStatusCheck() {
+            if (eventSource) {
+                return;
+            }
             statusCheckInterval = setInterval(checkStatus, 2000);
         }
 
-        // 檢查執行狀態
+        // 檢查執行狀態 (瀏覽器不支援 SSE 時使用)
         function checkStatus() {
             fetch('/status')
                 .then(response => response.json())
-                .then(data => {
-                    updateStatus(data.status, data.message);
-                    updateLog(data.log_content);
+                .then(applyStatus);
+        }
 
-                    // 如果有解析後的結果，顯示它們
-                    if (data.parsed_results) {
-                        displayParsedResults(data.parsed_results);
-                    }
+        // 套用執行狀態
+        function applyStatus(data) {
+            updateStatus(data.status, data.message);
+            if (data.log_content !== undefined) {
+                updateLog(data.log_content);
+            }
+            updateProgress(data.progress);
 
-                    if (data.status === 'completed' || data.status === 'error') {
-                        stopStatusCheck();
-                        resetButtons();
-                    }
-                });
+            // 如果有解析後的結果，顯示它們；執行中則顯示目前排行
+            if (data.parsed_results) {
+                displayParsedResults(data.parsed_results);
+            } else if (data.top) {
+                displayLiveTop(data.top);
+            }
+
+            if (data.status === 'running') {
+                document.getElementById('runBtn').disabled = true;
+                document.getElementById('stopBtn').disabled = false;
+            } else if (data.status === 'completed' || data.status === 'error') {
+                stopStatusCheck();
+                resetButtons();
+            }
+        }
+
+        // 秒數格式化為 分:秒
+        function formatSeconds(seconds) {
+            if (seconds === null || seconds === undefined) return '--:--';
+            const total = Math.round(seconds);
+            return Math.floor(total / 60) + ':' + String(total % 60).padStart(2, '0');
+        }
+
+        // 更新實驗進度 (完成數、失敗數、預估剩餘時間)
+        function updateProgress(progress) {
+            const info = document.getElementById('progressInfo');
+            if (!progress || !progress.total) {
+                info.textContent = '';
+                return;
+            }
+            info.textContent = `🧪 已完成 ${progress.completed}/${progress.total} 個實驗 (${progress.percent}%)` +
+                ` · 失敗 ${progress.failed} · 已執行 ${formatSeconds(progress.elapsed)}` +
+                ` · 預估剩餘 ${formatSeconds(progress.eta_seconds)}`;
+        }
+
+        // 附加即時日誌 (只保留最後 LIVE_LOG_LINES 行)
+        function appendLog(lines) {
+            const logContainer = document.getElementById('logContainer');
+            const text = logContainer.textContent.trim();
+            const current = (text && text !== '等待執行...') ? logContainer.textContent.split('\\n') : [];
+            logContainer.textContent = current.concat(lines).slice(-LIVE_LOG_LINES).join('\\n');
+            logContainer.scrollTop = logContainer.scrollHeight;
+        }
+
+        // 新的一次實驗：清除上一次的日誌與結果
+        function resetResults() {
+            document.getElementById('logContainer').textContent = '';
+            document.getElementById('progressInfo').textContent = '';
+            document.getElementById('resultsCard').style.display = 'none';
+            ['timeIntervalResults', 'recommendationsTable', 'mddTop10Table', 'riskAdjustedTop10Table',
+             'longPnlTop10Table', 'shortPnlTop10Table'].forEach(id => {
+                document.getElementById(id).innerHTML = '';
+            });
+        }
+
+        // 實驗進行中即時顯示目前的前 10 名 (完成後由完整結果取代)
+        function displayLiveTop(top) {
+            if (!top || top.mdd_top10.length === 0) {
+                return;
+            }
+            document.getElementById('resultsCard').style.display = 'block';
+            displayMddTop10(top.mdd_top10, document.getElementById('mddTop10Table'));
+            displayRiskAdjustedTop10(top.risk_adjusted_top10, document.getElementById('riskAdjustedTop10Table'));
+        }
+
+        // 以 SSE 接收狀態、進度、日誌與排行 (斷線時瀏覽器自動重連並補送)
+        function connectStream() {
+            eventSource = new EventSource('/stream');
+            eventSource.addEventListener('snapshot', e => applyStatus(JSON.parse(e.data)));
+            eventSource.addEventListener('status', e => {
+                const data = JSON.parse(e.data);
+                if (data.reset) {
+                    resetResults();
+                }
+                applyStatus(data);
+            });
+            eventSource.addEventListener('progress', e => updateProgress(JSON.parse(e.data)));
+            eventSource.addEventListener('log', e => appendLog(JSON.parse(e.data).lines));
+            eventSource.addEventListener('top', e => displayLiveTop(JSON.parse(e.data)));
+            eventSource.addEventListener('results', e => displayParsedResults(JSON.parse(e.data)));
         }
 
         // 停止狀態檢查
@@ -798,6 +905,11 @@ HTML_TEMPLATE = """
         function viewResults() {
             window.open('/results', '_blank');
         }
+
+        // 優先使用 SSE，不支援時於實驗啟動後每2秒輪詢一次狀態
+        if (window.EventSource) {
+            connectStream();
+        }
     </script>
 </body>
 </html>
@@ -806,7 +918,7 @@ HTML_TEMPLATE = """
 @app.route('/')
 def index():
     """主頁面"""
-    return render_template_string(HTML_TEMPLATE)
+    return render_template_string(HTML_TEMPLATE, live_log_lines=LIVE_LOG_LINES)
 
 @app.route('/run_experiment', methods=['POST'])
 def run_experiment():
@@ -826,9 +938,10 @@ def run_experiment():
             'completed': False,
             'error': None,
             'result': None,
-            'log_content': '',
-            'start_time': datetime.now()
+            'start_time': datetime.now(),
+            'parsed_results': None
         }
+        start_progress_stream()
         
         # 在背景線程執行實驗
         thread = threading.Thread(target=run_experiment_thread, args=(params,))
@@ -841,6 +954,29 @@ def run_experiment():
         logger.error(f"啟動實驗失敗: {e}")
         return jsonify({'status': 'error', 'message': f'啟動失敗: {str(e)}'})
 
+def start_progress_stream():
+    """新的一次實驗：清除上一次的事件、日誌與排行，完整輸出改寫入暫存檔"""
+    global experiment_log, live_results
+    progress_stream.reset()
+    experiment_log.close()
+    experiment_log = LogTail(max_lines=LIVE_LOG_LINES, spool_path=LOG_SPOOL_FILE)
+    live_results = ExperimentProgress()
+    publish_status(reset=True)
+
+def log_message(text):
+    """寫入實驗日誌並推送給瀏覽器"""
+    log_batch.add(experiment_log.append(text))
+
+def publish_status(reset=False):
+    """推送狀態變更 (reset=True 表示新的一次實驗開始)；先送出尚未發送的日誌行"""
+    log_batch.flush()
+    progress_stream.publish('status', dict(public_status(include_log=False), reset=reset))
+
+def publish_live_results():
+    """推送實驗進度與目前排行"""
+    progress_stream.publish('progress', live_results.snapshot())
+    progress_stream.publish('top', live_results.top_tables())
+
 def run_experiment_thread(params):
     """在背景線程執行實驗"""
     global experiment_status
@@ -853,9 +989,9 @@ def run_experiment_thread(params):
         with open(config_file, 'w', encoding='utf-8') as f:
             json.dump(config_data, f, ensure_ascii=False, indent=2)
 
-        experiment_status['log_content'] += f"[{datetime.now().strftime('%H:%M:%S')}] 開始執行 MDD 優化實驗\n"
-        experiment_status['log_content'] += f"[{datetime.now().strftime('%H:%M:%S')}] 配置已保存到 {config_file}\n"
-        experiment_status['log_content'] += f"[{datetime.now().strftime('%H:%M:%S')}] 參數: {params}\n"
+        log_message(f"[{datetime.now().strftime('%H:%M:%S')}] 開始執行 MDD 優化實驗\n")
+        log_message(f"[{datetime.now().strftime('%H:%M:%S')}] 配置已保存到 {config_file}\n")
+        log_message(f"[{datetime.now().strftime('%H:%M:%S')}] 參數: {params}\n")
 
         # 執行 enhanced_mdd_optimizer.py --config time_interval_analysis
         max_workers = params.get('max_workers', 6)  # 預設 6 線程
@@ -865,16 +1001,16 @@ def run_experiment_thread(params):
             '--max-workers', str(max_workers)
         ]
 
-        experiment_status['log_content'] += f"[{datetime.now().strftime('%H:%M:%S')}] 執行命令: {' '.join(cmd)}\n"
-        experiment_status['log_content'] += f"[{datetime.now().strftime('%H:%M:%S')}] 工作目錄: {os.path.dirname(os.path.abspath(__file__))}\n"
+        log_message(f"[{datetime.now().strftime('%H:%M:%S')}] 執行命令: {' '.join(cmd)}\n")
+        log_message(f"[{datetime.now().strftime('%H:%M:%S')}] 工作目錄: {os.path.dirname(os.path.abspath(__file__))}\n")
 
         # 暫時修改 mdd_search_config.py 來使用我們的參數
-        experiment_status['log_content'] += f"[{datetime.now().strftime('%H:%M:%S')}] 正在修改配置檔案...\n"
+        log_message(f"[{datetime.now().strftime('%H:%M:%S')}] 正在修改配置檔案...\n")
         modify_config_temporarily(config_data)
-        experiment_status['log_content'] += f"[{datetime.now().strftime('%H:%M:%S')}] 配置檔案修改完成\n"
+        log_message(f"[{datetime.now().strftime('%H:%M:%S')}] 配置檔案修改完成\n")
 
         try:
-            experiment_status['log_content'] += f"[{datetime.now().strftime('%H:%M:%S')}] 開始執行回測...\n"
+            log_message(f"[{datetime.now().strftime('%H:%M:%S')}] 開始執行回測...\n")
 
             # 使用 Popen 來即時捕獲輸出
             process = subprocess.Popen(
@@ -888,57 +1024,63 @@ def run_experiment_thread(params):
                 universal_newlines=True
             )
 
-            # 即時讀取輸出
+            # 即時讀取輸出：逐行推送日誌，解析實驗完成行更新進度與排行
+            throttle = Throttle(1.0)
             while True:
                 output = process.stdout.readline()
                 if output == '' and process.poll() is not None:
                     break
                 if output:
-                    experiment_status['log_content'] += output
+                    log_message(output)
+                    if live_results.feed(output) and throttle.ready():
+                        publish_live_results()
                     print(f"[MDD GUI] {output.strip()}")  # 也輸出到控制台
+            publish_live_results()
 
             return_code = process.poll()
-            experiment_status['log_content'] += f"[{datetime.now().strftime('%H:%M:%S')}] 執行完成，返回碼: {return_code}\n"
+            log_message(f"[{datetime.now().strftime('%H:%M:%S')}] 執行完成，返回碼: {return_code}\n")
 
             if return_code == 0:
                 experiment_status['completed'] = True
                 experiment_status['result'] = '實驗執行成功'
-                experiment_status['log_content'] += f"[{datetime.now().strftime('%H:%M:%S')}] ✅ 實驗執行成功！\n"
+                log_message(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ 實驗執行成功！\n")
 
-                # 解析結果
-                parsed_results = parse_experiment_results(experiment_status['log_content'])
+                # 解析結果 (從暫存檔逐行讀取完整輸出)
+                parsed_results = parse_experiment_results(experiment_log.iter_lines())
                 experiment_status['parsed_results'] = parsed_results
+                progress_stream.publish('results', parsed_results)
 
                 # 調試信息
-                experiment_status['log_content'] += f"[{datetime.now().strftime('%H:%M:%S')}] 解析結果統計:\n"
-                experiment_status['log_content'] += f"  - 時間區間: {len(parsed_results.get('time_intervals', []))}\n"
-                experiment_status['log_content'] += f"  - 一日建議: {len(parsed_results.get('recommendations', []))}\n"
-                experiment_status['log_content'] += f"  - MDD TOP 10: {len(parsed_results.get('mdd_top10', []))}\n"
-                experiment_status['log_content'] += f"  - 風險調整收益 TOP 10: {len(parsed_results.get('risk_adjusted_top10', []))}\n"
-                experiment_status['log_content'] += f"  - LONG PNL TOP 10: {len(parsed_results.get('long_pnl_top10', []))}\n"
-                experiment_status['log_content'] += f"  - SHORT PNL TOP 10: {len(parsed_results.get('short_pnl_top10', []))}\n"
+                log_message(f"[{datetime.now().strftime('%H:%M:%S')}] 解析結果統計:\n")
+                log_message(f"  - 時間區間: {len(parsed_results.get('time_intervals', []))}\n")
+                log_message(f"  - 一日建議: {len(parsed_results.get('recommendations', []))}\n")
+                log_message(f"  - MDD TOP 10: {len(parsed_results.get('mdd_top10', []))}\n")
+                log_message(f"  - 風險調整收益 TOP 10: {len(parsed_results.get('risk_adjusted_top10', []))}\n")
+                log_message(f"  - LONG PNL TOP 10: {len(parsed_results.get('long_pnl_top10', []))}\n")
+                log_message(f"  - SHORT PNL TOP 10: {len(parsed_results.get('short_pnl_top10', []))}\n")
             else:
                 experiment_status['error'] = f'執行失敗，返回碼: {return_code}'
-                experiment_status['log_content'] += f"[{datetime.now().strftime('%H:%M:%S')}] ❌ 執行失敗\n"
+                log_message(f"[{datetime.now().strftime('%H:%M:%S')}] ❌ 執行失敗\n")
 
         finally:
             # 恢復原始配置
-            experiment_status['log_content'] += f"[{datetime.now().strftime('%H:%M:%S')}] 正在恢復原始配置...\n"
+            log_message(f"[{datetime.now().strftime('%H:%M:%S')}] 正在恢復原始配置...\n")
             restore_original_config()
-            experiment_status['log_content'] += f"[{datetime.now().strftime('%H:%M:%S')}] 原始配置已恢復\n"
+            log_message(f"[{datetime.now().strftime('%H:%M:%S')}] 原始配置已恢復\n")
 
         # 清理臨時檔案
         if os.path.exists(config_file):
             os.remove(config_file)
-            experiment_status['log_content'] += f"[{datetime.now().strftime('%H:%M:%S')}] 臨時檔案已清理\n"
+            log_message(f"[{datetime.now().strftime('%H:%M:%S')}] 臨時檔案已清理\n")
 
     except Exception as e:
         experiment_status['error'] = f'執行錯誤: {str(e)}'
-        experiment_status['log_content'] += f"[{datetime.now().strftime('%H:%M:%S')}] ❌ 錯誤: {str(e)}\n"
+        log_message(f"[{datetime.now().strftime('%H:%M:%S')}] ❌ 錯誤: {str(e)}\n")
         print(f"[MDD GUI ERROR] {str(e)}")  # 也輸出到控制台
     finally:
         experiment_status['running'] = False
-        experiment_status['log_content'] += f"[{datetime.now().strftime('%H:%M:%S')}] 實驗線程結束\n"
+        log_message(f"[{datetime.now().strftime('%H:%M:%S')}] 實驗線程結束\n")
+        publish_status()
 
 def create_temp_config(params):
     """建立臨時配置"""
@@ -1027,8 +1169,94 @@ def restore_original_config():
             f.write(original_config_backup)
         original_config_backup = None
 
+class ExperimentProgress:
+    """
+    從優化器輸出即時解析實驗進度與部分排行
+
+    每個實驗完成時輸出 "✅ 實驗 <id> 完成 - MDD: x, P&L: y, LONG: a, SHORT: b"，失敗時輸出 "❌ 實驗 ..."；
+    總數取自 "📊 生成了 N 個實驗組合" (隨機抽樣時為抽樣數)。排行只保留前 N 名，不需保留完整日誌。
+    """
+
+    TOTAL_PATTERN = re.compile(r'📊 生成了 (\d+) 個實驗組合')
+    SAMPLE_PATTERN = re.compile(r'🎯 隨機選擇 (\d+) 個實驗')
+    PROGRESS_PATTERN = re.compile(r'📈 進度: (\d+)/(\d+)')
+    DONE_PATTERN = re.compile(r'✅ 實驗 (\S+) 完成 - MDD: ([^,]+), P&L: ([^,]+), LONG: ([^,]+), SHORT: (\S+)')
+    FAILED_PATTERN = re.compile(r'❌ 實驗(?: \S+ |執行異常)')
+    # 例: 09:0009:02_L1SL15_L2SL25_L3SL35_TP40_BL
+    EXPERIMENT_ID_PATTERN = re.compile(
+        r'^(\d{2}:\d{2})(\d{2}:\d{2})_(L1SL.+?)(?:_(RangeBoundary|TP\d+))?(?:_[A-Z]{2})?$')
+
+    def __init__(self, top_n=LIVE_TOP_N):
+        self.tracker = ProgressTracker()
+        self.failed = 0
+        self.mdd_top = TopN(top_n, key=lambda row: row['mdd'])  # MDD 是負數，越大越好
+        self.risk_adjusted_top = TopN(top_n, key=lambda row: row['ratio'])
+
+    def feed(self, line):
+        """處理一行輸出，回傳進度或排行是否有變動"""
+        match = self.DONE_PATTERN.search(line)
+        if match:
+            self.tracker.update(step=1)
+            row = self._result_row(*match.groups())
+            self.mdd_top.push(row)
+            self.risk_adjusted_top.push(row)
+            return True
+        if self.FAILED_PATTERN.search(line):
+            self.failed += 1
+            self.tracker.update(step=1)
+            return True
+        match = self.PROGRESS_PATTERN.search(line)
+        if match:
+            self.tracker.set_total(int(match.group(2)))
+            self.tracker.update(completed=int(match.group(1)))
+            return True
+        match = self.SAMPLE_PATTERN.search(line) or self.TOTAL_PATTERN.search(line)
+        if match:
+            self.tracker.set_total(int(match.group(1)))
+            return True
+        return False
+
+    def _result_row(self, experiment_id, mdd, pnl, long_pnl, short_pnl):
+        """組成與最終 TOP 10 表格相同欄位的資料列"""
+        def to_float(text):
+            try:
+                return float(text)
+            except ValueError:
+                return 0.0  # LONG/SHORT 可能為 None
+
+        mdd, pnl = to_float(mdd), to_float(pnl)
+        time_part, params_part, strategy_part = '', experiment_id, ''
+        match = self.EXPERIMENT_ID_PATTERN.match(experiment_id)
+        if match:
+            time_part = f"{match.group(1)}-{match.group(2)}"
+            params_part = match.group(3).replace('_', ' ')
+            if match.group(4) == 'RangeBoundary':
+                strategy_part = '區間邊緣停利'
+            elif match.group(4):
+                strategy_part = match.group(4).replace('TP', 'TP:')
+        return {
+            'experiment_id': experiment_id,
+            'mdd': mdd,
+            'pnl': pnl,
+            'long_pnl': to_float(long_pnl),
+            'short_pnl': to_float(short_pnl),
+            'ratio': round(abs(pnl / mdd), 2) if mdd != 0 else 0,
+            'params': params_part,
+            'strategy': strategy_part,
+            'time': time_part
+        }
+
+    def top_tables(self):
+        return {
+            'mdd_top10': self.mdd_top.rows(),
+            'risk_adjusted_top10': self.risk_adjusted_top.rows()
+        }
+
+    def snapshot(self):
+        return dict(self.tracker.snapshot(), failed=self.failed)
+
 def parse_experiment_results(log_content):
-    """解析實驗結果"""
+    """解析實驗結果 (log_content 可為完整日誌字串，或逐行產生的可迭代物件)"""
     results = {
         'time_intervals': [],
         'recommendations': [],
@@ -1038,7 +1266,7 @@ def parse_experiment_results(log_content):
         'short_pnl_top10': []
     }
 
-    lines = log_content.split('\n')
+    lines = log_content.split('\n') if isinstance(log_content, str) else log_content
     current_interval = None
     parsing_mdd_top10 = False
     parsing_risk_top10 = False
@@ -1523,8 +1751,17 @@ def parse_experiment_results(log_content):
 @app.route('/status')
 def get_status():
     """獲取執行狀態"""
-    global experiment_status
-    
+    return jsonify(public_status())
+
+@app.route('/stream')
+def stream():
+    """Server-Sent Events：推送實驗狀態、進度、日誌與即時排行"""
+    return Response(progress_stream.sse(request.headers.get('Last-Event-ID'), snapshot=public_status),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def public_status(include_log=True):
+    """執行狀態 (日誌只含最後幾行)，供 /status 與 SSE 快照使用"""
     if experiment_status['running']:
         status = 'running'
         message = f"實驗執行中... (已執行 {(datetime.now() - experiment_status['start_time']).seconds} 秒)"
@@ -1538,12 +1775,16 @@ def get_status():
         status = 'ready'
         message = '就緒 - 請設定參數後執行實驗'
     
-    return jsonify({
+    data = {
         'status': status,
         'message': message,
-        'log_content': experiment_status['log_content'],
-        'parsed_results': experiment_status.get('parsed_results')
-    })
+        'parsed_results': experiment_status.get('parsed_results'),
+        'progress': live_results.snapshot() if live_results else None,
+        'top': live_results.top_tables() if live_results else None
+    }
+    if include_log:
+        data['log_content'] = experiment_log.text()
+    return data
 
 @app.route('/stop_experiment', methods=['POST'])
 def stop_experiment():
@@ -1551,6 +1792,7 @@ def stop_experiment():
     global experiment_status
     experiment_status['running'] = False
     experiment_status['error'] = '用戶手動停止'
+    publish_status()
     return jsonify({'status': 'stopped'})
 
 @app.route('/results')
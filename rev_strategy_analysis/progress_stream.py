@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+進度串流 - 以 Server-Sent Events (SSE) 推送執行進度、日誌與部分結果
+(事件代理、日誌節流與回測進度解析由專案根目錄的 progress_stream_core.py 共用實作)
+"""
+
+import os
+import sys
+
+# 添加專案根目錄到路徑
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from progress_stream_core import (DEFAULT_HISTORY, DEFAULT_LOG_LINES, HEARTBEAT_SECONDS, RETRY_MS, BacktestLogProgress,
+                                  LogBatcher, LogTail, ProgressStream, ProgressTracker, Throttle, TopN, format_sse)
+
+__all__ = ['DEFAULT_HISTORY', 'DEFAULT_LOG_LINES', 'HEARTBEAT_SECONDS', 'RETRY_MS', 'BacktestLogProgress',
+           'LogBatcher', 'LogTail', 'ProgressStream', 'ProgressTracker', 'Throttle', 'TopN', 'format_sse']
@@ -5,7 +5,7 @@
 使用Flask創建簡單的Web界面，避免Tkinter版本問題
 """
 
-from flask import Flask, render_template_string, request, jsonify, redirect, url_for, send_file
+from flask import Flask, Response, render_template_string, request, jsonify, redirect, url_for, send_file
 import subprocess
 import sys
 import os
@@ -13,8 +13,13 @@ import json
 import threading
 import glob
 import shutil
+import tempfile
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlencode
+
+from report_index import DEFAULT_PER_PAGE, SORT_COLUMNS, ReportIndex, record_report
+from progress_stream import BacktestLogProgress, LogBatcher, LogTail, ProgressStream, Throttle
 
 app = Flask(__name__)
 
@@ -28,6 +33,18 @@ backtest_status = {
     'report_file': None
 }
 
+# 瀏覽器即時日誌與 /status 回傳的行數
+LIVE_LOG_LINES = 200
+
+# 進度串流 (SSE)：回測輸出逐行推送給瀏覽器；伺服器只保留最後幾行，完整輸出寫入暫存檔
+progress_stream = ProgressStream()
+live_log = LogTail(max_lines=LIVE_LOG_LINES)
+backtest_logs = {'stdout': LogTail(max_lines=LIVE_LOG_LINES), 'stderr': LogTail(max_lines=LIVE_LOG_LINES)}
+backtest_progress = None
+
+# 完整輸出暫存檔 (每次回測覆寫)
+OUTPUT_SPOOL_TEMPLATE = os.path.join(tempfile.gettempdir(), f"rev_web_trading_gui_{os.getpid()}_{{stream}}.log")
+
 # HTML模板
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
@@ -202,6 +219,37 @@ HTML_TEMPLATE = '''
             color: #1976d2;
             font-weight: bold;
         }
+        .progress-panel {
+            margin-top: 15px;
+            padding: 10px 15px;
+            background-color: #f8f9fa;
+            border-radius: 5px;
+            font-size: 14px;
+        }
+        .progress-bar {
+            height: 8px;
+            margin: 8px 0;
+            background-color: #e9ecef;
+            border-radius: 4px;
+            overflow: hidden;
+        }
+        .progress-fill {
+            height: 100%;
+            width: 0;
+            background-color: #007bff;
+            transition: width 0.3s;
+        }
+        .live-log {
+            max-height: 240px;
+            overflow-y: auto;
+            padding: 10px;
+            background-color: #1e1e1e;
+            color: #d4d4d4;
+            font-family: monospace;
+            font-size: 12px;
+            white-space: pre-wrap;
+            border-radius: 5px;
+        }
     </style>
 </head>
 <body>
@@ -404,6 +452,13 @@ HTML_TEMPLATE = '''
 
         <!-- 狀態顯示 -->
         <div id="status" class="status ready">就緒</div>
+
+        <!-- 即時進度 (SSE) -->
+        <div id="progressPanel" class="progress-panel" style="display: none;">
+            <div id="progressText"></div>
+            <div class="progress-bar"><div id="progressFill" class="progress-fill"></div></div>
+            <div id="liveLog" class="live-log"></div>
+        </div>
     </div>
 
     <script>
@@ -585,41 +640,102 @@ HTML_TEMPLATE = '''
             URL.revokeObjectURL(url);
         }
 
-        // 定期檢查回測狀態
+        // 更新狀態顯示
+        function applyStatus(data) {
+            if (data.running) {
+                document.getElementById('status').className = 'status running';
+                document.getElementById('status').textContent = '正在執行回測...';
+                document.getElementById('runBtn').disabled = true;
+            } else if (data.completed) {
+                if (data.report_ready) {
+                    document.getElementById('status').className = 'status completed';
+                    document.getElementById('status').textContent = '回測完成 - 報告已準備';
+                    document.getElementById('reportBtn').disabled = false;
+                } else {
+                    document.getElementById('status').className = 'status running';
+                    document.getElementById('status').textContent = '正在生成報告...';
+                    document.getElementById('reportBtn').disabled = true;
+                }
+                document.getElementById('kellyBtn').disabled = false;
+                document.getElementById('runBtn').disabled = false;
+            } else if (data.error) {
+                document.getElementById('status').className = 'status error';
+                document.getElementById('status').textContent = '執行失敗: ' + data.error;
+                document.getElementById('runBtn').disabled = false;
+            } else {
+                document.getElementById('status').className = 'status ready';
+                document.getElementById('status').textContent = '就緒';
+                document.getElementById('runBtn').disabled = false;
+            }
+        }
+
+        // 輪詢回測狀態 (瀏覽器不支援 SSE 時使用)
         function checkStatus() {
             fetch('/status')
             .then(response => response.json())
-            .then(data => {
-                if (data.running) {
-                    document.getElementById('status').className = 'status running';
-                    document.getElementById('status').textContent = '正在執行回測...';
-                    document.getElementById('runBtn').disabled = true;
-                } else if (data.completed) {
-                    if (data.report_ready) {
-                        document.getElementById('status').className = 'status completed';
-                        document.getElementById('status').textContent = '回測完成 - 報告已準備';
-                        document.getElementById('reportBtn').disabled = false;
-                    } else {
-                        document.getElementById('status').className = 'status running';
-                        document.getElementById('status').textContent = '正在生成報告...';
-                        document.getElementById('reportBtn').disabled = true;
-                    }
-                    document.getElementById('kellyBtn').disabled = false;
-                    document.getElementById('runBtn').disabled = false;
-                } else if (data.error) {
-                    document.getElementById('status').className = 'status error';
-                    document.getElementById('status').textContent = '執行失敗: ' + data.error;
-                    document.getElementById('runBtn').disabled = false;
-                } else {
-                    document.getElementById('status').className = 'status ready';
-                    document.getElementById('status').textContent = '就緒';
-                    document.getElementById('runBtn').disabled = false;
+            .then(applyStatus);
+        }
+
+        // 秒數格式化為 分:秒
+        function formatSeconds(seconds) {
+            if (seconds === null || seconds === undefined) return '--:--';
+            const total = Math.round(seconds);
+            return Math.floor(total / 60) + ':' + String(total % 60).padStart(2, '0');
+        }
+
+        // 更新即時進度
+        function updateProgress(progress) {
+            if (!progress) return;
+            document.getElementById('progressPanel').style.display = 'block';
+            document.getElementById('progressFill').style.width = progress.percent + '%';
+            const pnl = progress.total_pnl >= 0 ? '+' + progress.total_pnl : progress.total_pnl;
+            document.getElementById('progressText').textContent =
+                `📅 交易日 ${progress.completed}/${progress.total || '?'} (${progress.percent}%)` +
+                (progress.current_date ? ` · ${progress.current_date}` : '') +
+                ` · 出場 ${progress.trades} 口 · 累計損益 ${pnl} 點` +
+                ` · 已執行 ${formatSeconds(progress.elapsed)} · 預估剩餘 ${formatSeconds(progress.eta_seconds)}`;
+        }
+
+        // 附加即時日誌 (只保留最後 LIVE_LOG_LINES 行)
+        const LIVE_LOG_LINES = {{ live_log_lines }};
+        function appendLog(lines) {
+            const log = document.getElementById('liveLog');
+            document.getElementById('progressPanel').style.display = 'block';
+            const atBottom = log.scrollTop + log.clientHeight >= log.scrollHeight - 5;
+            const kept = (log.textContent ? log.textContent.split('\\n') : []).concat(lines);
+            log.textContent = kept.slice(-LIVE_LOG_LINES).join('\\n');
+            if (atBottom) log.scrollTop = log.scrollHeight;
+        }
+
+        // 以 SSE 接收狀態、進度與日誌 (斷線時瀏覽器自動重連並補送)
+        function connectStream() {
+            const source = new EventSource('/stream');
+            source.addEventListener('snapshot', e => {
+                const data = JSON.parse(e.data);
+                applyStatus(data);
+                document.getElementById('liveLog').textContent = '';
+                if (data.log_tail.length) appendLog(data.log_tail);
+                updateProgress(data.progress);
+            });
+            source.addEventListener('status', e => {
+                const data = JSON.parse(e.data);
+                if (data.reset) {
+                    document.getElementById('liveLog').textContent = '';
+                    document.getElementById('progressFill').style.width = '0';
+                    document.getElementById('progressText').textContent = '';
                 }
+                applyStatus(data);
             });
+            source.addEventListener('progress', e => updateProgress(JSON.parse(e.data)));
+            source.addEventListener('log', e => appendLog(JSON.parse(e.data).lines));
         }
 
-        // 每2秒檢查一次狀態
-        setInterval(checkStatus, 2000);
+        // 優先使用 SSE，不支援時每2秒輪詢一次狀態
+        if (window.EventSource) {
+            connectStream();
+        } else {
+            setInterval(checkStatus, 2000);
+        }
     </script>
 </body>
 </html>
@@ -627,11 +743,42 @@ HTML_TEMPLATE = '''
 
 @app.route('/')
 def index():
-    return render_template_string(HTML_TEMPLATE)
+    return render_template_string(HTML_TEMPLATE, live_log_lines=LIVE_LOG_LINES)
 
 @app.route('/status')
 def status():
-    return jsonify(backtest_status)
+    return jsonify(public_status())
+
+@app.route('/stream')
+def stream():
+    """Server-Sent Events：推送回測狀態、進度與日誌"""
+    return Response(progress_stream.sse(request.headers.get('Last-Event-ID'), snapshot=public_status),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def public_status(include_log=True):
+    """回測狀態 (不含完整輸出)，供 /status 與 SSE 快照使用"""
+    status = {key: value for key, value in backtest_status.items() if key != 'result'}
+    result = backtest_status.get('result')
+    status['returncode'] = result.get('returncode') if isinstance(result, dict) else None
+    status['progress'] = backtest_progress.snapshot() if backtest_progress else None
+    if include_log:
+        status['log_tail'] = live_log.lines()
+    return status
+
+def publish_status(reset=False):
+    """推送狀態變更 (reset=True 表示新的一次回測開始)"""
+    progress_stream.publish('status', dict(public_status(include_log=False), reset=reset))
+
+def read_backtest_output(result_obj):
+    """從暫存檔讀取最近一次回測的完整 stdout + stderr"""
+    output = []
+    for key in ('stdout_file', 'stderr_file'):
+        path = result_obj.get(key)
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8', errors='replace') as f:
+                output.append(f.read())
+    return "\n".join(output)
 
 @app.route('/view_report')
 def view_report():
@@ -679,7 +826,10 @@ def kelly_analysis():
 
         # 從最近的回測結果中提取交易數據
         result_obj = backtest_status['result']
-        if isinstance(result_obj, dict) and 'stdout' in result_obj:
+        if isinstance(result_obj, dict) and 'stdout_file' in result_obj:
+            # 串流格式：完整輸出在暫存檔
+            full_output = read_backtest_output(result_obj)
+        elif isinstance(result_obj, dict) and 'stdout' in result_obj:
             # 新格式：result是包含stdout/stderr的字典
             full_output = result_obj['stdout'] + "\n" + (result_obj['stderr'] or "")
         elif hasattr(result_obj, 'stdout'):
@@ -843,6 +993,7 @@ def run_backtest():
             'report_ready': False,
             'report_file': None
         }
+        start_progress_stream()
         
         # 在背景線程執行回測
         thread = threading.Thread(target=execute_backtest_thread, args=(config_data,))
@@ -858,6 +1009,67 @@ def run_backtest():
 
 
 
+def start_progress_stream():
+    """新的一次回測：清除上一次的事件、日誌與進度"""
+    global live_log, backtest_progress
+    progress_stream.reset()
+    live_log = LogTail(max_lines=LIVE_LOG_LINES)
+    backtest_progress = None
+    publish_status(reset=True)
+
+def run_backtest_process(cmd, gui_config):
+    """
+    執行回測子進程：stdout/stderr 逐行推送到進度串流並寫入暫存檔，記憶體只保留最後幾行
+
+    Returns:
+        subprocess.CompletedProcess: stdout/stderr 為暫存檔中的完整輸出 (供報告生成使用)
+    """
+    global backtest_progress
+    backtest_progress = BacktestLogProgress(gui_config["start_date"], gui_config["end_date"])
+    for name in ('stdout', 'stderr'):
+        backtest_logs[name].close()
+        backtest_logs[name] = LogTail(max_lines=LIVE_LOG_LINES, spool_path=OUTPUT_SPOOL_TEMPLATE.format(stream=name))
+    throttle = Throttle(0.5)
+    progress_lock = threading.Lock()
+    # 日誌行每個節流週期合併成一個 log 事件 (與進度同頻率)
+    log_batches = {name: LogBatcher(progress_stream, throttle.interval, stream=name) for name in ('stdout', 'stderr')}
+
+    process = subprocess.Popen(
+        cmd,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8',
+        errors='replace',  # 處理編碼錯誤
+        bufsize=1
+    )
+
+    def pump(name, pipe):
+        for line in pipe:
+            backtest_logs[name].append(line)
+            live_log.append(line)
+            log_batches[name].add([line.rstrip('\n')])
+            with progress_lock:
+                update = backtest_progress.feed(line)
+                if update and throttle.ready():
+                    progress_stream.publish('progress', update)
+        pipe.close()
+
+    readers = [threading.Thread(target=pump, args=(name, getattr(process, name)), daemon=True)
+               for name in ('stdout', 'stderr')]
+    for reader in readers:
+        reader.start()
+    returncode = process.wait()
+    for reader in readers:
+        reader.join()
+    for batch in log_batches.values():
+        batch.flush()
+    progress_stream.publish('progress', backtest_progress.finish())
+
+    return subprocess.CompletedProcess(cmd, returncode,
+                                       backtest_logs['stdout'].read_all(), backtest_logs['stderr'].read_all())
+
 def execute_backtest_thread(config_data):
     """在背景線程執行回測"""
     global backtest_status
@@ -922,15 +1134,8 @@ def execute_backtest_thread(config_data):
 
         print(f"🚀 執行命令: {' '.join(cmd)}")
 
-        # 執行回測 - 改進輸出捕獲
-        result = subprocess.run(
-            cmd,
-            cwd=os.path.dirname(os.path.abspath(__file__)),
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            errors='replace'  # 處理編碼錯誤
-        )
+        # 執行回測 - 輸出逐行推送到進度串流
+        result = run_backtest_process(cmd, gui_config)
 
         # 輸出詳細結果到控制台
         print("=" * 60)
@@ -953,10 +1158,11 @@ def execute_backtest_thread(config_data):
             backtest_status['completed'] = True
             # 只儲存可序列化的結果數據，而不是完整的CompletedProcess對象
             backtest_status['result'] = {
-                'stdout': result.stdout,
-                'stderr': result.stderr,
+                'stdout_file': backtest_logs['stdout'].spool_path,
+                'stderr_file': backtest_logs['stderr'].spool_path,
                 'returncode': result.returncode
             }
+            publish_status()
 
             # 嘗試生成增強報告
             try:
@@ -1226,6 +1432,14 @@ def execute_backtest_thread(config_data):
                 with open(report_filename, 'w', encoding='utf-8') as f:
                     f.write(html_content)
 
+                record_report(report_filename,
+                              trade_lots=gui_config["trade_lots"],
+                              start_date=gui_config["start_date"],
+                              end_date=gui_config["end_date"],
+                              total_trades=stats.get('total_trades'),
+                              win_rate=stats.get('win_rate'),
+                              total_pnl=stats.get('total_pnl'))
+
                 print("✅ 分析報告生成成功")
                 backtest_status['report_ready'] = True
                 backtest_status['report_file'] = report_filename
@@ -1238,7 +1452,7 @@ def execute_backtest_thread(config_data):
 
         else:
             backtest_status['running'] = False
-            backtest_status['error'] = result.stderr or f"回測執行失敗 (返回碼: {result.returncode})"
+            backtest_status['error'] = backtest_logs['stderr'].text() or f"回測執行失敗 (返回碼: {result.returncode})"
             print(f"❌ 回測執行失敗，返回碼: {result.returncode}")
 
     except Exception as e:
@@ -1247,83 +1461,43 @@ def execute_backtest_thread(config_data):
         print(f"❌ 執行過程中發生異常: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        publish_status()
 
 # ============================================================================
 # 報告管理功能
 # ============================================================================
 
-def get_report_metadata(report_path):
-    """從報告文件中提取元數據"""
-    try:
-        with open(report_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        # 提取策略參數
-        metadata = {
-            'filename': os.path.basename(report_path),
-            'filepath': report_path,
-            'size': os.path.getsize(report_path),
-            'created_time': datetime.fromtimestamp(os.path.getctime(report_path)),
-            'trade_lots': 'N/A',
-            'date_range': 'N/A',
-            'total_trades': 'N/A',
-            'win_rate': 'N/A'
-        }
-
-        # 從HTML內容中提取關鍵信息
-        if '交易口數:' in content:
-            try:
-                trade_lots = content.split('交易口數:')[1].split('<')[0].strip()
-                metadata['trade_lots'] = trade_lots
-            except:
-                pass
-
-        if '總交易次數:' in content:
-            try:
-                total_trades = content.split('總交易次數:')[1].split('<')[0].strip()
-                metadata['total_trades'] = total_trades
-            except:
-                pass
-
-        if '勝率:' in content:
-            try:
-                win_rate = content.split('勝率:')[1].split('<')[0].strip()
-                metadata['win_rate'] = win_rate
-            except:
-                pass
-
-        return metadata
-    except Exception as e:
-        return {
-            'filename': os.path.basename(report_path),
-            'filepath': report_path,
-            'size': 0,
-            'created_time': datetime.now(),
-            'trade_lots': 'Error',
-            'date_range': 'Error',
-            'total_trades': 'Error',
-            'win_rate': 'Error'
-        }
-
-
-
 @app.route('/reports')
 def list_reports():
-    """顯示歷史報告列表"""
+    """顯示歷史報告列表 (分頁、排序、篩選由報告索引完成，不讀取報告內容)"""
     try:
         reports_dir = 'reports'
-        if not os.path.exists(reports_dir):
-            os.makedirs(reports_dir)
+        sort = request.args.get('sort', 'created_time')
+        sort = sort if sort in SORT_COLUMNS else 'created_time'
+        order = 'asc' if request.args.get('order') == 'asc' else 'desc'
+
+        result = ReportIndex(reports_dir).query(
+            page=request.args.get('page', 1, type=int),
+            per_page=request.args.get('per_page', DEFAULT_PER_PAGE, type=int),
+            sort=sort,
+            order=order,
+            keyword=request.args.get('q', '').strip(),
+            report_type=request.args.get('type', ''),
+            trade_lots=request.args.get('lots', type=int)
+        )
+        reports_data = result['reports']
 
-        # 獲取所有報告文件
-        report_files = glob.glob(os.path.join(reports_dir, '*.html'))
-        report_files.sort(key=os.path.getctime, reverse=True)  # 按創建時間倒序
+        # 分頁與排序連結保留目前的篩選條件
+        base_args = {key: value for key, value in request.args.items() if key != 'page' and value}
+        def page_url(page):
+            return '?' + urlencode(dict(base_args, page=page))
 
-        # 提取報告元數據
-        reports_data = []
-        for report_file in report_files:
-            metadata = get_report_metadata(report_file)
-            reports_data.append(metadata)
+        sort_links = {column: '?' + urlencode(dict(base_args, sort=column,
+                                                   order='asc' if sort == column and order == 'desc' else 'desc'))
+                      for column in SORT_COLUMNS}
+        sort_marks = {column: '' for column in SORT_COLUMNS}
+        sort_marks[sort] = ' ▼' if order == 'desc' else ' ▲'
 
         html_template = """
 <!DOCTYPE html>
@@ -1356,6 +1530,14 @@ def list_reports():
         .summary { background: #e7f3ff; padding: 15px; border-radius: 5px; margin-bottom: 20px; }
         .report-row { border-bottom: 1px solid #eee; }
         .report-row:nth-child(even) { background-color: #f9f9f9; }
+        .filters { display: flex; gap: 10px; align-items: center; flex-wrap: wrap; margin-bottom: 10px; }
+        .filters input, .filters select { padding: 6px; border: 1px solid #ccc; border-radius: 4px; }
+        .filters button { background: #007bff; color: white; padding: 6px 15px; border: none; border-radius: 4px; cursor: pointer; }
+        .reports-table th a { color: #333; text-decoration: none; }
+        .pagination { text-align: center; margin-top: 20px; }
+        .pagination a, .pagination span { display: inline-block; padding: 6px 12px; margin: 0 3px; border-radius: 4px; }
+        .pagination a { background: #007bff; color: white; text-decoration: none; }
+        .pagination span { color: #6c757d; }
     </style>
 </head>
 <body>
@@ -1369,18 +1551,34 @@ def list_reports():
 
         <div class="summary">
             <strong>📈 報告總覽：</strong> 共 {{ total_reports }} 個報告
+            {% if pages > 1 %}（第 {{ page }} / {{ pages }} 頁）{% endif %}
         </div>
 
+        <form class="filters" method="get" action="/reports">
+            <input type="text" name="q" value="{{ filters.q }}" placeholder="🔍 報告名稱">
+            <select name="type">
+                <option value="">全部類型</option>
+                <option value="enhanced" {% if filters.type == 'enhanced' %}selected{% endif %}>增強報告</option>
+                <option value="backtest" {% if filters.type == 'backtest' %}selected{% endif %}>簡易報告</option>
+            </select>
+            <input type="number" name="lots" value="{{ filters.lots }}" placeholder="交易口數" min="1" style="width: 90px;">
+            <input type="hidden" name="sort" value="{{ sort }}">
+            <input type="hidden" name="order" value="{{ order }}">
+            <button type="submit">篩選</button>
+            <a href="/reports">清除</a>
+        </form>
+
         {% if reports_data %}
         <table class="reports-table">
             <thead>
                 <tr>
-                    <th>報告名稱</th>
-                    <th>創建時間</th>
-                    <th>文件大小</th>
-                    <th>交易口數</th>
-                    <th>交易次數</th>
-                    <th>勝率</th>
+                    <th><a href="{{ sort_links.filename }}">報告名稱{{ sort_marks.filename }}</a></th>
+                    <th><a href="{{ sort_links.created_time }}">創建時間{{ sort_marks.created_time }}</a></th>
+                    <th><a href="{{ sort_links.size }}">文件大小{{ sort_marks.size }}</a></th>
+                    <th><a href="{{ sort_links.trade_lots }}">交易口數{{ sort_marks.trade_lots }}</a></th>
+                    <th><a href="{{ sort_links.total_trades }}">交易次數{{ sort_marks.total_trades }}</a></th>
+                    <th><a href="{{ sort_links.win_rate }}">勝率{{ sort_marks.win_rate }}</a></th>
+                    <th><a href="{{ sort_links.total_pnl }}">總損益{{ sort_marks.total_pnl }}</a></th>
                     <th>操作</th>
                 </tr>
             </thead>
@@ -1395,6 +1593,7 @@ def list_reports():
                     <td class="stats">{{ report.trade_lots }}口</td>
                     <td class="stats">{{ report.total_trades }}</td>
                     <td class="stats">{{ report.win_rate }}</td>
+                    <td class="stats">{{ report.total_pnl }}</td>
                     <td>
                         <div class="action-buttons">
                             <a href="/view_report/{{ report.filename }}" class="btn btn-view" target="_blank">👁️ 查看</a>
@@ -1406,6 +1605,14 @@ def list_reports():
                 {% endfor %}
             </tbody>
         </table>
+
+        {% if pages > 1 %}
+        <div class="pagination">
+            {% if prev_url %}<a href="{{ prev_url }}">« 上一頁</a>{% endif %}
+            <span>{{ page }} / {{ pages }}</span>
+            {% if next_url %}<a href="{{ next_url }}">下一頁 »</a>{% endif %}
+        </div>
+        {% endif %}
         {% endif %}
 
         {% if not reports_data %}
@@ -1464,7 +1671,17 @@ def list_reports():
         template = Template(html_template)
         return template.render(
             reports_data=reports_data,
-            total_reports=len(reports_data)
+            total_reports=result['total'],
+            page=result['page'],
+            pages=result['pages'],
+            prev_url=page_url(result['page'] - 1) if result['page'] > 1 else '',
+            next_url=page_url(result['page'] + 1) if result['page'] < result['pages'] else '',
+            sort=sort,
+            order=order,
+            sort_links=sort_links,
+            sort_marks=sort_marks,
+            filters={'q': request.args.get('q', ''), 'type': request.args.get('type', ''),
+                     'lots': request.args.get('lots', '')}
         )
 
     except Exception as e:
@@ -1504,6 +1721,7 @@ def delete_report(filename):
             return jsonify({'success': False, 'error': '報告文件不存在'})
 
         os.remove(report_path)
+        ReportIndex('reports').remove(filename)
         return jsonify({'success': True, 'message': f'報告 {filename} 已刪除'})
     except Exception as e:
         return jsonify({'success': False, 'error': f'刪除失敗: {str(e)}'})
@@ -1520,6 +1738,7 @@ def delete_all_reports():
         for report_file in report_files:
             os.remove(report_file)
             deleted_count += 1
+        ReportIndex(reports_dir).clear()
 
         return jsonify({'success': True, 'message': f'已刪除 {deleted_count} 個報告'})
     except Exception as e:
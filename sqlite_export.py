@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+PostgreSQL → SQLite 串流導出核心 (四個分析套件共用)
+
+🎯 目的：
+    原本各套件的 export_to_sqlite.py 以 fetchall() 一次讀入整張 stock_prices，
+    再逐筆 execute INSERT；資料量大時記憶體與時間都隨之暴增，而且同一份程式碼複製了好幾份。
+    本模組統一處理：
+    1. PostgreSQL 端使用伺服器端具名游標 (named cursor) 分批讀取，記憶體只保留一批
+    2. SQLite 端每批以 executemany 寫入，整個導出在單一交易內完成
+    3. 全量導出寫入暫存檔 (關閉 journal / synchronous、寫完才建立索引)，完成後再置換原檔，
+       中途失敗時原本的資料庫不受影響
+    4. 定期回報進度與每秒筆數
+
+📐 用法 (各套件的 export_to_sqlite.py 只負責注入連線池)：
+    python export_to_sqlite.py --mode full
+    python export_to_sqlite.py --mode incremental [--from-date 2025-07-01]
+
+作者：量化分析團隊
+日期：2025-07-18
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+STOCK_PRICE_COLUMNS = ('trade_datetime', 'open_price', 'high_price', 'low_price',
+                       'close_price', 'price_change', 'percentage_change', 'volume')
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS stock_prices (
+        trade_datetime TEXT PRIMARY KEY,
+        open_price INTEGER,
+        high_price INTEGER,
+        low_price INTEGER,
+        close_price INTEGER,
+        price_change INTEGER,
+        percentage_change REAL,
+        volume INTEGER
+    )
+"""
+
+# 索引名稱與建立語句 (對應PostgreSQL的函數索引與時間範圍索引)
+INDEXES = {
+    'idx_date': "CREATE INDEX IF NOT EXISTS idx_date ON stock_prices (date(trade_datetime))",
+    'idx_datetime': "CREATE INDEX IF NOT EXISTS idx_datetime ON stock_prices (trade_datetime)",
+}
+
+DEFAULT_BATCH_SIZE = 20000
+
+_COLUMN_LIST = ", ".join(STOCK_PRICE_COLUMNS)
+_INSERT_SQL = f"INSERT INTO stock_prices ({_COLUMN_LIST}) VALUES ({', '.join('?' * len(STOCK_PRICE_COLUMNS))})"
+_REPLACE_SQL = _INSERT_SQL.replace("INSERT INTO", "REPLACE INTO", 1)
+
+
+def create_schema(conn: sqlite3.Connection, with_indexes: bool = True):
+    """建立 stock_prices 表 (與索引)"""
+    conn.execute(CREATE_TABLE_SQL)
+    if with_indexes:
+        create_indexes(conn)
+
+
+def create_indexes(conn: sqlite3.Connection):
+    for sql in INDEXES.values():
+        conn.execute(sql)
+
+
+def to_sqlite_row(row: Sequence) -> tuple:
+    """PostgreSQL 資料列 (依 STOCK_PRICE_COLUMNS 順序) 轉為 SQLite 參數"""
+    trade_datetime, open_price, high_price, low_price, close_price, price_change, percentage_change, volume = row
+    return (trade_datetime.isoformat() if hasattr(trade_datetime, 'isoformat') else trade_datetime,
+            open_price, high_price, low_price, close_price, price_change,
+            float(percentage_change) if percentage_change is not None else None,
+            volume)
+
+
+def iter_postgres_batches(pg_conn, start_date: Optional[str] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                          cursor_name: str = "sqlite_export") -> Iterator[List[tuple]]:
+    """
+    以伺服器端具名游標分批讀取 stock_prices
+
+    Args:
+        pg_conn: psycopg2 連線 (具名游標需在交易內，使用完畢後結束該交易)
+        start_date: 只讀取該日 (含) 之後的資料，None 表示全部
+        batch_size: 每批筆數 (同時作為 itersize)
+    """
+    query = f"SELECT {_COLUMN_LIST} FROM stock_prices"
+    params: tuple = ()
+    if start_date:
+        query += " WHERE trade_datetime::date >= %s"
+        params = (start_date,)
+    query += " ORDER BY trade_datetime"
+
+    cursor = pg_conn.cursor(name=cursor_name)
+    cursor.itersize = batch_size
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+        pg_conn.rollback()   # 唯讀交易，結束以釋放具名游標
+
+
+class ExportProgress:
+    """導出進度：累計筆數、每秒筆數，每隔 interval 秒輸出一次"""
+
+    def __init__(self, total: Optional[int] = None, interval: float = 2.0,
+                 printer: Callable[[str], None] = print):
+        self.total = total
+        self.interval = interval
+        self.printer = printer
+        self.rows = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def add(self, rows: int):
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.printer(self.format())
+
+    def format(self) -> str:
+        done = f"{self.rows:,}"
+        if self.total:
+            done += f"/{self.total:,} ({self.rows / self.total * 100:.1f}%)"
+        return f"💾 已寫入 {done} 筆 | {self.rows_per_sec:,.0f} 筆/秒 | {self.elapsed:.1f}s"
+
+    def summary(self) -> Dict:
+        return {'rows': self.rows, 'seconds': round(self.elapsed, 3), 'rows_per_sec': round(self.rows_per_sec, 1)}
+
+
+def bulk_load(sqlite_path, batches: Iterable[Sequence[Sequence]], replace_all: bool = True,
+              progress: Optional[ExportProgress] = None) -> Dict:
+    """
+    將資料批次寫入 SQLite (單一交易)
+
+    Args:
+        sqlite_path: SQLite 檔案路徑
+        batches: PostgreSQL 資料列批次 (依 STOCK_PRICE_COLUMNS 順序)
+        replace_all: True 為全量導出 (寫入暫存檔並置換原檔，關閉 journal 並延後建立索引)；
+                     False 為增量更新 (REPLACE INTO，保留 journal 以免中斷時損毀既有資料)
+        progress: 進度回報器
+
+    Returns:
+        dict: {'rows', 'seconds', 'rows_per_sec'}
+    """
+    progress = progress or ExportProgress()
+    target = str(sqlite_path) + '.loading' if replace_all else str(sqlite_path)
+    if replace_all and os.path.exists(target):
+        os.remove(target)
+
+    conn = sqlite3.connect(target, isolation_level=None)
+    try:
+        if replace_all:
+            conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        create_schema(conn, with_indexes=not replace_all)
+
+        conn.execute("BEGIN")
+        try:
+            sql = _INSERT_SQL if replace_all else _REPLACE_SQL
+            for batch in batches:
+                conn.executemany(sql, [to_sqlite_row(row) for row in batch])
+                progress.add(len(batch))
+            if replace_all:
+                progress.printer("🔧 正在建立索引...")
+                create_indexes(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            if not replace_all:
+                conn.execute("ROLLBACK")
+            raise
+    except BaseException:
+        conn.close()
+        if replace_all and os.path.exists(target):
+            os.remove(target)
+        raise
+    conn.close()
+
+    if replace_all:
+        os.replace(target, sqlite_path)
+    return progress.summary()
+
+
+def get_date_range(sqlite_path) -> Optional[Dict]:
+    """SQLite 中現有資料的日期範圍與筆數，無資料時為 None"""
+    conn = sqlite3.connect(sqlite_path)
+    try:
+        create_schema(conn, with_indexes=False)
+        min_date, max_date, total = conn.execute(
+            "SELECT MIN(date(trade_datetime)), MAX(date(trade_datetime)), COUNT(*) FROM stock_prices").fetchone()
+    finally:
+        conn.close()
+    if min_date:
+        return {'min_date': min_date, 'max_date': max_date, 'total_records': total}
+    return None
+
+
+class SQLiteExporter:
+    """
+    PostgreSQL 到 SQLite 數據導出工具 (全量導出與增量更新)
+
+    Args:
+        sqlite_path: SQLite 檔案路徑
+        get_conn_cur: shared.get_conn_cur_from_pool_b
+        init_pools: app_setup.init_all_db_pools
+        batch_size: 每批讀取/寫入筆數
+    """
+
+    def __init__(self, sqlite_path, get_conn_cur: Callable, init_pools: Optional[Callable] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE):
+        self.sqlite_path = Path(sqlite_path)
+        self.get_conn_cur = get_conn_cur
+        self.init_pools = init_pools
+        self.batch_size = batch_size
+        self.last_stats: Optional[Dict] = None
+        self.setup_sqlite()
+
+    def setup_sqlite(self):
+        """創建SQLite數據庫和表結構"""
+        conn = sqlite3.connect(self.sqlite_path)
+        try:
+            create_schema(conn)
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"✅ SQLite數據庫已創建: {self.sqlite_path}")
+
+    def get_sqlite_date_range(self):
+        """獲取SQLite中現有數據的日期範圍"""
+        return get_date_range(self.sqlite_path)
+
+    def _connect_postgres(self) -> bool:
+        if self.init_pools is None:
+            return True
+        try:
+            self.init_pools()
+            print("✅ PostgreSQL連接池初始化成功")
+            return True
+        except Exception as e:
+            print(f"❌ PostgreSQL連接失敗: {e}")
+            return False
+
+    def _export(self, start_date: Optional[str]) -> Dict:
+        with self.get_conn_cur() as (pg_conn, pg_cur):
+            if start_date:
+                pg_cur.execute("SELECT COUNT(*) FROM stock_prices WHERE trade_datetime::date >= %s", (start_date,))
+            else:
+                pg_cur.execute("SELECT COUNT(*) FROM stock_prices")
+            total = pg_cur.fetchone()[0]
+            print(f"📈 待導出 {total:,} 筆記錄")
+            if total == 0:
+                return ExportProgress(total=0).summary()
+
+            batches = iter_postgres_batches(pg_conn, start_date, self.batch_size)
+            return bulk_load(self.sqlite_path, batches, replace_all=start_date is None,
+                             progress=ExportProgress(total=total))
+
+    def export_full_data(self):
+        """全量導出PostgreSQL數據到SQLite"""
+        print("🚀 開始全量數據導出...")
+        if not self._connect_postgres():
+            return False
+        try:
+            self.last_stats = self._export(None)
+        except Exception as e:
+            print(f"❌ 導出過程發生錯誤: {e}")
+            return False
+        print(f"✅ 成功導出 {self.last_stats['rows']:,} 筆記錄到SQLite "
+              f"({self.last_stats['seconds']:.1f}s, {self.last_stats['rows_per_sec']:,.0f} 筆/秒)")
+        return True
+
+    def export_incremental_data(self, start_date=None):
+        """增量導出新數據"""
+        print("🔄 開始增量數據更新...")
+
+        sqlite_info = self.get_sqlite_date_range()
+        if not sqlite_info:
+            print("⚠️ SQLite無數據，執行全量導出")
+            return self.export_full_data()
+
+        if start_date:
+            update_from = start_date
+        else:
+            # 從SQLite最後日期的下一天開始
+            last_date = datetime.strptime(sqlite_info['max_date'], '%Y-%m-%d')
+            update_from = (last_date + timedelta(days=1)).strftime('%Y-%m-%d')
+        print(f"📅 從 {update_from} 開始更新數據")
+
+        if not self._connect_postgres():
+            return False
+        try:
+            self.last_stats = self._export(update_from)
+        except Exception as e:
+            print(f"❌ 增量更新失敗: {e}")
+            return False
+
+        if self.last_stats['rows'] == 0:
+            print("✅ 沒有新數據需要更新")
+        else:
+            print(f"✅ 成功更新 {self.last_stats['rows']:,} 筆記錄 "
+                  f"({self.last_stats['seconds']:.1f}s, {self.last_stats['rows_per_sec']:,.0f} 筆/秒)")
+        return True
+
+    def verify_data(self):
+        """驗證SQLite數據完整性"""
+        print("🔍 驗證數據完整性...")
+
+        sqlite_info = self.get_sqlite_date_range()
+        if not sqlite_info:
+            print("❌ SQLite無數據")
+            return False
+
+        print(f"📊 SQLite數據統計:")
+        print(f"  - 總記錄數: {sqlite_info['total_records']:,}")
+        print(f"  - 日期範圍: {sqlite_info['min_date']} 至 {sqlite_info['max_date']}")
+
+        conn = sqlite3.connect(self.sqlite_path)
+        try:
+            sample_data = conn.execute(
+                "SELECT trade_datetime, close_price FROM stock_prices ORDER BY trade_datetime LIMIT 5").fetchall()
+        finally:
+            conn.close()
+        print(f"📋 數據樣本:")
+        for row in sample_data:
+            print(f"  - {row[0]}: {row[1]}")
+        return True
+
+
+def run_cli(exporter_factory: Callable[..., SQLiteExporter]):
+    """各套件 export_to_sqlite.py 共用的命令列入口"""
+    parser = argparse.ArgumentParser(description='PostgreSQL到SQLite數據導出工具')
+    parser.add_argument('--mode', choices=['full', 'incremental'], default='full',
+                        help='導出模式: full(全量) 或 incremental(增量)')
+    parser.add_argument('--from-date', help='增量更新起始日期 (YYYY-MM-DD)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='每批讀取/寫入筆數')
+    args = parser.parse_args()
+
+    exporter = exporter_factory(batch_size=args.batch_size)
+    if args.mode == 'full':
+        success = exporter.export_full_data()
+    else:
+        success = exporter.export_incremental_data(args.from_date)
+
+    if success:
+        exporter.verify_data()
+        print("🎉 數據導出完成！")
+    else:
+        print("❌ 數據導出失敗！")
@@ -21,6 +21,8 @@ import logging
 import re
 from typing import Dict, Any, List, Optional
 
+from report_index import record_report
+
 # 導入策略摘要功能
 try:
     from multi_Profit_Funded_Risk_多口 import format_config_summary, create_strategy_config_from_gui
@@ -779,6 +781,18 @@ def generate_comprehensive_report(log_content: str, config_data: Dict[str, Any])
         with open(report_filename, 'w', encoding='utf-8') as f:
             f.write(html_content)
 
+        # 6. 寫入報告索引 (報告管理頁只讀索引)
+        config_data = config_data or {}
+        basic_metrics = statistics.get('basic_metrics', {})
+        record_report(report_filename,
+                      trade_lots=config_data.get('trade_lots'),
+                      start_date=config_data.get('start_date'),
+                      end_date=config_data.get('end_date'),
+                      total_trades=basic_metrics.get('total_trades'),
+                      win_rate=basic_metrics.get('win_rate'),
+                      total_pnl=basic_metrics.get('total_pnl'),
+                      max_drawdown=statistics.get('risk_metrics', {}).get('max_drawdown'))
+
         print(f"✅ 完整報告生成成功: {report_filename}")
         return report_filename
 
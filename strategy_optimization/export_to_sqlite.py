@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+PostgreSQL 到 SQLite 數據導出工具
+支持全量導出和增量更新 (串流讀取與批次寫入由專案根目錄的 sqlite_export.py 共用實作)
+"""
+
+import sys
+import os
+from pathlib import Path
+
+# 添加當前目錄與專案根目錄到路徑
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shared
+import app_setup
+from sqlite_export import DEFAULT_BATCH_SIZE, SQLiteExporter as _StreamingExporter, run_cli
+
+
+class SQLiteExporter(_StreamingExporter):
+    def __init__(self, sqlite_path="stock_data.sqlite", batch_size=DEFAULT_BATCH_SIZE):
+        super().__init__(Path(__file__).parent / sqlite_path,
+                         get_conn_cur=shared.get_conn_cur_from_pool_b,
+                         init_pools=app_setup.init_all_db_pools,
+                         batch_size=batch_size)
+
+
+def main():
+    """主函數"""
+    run_cli(SQLiteExporter)
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,9 @@ import glob
 import shutil
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlencode
+
+from report_index import DEFAULT_PER_PAGE, SORT_COLUMNS, ReportIndex, record_report
 
 app = Flask(__name__)
 
@@ -956,6 +959,14 @@ def execute_backtest_thread(config_data):
                 with open(report_filename, 'w', encoding='utf-8') as f:
                     f.write(html_content)
 
+                record_report(report_filename,
+                              trade_lots=gui_config["trade_lots"],
+                              start_date=gui_config["start_date"],
+                              end_date=gui_config["end_date"],
+                              total_trades=stats.get('total_trades'),
+                              win_rate=stats.get('win_rate'),
+                              total_pnl=stats.get('total_pnl'))
+
                 print("✅ 分析報告生成成功")
                 backtest_status['report_ready'] = True
                 backtest_status['report_file'] = report_filename
@@ -982,78 +993,36 @@ def execute_backtest_thread(config_data):
 # 報告管理功能
 # ============================================================================
 
-def get_report_metadata(report_path):
-    """從報告文件中提取元數據"""
-    try:
-        with open(report_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        # 提取策略參數
-        metadata = {
-            'filename': os.path.basename(report_path),
-            'filepath': report_path,
-            'size': os.path.getsize(report_path),
-            'created_time': datetime.fromtimestamp(os.path.getctime(report_path)),
-            'trade_lots': 'N/A',
-            'date_range': 'N/A',
-            'total_trades': 'N/A',
-            'win_rate': 'N/A'
-        }
-
-        # 從HTML內容中提取關鍵信息
-        if '交易口數:' in content:
-            try:
-                trade_lots = content.split('交易口數:')[1].split('<')[0].strip()
-                metadata['trade_lots'] = trade_lots
-            except:
-                pass
-
-        if '總交易次數:' in content:
-            try:
-                total_trades = content.split('總交易次數:')[1].split('<')[0].strip()
-                metadata['total_trades'] = total_trades
-            except:
-                pass
-
-        if '勝率:' in content:
-            try:
-                win_rate = content.split('勝率:')[1].split('<')[0].strip()
-                metadata['win_rate'] = win_rate
-            except:
-                pass
-
-        return metadata
-    except Exception as e:
-        return {
-            'filename': os.path.basename(report_path),
-            'filepath': report_path,
-            'size': 0,
-            'created_time': datetime.now(),
-            'trade_lots': 'Error',
-            'date_range': 'Error',
-            'total_trades': 'Error',
-            'win_rate': 'Error'
-        }
-
-
-
 @app.route('/reports')
 def list_reports():
-    """顯示歷史報告列表"""
+    """顯示歷史報告列表 (分頁、排序、篩選由報告索引完成，不讀取報告內容)"""
     try:
         reports_dir = 'reports'
-        if not os.path.exists(reports_dir):
-            os.makedirs(reports_dir)
+        sort = request.args.get('sort', 'created_time')
+        sort = sort if sort in SORT_COLUMNS else 'created_time'
+        order = 'asc' if request.args.get('order') == 'asc' else 'desc'
+
+        result = ReportIndex(reports_dir).query(
+            page=request.args.get('page', 1, type=int),
+            per_page=request.args.get('per_page', DEFAULT_PER_PAGE, type=int),
+            sort=sort,
+            order=order,
+            keyword=request.args.get('q', '').strip(),
+            report_type=request.args.get('type', ''),
+            trade_lots=request.args.get('lots', type=int)
+        )
+        reports_data = result['reports']
 
-        # 獲取所有報告文件
-        report_files = glob.glob(os.path.join(reports_dir, '*.html'))
-        report_files.sort(key=os.path.getctime, reverse=True)  # 按創建時間倒序
+        # 分頁與排序連結保留目前的篩選條件
+        base_args = {key: value for key, value in request.args.items() if key != 'page' and value}
+        def page_url(page):
+            return '?' + urlencode(dict(base_args, page=page))
 
-        # 提取報告元數據
-        reports_data = []
-        for report_file in report_files:
-            metadata = get_report_metadata(report_file)
-            reports_data.append(metadata)
+        sort_links = {column: '?' + urlencode(dict(base_args, sort=column,
+                                                   order='asc' if sort == column and order == 'desc' else 'desc'))
+                      for column in SORT_COLUMNS}
+        sort_marks = {column: '' for column in SORT_COLUMNS}
+        sort_marks[sort] = ' ▼' if order == 'desc' else ' ▲'
 
         html_template = """
 <!DOCTYPE html>
@@ -1086,6 +1055,14 @@ def list_reports():
         .summary { background: #e7f3ff; padding: 15px; border-radius: 5px; margin-bottom: 20px; }
         .report-row { border-bottom: 1px solid #eee; }
         .report-row:nth-child(even) { background-color: #f9f9f9; }
+        .filters { display: flex; gap: 10px; align-items: center; flex-wrap: wrap; margin-bottom: 10px; }
+        .filters input, .filters select { padding: 6px; border: 1px solid #ccc; border-radius: 4px; }
+        .filters button { background: #007bff; color: white; padding: 6px 15px; border: none; border-radius: 4px; cursor: pointer; }
+        .reports-table th a { color: #333; text-decoration: none; }
+        .pagination { text-align: center; margin-top: 20px; }
+        .pagination a, .pagination span { display: inline-block; padding: 6px 12px; margin: 0 3px; border-radius: 4px; }
+        .pagination a { background: #007bff; color: white; text-decoration: none; }
+        .pagination span { color: #6c757d; }
     </style>
 </head>
 <body>
@@ -1099,18 +1076,34 @@ def list_reports():
 
         <div class="summary">
             <strong>📈 報告總覽：</strong> 共 {{ total_reports }} 個報告
+            {% if pages > 1 %}（第 {{ page }} / {{ pages }} 頁）{% endif %}
         </div>
 
+        <form class="filters" method="get" action="/reports">
+            <input type="text" name="q" value="{{ filters.q }}" placeholder="🔍 報告名稱">
+            <select name="type">
+                <option value="">全部類型</option>
+                <option value="enhanced" {% if filters.type == 'enhanced' %}selected{% endif %}>增強報告</option>
+                <option value="backtest" {% if filters.type == 'backtest' %}selected{% endif %}>簡易報告</option>
+            </select>
+            <input type="number" name="lots" value="{{ filters.lots }}" placeholder="交易口數" min="1" style="width: 90px;">
+            <input type="hidden" name="sort" value="{{ sort }}">
+            <input type="hidden" name="order" value="{{ order }}">
+            <button type="submit">篩選</button>
+            <a href="/reports">清除</a>
+        </form>
+
         {% if reports_data %}
         <table class="reports-table">
             <thead>
                 <tr>
-                    <th>報告名稱</th>
-                    <th>創建時間</th>
-                    <th>文件大小</th>
-                    <th>交易口數</th>
-                    <th>交易次數</th>
-                    <th>勝率</th>
+                    <th><a href="{{ sort_links.filename }}">報告名稱{{ sort_marks.filename }}</a></th>
+                    <th><a href="{{ sort_links.created_time }}">創建時間{{ sort_marks.created_time }}</a></th>
+                    <th><a href="{{ sort_links.size }}">文件大小{{ sort_marks.size }}</a></th>
+                    <th><a href="{{ sort_links.trade_lots }}">交易口數{{ sort_marks.trade_lots }}</a></th>
+                    <th><a href="{{ sort_links.total_trades }}">交易次數{{ sort_marks.total_trades }}</a></th>
+                    <th><a href="{{ sort_links.win_rate }}">勝率{{ sort_marks.win_rate }}</a></th>
+                    <th><a href="{{ sort_links.total_pnl }}">總損益{{ sort_marks.total_pnl }}</a></th>
                     <th>操作</th>
                 </tr>
             </thead>
@@ -1125,6 +1118,7 @@ def list_reports():
                     <td class="stats">{{ report.trade_lots }}口</td>
                     <td class="stats">{{ report.total_trades }}</td>
                     <td class="stats">{{ report.win_rate }}</td>
+                    <td class="stats">{{ report.total_pnl }}</td>
                     <td>
                         <div class="action-buttons">
                             <a href="/view_report/{{ report.filename }}" class="btn btn-view" target="_blank">👁️ 查看</a>
@@ -1136,6 +1130,14 @@ def list_reports():
                 {% endfor %}
             </tbody>
         </table>
+
+        {% if pages > 1 %}
+        <div class="pagination">
+            {% if prev_url %}<a href="{{ prev_url }}">« 上一頁</a>{% endif %}
+            <span>{{ page }} / {{ pages }}</span>
+            {% if next_url %}<a href="{{ next_url }}">下一頁 »</a>{% endif %}
+        </div>
+        {% endif %}
         {% endif %}
 
         {% if not reports_data %}
@@ -1194,7 +1196,17 @@ def list_reports():
         template = Template(html_template)
         return template.render(
             reports_data=reports_data,
-            total_reports=len(reports_data)
+            total_reports=result['total'],
+            page=result['page'],
+            pages=result['pages'],
+            prev_url=page_url(result['page'] - 1) if result['page'] > 1 else '',
+            next_url=page_url(result['page'] + 1) if result['page'] < result['pages'] else '',
+            sort=sort,
+            order=order,
+            sort_links=sort_links,
+            sort_marks=sort_marks,
+            filters={'q': request.args.get('q', ''), 'type': request.args.get('type', ''),
+                     'lots': request.args.get('lots', '')}
         )
 
     except Exception as e:
@@ -1234,6 +1246,7 @@ def delete_report(filename):
             return jsonify({'success': False, 'error': '報告文件不存在'})
 
         os.remove(report_path)
+        ReportIndex('reports').remove(filename)
         return jsonify({'success': True, 'message': f'報告 {filename} 已刪除'})
     except Exception as e:
         return jsonify({'success': False, 'error': f'刪除失敗: {str(e)}'})
@@ -1250,6 +1263,7 @@ def delete_all_reports():
         for report_file in report_files:
             os.remove(report_file)
             deleted_count += 1
+        ReportIndex(reports_dir).clear()
 
         return jsonify({'success': True, 'message': f'已刪除 {deleted_count} 個報告'})
     except Exception as e:
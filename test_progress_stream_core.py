@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+進度串流測試
+驗證 SSE 事件補送與快照、日誌只保留最後幾行、ETA 計算、前 N 名排行與回測日誌進度解析
+
+作者：量化分析團隊
+日期：2025-07-18
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from progress_stream_core import (BacktestLogProgress, LogBatcher, LogTail, ProgressStream, ProgressTracker, Throttle,
+                                  TopN, format_sse)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _parse(frame):
+    fields = dict(line.split(': ', 1) for line in frame.strip().split('\n'))
+    return int(fields['id']), fields['event'], json.loads(fields['data'])
+
+
+def test_sse_replay_and_snapshot():
+    """測試新連線先收快照、重連依 Last-Event-ID 補送、落後太多改送快照、無事件時送心跳"""
+    print("🧪 測試 SSE 事件代理")
+    stream = ProgressStream(history=3)
+    assert format_sse(7, 'log', {'line': '第1口'}) == 'id: 7\nevent: log\ndata: {"line": "第1口"}\n\n'
+
+    for i in range(1, 6):
+        stream.publish('progress', {'completed': i})
+
+    # 新連線：快照後接續即時事件
+    frames = stream.sse(snapshot=lambda: {'completed': 5})
+    assert next(frames).startswith('retry:')
+    assert _parse(next(frames)) == (5, 'snapshot', {'completed': 5})
+    threading.Timer(0.05, stream.publish, args=('log', {'line': 'x'})).start()
+    assert _parse(next(frames)) == (6, 'log', {'line': 'x'})
+    frames.close()
+
+    # 重連：補送 Last-Event-ID 之後仍在歷史內的事件
+    frames = stream.sse(last_event_id='4', snapshot=lambda: 'snapshot')
+    next(frames)
+    assert [_parse(next(frames))[0] for _ in range(2)] == [5, 6]
+    frames.close()
+
+    # 落後超過歷史長度：改送快照
+    frames = stream.sse(last_event_id='1', snapshot=lambda: {'completed': 6})
+    next(frames)
+    assert _parse(next(frames)) == (6, 'snapshot', {'completed': 6})
+    frames.close()
+
+    frames = stream.sse(last_event_id='6', heartbeat=0.01)
+    next(frames)
+    assert next(frames) == ": keep-alive\n\n"
+    frames.close()
+
+    # 新的一次執行：舊事件清除，已連線的用戶端繼續收新事件
+    stream.reset()
+    assert stream.events_after(6, timeout=0) == ([], False)
+    stream.publish('status', {'status': 'running'})
+    assert stream.events_after(6, timeout=0) == ([(7, 'status', {'status': 'running'})], False)
+    print("✅ SSE 事件代理正常")
+
+
+def test_log_tail_and_progress():
+    """測試日誌只保留最後幾行 (完整內容寫入暫存檔)、ETA、節流"""
+    print("🧪 測試日誌緩衝與進度")
+    with tempfile.TemporaryDirectory() as tmp:
+        tail = LogTail(max_lines=3, spool_path=os.path.join(tmp, 'stdout.log'))
+        for i in range(10):
+            tail.append(f"line {i}\n")
+        assert tail.lines() == ['line 7', 'line 8', 'line 9'] and tail.dropped_lines == 7
+        assert tail.text().startswith("... (省略前 7 行)")
+        assert tail.read_all() == ''.join(f"line {i}\n" for i in range(10))
+        assert list(tail.iter_lines()) == [f"line {i}" for i in range(10)]
+    assert LogTail(max_lines=2).append("a\nb\nc") == ['a', 'b', 'c']
+
+    clock = FakeClock()
+    tracker = ProgressTracker(total=5000, clock=clock)
+    assert tracker.snapshot()['eta_seconds'] is None
+    clock.now += 50
+    progress = tracker.update(completed=100)
+    assert (progress['percent'], progress['rate'], progress['eta_seconds']) == (2.0, 2.0, 2450.0)
+    assert tracker.update(completed=90)['completed'] == 100  # 完成數只會往前
+
+    throttle = Throttle(1.0, clock=clock)
+    assert throttle.ready() and not throttle.ready() and throttle.ready(force=True)
+    clock.now += 1
+    assert throttle.ready()
+    print("✅ 日誌緩衝與進度正常")
+
+
+def test_log_batcher():
+    """測試日誌行每個週期合併為一個事件、停頓時由計時器補送、flush 立即送出"""
+    print("🧪 測試日誌批次發送")
+    stream = ProgressStream(history=100)
+    clock = FakeClock()
+    batcher = LogBatcher(stream, interval=0.2, clock=clock, stream='stdout')
+    batcher.add(['line 0'])
+    for i in range(1, 500):
+        batcher.add([f'line {i}'])
+    events = [(event, data) for _, event, data in stream.events_after(0)[0]]
+    assert events == [('log', {'stream': 'stdout', 'lines': ['line 0']})]
+
+    # 週期內累積的行由計時器一次補送
+    deadline = time.monotonic() + 2
+    while len(stream.events_after(0)[0]) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    _, event, data = stream.events_after(0)[0][-1]
+    assert event == 'log' and data['lines'] == [f'line {i}' for i in range(1, 500)]
+
+    # 週期已滿直接發送；flush 送出剩餘行，沒有剩餘時不發送
+    clock.now += 1
+    batcher.add(['a'])
+    batcher.add(['b', 'c'])
+    batcher.flush()
+    batcher.flush()
+    assert [data['lines'] for _, _, data in stream.events_after(0)[0][2:]] == [['a'], ['b', 'c']]
+    print("✅ 日誌批次發送正常")
+
+
+def test_top_n():
+    """測試前 N 名只保留 N 筆、依 key 由高到低、同分先到者優先"""
+    print("🧪 測試前 N 名排行")
+    top = TopN(3, key=lambda row: row['mdd'])
+    entered = [top.push({'id': i, 'mdd': mdd}) for i, mdd in enumerate([-80, -30, -120, -30, -10, -200])]
+    assert entered == [True, True, True, True, True, False]
+    assert [(row['rank'], row['id']) for row in top.rows()] == [(1, 4), (2, 1), (3, 3)]
+    assert len(top) == 3
+    print("✅ 前 N 名排行正常")
+
+
+def test_backtest_log_progress():
+    """測試回測日誌的交易日進度與累計損益 (總損益摘要不重複計入)"""
+    print("🧪 測試回測日誌進度")
+    clock = FakeClock()
+    progress = BacktestLogProgress('2024-11-04', '2024-11-08', clock=clock)
+    assert progress.tracker.total == 5
+    log = [
+        "INFO [__main__.run_backtest:382] --- 2024-11-04 | 開盤區間: 23130 - 23180 | 區間濾網未啟用 ---",
+        "INFO   ✅ 第1口移動停利 | 時間: 08:49:00, 價格: 23115, 損益: +15",
+        "INFO   🛡️ 第2口保護性停損 | 時間: 09:05:00, 出場價: 23234, 損益: -104",
+        "INFO --- 2024-11-05 | 開盤區間: 23746 - 23793 | 區間濾網未啟用 ---",
+        "INFO     🚨 第1口風險平倉 | 損益: -38點",
+        "INFO 💰 總損益: -127.0",
+    ]
+    events = []
+    for line in log:
+        clock.now += 1
+        event = progress.feed(line)
+        if event:
+            events.append(event)
+    assert [(e['current_date'], e['completed']) for e in events] == [('2024-11-04', 0), ('2024-11-05', 1)]
+    assert events[1]['trades'] == 2 and events[1]['total_pnl'] == -89.0
+    final = progress.finish()
+    assert (final['completed'], final['total'], final['percent'], final['trades'], final['total_pnl']) == \
+        (2, 2, 100.0, 3, -127.0)
+    print("✅ 回測日誌進度正常")
+
+
+if __name__ == "__main__":
+    test_sse_replay_and_snapshot()
+    test_log_tail_and_progress()
+    test_log_batcher()
+    test_top_n()
+    test_backtest_log_progress()
+    print("\n🎯 進度串流測試完成")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+測試Queue基礎設施批次處理
+- 策略回調依序收到每一筆Tick (TickData 不轉字典)
+- UI每幀最多刷新一次，只顯示最新一筆
+- 佇列深度、延遲、丟棄統計與停止時立即喚醒
+"""
+
+import time
+import threading
+
+from queue_infrastructure.queue_manager import QueueManager, TickData
+from queue_infrastructure.tick_processor import TickDataProcessor
+from queue_infrastructure.ui_updater import UIUpdateManager
+
+
+class _FrameClock:
+    """代替 Tk root 的畫面節拍：after() 只記錄，由測試手動推進一幀"""
+
+    def __init__(self):
+        self.pending = None
+
+    def after(self, interval, func):
+        self.pending = func
+        return 1
+
+    def after_cancel(self, after_id):
+        self.pending = None
+
+    def tick(self):
+        func, self.pending = self.pending, None
+        func()
+
+
+def _tick(i):
+    return TickData(market_no="TF", stock_idx=1, date=20250703, time_hms=90000 + i % 60, time_millis=i,
+                    bid=2246100 + i, ask=2246200 + i, close=2246200 + i, qty=1)
+
+
+def _wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_tick_record_and_queue_counters():
+    """測試TickData字典相容存取、丟棄與深度/延遲統計"""
+    print("🧪 測試Tick記錄與佇列統計")
+    tick = _tick(5)
+    assert tick.corrected_price == 22462.05 and tick.formatted_time == "09:00:05"
+    assert tick['corrected_price'] == tick.get('corrected_price') == 22462.05
+    assert 'time_hms' in tick and tick.get('missing', 0) == 0
+    assert tick.to_dict()['formatted_time'] == "09:00:05"
+
+    manager = QueueManager(tick_queue_size=3)
+    results = [manager.put_tick_data(_tick(i)) for i in range(5)]
+    assert results == [True, True, True, False, False]
+
+    time.sleep(0.002)
+    batch = manager.get_tick_batch(max_items=2, timeout=0)
+    assert [t.time_millis for t in batch] == [0, 1]
+    assert manager.get_tick_data(timeout=0).time_millis == 2
+    assert manager.get_tick_batch(timeout=0) == []
+
+    status = manager.get_queue_status()
+    assert status['tick_dropped'] == 2 and status['tick_queue_size'] == 0
+    assert status['stats']['tick_max_depth'] == 3 and status['stats']['tick_batches'] == 2
+    assert status['latency_max_ms'] >= 2.0 and 0 < status['latency_avg_ms'] <= status['latency_max_ms']
+    print("✅ Tick記錄與佇列統計正常")
+
+
+def test_strategy_sees_every_tick_and_ui_coalesces():
+    """測試策略收到每筆Tick，UI每幀只刷新最新一筆"""
+    print("🧪 測試批次處理與UI合併")
+    manager = QueueManager(tick_queue_size=1000)
+    processor = TickDataProcessor(manager)
+    seen = []
+    processor.add_strategy_callback(lambda tick: seen.append(tick.time_millis))
+
+    clock = _FrameClock()
+    ui = UIUpdateManager(clock, manager)
+    shown = []
+    ui.add_tick_callback(lambda tick: shown.append(tick.time_millis))
+    ui.start_updates()
+
+    # 處理線程啟動前先累積一批
+    for i in range(500):
+        manager.put_tick_data(_tick(i))
+    processor.start_processing()
+    assert _wait_for(lambda: len(seen) == 500)
+    assert seen == list(range(500))
+    assert processor.stats['batch_count'] < 500 and processor.stats['largest_batch'] > 1
+    assert processor.get_last_tick_data().time_millis == 499
+
+    # 一幀只刷新一次，只拿到最新一筆
+    assert _wait_for(lambda: manager.get_latest_tick()[0] == 500)
+    clock.tick()
+    assert shown == [499] and ui.stats['tick_coalesced'] == 499
+    clock.tick()
+    assert shown == [499]  # 沒有新資料不重複刷新
+
+    manager.put_tick_data(_tick(500))
+    assert _wait_for(lambda: manager.get_latest_tick()[0] == 501)
+    clock.tick()
+    assert shown == [499, 500] and ui.stats['tick_updates'] == 2
+
+    # 外部資料顯示同樣只保留最新一筆
+    data_shown = []
+    ui.add_data_callback(data_shown.append)
+    ui.update_data_display({'price': 1})
+    ui.update_data_display({'price': 2})
+    clock.tick()
+    assert data_shown == [{'price': 2}] and ui.stats['data_coalesced'] == 1
+
+    # 日誌非阻塞整批取出
+    assert ui.stats['log_updates'] > 0
+
+    ui.stop_updates()
+    processor.stop_processing()
+    print("✅ 批次處理與UI合併正常")
+
+
+def test_stop_wakes_idle_consumer():
+    """測試佇列為空時停止處理線程不需等到超時"""
+    print("🧪 測試停止喚醒")
+    manager = QueueManager()
+    processor = TickDataProcessor(manager)
+    processor.idle_timeout = 5.0
+    processor.start_processing()
+    time.sleep(0.05)
+
+    start = time.monotonic()
+    processor.stop_processing()
+    assert time.monotonic() - start < 1.0
+    assert not processor.processing_thread.is_alive()
+
+    # 消費端等待中，放入資料立即被喚醒
+    results = []
+    consumer = threading.Thread(target=lambda: results.append(manager.get_tick_batch(timeout=5.0)))
+    consumer.start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    manager.put_tick_data(_tick(1))
+    consumer.join(2.0)
+    assert time.monotonic() - start < 1.0 and len(results[0]) == 1
+    print("✅ 停止喚醒正常")
+
+
+if __name__ == "__main__":
+    test_tick_record_and_queue_counters()
+    test_strategy_sees_every_tick_and_ui_coalesces()
+    test_stop_wakes_idle_consumer()
+    print("\n🎯 Queue批次處理測試完成")
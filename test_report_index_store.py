@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+報告索引測試
+驗證報告產生時寫入的指標、舊報告補建、已刪除報告的清除，以及伺服器端分頁排序篩選
+
+作者：量化分析團隊
+日期：2025-07-18
+"""
+
+import os
+import sys
+import tempfile
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import report_index_store
+from report_index_store import ReportIndex, record_report
+
+
+def _write(reports_dir, filename, content="<html></html>"):
+    path = os.path.join(reports_dir, filename)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return path
+
+
+def test_record_and_legacy_backfill():
+    """測試寫入指標、舊報告只讀一次補建、檔案刪除後記錄移除"""
+    print("🧪 測試報告索引寫入與補建")
+    with tempfile.TemporaryDirectory() as reports_dir:
+        path = _write(reports_dir, "enhanced_report_20250718_100000.html")
+        assert record_report(path, trade_lots=3, start_date="2024-11-04", end_date="2025-06-27",
+                             total_trades=131, win_rate=96.95, total_pnl=4245.6, max_drawdown=-120.0)
+
+        # 舊版增強報告與簡易報告 (統計卡片數值在標籤之前)
+        _write(reports_dir, "enhanced_report_20250701_090000.html",
+               "<pre>📅 回測期間: 2024-11-06 至 2025-06-27\n📊 交易口數: 3 口\n📈 總交易次數: 136\n"
+               "🎯 勝率: 97.06%\n💰 總損益: 4062.20 點</pre>")
+        _write(reports_dir, "backtest_report_20250702_090000.html",
+               '<div class="stat-value">12</div>\n<div class="stat-label">總交易次數</div>'
+               '<div class="stat-value">58.33%</div>\n<div class="stat-label">勝率</div>'
+               '<div class="stat-value">N/A</div>\n<div class="stat-label">總損益</div>')
+        _write(reports_dir, "notes.txt", "非報告檔")
+
+        index = ReportIndex(reports_dir)
+        with mock.patch.object(report_index_store, 'parse_report_metadata',
+                               wraps=report_index_store.parse_report_metadata) as parse:
+            result = index.query()
+            assert parse.call_count == 2
+            index.query()
+            assert parse.call_count == 2  # 已建立索引的報告不再讀取
+
+        assert result['total'] == 3
+        reports = {report['filename']: report for report in result['reports']}
+        recorded = reports["enhanced_report_20250718_100000.html"]
+        assert (recorded['trade_lots'], recorded['total_trades'], recorded['win_rate']) == ('3', '131', '96.95%')
+        assert recorded['date_range'] == "2024-11-04 ~ 2025-06-27" and recorded['max_drawdown'] == '-120.0'
+
+        legacy = reports["enhanced_report_20250701_090000.html"]
+        assert (legacy['trade_lots'], legacy['total_trades'], legacy['win_rate'], legacy['total_pnl']) == \
+            ('3', '136', '97.06%', '4062.2')
+        assert legacy['date_range'] == "2024-11-06 ~ 2025-06-27"
+
+        simple = reports["backtest_report_20250702_090000.html"]
+        assert (simple['total_trades'], simple['win_rate'], simple['total_pnl']) == ('12', '58.33%', 'N/A')
+        assert simple['report_type'] == 'backtest'
+
+        os.remove(path)
+        assert index.sync() == {'added': 0, 'removed': 1}
+        index.remove("backtest_report_20250702_090000.html")
+        assert index.query(sync=False)['total'] == 1
+        index.clear()
+        assert index.query(sync=False)['total'] == 0
+    print("✅ 報告索引寫入與補建正常")
+
+
+def test_pagination_sorting_and_filters():
+    """測試分頁、排序 (缺值排最後)、檔名/類型/口數篩選"""
+    print("🧪 測試分頁排序篩選")
+    with tempfile.TemporaryDirectory() as reports_dir:
+        for i in range(25):
+            path = _write(reports_dir, f"enhanced_report_20250718_{i:06d}.html")
+            record_report(path, trade_lots=1 + i % 3, total_trades=10 + i, win_rate=50 + i,
+                          total_pnl=None if i == 7 else i * 100 - 1000)
+        _write(reports_dir, "backtest_report_20250718_999999.html")
+
+        index = ReportIndex(reports_dir)
+        first = index.query(page=1, per_page=10, sort='total_pnl', order='desc')
+        assert (first['total'], first['pages'], len(first['reports'])) == (26, 3, 10)
+        assert first['reports'][0]['total_pnl'] == '1400.0'
+
+        last = index.query(page=99, per_page=10, sort='total_pnl', order='desc')
+        assert last['page'] == 3 and len(last['reports']) == 6
+        assert [r['total_pnl'] for r in last['reports']][-2:] == ['N/A', 'N/A']
+
+        ascending = index.query(per_page=5, sort='total_pnl', order='asc')['reports']
+        assert ascending[0]['total_pnl'] == '-1000.0'
+
+        # 不在白名單的排序欄位退回創建時間，不會組入 SQL
+        assert index.query(sort="size; DROP TABLE reports")['total'] == 26
+
+        assert index.query(report_type='backtest')['total'] == 1
+        assert index.query(trade_lots=2)['total'] == 8
+        assert index.query(keyword='_00001')['total'] == 10
+        assert index.query(keyword='%')['total'] == 0
+        assert index.query(per_page=10_000)['per_page'] == report_index_store.MAX_PER_PAGE
+    print("✅ 分頁排序篩選正常")
+
+
+if __name__ == "__main__":
+    test_record_and_legacy_backfill()
+    test_pagination_sorting_and_filters()
+    print("\n🎯 報告索引測試完成")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+PostgreSQL → SQLite 串流導出測試
+以模擬的具名游標驗證分批讀取、全量重建 (索引延後建立)、增量 REPLACE 與進度統計
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlite_export import INDEXES, SQLiteExporter, bulk_load, iter_postgres_batches
+
+
+def _pg_rows(start, days, per_day=300, close_offset=0):
+    rows = []
+    for day in range(days):
+        base = datetime(start.year, start.month, start.day, 8, 45) + timedelta(days=day)
+        for minute in range(per_day):
+            price = 20000 + minute + close_offset
+            rows.append((base + timedelta(minutes=minute), price, price + 5, price - 5, price + close_offset,
+                         1, Decimal('0.01') if minute else Decimal('0'), 10))
+    return rows
+
+
+class FakeCursor:
+    """模擬 psycopg2 游標：具名游標只能 fetchmany，未具名游標回傳 COUNT"""
+
+    def __init__(self, rows, name=None):
+        self.rows, self.name, self.itersize = rows, name, 2000
+        self.result, self.fetch_sizes = [], []
+
+    def execute(self, query, params=()):
+        rows = self.rows
+        if params:
+            start = datetime.strptime(params[0], '%Y-%m-%d').date()
+            rows = [row for row in rows if row[0].date() >= start]
+        self.result = [(len(rows),)] if 'COUNT(*)' in query else list(rows)
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        raise AssertionError("串流導出不應 fetchall")
+
+    def fetchmany(self, size):
+        batch, self.result = self.result[:size], self.result[size:]
+        self.fetch_sizes.append(len(batch))
+        return batch
+
+    def close(self):
+        pass
+
+
+class FakePGConnection:
+    def __init__(self, rows):
+        self.rows, self.named_cursors, self.rollbacks = rows, [], 0
+
+    def cursor(self, name=None):
+        cursor = FakeCursor(self.rows, name)
+        if name:
+            self.named_cursors.append(cursor)
+        return cursor
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def _fake_pool(pg_conn):
+    class Context:
+        def __enter__(self):
+            return pg_conn, pg_conn.cursor()
+
+        def __exit__(self, *exc):
+            return False
+
+    return lambda: Context()
+
+
+def _sqlite_rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT * FROM stock_prices ORDER BY trade_datetime").fetchall()
+
+
+def test_batches_stream_from_named_cursor():
+    """測試以具名游標分批讀取"""
+    print("🧪 測試具名游標分批讀取")
+    pg_conn = FakePGConnection(_pg_rows(datetime(2024, 1, 1), 3))
+    batches = list(iter_postgres_batches(pg_conn, batch_size=400))
+    assert [len(b) for b in batches] == [400, 400, 100]
+    assert pg_conn.named_cursors[0].name and pg_conn.rollbacks == 1
+    assert len(list(iter_postgres_batches(pg_conn, start_date='2024-01-03', batch_size=400))) == 1
+    print("✅ 分批讀取正常")
+
+
+def test_full_and_incremental_export():
+    """測試全量導出重建索引、增量更新覆蓋修正資料，結果與逐筆寫入相同"""
+    print("🧪 測試全量與增量導出")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'stock_data.sqlite')
+        rows = _pg_rows(datetime(2024, 1, 1), 5)
+        exporter = SQLiteExporter(path, get_conn_cur=_fake_pool(FakePGConnection(rows)), batch_size=700)
+        assert exporter.export_full_data()
+        assert exporter.last_stats['rows'] == len(rows) and exporter.last_stats['rows_per_sec'] > 0
+
+        stored = _sqlite_rows(path)
+        assert len(stored) == len(rows)
+        assert stored[0] == (rows[0][0].isoformat(), 20000, 20005, 19995, 20000, 1, 0.0, 10)
+        assert stored[1][6] == 0.01
+        with sqlite3.connect(path) as conn:
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+            assert set(INDEXES) <= indexes
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'delete'
+
+        # 增量：最後一天的資料被修正，並新增兩天
+        revised = rows[:-300] + _pg_rows(datetime(2024, 1, 5), 3, close_offset=7)
+        exporter.get_conn_cur = _fake_pool(FakePGConnection(revised))
+        assert exporter.export_incremental_data(start_date='2024-01-05')
+        assert exporter.last_stats['rows'] == 900
+        stored = _sqlite_rows(path)
+        assert len(stored) == len(revised)
+        assert [row[4] for row in stored] == [row[4] for row in revised] and stored[4 * 300][4] == 20014
+
+        # 沒有新資料
+        assert exporter.export_incremental_data()
+        assert exporter.last_stats['rows'] == 0
+        assert exporter.get_sqlite_date_range()['max_date'] == '2024-01-07'
+    print("✅ 全量與增量導出正常")
+
+
+def test_failed_full_export_keeps_existing_data():
+    """測試全量導出中途失敗時回滾，既有資料與索引不受影響"""
+    print("🧪 測試導出失敗回滾")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'stock_data.sqlite')
+        rows = _pg_rows(datetime(2024, 1, 1), 2)
+        bulk_load(path, [rows])
+
+        def broken_batches():
+            yield rows[:100]
+            raise RuntimeError("連線中斷")
+
+        try:
+            bulk_load(path, broken_batches())
+            raise AssertionError("應拋出例外")
+        except RuntimeError:
+            pass
+        assert len(_sqlite_rows(path)) == len(rows)
+        with sqlite3.connect(path) as conn:
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+        assert set(INDEXES) <= indexes
+    print("✅ 導出失敗回滾正常")
+
+
+if __name__ == "__main__":
+    test_batches_stream_from_named_cursor()
+    test_full_and_incremental_export()
+    test_failed_full_export_keeps_existing_data()
+    print("\n🎯 串流導出測試完成")